@@ -18,6 +18,7 @@ from app.schemas.admin.dashboard import (
     ActivityFeedItem,
     RecentActivity
 )
+from app.services.audit.audit_storage import activity_stats
 
 router = APIRouter(prefix="/activity", tags=["activity-feed"])
 
@@ -324,67 +325,11 @@ async def get_activity_stats(
     """
     start_date = datetime.utcnow() - timedelta(days=days)
 
-    # Get daily activity counts
-    daily_stats_query = text("""
-        SELECT
-            DATE(created_at) as date,
-            event_type,
-            COUNT(*) as count
-        FROM audit_logs
-        WHERE created_at >= :start_date
-        GROUP BY DATE(created_at), event_type
-        ORDER BY date DESC, count DESC
-    """)
-
-    result = await db.execute(daily_stats_query, {"start_date": start_date})
-
-    daily_stats = {}
-    event_type_totals = {}
-
-    for row in result:
-        date_str = row.date.isoformat()
-        if date_str not in daily_stats:
-            daily_stats[date_str] = {}
-
-        daily_stats[date_str][row.event_type] = row.count
-        event_type_totals[row.event_type] = event_type_totals.get(
-            row.event_type, 0) + row.count
-
-    # Get top actors
-    top_actors_query = text("""
-        SELECT
-            actor_id,
-            COUNT(*) as activity_count
-        FROM audit_logs
-        WHERE created_at >= :start_date AND actor_id IS NOT NULL
-        GROUP BY actor_id
-        ORDER BY activity_count DESC
-        LIMIT 10
-    """)
-
-    actors_result = await db.execute(top_actors_query, {"start_date": start_date})
-    top_actors = [{"actor_id": row.actor_id, "count": row.activity_count}
-                  for row in actors_result]
-
-    # Get hourly distribution
-    hourly_stats_query = text("""
-        SELECT
-            EXTRACT(HOUR FROM created_at) as hour,
-            COUNT(*) as count
-        FROM audit_logs
-        WHERE created_at >= :start_date
-        GROUP BY EXTRACT(HOUR FROM created_at)
-        ORDER BY hour
-    """)
-
-    hourly_result = await db.execute(hourly_stats_query, {"start_date": start_date})
-    hourly_distribution = {int(row.hour): row.count for row in hourly_result}
+    # Served from the hourly rollups rather than scanning audit_logs
+    stats = await activity_stats(db, start_date)
 
     return {
-        "daily_stats": daily_stats,
-        "event_type_totals": event_type_totals,
-        "top_actors": top_actors,
-        "hourly_distribution": hourly_distribution,
+        **stats,
         "analysis_period": {
             "start_date": start_date.isoformat(),
             "end_date": datetime.utcnow().isoformat(),
@@ -18,6 +18,7 @@ from app.models.user import User
 from app.models.order import Order
 from app.models.product import Product
 from app.models.audit.audit_log import AuditLog
+from app.services.admin.dashboard_metrics import dashboard_metrics
 from app.schemas.admin.dashboard import (
     DashboardMetrics,
     SystemHealthMetrics,
@@ -40,164 +41,70 @@ router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 @router.get("/metrics", response_model=DashboardMetrics)
 async def get_dashboard_metrics(
     current_admin: AdminUser = Depends(get_current_super_admin),
-    db: AsyncSession = Depends(get_async_db),
     days: int = Query(default=30, ge=1, le=365,
                       description="Number of days to analyze")
 ):
     """
     Get comprehensive dashboard metrics including KPIs, system health, and performance data.
     """
-    end_date = datetime.utcnow()
-    start_date = end_date - timedelta(days=days)
-
-    # Get basic tenant metrics
-    tenant_query = await db.execute(
-        text("""
-            SELECT
-                COUNT(*) as total_tenants,
-                COUNT(CASE WHEN is_active = true THEN 1 END) as active_tenants,
-                COUNT(CASE WHEN is_verified = true THEN 1 END) as verified_tenants,
-                COUNT(CASE WHEN created_at >= :start_date THEN 1 END) as new_tenants
-            FROM tenants
-        """),
-        {"start_date": start_date}
-    )
-    tenant_metrics = tenant_query.fetchone()
-
-    # Get user metrics
-    user_query = await db.execute(
-        text("""
-            SELECT
-                COUNT(*) as total_users,
-                COUNT(CASE WHEN is_active = true THEN 1 END) as active_users,
-                COUNT(CASE WHEN created_at >= :start_date THEN 1 END) as new_users,
-                COUNT(CASE WHEN last_login >= :start_date THEN 1 END) as active_in_period
-            FROM users
-        """),
-        {"start_date": start_date}
-    )
-    user_metrics = user_query.fetchone()
-
-    # Get order metrics
-    order_query = await db.execute(
-        text("""
-            SELECT
-                COUNT(*) as total_orders,
-                COUNT(CASE WHEN status = 'completed' THEN 1 END) as completed_orders,
-                COUNT(CASE WHEN created_at >= :start_date THEN 1 END) as recent_orders,
-                COALESCE(SUM(CASE WHEN status = 'completed' THEN total_amount END), 0) as total_revenue,
-                COALESCE(AVG(CASE WHEN status = 'completed' THEN total_amount END), 0) as avg_order_value
-            FROM orders
-        """),
-        {"start_date": start_date}
-    )
-    order_metrics = order_query.fetchone()
-
-    # Get product metrics
-    product_query = await db.execute(
-        text("""
-            SELECT
-                COUNT(*) as total_products,
-                COUNT(CASE WHEN is_active = true THEN 1 END) as active_products,
-                COUNT(CASE WHEN created_at >= :start_date THEN 1 END) as new_products,
-                COALESCE(SUM(inventory_quantity), 0) as total_inventory
-            FROM products
-        """),
-        {"start_date": start_date}
-    )
-    product_metrics = product_query.fetchone()
-
-    # Get security metrics
-    security_query = await db.execute(
-        text("""
-            SELECT
-                COUNT(CASE WHEN event_type = 'authentication' AND details->>'success' = 'true' THEN 1 END) as successful_logins,
-                COUNT(CASE WHEN event_type = 'authentication' AND details->>'success' = 'false' THEN 1 END) as failed_logins,
-                COUNT(CASE WHEN event_type = 'security_violation' THEN 1 END) as security_violations,
-                COUNT(CASE WHEN event_type = 'emergency_lockdown' THEN 1 END) as emergency_lockdowns
-            FROM audit_logs
-            WHERE created_at >= :start_date
-        """),
-        {"start_date": start_date}
-    )
-    security_metrics = security_query.fetchone()
-
-    # Get performance metrics (simplified - in production, use monitoring tools)
-    performance_query = await db.execute(
-        text("""
-            SELECT
-                COUNT(*) as total_requests,
-                AVG(CASE WHEN details->>'response_time' IS NOT NULL
-                    THEN CAST(details->>'response_time' AS FLOAT) END) as avg_response_time,
-                COUNT(CASE WHEN details->>'status_code' LIKE '5%' THEN 1 END) as error_count
-            FROM audit_logs
-            WHERE created_at >= :start_date AND event_type = 'api_request'
-        """),
-        {"start_date": start_date}
-    )
-    performance_metrics = performance_query.fetchone()
+    metrics = await dashboard_metrics.snapshot(days)
+    tenant_metrics = metrics["tenants"]
+    user_metrics = metrics["users"]
+    order_metrics = metrics["orders"]
+    product_metrics = metrics["products"]
+    audit_metrics = metrics["audit"]
 
     # Calculate growth rates
-    previous_start = start_date - timedelta(days=days)
-    previous_tenant_query = await db.execute(
-        text("""
-            SELECT COUNT(*) as previous_tenants
-            FROM tenants
-            WHERE created_at >= :start_date AND created_at < :end_date
-        """),
-        {"start_date": previous_start, "end_date": start_date}
-    )
-    previous_tenant_count = previous_tenant_query.scalar() or 0
-
+    previous_tenant_count = tenant_metrics["previous_tenants"]
     tenant_growth_rate = 0
     if previous_tenant_count > 0:
-        tenant_growth_rate = ((tenant_metrics.new_tenants -
+        tenant_growth_rate = ((tenant_metrics["new_tenants"] -
                               previous_tenant_count) / previous_tenant_count) * 100
 
     return DashboardMetrics(
         tenant_metrics=TenantOverview(
-            total_tenants=tenant_metrics.total_tenants,
-            active_tenants=tenant_metrics.active_tenants,
-            verified_tenants=tenant_metrics.verified_tenants,
-            new_tenants=tenant_metrics.new_tenants,
+            total_tenants=tenant_metrics["total_tenants"],
+            active_tenants=tenant_metrics["active_tenants"],
+            verified_tenants=tenant_metrics["verified_tenants"],
+            new_tenants=tenant_metrics["new_tenants"],
             growth_rate=tenant_growth_rate
         ),
         user_metrics=UserMetrics(
-            total_users=user_metrics.total_users,
-            active_users=user_metrics.active_users,
-            new_users=user_metrics.new_users,
-            active_in_period=user_metrics.active_in_period,
+            total_users=user_metrics["total_users"],
+            active_users=user_metrics["active_users"],
+            new_users=user_metrics["new_users"],
+            active_in_period=user_metrics["active_in_period"],
             retention_rate=0.0  # Calculate based on your business logic
         ),
         order_metrics=OrderMetrics(
-            total_orders=order_metrics.total_orders,
-            completed_orders=order_metrics.completed_orders,
-            recent_orders=order_metrics.recent_orders,
-            total_revenue=float(order_metrics.total_revenue),
-            avg_order_value=float(order_metrics.avg_order_value),
-            completion_rate=(order_metrics.completed_orders /
-                             max(order_metrics.total_orders, 1)) * 100
+            total_orders=order_metrics["total_orders"],
+            completed_orders=order_metrics["completed_orders"],
+            recent_orders=order_metrics["recent_orders"],
+            total_revenue=float(order_metrics["total_revenue"]),
+            avg_order_value=float(order_metrics["avg_order_value"]),
+            completion_rate=(order_metrics["completed_orders"] /
+                             max(order_metrics["total_orders"], 1)) * 100
         ),
         product_metrics=ProductMetrics(
-            total_products=product_metrics.total_products,
-            active_products=product_metrics.active_products,
-            new_products=product_metrics.new_products,
-            total_inventory=product_metrics.total_inventory
+            total_products=product_metrics["total_products"],
+            active_products=product_metrics["active_products"],
+            new_products=product_metrics["new_products"],
+            total_inventory=product_metrics["total_inventory"]
         ),
         security_metrics=SecurityMetrics(
-            successful_logins=security_metrics.successful_logins,
-            failed_logins=security_metrics.failed_logins,
-            security_violations=security_metrics.security_violations,
-            emergency_lockdowns=security_metrics.emergency_lockdowns,
+            successful_logins=audit_metrics["successful_logins"],
+            failed_logins=audit_metrics["failed_logins"],
+            security_violations=audit_metrics["security_violations"],
+            emergency_lockdowns=audit_metrics["emergency_lockdowns"],
             threat_level="LOW"  # Calculate based on security events
         ),
         performance_metrics=PerformanceMetrics(
-            total_requests=performance_metrics.total_requests or 0,
-            avg_response_time=performance_metrics.avg_response_time or 0.0,
-            error_count=performance_metrics.error_count or 0,
+            total_requests=audit_metrics["total_requests"],
+            avg_response_time=audit_metrics["avg_response_time"],
+            error_count=audit_metrics["error_count"],
             uptime_percentage=99.9  # Calculate from monitoring data
         ),
-        last_updated=datetime.utcnow()
+        last_updated=metrics["computed_at"]
     )
 
 
@@ -247,13 +154,16 @@ async def get_dashboard_kpis(
     )
     health_data = health_query.fetchone()
 
+    # Table totals do not depend on the window; share the metrics endpoint's snapshot
+    totals = await dashboard_metrics.snapshot(30)
+
     return DashboardKPIs(
-        total_tenants=await db.scalar(text("SELECT COUNT(*) FROM tenants")),
-        active_tenants=await db.scalar(text("SELECT COUNT(*) FROM tenants WHERE is_active = true")),
-        total_users=await db.scalar(text("SELECT COUNT(*) FROM users")),
-        active_users=await db.scalar(text("SELECT COUNT(*) FROM users WHERE is_active = true")),
-        total_orders=await db.scalar(text("SELECT COUNT(*) FROM orders")),
-        total_revenue=float(await db.scalar(text("SELECT COALESCE(SUM(total_amount), 0) FROM orders WHERE status = 'completed'")) or 0),
+        total_tenants=totals["tenants"]["total_tenants"],
+        active_tenants=totals["tenants"]["active_tenants"],
+        total_users=totals["users"]["total_users"],
+        active_users=totals["users"]["active_users"],
+        total_orders=totals["orders"]["total_orders"],
+        total_revenue=float(totals["orders"]["total_revenue"]),
         avg_daily_tenants=float(kpi_data.avg_daily_tenants or 0),
         avg_daily_users=float(kpi_data.avg_daily_users or 0),
         avg_daily_orders=float(kpi_data.avg_daily_orders or 0),
@@ -254,3 +254,19 @@ async def get_tenant_feature_flags(
             flag.config = {**flag.config, **(override.config_override or {})}
     
     return all_flags
+
+
+@router.get("/tenant/{tenant_id}/evaluate", response_model=Dict[str, bool])
+async def evaluate_tenant_feature_flags(
+    *,
+    db: AsyncSession = Depends(get_db),
+    tenant_id: uuid.UUID,
+    current_admin: AdminUser = Depends(get_current_admin_user_with_permissions(["feature_flags:read"]))
+):
+    """
+    Evaluate every feature flag for a tenant, including rollouts and overrides.
+    
+    Requires 'feature_flags:read' permission.
+    """
+    feature_flag_service = FeatureFlagService()
+    return await feature_flag_service.evaluate_all(db, tenant_id)
@@ -1,10 +1,9 @@
 from typing import List, Optional, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Response, Query
-from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-import io
 import pandas as pd
 from datetime import datetime, timedelta
+from functools import partial
 
 from app.core.database import get_db
 from app.core.security import get_current_user_id, get_tenant_id_from_headers
@@ -15,9 +14,19 @@ from app.schemas.analytics import (
     AnalyticsQuery, AnalyticsExportQuery, AnalyticsExportFormat
 )
 from app.repositories.analytics_repository import AnalyticsRepository
+from app.db.session import get_db as get_sync_db
+from app.services.export import (
+    ExportFormat, encode_rows, export_response
+)
 
 router = APIRouter()
 
+_EXPORT_FORMATS = {
+    AnalyticsExportFormat.CSV: ExportFormat.CSV,
+    AnalyticsExportFormat.EXCEL: ExportFormat.XLSX,
+    AnalyticsExportFormat.JSON: ExportFormat.JSON,
+}
+
 
 @router.post("/events", response_model=AnalyticsEvent)
 async def create_event(
@@ -236,42 +245,45 @@ async def get_real_time_analytics(
     }
 
 
+def _export_metrics(query: AnalyticsExportQuery, tenant_id: int, export_format: ExportFormat):
+    with get_sync_db() as db:
+        columns, rows = AnalyticsRepository.stream_metrics(db, query, tenant_id)
+        yield from encode_rows(
+            rows, export_format, columns, query.include_headers, sheet_name="Analytics"
+        )
+
+
 @router.post("/export")
 async def export_analytics(
     query: AnalyticsExportQuery,
-    db: Session = Depends(get_db),
     tenant_id: int = Depends(get_tenant_id_from_headers)
 ):
-    """Export analytics data in specified format"""
-    # Query data
-    df = await AnalyticsRepository.aggregate_metrics(db, query, tenant_id)
-    
-    # Get export format
-    export_format = query.format
-    include_headers = query.include_headers
-    
-    # Export data
-    data_bytes, mime_type = await AnalyticsRepository.export_analytics_data(
-        df, export_format, include_headers
-    )
-    
+    """
+    Export analytics data in specified format
+
+    Aggregation runs in the database and rows are encoded as they are read,
+    so the export is streamed rather than built in memory first.
+    """
+    export_format = _EXPORT_FORMATS[query.format]
+
+    # Resolve dimensions up front so bad requests fail before streaming starts
+    try:
+        for dimension in query.dimensions or []:
+            AnalyticsRepository.dimension_column(dimension)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     # Generate file name
     metrics = "-".join(query.metrics[:2])  # First 2 metrics to keep filename reasonable
     date_str = datetime.now().strftime("%Y%m%d-%H%M%S")
-    
-    file_extension = {
-        AnalyticsExportFormat.CSV: "csv",
-        AnalyticsExportFormat.EXCEL: "xlsx",
-        AnalyticsExportFormat.JSON: "json"
-    }[export_format]
-    
-    filename = f"analytics-{metrics}-{date_str}.{file_extension}"
-    
-    # Return file as download
-    return StreamingResponse(
-        io.BytesIO(data_bytes),
-        media_type=mime_type,
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    basename = f"analytics-{metrics}-{date_str}"
+
+    return await export_response(
+        partial(_export_metrics, query, tenant_id, export_format),
+        export_format,
+        basename,
+        query.compress,
+        query.background,
     )
 
 
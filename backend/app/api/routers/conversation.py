@@ -1,18 +1,18 @@
 import asyncio
-import csv
+import bisect
 from datetime import datetime, timedelta
-from io import StringIO
+from itertools import groupby
 from typing import List
 
+from anyio import from_thread
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from fastapi.responses import StreamingResponse
 from sqlalchemy import Date, cast, func
 from sqlalchemy.orm import Session
 from textblob import TextBlob
 
 from app.core.websocket.monitoring import connection_manager
 from app.api.deps import get_db
-from app.models.cart import Cart, CartItem
+from app.db.session import get_db as get_sync_db
 from app.models.conversation_event import ConversationEvent
 from app.models.conversation_history import ChannelType, ConversationHistory, SenderType
 from app.models.product import Product
@@ -25,10 +25,45 @@ from app.schemas.conversation_history import (
     ConversationHistoryResponse,
 )
 from app.services.alert_service import maybe_trigger_alert
+from app.services.cart_engine import CartAggregate, CartOwner, cart_engine
 from app.services.conversation_audit_bridge import log_event_to_audit
+from app.services.export import (
+    ExportFormat,
+    encode_rows,
+    export_response,
+    stream_query,
+)
 
 router = APIRouter()
 
+CONVERSATION_ANALYTICS_EXPORT_COLUMNS = [
+    "id",
+    "conversation_id",
+    "user_id",
+    "event_type",
+    "created_at",
+    "payload",
+]
+CONVERSATION_QUALITY_EXPORT_COLUMNS = [
+    "conversation_id",
+    "quality_score",
+    "avg_response_time_seconds",
+    "avg_sentiment",
+    "resolved",
+]
+CART_INTENTS = {"add_to_cart", "remove_from_cart", "update_cart", "clear_cart", "view_cart"}
+
+
+def _mutate_cart(tenant_id, owner: CartOwner, mutation):
+    """
+    Apply a cart change through the cart engine from a sync endpoint.
+
+    Sync endpoints run in a worker thread; the engine's write and cache
+    update run on the event loop, so other readers never see a stale cart.
+    """
+    _, outcome = from_thread.run(cart_engine.mutate, tenant_id, owner, mutation)
+    return outcome
+
 
 @router.get("/conversations", response_model=List[ConversationHistoryResponse])
 def get_conversations(db: Session = Depends(get_db)):
@@ -141,32 +176,14 @@ def log_conversation_event(
             )
             tenant_id = event.tenant_id
 
-            def get_or_create_cart():
-                cart = (
-                    db.query(Cart)
-                    .filter(
-                        Cart.tenant_id == tenant_id,
-                        (Cart.user_id == user_id)
-                        | (Cart.phone_number == phone_number)
-                        | (Cart.session_id == session_id),
-                    )
-                    .first()
-                )
-                if not cart:
-                    cart = Cart(
-                        tenant_id=tenant_id,
-                        user_id=user_id,
-                        phone_number=phone_number,
-                        session_id=session_id,
-                        created_at=datetime.utcnow(),
-                        updated_at=datetime.utcnow(),
-                    )
-                    db.add(cart)
-                    db.commit()
-                    db.refresh(cart)
-                return cart
+            try:
+                owner = CartOwner.from_identity(user_id, phone_number, session_id)
+            except ValueError:
+                owner = None
 
-            if intent in ["add_to_cart", "remove_from_cart", "update_cart"]:
+            if intent in CART_INTENTS and owner is None:
+                chat_response = "I can't find your cart without a user, phone number or session."
+            elif intent in ["add_to_cart", "remove_from_cart", "update_cart"]:
                 # Try to extract product name and quantity from text (simple rule-based)
                 import re
 
@@ -201,101 +218,58 @@ def log_conversation_event(
                     )
                     if not product:
                         chat_response = f"Sorry, I couldn't find a product matching '{product_name}'."
-                    else:
-                        cart = get_or_create_cart()
-                        if intent == "add_to_cart":
-                            # Add to cart
-                            cart_item = next(
-                                (
-                                    ci
-                                    for ci in cart.items
-                                    if ci.product_id == product.id
-                                ),
-                                None,
-                            )
-                            if cart_item:
-                                cart_item.quantity += quantity
-                                cart_item.updated_at = datetime.utcnow()
-                            else:
-                                cart_item = CartItem(
-                                    cart_id=cart.id,
-                                    product_id=product.id,
-                                    quantity=quantity,
-                                    price_at_add=product.price,
-                                    created_at=datetime.utcnow(),
-                                    updated_at=datetime.utcnow(),
-                                )
-                                db.add(cart_item)
-                                cart.items.append(cart_item)
-                            cart.updated_at = datetime.utcnow()
-                            db.commit()
-                            db.refresh(cart)
+                    elif intent == "add_to_cart":
+                        _mutate_cart(
+                            tenant_id,
+                            owner,
+                            lambda cart: cart.add(
+                                product.id, quantity, product.price, product.name
+                            ),
+                        )
+                        chat_response = (
+                            f"Added {quantity}x {product.name} to your cart!"
+                        )
+                    elif intent == "remove_from_cart":
+
+                        def remove(cart: CartAggregate) -> bool:
+                            line = cart.line_for(product.id)
+                            if line is None:
+                                return False
+                            cart.remove(line)
+                            return True
+
+                        if _mutate_cart(tenant_id, owner, remove):
+                            chat_response = f"Removed {product.name} from your cart."
+                        else:
+                            chat_response = f"{product.name} is not in your cart."
+                    elif intent == "update_cart":
+
+                        def update(cart: CartAggregate) -> bool:
+                            line = cart.line_for(product.id)
+                            if line is None:
+                                return False
+                            cart.set_quantity(line, quantity)
+                            return True
+
+                        if _mutate_cart(tenant_id, owner, update):
                             chat_response = (
-                                f"Added {quantity}x {product.name} to your cart!"
+                                f"Updated {product.name} quantity to {quantity}."
                             )
-                        elif intent == "remove_from_cart":
-                            cart_item = next(
-                                (
-                                    ci
-                                    for ci in cart.items
-                                    if ci.product_id == product.id
-                                ),
-                                None,
-                            )
-                            if cart_item:
-                                db.delete(cart_item)
-                                cart.updated_at = datetime.utcnow()
-                                db.commit()
-                                db.refresh(cart)
-                                chat_response = (
-                                    f"Removed {product.name} from your cart."
-                                )
-                            else:
-                                chat_response = f"{product.name} is not in your cart."
-                        elif intent == "update_cart":
-                            cart_item = next(
-                                (
-                                    ci
-                                    for ci in cart.items
-                                    if ci.product_id == product.id
-                                ),
-                                None,
-                            )
-                            if cart_item:
-                                cart_item.quantity = quantity
-                                cart_item.updated_at = datetime.utcnow()
-                                cart.updated_at = datetime.utcnow()
-                                db.commit()
-                                db.refresh(cart)
-                                chat_response = (
-                                    f"Updated {product.name} quantity to {quantity}."
-                                )
-                            else:
-                                chat_response = f"{product.name} is not in your cart."
+                        else:
+                            chat_response = f"{product.name} is not in your cart."
             elif intent == "clear_cart":
-                cart = get_or_create_cart()
-                for item in list(cart.items):
-                    db.delete(item)
-                cart.updated_at = datetime.utcnow()
-                db.commit()
-                db.refresh(cart)
+                _mutate_cart(tenant_id, owner, lambda cart: cart.clear())
                 chat_response = "Your cart has been cleared."
             elif intent == "view_cart":
-                cart = get_or_create_cart()
+                cart = from_thread.run(cart_engine.load, tenant_id, owner)
                 if not cart.items:
                     chat_response = "Your cart is empty."
                 else:
                     lines = ["Your cart:"]
                     for item in cart.items:
-                        product = (
-                            db.query(Product)
-                            .filter(Product.id == item.product_id)
-                            .first()
+                        lines.append(
+                            f"- {item.quantity}x {item.product_name} @ {item.price_at_add:.2f}"
                         )
-                        if product:
-                            lines.append(
-                                f"- {item.quantity}x {product.name} @ {item.price_at_add:.2f}"
-                            )
                     chat_response = "\n".join(lines)
 
             if chat_response:
@@ -604,151 +578,163 @@ def get_conversation_quality(db: Session = Depends(get_db)):
         )
 
 
-@router.get("/conversation-analytics/export")
-def export_conversation_analytics_csv(db: Session = Depends(get_db)):
+def _conversation_event_rows(db: Session, start: datetime, end: datetime):
+    """Yield raw conversation events in the window through a server-side cursor."""
+    query = (
+        db.query(
+            ConversationEvent.id,
+            ConversationEvent.conversation_id,
+            ConversationEvent.user_id,
+            ConversationEvent.event_type,
+            ConversationEvent.created_at,
+            ConversationEvent.payload,
+        )
+        .filter(
+            ConversationEvent.created_at >= start, ConversationEvent.created_at <= end
+        )
+        .order_by(ConversationEvent.created_at)
+    )
+    for row in stream_query(query):
+        yield {
+            "id": row.id,
+            "conversation_id": row.conversation_id,
+            "user_id": row.user_id,
+            "event_type": row.event_type,
+            "created_at": row.created_at,
+            "payload": row.payload,
+        }
+
+
+def _quality_summary(conv_id, events) -> dict:
+    """Score one conversation from its events, ordered by created_at."""
+    read_times = [e.created_at for e in events if e.event_type == "message_read"]
+    response_times = []
+    for e in events:
+        if e.event_type != "message_sent":
+            continue
+        # First read strictly after the message was sent
+        index = bisect.bisect_right(read_times, e.created_at)
+        if index < len(read_times):
+            response_times.append((read_times[index] - e.created_at).total_seconds())
+    avg_response_time = (
+        sum(response_times) / len(response_times) if response_times else None
+    )
+    sentiments = []
+    for e in events:
+        s = (e.payload or {}).get("sentiment", {})
+        if isinstance(s, dict) and "polarity" in s:
+            sentiments.append(s["polarity"])
+    avg_sentiment = sum(sentiments) / len(sentiments) if sentiments else None
+    resolved = any(
+        (e.payload or {}).get("intent") == "resolved"
+        or (e.event_metadata or {}).get("resolved")
+        for e in events
+    )
+    score = 0
+    if avg_response_time is not None:
+        score += max(0, 1 - min(avg_response_time / 60, 1)) * 0.4
+    if avg_sentiment is not None:
+        score += ((avg_sentiment + 1) / 2) * 0.4
+    if resolved:
+        score += 0.2
+    return {
+        "conversation_id": str(conv_id),
+        "quality_score": round(score, 3),
+        "avg_response_time_seconds": avg_response_time,
+        "avg_sentiment": avg_sentiment,
+        "resolved": "yes" if resolved else "no",
+    }
+
+
+def _conversation_quality_rows(db: Session):
     """
-    Export conversation analytics as CSV.
+    Yield the quality leaderboard, best first.
+
+    Events are streamed in conversation order so only one conversation's
+    events are held at a time; the leaderboard itself keeps one small
+    summary per conversation so it can be sorted.
     """
-    try:
-        # Reuse analytics logic
-        start = datetime.utcnow() - timedelta(days=30)
-        end = datetime.utcnow()
-        q = db.query(ConversationEvent).filter(
-            ConversationEvent.created_at >= start, ConversationEvent.created_at <= end
+    query = (
+        db.query(
+            ConversationEvent.conversation_id,
+            ConversationEvent.event_type,
+            ConversationEvent.created_at,
+            ConversationEvent.payload,
+            ConversationEvent.event_metadata,
         )
-        events = q.all()
-        output = StringIO()
-        writer = csv.writer(output)
-        writer.writerow(
-            ["id", "conversation_id", "user_id",
-                "event_type", "created_at", "payload"]
+        .filter(ConversationEvent.conversation_id.is_not(None))
+        .order_by(ConversationEvent.conversation_id, ConversationEvent.created_at)
+    )
+    summaries = [
+        _quality_summary(conv_id, list(events))
+        for conv_id, events in groupby(
+            stream_query(query), key=lambda e: e.conversation_id
         )
-        for e in events:
-            writer.writerow(
-                [
-                    str(e.id),
-                    str(e.conversation_id) if e.conversation_id else "",
-                    str(e.user_id) if e.user_id else "",
-                    e.event_type,
-                    e.created_at.isoformat(),
-                    str(e.payload),
-                ]
-            )
-        output.seek(0)
-        return StreamingResponse(
-            output,
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": "attachment; filename=conversation_analytics.csv"
-            },
+    ]
+    summaries.sort(key=lambda x: x["quality_score"], reverse=True)
+    yield from summaries
+
+
+def _export_conversation_analytics(export_format: ExportFormat, start: datetime, end: datetime):
+    with get_sync_db() as db:
+        yield from encode_rows(
+            _conversation_event_rows(db, start, end),
+            export_format,
+            CONVERSATION_ANALYTICS_EXPORT_COLUMNS,
+            sheet_name="Conversation analytics",
         )
-    except Exception as e:
-        raise HTTPException(
-            status_code=500, detail=f"Failed to export analytics: {str(e)}"
+
+
+def _export_conversation_quality(export_format: ExportFormat):
+    with get_sync_db() as db:
+        yield from encode_rows(
+            _conversation_quality_rows(db),
+            export_format,
+            CONVERSATION_QUALITY_EXPORT_COLUMNS,
+            sheet_name="Conversation quality",
         )
 
 
+@router.get("/conversation-analytics/export")
+async def export_conversation_analytics_csv(
+    export_format: ExportFormat = Query(ExportFormat.CSV, alias="format"),
+    compress: bool = Query(False, alias="gzip", description="Gzip the export"),
+    background: bool = Query(
+        False, description="Write the export to disk and return a download token"
+    ),
+):
+    """
+    Export the last 30 days of conversation events.
+
+    Rows are streamed from a server-side cursor as they are encoded, so the
+    export never has to fit in memory.
+    """
+    end = datetime.utcnow()
+    start = end - timedelta(days=30)
+    return await export_response(
+        lambda: _export_conversation_analytics(export_format, start, end),
+        export_format,
+        "conversation_analytics",
+        compress,
+        background,
+    )
+
+
 @router.get("/conversation-quality/export")
-def export_conversation_quality_csv(db: Session = Depends(get_db)):
+async def export_conversation_quality_csv(
+    export_format: ExportFormat = Query(ExportFormat.CSV, alias="format"),
+    compress: bool = Query(False, alias="gzip", description="Gzip the export"),
+    background: bool = Query(
+        False, description="Write the export to disk and return a download token"
+    ),
+):
     """
-    Export conversation quality leaderboard as CSV.
+    Export the conversation quality leaderboard.
     """
-    try:
-        # Reuse quality logic
-        conv_ids = (
-            db.query(ConversationEvent.conversation_id)
-            .filter(ConversationEvent.conversation_id.is_not(None))
-            .distinct()
-            .all()
-        )
-        results = []
-        for (conv_id,) in conv_ids:
-            events = (
-                db.query(ConversationEvent)
-                .filter(ConversationEvent.conversation_id == conv_id)
-                .all()
-            )
-            if not events:
-                continue
-            sent_times = [
-                e.created_at for e in events if e.event_type == "message_sent"
-            ]
-            read_times = [
-                e.created_at for e in events if e.event_type == "message_read"
-            ]
-            response_times = []
-            for sent in sent_times:
-                after_reads = [r for r in read_times if r > sent]
-                if after_reads:
-                    response_times.append(
-                        (after_reads[0] - sent).total_seconds())
-            avg_response_time = (
-                sum(response_times) /
-                len(response_times) if response_times else None
-            )
-            sentiments = []
-            for e in events:
-                s = (e.payload or {}).get("sentiment", {})
-                if isinstance(s, dict) and "polarity" in s:
-                    sentiments.append(s["polarity"])
-            avg_sentiment = sum(sentiments) / \
-                len(sentiments) if sentiments else None
-            resolved = any(
-                (e.payload or {}).get("intent") == "resolved"
-                or (e.event_metadata or {}).get("resolved")
-                for e in events
-            )
-            score = 0
-            if avg_response_time is not None:
-                score += max(0, 1 - min(avg_response_time / 60, 1)) * 0.4
-            if avg_sentiment is not None:
-                score += ((avg_sentiment + 1) / 2) * 0.4
-            if resolved:
-                score += 0.2
-            results.append(
-                {
-                    "conversation_id": str(conv_id),
-                    "avg_response_time_seconds": avg_response_time,
-                    "avg_sentiment": avg_sentiment,
-                    "resolved": resolved,
-                    "quality_score": round(score, 3),
-                }
-            )
-        results.sort(key=lambda x: x["quality_score"], reverse=True)
-        output = StringIO()
-        writer = csv.writer(output)
-        writer.writerow(
-            [
-                "conversation_id",
-                "quality_score",
-                "avg_response_time_seconds",
-                "avg_sentiment",
-                "resolved",
-            ]
-        )
-        for row in results:
-            writer.writerow(
-                [
-                    row["conversation_id"],
-                    row["quality_score"],
-                    (
-                        row["avg_response_time_seconds"]
-                        if row["avg_response_time_seconds"] is not None
-                        else ""
-                    ),
-                    row["avg_sentiment"] if row["avg_sentiment"] is not None else "",
-                    "yes" if row["resolved"] else "no",
-                ]
-            )
-        output.seek(0)
-        return StreamingResponse(
-            output,
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": "attachment; filename=conversation_quality.csv"
-            },
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=500, detail=f"Failed to export quality leaderboard: {str(e)}"
-        )
+    return await export_response(
+        lambda: _export_conversation_quality(export_format),
+        export_format,
+        "conversation_quality",
+        compress,
+        background,
+    )
@@ -10,6 +10,7 @@ from app.models.tenant import Tenant
 from app.models.user import User
 from app.schemas.tenant import TenantOut, TenantUpdate, TenantCreate
 from app.services.tenant.service import TenantService
+from app.services.whatsapp_outbound_service import whatsapp_sender
 
 router = APIRouter()
 
@@ -38,6 +39,7 @@ def update_my_tenant(
         setattr(tenant, field, value)
     db.commit()
     db.refresh(tenant)
+    whatsapp_sender.invalidate_credentials(tenant.id)
     return tenant
 
 
@@ -55,6 +57,7 @@ async def update_tenant_by_subdomain(subdomain: str, update: TenantUpdate, db: A
         tenant.email = update.email
     await db.commit()
     await db.refresh(tenant)
+    whatsapp_sender.invalidate_credentials(tenant.id)
     return TenantOut.model_validate(tenant)
 
 
@@ -7,6 +7,7 @@ from app.api.v1.endpoints import (
     activities,
     batch_operations,
     dashboard,
+    exports,
     orders,
     buyer_orders,
     products,
@@ -42,6 +43,7 @@ api_router.include_router(
     tags=["buyer-orders"],
 )
 api_router.include_router(conversation_router, tags=["conversations"])
+api_router.include_router(exports.router, tags=["exports"])
 # ai_config router removed - using v1 endpoints instead
 api_router.include_router(activities.router, tags=[
                           "monitoring"], prefix="/admin")
@@ -1,18 +1,24 @@
+import asyncio
+import os
+import shutil
+import tempfile
 from typing import Any, Dict, List
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, Request, status
+from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile, status
 from pydantic import BaseModel, Field, field_validator
 from sqlalchemy.orm import Session
 
 from app.core.security.clerk_multi_org import MultiOrgClerkTokenData as ClerkTokenData
 from app.core.security.role_based_auth import require_seller
-from app.api.deps import get_db
+from app.api.deps import get_current_tenant_id, get_db
+from app.core.optimization.background_tasks import AdminBackgroundTaskManager
 from app.services.audit_service import (
     AuditActionType,
     AuditResourceType,
     create_audit_log,
 )
+from app.services.catalog_import import ImportFormat, catalog_importer, detect_format
 from app.services.product_service import batch_update_products
 
 router = APIRouter()
@@ -107,3 +113,85 @@ async def batch_update_products_endpoint(
     except Exception:
         # Let the exception handlers handle specific errors
         raise
+
+
+def _save_upload(upload: UploadFile) -> str:
+    """Copy an upload to a temp file the background import can outlive the request with."""
+    handle, path = tempfile.mkstemp(prefix="catalog-import-")
+    with os.fdopen(handle, "wb") as target:
+        shutil.copyfileobj(upload.file, target, 1024 * 1024)
+    return path
+
+
+@router.post(
+    "/products/import",
+    summary="Bulk import products and variants",
+    description="Upsert a product catalog from a CSV or NDJSON file in the background",
+    status_code=status.HTTP_202_ACCEPTED,
+    responses={
+        202: {"description": "Import started"},
+        401: {"description": "Not authenticated"},
+        403: {"description": "Not authorized to import products"},
+        422: {"description": "Unsupported file format"},
+    },
+)
+async def import_products_endpoint(
+    request: Request,
+    file: UploadFile = File(...),
+    format: str = None,
+    tenant_id: UUID = Depends(get_current_tenant_id),
+    db: Session = Depends(get_db),
+    current_user: ClerkTokenData = Depends(require_seller),
+):
+    """
+    Import a product catalog file.
+
+    Products are matched on SKU within the store: existing products are
+    updated, new ones created. Variants are matched on their own SKU. Empty
+    cells leave the current value unchanged. Progress, counts and per-row
+    errors are reported on the returned task.
+    """
+    file_format = format or detect_format(file.filename, file.content_type)
+    if file_format not in ImportFormat.ALL:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unsupported import format: {file_format}",
+        )
+
+    path = await asyncio.to_thread(_save_upload, file)
+    task = catalog_importer.submit(
+        path,
+        file_format,
+        tenant_id=tenant_id,
+        seller_id=current_user.user_id,
+        created_by=current_user.user_id,
+        filename=file.filename,
+    )
+
+    await create_audit_log(
+        db=db,
+        user_id=current_user.user_id,
+        action=AuditActionType.CREATE,
+        resource_type=AuditResourceType.PRODUCT,
+        resource_id="import",
+        details={"task_id": task.task_id, "filename": file.filename, "format": file_format},
+        request=request,
+    )
+
+    return {"task_id": task.task_id, "status": task.status}
+
+
+@router.get(
+    "/products/import/{task_id}",
+    summary="Get bulk import status",
+    description="Progress of a product import, with its report once finished",
+)
+async def get_import_status_endpoint(
+    task_id: str,
+    current_user: ClerkTokenData = Depends(require_seller),
+):
+    """Return the task record of an import started by the current user."""
+    task = AdminBackgroundTaskManager.get_task(task_id)
+    if task is None or task.created_by != current_user.user_id or task.name != "catalog_import":
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Import not found")
+    return task.model_dump()
@@ -1,185 +1,139 @@
-from datetime import datetime
 from typing import Optional
 from uuid import UUID
 
 from fastapi import APIRouter, Body, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api import deps
 from app.core.security.clerk_multi_org import MultiOrgClerkTokenData as ClerkTokenData
-from app.models.cart import Cart, CartItem
 from app.models.product import Product
 from app.schemas.cart import CartItemCreate, CartResponse
+from app.services.cart_engine import CartAggregate, CartConflictError, CartOwner, cart_engine
 
 router = APIRouter()
 
-# Helper to get or create cart by user/session/phone/tenant
+# Helper to resolve the cart owner from user/session/phone
 
 
-def get_or_create_cart(
-    db: Session,
-    tenant_id: UUID,
-    user_id: Optional[UUID],
+def cart_owner(
+    user: Optional[ClerkTokenData],
     phone_number: Optional[str],
     session_id: Optional[str],
-):
-    cart = (
-        db.query(Cart)
-        .filter(
-            Cart.tenant_id == tenant_id,
-            (Cart.user_id == user_id)
-            | (Cart.phone_number == phone_number)
-            | (Cart.session_id == session_id),
-        )
-        .first()
-    )
-    if not cart:
-        cart = Cart(
-            tenant_id=tenant_id,
-            user_id=user_id,
-            phone_number=phone_number,
-            session_id=session_id,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow(),
+) -> CartOwner:
+    user_id = None
+    if user:
+        # Cart owners are UUIDs; external auth subjects fall back to phone/session
+        try:
+            user_id = UUID(str(user.sub))
+        except ValueError:
+            user_id = None
+    try:
+        return CartOwner.from_identity(user_id, phone_number, session_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def apply_cart_change(tenant_id: UUID, owner: CartOwner, change) -> CartAggregate:
+    try:
+        cart, _ = await cart_engine.mutate(tenant_id, owner, change)
+    except CartConflictError:
+        raise HTTPException(
+            status_code=409, detail="Cart was modified concurrently, please retry"
         )
-        db.add(cart)
-        db.commit()
-        db.refresh(cart)
     return cart
 
 
 @router.get("/cart", response_model=CartResponse)
-def get_cart(
+async def get_cart(
     tenant_id: UUID = Query(...),
-    db: Session = Depends(deps.get_db),
     user: Optional[ClerkTokenData] = Depends(deps.get_current_user_optional),
     session_id: Optional[str] = Query(None),
     phone_number: Optional[str] = Query(None),
 ):
-    user_id = user.sub if user else None
-    cart = get_or_create_cart(db, tenant_id, user_id, phone_number, session_id)
-    return cart
+    owner = cart_owner(user, phone_number, session_id)
+    cart = await cart_engine.load(tenant_id, owner)
+    return cart.to_response()
 
 
 @router.post("/cart/add", response_model=CartResponse)
-def add_to_cart(
+async def add_to_cart(
     item: CartItemCreate = Body(...),
     tenant_id: UUID = Query(...),
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     user: Optional[ClerkTokenData] = Depends(deps.get_current_user_optional),
     session_id: Optional[str] = Query(None),
     phone_number: Optional[str] = Query(None),
 ):
-    user_id = user.sub if user else None
-    cart = get_or_create_cart(db, tenant_id, user_id, phone_number, session_id)
-    # Check if item already exists
-    cart_item = next(
-        (
-            ci
-            for ci in cart.items
-            if ci.product_id == item.product_id and ci.variant_id == item.variant_id
-        ),
-        None,
+    owner = cart_owner(user, phone_number, session_id)
+    # Get product price
+    result = await db.execute(
+        select(Product.name, Product.price).where(Product.id == item.product_id)
     )
-    if cart_item:
-        cart_item.quantity += item.quantity
-        cart_item.updated_at = datetime.utcnow()
-    else:
-        # Get product price
-        product = db.query(Product).filter(
-            Product.id == item.product_id).first()
-        if not product:
-            raise HTTPException(status_code=404, detail="Product not found")
-        cart_item = CartItem(
-            cart_id=cart.id,
-            product_id=item.product_id,
-            quantity=item.quantity,
-            price_at_add=product.price,
-            variant_id=item.variant_id,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow(),
-        )
-        db.add(cart_item)
-        cart.items.append(cart_item)
-    cart.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(cart)
-    return cart
+    product = result.first()
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    name, price = product
+
+    return (await apply_cart_change(
+        tenant_id,
+        owner,
+        lambda cart: cart.add(
+            item.product_id, item.quantity, price, product_name=name, variant_id=item.variant_id
+        ),
+    )).to_response()
+
+
+def _require_line(cart: CartAggregate, product_id: UUID, variant_id: Optional[UUID]):
+    line = cart.line_for(product_id, variant_id)
+    if line is None:
+        raise HTTPException(status_code=404, detail="Cart item not found")
+    return line
 
 
 @router.post("/cart/update", response_model=CartResponse)
-def update_cart_item(
+async def update_cart_item(
     product_id: UUID = Body(...),
     quantity: int = Body(...),
     variant_id: Optional[UUID] = Body(None),
     tenant_id: UUID = Query(...),
-    db: Session = Depends(deps.get_db),
     user: Optional[ClerkTokenData] = Depends(deps.get_current_user_optional),
     session_id: Optional[str] = Query(None),
     phone_number: Optional[str] = Query(None),
 ):
-    user_id = user.sub if user else None
-    cart = get_or_create_cart(db, tenant_id, user_id, phone_number, session_id)
-    cart_item = next(
-        (
-            ci
-            for ci in cart.items
-            if ci.product_id == product_id and ci.variant_id == variant_id
-        ),
-        None,
-    )
-    if not cart_item:
-        raise HTTPException(status_code=404, detail="Cart item not found")
-    cart_item.quantity = quantity
-    cart_item.updated_at = datetime.utcnow()
-    cart.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(cart)
-    return cart
+    owner = cart_owner(user, phone_number, session_id)
+    return (await apply_cart_change(
+        tenant_id,
+        owner,
+        lambda cart: cart.set_quantity(_require_line(cart, product_id, variant_id), quantity),
+    )).to_response()
 
 
 @router.post("/cart/remove", response_model=CartResponse)
-def remove_cart_item(
+async def remove_cart_item(
     product_id: UUID = Body(...),
     variant_id: Optional[UUID] = Body(None),
     tenant_id: UUID = Query(...),
-    db: Session = Depends(deps.get_db),
     user: Optional[ClerkTokenData] = Depends(deps.get_current_user_optional),
     session_id: Optional[str] = Query(None),
     phone_number: Optional[str] = Query(None),
 ):
-    user_id = user.sub if user else None
-    cart = get_or_create_cart(db, tenant_id, user_id, phone_number, session_id)
-    cart_item = next(
-        (
-            ci
-            for ci in cart.items
-            if ci.product_id == product_id and ci.variant_id == variant_id
-        ),
-        None,
-    )
-    if not cart_item:
-        raise HTTPException(status_code=404, detail="Cart item not found")
-    db.delete(cart_item)
-    cart.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(cart)
-    return cart
+    owner = cart_owner(user, phone_number, session_id)
+    return (await apply_cart_change(
+        tenant_id,
+        owner,
+        lambda cart: cart.remove(_require_line(cart, product_id, variant_id)),
+    )).to_response()
 
 
 @router.post("/cart/clear", response_model=CartResponse)
-def clear_cart(
+async def clear_cart(
     tenant_id: UUID = Query(...),
-    db: Session = Depends(deps.get_db),
     user: Optional[ClerkTokenData] = Depends(deps.get_current_user_optional),
     session_id: Optional[str] = Query(None),
     phone_number: Optional[str] = Query(None),
 ):
-    user_id = user.sub if user else None
-    cart = get_or_create_cart(db, tenant_id, user_id, phone_number, session_id)
-    for item in list(cart.items):
-        db.delete(item)
-    cart.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(cart)
-    return cart
+    owner = cart_owner(user, phone_number, session_id)
+    return (await apply_cart_change(
+        tenant_id, owner, lambda cart: cart.clear()
+    )).to_response()
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import FileResponse, JSONResponse
+
+from app.services.export import ExportJobStatus, export_jobs
+
+router = APIRouter()
+
+
+@router.get("/exports/{token}")
+async def download_export(token: str):
+    """
+    Download a background export by its token.
+
+    Returns the file once the job has completed, or the job status with a
+    202 while it is still being written.
+    """
+    job = await export_jobs.get(token)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Export not found or expired"
+        )
+    if job.status == ExportJobStatus.FAILED:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Export failed: {job.error}",
+        )
+    if job.status != ExportJobStatus.COMPLETED:
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=job.to_dict())
+    return FileResponse(job.path, media_type=job.media_type, filename=job.filename)
@@ -19,6 +19,7 @@ from app.schemas.seller_shipping import (
     DeliveryQuoteResponse,
 )
 from app.services.shipping.seller_plugin import calculate_delivery_fee, estimate_delivery_time
+from app.services.shipping.seller_quote_engine import seller_quote_engine
 
 router = APIRouter()
 
@@ -39,6 +40,7 @@ async def create_shipping_provider(
         provider_data=provider.dict(),
     )
     await db.commit()
+    await seller_quote_engine.invalidate_tenant(current_tenant.id)
     return db_provider
 
 
@@ -106,6 +108,7 @@ async def update_shipping_provider(
         provider_data=update_data,
     )
     await db.commit()
+    await seller_quote_engine.invalidate_tenant(current_tenant.id)
     return db_provider
 
 
@@ -126,6 +129,7 @@ async def delete_shipping_provider(
             detail="Shipping provider not found",
         )
     await db.commit()
+    await seller_quote_engine.invalidate_tenant(current_tenant.id)
     return None
 
 
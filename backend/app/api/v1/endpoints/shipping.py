@@ -15,7 +15,7 @@ def get_shipping_service():
 
 
 @router.post("/quote", response_model=Dict[str, Any])
-def get_shipping_quote(
+async def get_shipping_quote(
     provider: str,
     address: Address,
     method: ShippingMethod,
@@ -23,14 +23,14 @@ def get_shipping_quote(
     shipping_service: ShippingService = Depends(get_shipping_service),
 ):
     try:
-        quote = shipping_service.get_quote(provider, address.dict(), method.value)
+        quote = await shipping_service.get_quote(provider, address.dict(), method.value)
         return quote
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.post("/create", response_model=Dict[str, Any])
-def create_shipment(
+async def create_shipment(
     provider: str,
     order_id: str,
     shipping_details: ShippingDetails,
@@ -38,7 +38,7 @@ def create_shipment(
     shipping_service: ShippingService = Depends(get_shipping_service),
 ):
     try:
-        result = shipping_service.create_shipment(provider, order_id, shipping_details)
+        result = await shipping_service.create_shipment(provider, order_id, shipping_details)
         return result
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -14,6 +14,7 @@ from fastapi import (
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_db, get_tenant_context
+from app.core.cache.redis_cache import cached_response
 from app.schemas.storefront_product import (
     CollectionInfo,
     PaginatedStorefrontProducts,
@@ -31,13 +32,26 @@ CACHE_MEDIUM = 300  # 5 minutes
 CACHE_LONG = 3600  # 1 hour
 
 
+def cache_headers(duration: int) -> dict:
+    """Cache control headers for storefront responses."""
+    return {
+        "Cache-Control": f"public, max-age={duration}",
+        "Vary": "Accept-Encoding, Accept, X-Tenant-ID",
+    }
+
+
 def set_cache_headers(response: Response, duration: int):
     """Set cache control headers for the response."""
-    response.headers["Cache-Control"] = f"public, max-age={duration}"
-    response.headers["Vary"] = "Accept-Encoding, Accept, X-Tenant-ID"
+    response.headers.update(cache_headers(duration))
 
 
 @router.get("/products", response_model=PaginatedStorefrontProducts)
+@cached_response(
+    "product",
+    expiration=CACHE_SHORT,
+    response_model=PaginatedStorefrontProducts,
+    headers=cache_headers(CACHE_SHORT),
+)
 async def get_storefront_products(
     request: Request,
     response: Response,
@@ -112,6 +126,12 @@ async def get_storefront_products(
 
 
 @router.get("/products/{product_id}", response_model=StorefrontProductWithVariants)
+@cached_response(
+    "product",
+    expiration=CACHE_SHORT,
+    response_model=StorefrontProductWithVariants,
+    headers=cache_headers(CACHE_SHORT),
+)
 async def get_product_detail(
     request: Request,
     response: Response,
@@ -197,6 +217,12 @@ async def get_product_detail(
 
 
 @router.get("/collections", response_model=List[CollectionInfo])
+@cached_response(
+    "collection",
+    expiration=CACHE_MEDIUM,
+    response_model=List[CollectionInfo],
+    headers=cache_headers(CACHE_MEDIUM),
+)
 async def get_product_collections(
     request: Request, response: Response, db: Session = Depends(get_db)
 ):
@@ -222,6 +248,12 @@ async def get_product_collections(
 
 
 @router.get("/tags", response_model=List[TagInfo])
+@cached_response(
+    "product",
+    expiration=CACHE_MEDIUM,
+    response_model=List[TagInfo],
+    headers=cache_headers(CACHE_MEDIUM),
+)
 async def get_product_tags(
     request: Request,
     response: Response,
@@ -248,6 +280,12 @@ async def get_product_tags(
 
 
 @router.get("/new-arrivals", response_model=List[StorefrontProductBase])
+@cached_response(
+    "product",
+    expiration=CACHE_SHORT,
+    response_model=List[StorefrontProductBase],
+    headers=cache_headers(CACHE_SHORT),
+)
 async def get_new_arrivals(
     request: Request,
     response: Response,
@@ -287,6 +325,12 @@ async def get_new_arrivals(
 
 
 @router.get("/bestsellers", response_model=List[StorefrontProductBase])
+@cached_response(
+    "product",
+    expiration=CACHE_MEDIUM,
+    response_model=List[StorefrontProductBase],
+    headers=cache_headers(CACHE_MEDIUM),
+)
 async def get_bestsellers(
     request: Request,
     response: Response,
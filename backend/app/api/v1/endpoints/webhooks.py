@@ -4,11 +4,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.deps import get_db
 from app.core.config.settings import get_settings
 from app.core.security.payment_security import verify_paystack_signature
-from app.services.payment.payment_service import PaymentService
 from app.core.monitoring.webhook_metrics import WebhookMetrics
 from app.core.logging import logger
-from app.api.deps import get_db
-from app.services.payment.payment_service import PaymentService
+from app.services.payment.webhook_processing_engine import payment_webhook_engine
 from typing import Dict, Optional, Callable, Any
 import json
 import ipaddress
@@ -57,19 +55,16 @@ def validate_ip(request: Request, provider: str) -> bool:
         return False
 
 
-# Ensure idempotency for webhook processing
-async def ensure_idempotency(db: AsyncSession, event_id: str, provider: str) -> bool:
-    """Check if the event has already been processed to ensure idempotency"""
-    from app.services.payment.webhook_event_service import WebhookEventService
-    service = WebhookEventService()
-    return await service.is_webhook_processed(db, event_id, provider)
-
-
 @router.post("/paystack")
 async def paystack_webhook(
     request: Request, db: AsyncSession = Depends(get_db)
 ):
-    """Handle webhooks from Paystack"""
+    """
+    Handle webhooks from Paystack
+
+    Validates and claims the event, then acknowledges; the charge is applied
+    asynchronously by the payment webhook engine.
+    """
     # Start tracking metrics
     WebhookMetrics.record_received("paystack")
 
@@ -110,47 +105,17 @@ async def paystack_webhook(
                     detail="Invalid payload format"
                 )
 
-            # Check for idempotency
-            if await ensure_idempotency(db, event_id, "paystack"):
-                WebhookMetrics.record_processed("paystack", "duplicate")
-                return {"status": "skipped", "message": "Event already processed"}
-
-            # Process webhook based on event type
-            service = PaymentService()
-            if event == "charge.success":
-                await service.process_successful_payment(
-                    db=db,
-                    payment_data=data,
-                    provider="paystack",
-                    event_id=event_id
-                )
-                WebhookMetrics.record_processed("paystack", "success")
-            elif event == "charge.failed":
-                await service.process_failed_payment(
-                    db=db,
-                    payment_data=data,
-                    provider="paystack",
-                    event_id=event_id,
-                    failure_reason=data.get(
-                        "gateway_response", "Payment failed")
-                )
-                WebhookMetrics.record_processed("paystack", "failure")
-            else:
-                WebhookMetrics.record_processed("paystack", "unhandled_event")
-            # Add more event types as needed
-
-            # Record the processed event for idempotency
-            from app.services.payment.webhook_event_service import WebhookEventService
-            service = WebhookEventService()
-            await service.record_webhook_event(
+            # Claim the event; redeliveries stop here
+            if not await payment_webhook_engine.submit(
                 db=db,
-                event_id=event_id,
                 provider="paystack",
+                event_id=event_id,
                 event_type=event,
                 payload=payload
-            )
+            ):
+                return {"status": "skipped", "message": "Event already processed"}
 
-            return {"status": "success", "message": "Webhook processed"}
+            return {"status": "accepted", "message": "Webhook queued for processing"}
         except Exception as e:
             # Record failure metric but don't re-raise
             WebhookMetrics.record_processed("paystack", "error")
@@ -161,7 +126,12 @@ async def paystack_webhook(
 async def mpesa_webhook(
     request: Request, db: AsyncSession = Depends(get_db)
 ):
-    """Handle webhooks from M-Pesa"""
+    """
+    Handle webhooks from M-Pesa
+
+    Validates and claims the STK callback, then acknowledges; the payment is
+    updated asynchronously by the payment webhook engine.
+    """
     # Start tracking metrics
     WebhookMetrics.record_received("mpesa")
 
@@ -198,46 +168,18 @@ async def mpesa_webhook(
                     detail="Missing CheckoutRequestID"
                 )
 
-            # Check for idempotency
-            if await ensure_idempotency(db, event_id, "mpesa"):
-                WebhookMetrics.record_processed("mpesa", "duplicate")
-                return {"status": "skipped", "message": "Event already processed"}
-
-            # Process based on result code
+            # Claim the event; redeliveries stop here
             result_code = stk_callback.get("ResultCode")
-            service = PaymentService()
-
-            if result_code == 0:  # Success
-                await service.process_successful_payment(
-                    db=db,
-                    payment_data=stk_callback,
-                    provider="mpesa",
-                    event_id=event_id
-                )
-                WebhookMetrics.record_processed("mpesa", "success")
-            else:  # Failure
-                result_desc = stk_callback.get("ResultDesc", "Payment failed")
-                await service.process_failed_payment(
-                    db=db,
-                    payment_data=stk_callback,
-                    provider="mpesa",
-                    event_id=event_id,
-                    failure_reason=result_desc
-                )
-                WebhookMetrics.record_processed("mpesa", "failure")
-
-            # Record the processed event for idempotency
-            from app.services.payment.webhook_event_service import WebhookEventService
-            service = WebhookEventService()
-            await service.record_webhook_event(
+            if not await payment_webhook_engine.submit(
                 db=db,
-                event_id=event_id,
                 provider="mpesa",
+                event_id=event_id,
                 event_type=f"mpesa_result_{result_code}",
                 payload=payload
-            )
+            ):
+                return {"status": "skipped", "message": "Event already processed"}
 
-            return {"status": "success", "message": "Webhook processed"}
+            return {"status": "accepted", "message": "Webhook queued for processing"}
         except Exception as e:
             # Record failure metric but don't re-raise
             WebhookMetrics.record_processed("mpesa", "error")
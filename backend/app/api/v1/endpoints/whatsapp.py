@@ -1,21 +1,25 @@
+import asyncio
+import base64
 import hashlib
 import hmac
 import json
 import logging
 import os
+import uuid
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-import requests
 from fastapi import (
     APIRouter,
-    BackgroundTasks,
     Depends,
     HTTPException,
     Query,
     Request,
     Response,
 )
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.api.routers.conversation import log_conversation_event
@@ -24,9 +28,20 @@ from app.conversation.handlers.order_handler import OrderIntentHandler
 from app.conversation.nlp.cart_intent_processor import process_cart_intent
 from app.conversation.nlp.intent_parser import IntentType, parse_intent
 from app.api.deps import get_db
+from app.core.db.session import AsyncSessionLocal
+from app.db.session import SessionLocal, get_db as get_sync_db
 from app.models.conversation_history import ChannelType, ConversationHistory, SenderType
 from app.models.tenant import Tenant
 from app.schemas.conversation_event import ConversationEventCreate
+from app.services.whatsapp_outbound_service import (
+    extract_statuses,
+    whatsapp_sender,
+)
+from app.services.whatsapp_ingest_service import (
+    IngestedMessage,
+    extract_messages,
+    whatsapp_ingest_queue,
+)
 
 # WhatsApp Business API settings
 WHATSAPP_API_VERSION = os.getenv("WHATSAPP_API_VERSION", "v16.0")
@@ -62,6 +77,20 @@ def verify_whatsapp_signature(request_body: bytes, signature_header: str) -> boo
     return hmac.compare_digest(signature, expected_signature)
 
 
+def verify_twilio_signature(url: str, params: Dict[str, str], signature: str) -> bool:
+    """Verify a Twilio webhook signature (HMAC-SHA1 over the URL and sorted form params)"""
+    auth_token = whatsapp_sender.twilio_auth_token
+    if not auth_token or not signature:
+        return False
+
+    payload = url + "".join(f"{key}{params[key]}" for key in sorted(params))
+    expected_signature = base64.b64encode(
+        hmac.new(auth_token.encode("utf-8"), payload.encode("utf-8"), hashlib.sha1).digest()
+    ).decode("ascii")
+
+    return hmac.compare_digest(signature, expected_signature)
+
+
 def find_tenant_by_whatsapp(phone_number: str, db: Session) -> Optional[Tenant]:
     """Find tenant with matching WhatsApp number"""
     # Remove any '+' prefix for consistent comparison
@@ -76,161 +105,6 @@ def find_tenant_by_whatsapp(phone_number: str, db: Session) -> Optional[Tenant]:
     return tenant
 
 
-def get_tenant_by_id(db, tenant_id):
-    from app.models.tenant import Tenant
-
-    return db.query(Tenant).filter(Tenant.id == tenant_id).first()
-
-
-class WhatsAppCredential:
-    """Represents credentials for a tenant's WhatsApp integration"""
-
-    def __init__(
-        self,
-        tenant_id: str,
-        whatsapp_number: str,
-        access_token: str = None,
-        phone_number_id: str = None,
-    ):
-        self.tenant_id = tenant_id
-        self.whatsapp_number = whatsapp_number
-        # If tenant doesn't have their own credentials, use Twilio integration
-        self.access_token = access_token
-        self.phone_number_id = phone_number_id
-        self.use_twilio = (access_token is None) or (phone_number_id is None)
-
-
-class WhatsAppMessageManager:
-    """Manages sending and receiving WhatsApp messages for multiple tenants"""
-
-    def __init__(self):
-        self.credentials_cache = {}
-        # Default Twilio settings from env variables
-        self.twilio_account_sid = os.getenv("TWILIO_ACCOUNT_SID")
-        self.twilio_auth_token = os.getenv("TWILIO_AUTH_TOKEN")
-        self.twilio_whatsapp_number = os.getenv("TWILIO_WHATSAPP_FROM")
-
-    def get_tenant_credentials(
-        self, tenant_id: str, db: Session
-    ) -> Optional[WhatsAppCredential]:
-        """Get WhatsApp credentials for a tenant from cache or database"""
-        # Check cache first
-        if tenant_id in self.credentials_cache:
-            return self.credentials_cache[tenant_id]
-
-        # Get from database
-        tenant = get_tenant_by_id(db, tenant_id)
-        if not tenant:
-            return None
-
-        # Check if tenant has WhatsApp number
-        if not tenant.whatsapp_number:
-            return None
-
-        # Check if tenant has own WhatsApp Business API credentials
-        # This would be stored in a separate table in a real implementation
-        # For now, we'll assume they're using Twilio through the platform
-
-        credential = WhatsAppCredential(
-            tenant_id=tenant.id,
-            whatsapp_number=tenant.whatsapp_number,
-            # In future: get these from tenant-specific settings
-            access_token=None,  # tenant.whatsapp_access_token
-            phone_number_id=None,  # tenant.whatsapp_phone_number_id
-        )
-
-        # Cache the credentials
-        self.credentials_cache[tenant_id] = credential
-        return credential
-
-    def send_whatsapp_reply(
-        self, tenant_id: str, to_number: str, message: str, db: Session
-    ) -> bool:
-        """Send a WhatsApp reply using tenant's WhatsApp credentials"""
-        credentials = self.get_tenant_credentials(tenant_id, db)
-        if not credentials:
-            logger.error(
-                f"No WhatsApp credentials found for tenant {tenant_id}")
-            return False
-
-        if credentials.use_twilio:
-            return self._send_via_twilio(
-                credentials.whatsapp_number, to_number, message
-            )
-        else:
-            return self._send_via_graph_api(credentials, to_number, message)
-
-    def _send_via_twilio(self, from_number: str, to_number: str, message: str) -> bool:
-        """Send message using Twilio API"""
-        try:
-            from twilio.rest import Client
-
-            if not (self.twilio_account_sid and self.twilio_auth_token):
-                logger.error("Twilio credentials not configured")
-                return False
-
-            client = Client(self.twilio_account_sid, self.twilio_auth_token)
-
-            # If tenant has their own WhatsApp number, use it
-            # Otherwise fall back to platform WhatsApp number
-            from_whatsapp = from_number or self.twilio_whatsapp_number
-
-            if not from_whatsapp:
-                logger.error("No WhatsApp number available for sending")
-                return False
-
-            # Format the WhatsApp number with the whatsapp: prefix
-            twilio_msg = client.messages.create(
-                body=message,
-                from_=f"whatsapp:{from_whatsapp}",
-                to=f"whatsapp:{to_number}",
-            )
-
-            logger.info(f"Sent WhatsApp message via Twilio: {twilio_msg.sid}")
-            return True
-        except Exception as e:
-            logger.error(f"Error sending WhatsApp via Twilio: {str(e)}")
-            return False
-
-    def _send_via_graph_api(
-        self, credentials: WhatsAppCredential, to_number: str, message: str
-    ) -> bool:
-        """Send message using Meta Graph API"""
-        try:
-            url = f"https://graph.facebook.com/{WHATSAPP_API_VERSION}/{credentials.phone_number_id}/messages"
-
-            headers = {
-                "Authorization": f"Bearer {credentials.access_token}",
-                "Content-Type": "application/json",
-            }
-
-            data = {
-                "messaging_product": "whatsapp",
-                "recipient_type": "individual",
-                "to": to_number,
-                "type": "text",
-                "text": {"body": message},
-            }
-
-            response = requests.post(url, headers=headers, json=data)
-            success = response.status_code == 200
-
-            if success:
-                logger.info(
-                    f"Sent WhatsApp message via Graph API to {to_number}")
-            else:
-                logger.error(
-                    f"Failed to send WhatsApp via Graph API: {response.text}")
-
-            return success
-        except Exception as e:
-            logger.error(f"Error sending WhatsApp via Graph API: {str(e)}")
-            return False
-
-
-# Initialize the WhatsApp message manager
-whatsapp_manager = WhatsAppMessageManager()
-
 # Order-related intent types
 ORDER_INTENT_TYPES = [
     IntentType.CHECKOUT,
@@ -269,12 +143,13 @@ async def verify_webhook(
 
 
 @router.post("/webhook")
-async def webhook(
-    request: Request, background_tasks: BackgroundTasks, db: Session = Depends(get_db)
-):
+async def webhook(request: Request, db: AsyncSession = Depends(get_db)):
     """
     Handle incoming WhatsApp messages
-    Processes messages using the existing NLP cart management functionality
+
+    Verifies the signature, records the messages and acknowledges immediately.
+    Messages are processed afterwards by the ingest queue, in order per
+    conversation, so slow NLP or provider calls never cause Meta to retry.
     """
     # Get the raw request body
     body = await request.body()
@@ -290,162 +165,269 @@ async def webhook(
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON")
 
-    # Process webhook event
-    if "object" not in data or data["object"] != "whatsapp_business_account":
-        return {"success": True}  # Ignore non-WhatsApp events
-
-    # Process each entry
-    responses = []
-    for entry in data.get("entry", []):
-        for change in entry.get("changes", []):
-            value = change.get("value", {})
-
-            # Check if this is a message
-            if "messages" not in value:
-                continue
-
-            for message in value.get("messages", []):
-                if message.get("type") != "text":
-                    continue  # Only process text messages for now
-
-                # Get message details
-                customer_number = message.get("from")
-                # The business number that received the message
-                to_number = message.get("to")
-                timestamp = datetime.fromtimestamp(
-                    int(message.get("timestamp")))
-                message_body = message.get("text", {}).get("body", "")
-
-                # Find associated tenant by WhatsApp number that received the message
-                tenant = find_tenant_by_whatsapp(to_number, db)
-                if not tenant:
-                    # This can happen if a message is sent to a number not registered in the platform
-                    logger.warning(
-                        f"Received message to unknown WhatsApp number: {to_number}"
-                    )
-                    # No response since we don't know which business this is for
-                    continue
-
-                # Create conversation history record
-                conversation = ConversationHistory(
-                    message=message_body,
-                    sender_type=SenderType.CUSTOMER,
-                    channel=ChannelType.WHATSAPP,
-                    timestamp=timestamp,
-                    tenant_id=tenant.id,
-                )
-                db.add(conversation)
-                db.commit()
-                db.refresh(conversation)
-
-                # --- Conversational Checkout Flow Integration ---
-                # If the message is not a cart/order intent, use ChatFlowEngine for stateful checkout
-                parsed_intent = await parse_intent(message_body, tenant.id)
-                is_checkout_flow = (
-                    not parsed_intent
-                    or parsed_intent.intent_type not in ORDER_INTENT_TYPES
-                )
-                if is_checkout_flow:
-                    chat_engine = ChatFlowEngine(
-                        tenant_id=tenant.id,
-                        user_id=None,
-                        db=db,
-                        channel=ChannelType.WHATSAPP,
-                        phone_number=customer_number,
-                    )
-                    chat_responses = chat_engine.handle_input(message_body)
-                    for resp in chat_responses:
-                        whatsapp_manager.send_whatsapp_reply(
-                            tenant.id, customer_number, resp.get(
-                                "text", ""), db
-                        )
-                    continue
-                # --- End Conversational Checkout Flow Integration ---
-
-                # Existing order/cart intent logic
-                context = {
-                    "phone_number": customer_number,
-                    "tenant_id": tenant.id,
-                    "conversation_id": conversation.id,
-                    "platform": "whatsapp",
-                    "timestamp": datetime.utcnow().isoformat(),
-                }
-                if parsed_intent and parsed_intent.intent_type in ORDER_INTENT_TYPES:
-                    order_handler = OrderIntentHandler(
-                        tenant.id, user_id=None, db=db)
-                    response = await order_handler.handle_intent(parsed_intent, context)
-                else:
-                    response = await process_cart_intent(
-                        message_body, tenant.id, customer_number, context
-                    )
-                response_messages = response.get("messages", [])
-                context.update(response.get("context", {}))
-                for message in response_messages:
-                    if isinstance(message, dict):
-                        if message.get("type") == "text":
-                            message_content = message.get("text", "")
-                        elif message.get("type") == "location":
-                            # Format location message specially
-                            lat = message.get("latitude")
-                            lng = message.get("longitude")
-                            name = message.get("name", "Location")
-                            message_content = (
-                                f"📍 {name}\nLatitude: {lat}\nLongitude: {lng}"
-                            )
-                        else:
-                            # Default to text content
-                            message_content = message.get("text", "")
-                    else:
-                        # If message is a string
-                        message_content = str(message)
-
-                    # Send the message
-                    whatsapp_manager.send_whatsapp_reply(
-                        tenant.id, customer_number, message_content, db
-                    )
-
-                # Log conversation event with AI response(s)
-                # Join multiple messages if needed
-                response_content = "\n".join(
-                    [
-                        m.get("text", str(m)) if isinstance(
-                            m, dict) else str(m)
-                        for m in response_messages
-                    ]
-                )
+    # Delivery receipts for replies we sent
+    for status in extract_statuses(data):
+        whatsapp_sender.receipts.update(status["id"], status["status"])
 
-                log_event = ConversationEventCreate(
-                    conversation_id=conversation.id,
-                    event_type="ai_response",
-                    content=response_content,
-                    timestamp=datetime.utcnow(),
-                    metadata={
-                        "channel": "whatsapp",
-                        "intent": (
-                            parsed_intent.intent_type if parsed_intent else "unknown"
-                        ),
-                        "context": {
-                            k: v for k, v in context.items() if k not in ["timestamp"]
-                        },
-                    },
-                )
+    # Ignore non-WhatsApp events
+    messages = extract_messages(data)
+    if not messages:
+        return {"success": True, "queued": 0}
+
+    # Persist before acknowledging; redelivered message ids are dropped here
+    fresh_messages = await whatsapp_ingest_queue.record(db, messages)
+    for message in fresh_messages:
+        await whatsapp_ingest_queue.enqueue(message)
+
+    return {"success": True, "queued": len(fresh_messages)}
+
+
+@router.post("/twilio/status")
+async def twilio_status_callback(request: Request):
+    """
+    Handle Twilio delivery status callbacks for replies sent through Twilio
+
+    Twilio calls this for messages sent with ``StatusCallback`` set to
+    ``TWILIO_STATUS_CALLBACK_URL``, which is also the URL it signs.
+    """
+    callback_url = whatsapp_sender.twilio_status_callback
+    if not callback_url:
+        raise HTTPException(status_code=404, detail="Status callbacks not configured")
+
+    form = await request.form()
+    params = {key: str(value) for key, value in form.items()}
+    signature = request.headers.get("X-Twilio-Signature", "")
+    if not verify_twilio_signature(callback_url, params, signature):
+        raise HTTPException(status_code=403, detail="Invalid signature")
+
+    message_sid = params.get("MessageSid")
+    message_status = params.get("MessageStatus")
+    if message_sid and message_status:
+        whatsapp_sender.receipts.update(message_sid, message_status)
+    return {"success": True}
+
+
+def _record_customer_message(message: IngestedMessage) -> Optional[Tuple[Any, Any, bool]]:
+    """
+    Find the receiving tenant and store the customer's message.
+
+    Keyed on the WhatsApp message id, so a retried message reuses the row
+    stored by its first attempt. Blocking (sync session); run in a worker
+    thread.
+
+    Returns:
+        (tenant id, conversation id, whether replies were already queued),
+        or None if the number is not registered
+    """
+    with get_sync_db() as db:
+        # Find associated tenant by WhatsApp number that received the message
+        tenant = find_tenant_by_whatsapp(message.business_number, db)
+        if not tenant:
+            return None
 
-                # Use the existing NLP processing function
-                result = log_conversation_event(log_event, db)
+        # Create conversation history record
+        db.execute(
+            pg_insert(ConversationHistory)
+            .values(
+                id=uuid.uuid4(),
+                message=message.body,
+                sender_type=SenderType.CUSTOMER,
+                channel=ChannelType.WHATSAPP,
+                timestamp=message.timestamp,
+                tenant_id=tenant.id,
+                external_message_id=message.message_id,
+            )
+            .on_conflict_do_nothing(
+                index_elements=["tenant_id", "external_message_id"],
+                index_where=ConversationHistory.external_message_id.isnot(None),
+            )
+        )
+        conversation_id, replied_at = db.execute(
+            select(ConversationHistory.id, ConversationHistory.replied_at).where(
+                ConversationHistory.tenant_id == tenant.id,
+                ConversationHistory.external_message_id == message.message_id,
+            )
+        ).one()
+        db.commit()
+        return tenant.id, conversation_id, replied_at is not None
 
-                # Send the response back to WhatsApp using the tenant's credentials
-                response = result.payload.get(
-                    "chat_response", "I received your message."
+
+def _claim_reply(conversation_id: Any) -> bool:
+    """
+    Mark the replies to a customer message as queued.
+
+    Committed before the replies are queued, so a retry of the message never
+    sends them twice. Blocking (sync session); run in a worker thread.
+
+    Returns:
+        False if an earlier attempt already replied
+    """
+    with get_sync_db() as db:
+        result = db.execute(
+            update(ConversationHistory)
+            .where(ConversationHistory.id == conversation_id, ConversationHistory.replied_at.is_(None))
+            .values(replied_at=datetime.utcnow())
+        )
+        db.commit()
+        return result.rowcount == 1
+
+
+async def _run_chat_flow(tenant_id: Any, customer_number: str, message_body: str) -> List[Dict[str, Any]]:
+    """
+    Advance the conversational checkout flow for one message.
+
+    ChatFlowEngine works on a sync session; its queries run in worker threads
+    so the event loop stays free to acknowledge webhooks.
+    """
+    db = SessionLocal()
+    try:
+        chat_engine = await asyncio.to_thread(
+            ChatFlowEngine,
+            tenant_id=tenant_id,
+            user_id=None,
+            db=db,
+            channel=ChannelType.WHATSAPP,
+            phone_number=customer_number,
+        )
+        responses = await chat_engine.handle_input(message_body)
+        await asyncio.to_thread(db.commit)
+        return responses
+    except Exception:
+        await asyncio.to_thread(db.rollback)
+        raise
+    finally:
+        await asyncio.to_thread(db.close)
+
+
+def _log_ai_response(log_event: ConversationEventCreate) -> Optional[str]:
+    """
+    Log the AI response event and return the chat reply it produced.
+
+    Blocking (sync session); run in a worker thread.
+    """
+    with get_sync_db() as db:
+        # Use the existing NLP processing function
+        result = log_conversation_event(log_event, db)
+        return result.payload.get("chat_response", "I received your message.")
+
+
+async def process_whatsapp_message(message: IngestedMessage) -> None:
+    """
+    Process one queued WhatsApp message
+    Runs the conversational checkout flow or the NLP cart/order handlers and
+    queues the replies for delivery
+    """
+    customer_number = message.customer_number
+    message_body = message.body
+
+    recorded = await asyncio.to_thread(_record_customer_message, message)
+    if recorded is None:
+        # This can happen if a message is sent to a number not registered in the platform
+        logger.warning(
+            f"Received message to unknown WhatsApp number: {message.business_number}"
+        )
+        # No response since we don't know which business this is for
+        return
+    tenant_id, conversation_id, replied = recorded
+    if replied:
+        # A retry of a message whose replies an earlier attempt already queued
+        return
+
+    # --- Conversational Checkout Flow Integration ---
+    # If the message is not a cart/order intent, use ChatFlowEngine for stateful checkout
+    parsed_intent = await parse_intent(message_body, tenant_id)
+    is_checkout_flow = (
+        not parsed_intent
+        or parsed_intent.intent_type not in ORDER_INTENT_TYPES
+    )
+    if is_checkout_flow:
+        chat_responses = await _run_chat_flow(tenant_id, customer_number, message_body)
+        if not await asyncio.to_thread(_claim_reply, conversation_id):
+            return
+        for resp in chat_responses:
+            await whatsapp_sender.send_reply(
+                tenant_id, customer_number, resp.get("text", "")
+            )
+        return
+    # --- End Conversational Checkout Flow Integration ---
+
+    # Existing order/cart intent logic
+    context = {
+        "phone_number": customer_number,
+        "tenant_id": tenant_id,
+        "conversation_id": conversation_id,
+        "platform": "whatsapp",
+        "timestamp": datetime.utcnow().isoformat(),
+    }
+    if parsed_intent and parsed_intent.intent_type in ORDER_INTENT_TYPES:
+        # Order services run on the async session
+        async with AsyncSessionLocal() as async_db:
+            order_handler = OrderIntentHandler(
+                tenant_id, user_id=None, db=async_db)
+            response = await order_handler.handle_intent(parsed_intent, context)
+    else:
+        response = await process_cart_intent(
+            message_body, tenant_id, customer_number, context
+        )
+    response_messages = response.get("messages", [])
+    context.update(response.get("context", {}))
+    if not await asyncio.to_thread(_claim_reply, conversation_id):
+        return
+    for reply in response_messages:
+        if isinstance(reply, dict):
+            if reply.get("type") == "text":
+                message_content = reply.get("text", "")
+            elif reply.get("type") == "location":
+                # Format location message specially
+                lat = reply.get("latitude")
+                lng = reply.get("longitude")
+                name = reply.get("name", "Location")
+                message_content = (
+                    f"📍 {name}\nLatitude: {lat}\nLongitude: {lng}"
                 )
-                if response:
-                    # Send response in background to avoid blocking the webhook
-                    background_tasks.add_task(
-                        whatsapp_manager.send_whatsapp_reply,
-                        tenant.id,
-                        customer_number,
-                        response,
-                        db,
-                    )
-                    responses.append(response)
-
-    return {"success": True, "processed": len(responses)}
+            else:
+                # Default to text content
+                message_content = reply.get("text", "")
+        else:
+            # If message is a string
+            message_content = str(reply)
+
+        # Send the message
+        await whatsapp_sender.send_reply(
+            tenant_id, customer_number, message_content
+        )
+
+    # Log conversation event with AI response(s)
+    # Join multiple messages if needed
+    response_content = "\n".join(
+        [
+            m.get("text", str(m)) if isinstance(m, dict) else str(m)
+            for m in response_messages
+        ]
+    )
+
+    log_event = ConversationEventCreate(
+        conversation_id=conversation_id,
+        event_type="ai_response",
+        content=response_content,
+        timestamp=datetime.utcnow(),
+        metadata={
+            "channel": "whatsapp",
+            "intent": (
+                parsed_intent.intent_type if parsed_intent else "unknown"
+            ),
+            "context": {
+                k: v for k, v in context.items() if k not in ["timestamp"]
+            },
+        },
+    )
+
+    # Send the response back to WhatsApp using the tenant's credentials
+    chat_response = await asyncio.to_thread(_log_ai_response, log_event)
+    if chat_response:
+        await whatsapp_sender.send_reply(
+            tenant_id, customer_number, chat_response
+        )
+
+
+whatsapp_ingest_queue.set_handler(process_whatsapp_message)
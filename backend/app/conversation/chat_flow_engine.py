@@ -1,11 +1,11 @@
+import asyncio
 import logging
 import re
 from enum import Enum
 from typing import Any, Dict, List, Optional
 
-import httpx
-
 from app.conversation.message_builder import MessageBuilder
+from app.core.http.outbound import outbound_http
 from app.models.conversation_history import ChannelType, ConversationHistory, SenderType
 from app.services.order_service import OrderService
 from app.services.payment.payment_service import PaymentService
@@ -24,6 +24,9 @@ class ChatFlowEngine:
     """
     Stateful conversational checkout engine for chat channels (WhatsApp, SMS, Telegram, etc).
     Handles step transitions, input validation, retries, and order/payment integration.
+
+    ``db`` is a sync session; ``handle_input`` runs its queries in worker
+    threads, so construct the engine off the event loop as well.
     """
 
     def __init__(
@@ -80,7 +83,7 @@ class ChatFlowEngine:
             history.context = self.state
             self.db.commit()
 
-    def handle_input(self, message: str) -> List[Dict[str, Any]]:
+    async def handle_input(self, message: str) -> List[Dict[str, Any]]:
         """
         Main entry: process user input, advance flow, validate, and return response messages.
         Now posts to the unified /api/v1/orders endpoint with channel metadata for order creation.
@@ -103,7 +106,7 @@ class ChatFlowEngine:
                     "Order cancelled. If you'd like to start again, please tell me your name."
                 )
             )
-            self._save_state()
+            await asyncio.to_thread(self._save_state)
             return messages
         if self._is_edit_intent(message):
             edit_step = self._parse_edit_step(message)
@@ -114,7 +117,7 @@ class ChatFlowEngine:
                 self.state["step"] = edit_step
                 self.state["retries"] = 0
                 messages.append(self._prompt_for_step(edit_step))
-                self._save_state()
+                await asyncio.to_thread(self._save_state)
                 return messages
 
         # Step logic
@@ -156,8 +159,8 @@ class ChatFlowEngine:
                 f"[ChatFlow] Address accepted. Moving to ASK_PAYMENT.")
             messages.append(self._prompt_for_step(ChatStep.ASK_PAYMENT))
         elif step == ChatStep.ASK_PAYMENT:
-            enabled_methods = self.payment_service.get_enabled_payment_methods(
-                self.tenant_id
+            enabled_methods = await asyncio.to_thread(
+                self.payment_service.get_enabled_payment_methods, self.tenant_id
             )
             if message.lower() not in [m.lower() for m in enabled_methods]:
                 logging.warning(
@@ -197,37 +200,38 @@ class ChatFlowEngine:
                     }
                     # POST to /api/v1/orders
                     api_url = "http://localhost:8000/api/v1/orders"
-                    with httpx.Client() as client:
-                        resp = client.post(api_url, json=order_payload)
-                        if resp.status_code == 201:
-                            order = resp.json()
-                            payment_link = self.payment_service.generate_payment_link(
-                                order, data["payment_method"]
-                            )
-                            messages.append(
-                                self.message_builder.text_message(
-                                    f"Order placed! Pay here: {payment_link}"
-                                )
-                            )
-                            messages.append(
-                                self.message_builder.text_message(
-                                    "You'll receive a receipt once payment is confirmed."
-                                )
-                            )
-                            self.state["step"] = ChatStep.COMPLETE
-                            self.state["retries"] = 0
-                            logging.info(
-                                f"[ChatFlow] Order created via API and payment link sent. Moving to COMPLETE."
+                    resp = await outbound_http.post(
+                        "orders_api", api_url, json=order_payload
+                    )
+                    if resp.status_code == 201:
+                        order = resp.json()
+                        payment_link = await self.payment_service.generate_payment_link(
+                            order, data["payment_method"]
+                        )
+                        messages.append(
+                            self.message_builder.text_message(
+                                f"Order placed! Pay here: {payment_link}"
                             )
-                        else:
-                            logging.error(
-                                f"[ChatFlow] API order creation failed: {resp.text}"
+                        )
+                        messages.append(
+                            self.message_builder.text_message(
+                                "You'll receive a receipt once payment is confirmed."
                             )
-                            messages.append(
-                                self.message_builder.text_message(
-                                    "Sorry, there was an error placing your order. Please try again later."
-                                )
+                        )
+                        self.state["step"] = ChatStep.COMPLETE
+                        self.state["retries"] = 0
+                        logging.info(
+                            f"[ChatFlow] Order created via API and payment link sent. Moving to COMPLETE."
+                        )
+                    else:
+                        logging.error(
+                            f"[ChatFlow] API order creation failed: {resp.text}"
+                        )
+                        messages.append(
+                            self.message_builder.text_message(
+                                "Sorry, there was an error placing your order. Please try again later."
                             )
+                        )
                 except Exception as e:
                     logging.error(
                         f"[ChatFlow] Error during order/payment: {str(e)}")
@@ -250,7 +254,7 @@ class ChatFlowEngine:
                 self.message_builder.text_message(
                     "Your order is complete. Thank you!")
             )
-        self._save_state()
+        await asyncio.to_thread(self._save_state)
         return messages
 
     def _prompt_for_step(self, step: ChatStep) -> Dict[str, Any]:
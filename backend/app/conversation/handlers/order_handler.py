@@ -5,8 +5,6 @@ from typing import Any, Dict, Optional
 
 from app.conversation.message_builder import MessageBuilder
 from app.conversation.nlp.intent_parser import IntentType, ParsedIntent
-from app.domain.events.event_bus import get_event_bus
-from app.domain.events.order_events import OrderEventFactory
 from app.models.order import OrderSource, OrderStatus
 from app.models.payment_method import PaymentMethodType
 from app.schemas.shipping import Address
@@ -30,7 +28,6 @@ class OrderIntentHandler:
         self.user_id = user_id
         self.db = db  # Should be an AsyncSession
         self.cart_service = get_cart_service()
-        self.event_bus = get_event_bus()
         self.message_builder = MessageBuilder()
 
     async def handle_intent(
@@ -148,8 +145,6 @@ class OrderIntentHandler:
             channel_data={"whatsapp_number": user_phone},
         )
         order_number = getattr(order, "order_number", str(order.id))
-        event = OrderEventFactory.create_order_created_event(order)
-        await self.event_bus.publish(event)
         await self.cart_service.clear_cart(user_phone, self.tenant_id)
         response_messages = []
         response_messages.append(
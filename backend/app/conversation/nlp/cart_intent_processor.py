@@ -1,26 +1,29 @@
 import logging
 import re
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 from uuid import UUID
-from datetime import datetime, timedelta
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, func, desc
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, and_, or_
 
-from app.models.cart import Cart, CartItem
+from app.core.cache.redis_cache import redis_cache
 from app.models.product import Product
-from app.models.customer import Customer
-from app.models.order import Order, OrderStatus, OrderSource
-from app.models.order_item import OrderItem
-from app.models.order_channel_meta import OrderChannelMeta
-from app.models.conversation_history import ChannelType
+from app.models.order import OrderSource
+from app.services.cart_engine import CartAggregate, CartOwner, cart_engine
 from app.services.order_creation_service import OrderCreationService
-from app.services.order_exceptions import OrderValidationError
-from app.core.exceptions import AppError
 
 logger = logging.getLogger(__name__)
 
+PRODUCT_MATCH_CACHE_PREFIX = "cart_product_match"
+PRODUCT_MATCH_CACHE_TTL = 300
+
+
+class ProductMatch(NamedTuple):
+    """The product fields a cart turn needs"""
+    id: UUID
+    name: str
+    price: float
+
 
 class CartIntentProcessor:
     """
@@ -41,6 +44,10 @@ class CartIntentProcessor:
         """
         Process cart-related intents from conversational flows.
 
+        The customer's cart is read from the cart engine's cache and each
+        change is written back in a single statement, so a turn costs at
+        most one cart round trip once the cart is warm.
+
         Args:
             message_body: The customer's message text
             tenant_id: Tenant/seller ID
@@ -57,27 +64,23 @@ class CartIntentProcessor:
             if not intent_data:
                 return self._create_help_response(context)
 
-            # Get or create customer
-            customer = await self._get_or_create_customer(customer_number, tenant_id)
-
-            # Get or create cart
-            cart = await self._get_or_create_cart(customer.id, tenant_id, customer_number)
+            owner = CartOwner("phone_number", customer_number)
 
             # Process the specific intent
             intent_type = intent_data.get('intent')
 
             if intent_type == 'add_to_cart':
-                return await self._handle_add_to_cart(cart, intent_data, context)
+                return await self._handle_add_to_cart(tenant_id, owner, intent_data, context)
             elif intent_type == 'remove_from_cart':
-                return await self._handle_remove_from_cart(cart, intent_data, context)
+                return await self._handle_remove_from_cart(tenant_id, owner, intent_data, context)
             elif intent_type == 'update_cart':
-                return await self._handle_update_cart(cart, intent_data, context)
+                return await self._handle_update_cart(tenant_id, owner, intent_data, context)
             elif intent_type == 'view_cart':
-                return await self._handle_view_cart(cart, context)
+                return await self._handle_view_cart(tenant_id, owner, context)
             elif intent_type == 'clear_cart':
-                return await self._handle_clear_cart(cart, context)
+                return await self._handle_clear_cart(tenant_id, owner, context)
             elif intent_type == 'checkout':
-                return await self._handle_checkout(cart, customer, context)
+                return await self._handle_checkout(tenant_id, owner, context)
             else:
                 return self._create_help_response(context)
 
@@ -215,77 +218,17 @@ class CartIntentProcessor:
 
         return None
 
-    async def _get_or_create_customer(self, phone_number: str, tenant_id: str) -> Customer:
-        """Get or create customer record"""
-        try:
-            # Try to find existing customer
-            query = select(Customer).where(
-                and_(
-                    Customer.phone == phone_number,
-                    Customer.tenant_id == UUID(tenant_id)
-                )
-            )
-            result = await self.db.execute(query)
-            customer = result.scalar_one_or_none()
-
-            if not customer:
-                # Create new customer
-                customer = Customer(
-                    phone=phone_number,
-                    tenant_id=UUID(tenant_id),
-                    name=f"Customer {phone_number}",  # Default name
-                    created_at=datetime.utcnow()
-                )
-                self.db.add(customer)
-                await self.db.flush()
-
-            return customer
-
-        except Exception as e:
-            logger.error(f"Error getting/creating customer: {str(e)}")
-            raise AppError(f"Failed to get customer: {str(e)}")
-
-    async def _get_or_create_cart(self, customer_id: UUID, tenant_id: str, phone_number: str) -> Cart:
-        """Get or create cart for customer"""
-        try:
-            # Try to find existing cart
-            query = select(Cart).options(
-                selectinload(Cart.items)
-            ).where(
-                and_(
-                    Cart.tenant_id == UUID(tenant_id),
-                    or_(
-                        Cart.user_id == customer_id,
-                        Cart.phone_number == phone_number
-                    )
-                )
-            )
-            result = await self.db.execute(query)
-            cart = result.scalar_one_or_none()
-
-            if not cart:
-                # Create new cart
-                cart = Cart(
-                    user_id=customer_id,
-                    phone_number=phone_number,
-                    tenant_id=UUID(tenant_id),
-                    created_at=datetime.utcnow(),
-                    updated_at=datetime.utcnow()
-                )
-                self.db.add(cart)
-                await self.db.flush()
+    async def _find_product_by_name(self, product_name: str, tenant_id: str) -> Optional[ProductMatch]:
+        """Find product by name with fuzzy matching; matches are cached briefly"""
+        cache_key = redis_cache.generate_key(
+            tenant_id, PRODUCT_MATCH_CACHE_PREFIX, product_name.strip().lower())
+        cached = await redis_cache.get(cache_key)
+        if cached:
+            return ProductMatch(UUID(cached['id']), cached['name'], cached['price'])
 
-            return cart
-
-        except Exception as e:
-            logger.error(f"Error getting/creating cart: {str(e)}")
-            raise AppError(f"Failed to get cart: {str(e)}")
-
-    async def _find_product_by_name(self, product_name: str, tenant_id: str) -> Optional[Product]:
-        """Find product by name with fuzzy matching"""
         try:
             # Try exact match first
-            query = select(Product).where(
+            query = select(Product.id, Product.name, Product.price).where(
                 and_(
                     Product.tenant_id == UUID(tenant_id),
                     Product.name.ilike(f"%{product_name}%")
@@ -293,45 +236,52 @@ class CartIntentProcessor:
             ).limit(1)
 
             result = await self.db.execute(query)
-            product = result.scalar_one_or_none()
-
-            if product:
-                return product
-
-            # Try broader search
-            words = product_name.split()
-            if len(words) > 1:
-                # Search for products containing any of the words
-                conditions = []
-                for word in words:
-                    if len(word) > 2:  # Only search for words longer than 2 characters
-                        conditions.append(Product.name.ilike(f"%{word}%"))
-
-                if conditions:
-                    query = select(Product).where(
-                        and_(
-                            Product.tenant_id == UUID(tenant_id),
-                            or_(*conditions)
-                        )
-                    ).limit(1)
-
-                    result = await self.db.execute(query)
-                    product = result.scalar_one_or_none()
-
+            row = result.first()
+
+            if not row:
+                # Try broader search
+                words = product_name.split()
+                if len(words) > 1:
+                    # Search for products containing any of the words
+                    conditions = []
+                    for word in words:
+                        if len(word) > 2:  # Only search for words longer than 2 characters
+                            conditions.append(Product.name.ilike(f"%{word}%"))
+
+                    if conditions:
+                        query = select(Product.id, Product.name, Product.price).where(
+                            and_(
+                                Product.tenant_id == UUID(tenant_id),
+                                or_(*conditions)
+                            )
+                        ).limit(1)
+
+                        result = await self.db.execute(query)
+                        row = result.first()
+
+            if not row:
+                return None
+
+            product = ProductMatch(*row)
+            await redis_cache.set(
+                cache_key,
+                {'id': str(product.id), 'name': product.name, 'price': product.price},
+                expire=PRODUCT_MATCH_CACHE_TTL,
+            )
             return product
 
         except Exception as e:
             logger.error(f"Error finding product: {str(e)}")
             return None
 
-    async def _handle_add_to_cart(self, cart: Cart, intent_data: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+    async def _handle_add_to_cart(self, tenant_id: str, owner: CartOwner, intent_data: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """Handle add to cart intent"""
         try:
             product_name = intent_data.get('product_name', '')
             quantity = intent_data.get('quantity', 1)
 
             # Find product
-            product = await self._find_product_by_name(product_name, str(cart.tenant_id))
+            product = await self._find_product_by_name(product_name, tenant_id)
 
             if not product:
                 return {
@@ -344,36 +294,10 @@ class CartIntentProcessor:
                     'context': context
                 }
 
-            # Check if item already exists in cart
-            existing_item = None
-            for item in cart.items:
-                if item.product_id == product.id:
-                    existing_item = item
-                    break
-
-            if existing_item:
-                # Update existing item
-                existing_item.quantity += quantity
-                existing_item.updated_at = datetime.utcnow()
-            else:
-                # Add new item
-                cart_item = CartItem(
-                    cart_id=cart.id,
-                    product_id=product.id,
-                    quantity=quantity,
-                    price_at_add=product.price,
-                    created_at=datetime.utcnow(),
-                    updated_at=datetime.utcnow()
-                )
-                self.db.add(cart_item)
-                cart.items.append(cart_item)
-
-            cart.updated_at = datetime.utcnow()
-            await self.db.commit()
-
-            # Calculate total
-            total_amount = sum(
-                item.quantity * item.price_at_add for item in cart.items)
+            cart, _ = await cart_engine.mutate(
+                tenant_id, owner,
+                lambda cart: cart.add(product.id, quantity, product.price, product_name=product.name),
+            )
 
             return {
                 'messages': [
@@ -381,7 +305,7 @@ class CartIntentProcessor:
                         'type': 'text',
                         'text': f"✅ Added {quantity}x {product.name} to your cart!\n\n"
                         f"💰 Price: KES {product.price:.2f} each\n"
-                        f"🛒 Cart total: KES {total_amount:.2f}\n\n"
+                        f"🛒 Cart total: KES {cart.total:.2f}\n\n"
                         f"Type 'checkout' to place your order or 'view cart' to see all items."
                     }
                 ],
@@ -392,13 +316,13 @@ class CartIntentProcessor:
             logger.error(f"Error adding to cart: {str(e)}")
             return self._create_error_response("Failed to add item to cart", context)
 
-    async def _handle_remove_from_cart(self, cart: Cart, intent_data: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+    async def _handle_remove_from_cart(self, tenant_id: str, owner: CartOwner, intent_data: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """Handle remove from cart intent"""
         try:
             product_name = intent_data.get('product_name', '')
 
             # Find product
-            product = await self._find_product_by_name(product_name, str(cart.tenant_id))
+            product = await self._find_product_by_name(product_name, tenant_id)
 
             if not product:
                 return {
@@ -411,14 +335,16 @@ class CartIntentProcessor:
                     'context': context
                 }
 
-            # Find and remove item from cart
-            item_to_remove = None
-            for item in cart.items:
-                if item.product_id == product.id:
-                    item_to_remove = item
-                    break
+            def remove(cart: CartAggregate) -> bool:
+                line = cart.line_for(product.id)
+                if line is None:
+                    return False
+                cart.remove(line)
+                return True
+
+            cart, removed = await cart_engine.mutate(tenant_id, owner, remove)
 
-            if not item_to_remove:
+            if not removed:
                 return {
                     'messages': [
                         {
@@ -429,22 +355,12 @@ class CartIntentProcessor:
                     'context': context
                 }
 
-            # Remove item
-            cart.items.remove(item_to_remove)
-            await self.db.delete(item_to_remove)
-            cart.updated_at = datetime.utcnow()
-            await self.db.commit()
-
-            # Calculate new total
-            total_amount = sum(
-                item.quantity * item.price_at_add for item in cart.items)
-
             return {
                 'messages': [
                     {
                         'type': 'text',
                         'text': f"✅ Removed {product.name} from your cart.\n\n"
-                        f"🛒 Cart total: KES {total_amount:.2f}\n\n"
+                        f"🛒 Cart total: KES {cart.total:.2f}\n\n"
                         f"Type 'view cart' to see remaining items."
                     }
                 ],
@@ -455,14 +371,14 @@ class CartIntentProcessor:
             logger.error(f"Error removing from cart: {str(e)}")
             return self._create_error_response("Failed to remove item from cart", context)
 
-    async def _handle_update_cart(self, cart: Cart, intent_data: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+    async def _handle_update_cart(self, tenant_id: str, owner: CartOwner, intent_data: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """Handle update cart quantity intent"""
         try:
             product_name = intent_data.get('product_name', '')
             new_quantity = intent_data.get('quantity', 1)
 
             # Find product
-            product = await self._find_product_by_name(product_name, str(cart.tenant_id))
+            product = await self._find_product_by_name(product_name, tenant_id)
 
             if not product:
                 return {
@@ -475,14 +391,17 @@ class CartIntentProcessor:
                     'context': context
                 }
 
-            # Find item in cart
-            cart_item = None
-            for item in cart.items:
-                if item.product_id == product.id:
-                    cart_item = item
-                    break
+            def update(cart: CartAggregate) -> bool:
+                line = cart.line_for(product.id)
+                if line is None:
+                    return False
+                # Removes the item if quantity is 0 or negative
+                cart.set_quantity(line, new_quantity)
+                return True
+
+            cart, updated = await cart_engine.mutate(tenant_id, owner, update)
 
-            if not cart_item:
+            if not updated:
                 return {
                     'messages': [
                         {
@@ -493,30 +412,17 @@ class CartIntentProcessor:
                     'context': context
                 }
 
-            # Update quantity
             if new_quantity <= 0:
-                # Remove item if quantity is 0 or negative
-                cart.items.remove(cart_item)
-                await self.db.delete(cart_item)
                 message = f"✅ Removed {product.name} from your cart."
             else:
-                cart_item.quantity = new_quantity
-                cart_item.updated_at = datetime.utcnow()
                 message = f"✅ Updated {product.name} quantity to {new_quantity}."
 
-            cart.updated_at = datetime.utcnow()
-            await self.db.commit()
-
-            # Calculate new total
-            total_amount = sum(
-                item.quantity * item.price_at_add for item in cart.items)
-
             return {
                 'messages': [
                     {
                         'type': 'text',
                         'text': f"{message}\n\n"
-                        f"🛒 Cart total: KES {total_amount:.2f}\n\n"
+                        f"🛒 Cart total: KES {cart.total:.2f}\n\n"
                         f"Type 'view cart' to see all items."
                     }
                 ],
@@ -527,9 +433,11 @@ class CartIntentProcessor:
             logger.error(f"Error updating cart: {str(e)}")
             return self._create_error_response("Failed to update cart", context)
 
-    async def _handle_view_cart(self, cart: Cart, context: Dict[str, Any]) -> Dict[str, Any]:
+    async def _handle_view_cart(self, tenant_id: str, owner: CartOwner, context: Dict[str, Any]) -> Dict[str, Any]:
         """Handle view cart intent"""
         try:
+            cart = await cart_engine.load(tenant_id, owner)
+
             if not cart.items:
                 return {
                     'messages': [
@@ -545,25 +453,15 @@ class CartIntentProcessor:
                     'context': context
                 }
 
-            # Build cart summary
+            # Build cart summary; product names are loaded with the cart
             cart_lines = ["🛒 Your Cart:"]
-            total_amount = 0
 
             for item in cart.items:
-                # Get product details
-                product_query = select(Product).where(
-                    Product.id == item.product_id)
-                product_result = await self.db.execute(product_query)
-                product = product_result.scalar_one_or_none()
-
-                if product:
-                    item_total = item.quantity * item.price_at_add
-                    total_amount += item_total
-                    cart_lines.append(
-                        f"• {item.quantity}x {product.name} - KES {item.price_at_add:.2f} each = KES {item_total:.2f}"
-                    )
-
-            cart_lines.append(f"\n💰 Total: KES {total_amount:.2f}")
+                cart_lines.append(
+                    f"• {item.quantity}x {item.product_name} - KES {item.price_at_add:.2f} each = KES {item.subtotal:.2f}"
+                )
+
+            cart_lines.append(f"\n💰 Total: KES {cart.total:.2f}")
             cart_lines.append("\n📝 Options:")
             cart_lines.append("• Type 'checkout' to place your order")
             cart_lines.append("• Type 'clear cart' to remove all items")
@@ -583,10 +481,17 @@ class CartIntentProcessor:
             logger.error(f"Error viewing cart: {str(e)}")
             return self._create_error_response("Failed to view cart", context)
 
-    async def _handle_clear_cart(self, cart: Cart, context: Dict[str, Any]) -> Dict[str, Any]:
+    async def _handle_clear_cart(self, tenant_id: str, owner: CartOwner, context: Dict[str, Any]) -> Dict[str, Any]:
         """Handle clear cart intent"""
         try:
-            if not cart.items:
+            def clear(cart: CartAggregate) -> bool:
+                had_items = bool(cart.items)
+                cart.clear()
+                return had_items
+
+            _, cleared = await cart_engine.mutate(tenant_id, owner, clear)
+
+            if not cleared:
                 return {
                     'messages': [
                         {
@@ -597,14 +502,6 @@ class CartIntentProcessor:
                     'context': context
                 }
 
-            # Remove all items
-            for item in cart.items:
-                await self.db.delete(item)
-
-            cart.items.clear()
-            cart.updated_at = datetime.utcnow()
-            await self.db.commit()
-
             return {
                 'messages': [
                     {
@@ -622,9 +519,11 @@ class CartIntentProcessor:
             logger.error(f"Error clearing cart: {str(e)}")
             return self._create_error_response("Failed to clear cart", context)
 
-    async def _handle_checkout(self, cart: Cart, customer: Customer, context: Dict[str, Any]) -> Dict[str, Any]:
+    async def _handle_checkout(self, tenant_id: str, owner: CartOwner, context: Dict[str, Any]) -> Dict[str, Any]:
         """Handle checkout intent"""
         try:
+            cart = await cart_engine.load(tenant_id, owner)
+
             if not cart.items:
                 return {
                     'messages': [
@@ -637,8 +536,7 @@ class CartIntentProcessor:
                 }
 
             # Calculate totals
-            subtotal = sum(item.quantity *
-                           item.price_at_add for item in cart.items)
+            subtotal = float(cart.total)
             tax = subtotal * 0.16  # 16% VAT
             shipping = 500.0  # Fixed shipping cost
             total = subtotal + tax + shipping
@@ -647,27 +545,23 @@ class CartIntentProcessor:
             order_creation_service = OrderCreationService(self.db)
 
             # Prepare order items
-            order_items = []
-            for cart_item in cart.items:
-                product_query = select(Product).where(
-                    Product.id == cart_item.product_id)
-                product_result = await self.db.execute(product_query)
-                product = product_result.scalar_one_or_none()
-
-                if product:
-                    order_items.append({
-                        'product_id': product.id,
-                        'quantity': cart_item.quantity,
-                        'price': cart_item.price_at_add,
-                        'subtotal': cart_item.quantity * cart_item.price_at_add
-                    })
+            order_items = [
+                {
+                    'product_id': item.product_id,
+                    'quantity': item.quantity,
+                    'price': float(item.price_at_add),
+                    'subtotal': float(item.subtotal)
+                }
+                for item in cart.items
+            ]
+            ordered_version = cart.version
 
             # Create order
             order = await order_creation_service.create_order_internal(
                 product_id=order_items[0]['product_id'],  # Primary product
                 seller_id=cart.tenant_id,
-                buyer_name=customer.name,
-                buyer_phone=customer.phone,
+                buyer_name=cart.customer_name,
+                buyer_phone=owner.value,
                 total_amount=total,
                 order_source=OrderSource.whatsapp,
                 items=order_items,
@@ -675,16 +569,22 @@ class CartIntentProcessor:
                     'channel': 'whatsapp',
                     'conversation_id': context.get('conversation_id'),
                     'message_id': context.get('message_id'),
-                    'whatsapp_number': customer.phone
+                    'whatsapp_number': owner.value
                 }
             )
 
-            # Clear cart after successful order creation
-            for item in cart.items:
-                await self.db.delete(item)
-            cart.items.clear()
-            cart.updated_at = datetime.utcnow()
-            await self.db.commit()
+            # Clear the ordered items; anything added meanwhile stays in the cart
+            ordered_ids = {item.product_id for item in cart.items}
+
+            def clear_ordered(current: CartAggregate):
+                if current.version == ordered_version:
+                    current.clear()
+                    return
+                for line in list(current.items):
+                    if line.product_id in ordered_ids:
+                        current.remove(line)
+
+            await cart_engine.mutate(tenant_id, owner, clear_ordered)
 
             # Create order summary
             order_lines = [
@@ -693,16 +593,10 @@ class CartIntentProcessor:
                 "📋 Order Summary:",
             ]
 
-            for item_data in order_items:
-                product_query = select(Product).where(
-                    Product.id == item_data['product_id'])
-                product_result = await self.db.execute(product_query)
-                product = product_result.scalar_one_or_none()
-
-                if product:
-                    order_lines.append(
-                        f"• {item_data['quantity']}x {product.name} - KES {item_data['price']:.2f}"
-                    )
+            for item in cart.items:
+                order_lines.append(
+                    f"• {item.quantity}x {item.product_name} - KES {item.price_at_add:.2f}"
+                )
 
             order_lines.extend([
                 "",
@@ -0,0 +1,323 @@
+"""
+Binary codec for cached values.
+
+Provides:
+- Pluggable serializers: orjson (default when installed), msgpack and stdlib json
+- Schema-aware encoding of Pydantic models, ORM rows, dataclasses, UUIDs,
+  datetimes, decimals and enums, and typed restore of cached ORM rows
+- Optional zstd/lz4/zlib compression for payloads above a size threshold
+- A versioned header on every payload so codecs can be rolled forward
+
+Every encoded payload starts with a four-byte header:
+
+    0xC1 | header version | serializer id | compression id
+
+0xC1 can never start a UTF-8 JSON document, so values written before the
+header existed (plain JSON, or bare integers from INCR) are still decoded.
+Readers keep every decoder they know about, so a new serializer or
+compressor can be rolled out by deploying readers before switching writers.
+Payloads a reader can't decode raise CacheCodecError, which callers treat as
+a cache miss.
+"""
+
+import dataclasses
+import json
+import logging
+import zlib
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+from uuid import UUID
+
+from pydantic import BaseModel
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.exc import NoInspectionAvailable
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.config.settings import get_settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # pragma: no cover - optional dependency
+    lz4_frame = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = 0xC1
+HEADER_VERSION = 1
+HEADER_SIZE = 4
+
+SERIALIZER_JSON = "json"
+SERIALIZER_ORJSON = "orjson"
+SERIALIZER_MSGPACK = "msgpack"
+
+COMPRESSION_NONE = "none"
+COMPRESSION_ZLIB = "zlib"
+COMPRESSION_ZSTD = "zstd"
+COMPRESSION_LZ4 = "lz4"
+
+# Wire ids; never renumber, only append
+SERIALIZER_IDS = {SERIALIZER_JSON: 1, SERIALIZER_ORJSON: 2, SERIALIZER_MSGPACK: 3}
+COMPRESSION_IDS = {COMPRESSION_NONE: 0, COMPRESSION_ZLIB: 1, COMPRESSION_ZSTD: 2, COMPRESSION_LZ4: 3}
+
+DEFAULT_COMPRESSION_THRESHOLD = 1024
+
+
+class CacheCodecError(ValueError):
+    """Raised when a cached payload can't be encoded or decoded"""
+
+
+def to_cache_value(value: Any) -> Any:
+    """
+    Convert a value the serializers don't handle natively.
+
+    Used as the ``default`` hook of every serializer. ORM rows become a dict
+    of their loaded column attributes; unloaded attributes are skipped rather
+    than lazy-loaded.
+
+    Raises:
+        TypeError: If the value has no cache representation
+    """
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (UUID, Decimal)):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    try:
+        state = sa_inspect(value)
+    except NoInspectionAvailable:
+        state = None
+    if state is not None and hasattr(state, "mapper"):
+        loaded = state.dict
+        return {
+            attr.key: loaded[attr.key]
+            for attr in state.mapper.column_attrs
+            if attr.key in loaded
+        }
+    raise TypeError(f"Type is not cache serializable: {type(value).__name__}")
+
+
+def _restore_column_value(column_type: Any, value: Any) -> Any:
+    if value is None:
+        return None
+    try:
+        python_type = column_type.python_type
+    except NotImplementedError:
+        return value
+    if isinstance(value, python_type):
+        return value
+    if python_type in (datetime, date, time) and isinstance(value, str):
+        return python_type.fromisoformat(value)
+    if python_type in (UUID, Decimal) or (isinstance(python_type, type) and issubclass(python_type, Enum)):
+        return python_type(value)
+    return value
+
+
+def orm_row_from_cache(model_class: Any, data: Dict[str, Any]) -> Any:
+    """
+    Rebuild an ORM instance from its cached column dict.
+
+    Column values are converted back to their Python types. The instance is
+    detached and its attributes are marked as loaded, not modified; attach
+    it with ``session.merge(instance, load=False)`` if it has to be written.
+
+    Args:
+        model_class: Mapped class the row was encoded from
+        data: Column dict produced by the codec
+
+    Returns:
+        A detached instance of model_class
+    """
+    mapper = sa_inspect(model_class)
+    instance = mapper.class_manager.new_instance()
+    for attr in mapper.column_attrs:
+        if attr.key in data:
+            value = _restore_column_value(attr.columns[0].type, data[attr.key])
+            set_committed_value(instance, attr.key, value)
+    return instance
+
+
+def _json_dumps(value: Any) -> bytes:
+    return json.dumps(value, default=to_cache_value, separators=(",", ":")).encode("utf-8")
+
+
+def _json_loads(data: bytes) -> Any:
+    return json.loads(data)
+
+
+def _orjson_dumps(value: Any) -> bytes:
+    return orjson.dumps(value, default=to_cache_value, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _msgpack_dumps(value: Any) -> bytes:
+    return msgpack.packb(value, default=to_cache_value, use_bin_type=True, datetime=False)
+
+
+def _msgpack_loads(data: bytes) -> Any:
+    return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+Codec = Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]
+
+SERIALIZERS: Dict[str, Codec] = {SERIALIZER_JSON: (_json_dumps, _json_loads)}
+if orjson is not None:
+    SERIALIZERS[SERIALIZER_ORJSON] = (_orjson_dumps, orjson.loads)
+if msgpack is not None:
+    SERIALIZERS[SERIALIZER_MSGPACK] = (_msgpack_dumps, _msgpack_loads)
+
+COMPRESSORS: Dict[str, Codec] = {
+    COMPRESSION_NONE: (bytes, bytes),
+    COMPRESSION_ZLIB: (lambda data: zlib.compress(data, 1), zlib.decompress),
+}
+if zstandard is not None:
+    COMPRESSORS[COMPRESSION_ZSTD] = (
+        zstandard.ZstdCompressor(level=3).compress,
+        zstandard.ZstdDecompressor().decompress,
+    )
+if lz4_frame is not None:
+    COMPRESSORS[COMPRESSION_LZ4] = (lz4_frame.compress, lz4_frame.decompress)
+
+_SERIALIZER_NAMES = {wire_id: name for name, wire_id in SERIALIZER_IDS.items()}
+_COMPRESSION_NAMES = {wire_id: name for name, wire_id in COMPRESSION_IDS.items()}
+
+
+def default_serializer() -> str:
+    """Fastest serializer that is installed."""
+    return SERIALIZER_ORJSON if SERIALIZER_ORJSON in SERIALIZERS else SERIALIZER_JSON
+
+
+def default_compression() -> str:
+    """Best compressor that is installed."""
+    for name in (COMPRESSION_ZSTD, COMPRESSION_LZ4):
+        if name in COMPRESSORS:
+            return name
+    return COMPRESSION_ZLIB
+
+
+class CacheCodec:
+    """Encodes cache values to header-tagged bytes and back"""
+
+    def __init__(
+        self,
+        serializer: Optional[str] = None,
+        compression: Optional[str] = None,
+        compress_threshold: Optional[int] = DEFAULT_COMPRESSION_THRESHOLD,
+    ):
+        """
+        Args:
+            serializer: Serializer name, defaults to the fastest installed
+            compression: Compressor name, defaults to the best installed
+            compress_threshold: Compress payloads at least this many bytes;
+                None disables compression
+        """
+        serializer = serializer or default_serializer()
+        if serializer not in SERIALIZERS:
+            logger.warning(f"Cache serializer {serializer!r} is not installed, using json")
+            serializer = SERIALIZER_JSON
+        compression = compression or default_compression()
+        if compression not in COMPRESSORS:
+            logger.warning(f"Cache compression {compression!r} is not installed, using zlib")
+            compression = COMPRESSION_ZLIB
+
+        self.serializer = serializer
+        self.compression = compression
+        self.compress_threshold = compress_threshold
+        self._dumps = SERIALIZERS[serializer][0]
+        self._compress = COMPRESSORS[compression][0]
+        self._serializer_id = SERIALIZER_IDS[serializer]
+        self._compression_id = COMPRESSION_IDS[compression]
+
+    def encode(self, value: Any) -> bytes:
+        """
+        Serialize a value, compressing it if it is large enough to benefit.
+
+        Raises:
+            CacheCodecError: If the value can't be serialized
+        """
+        try:
+            body = self._dumps(value)
+        except (TypeError, ValueError) as e:
+            raise CacheCodecError(f"Cannot encode {type(value).__name__}: {e}") from e
+
+        compression_id = COMPRESSION_IDS[COMPRESSION_NONE]
+        if self.compress_threshold is not None and len(body) >= self.compress_threshold:
+            compressed = self._compress(body)
+            # Keep incompressible payloads as they are
+            if len(compressed) < len(body):
+                body = compressed
+                compression_id = self._compression_id
+
+        return bytes((MAGIC, HEADER_VERSION, self._serializer_id, compression_id)) + body
+
+    def decode(self, data: Union[bytes, bytearray, memoryview, str]) -> Any:
+        """
+        Decode a payload written by any known codec, or legacy plain JSON.
+
+        Raises:
+            CacheCodecError: If the payload is corrupt or needs a codec this
+                process doesn't have
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        elif not isinstance(data, bytes):
+            data = bytes(data)
+
+        if not data or data[0] != MAGIC:
+            try:
+                return json.loads(data)
+            except ValueError as e:
+                raise CacheCodecError(f"Undecodable legacy cache payload: {e}") from e
+
+        if len(data) < HEADER_SIZE or data[1] != HEADER_VERSION:
+            raise CacheCodecError("Unsupported cache payload header")
+
+        serializer = _SERIALIZER_NAMES.get(data[2])
+        compression = _COMPRESSION_NAMES.get(data[3])
+        if serializer not in SERIALIZERS or compression not in COMPRESSORS:
+            raise CacheCodecError(
+                f"No decoder for serializer id {data[2]} / compression id {data[3]}"
+            )
+
+        try:
+            body = COMPRESSORS[compression][1](data[HEADER_SIZE:])
+            return SERIALIZERS[serializer][1](body)
+        except Exception as e:
+            raise CacheCodecError(f"Corrupt cache payload: {e}") from e
+
+
+def build_cache_codec() -> CacheCodec:
+    """Codec configured from application settings."""
+    settings = get_settings()
+    threshold = settings.CACHE_COMPRESSION_THRESHOLD
+    return CacheCodec(
+        serializer=settings.CACHE_SERIALIZER or None,
+        compression=settings.CACHE_COMPRESSION or None,
+        compress_threshold=threshold if threshold > 0 else None,
+    )
+
+
+# Global cache codec instance
+cache_codec = build_cache_codec()
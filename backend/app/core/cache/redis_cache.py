@@ -1,15 +1,27 @@
 import asyncio
+import functools
 import hashlib
 import json
 import logging
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import redis.asyncio as redis
 from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from pydantic import TypeAdapter
 
+from app.core.cache.codec import cache_codec
 from app.core.config.settings import get_settings
 from app.core.exceptions import CacheError
+from app.core.http.compression import (
+    IDENTITY,
+    compress_variants,
+    configured_encodings,
+    negotiate_encoding,
+    record_precompressed_hit,
+)
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -187,7 +199,7 @@ class RedisCache:
 
         try:
             value = await self._execute_with_retry("get", key)
-            return json.loads(value) if value else None
+            return cache_codec.decode(value) if value else None
         except Exception as e:
             logger.error(f"Redis cache get error: {str(e)}")
             return None
@@ -208,7 +220,7 @@ class RedisCache:
             return False
 
         try:
-            serialized = json.dumps(value)
+            serialized = cache_codec.encode(value)
             if expire:
                 return await self._execute_with_retry("setex", key, expire, serialized)
             return await self._execute_with_retry("set", key, serialized)
@@ -216,6 +228,193 @@ class RedisCache:
             logger.error(f"Redis cache set error: {str(e)}")
             return False
 
+    async def set_if_absent(
+        self, key: str, value: Any = 1, expire: Optional[int] = None
+    ) -> Optional[bool]:
+        """
+        Atomically set a key only if it does not already exist (SET NX).
+
+        Args:
+            key: Cache key
+            value: Value to store
+            expire: Expiration time in seconds
+
+        Returns:
+            True if the key was set, False if it already existed,
+            None if Redis is unavailable
+        """
+        if not self.is_available:
+            return None
+
+        try:
+            result = await self._execute_with_retry(
+                "set", key, cache_codec.encode(value), ex=expire, nx=True
+            )
+            return bool(result)
+        except Exception as e:
+            logger.error(f"Redis cache set_if_absent error: {str(e)}")
+            return None
+
+    async def incr(self, key: str) -> Optional[int]:
+        """
+        Atomically increment an integer counter, creating it at 1.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The new value, or None if Redis is unavailable
+        """
+        if not self.is_available:
+            return None
+
+        try:
+            return int(await self._execute_with_retry("incr", key))
+        except Exception as e:
+            logger.error(f"Redis cache incr error: {str(e)}")
+            return None
+
+    async def publish(self, channel: str, message: str) -> int:
+        """
+        Publish a message on a pub/sub channel.
+
+        Args:
+            channel: Channel name
+            message: Message payload
+
+        Returns:
+            Number of subscribers that received it, 0 if Redis is unavailable
+        """
+        if not self.is_available:
+            return 0
+
+        try:
+            return int(await self._execute_with_retry("publish", channel, message))
+        except Exception as e:
+            logger.error(f"Redis cache publish error: {str(e)}")
+            return 0
+
+    def pubsub(self):
+        """
+        Get a pub/sub connection, or None if Redis is unavailable.
+
+        Callers own the returned object and must close it.
+        """
+        if not self.is_available:
+            return None
+        return self._redis_client.pubsub(ignore_subscribe_messages=True)
+
+    async def hset(self, key: str, field: str, value: Any) -> bool:
+        """
+        Set one field of a hash.
+
+        Args:
+            key: Hash key
+            field: Field name
+            value: Value to store
+
+        Returns:
+            True if successful, False otherwise
+        """
+        if not self.is_available:
+            return False
+
+        try:
+            await self._execute_with_retry("hset", key, field, cache_codec.encode(value))
+            return True
+        except Exception as e:
+            logger.error(f"Redis cache hset error: {str(e)}")
+            return False
+
+    async def hdel(self, key: str, *fields: str) -> int:
+        """
+        Delete fields of a hash.
+
+        Args:
+            key: Hash key
+            fields: Field names
+
+        Returns:
+            Number of fields removed, 0 if Redis is unavailable
+        """
+        if not self.is_available or not fields:
+            return 0
+
+        try:
+            return int(await self._execute_with_retry("hdel", key, *fields))
+        except Exception as e:
+            logger.error(f"Redis cache hdel error: {str(e)}")
+            return 0
+
+    async def hgetall(self, key: str) -> Dict[str, Any]:
+        """
+        Get all fields of a hash.
+
+        Args:
+            key: Hash key
+
+        Returns:
+            Field to value mapping, empty if missing or Redis is unavailable
+        """
+        if not self.is_available:
+            return {}
+
+        try:
+            values = await self._execute_with_retry("hgetall", key)
+            return {
+                (field.decode() if isinstance(field, bytes) else field): cache_codec.decode(value)
+                for field, value in (values or {}).items()
+            }
+        except Exception as e:
+            logger.error(f"Redis cache hgetall error: {str(e)}")
+            return {}
+
+    async def hset_bytes(
+        self, key: str, mapping: Dict[str, bytes], expire: Optional[int] = None
+    ) -> bool:
+        """
+        Store raw byte fields of a hash, bypassing the cache codec.
+
+        Args:
+            key: Hash key
+            mapping: Field to bytes mapping
+            expire: Expiration time in seconds for the whole hash
+
+        Returns:
+            True if successful, False otherwise
+        """
+        if not self.is_available:
+            return False
+
+        try:
+            await self._execute_with_retry("hset", key, mapping=mapping)
+            if expire:
+                await self._execute_with_retry("expire", key, expire)
+            return True
+        except Exception as e:
+            logger.error(f"Redis cache hset_bytes error: {str(e)}")
+            return False
+
+    async def hmget_bytes(self, key: str, *fields: str) -> List[Optional[bytes]]:
+        """
+        Get raw byte fields of a hash stored with hset_bytes.
+
+        Args:
+            key: Hash key
+            fields: Field names
+
+        Returns:
+            Values in field order, None for missing fields or if Redis is unavailable
+        """
+        if not self.is_available:
+            return [None] * len(fields)
+
+        try:
+            return list(await self._execute_with_retry("hmget", key, list(fields)))
+        except Exception as e:
+            logger.error(f"Redis cache hmget_bytes error: {str(e)}")
+            return [None] * len(fields)
+
     async def delete(self, key: str) -> bool:
         """
         Delete value from cache.
@@ -384,20 +583,36 @@ def cached_response(
     prefix: str,
     expiration: int = DEFAULT_EXPIRATION,
     include_request_headers: bool = False,
+    response_model: Any = None,
+    headers: Optional[Dict[str, str]] = None,
 ):
     """
-    Decorator for caching API responses with tenant isolation.
+    Decorator for caching JSON API responses with tenant isolation.
+
+    The rendered JSON body is cached in a hash together with one compressed
+    copy per configured encoding (br, zstd, gzip), so a hot response is
+    compressed once when it is cached instead of on every hit. Hits are
+    served as the variant the client accepts, with ETag and 304 support.
+
+    Cached responses bypass the route's response_model, so endpoints that
+    return more than they expose must pass it here to filter the result
+    before it is cached.
 
     Args:
         prefix: Cache key prefix
         expiration: Cache expiration time in seconds
         include_request_headers: Whether to include request headers in cache key
+        response_model: Type the result is validated and serialized as
+        headers: Extra headers for cached responses, e.g. a public Cache-Control
 
     Returns:
         Decorator function
     """
 
+    adapter = TypeAdapter(response_model) if response_model is not None else None
+
     def decorator(func):
+        @functools.wraps(func)
         async def wrapper(*args, **kwargs):
             # Get request from args or kwargs
             request = None
@@ -413,9 +628,6 @@ def cached_response(
                 # Can't cache without request context
                 return await func(*args, **kwargs)
 
-            # Get response from kwargs if present
-            response = kwargs.get("response", None)
-
             # Generate cache key
             cache_key = await get_cache_key_from_request(request, prefix)
 
@@ -426,47 +638,50 @@ def cached_response(
                 headers_hash = hashlib.md5(headers_str.encode()).hexdigest()
                 cache_key += f":{headers_hash}"
 
+            encoding = negotiate_encoding(
+                request.headers.get("accept-encoding"), configured_encodings()
+            )
+
             # Check if we have cached response
             if redis_cache.is_available:
-                cached_data = await redis_cache.get(cache_key)
-                if cached_data:
+                cached = await _get_cached_body(cache_key, encoding)
+                if cached:
+                    meta, body_encoding, body = cached
                     # Check if this is a conditional request
-                    if_none_match = request.headers.get("if-none-match")
-                    if if_none_match and "etag" in cached_data:
-                        if if_none_match == cached_data["etag"]:
-                            # Return 304 Not Modified
-                            if response:
-                                response.status_code = 304
-                                return None
-
-                    # Return cached response with ETag
-                    result = cached_data["data"]
-                    if response and "etag" in cached_data:
-                        response.headers["ETag"] = cached_data["etag"]
-                        response.headers["Cache-Control"] = f"max-age={expiration}"
-
-                    return result
+                    if _etag_matches(request.headers.get("if-none-match"), meta["etag"]):
+                        return Response(
+                            status_code=304,
+                            headers={"ETag": meta["etag"], "Vary": "Accept-Encoding", **(headers or {})},
+                        )
+                    if body_encoding != IDENTITY:
+                        record_precompressed_hit(body_encoding, meta["size"], len(body))
+                    return _cached_body_response(body, body_encoding, meta["etag"], expiration, headers)
 
             # Execute the original function
             result = await func(*args, **kwargs)
 
-            # Cache the result if available
-            if redis_cache.is_available and result is not None:
-                # Generate ETag
-                etag = await redis_cache.generate_etag(result)
-
-                # Set ETag header in response
-                if response:
-                    response.headers["ETag"] = etag
-                    response.headers["Cache-Control"] = f"max-age={expiration}"
-
-                # Cache the result with ETag
-                await redis_cache.set(
+            # Cache the rendered result and its compressed variants
+            if redis_cache.is_available and result is not None and not isinstance(result, Response):
+                if adapter is not None:
+                    result = adapter.dump_python(
+                        adapter.validate_python(result, from_attributes=True), mode="json", by_alias=True
+                    )
+                body = JSONResponse(jsonable_encoder(result)).body
+                # Entity tags are quoted strings (RFC 9110 8.8.3)
+                etag = f'"{hashlib.md5(body).hexdigest()}"'
+                variants = {}
+                if len(body) >= settings.RESPONSE_COMPRESSION_MIN_SIZE:
+                    # Compression is CPU-bound; keep it off the event loop
+                    variants = await asyncio.to_thread(compress_variants, body, configured_encodings())
+                meta = {"etag": etag, "size": len(body), "cached_at": str(datetime.now())}
+                await redis_cache.hset_bytes(
                     cache_key,
-                    {"data": result, "etag": etag,
-                        "cached_at": str(datetime.now())},
+                    {"meta": json.dumps(meta).encode(), IDENTITY: body, **variants},
                     expiration,
                 )
+                if encoding in variants:
+                    return _cached_body_response(variants[encoding], encoding, etag, expiration, headers)
+                return _cached_body_response(body, IDENTITY, etag, expiration, headers)
 
             return result
 
@@ -475,6 +690,50 @@ def cached_response(
     return decorator
 
 
+async def _get_cached_body(
+    cache_key: str, encoding: Optional[str]
+) -> Optional[Tuple[Dict[str, Any], str, bytes]]:
+    """Fetch the cached metadata and the best stored body for an encoding."""
+    field = encoding or IDENTITY
+    meta, body = await redis_cache.hmget_bytes(cache_key, "meta", field)
+    if not meta:
+        return None
+    if body is None and field != IDENTITY:
+        # Bodies too small or incompressible are only stored uncompressed
+        field = IDENTITY
+        (body,) = await redis_cache.hmget_bytes(cache_key, IDENTITY)
+    if body is None:
+        return None
+    return json.loads(meta), field, body
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # Weak comparison: compressed variants carry the weak form of the ETag
+    candidates = {tag.strip().removeprefix("W/").strip('"') for tag in if_none_match.split(",")}
+    return etag.strip('"') in candidates or "*" in candidates
+
+
+def _cached_body_response(
+    body: bytes,
+    encoding: str,
+    etag: str,
+    expiration: int,
+    extra_headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"max-age={expiration}",
+        "Vary": "Accept-Encoding",
+        **(extra_headers or {}),
+    }
+    if encoding != IDENTITY:
+        headers["Content-Encoding"] = encoding
+        headers["ETag"] = f"W/{etag}"
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 async def invalidate_tenant_cache(tenant_id: str, prefix: Optional[str] = None) -> int:
     """
     Invalidate cache for a specific tenant.
@@ -0,0 +1,190 @@
+"""
+Versioned, per-worker snapshot cache.
+
+Read-mostly configuration (RBAC graph, feature flags, IP allowlist) is
+loaded into an immutable snapshot held by every worker and tagged with a
+shared version stamp in Redis. Writers bump the stamp; readers drop their
+snapshot when it moves.
+
+Provides:
+- A double-checked reload under a lock, so one load serves every waiter
+- Generation counting, so a load racing an invalidation is not published
+- A polling fallback on the shared stamp, bounded by snapshot age when
+  Redis can't be read
+- Optional push invalidation over a Redis channel
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Generic, Optional, TypeVar
+
+from app.core.cache.redis_cache import redis_cache
+
+logger = logging.getLogger(__name__)
+
+# How often a warm snapshot re-reads the shared version stamp
+VERSION_CHECK_INTERVAL = 10.0
+# Upper bound on snapshot age when the shared stamp can't be read
+MAX_SNAPSHOT_AGE = 60.0
+LISTENER_RETRY_DELAY = 5.0
+
+S = TypeVar("S")
+
+
+class VersionedSnapshotCache(Generic[S]):
+    """
+    Base for process-wide holders of a versioned snapshot.
+
+    Snapshots must expose the ``version`` they were loaded at. Subclasses
+    provide the loader to ``_current`` and may override ``_usable`` to
+    reject snapshots on other grounds (e.g. an expired entry).
+    """
+
+    def __init__(
+        self,
+        version_key: str,
+        channel: Optional[str] = None,
+        name: str = "snapshot",
+        cache=redis_cache,
+        version_check_interval: float = VERSION_CHECK_INTERVAL,
+        max_snapshot_age: float = MAX_SNAPSHOT_AGE,
+    ):
+        """
+        Args:
+            version_key: Redis key of the shared version stamp
+            channel: Redis channel change notifications are published on;
+                None relies on version polling alone
+            name: Label used in log messages
+            cache: Redis cache client
+            version_check_interval: Seconds between shared stamp checks
+            max_snapshot_age: Seconds a snapshot is trusted without a stamp
+        """
+        self.version_key = version_key
+        self.channel = channel
+        self.name = name
+        self.cache = cache
+        self.version_check_interval = version_check_interval
+        self.max_snapshot_age = max_snapshot_age
+        self._generation = 0
+        self._snapshot: Optional[S] = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+        self._listener: Optional[asyncio.Task] = None
+
+    async def _shared_version(self) -> Optional[int]:
+        return await self.cache.get(self.version_key)
+
+    def _usable(self, snapshot: S) -> bool:
+        return True
+
+    async def _fresh_snapshot(self) -> Optional[S]:
+        snapshot = self._snapshot
+        if snapshot is None or not self._usable(snapshot):
+            return None
+
+        now = time.monotonic()
+        if now - self._checked_at < self.version_check_interval:
+            return snapshot
+
+        shared = await self._shared_version()
+        if shared is None:
+            # Without a shared stamp, bound staleness by age instead
+            if now - self._loaded_at > self.max_snapshot_age:
+                return None
+        elif shared != snapshot.version:
+            return None
+        self._checked_at = now
+        return snapshot
+
+    async def _current(self, load: Callable[[Optional[int]], Awaitable[S]]) -> S:
+        """
+        Get the current snapshot, loading it if it is cold or stale.
+
+        Args:
+            load: Called with the shared version to build a new snapshot
+
+        Returns:
+            The snapshot
+        """
+        snapshot = await self._fresh_snapshot()
+        if snapshot is not None:
+            return snapshot
+
+        async with self._lock:
+            # Another request may have reloaded while we waited
+            snapshot = await self._fresh_snapshot()
+            if snapshot is not None:
+                return snapshot
+
+            generation = self._generation
+            snapshot = await load(await self._shared_version())
+            # Only publish if nothing was invalidated during the load
+            if generation == self._generation and snapshot is not self._snapshot:
+                self._store(snapshot)
+            return snapshot
+
+    def _store(self, snapshot: S):
+        self._snapshot = snapshot
+        self._loaded_at = self._checked_at = time.monotonic()
+
+    def invalidate_local(self):
+        """Drop this process's snapshot."""
+        self._generation += 1
+        self._snapshot = None
+
+    async def invalidate(self):
+        """Drop the snapshot here, bump the shared stamp and notify other workers."""
+        self.invalidate_local()
+        version = await self.cache.incr(self.version_key)
+        if version is not None and self.channel is not None:
+            await self.cache.publish(self.channel, str(version))
+
+    def _on_change(self, payload: Any):
+        snapshot = self._snapshot
+        try:
+            version = int(payload)
+        except (TypeError, ValueError):
+            version = None
+        if snapshot is None or version is None or version != snapshot.version:
+            self.invalidate_local()
+
+    async def _listen(self):
+        while True:
+            pubsub = self.cache.pubsub()
+            if pubsub is None:
+                # Redis is down; version polling covers us until it's back
+                await asyncio.sleep(LISTENER_RETRY_DELAY)
+                continue
+            try:
+                await pubsub.subscribe(self.channel)
+                # Anything published before the subscription is in place was missed
+                self.invalidate_local()
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._on_change(message.get("data"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"{self.name} listener disconnected: {str(e)}")
+            finally:
+                await pubsub.aclose()
+            await asyncio.sleep(LISTENER_RETRY_DELAY)
+
+    def start(self):
+        """Start listening for change notifications."""
+        if self.channel is None:
+            return
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        """Stop the change listener."""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
@@ -78,6 +78,17 @@ class Settings(BaseSettings):
     IS_CONTAINER: bool = False
     CACHE_EXPIRATION: int = 300  # Default cache expiration in seconds
     TWILIO_WHATSAPP_FROM: str = ""  # WhatsApp number with country code (no +)
+    # Public URL of the WhatsApp Twilio status webhook; empty disables delivery receipts
+    TWILIO_STATUS_CALLBACK_URL: str = ""
+
+    # Notification email; empty SMTP_HOST disables the email channel
+    SMTP_HOST: str = ""
+    SMTP_PORT: int = 587
+    SMTP_USERNAME: str = ""
+    SMTP_PASSWORD: str = ""
+    SMTP_FROM_EMAIL: str = "notifications@enwhe.io"
+    SMTP_TLS: bool = True
+    SMTP_POOL_SIZE: int = 4  # persistent connections per worker
 
     # CORS
     BACKEND_CORS_ORIGINS: list[str] = [
@@ -107,6 +118,9 @@ class Settings(BaseSettings):
     SENDY_API_URL: str = "https://api.sendyit.com/v1"
     SENDY_VENDOR_TYPE: str = "express"  # Options: express, motorcycle, pickup
 
+    # Postal code centroid dataset for shipping quotes (defaults to the bundled seed file)
+    POSTAL_CENTROIDS_PATH: str = ""
+
     # New fields
     ASSET_UPLOAD_DIR: str = "/tmp/storefront_assets"
     MAX_UPLOAD_SIZE_MB: int = 10
@@ -116,6 +130,27 @@ class Settings(BaseSettings):
     REDIS_MAX_CONNECTIONS: int = 10
     REDIS_SOCKET_TIMEOUT: int = 5
 
+    # Cache codec; empty means the fastest installed serializer/compressor
+    CACHE_SERIALIZER: str = ""
+    CACHE_COMPRESSION: str = ""
+    CACHE_COMPRESSION_THRESHOLD: int = 1024  # bytes; 0 disables compression
+
+    # HTTP response compression; encodings in preference order, uninstalled ones are skipped
+    RESPONSE_COMPRESSION_ENCODINGS: str = "br,zstd,gzip"
+    RESPONSE_COMPRESSION_MIN_SIZE: int = 1000  # bytes; smaller whole responses go out as-is
+
+    # HTTP request metrics; buckets are comma-separated seconds, empty keeps the defaults
+    HTTP_REQUEST_DURATION_BUCKETS: str = ""
+    METRICS_MAX_SERIES_PER_METRIC: int = 2000  # further label sets are recorded as "overflow"
+    METRICS_TOP_TENANTS: int = 50  # tenants tracked in the per-tenant latency sketch
+
+    # Audit log storage; monthly partitions older than the retention are archived here
+    AUDIT_LOG_RETENTION_MONTHS: int = 12
+    AUDIT_ARCHIVE_DIR: str = "/tmp/audit_archive"
+
+    # Background export files; must be a directory shared by every API worker
+    EXPORT_DIR: str = "/tmp/exports"
+
     model_config = SettingsConfigDict(
         env_file=[
             "backend/.env.test",
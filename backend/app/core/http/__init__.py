@@ -1,3 +1,5 @@
+from app.core.http.compression import CompressionStage, negotiate_encoding
+from app.core.http.outbound import OutboundHTTPClient, outbound_http
 from app.core.http.response_optimization import (
     conditional_response,
     generate_etag,
@@ -7,6 +9,10 @@ from app.core.http.response_optimization import (
 )
 
 __all__ = [
+    "CompressionStage",
+    "negotiate_encoding",
+    "OutboundHTTPClient",
+    "outbound_http",
     "generate_etag",
     "set_cache_headers",
     "handle_conditional_request",
@@ -0,0 +1,383 @@
+"""
+HTTP response compression.
+
+Provides:
+- Accept-Encoding negotiation over br, zstd and gzip (br and zstd only when
+  their packages are installed)
+- Incremental compressors, so streamed responses are compressed chunk by
+  chunk and each chunk is flushed to the client as it is produced
+- CompressionStage: the middleware pipeline stage compressing responses
+- compress_variants: every negotiable encoding of a body at once, for
+  responses cached precompressed by cached_response
+- Metrics for bytes saved and the CPU time spent compressing
+
+Responses that already carry a Content-Encoding, that are already
+compressed media (images, archives, fonts, video) or that are too small to
+benefit are sent as they are.
+"""
+
+import logging
+import time
+import zlib
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from prometheus_client import Counter, Histogram
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import Message, Send
+
+from app.core.config.settings import get_settings
+from app.core.middleware.pipeline import PipelineStage, RequestContext
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+ENCODING_BROTLI = "br"
+ENCODING_ZSTD = "zstd"
+ENCODING_GZIP = "gzip"
+IDENTITY = "identity"
+
+# Levels for compressing while a request waits, and for cached variants that
+# are compressed once and served many times
+LIVE_LEVELS = {ENCODING_BROTLI: 4, ENCODING_ZSTD: 3, ENCODING_GZIP: 6}
+PRECOMPRESSED_LEVELS = {ENCODING_BROTLI: 9, ENCODING_ZSTD: 12, ENCODING_GZIP: 9}
+
+# Content types that are already compressed or must not be delayed
+SKIPPED_TYPE_PREFIXES = ("image/", "video/", "audio/", "font/")
+SKIPPED_TYPES = frozenset({
+    "application/gzip",
+    "application/x-gzip",
+    "application/zip",
+    "application/zstd",
+    "application/x-bzip2",
+    "application/x-7z-compressed",
+    "application/x-rar-compressed",
+    "application/vnd.rar",
+    "application/pdf",
+    "application/octet-stream",
+    "application/font-woff",
+    "text/event-stream",
+})
+# Image types that are text and compress well
+COMPRESSIBLE_IMAGE_TYPES = frozenset({"image/svg+xml", "image/x-icon", "image/bmp"})
+
+response_compression_bytes = Counter(
+    "http_response_compression_bytes_total",
+    "Response bytes before and after compression",
+    ["encoding", "stage", "source"],  # stage: input, output; source: live, precompressed
+)
+response_compression_cpu = Histogram(
+    "http_response_compression_cpu_seconds",
+    "CPU time spent compressing one response",
+    ["encoding", "source"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+response_compression_skipped = Counter(
+    "http_response_compression_skipped_total",
+    "Responses sent uncompressed to clients accepting compression",
+    ["reason"],  # reason: encoded, content_type, status, small
+)
+
+
+class StreamCompressor:
+    """Incremental compressor for one response body."""
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk and flush it, so the client can decode it now."""
+        raise NotImplementedError
+
+    def finish(self, data: bytes = b"") -> bytes:
+        """Compress the last chunk and end the stream."""
+        raise NotImplementedError
+
+
+class GzipCompressor(StreamCompressor):
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor(StreamCompressor):
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.process(data) + self._compressor.finish()
+
+
+class ZstdCompressor(StreamCompressor):
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+COMPRESSORS: Dict[str, Callable[[int], StreamCompressor]] = {ENCODING_GZIP: GzipCompressor}
+if brotli is not None:
+    COMPRESSORS[ENCODING_BROTLI] = BrotliCompressor
+if zstandard is not None:
+    COMPRESSORS[ENCODING_ZSTD] = ZstdCompressor
+
+
+def available_encodings(preferred: Iterable[str]) -> Tuple[str, ...]:
+    """The preferred encodings that are installed, in preference order."""
+    encodings = []
+    for encoding in preferred:
+        encoding = encoding.strip().lower()
+        if encoding in COMPRESSORS and encoding not in encodings:
+            encodings.append(encoding)
+        elif encoding:
+            logger.debug(f"Response compression {encoding!r} is not available")
+    return tuple(encodings)
+
+
+def negotiate_encoding(accept_encoding: Optional[str], encodings: Iterable[str]) -> Optional[str]:
+    """
+    Pick the response encoding for an Accept-Encoding header.
+
+    The client's q-values decide; ties go to the server's preference order.
+
+    Args:
+        accept_encoding: The request's Accept-Encoding header
+        encodings: Encodings the server offers, most preferred first
+
+    Returns:
+        The encoding to use, or None to send the body uncompressed
+    """
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.partition(";")
+        name = name.strip()
+        if not name:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name] = weight
+    wildcard = weights.get("*", 0.0)
+
+    best, best_weight = None, 0.0
+    for encoding in encodings:
+        weight = weights.get(encoding, wildcard)
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def is_compressible_type(content_type: str) -> bool:
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    if media_type in COMPRESSIBLE_IMAGE_TYPES:
+        return True
+    if media_type in SKIPPED_TYPES or media_type.startswith(SKIPPED_TYPE_PREFIXES):
+        return False
+    return not media_type.endswith(("+zip", "+gzip"))
+
+
+def compress_body(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    """Compress a whole body in one call."""
+    return COMPRESSORS[encoding](level if level is not None else LIVE_LEVELS[encoding]).finish(data)
+
+
+def compress_variants(data: bytes, encodings: Iterable[str]) -> Dict[str, bytes]:
+    """
+    Compress a body once per encoding, at the higher precompression levels.
+
+    Variants that come out no smaller than the body are left out.
+
+    Returns:
+        Encoding to compressed body
+    """
+    variants = {}
+    for encoding in encodings:
+        started = time.thread_time()
+        compressed = compress_body(data, encoding, PRECOMPRESSED_LEVELS[encoding])
+        response_compression_cpu.labels(encoding, "precompressed").observe(time.thread_time() - started)
+        if len(compressed) < len(data):
+            variants[encoding] = compressed
+    return variants
+
+
+def record_precompressed_hit(encoding: str, identity_size: int, sent_size: int) -> None:
+    """Count the bytes a cached precompressed response saved."""
+    response_compression_bytes.labels(encoding, "input", "precompressed").inc(identity_size)
+    response_compression_bytes.labels(encoding, "output", "precompressed").inc(sent_size)
+
+
+def _weaken_etag(headers: MutableHeaders) -> None:
+    # A compressed body is a different representation of the same resource
+    etag = headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        headers["etag"] = f"W/{etag}"
+
+
+def _add_vary(headers: MutableHeaders) -> None:
+    vary = headers.get("vary")
+    if not vary:
+        headers["vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        headers["vary"] = f"{vary}, Accept-Encoding"
+
+
+class _CompressingSend:
+    """Send channel compressing one response, created per request."""
+
+    def __init__(self, send: Send, encoding: str, level: int, minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.level = level
+        self.minimum_size = minimum_size
+        self.start: Optional[Message] = None
+        self.compressor: Optional[StreamCompressor] = None
+        self.passthrough = False
+        self.input_size = 0
+        self.output_size = 0
+        self.cpu = 0.0
+
+    async def __call__(self, message: Message) -> None:
+        if self.passthrough:
+            await self.send(message)
+            return
+        if message["type"] == "http.response.start":
+            reason = self._skip_reason(message)
+            if reason:
+                response_compression_skipped.labels(reason).inc()
+                self.passthrough = True
+                await self.send(message)
+            else:
+                # Held until the first body chunk shows whether it streams
+                self.start = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is None:
+            if not more_body and len(body) < self.minimum_size:
+                response_compression_skipped.labels("small").inc()
+                self.passthrough = True
+                await self.send(self.start)
+                await self.send(message)
+                return
+            await self._begin(streaming=more_body)
+
+        started = time.thread_time()
+        if more_body:
+            compressed = self.compressor.compress(body) if body else b""
+        else:
+            compressed = self.compressor.finish(body)
+        self.cpu += time.thread_time() - started
+        self.input_size += len(body)
+        self.output_size += len(compressed)
+
+        if not more_body:
+            if self.start is not None:
+                # Whole body in one message: the length is known now
+                MutableHeaders(scope=self.start)["content-length"] = str(len(compressed))
+                await self.send(self.start)
+                self.start = None
+            self._record()
+            await self.send({"type": "http.response.body", "body": compressed, "more_body": False})
+        elif compressed:
+            await self.send({"type": "http.response.body", "body": compressed, "more_body": True})
+
+    def _skip_reason(self, message: Message) -> Optional[str]:
+        status = message["status"]
+        if status < 200 or status in (204, 206, 304):
+            return "status"
+        headers = Headers(raw=message.get("headers", []))
+        if "content-encoding" in headers:
+            return "encoded"
+        if not is_compressible_type(headers.get("content-type", "")):
+            return "content_type"
+        return None
+
+    async def _begin(self, streaming: bool) -> None:
+        self.compressor = COMPRESSORS[self.encoding](self.level)
+        headers = MutableHeaders(scope=self.start)
+        headers["content-encoding"] = self.encoding
+        _add_vary(headers)
+        _weaken_etag(headers)
+        if "content-length" in headers:
+            del headers["content-length"]
+        if streaming:
+            # The compressed length is unknown; send the headers now
+            await self.send(self.start)
+            self.start = None
+
+    def _record(self) -> None:
+        response_compression_bytes.labels(self.encoding, "input", "live").inc(self.input_size)
+        response_compression_bytes.labels(self.encoding, "output", "live").inc(self.output_size)
+        response_compression_cpu.labels(self.encoding, "live").observe(self.cpu)
+
+
+class CompressionStage(PipelineStage):
+    """
+    Compress responses for clients that accept br, zstd or gzip.
+
+    Whole bodies smaller than minimum_size are sent as they are; streamed
+    bodies are always compressed, chunk by chunk.
+    """
+
+    def __init__(
+        self,
+        encodings: Optional[Iterable[str]] = None,
+        minimum_size: Optional[int] = None,
+        levels: Optional[Dict[str, int]] = None,
+    ):
+        settings = get_settings()
+        if encodings is None:
+            encodings = settings.RESPONSE_COMPRESSION_ENCODINGS.split(",")
+        if minimum_size is None:
+            minimum_size = settings.RESPONSE_COMPRESSION_MIN_SIZE
+        self.encodings = available_encodings(encodings)
+        self.minimum_size = minimum_size
+        self.levels = {**LIVE_LEVELS, **(levels or {})}
+
+    def wrap_send(self, ctx: RequestContext, send: Send) -> Send:
+        if ctx.method == "HEAD":
+            return send
+        encoding = negotiate_encoding(ctx.headers.get("accept-encoding"), self.encodings)
+        if encoding is None:
+            return send
+        return _CompressingSend(send, encoding, self.levels[encoding], self.minimum_size)
+
+
+def encoding_for(accept_encoding: Optional[str], stored: Iterable[str]) -> str:
+    """Pick a stored variant for a request, falling back to identity."""
+    return negotiate_encoding(accept_encoding, list(stored)) or IDENTITY
+
+
+def configured_encodings() -> Tuple[str, ...]:
+    return available_encodings(get_settings().RESPONSE_COMPRESSION_ENCODINGS.split(","))
+
@@ -0,0 +1,270 @@
+"""
+Shared async outbound HTTP layer for carrier and payment provider calls.
+
+Provides:
+- One pooled ``httpx.AsyncClient`` per upstream host with keep-alive
+- Per-call deadlines covering connect, send, hedges and body read
+- Hedged requests for idempotent calls (quotes, tracking, verification)
+- Circuit breakers shared with ``core/resilience/retry_manager.py``
+- Per-provider latency histograms
+
+Circuit breakers count transport errors, timeouts and 5xx responses as
+failures. 4xx responses are returned to the caller and do not trip the
+breaker, since they indicate a bad request rather than an unhealthy host.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from prometheus_client import Counter, Histogram
+
+from app.core.resilience.retry_manager import (
+    CircuitBreakerConfig,
+    CircuitOpenError,
+    MerchantRetryManager,
+    retry_manager,
+)
+
+logger = logging.getLogger(__name__)
+
+outbound_request_duration = Histogram(
+    "outbound_http_request_duration_seconds",
+    "Latency of outbound provider HTTP calls in seconds",
+    ["provider", "method", "outcome"],
+    buckets=(0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.5, 5.0, 10.0, 30.0),
+)
+outbound_hedges = Counter(
+    "outbound_http_hedged_requests_total",
+    "Hedge requests issued for slow idempotent outbound calls",
+    ["provider"],
+)
+outbound_short_circuits = Counter(
+    "outbound_http_short_circuited_total",
+    "Outbound calls rejected because the provider circuit was open",
+    ["provider"],
+)
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Hedge after the provider's recent p95 latency, within these bounds
+MIN_HEDGE_DELAY = 0.05
+MAX_HEDGE_DELAY = 2.0
+DEFAULT_HEDGE_DELAY = 0.5
+LATENCY_WINDOW = 200
+
+
+# Failures raised before a request reached the upstream; retrying them can't
+# duplicate a non-idempotent call. Read and write timeouts can.
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout, CircuitOpenError)
+
+
+def request_not_sent(error: BaseException) -> bool:
+    """Whether a failed call certainly never reached the upstream."""
+    return isinstance(error, UNSENT_ERRORS)
+
+
+class UpstreamServerError(httpx.HTTPStatusError):
+    """Raised internally when an upstream answers 5xx, so it counts as a failure."""
+
+
+class OutboundHTTPClient:
+    """
+    Pooled async HTTP client shared by all outbound integrations.
+
+    Each call names a ``provider`` (e.g. "sendy", "paystack"); breakers are
+    registered with the shared retry manager as ``http:<provider>`` so their
+    state shows up in ``retry_manager.get_circuit_status()``.
+    """
+
+    def __init__(
+        self,
+        default_timeout: float = 10.0,
+        max_connections_per_host: int = 50,
+        max_keepalive_per_host: int = 20,
+        keepalive_expiry: float = 30.0,
+        circuit_config: Optional[CircuitBreakerConfig] = None,
+        breakers: MerchantRetryManager = retry_manager,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.default_timeout = default_timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections_per_host,
+            max_keepalive_connections=max_keepalive_per_host,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.circuit_config = circuit_config or CircuitBreakerConfig(
+            failure_threshold=5, success_threshold=2, timeout=30.0
+        )
+        self.breakers = breakers
+        self._transport = transport
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._latencies: Dict[str, Deque[float]] = {}
+
+    def _client_for(self, url: str) -> httpx.AsyncClient:
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        client = self._clients.get(origin)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                limits=self.limits,
+                timeout=self.default_timeout,
+                transport=self._transport,
+            )
+            self._clients[origin] = client
+        return client
+
+    def _breaker_name(self, provider: str) -> str:
+        return f"http:{provider}"
+
+    def _observe(self, provider: str, method: str, outcome: str, elapsed: float) -> None:
+        outbound_request_duration.labels(provider, method, outcome).observe(elapsed)
+        if outcome == "ok":
+            window = self._latencies.setdefault(provider, deque(maxlen=LATENCY_WINDOW))
+            window.append(elapsed)
+
+    def hedge_delay(self, provider: str) -> float:
+        """Return the hedge delay for a provider: its recent p95 latency, bounded."""
+        window = self._latencies.get(provider)
+        if not window or len(window) < 20:
+            return DEFAULT_HEDGE_DELAY
+        ordered = sorted(window)
+        p95 = ordered[int(len(ordered) * 0.95) - 1]
+        return min(max(p95, MIN_HEDGE_DELAY), MAX_HEDGE_DELAY)
+
+    def is_available(self, provider: str) -> bool:
+        """True unless the provider's circuit is open."""
+        name = self._breaker_name(provider)
+        self.breakers.ensure_circuit_breaker(name, self.circuit_config)
+        return self.breakers.allow_call(name)
+
+    async def _send_once(self, provider: str, method: str, url: str, timeout: float, **kwargs: Any) -> httpx.Response:
+        client = self._client_for(url)
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, timeout=timeout, **kwargs)
+        except httpx.TimeoutException:
+            self._observe(provider, method, "timeout", time.perf_counter() - started)
+            raise
+        except httpx.TransportError:
+            self._observe(provider, method, "error", time.perf_counter() - started)
+            raise
+
+        elapsed = time.perf_counter() - started
+        if response.status_code >= 500:
+            self._observe(provider, method, "server_error", elapsed)
+            raise UpstreamServerError(
+                f"{provider} returned HTTP {response.status_code}",
+                request=response.request,
+                response=response,
+            )
+        self._observe(provider, method, "ok", elapsed)
+        return response
+
+    async def _hedged(self, provider: str, send: Callable[[], Awaitable[httpx.Response]], delay: float) -> httpx.Response:
+        """Run ``send``; if it is still pending after ``delay``, race a second copy."""
+        primary = asyncio.ensure_future(send())
+        pending = {primary}
+        last_error: Optional[BaseException] = None
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done:
+                pending = set()
+                return primary.result()
+
+            outbound_hedges.labels(provider).inc()
+            pending.add(asyncio.ensure_future(send()))
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def request(
+        self,
+        provider: str,
+        method: str,
+        url: str,
+        *,
+        timeout: Optional[float] = None,
+        idempotent: Optional[bool] = None,
+        hedge: bool = True,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """
+        Send a request through the provider's pool and circuit breaker.
+
+        Args:
+            provider: Logical upstream name used for breakers and metrics
+            method: HTTP method
+            url: Absolute URL
+            timeout: Overall deadline in seconds for the call, hedges included
+            idempotent: Whether the call may be duplicated; defaults to True for
+                GET/HEAD/OPTIONS. Only idempotent calls are hedged.
+            hedge: Set False to disable hedging for an idempotent call
+            **kwargs: Passed through to ``httpx.AsyncClient.request``
+
+        Returns:
+            The upstream response. 5xx responses are returned like any other
+            status (after hedging), but count as failures for the breaker.
+
+        Raises:
+            CircuitOpenError: If the provider's circuit is open
+            httpx.HTTPError: On transport errors and timeouts
+        """
+        method = method.upper()
+        deadline = timeout or self.default_timeout
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+
+        breaker = self._breaker_name(provider)
+        if not self.is_available(provider):
+            outbound_short_circuits.labels(provider).inc()
+            raise CircuitOpenError(f"Circuit breaker open for {breaker}")
+
+        async def send() -> httpx.Response:
+            return await self._send_once(provider, method, url, deadline, **kwargs)
+
+        try:
+            if idempotent and hedge:
+                call = self._hedged(provider, send, min(self.hedge_delay(provider), deadline / 2))
+            else:
+                call = send()
+            response = await asyncio.wait_for(call, timeout=deadline)
+        except UpstreamServerError as e:
+            self.breakers.record_call_failure(breaker, e, f"{method} {url}")
+            return e.response
+        except (httpx.HTTPError, asyncio.TimeoutError) as e:
+            self.breakers.record_call_failure(breaker, e, f"{method} {url}")
+            if isinstance(e, asyncio.TimeoutError):
+                raise httpx.TimeoutException(f"{provider} call exceeded {deadline}s deadline") from e
+            raise
+
+        self.breakers.record_call_success(breaker)
+        return response
+
+    async def get(self, provider: str, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request(provider, "GET", url, **kwargs)
+
+    async def post(self, provider: str, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request(provider, "POST", url, **kwargs)
+
+    async def aclose(self) -> None:
+        """Close every pooled connection (call on application shutdown)."""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
+
+
+# Global shared client
+outbound_http = OutboundHTTPClient()
@@ -6,37 +6,31 @@ from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 
 from app.core.behavior.behavior_analysis import behavior_analysis_service
+from app.core.middleware.pipeline import PipelineStage, RequestContext
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_SKIP_PATHS = {
+    "/docs",
+    "/redoc",
+    "/openapi.json",
+    "/health",
+    "/metrics",
+}
+
 
 class ActivityTrackerMiddleware(BaseHTTPMiddleware):
     def __init__(self, app, skip_paths: set = None):
         super().__init__(app)
-        self.skip_paths = skip_paths or {
-            "/docs",
-            "/redoc",
-            "/openapi.json",
-            "/health",
-            "/metrics",
-        }
+        self.skip_paths = skip_paths or set(DEFAULT_SKIP_PATHS)
 
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
         # Skip tracking for certain paths
         if request.url.path in self.skip_paths:
             return await call_next(request)
-            
-        # Check if we're in test mode
-        is_test = False
-        try:
-            from app.core.config.settings import get_settings
-            settings = get_settings()
-            is_test = getattr(settings, "TESTING", False) or request.headers.get("X-Test") == "true"
-        except Exception:
-            pass
-            
+
         # Skip activity tracking in test mode to avoid DB schema visibility issues
-        if is_test:
+        if _is_test_request(request):
             return await call_next(request)
 
         # Get tenant and user info
@@ -71,49 +65,15 @@ class ActivityTrackerMiddleware(BaseHTTPMiddleware):
         self, request: Request, response: Response, duration: float
     ) -> Dict[str, Any]:
         """Collect activity data from request and response"""
-        try:
-            # Get request body if available
-            body = None
-            if request.method in ["POST", "PUT", "PATCH"]:
-                try:
-                    body = await request.json()
-                except (ValueError, TypeError, UnicodeDecodeError):
-                    pass
-
-            # Get query parameters
-            query_params = dict(request.query_params)
-
-            # Get response status
-            status_code = response.status_code
-
-            # Collect headers
-            headers = dict(request.headers)
-            # Remove sensitive headers
-            sensitive_headers = {"authorization", "cookie", "x-api-key", "x-secret-key"}
-            for header in sensitive_headers:
-                headers.pop(header, None)
-
-            return {
-                "type": "api_request",
-                "method": request.method,
-                "path": request.url.path,
-                "query_params": query_params,
-                "body": body,
-                "headers": headers,
-                "status_code": status_code,
-                "duration": duration,
-                "timestamp": time.time(),
-            }
+        # Get request body if available
+        body = None
+        if request.method in ["POST", "PUT", "PATCH"]:
+            try:
+                body = await request.json()
+            except (ValueError, TypeError, UnicodeDecodeError):
+                pass
 
-        except Exception as e:
-            logger.error(f"Error collecting activity data: {str(e)}")
-            return {
-                "type": "api_request",
-                "method": request.method,
-                "path": request.url.path,
-                "error": str(e),
-                "timestamp": time.time(),
-            }
+        return build_activity_data(request, body, response.status_code, duration)
 
     async def _analyze_behavior(
         self,
@@ -137,3 +97,93 @@ class ActivityTrackerMiddleware(BaseHTTPMiddleware):
 
         except Exception as e:
             logger.error(f"Error analyzing behavior: {str(e)}")
+
+
+class ActivityTrackerStage(PipelineStage):
+    """
+    Activity tracking as a middleware pipeline stage.
+
+    Runs after the response has been sent, so behavior analysis never delays
+    the client. The request body is captured by the pipeline while the
+    endpoint reads it instead of being read a second time here.
+    """
+
+    needs_body = True
+
+    def __init__(self, skip_paths: set = None):
+        self.skip_paths = frozenset(skip_paths or DEFAULT_SKIP_PATHS)
+
+    def applies_to(self, path: str) -> bool:
+        return path not in self.skip_paths
+
+    async def on_complete(self, ctx: RequestContext) -> None:
+        if ctx.error is not None or ctx.status_code is None:
+            return
+        request = ctx.request
+        tenant_id = request.headers.get("X-Tenant-ID")
+        if not tenant_id or _is_test_request(request):
+            return
+
+        # Behavior analysis needs the request's database session
+        db = getattr(request.state, "db", None)
+        if db is None:
+            logger.debug(f"No request database session; skipping activity tracking for {ctx.path}")
+            return
+
+        activity_data = build_activity_data(request, ctx.json(), ctx.status_code, ctx.elapsed)
+        try:
+            await behavior_analysis_service.analyze_behavior(
+                db=db,
+                tenant_id=tenant_id,
+                user_id=getattr(request.state, "user_id", None),
+                activity_data=activity_data,
+            )
+        except Exception as e:
+            logger.error(f"Error analyzing behavior: {str(e)}")
+
+
+def _is_test_request(request: Request) -> bool:
+    try:
+        from app.core.config.settings import get_settings
+        settings = get_settings()
+        return bool(getattr(settings, "TESTING", False) or request.headers.get("X-Test") == "true")
+    except Exception:
+        return False
+
+
+def build_activity_data(
+    request: Request, body: Any, status_code: int, duration: float
+) -> Dict[str, Any]:
+    """Activity record for one API request, without sensitive headers."""
+    try:
+        # Get query parameters
+        query_params = dict(request.query_params)
+
+        # Collect headers
+        headers = dict(request.headers)
+        # Remove sensitive headers
+        sensitive_headers = {"authorization", "cookie", "x-api-key", "x-secret-key"}
+        for header in sensitive_headers:
+            headers.pop(header, None)
+
+        return {
+            "type": "api_request",
+            "method": request.method,
+            "path": request.url.path,
+            "query_params": query_params,
+            "body": body,
+            "headers": headers,
+            "status_code": status_code,
+            "duration": duration,
+            "timestamp": time.time(),
+        }
+
+    except Exception as e:
+        logger.error(f"Error collecting activity data: {str(e)}")
+        return {
+            "type": "api_request",
+            "method": request.method,
+            "path": request.url.path,
+            "error": str(e),
+            "timestamp": time.time(),
+        }
@@ -7,14 +7,16 @@ This middleware provides different CORS configurations based on the requesting d
 """
 
 import os
-from typing import List, Set
+from typing import List, Optional, Set
 from fastapi import Request
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.datastructures import MutableHeaders
 from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
 from starlette.responses import Response
 
 from app.core.logging import logger
 from app.core.config.settings import get_settings
+from app.core.middleware.pipeline import PipelineStage, RequestContext
 
 # Check if we're in test mode
 TESTING = str(os.environ.get("TESTING", "false")
@@ -195,7 +197,7 @@ class DomainSpecificCORSMiddleware(BaseHTTPMiddleware):
         response = await call_next(request)
 
         # Add CORS headers to the response
-        self._add_cors_headers(response, request, cors_config)
+        self._add_cors_headers(response.headers, request, cors_config)
 
         # Log CORS policy application for security monitoring
         self._log_cors_application(request, cors_config, host, origin)
@@ -283,12 +285,12 @@ class DomainSpecificCORSMiddleware(BaseHTTPMiddleware):
 
         return response
 
-    def _add_cors_headers(self, response: Response, request: Request, cors_config: dict):
+    def _add_cors_headers(self, headers: MutableHeaders, request: Request, cors_config: dict):
         """
         Add CORS headers to the response.
 
         Args:
-            response: The response to add headers to
+            headers: The response headers to add to
             request: The original request
             cors_config: CORS configuration to apply
         """
@@ -296,13 +298,13 @@ class DomainSpecificCORSMiddleware(BaseHTTPMiddleware):
 
         # Check if origin is allowed
         if self._is_origin_allowed(origin, cors_config["allow_origins"]):
-            response.headers["Access-Control-Allow-Origin"] = origin or "*"
+            headers["Access-Control-Allow-Origin"] = origin or "*"
 
             if cors_config["allow_credentials"]:
-                response.headers["Access-Control-Allow-Credentials"] = "true"
+                headers["Access-Control-Allow-Credentials"] = "true"
 
             if cors_config["expose_headers"]:
-                response.headers["Access-Control-Expose-Headers"] = ", ".join(
+                headers["Access-Control-Expose-Headers"] = ", ".join(
                     cors_config["expose_headers"])
         else:
             # Log unauthorized origin attempt
@@ -371,6 +373,30 @@ class DomainSpecificCORSMiddleware(BaseHTTPMiddleware):
             logger.error(f"Error logging CORS application: {str(e)}")
 
 
+class DomainSpecificCORSStage(PipelineStage):
+    """Domain-specific CORS policies as a middleware pipeline stage."""
+
+    def __init__(self):
+        self.policy = DomainSpecificCORSMiddleware(None)
+
+    async def on_request(self, ctx: RequestContext) -> Optional[Response]:
+        host = ctx.host
+        origin = ctx.headers.get("origin", "")
+        cors_config = self.policy._get_cors_config_for_domain(host, origin)
+
+        # Handle preflight requests
+        if ctx.method == "OPTIONS":
+            return self.policy._handle_preflight(ctx.request, cors_config)
+
+        ctx.data["cors_config"] = cors_config
+        return None
+
+    def on_response_start(self, ctx: RequestContext, headers: MutableHeaders) -> None:
+        cors_config = ctx.data["cors_config"]
+        self.policy._add_cors_headers(headers, ctx.request, cors_config)
+        self.policy._log_cors_application(ctx.request, cors_config, ctx.host, ctx.headers.get("origin", ""))
+
+
 def get_domain_specific_cors_middleware():
     """
     Factory function to create the domain-specific CORS middleware.
@@ -0,0 +1,277 @@
+"""
+Composed pure-ASGI middleware pipeline.
+
+The application used to stack a dozen BaseHTTPMiddleware subclasses; every
+layer wrapped the request in its own task and response stream. The pipeline
+replaces the stack with a single ASGI layer that runs lightweight stages:
+
+- Which stages apply is decided once per request from their path prefixes.
+- Stages share one RequestContext, so headers are parsed once and the
+  request body (when a stage asks for it) is captured while the endpoint
+  reads it, not read a second time.
+- Header hooks only see the http.response.start message, so streaming
+  bodies pass through untouched. Stages that must rewrite the body
+  (compression) wrap the send channel instead, and only for requests they
+  apply to.
+
+Stage order follows the old stack: the first stage is the outermost. A
+stage that answers a request itself (on_request returns a response) skips
+the stages and endpoint inside it, and its response goes through the
+start hooks of the stages outside it, exactly like a short-circuiting
+BaseHTTPMiddleware.
+
+Provides:
+- RequestContext: per-request state shared by stages
+- PipelineStage: base class for stages
+- MiddlewarePipeline: the ASGI middleware running the stages
+"""
+
+import json
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Request bodies captured for stages are capped; larger bodies are not kept
+MAX_CAPTURED_BODY = 64 * 1024
+
+BODY_METHODS = frozenset({"POST", "PUT", "PATCH"})
+
+
+class RequestContext:
+    """Per-request state shared by all pipeline stages."""
+
+    __slots__ = (
+        "scope", "method", "path", "started", "status_code", "error",
+        "body", "data", "_body_parts", "_body_size", "_request", "_client_ip", "_json",
+    )
+
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self.method: str = scope["method"]
+        self.path: str = scope["path"]
+        self.started = time.perf_counter()
+        self.status_code: Optional[int] = None
+        self.error: Optional[BaseException] = None
+        # Raw request body, set once fully received and only if captured
+        self.body: Optional[bytes] = None
+        # Per-request values stages hand from on_request to later hooks
+        self.data: Dict[str, Any] = {}
+        self._body_parts: Optional[List[bytes]] = None
+        self._body_size = 0
+        self._request: Optional[Request] = None
+        self._client_ip: Optional[str] = None
+        self._json: Any = None
+
+    @property
+    def request(self) -> Request:
+        """Starlette request over the shared scope; headers are parsed once."""
+        if self._request is None:
+            self._request = Request(self.scope)
+        return self._request
+
+    @property
+    def headers(self):
+        return self.request.headers
+
+    @property
+    def state(self):
+        return self.request.state
+
+    @property
+    def host(self) -> str:
+        return self.headers.get("host", "")
+
+    @property
+    def client_ip(self) -> str:
+        """Client IP, preferring X-Forwarded-For and X-Real-IP."""
+        if self._client_ip is None:
+            headers = self.headers
+            forwarded_for = headers.get("x-forwarded-for")
+            if forwarded_for:
+                self._client_ip = forwarded_for.split(",")[0].strip()
+            else:
+                client = self.scope.get("client")
+                self._client_ip = headers.get("x-real-ip") or (client[0] if client else "unknown")
+        return self._client_ip
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def json(self) -> Any:
+        """Captured body parsed as JSON, or None. Parsed at most once."""
+        if self._json is None and self.body:
+            try:
+                self._json = json.loads(self.body)
+            except (ValueError, UnicodeDecodeError):
+                self._json = False
+        return self._json or None
+
+    def _capture(self, message: Message) -> None:
+        if self._body_parts is None:
+            return
+        chunk = message.get("body", b"")
+        self._body_size += len(chunk)
+        if self._body_size > MAX_CAPTURED_BODY:
+            self._body_parts = None
+            return
+        self._body_parts.append(chunk)
+        if not message.get("more_body", False):
+            self.body = b"".join(self._body_parts)
+            self._body_parts = None
+
+
+class PipelineStage:
+    """
+    One step of the middleware pipeline.
+
+    Subclasses override only the hooks they need; the pipeline skips hooks
+    that are not overridden.
+
+    Attributes:
+        include_prefixes: If set, the stage only runs for these path prefixes
+        exclude_prefixes: Path prefixes the stage never runs for
+        needs_body: Capture the request body into RequestContext.body
+    """
+
+    include_prefixes: Tuple[str, ...] = ()
+    exclude_prefixes: Tuple[str, ...] = ()
+    needs_body: bool = False
+
+    def applies_to(self, path: str) -> bool:
+        if self.include_prefixes and not path.startswith(self.include_prefixes):
+            return False
+        return not (self.exclude_prefixes and path.startswith(self.exclude_prefixes))
+
+    async def on_request(self, ctx: RequestContext) -> Optional[Response]:
+        """Inspect the request; return a response to answer it here."""
+        return None
+
+    def on_response_start(self, ctx: RequestContext, headers: MutableHeaders) -> None:
+        """Adjust the status line headers before they are sent."""
+
+    def wrap_send(self, ctx: RequestContext, send: Send) -> Send:
+        """
+        Return the send channel for the stages inside this one.
+
+        Override to rewrite response messages. Header hooks of this stage
+        and the stages outside it see the messages this wrapper emits.
+        """
+        return send
+
+    async def on_complete(self, ctx: RequestContext) -> None:
+        """Run after the response was sent or the request failed (ctx.error)."""
+
+
+def _overrides(stage: PipelineStage, hook: str) -> bool:
+    return getattr(type(stage), hook) is not getattr(PipelineStage, hook)
+
+
+def _header_layer(
+    ctx: RequestContext, hooks: List[PipelineStage], send: Send, record_status: bool
+) -> Send:
+    async def send_with_hooks(message: Message) -> None:
+        if message["type"] == "http.response.start":
+            if record_status:
+                ctx.status_code = message["status"]
+            if hooks:
+                headers = MutableHeaders(scope=message)
+                for stage in hooks:
+                    stage.on_response_start(ctx, headers)
+        await send(message)
+
+    return send_with_hooks
+
+
+class MiddlewarePipeline:
+    """
+    Single ASGI middleware running a sequence of PipelineStage objects.
+
+    Added with app.add_middleware(MiddlewarePipeline, stages=[...]).
+    Non-HTTP scopes (websocket, lifespan) pass straight through.
+    """
+
+    def __init__(self, app: ASGIApp, stages: Iterable[PipelineStage] = ()):
+        self.app = app
+        self.stages: Sequence[PipelineStage] = tuple(stages)
+        self._request_hooks = frozenset(
+            id(stage) for stage in self.stages if _overrides(stage, "on_request"))
+        self._start_hooks = frozenset(
+            id(stage) for stage in self.stages if _overrides(stage, "on_response_start"))
+        self._complete_hooks = frozenset(
+            id(stage) for stage in self.stages if _overrides(stage, "on_complete"))
+        self._send_wrappers = frozenset(
+            id(stage) for stage in self.stages if _overrides(stage, "wrap_send"))
+
+    def active_stages(self, path: str) -> List[PipelineStage]:
+        return [stage for stage in self.stages if stage.applies_to(path)]
+
+    def _response_channel(self, ctx: RequestContext, entered: List[PipelineStage], send: Send) -> Send:
+        """
+        Build the send channel handed to the endpoint.
+
+        Header hooks between two send wrappers are applied by one layer, inner
+        stages first, as in a middleware stack. The innermost layer records
+        the response status.
+        """
+        hooks: List[PipelineStage] = []
+        for stage in entered:
+            if id(stage) in self._start_hooks:
+                hooks.append(stage)
+            if id(stage) in self._send_wrappers:
+                if hooks:
+                    send = _header_layer(ctx, hooks[::-1], send, record_status=False)
+                    hooks = []
+                send = stage.wrap_send(ctx, send)
+        return _header_layer(ctx, hooks[::-1], send, record_status=True)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        ctx = RequestContext(scope)
+        active = self.active_stages(ctx.path)
+        entered: List[PipelineStage] = []
+
+        if ctx.method in BODY_METHODS and any(stage.needs_body for stage in active):
+            ctx._body_parts = []
+            downstream_receive = receive
+
+            async def receive() -> Message:
+                message = await downstream_receive()
+                if message["type"] == "http.request":
+                    ctx._capture(message)
+                return message
+
+        try:
+            response = None
+            for stage in active:
+                if id(stage) in self._request_hooks:
+                    response = await stage.on_request(ctx)
+                    if response is not None:
+                        break
+                entered.append(stage)
+
+            send_response = self._response_channel(ctx, entered, send)
+            if response is not None:
+                await response(scope, receive, send_response)
+            else:
+                await self.app(scope, receive, send_response)
+        except BaseException as exc:
+            ctx.error = exc
+            raise
+        finally:
+            for stage in reversed(entered):
+                if id(stage) in self._complete_hooks:
+                    try:
+                        await stage.on_complete(ctx)
+                    except Exception as e:
+                        logger.error(f"Middleware stage {type(stage).__name__} failed after response: {e}")
@@ -1,11 +1,12 @@
 import os
 import time
-from typing import Dict, List
+from typing import Dict, List, Optional
 from fastapi import Request
 from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
 from starlette.responses import Response
 
 from app.core.logging import logger
+from app.core.middleware.pipeline import PipelineStage, RequestContext
 
 # Helper: is test mode?
 IS_TEST_MODE = os.getenv("TESTING", "").lower() in (
@@ -27,10 +28,18 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
 
     async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
         """Main middleware dispatch method."""
+        rejection = self.check_request(request)
+        if rejection is not None:
+            return rejection
 
+        # Continue with the request
+        return await call_next(request)
+
+    def check_request(self, request: Request) -> Optional[Response]:
+        """Return a 429 response if the client is over its limit, else None."""
         # Skip rate limiting in test mode or for test clients
         if self._should_skip_rate_limit(request):
-            return await call_next(request)
+            return None
 
         # Get client IP
         client_ip = self._get_client_ip(request)
@@ -44,9 +53,7 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
                 media_type="text/plain",
                 headers={"Retry-After": "60"}
             )
-
-        # Continue with the request
-        return await call_next(request)
+        return None
 
     def _should_skip_rate_limit(self, request: Request) -> bool:
         """Check if rate limiting should be skipped for this request."""
@@ -121,3 +128,13 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             ]
             if not self.rate_limit_cache[ip]:
                 del self.rate_limit_cache[ip]
+
+
+class RateLimitStage(PipelineStage):
+    """Per-IP rate limiting as a middleware pipeline stage."""
+
+    def __init__(self, requests_per_minute: int = 60):
+        self.limiter = RateLimitMiddleware(None, requests_per_minute=requests_per_minute)
+
+    async def on_request(self, ctx: RequestContext) -> Optional[Response]:
+        return self.limiter.check_request(ctx.request)
@@ -19,6 +19,7 @@ from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoin
 from starlette.responses import Response
 
 from app.core.config.settings import get_settings
+from app.core.middleware.pipeline import PipelineStage, RequestContext
 from app.core.security.clerk_multi_org import clerk_service
 
 logger = logging.getLogger(__name__)
@@ -67,9 +68,23 @@ class SuperAdminSecurityMiddleware(BaseHTTPMiddleware):
         if not request.url.path.startswith(self.admin_path_prefix):
             return await call_next(request)
 
+        rejection = self.check_request(request)
+        if rejection is not None:
+            return rejection
+
+        # Continue with the request
+        return await call_next(request)
+
+    def check_request(self, request: Request) -> Optional[Response]:
+        """
+        Run the Super Admin checks for a request under the admin prefix.
+
+        Returns:
+            A 401/403 response if access is denied, otherwise None
+        """
         # Skip security checks in test mode
         if IS_TEST_MODE:
-            return await call_next(request)
+            return None
 
         # Validate domain access
         host = request.headers.get("host", "")
@@ -136,8 +151,7 @@ class SuperAdminSecurityMiddleware(BaseHTTPMiddleware):
                 media_type="text/plain"
             )
 
-        # Continue with the request
-        return await call_next(request)
+        return None
 
     def _is_domain_allowed(self, host: str) -> bool:
         """Check if the domain is in the allowed list."""
@@ -167,3 +181,14 @@ class SuperAdminSecurityMiddleware(BaseHTTPMiddleware):
             return request.client.host
 
         return "unknown"
+
+
+class SuperAdminSecurityStage(PipelineStage):
+    """Super Admin security checks as a middleware pipeline stage."""
+
+    def __init__(self, admin_path_prefix: str = "/api/admin", **options):
+        self.guard = SuperAdminSecurityMiddleware(None, admin_path_prefix=admin_path_prefix, **options)
+        self.include_prefixes = (admin_path_prefix,)
+
+    async def on_request(self, ctx: RequestContext) -> Optional[Response]:
+        return self.guard.check_request(ctx.request)
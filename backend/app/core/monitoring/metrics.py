@@ -19,6 +19,17 @@ from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 
 from app.core.config.settings import get_settings
+from app.core.middleware.pipeline import PipelineStage, RequestContext
+from app.core.monitoring.request_metrics import (
+    OVERFLOW_ROUTE,
+    UNKNOWN_TIER,
+    CardinalityGuard,
+    TenantLatencySketch,
+    method_label,
+    parse_buckets,
+    route_template,
+    tenant_labels,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -36,17 +47,21 @@ open_file_descriptors = Gauge(
     'system_open_file_descriptors', 'Number of open file descriptors')
 
 # Application metrics
+# "endpoint" is the matched route template, never the raw path; per-tenant
+# latency is kept out of labels (see request_metrics)
+DEFAULT_REQUEST_DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075,
+                                    0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0)
 http_request_total = Counter(
     'http_request_total',
     'Total HTTP requests',
-    ['method', 'endpoint', 'status_code']
+    ['method', 'endpoint', 'status_code', 'tenant_tier']
 )
 http_request_duration = Histogram(
     'http_request_duration_seconds',
     'HTTP request latency in seconds',
-    ['method', 'endpoint'],
-    buckets=(0.005, 0.01, 0.025, 0.05, 0.075,
-             0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0)
+    ['method', 'endpoint', 'tenant_tier'],
+    buckets=parse_buckets(get_settings().HTTP_REQUEST_DURATION_BUCKETS,
+                          DEFAULT_REQUEST_DURATION_BUCKETS)
 )
 active_users = Gauge('app_active_users',
                      'Number of active users', ['tenant_id'])
@@ -109,6 +124,11 @@ class MetricsCollector:
             settings, 'ENABLE_METRICS_ENDPOINT', False)
         self.metrics_port = getattr(settings, 'METRICS_PORT', 9090)
         self._tenant_active_users: Dict[str, int] = {}
+        # Labelled children per request label set, capped against label explosions
+        self._request_series = CardinalityGuard(
+            'http_request_total', getattr(settings, 'METRICS_MAX_SERIES_PER_METRIC', 2000))
+        self._overflow_series: Dict[tuple, tuple] = {}
+        self.tenant_latency = TenantLatencySketch(getattr(settings, 'METRICS_TOP_TENANTS', 50))
 
     def start(self):
         """Start the metrics collection"""
@@ -195,29 +215,63 @@ class MetricsCollector:
 
     def track_request(self, request: Request, response: Response, duration: float):
         """Track HTTP request metrics"""
-        method = request.method
-        endpoint = request.url.path
-        status_code = response.status_code
-
-        # Increment request counter
-        http_request_total.labels(
-            method=method,
-            endpoint=endpoint,
-            status_code=status_code
-        ).inc()
-
-        # Record request duration
-        http_request_duration.labels(
-            method=method,
-            endpoint=endpoint
-        ).observe(duration)
-
-        # Track errors
-        if 400 <= status_code < 600:
-            error_rate.labels(
-                error_type=f"http_{status_code}",
-                endpoint=endpoint
-            ).inc()
+        tenant_id, tier = tenant_labels(request.state)
+        self.record_request(request.method, route_template(request.scope), response.status_code,
+                            duration, tenant_tier=tier, tenant_id=tenant_id)
+
+    def record_request(self, method: str, endpoint: str, status_code: int, duration: float,
+                       tenant_tier: str = UNKNOWN_TIER, tenant_id: Optional[str] = None):
+        """
+        Record one finished HTTP request.
+
+        Args:
+            method: HTTP method
+            endpoint: Matched route template (not the raw path)
+            status_code: Response status
+            duration: Request duration in seconds
+            tenant_tier: Normalized tenant tier label
+            tenant_id: Tenant id, kept out of labels; attached as a histogram
+                exemplar and counted in the top-tenants sketch
+        """
+        key = (method_label(method), endpoint, str(status_code), tenant_tier)
+        children = self._request_series.lookup(key, lambda: self._request_children(*key))
+        if children is None:
+            children = self._overflow_children(*key)
+        total, duration_histogram, errors = children
+
+        total.inc()
+        if tenant_id:
+            duration_histogram.observe(duration, exemplar={'tenant_id': tenant_id[:64]})
+            self.tenant_latency.observe(tenant_id, duration)
+        else:
+            duration_histogram.observe(duration)
+        if errors is not None:
+            errors.inc()
+
+    @staticmethod
+    def _request_children(method: str, endpoint: str, status_code: str, tenant_tier: str) -> tuple:
+        errors = None
+        if 400 <= int(status_code) < 600:
+            errors = error_rate.labels(error_type=f"http_{status_code}", endpoint=endpoint)
+        return (
+            http_request_total.labels(method=method, endpoint=endpoint,
+                                      status_code=status_code, tenant_tier=tenant_tier),
+            http_request_duration.labels(method=method, endpoint=endpoint, tenant_tier=tenant_tier),
+            errors,
+        )
+
+    def _overflow_children(self, method: str, endpoint: str, status_code: str, tenant_tier: str) -> tuple:
+        # Bounded by methods x statuses x tiers, so it needs no cap of its own
+        key = (method, status_code, tenant_tier)
+        children = self._overflow_series.get(key)
+        if children is None:
+            children = self._overflow_series[key] = self._request_children(
+                method, OVERFLOW_ROUTE, status_code, tenant_tier)
+        return children
+
+    def top_tenants(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Busiest tenants with their request latency, from the bounded sketch"""
+        return self.tenant_latency.top(limit)
 
     def track_db_query(self, query_type: str, duration: float):
         """Track database query metrics"""
@@ -314,6 +368,19 @@ class MetricsMiddleware(BaseHTTPMiddleware):
             raise
 
 
+class MetricsStage(PipelineStage):
+    """Request metrics as a middleware pipeline stage"""
+
+    async def on_complete(self, ctx: RequestContext) -> None:
+        if ctx.error is not None:
+            logger.error(f"Error processing request: {ctx.error}")
+        # Routing has run by now, so the scope carries the matched route.
+        # Requests that failed before a response started are counted as 500s
+        tenant_id, tier = tenant_labels(ctx.scope.get("state") or {})
+        metrics_collector.record_request(ctx.method, route_template(ctx.scope), ctx.status_code or 500,
+                                         ctx.elapsed, tenant_tier=tier, tenant_id=tenant_id)
+
+
 # Backward compatibility function
 async def metrics_middleware(request: Request, call_next):
     """Legacy function for backward compatibility"""
@@ -413,6 +480,7 @@ def get_metrics_snapshot() -> Dict[str, Any]:
                 "active_users_total": sum(metrics_collector._tenant_active_users.values()),
                 "active_users_by_tenant": metrics_collector._tenant_active_users,
                 "active_sessions": active_sessions._value.get(),
+                "top_tenants_by_requests": metrics_collector.top_tenants(10),
             },
             # Other metrics would be fetched from Prometheus when the dashboard
             # integrates with the Prometheus API
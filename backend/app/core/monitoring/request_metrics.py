@@ -0,0 +1,199 @@
+"""
+Low-cardinality HTTP request metrics.
+
+Request series are labelled with the matched route template
+(/api/v1/orders/{order_id}) and the tenant's tier, never with the raw path
+or the tenant id, so the number of series is bounded by the application's
+routes rather than by its data. Per-tenant latency goes to a bounded top-K
+sketch and to histogram exemplars instead.
+
+Provides:
+- route_template: the route template label for a request scope
+- tenant_labels: tenant id and normalized tier for a request state
+- parse_buckets: histogram buckets from a settings string
+- CardinalityGuard: caps the label sets of a metric, reporting overflow
+- TenantLatencySketch: Space-Saving top-K of tenants by request count
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from prometheus_client import Counter
+
+logger = logging.getLogger(__name__)
+
+# Requests no route matched (404 scans, bots) share one label
+UNMATCHED_ROUTE = "unmatched"
+# Label sets beyond a metric's cap are recorded under this route
+OVERFLOW_ROUTE = "overflow"
+
+UNKNOWN_TIER = "unknown"
+TENANT_TIERS = frozenset({"free", "basic", "standard", "premium", "enterprise"})
+
+KNOWN_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+metric_series_overflow = Counter(
+    "metrics_series_overflow_total",
+    "Observations recorded under the overflow label because a metric hit its series cap",
+    ["metric"],
+)
+
+
+def route_template(scope: Dict[str, Any]) -> str:
+    """
+    Route template label for a request scope, after routing has run.
+
+    FastAPI records the matched route in the scope; mounted apps (such as
+    /metrics) are labelled with their mount path.
+    """
+    route = scope.get("route")
+    if route is not None:
+        return getattr(route, "path_format", None) or getattr(route, "path", UNMATCHED_ROUTE)
+    if "app_root_path" in scope and scope.get("root_path"):
+        return scope["root_path"]
+    return UNMATCHED_ROUTE
+
+
+def method_label(method: str) -> str:
+    return method if method in KNOWN_METHODS else "OTHER"
+
+
+def tenant_labels(state: Any) -> Tuple[Optional[str], str]:
+    """
+    Tenant id and tier of a request, from request.state or the raw
+    scope["state"] dict.
+
+    Returns:
+        (tenant_id or None, tier label); tiers outside TENANT_TIERS are
+        reported as "unknown" so the label stays bounded
+    """
+    values = state if isinstance(state, dict) else getattr(state, "_state", None) or {}
+    context = values.get("tenant_context") or {}
+    tenant_id = values.get("tenant_id") or context.get("tenant_id")
+    tier = values.get("tenant_tier") or context.get("tier") or context.get("tenant_tier")
+    tier = str(tier).lower() if tier else UNKNOWN_TIER
+    return (str(tenant_id) if tenant_id else None), (tier if tier in TENANT_TIERS else UNKNOWN_TIER)
+
+
+def parse_buckets(value: str, default: Sequence[float]) -> Tuple[float, ...]:
+    """
+    Histogram buckets from a comma-separated settings value.
+
+    Invalid or empty values fall back to the default buckets.
+    """
+    if not value or not value.strip():
+        return tuple(default)
+    try:
+        buckets = sorted({float(part) for part in value.split(",") if part.strip()})
+    except ValueError:
+        logger.warning(f"Invalid histogram buckets {value!r}; using defaults")
+        return tuple(default)
+    return tuple(buckets) or tuple(default)
+
+
+class CardinalityGuard:
+    """
+    Caps the distinct label sets recorded for one metric.
+
+    Admitted label sets keep a cached value (typically the labelled
+    metric children), so hot series skip prometheus_client's label lookup.
+    Once the cap is reached, new label sets are rejected and counted in
+    metrics_series_overflow_total; the caller records them under an
+    overflow label instead.
+    """
+
+    def __init__(self, metric: str, max_series: int):
+        self.metric = metric
+        self.max_series = max_series
+        self._series: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+        self._warned = False
+        self._overflow = metric_series_overflow.labels(metric)
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def lookup(self, key: Hashable, create: Callable[[], Any]) -> Optional[Any]:
+        """
+        Cached value for a label set, creating it while under the cap.
+
+        Returns:
+            The cached value, or None if the label set was rejected
+        """
+        value = self._series.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            value = self._series.get(key)
+            if value is not None:
+                return value
+            if len(self._series) >= self.max_series:
+                self._overflow.inc()
+                if not self._warned:
+                    self._warned = True
+                    logger.warning(
+                        f"Metric {self.metric} reached {self.max_series} series; "
+                        f"new label sets are recorded as {OVERFLOW_ROUTE}"
+                    )
+                return None
+            value = self._series[key] = create()
+            return value
+
+
+class TenantLatencySketch:
+    """
+    Space-Saving top-K of tenants by request count, with their latency.
+
+    Memory is bounded by capacity. A tenant entering a full sketch replaces
+    the least busy one and inherits its count as an error bound, so every
+    tenant with more than total/capacity requests is guaranteed to be
+    listed. Latency is averaged over the requests seen since the tenant
+    entered the sketch.
+    """
+
+    def __init__(self, capacity: int = 50):
+        self.capacity = capacity
+        # tenant id -> [count, error, latency seconds since entry, requests since entry, max seconds]
+        self._entries: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        self.total = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def observe(self, tenant_id: str, seconds: float) -> None:
+        with self._lock:
+            self.total += 1
+            entry = self._entries.get(tenant_id)
+            if entry is None:
+                inherited = 0
+                if len(self._entries) >= self.capacity:
+                    victim = min(self._entries, key=lambda key: self._entries[key][0])
+                    inherited = self._entries.pop(victim)[0]
+                entry = self._entries[tenant_id] = [inherited, inherited, 0.0, 0, 0.0]
+            entry[0] += 1
+            entry[2] += seconds
+            entry[3] += 1
+            if seconds > entry[4]:
+                entry[4] = seconds
+
+    def top(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Tenants by estimated request count, busiest first."""
+        with self._lock:
+            ranked = sorted(self._entries.items(), key=lambda item: item[1][0], reverse=True)
+        return [
+            {
+                "tenant_id": tenant_id,
+                "requests": int(count),
+                "requests_error": int(error),
+                "avg_latency_seconds": latency / seen if seen else 0.0,
+                "max_latency_seconds": slowest,
+            }
+            for tenant_id, (count, error, latency, seen, slowest) in ranked[:limit]
+        ]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.total = 0
@@ -0,0 +1,304 @@
+"""
+Compiled, indexed alert rules of one tenant.
+
+Provides:
+- Conditions compiled once into closures and shared across a tenant's rules
+- Candidate lookup by (field, value) with a scan set for rules that have
+  no equality condition
+- Bucketed sliding counters backing time-window conditions
+"""
+
+import logging
+from collections import deque
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    from app.core.monitoring.rules_engine import Rule, RuleCondition
+
+logger = logging.getLogger(__name__)
+
+# Buckets per time window; counts are exact to 1/WINDOW_BUCKETS of the window
+WINDOW_BUCKETS = 60
+
+
+OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "equals": lambda x, y: x == y,
+    "not_equals": lambda x, y: x != y,
+    "contains": lambda x, y: y in x if isinstance(x, (str, list)) else False,
+    "greater_than": lambda x, y: x > y,
+    "less_than": lambda x, y: x < y,
+    "in": lambda x, y: x in y if isinstance(y, (list, tuple)) else False,
+    "not_in": lambda x, y: (
+        x not in y if isinstance(y, (list, tuple)) else False
+    ),
+}
+
+
+def _freeze(value: Any) -> Hashable:
+    """Hashable stand-in for a condition value, distinguishing container types."""
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, tuple(_freeze(item) for item in value))
+    if isinstance(value, dict):
+        return ("dict", tuple(sorted((str(k), _freeze(v)) for k, v in value.items())))
+    if isinstance(value, set):
+        return ("set", frozenset(_freeze(item) for item in value))
+    try:
+        hash(value)
+    except TypeError:
+        return ("repr", repr(value))
+    return value
+
+
+def _index_values(condition: "RuleCondition") -> Optional[Tuple[Hashable, ...]]:
+    """Activity values that can satisfy an equality-style condition, if hashable."""
+    if condition.duration_seconds:
+        return None
+    try:
+        if condition.operator == "equals":
+            hash(condition.value)
+            return (condition.value,)
+        if condition.operator == "in" and isinstance(condition.value, (list, tuple)):
+            values = tuple(condition.value)
+            for value in values:
+                hash(value)
+            return values
+    except TypeError:
+        pass
+    return None
+
+
+class CompiledCondition:
+    """A condition compiled to a closure; shared by every rule that uses it"""
+
+    __slots__ = ("key", "field", "test")
+
+    def __init__(self, condition: "RuleCondition"):
+        self.key = (condition.field, condition.operator, _freeze(condition.value))
+        self.field = condition.field
+        operator = OPERATORS.get(condition.operator)
+        if operator is None:
+            logger.error(f"Unknown operator: {condition.operator}")
+            self.test = lambda activity: False
+            return
+
+        field, expected = condition.field, condition.value
+
+        def test(activity: Dict[str, Any]) -> bool:
+            actual = activity.get(field)
+            if actual is None:
+                return False
+            try:
+                return operator(actual, expected)
+            except Exception as e:
+                logger.error(f"Error evaluating condition on {field}: {str(e)}")
+                return False
+
+        self.test = test
+
+
+class SlidingCounter:
+    """Matches seen in the last `window` seconds, counted in fixed buckets"""
+
+    __slots__ = ("window", "resolution", "buckets", "total")
+
+    def __init__(self, window: float, buckets: int = WINDOW_BUCKETS):
+        self.window = window
+        self.resolution = max(window / buckets, 0.001)
+        self.buckets: deque = deque()  # [bucket number, count]
+        self.total = 0
+
+    def _expire(self, now: float):
+        oldest = int((now - self.window) // self.resolution)
+        while self.buckets and self.buckets[0][0] <= oldest:
+            self.total -= self.buckets.popleft()[1]
+
+    def hit(self, now: float):
+        bucket = int(now // self.resolution)
+        if self.buckets and self.buckets[-1][0] == bucket:
+            self.buckets[-1][1] += 1
+        else:
+            self.buckets.append([bucket, 1])
+        self.total += 1
+        self._expire(now)
+
+    def count(self, now: float) -> int:
+        self._expire(now)
+        return self.total
+
+
+class WindowedCondition:
+    """A time-window condition of one rule with its own counter"""
+
+    __slots__ = ("condition", "counter", "min_count")
+
+    def __init__(self, condition: CompiledCondition, window: float, min_count: int):
+        self.condition = condition
+        self.counter = SlidingCounter(window)
+        self.min_count = max(min_count, 1)
+
+    def holds(self, activity: Dict[str, Any], now: float) -> bool:
+        # As before, the activity itself must carry the field
+        if activity.get(self.condition.field) is None:
+            return False
+        return self.counter.count(now) >= self.min_count
+
+
+class CompiledRule:
+    """A rule with its conditions compiled, cheapest-to-reject first"""
+
+    __slots__ = ("rule", "sequence", "conditions", "windows", "index_field", "index_values")
+
+    def __init__(self, rule: "Rule", sequence: int, conditions: List[CompiledCondition],
+                 windows: List[WindowedCondition]):
+        self.rule = rule
+        self.sequence = sequence
+        self.conditions = conditions
+        self.windows = windows
+        self.index_field: Optional[str] = None
+        self.index_values: Tuple[Hashable, ...] = ()
+
+    def matches(self, activity: Dict[str, Any], memo: Dict[Tuple, bool], now: float) -> bool:
+        for condition in self.conditions:
+            result = memo.get(condition.key)
+            if result is None:
+                result = memo[condition.key] = condition.test(activity)
+            if not result:
+                return False
+        for window in self.windows:
+            if not window.holds(activity, now):
+                return False
+        return True
+
+
+class TenantRuleIndex:
+    """One tenant's compiled rules, candidate index and window counters"""
+
+    def __init__(self):
+        self.rules: Dict[str, "Rule"] = {}
+        self.compiled: Dict[str, CompiledRule] = {}
+        # Interned conditions with the number of rules using each
+        self.conditions: Dict[Tuple, CompiledCondition] = {}
+        self.condition_refs: Dict[Tuple, int] = {}
+        # field -> value -> ids of rules discriminated by that equality
+        self.by_value: Dict[str, Dict[Hashable, Set[str]]] = {}
+        # Rules without a hashable equality condition; always candidates
+        self.scan: Set[str] = set()
+        # Window counters must see every matching activity, not just candidates
+        self.windows: Dict[str, List[WindowedCondition]] = {}
+        # rule_id -> position, so triggered rules come back in the order they were added
+        self.sequences: Dict[str, int] = {}
+        self._sequence = 0
+
+    def _intern(self, condition: "RuleCondition") -> CompiledCondition:
+        compiled = CompiledCondition(condition)
+        shared = self.conditions.setdefault(compiled.key, compiled)
+        self.condition_refs[compiled.key] = self.condition_refs.get(compiled.key, 0) + 1
+        return shared
+
+    def _release(self, condition: CompiledCondition):
+        refs = self.condition_refs[condition.key] - 1
+        if refs:
+            self.condition_refs[condition.key] = refs
+        else:
+            del self.condition_refs[condition.key]
+            del self.conditions[condition.key]
+
+    def add(self, rule: "Rule"):
+        if rule.id in self.rules:
+            # Replaced in place: same position, recompiled
+            self._unindex(rule.id)
+            sequence = self.sequences[rule.id]
+        else:
+            self._sequence += 1
+            sequence = self.sequences[rule.id] = self._sequence
+        self.rules[rule.id] = rule
+        if not rule.enabled:
+            return
+
+        conditions, windows = [], []
+        index_field, index_values = None, None
+        for condition in rule.conditions:
+            compiled = self._intern(condition)
+            if condition.duration_seconds:
+                windows.append(WindowedCondition(compiled, condition.duration_seconds, condition.min_count))
+                continue
+            values = _index_values(condition) if index_field is None else None
+            if values is not None:
+                # The discriminating condition is checked first
+                index_field, index_values = condition.field, values
+                conditions.insert(0, compiled)
+            else:
+                conditions.append(compiled)
+
+        entry = CompiledRule(rule, sequence, conditions, windows)
+        self.compiled[rule.id] = entry
+        if windows:
+            self.windows[rule.id] = windows
+        if index_field is None:
+            self.scan.add(rule.id)
+        else:
+            entry.index_field, entry.index_values = index_field, index_values
+            by_value = self.by_value.setdefault(index_field, {})
+            for value in index_values:
+                by_value.setdefault(value, set()).add(rule.id)
+
+    def remove(self, rule_id: str) -> Optional["Rule"]:
+        self._unindex(rule_id)
+        self.sequences.pop(rule_id, None)
+        return self.rules.pop(rule_id, None)
+
+    def _unindex(self, rule_id: str):
+        entry = self.compiled.pop(rule_id, None)
+        if entry is None:
+            return
+
+        for condition in entry.conditions:
+            self._release(condition)
+        for window in self.windows.pop(rule_id, ()):
+            self._release(window.condition)
+        if entry.index_field is None:
+            self.scan.discard(rule_id)
+        else:
+            by_value = self.by_value[entry.index_field]
+            for value in entry.index_values:
+                members = by_value.get(value)
+                if members is not None:
+                    members.discard(rule_id)
+                    if not members:
+                        del by_value[value]
+            if not by_value:
+                del self.by_value[entry.index_field]
+
+    def candidates(self, activity: Dict[str, Any]) -> Set[str]:
+        candidates = set(self.scan)
+        for field, by_value in self.by_value.items():
+            value = activity.get(field)
+            if value is None:
+                continue
+            try:
+                members = by_value.get(value)
+            except TypeError:
+                # Unhashable activity values can't equal an indexed value
+                continue
+            if members:
+                candidates |= members
+        return candidates
+
+    def match(self, activity: Dict[str, Any], now: float) -> List["Rule"]:
+        memo: Dict[Tuple, bool] = {}
+        for windows in self.windows.values():
+            for window in windows:
+                condition = window.condition
+                result = memo.get(condition.key)
+                if result is None:
+                    result = memo[condition.key] = condition.test(activity)
+                if result:
+                    window.counter.hit(now)
+
+        matched = []
+        for rule_id in self.candidates(activity):
+            entry = self.compiled[rule_id]
+            if entry.matches(activity, memo, now):
+                matched.append(entry)
+        matched.sort(key=lambda entry: entry.sequence)
+        return [entry.rule for entry in matched]
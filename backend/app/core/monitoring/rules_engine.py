@@ -1,4 +1,20 @@
+"""
+Alert rules engine.
+
+Rules are compiled once when added: every condition becomes a closure,
+identical conditions are shared across a tenant's rules, and each rule is
+indexed under one equality condition so an activity only reaches the
+rules whose discriminating field matches. The compiled index lives in
+``rule_index``.
+
+Provides:
+- Rule and condition models
+- Per-tenant matching of activities against compiled rules
+- Notifications with per-rule, per-severity cooldowns
+"""
+
 import logging
+import time
 from datetime import datetime, timedelta, timezone
 from enum import Enum
 from typing import Any, Dict, List, Optional
@@ -6,17 +22,16 @@ from uuid import uuid4
 
 from pydantic import BaseModel, Field
 
+from app.core.monitoring.rule_index import TenantRuleIndex
 from app.core.notifications.notification_service import (
     Notification,
     NotificationChannel,
     NotificationPriority,
     notification_service,
 )
-from app.db.async_session import get_async_session_local
 
 logger = logging.getLogger(__name__)
 
-
 class RuleSeverity(str, Enum):
     LOW = "low"
     MEDIUM = "medium"
@@ -29,6 +44,8 @@ class RuleCondition(BaseModel):
     operator: str
     value: Any
     duration_seconds: Optional[int] = None
+    # Matching activities needed inside duration_seconds for the condition to hold
+    min_count: int = 1
 
 
 class Rule(BaseModel):
@@ -45,159 +62,69 @@ class Rule(BaseModel):
 
 class RulesEngine:
     def __init__(self):
-        self.rules: Dict[str, List[Rule]] = {}  # tenant_id -> rules
-        # rule_id -> last_evaluation
-        self.rule_evaluations: Dict[str, Dict[str, datetime]] = {}
+        self.indexes: Dict[str, TenantRuleIndex] = {}  # tenant_id -> compiled rules
         # rule_id -> last_notification
         self.notification_cooldowns: Dict[str, datetime] = {}
 
+    @property
+    def rules(self) -> Dict[str, List[Rule]]:
+        """Rules per tenant, in the order they were added"""
+        return {tenant_id: list(index.rules.values()) for tenant_id, index in self.indexes.items()}
+
     def add_rule(self, rule: Rule):
         """Add a new rule to the engine"""
-        if rule.tenant_id not in self.rules:
-            self.rules[rule.tenant_id] = []
-        self.rules[rule.tenant_id].append(rule)
+        self.indexes.setdefault(rule.tenant_id, TenantRuleIndex()).add(rule)
         logger.info(f"Added rule {rule.id} for tenant {rule.tenant_id}")
 
     def remove_rule(self, rule_id: str, tenant_id: str):
         """Remove a rule from the engine"""
-        if tenant_id in self.rules:
-            self.rules[tenant_id] = [
-                r for r in self.rules[tenant_id] if r.id != rule_id
-            ]
+        index = self.indexes.get(tenant_id)
+        if index is not None and index.remove(rule_id) is not None:
+            if not index.rules:
+                del self.indexes[tenant_id]
             logger.info(f"Removed rule {rule_id} for tenant {tenant_id}")
 
-    async def evaluate_activity(self, activity: Dict[str, Any]) -> List[Rule]:
-        """Evaluate an activity against all rules for the tenant"""
-        tenant_id = activity.get("tenant_id")
-        if not tenant_id or tenant_id not in self.rules:
-            return []
+    def match_activity(self, activity: Dict[str, Any], now: Optional[float] = None) -> List[Rule]:
+        """
+        Find the enabled rules an activity triggers, without notifying.
 
-        triggered_rules = []
-        for rule in self.rules[tenant_id]:
-            if not rule.enabled:
-                continue
+        Args:
+            activity: Activity fields, including tenant_id
+            now: Monotonic time for window counters, defaults to now
 
-            if self._evaluate_rule(rule, activity):
-                triggered_rules.append(rule)
-                logger.info(
-                    f"Rule {rule.id} triggered for activity {activity.get('id')}"
-                )
-
-                # Send notification if cooldown period has passed
-                await self._handle_rule_notification(rule, activity)
+        Returns:
+            Triggered rules in the order they were added
+        """
+        index = self.indexes.get(activity.get("tenant_id"))
+        if index is None:
+            return []
+        return index.match(activity, time.monotonic() if now is None else now)
 
-        return triggered_rules
+    async def evaluate_activity(self, activity: Dict[str, Any]) -> List[Rule]:
+        """Evaluate an activity against the tenant's rules and notify on triggers"""
+        triggered_rules = self.match_activity(activity)
+        for rule in triggered_rules:
+            logger.info(
+                f"Rule {rule.id} triggered for activity {activity.get('id')}"
+            )
 
-    def _evaluate_rule(self, rule: Rule, activity: Dict[str, Any]) -> bool:
-        """Evaluate a single rule against an activity"""
-        try:
-            for condition in rule.conditions:
-                if not self._evaluate_condition(condition, activity):
-                    return False
-            return True
-        except Exception as e:
-            logger.error(f"Error evaluating rule {rule.id}: {str(e)}")
-            return False
-
-    def _evaluate_condition(
-        self, condition: RuleCondition, activity: Dict[str, Any]
-    ) -> bool:
-        """Evaluate a single condition against an activity"""
-        try:
-            field_value = activity.get(condition.field)
-            if field_value is None:
-                return False
-
-            if condition.duration_seconds:
-                # For time-based conditions, check historical data
-                return self._evaluate_time_condition(condition, activity)
-            else:
-                # For immediate conditions
-                return self._evaluate_operator(
-                    condition.operator, field_value, condition.value
-                )
-        except Exception as e:
-            logger.error(f"Error evaluating condition: {str(e)}")
-            return False
-
-    def _evaluate_operator(
-        self, operator: str, field_value: Any, condition_value: Any
-    ) -> bool:
-        """Evaluate a single operator"""
-        operators = {
-            "equals": lambda x, y: x == y,
-            "not_equals": lambda x, y: x != y,
-            "contains": lambda x, y: y in x if isinstance(x, (str, list)) else False,
-            "greater_than": lambda x, y: x > y,
-            "less_than": lambda x, y: x < y,
-            "in": lambda x, y: x in y if isinstance(y, (list, tuple)) else False,
-            "not_in": lambda x, y: (
-                x not in y if isinstance(y, (list, tuple)) else False
-            ),
-        }
+            # Send notification if cooldown period has passed
+            await self._handle_rule_notification(rule, activity)
 
-        if operator not in operators:
-            logger.error(f"Unknown operator: {operator}")
-            return False
-
-        return operators[operator](field_value, condition_value)
-
-    def _evaluate_time_condition(
-        self, condition: RuleCondition, activity: Dict[str, Any]
-    ) -> bool:
-        """Evaluate a time-based condition by checking historical data"""
-        try:
-            db = get_async_session_local()
-            try:
-                # Get activities within the time window
-                start_time = datetime.now(timezone.utc) - timedelta(
-                    seconds=condition.duration_seconds
-                )
-                activities = await db.execute(
-                    """
-                    SELECT * FROM audit_log
-                    WHERE tenant_id = :tenant_id
-                    AND timestamp >= :start_time
-                    AND timestamp <= :end_time
-                    """,
-                    {
-                        "tenant_id": activity["tenant_id"],
-                        "start_time": start_time,
-                        "end_time": datetime.now(timezone.utc),
-                    },
-                )
-
-                # Convert to dict for evaluation
-                activity_dicts = [a.__dict__ for a in activities]
-
-                # Count matching activities
-                matches = sum(
-                    1
-                    for a in activity_dicts
-                    if self._evaluate_operator(
-                        condition.operator, a.get(condition.field), condition.value
-                    )
-                )
-
-                return matches > 0
-            finally:
-                await db.close()
-        except Exception as e:
-            logger.error(f"Error evaluating time condition: {str(e)}")
-            return False
+        return triggered_rules
 
     def get_rules(self, tenant_id: str) -> List[Rule]:
         """Get all rules for a tenant"""
-        return self.rules.get(tenant_id, [])
+        index = self.indexes.get(tenant_id)
+        return list(index.rules.values()) if index is not None else []
 
     def update_rule(self, rule: Rule):
         """Update an existing rule"""
-        if rule.tenant_id in self.rules:
-            for i, r in enumerate(self.rules[rule.tenant_id]):
-                if r.id == rule.id:
-                    self.rules[rule.tenant_id][i] = rule
-                    logger.info(f"Updated rule {rule.id} for tenant {rule.tenant_id}")
-                    break
+        index = self.indexes.get(rule.tenant_id)
+        if index is not None and rule.id in index.rules:
+            # Recompiling replaces the rule in place and resets its window counters
+            index.add(rule)
+            logger.info(f"Updated rule {rule.id} for tenant {rule.tenant_id}")
 
     async def _handle_rule_notification(
         self, rule: Rule, activity: Dict[str, Any]
@@ -336,7 +263,8 @@ try:
     import sentry_sdk
 
     sentry_sdk.init(dsn="YOUR_SENTRY_DSN")
-except ImportError:
+except (ImportError, ValueError):
+    # The placeholder DSN is rejected (BadDsn); main.py configures Sentry from SENTRY_DSN
     pass
 
 # Prometheus stub (to be implemented)
@@ -30,6 +30,14 @@ webhook_queue_age = Gauge(
     ['provider']
 )
 
+# Track time between accepting a webhook and starting to process it
+webhook_queue_lag = Histogram(
+    'webhook_queue_lag_seconds',
+    'Time a webhook spent queued before processing started',
+    ['provider'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+
 # Track webhook queue length
 webhook_queue_length = Gauge(
     'webhook_queue_length',
@@ -65,6 +73,11 @@ class WebhookMetrics:
 
         return TimerContextManager()
 
+    @staticmethod
+    def record_queue_lag(provider: str, lag_seconds: float) -> None:
+        """Record how long a webhook waited in the queue"""
+        webhook_queue_lag.labels(provider=provider).observe(lag_seconds)
+
     @staticmethod
     def update_queue_metrics(provider: str, queue_length: int, oldest_age_seconds: float = None) -> None:
         """Update queue metrics for a provider"""
@@ -0,0 +1,79 @@
+"""
+Tenant notification contacts.
+
+Provides:
+- Where each tenant receives email, SMS and WhatsApp notifications
+- A per-worker cache with a TTL, loading a batch's missing tenants in one
+  query
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+
+CONTACT_TTL_SECONDS = 300.0
+
+
+@dataclass(frozen=True)
+class TenantContact:
+    """Where a tenant receives notifications"""
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    whatsapp: Optional[str] = None
+
+
+ContactLoader = Callable[[List[str]], Awaitable[Dict[str, TenantContact]]]
+
+
+class TenantContactCache:
+    """Tenant contact details cached per worker for ``ttl`` seconds"""
+
+    def __init__(self, loader: Optional[ContactLoader] = None, ttl: float = CONTACT_TTL_SECONDS):
+        self._loader = loader or self._load
+        self.ttl = ttl
+        self._contacts: Dict[str, Tuple[float, TenantContact]] = {}
+
+    async def _load(self, tenant_ids: List[str]) -> Dict[str, TenantContact]:
+        from app.core.db.session import AsyncSessionLocal
+        from app.models.tenant import Tenant
+
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(Tenant.id, Tenant.email, Tenant.phone_number, Tenant.whatsapp_number)
+                .where(Tenant.id.in_(tenant_ids))
+            )
+            return {
+                str(tenant_id): TenantContact(email, phone, whatsapp or phone)
+                for tenant_id, email, phone, whatsapp in result.all()
+            }
+
+    async def get_many(self, tenant_ids: Iterable[str]) -> Dict[str, TenantContact]:
+        """
+        Contacts for several tenants, loading the uncached ones in one query.
+
+        Returns:
+            tenant_id -> contact; unknown tenants get an empty contact
+        """
+        now = time.monotonic()
+        contacts, missing = {}, []
+        for tenant_id in set(tenant_ids):
+            cached = self._contacts.get(tenant_id)
+            if cached and cached[0] > now:
+                contacts[tenant_id] = cached[1]
+            else:
+                missing.append(tenant_id)
+
+        if missing:
+            loaded = await self._loader(missing)
+            expires = time.monotonic() + self.ttl
+            for tenant_id in missing:
+                contact = loaded.get(tenant_id, TenantContact())
+                self._contacts[tenant_id] = (expires, contact)
+                contacts[tenant_id] = contact
+        return contacts
+
+    def invalidate(self, tenant_id: str) -> None:
+        """Drop a cached contact after a tenant changes its email or phone numbers."""
+        self._contacts.pop(str(tenant_id), None)
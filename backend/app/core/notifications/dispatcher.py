@@ -0,0 +1,463 @@
+"""
+Notification dispatcher.
+
+``NotificationService.send_notification`` hands notifications to the
+dispatcher and returns. A flusher task collects them into batches and
+delivers each batch per channel without blocking the event loop, so a storm
+of order-status notifications costs the publisher a dictionary insert each.
+
+Provides:
+- Batched email over the pooled SMTP connections (``smtp_pool``), with
+  tenant contacts from a TTL cache (``contacts``)
+- SMS and WhatsApp through the Twilio REST API over the pooled
+  ``outbound_http`` client, concurrently within a batch
+- Coalescing of duplicate notifications: duplicates waiting in the same
+  batch are merged with an occurrence count, and duplicates of one sent
+  within the coalescing window are dropped
+- A durable retry queue (``retry_store``) swept with exponential backoff for deliveries that failed transiently. Twilio sends are retried
+  only when the request never reached Twilio or it answered 429/5xx; a
+  send that may have gone through (e.g. a read timeout) is not retried
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+import httpx
+from prometheus_client import Counter
+
+from app.core.config.settings import get_settings
+from app.core.exceptions import AppError
+from app.core.http.outbound import outbound_http, request_not_sent
+from app.core.notifications.contacts import TenantContact, TenantContactCache
+from app.core.notifications.retry_store import NotificationRetryStore
+from app.core.notifications.smtp_pool import SMTPConnectionPool
+from app.core.resilience.retry_manager import CircuitOpenError
+from app.db.models.notification_retry import NotificationRetry
+
+if TYPE_CHECKING:
+    from app.core.notifications.notification_service import Notification
+
+logger = logging.getLogger(__name__)
+
+notification_deliveries = Counter(
+    "notification_deliveries_total",
+    "Notification deliveries by channel and outcome",
+    ["channel", "outcome"],  # outcome: sent, failed, retried, coalesced, dropped, unknown
+)
+
+TWILIO_API_BASE = "https://api.twilio.com/2010-04-01"
+
+# Longest a queued notification waits for its batch to fill
+FLUSH_INTERVAL = 0.25
+MAX_BATCH_SIZE = 200
+# Identical notifications within this many seconds of one sent are dropped
+COALESCE_WINDOW_SECONDS = 60.0
+# Concurrent Twilio requests per batch
+PROVIDER_CONCURRENCY = 10
+MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = 30.0
+MAX_RETRY_DELAY = 3600.0
+RETRY_SWEEP_INTERVAL = 30.0
+RETRY_BATCH_SIZE = 100
+
+
+class FinalDeliveryError(AppError):
+    """A delivery error that must not be retried"""
+    outcome = "failed"
+
+
+class UnknownOutcomeError(FinalDeliveryError):
+    """The request may have reached the provider; a retry could send a duplicate"""
+    outcome = "unknown"
+
+
+DeliveryResult = Optional[Union[str, FinalDeliveryError]]
+
+# Sends a batch of (notification, address) pairs; returns an error per pair,
+# None if sent. Plain string errors are retried, FinalDeliveryErrors are not.
+ChannelSender = Callable[[List[Tuple["Notification", str]]], Awaitable[List[DeliveryResult]]]
+
+
+def coalesce_key(notification: "Notification") -> Tuple:
+    return (
+        notification.tenant_id,
+        notification.title,
+        notification.message,
+        tuple(sorted(channel.value for channel in notification.channels)),
+    )
+
+
+def format_metadata(metadata: Dict[str, Any]) -> str:
+    """Format metadata for display in notifications"""
+    return "\n".join(f"{k}: {v}" for k, v in metadata.items())
+
+
+def short_text(notification: "Notification") -> str:
+    """Body for SMS and WhatsApp."""
+    return f"[{notification.priority.upper()}] {notification.title}\n\n{notification.message}"
+
+
+class NotificationDispatcher:
+    """
+    Batches, coalesces and delivers notifications.
+
+    The flusher starts lazily on the first ``submit``; ``start()`` also runs
+    the retry sweep.
+    """
+
+    def __init__(
+        self,
+        contacts: Optional[TenantContactCache] = None,
+        retry_store: Optional[NotificationRetryStore] = None,
+        senders: Optional[Dict[str, ChannelSender]] = None,
+        flush_interval: float = FLUSH_INTERVAL,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        coalesce_window: float = COALESCE_WINDOW_SECONDS,
+        max_attempts: int = MAX_ATTEMPTS,
+        retry_base_delay: float = RETRY_BASE_DELAY,
+        retry_interval: float = RETRY_SWEEP_INTERVAL,
+    ):
+        self.contacts = contacts or TenantContactCache()
+        self.retry_store = retry_store or NotificationRetryStore()
+        self.smtp = SMTPConnectionPool()
+        self.senders: Dict[str, ChannelSender] = {
+            "email": self._send_email,
+            "sms": self._send_sms,
+            "whatsapp": self._send_whatsapp,
+            "in_app": self._send_in_app,
+        }
+        self.senders.update(senders or {})
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+        self.coalesce_window = coalesce_window
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retry_interval = retry_interval
+
+        self._pending: "OrderedDict[Tuple, Notification]" = OrderedDict()
+        # coalesce key -> monotonic time until which duplicates are dropped
+        self._recent: Dict[Tuple, float] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._retrier: Optional[asyncio.Task] = None
+
+    # Intake
+
+    def submit(self, notification: "Notification") -> bool:
+        """
+        Queue a notification for the next batch.
+
+        Returns:
+            False if it duplicates one sent within the coalescing window
+        """
+        key = coalesce_key(notification)
+        pending = self._pending.get(key)
+        if pending is not None:
+            pending.metadata["occurrences"] = pending.metadata.get("occurrences", 1) + 1
+            for channel in notification.channels:
+                notification_deliveries.labels(channel.value, "coalesced").inc()
+            return True
+        if self._recent.get(key, 0.0) > time.monotonic():
+            for channel in notification.channels:
+                notification_deliveries.labels(channel.value, "coalesced").inc()
+            return False
+
+        self._pending[key] = notification
+        self._ensure_flusher()
+        if len(self._pending) >= self.max_batch_size:
+            self._wakeup.set()
+        return True
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher is None or self._flusher.done():
+            self._wakeup = asyncio.Event()
+            self._flusher = asyncio.create_task(self._flush_loop(), name="notification-flusher")
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Notification batch failed: {str(e)}")
+
+    async def flush(self) -> int:
+        """
+        Deliver everything queued so far.
+
+        Returns:
+            Number of notifications in the batch
+        """
+        if not self._pending:
+            return 0
+        batch = list(self._pending.items())[: self.max_batch_size]
+        for key, _ in batch:
+            del self._pending[key]
+
+        now = time.monotonic()
+        self._recent = {key: until for key, until in self._recent.items() if until > now}
+        for key, _ in batch:
+            self._recent[key] = now + self.coalesce_window
+
+        notifications = [notification for _, notification in batch]
+        failures = await self.deliver(notifications)
+        if failures:
+            try:
+                await self.retry_store.add(failures, self.retry_base_delay)
+            except Exception as e:
+                logger.error(f"Could not store {len(failures)} failed notification deliveries: {str(e)}")
+        sent_at = datetime.now(timezone.utc)
+        failed_ids = {notification.id for notification, _, _ in failures}
+        for notification in notifications:
+            if notification.id in failed_ids:
+                notification.status = "retrying"
+            elif notification.status != "failed":
+                notification.status = "sent"
+            notification.sent_at = sent_at
+        return len(notifications)
+
+    # Delivery
+
+    async def deliver(self, notifications: List["Notification"]) -> List[Tuple["Notification", str, str]]:
+        """
+        Deliver notifications on each of their channels, a batch per channel.
+
+        Returns:
+            Retryable failures as (notification, channel, error)
+        """
+        needs_contact = [
+            notification.tenant_id for notification in notifications
+            if any(channel.value != "in_app" for channel in notification.channels)
+        ]
+        contacts = await self.contacts.get_many(needs_contact) if needs_contact else {}
+
+        by_channel: Dict[str, List[Tuple["Notification", str]]] = {}
+        for notification in notifications:
+            contact = contacts.get(notification.tenant_id, TenantContact())
+            for channel in notification.channels:
+                address = {
+                    "email": contact.email,
+                    "sms": contact.phone,
+                    "whatsapp": contact.whatsapp,
+                    "in_app": notification.tenant_id,
+                }.get(channel.value)
+                if not address:
+                    logger.warning(f"Tenant {notification.tenant_id} has no {channel.value} contact; dropping")
+                    notification_deliveries.labels(channel.value, "dropped").inc()
+                    continue
+                by_channel.setdefault(channel.value, []).append((notification, address))
+
+        channels = list(by_channel)
+        results = await asyncio.gather(
+            *(self._send_channel(channel, by_channel[channel]) for channel in channels)
+        )
+        return [failure for failures in results for failure in failures]
+
+    async def _send_channel(
+        self, channel: str, items: List[Tuple["Notification", str]]
+    ) -> List[Tuple["Notification", str, str]]:
+        try:
+            errors = await self.senders[channel](items)
+        except Exception as e:
+            errors = [str(e)] * len(items)
+
+        failures = []
+        for (notification, _), error in zip(items, errors):
+            if error is None:
+                notification_deliveries.labels(channel, "sent").inc()
+            elif isinstance(error, FinalDeliveryError):
+                logger.error(f"Not retrying {channel} notification {notification.id}: {error}")
+                notification_deliveries.labels(channel, error.outcome).inc()
+                notification.status = "failed"
+            else:
+                logger.error(f"Error sending {channel} notification {notification.id}: {error}")
+                notification_deliveries.labels(channel, "failed").inc()
+                failures.append((notification, channel, str(error)))
+        return failures
+
+    async def _send_email(self, items: List[Tuple["Notification", str]]) -> List[DeliveryResult]:
+        if not self.smtp.configured:
+            return ["SMTP settings not configured"] * len(items)
+
+        messages = []
+        for notification, address in items:
+            msg = MIMEMultipart()
+            msg["From"] = self.smtp.from_email
+            msg["To"] = address
+            msg["Subject"] = f"[{notification.priority.upper()}] {notification.title}"
+            body = f"""
+            Priority: {notification.priority}
+            Time: {notification.created_at}
+
+            {notification.message}
+
+            Additional Information:
+            {format_metadata(notification.metadata)}
+            """
+            msg.attach(MIMEText(body, "plain"))
+            messages.append(msg)
+        return await self.smtp.send(messages)
+
+    async def _send_twilio(self, items: List[Tuple["Notification", str]], from_: str, prefix: str) -> List[DeliveryResult]:
+        settings = get_settings()
+        if not (settings.TWILIO_ACCOUNT_SID and settings.TWILIO_AUTH_TOKEN and from_):
+            return ["Twilio client not configured"] * len(items)
+
+        url = f"{TWILIO_API_BASE}/Accounts/{settings.TWILIO_ACCOUNT_SID}/Messages.json"
+        limit = asyncio.Semaphore(PROVIDER_CONCURRENCY)
+
+        async def send(notification: "Notification", address: str) -> DeliveryResult:
+            async with limit:
+                try:
+                    response = await outbound_http.post(
+                        "twilio",
+                        url,
+                        auth=(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN),
+                        data={"Body": short_text(notification), "From": f"{prefix}{from_}", "To": f"{prefix}{address}"},
+                    )
+                except (httpx.HTTPError, CircuitOpenError) as e:
+                    if request_not_sent(e):
+                        return str(e)
+                    return UnknownOutcomeError(f"Twilio outcome unknown: {str(e)}")
+            if response.status_code == 429 or response.status_code >= 500:
+                return f"Twilio returned HTTP {response.status_code}"
+            if response.status_code >= 400:
+                return FinalDeliveryError(f"Twilio returned HTTP {response.status_code}: {response.text[:200]}")
+            return None
+
+        return list(await asyncio.gather(*(send(notification, address) for notification, address in items)))
+
+    async def _send_sms(self, items: List[Tuple["Notification", str]]) -> List[DeliveryResult]:
+        return await self._send_twilio(items, get_settings().TWILIO_PHONE_NUMBER, "")
+
+    async def _send_whatsapp(self, items: List[Tuple["Notification", str]]) -> List[DeliveryResult]:
+        return await self._send_twilio(items, get_settings().TWILIO_WHATSAPP_FROM, "whatsapp:")
+
+    async def _send_in_app(self, items: List[Tuple["Notification", str]]) -> List[DeliveryResult]:
+        # The hub queues each broadcast and returns
+        from app.core.websocket.hub import websocket_hub
+
+        for notification, tenant_id in items:
+            await websocket_hub.broadcast_to_tenant(
+                tenant_id, {"type": "notification", "data": notification.model_dump(mode="json")}
+            )
+        return [None] * len(items)
+
+    # Retries
+
+    def retry_delay(self, attempts: int) -> float:
+        return min(self.retry_base_delay * (2 ** (attempts - 1)), MAX_RETRY_DELAY)
+
+    async def retry_due(self) -> int:
+        """
+        Retry deliveries whose backoff has elapsed.
+
+        Due rows are claimed and committed first; the sends happen outside
+        any transaction and their outcome is written back afterwards.
+
+        Returns:
+            Number of deliveries attempted
+        """
+        from app.core.notifications.notification_service import Notification
+
+        rows = await self.retry_store.claim_due(RETRY_BATCH_SIZE)
+        if not rows:
+            return 0
+
+        contacts = await self.contacts.get_many(str(row.tenant_id) for row in rows)
+        by_channel: Dict[str, List[Tuple[NotificationRetry, Tuple["Notification", str]]]] = {}
+        done: List[uuid.UUID] = []
+        for row in rows:
+            notification = Notification.model_validate(row.payload)
+            contact = contacts.get(str(row.tenant_id), TenantContact())
+            address = {"email": contact.email, "sms": contact.phone,
+                       "whatsapp": contact.whatsapp}.get(row.channel)
+            if not address or row.channel not in self.senders:
+                notification_deliveries.labels(row.channel, "dropped").inc()
+                done.append(row.id)
+                continue
+            by_channel.setdefault(row.channel, []).append((row, (notification, address)))
+
+        failed: List[Tuple[uuid.UUID, int, str, float]] = []
+        for channel, entries in by_channel.items():
+            failures = await self._send_channel(channel, [item for _, item in entries])
+            self._settle_retries(channel, entries, failures, done, failed)
+
+        await self.retry_store.resolve(done, failed)
+        return len(rows)
+
+    def _settle_retries(
+        self,
+        channel: str,
+        entries: List[Tuple[NotificationRetry, Tuple["Notification", str]]],
+        failures: List[Tuple["Notification", str, str]],
+        done: List[uuid.UUID],
+        failed: List[Tuple[uuid.UUID, int, str, float]],
+    ) -> None:
+        """Sort one channel's retried rows into finished and rescheduled."""
+        errors = {id(notification): error for notification, _, error in failures}
+        for row, (notification, _) in entries:
+            error = errors.get(id(notification))
+            attempts = row.attempts + 1
+            if error is None:
+                done.append(row.id)
+            elif attempts >= self.max_attempts:
+                logger.error(
+                    f"Giving up on {channel} notification {row.notification_id} "
+                    f"after {attempts} attempts: {error}"
+                )
+                notification_deliveries.labels(channel, "dropped").inc()
+                done.append(row.id)
+            else:
+                notification_deliveries.labels(channel, "retried").inc()
+                failed.append((row.id, attempts, error, self.retry_delay(attempts)))
+
+    async def _retry_loop(self) -> None:
+        while True:
+            try:
+                while await self.retry_due() >= RETRY_BATCH_SIZE:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Notification retry sweep failed: {str(e)}")
+            await asyncio.sleep(self.retry_interval)
+
+    # Lifecycle
+
+    def start(self) -> None:
+        """Start the flusher and the retry sweep (idempotent)."""
+        self._ensure_flusher()
+        if self._retrier is None or self._retrier.done():
+            self._retrier = asyncio.create_task(self._retry_loop(), name="notification-retries")
+
+    async def stop(self) -> None:
+        """Stop the retry sweep, deliver what is queued, then close SMTP connections."""
+        for task in (self._retrier, self._flusher):
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self._retrier = self._flusher = None
+        try:
+            while await self.flush():
+                pass
+        except Exception as e:
+            logger.error(f"Could not deliver queued notifications at shutdown: {str(e)}")
+        await self.smtp.close()
+
+
+# Global dispatcher instance
+notification_dispatcher = NotificationDispatcher()
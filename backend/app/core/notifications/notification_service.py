@@ -1,25 +1,17 @@
 import logging
-import smtplib
 from datetime import datetime, timezone
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
 from enum import Enum
 from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, Field
-from twilio.rest import Client
 
-from app.core.config.settings import get_settings
-from app.db.async_session import get_async_session_local
-from app.models.tenant import Tenant
-
-settings = get_settings()
 logger = logging.getLogger(__name__)
 
 
 class NotificationChannel(str, Enum):
     EMAIL = "email"
     SMS = "sms"
+    WHATSAPP = "whatsapp"
     IN_APP = "in_app"
 
 
@@ -45,108 +37,23 @@ class Notification(BaseModel):
 
 
 class NotificationService:
-    def __init__(self):
-        self.twilio_client = None
-        if settings.TWILIO_ACCOUNT_SID and settings.TWILIO_AUTH_TOKEN:
-            self.twilio_client = Client(
-                settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN
-            )
+    """Queues notifications on the batch dispatcher (``dispatcher.py``)"""
 
     async def send_notification(self, notification: Notification) -> bool:
-        """Send a notification through all specified channels"""
-        success = True
-        for channel in notification.channels:
-            try:
-                if channel == NotificationChannel.EMAIL:
-                    await self._send_email(notification)
-                elif channel == NotificationChannel.SMS:
-                    await self._send_sms(notification)
-                elif channel == NotificationChannel.IN_APP:
-                    await self._send_in_app(notification)
-            except Exception as e:
-                logger.error(f"Error sending {channel} notification: {str(e)}")
-                success = False
-
-        # Update notification status
-        notification.status = "sent" if success else "failed"
-        notification.sent_at = datetime.now(timezone.utc)
-
-        return success
-
-    async def _send_email(self, notification: Notification) -> None:
-        """Send email notification"""
-        if not settings.SMTP_HOST or not settings.SMTP_PORT:
-            raise ValueError("SMTP settings not configured")
-
-        # Get tenant email settings
-        db = get_async_session_local()
-        try:
-            tenant = await db.get(Tenant, notification.tenant_id)
-            if not tenant or not tenant.notification_email:
-                raise ValueError("Tenant email not configured")
-
-            msg = MIMEMultipart()
-            msg["From"] = settings.SMTP_FROM_EMAIL
-            msg["To"] = tenant.notification_email
-            msg["Subject"] = f"[{notification.priority.upper()}] {notification.title}"
-
-            body = f"""
-            Priority: {notification.priority}
-            Time: {notification.created_at}
-
-            {notification.message}
-
-            Additional Information:
-            {self._format_metadata(notification.metadata)}
-            """
-
-            msg.attach(MIMEText(body, "plain"))
-
-            with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as server:
-                if settings.SMTP_USERNAME and settings.SMTP_PASSWORD:
-                    server.starttls()
-                    server.login(settings.SMTP_USERNAME, settings.SMTP_PASSWORD)
-                server.send_message(msg)
-
-        finally:
-            await db.close()
-
-    async def _send_sms(self, notification: Notification) -> None:
-        """Send SMS notification using Twilio"""
-        if not self.twilio_client:
-            raise ValueError("Twilio client not configured")
-
-        # Get tenant phone settings
-        db = get_async_session_local()
-        try:
-            tenant = await db.get(Tenant, notification.tenant_id)
-            if not tenant or not tenant.notification_phone:
-                raise ValueError("Tenant phone not configured")
-
-            message = self.twilio_client.messages.create(
-                body=f"[{notification.priority.upper()}] {notification.title}\n\n{notification.message}",
-                from_=settings.TWILIO_PHONE_NUMBER,
-                to=tenant.notification_phone,
-            )
-            logger.info(f"SMS sent: {message.sid}")
-
-        finally:
-            await db.close()
-
-    async def _send_in_app(self, notification: Notification) -> None:
-        """Send in-app notification through WebSocket"""
-        # This will be handled by the WebSocket service
-        # The notification will be broadcast to all connected clients for the tenant
-        from app.core.websocket.monitoring import connection_manager
-
-        await connection_manager.broadcast_to_tenant(
-            notification.tenant_id,
-            {"type": "notification", "data": notification.dict()},
-        )
-
-    def _format_metadata(self, metadata: Dict[str, Any]) -> str:
-        """Format metadata for display in notifications"""
-        return "\n".join(f"{k}: {v}" for k, v in metadata.items())
+        """
+        Queue a notification for delivery through all specified channels.
+
+        Delivery happens in the dispatcher's next batch; failed deliveries
+        are retried from the durable retry queue.
+
+        Returns:
+            False if it duplicates a notification sent within the coalescing window
+        """
+        from app.core.notifications.dispatcher import notification_dispatcher
+
+        queued = notification_dispatcher.submit(notification)
+        notification.status = "queued" if queued else "coalesced"
+        return queued
 
 
 # Create global instance
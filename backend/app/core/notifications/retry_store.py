@@ -0,0 +1,106 @@
+"""
+Durable queue of notification deliveries waiting to be retried.
+
+Provides:
+- Storage of first failures in ``notification_retries``
+- Claiming of due rows under a lease, committed before anything is sent so
+  no row lock is held across network calls
+- Deletion of finished rows and rescheduling of failed ones
+"""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models.notification_retry import NotificationRetry
+
+if TYPE_CHECKING:
+    from app.core.notifications.notification_service import Notification
+
+# Claimed rows are hidden from other sweeps for this long while they are sent
+CLAIM_LEASE_SECONDS = 300.0
+
+
+class NotificationRetryStore:
+    """Failed deliveries kept in ``notification_retries`` until they go out"""
+
+    def __init__(self, session_factory: Optional[Callable[[], AsyncSession]] = None):
+        self._session_factory = session_factory
+
+    def session(self) -> AsyncSession:
+        if self._session_factory is None:
+            from app.core.db.session import AsyncSessionLocal
+
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory()
+
+    async def add(self, failures: List[Tuple["Notification", str, str]], delay: float) -> None:
+        """Store first failures as (notification, channel, error)."""
+        due = datetime.now(timezone.utc) + timedelta(seconds=delay)
+        async with self.session() as db:
+            db.add_all([
+                NotificationRetry(
+                    notification_id=notification.id,
+                    tenant_id=uuid.UUID(str(notification.tenant_id)),
+                    channel=channel,
+                    payload=notification.model_dump(mode="json"),
+                    attempts=1,
+                    next_attempt_at=due,
+                    last_error=error[:2000],
+                )
+                for notification, channel, error in failures
+            ])
+            await db.commit()
+
+    async def claim_due(self, limit: int, lease: float = CLAIM_LEASE_SECONDS) -> List[NotificationRetry]:
+        """
+        Claim due rows for one sweep.
+
+        The rows are locked only long enough to push ``next_attempt_at`` past
+        the lease, then the transaction commits: concurrent sweeps skip them,
+        and a worker that dies mid-send leaves them due again once the lease
+        runs out.
+
+        Args:
+            limit: Most rows to claim
+            lease: Seconds the claimed rows stay hidden from other sweeps
+
+        Returns:
+            The claimed rows, detached from their session
+        """
+        now = datetime.now(timezone.utc)
+        async with self.session() as db:
+            result = await db.execute(
+                select(NotificationRetry)
+                .where(NotificationRetry.next_attempt_at <= now)
+                .order_by(NotificationRetry.next_attempt_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+            rows = list(result.scalars().all())
+            if rows:
+                await db.execute(
+                    update(NotificationRetry)
+                    .where(NotificationRetry.id.in_([row.id for row in rows]))
+                    .values(next_attempt_at=now + timedelta(seconds=lease))
+                )
+            await db.commit()
+            return rows
+
+    async def resolve(self, done: List[uuid.UUID], failed: List[Tuple[uuid.UUID, int, str, float]]) -> None:
+        """Delete finished rows; reschedule failed ones as (id, attempts, error, delay)."""
+        now = datetime.now(timezone.utc)
+        async with self.session() as db:
+            if done:
+                await db.execute(delete(NotificationRetry).where(NotificationRetry.id.in_(done)))
+            for row_id, attempts, error, delay in failed:
+                await db.execute(
+                    update(NotificationRetry)
+                    .where(NotificationRetry.id == row_id)
+                    .values(attempts=attempts, last_error=error[:2000],
+                            next_attempt_at=now + timedelta(seconds=delay))
+                )
+            await db.commit()
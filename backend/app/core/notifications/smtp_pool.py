@@ -0,0 +1,138 @@
+"""
+Pooled SMTP connections.
+
+Provides:
+- Persistent, logged-in SMTP connections reused across email batches
+- Sends split across the pool and driven from worker threads, so the event
+  loop never blocks on smtplib
+"""
+
+import asyncio
+import smtplib
+import time
+from email.mime.multipart import MIMEMultipart
+from typing import List, Optional
+
+from app.core.config.settings import get_settings
+
+# SMTP connections idle longer than this are checked with NOOP before reuse
+SMTP_IDLE_CHECK_SECONDS = 30.0
+
+
+class SMTPConnectionPool:
+    """
+    Persistent SMTP connections shared by email batches.
+
+    smtplib is blocking, so each connection is driven from a worker thread;
+    the event loop only waits on the thread. A connection stays logged in
+    between batches and is replaced when the server has dropped it.
+    """
+
+    def __init__(self, size: Optional[int] = None):
+        settings = get_settings()
+        self.host = settings.SMTP_HOST
+        self.port = settings.SMTP_PORT
+        self.username = settings.SMTP_USERNAME
+        self.password = settings.SMTP_PASSWORD
+        self.use_tls = settings.SMTP_TLS
+        self.from_email = settings.SMTP_FROM_EMAIL
+        self.size = size or settings.SMTP_POOL_SIZE
+        self._idle: Optional[asyncio.Queue] = None
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.host and self.port)
+
+    def _pool(self) -> asyncio.Queue:
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            for _ in range(self.size):
+                # [connection or None, last used]
+                self._idle.put_nowait([None, 0.0])
+        return self._idle
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=30)
+        if self.use_tls:
+            server.starttls()
+        if self.username and self.password:
+            server.login(self.username, self.password)
+        return server
+
+    def _live(self, slot: list) -> smtplib.SMTP:
+        server = slot[0]
+        if server is not None and time.monotonic() - slot[1] > SMTP_IDLE_CHECK_SECONDS:
+            try:
+                if server.noop()[0] != 250:
+                    raise smtplib.SMTPServerDisconnected("NOOP failed")
+            except (smtplib.SMTPException, OSError):
+                self._close(server)
+                server = None
+        if server is None:
+            server = slot[0] = self._connect()
+        return server
+
+    @staticmethod
+    def _close(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def _send_all(self, slot: list, messages: List[MIMEMultipart]) -> List[Optional[str]]:
+        """Send messages back to back over one connection (runs in a thread)."""
+        errors: List[Optional[str]] = []
+        for message in messages:
+            for attempt in (1, 2):
+                try:
+                    self._live(slot).send_message(message)
+                    errors.append(None)
+                    break
+                except smtplib.SMTPServerDisconnected as e:
+                    # Dropped between messages; reconnect once
+                    slot[0] = None
+                    if attempt == 2:
+                        errors.append(str(e))
+                except (smtplib.SMTPException, OSError) as e:
+                    if isinstance(e, OSError):
+                        slot[0] = None
+                    errors.append(str(e))
+                    break
+        slot[1] = time.monotonic()
+        return errors
+
+    async def send(self, messages: List[MIMEMultipart]) -> List[Optional[str]]:
+        """
+        Send messages split across the pooled connections.
+
+        Returns:
+            An error string per message, None for each one sent
+        """
+        if not messages:
+            return []
+        pool = self._pool()
+        chunk = -(-len(messages) // self.size)
+        chunks = [messages[start:start + chunk] for start in range(0, len(messages), chunk)]
+
+        async def run(part: List[MIMEMultipart]) -> List[Optional[str]]:
+            slot = await pool.get()
+            try:
+                return await asyncio.to_thread(self._send_all, slot, part)
+            finally:
+                pool.put_nowait(slot)
+
+        results = await asyncio.gather(*(run(part) for part in chunks))
+        return [error for part in results for error in part]
+
+    async def close(self) -> None:
+        """Log out of every idle connection."""
+        if self._idle is None:
+            return
+        slots = []
+        while not self._idle.empty():
+            slots.append(self._idle.get_nowait())
+        for slot in slots:
+            if slot[0] is not None:
+                await asyncio.to_thread(self._close, slot[0])
+                slot[0] = None
+            self._idle.put_nowait(slot)
@@ -165,7 +165,12 @@ class AdminBackgroundTaskManager:
         cls._task_store[task_id] = task
         
         # Send notifications if needed
-        cls._send_task_notifications(task)
+        if status in (TaskStatus.COMPLETED, TaskStatus.FAILED):
+            try:
+                asyncio.get_running_loop().create_task(cls._send_task_notifications(task))
+            except RuntimeError:
+                # Celery worker threads have no running event loop
+                asyncio.run(cls._send_task_notifications(task))
         
         return task
     
@@ -4,8 +4,13 @@ from sqlalchemy import select, func, text
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload, contains_eager, selectinload
 
+from app.core.cache.codec import orm_row_from_cache
 from app.core.cache.redis_cache import redis_cache
-from app.db.async_session import get_async_session_local
+from app.core.optimization.partitioned_executor import (
+    PARTIAL_AGGREGATES,
+    order_by_sort_key,
+    partitioned_executor,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +20,9 @@ class CrossTenantQueryOptimizer:
     """
     Utility class for optimizing cross-tenant database queries
     for admin operations that need to work across multiple tenants.
+
+    Queries over more tenants than fit in one shard are split by tenant and
+    run concurrently through the partitioned executor.
     """
     
     ADMIN_QUERY_CACHE_PREFIX = "admin_query"
@@ -47,56 +55,65 @@ class CrossTenantQueryOptimizer:
             cache_expiration: Cache expiration time in seconds
             
         Returns:
-            List of model instances
+            List of model instances; cache hits are detached instances
+            rebuilt from their cached columns, without relationships
         """
         # Try to get from cache first if cache_key provided
         if cache_key:
             full_cache_key = f"{CrossTenantQueryOptimizer.ADMIN_QUERY_CACHE_PREFIX}:{cache_key}"
-            cached_result = await redis_cache.get(full_cache_key)
-            if cached_result:
+            cached_rows = await redis_cache.get(full_cache_key)
+            if cached_rows is not None:
                 logger.debug(f"Retrieved cross-tenant query results from cache: {full_cache_key}")
-                return cached_result
-        
-        # Build query
-        query = select(model_class)
-        
-        # Add tenant_id filter if provided
-        if tenant_ids:
-            query = query.filter(model_class.tenant_id.in_(tenant_ids))
-        
-        # Add additional filters if provided
-        if filter_conditions:
-            for condition in filter_conditions:
-                query = query.filter(condition)
-        
-        # Add joins if provided
-        if join_relationships:
-            for relationship in join_relationships:
-                query = query.options(selectinload(relationship))
-        
-        # Add ordering if provided
-        if order_by:
-            for order_clause in order_by:
-                query = query.order_by(order_clause)
-        
-        # Add pagination if provided
-        if limit:
-            query = query.limit(limit)
-        if offset:
-            query = query.offset(offset)
+                return [orm_row_from_cache(model_class, row) for row in cached_rows]
         
+        def build_query(shard: Optional[List[str]], row_limit: Optional[int]):
+            query = select(model_class)
+
+            # Add tenant_id filter if provided
+            if shard:
+                query = query.filter(model_class.tenant_id.in_(shard))
+
+            # Add additional filters if provided
+            if filter_conditions:
+                for condition in filter_conditions:
+                    query = query.filter(condition)
+
+            # Add joins if provided
+            if join_relationships:
+                for relationship in join_relationships:
+                    query = query.options(selectinload(relationship))
+
+            # Add ordering if provided
+            if order_by:
+                for order_clause in order_by:
+                    query = query.order_by(order_clause)
+
+            if row_limit is not None:
+                query = query.limit(row_limit)
+            return query
+
         # Execute query
         try:
-            async with get_async_session_local() as session:
-                result = await session.execute(query)
-                items = result.scalars().all()
-                
-                # Cache results if cache_key provided
-                if cache_key:
-                    full_cache_key = f"{CrossTenantQueryOptimizer.ADMIN_QUERY_CACHE_PREFIX}:{cache_key}"
-                    await redis_cache.set(full_cache_key, items, expiration=cache_expiration)
-                
-                return items
+            executor = partitioned_executor
+            sort_key = order_by_sort_key(model_class, order_by) if order_by else None
+            if tenant_ids and len(executor.shards(tenant_ids)) > 1 and (sort_key or not order_by):
+                # Fan out over tenant shards and merge
+                items = await executor.fetch(
+                    build_query, tenant_ids, sort_key=sort_key, limit=limit or None, offset=offset
+                )
+            else:
+                query = build_query(tenant_ids, limit or None)
+                if offset:
+                    query = query.offset(offset)
+                items = await executor.execute(query)
+
+            # Cache results if cache_key provided; the codec stores each
+            # row's loaded columns, not the ORM instance itself
+            if cache_key:
+                full_cache_key = f"{CrossTenantQueryOptimizer.ADMIN_QUERY_CACHE_PREFIX}:{cache_key}"
+                await redis_cache.set(full_cache_key, items, expire=cache_expiration)
+
+            return items
         except Exception as e:
             logger.error(f"Error executing cross-tenant query: {str(e)}")
             raise
@@ -136,36 +153,48 @@ class CrossTenantQueryOptimizer:
                 logger.debug(f"Retrieved cross-tenant aggregation from cache: {full_cache_key}")
                 return cached_result
         
-        # Build query
-        query = select(
-            group_by_column,
-            aggregation_func(aggregation_column).label("aggregated_value")
-        ).group_by(group_by_column)
-        
-        # Add tenant_id filter if provided
-        if tenant_ids:
-            query = query.filter(model_class.tenant_id.in_(tenant_ids))
-        
-        # Add additional filters if provided
-        if filter_conditions:
-            for condition in filter_conditions:
-                query = query.filter(condition)
-        
+        def build_query(shard: Optional[List[str]], columns: List[Any]):
+            query = select(group_by_column, *columns).group_by(group_by_column)
+
+            # Add tenant_id filter if provided
+            if shard:
+                query = query.filter(model_class.tenant_id.in_(shard))
+
+            # Add additional filters if provided
+            if filter_conditions:
+                for condition in filter_conditions:
+                    query = query.filter(condition)
+            return query
+
         # Execute query
         try:
-            async with get_async_session_local() as session:
-                result = await session.execute(query)
-                items = result.all()
-                
-                # Convert to dictionary
-                aggregation_dict = {str(item[0]): item[1] for item in items}
-                
-                # Cache results if cache_key provided
-                if cache_key:
-                    full_cache_key = f"{CrossTenantQueryOptimizer.ADMIN_QUERY_CACHE_PREFIX}:agg:{cache_key}"
-                    await redis_cache.set(full_cache_key, aggregation_dict, expiration=cache_expiration)
-                
-                return aggregation_dict
+            executor = partitioned_executor
+            aggregate = aggregation_func(aggregation_column)
+            partial = PARTIAL_AGGREGATES.get(getattr(aggregate, "name", "").lower())
+            if tenant_ids and partial and len(executor.shards(tenant_ids)) > 1:
+                # Aggregate each tenant shard, then combine the partials
+                if aggregate.name.lower() == "avg":
+                    columns = [func.sum(aggregation_column), func.count(aggregation_column)]
+                else:
+                    columns = [aggregate]
+                values = await executor.aggregate(
+                    lambda shard: build_query(shard, columns), tenant_ids, partial
+                )
+                items = list(values.items())
+            else:
+                items = await executor.execute(
+                    build_query(tenant_ids, [aggregate.label("aggregated_value")]), scalars=False
+                )
+
+            # Convert to dictionary
+            aggregation_dict = {str(item[0]): item[1] for item in items}
+
+            # Cache results if cache_key provided
+            if cache_key:
+                full_cache_key = f"{CrossTenantQueryOptimizer.ADMIN_QUERY_CACHE_PREFIX}:agg:{cache_key}"
+                await redis_cache.set(full_cache_key, aggregation_dict, expire=cache_expiration)
+
+            return aggregation_dict
         except Exception as e:
             logger.error(f"Error executing cross-tenant aggregation query: {str(e)}")
             raise
@@ -0,0 +1,280 @@
+"""
+Partitioned executor for cross-tenant admin queries.
+
+Provides:
+- Splitting of tenant sets into shards queried concurrently on pooled sessions
+- A process-wide concurrency limit so admin fan-out can't drain the pool
+- A k-way merge of per-shard ordered results
+- Combination of per-shard partial aggregates for GROUP BY queries
+- Early cancellation of outstanding shards once an unordered limit is met
+
+Each shard of an ordered query only needs its own first offset + limit rows,
+so shard queries are limited in the database and their results merged
+lazily; only the requested page is ever materialized past the merge.
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
+
+from app.core.db.session import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHARD_SIZE = 250
+DEFAULT_MAX_CONCURRENCY = 4
+
+# build_query(shard_tenant_ids, row_limit) -> executable statement
+QueryBuilder = Callable[[List[Any], Optional[int]], Any]
+
+
+class _Descending:
+    """Inverts the ordering of the wrapped sort value"""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def _nulls(value: Any, nulls_last: bool) -> Tuple[int, Any]:
+    if value is None:
+        return (1, 0) if nulls_last else (-1, 0)
+    return (0, value)
+
+
+def order_by_sort_key(model_class: Any, order_by: Sequence[Any]) -> Optional[Callable[[Any], Tuple]]:
+    """
+    Python sort key equivalent to a list of ORDER BY clauses on model columns.
+
+    NULL placement follows PostgreSQL defaults: last for ascending columns,
+    first for descending ones, unless nulls_first()/nulls_last() is given.
+
+    Args:
+        model_class: Mapped class whose instances are being sorted
+        order_by: ORDER BY clauses, e.g. [Order.created_at.desc(), Order.id]
+
+    Returns:
+        A key function for model instances, or None if a clause is not a
+        plain (optionally asc/desc/nulls-ordered) mapped column
+    """
+    mapper = sa_inspect(model_class)
+    parts = []
+    for clause in order_by:
+        element = clause.__clause_element__() if hasattr(clause, "__clause_element__") else clause
+        descending = False
+        nulls_last = None
+        while isinstance(element, UnaryExpression):
+            if element.modifier is operators.desc_op:
+                descending = True
+            elif element.modifier is operators.nulls_first_op:
+                nulls_last = False
+            elif element.modifier is operators.nulls_last_op:
+                nulls_last = True
+            elif element.modifier is not operators.asc_op:
+                return None
+            element = element.element
+        try:
+            key = mapper.get_property_by_column(element).key
+        except Exception:
+            return None
+        if nulls_last is None:
+            nulls_last = not descending
+        # Descending inverts the whole tuple, so invert NULL placement first
+        parts.append((key, descending, nulls_last != descending))
+
+    def sort_key(instance: Any) -> Tuple:
+        values = []
+        for key, descending, nulls_last in parts:
+            value = _nulls(getattr(instance, key), nulls_last)
+            values.append(_Descending(value) if descending else value)
+        return tuple(values)
+
+    return sort_key
+
+
+@dataclass(frozen=True)
+class PartialAggregate:
+    """How per-shard aggregate columns are combined and finalized"""
+    combine: Callable[[Tuple, Tuple], Tuple]
+    finalize: Callable[[Tuple], Any]
+
+
+def _sum_none(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return a + b
+
+
+def _pick(choose):
+    def combine(a, b):
+        if a is None:
+            return b
+        if b is None:
+            return a
+        return choose(a, b)
+    return combine
+
+
+def _elementwise(combine_one):
+    return lambda left, right: tuple(combine_one(a, b) for a, b in zip(left, right))
+
+
+def _average(partial: Tuple) -> Any:
+    total, count = partial
+    return total / count if count else None
+
+
+PARTIAL_AGGREGATES: Dict[str, PartialAggregate] = {
+    "count": PartialAggregate(_elementwise(_sum_none), lambda partial: partial[0] or 0),
+    "sum": PartialAggregate(_elementwise(_sum_none), lambda partial: partial[0]),
+    "min": PartialAggregate(_elementwise(_pick(min)), lambda partial: partial[0]),
+    "max": PartialAggregate(_elementwise(_pick(max)), lambda partial: partial[0]),
+    # avg is computed from a per-shard (sum, count) pair
+    "avg": PartialAggregate(_elementwise(_sum_none), _average),
+}
+
+
+class PartitionedQueryExecutor:
+    """Runs tenant-sharded queries concurrently and merges their results"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Any] = AsyncSessionLocal,
+        shard_size: int = DEFAULT_SHARD_SIZE,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    ):
+        self.session_factory = session_factory
+        self.shard_size = shard_size
+        self.max_concurrency = max_concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Shared by every query on this executor to bound pooled connections
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def shards(self, tenant_ids: Sequence[Any]) -> List[List[Any]]:
+        """Split tenant IDs into shards of at most shard_size, deduplicated."""
+        unique = list(dict.fromkeys(tenant_ids))
+        return [unique[i:i + self.shard_size] for i in range(0, len(unique), self.shard_size)]
+
+    async def execute(self, statement: Any, scalars: bool = True) -> List[Any]:
+        """Run one statement on a pooled session within the concurrency limit."""
+        async with self.semaphore:
+            started = time.perf_counter()
+            async with self.session_factory() as session:
+                result = await session.execute(statement)
+                rows = result.scalars().all() if scalars else result.all()
+            logger.debug(
+                f"Partitioned query returned {len(rows)} rows in "
+                f"{(time.perf_counter() - started) * 1000:.1f}ms"
+            )
+            return rows
+
+    async def fetch(
+        self,
+        build_query: QueryBuilder,
+        tenant_ids: Sequence[Any],
+        sort_key: Optional[Callable[[Any], Any]] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        scalars: bool = True,
+    ) -> List[Any]:
+        """
+        Fetch rows for many tenants, one concurrent query per shard.
+
+        Args:
+            build_query: Builds the statement for a shard's tenant IDs and row
+                limit; it must apply its own ORDER BY when sort_key is given
+            tenant_ids: Tenants to query
+            sort_key: Python equivalent of the ORDER BY, used to merge shards
+            limit: Maximum rows to return
+            offset: Rows to skip in the merged order
+            scalars: Return scalar entities instead of rows
+
+        Returns:
+            The merged page of rows
+        """
+        shards = self.shards(tenant_ids)
+        if not shards:
+            return []
+        offset = offset or 0
+        needed = None if limit is None else offset + limit
+        page = slice(offset, needed)
+
+        if sort_key is not None:
+            results = await asyncio.gather(
+                *(self.execute(build_query(shard, needed), scalars) for shard in shards)
+            )
+            merged = heapq.merge(*results, key=sort_key)
+            return list(islice(merged, page.start, page.stop))
+
+        # Unordered: stop as soon as enough rows have arrived
+        tasks = [
+            asyncio.create_task(self.execute(build_query(shard, needed), scalars))
+            for shard in shards
+        ]
+        rows: List[Any] = []
+        try:
+            for completed in asyncio.as_completed(tasks):
+                rows.extend(await completed)
+                if needed is not None and len(rows) >= needed:
+                    break
+        finally:
+            cancelled = sum(task.cancel() for task in tasks if not task.done())
+            if cancelled:
+                logger.debug(f"Cancelled {cancelled} shard queries after reaching the limit")
+                await asyncio.gather(*tasks, return_exceptions=True)
+        return rows[page]
+
+    async def aggregate(
+        self,
+        build_query: Callable[[List[Any]], Any],
+        tenant_ids: Sequence[Any],
+        partial: PartialAggregate,
+    ) -> Dict[Any, Any]:
+        """
+        Run a GROUP BY per shard and combine the partial aggregates.
+
+        Args:
+            build_query: Builds a statement returning (group, *partial columns)
+                rows for a shard's tenant IDs
+            tenant_ids: Tenants to query
+            partial: How to combine and finalize the partial columns
+
+        Returns:
+            Final aggregate value by group
+        """
+        results = await asyncio.gather(
+            *(self.execute(build_query(shard), scalars=False) for shard in self.shards(tenant_ids))
+        )
+        combined: Dict[Any, Tuple] = {}
+        for rows in results:
+            for group, *values in rows:
+                values = tuple(values)
+                current = combined.get(group)
+                combined[group] = values if current is None else partial.combine(current, values)
+        return {group: partial.finalize(values) for group, values in combined.items()}
+
+
+# Global partitioned executor instance
+partitioned_executor = PartitionedQueryExecutor()
@@ -9,7 +9,6 @@ Provides:
 - Tenant-aware caching
 """
 
-import json
 import uuid
 import hashlib
 import asyncio
@@ -21,6 +20,8 @@ import redis.asyncio as redis
 from fastapi import BackgroundTasks
 import logging
 
+from app.core.cache.codec import CacheCodecError, cache_codec
+
 logger = logging.getLogger(__name__)
 
 
@@ -104,10 +105,9 @@ class MerchantCacheManager:
         """Initialize cache manager and connections."""
         try:
             # Initialize Redis connection
+            # Values are binary codec payloads, so responses stay as bytes
             self._redis_pool = redis.Redis.from_url(
                 self.redis_url,
-                encoding="utf-8",
-                decode_responses=True,
                 max_connections=20
             )
 
@@ -348,7 +348,7 @@ class MerchantCacheManager:
 
         logger.info(f"Cache warmed with {len(warm_data)} entries")
 
-    async def _set_memory_cache(self, key: str, value: str, ttl: int) -> None:
+    async def _set_memory_cache(self, key: str, value: bytes, ttl: int) -> None:
         """Set value in L1 memory cache with size limits."""
         # Check cache size limit
         if len(self._memory_cache) >= self.max_memory_cache_size:
@@ -432,19 +432,19 @@ class MerchantCacheManager:
                 f"avg_response_time={metrics.avg_response_time:.3f}s"
             )
 
-    def _serialize_value(self, value: Any) -> str:
+    def _serialize_value(self, value: Any) -> bytes:
         """Serialize value for cache storage."""
         try:
-            return json.dumps(value, default=str)
-        except (TypeError, ValueError) as e:
+            return cache_codec.encode(value)
+        except CacheCodecError as e:
             logger.warning(f"Cache serialization failed: {e}")
-            return str(value)
+            return cache_codec.encode(str(value))
 
-    def _deserialize_value(self, value: str) -> Any:
+    def _deserialize_value(self, value: bytes) -> Any:
         """Deserialize value from cache storage."""
         try:
-            return json.loads(value)
-        except (TypeError, ValueError):
+            return cache_codec.decode(value)
+        except CacheCodecError:
             return value
 
     def _record_hit(self, namespace: str) -> None:
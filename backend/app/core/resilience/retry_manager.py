@@ -437,6 +437,24 @@ class MerchantRetryManager:
         else:
             logger.error(f"All retry attempts failed: {error_details}")
 
+    def ensure_circuit_breaker(self, service_name: str, config: Optional[CircuitBreakerConfig] = None) -> None:
+        """Configure a circuit breaker for a service unless one already exists."""
+        if service_name not in self._circuit_states:
+            self.configure_circuit_breaker(service_name, config or CircuitBreakerConfig())
+
+    def allow_call(self, service_name: str) -> bool:
+        """Return True if the service's circuit breaker lets a call through."""
+        return self._is_circuit_closed(service_name)
+
+    def record_call_success(self, service_name: str) -> None:
+        """Record a successful call made outside ``execute_with_retry``."""
+        self._record_success(service_name)
+
+    def record_call_failure(self, service_name: str, exception: Exception, operation_name: str = "") -> None:
+        """Record a failed call made outside ``execute_with_retry``."""
+        context = ErrorContext(operation_name=operation_name or service_name)
+        self._record_failure(service_name, context, exception)
+
     def get_circuit_status(self) -> Dict[str, Any]:
         """Get current circuit breaker status."""
         status = {}
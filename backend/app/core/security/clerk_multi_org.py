@@ -8,11 +8,12 @@ It can validate tokens from either organization and assign appropriate roles.
 import os
 import jwt
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from fastapi import HTTPException, status
 from pydantic import BaseModel
 
 from app.core.config.settings import get_settings
+from app.core.security.token_cache import VerifiedTokenCache, auth_stage
 
 # Check if we're in test mode
 IS_TEST_MODE = os.getenv("TESTING", "").lower() in (
@@ -20,6 +21,9 @@ IS_TEST_MODE = os.getenv("TESTING", "").lower() in (
 
 settings = get_settings()
 
+ADMIN_AUDIENCE = "admin-audience"
+SELLER_AUDIENCE = "seller-audience"
+
 
 class MultiOrgClerkTokenData(BaseModel):
     """Multi-organization Clerk token data."""
@@ -65,6 +69,7 @@ class MultiOrgClerkService:
         self.admin_secret_key = settings.ADMIN_CLERK_SECRET_KEY
         self.seller_public_key = settings.SELLER_CLERK_PUBLISHABLE_KEY
         self.admin_public_key = settings.ADMIN_CLERK_PUBLISHABLE_KEY
+        self.token_cache = VerifiedTokenCache()
 
     def _generate_test_token(self, user_id: str, email: str, roles: List[str],
                              org_source: str, expires_in: int = 3600) -> str:
@@ -83,7 +88,7 @@ class MultiOrgClerkService:
             "iat": iat_timestamp,
             "exp": exp_timestamp,
             "iss": "test-issuer",
-            "aud": "admin-audience" if org_source == "admin" else "seller-audience"
+            "aud": ADMIN_AUDIENCE if org_source == "admin" else SELLER_AUDIENCE
         }
 
         # Use the appropriate secret key based on org source
@@ -136,52 +141,68 @@ class MultiOrgClerkService:
             detail="Invalid test token"
         )
 
+    def _key_for_token(self, token: str) -> Optional[Tuple[str, str, str]]:
+        """
+        Pick the verification key from the token's unverified audience.
+
+        Returns:
+            (organization_source, secret_key, audience), or None if the token
+            is malformed or targets an organization without a configured key
+        """
+        try:
+            claims = jwt.decode(token, options={"verify_signature": False})
+        except jwt.InvalidTokenError:
+            return None
+
+        audience = claims.get("aud")
+        audiences = audience if isinstance(audience, list) else [audience]
+        for source, secret_key, expected in (
+            ("admin", self.admin_secret_key, ADMIN_AUDIENCE),
+            ("seller", self.seller_secret_key, SELLER_AUDIENCE),
+        ):
+            if secret_key and expected in audiences:
+                return source, secret_key, expected
+        return None
+
     def _verify_production_token(self, token: str) -> MultiOrgClerkTokenData:
         """Verify a production Clerk JWT token."""
-        # Try admin org first if admin secret key is available
-        if self.admin_secret_key:
-            try:
-                payload = jwt.decode(
-                    token,
-                    self.admin_secret_key,
-                    algorithms=["HS256"],
-                    audience="admin-audience"
-                )
-                return MultiOrgClerkTokenData(
-                    user_id=payload["sub"],
-                    email=payload["email"],
-                    roles=payload.get("roles", []),
-                    metadata=payload.get("metadata", {}),
-                    organization_source="admin",
-                    exp=payload.get("exp"),
-                    iat=payload.get("iat")
-                )
-            except (jwt.InvalidTokenError, Exception):
-                # Continue to try seller key if admin key fails
-                pass
-                
-        # Try seller org if seller secret key is available
-        if self.seller_secret_key:
+        with auth_stage("token_cache"):
+            cached = self.token_cache.get(token)
+        if cached is not None:
+            # Callers may annotate the returned claims (roles, metadata), so hand out a deep copy
+            return cached.model_copy(deep=True)
+
+        with auth_stage("token_route"):
+            route = self._key_for_token(token)
+
+        if route is not None:
+            source, secret_key, audience = route
             try:
-                payload = jwt.decode(
-                    token,
-                    self.seller_secret_key,
-                    algorithms=["HS256"],
-                    audience="seller-audience"
-                )
-                return MultiOrgClerkTokenData(
+                with auth_stage("token_verify"):
+                    payload = jwt.decode(
+                        token,
+                        secret_key,
+                        algorithms=["HS256"],
+                        audience=audience
+                    )
+                token_data = MultiOrgClerkTokenData(
                     user_id=payload["sub"],
                     email=payload["email"],
                     roles=payload.get("roles", []),
                     metadata=payload.get("metadata", {}),
-                    organization_source="seller",
+                    organization_source=source,
                     exp=payload.get("exp"),
                     iat=payload.get("iat")
                 )
-            except (jwt.InvalidTokenError, jwt.ExpiredSignatureError):
-                pass
+            except (jwt.InvalidTokenError, KeyError, ValueError):
+                token_data = None
+
+            if token_data is not None:
+                self.token_cache.set(token, token_data, token_data.exp)
+                return token_data.model_copy(deep=True)
 
-        # If both fail, token is invalid
+        # Token is malformed, signed with the wrong key, expired, or for an
+        # organization whose key is not configured
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token or missing authentication keys"
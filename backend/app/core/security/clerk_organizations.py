@@ -8,7 +8,9 @@ This service handles Clerk Organizations integration specifically for SuperAdmin
 - Domain-specific authentication
 """
 
+import copy
 import os
+import time
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timezone
 
@@ -17,6 +19,14 @@ from fastapi import HTTPException, status
 
 from app.core.logging import logger
 from app.core.config.settings import get_settings
+from app.core.http.outbound import outbound_http
+from app.core.security.token_cache import ExpiringLRUCache, auth_stage
+
+CLERK_PROVIDER = "clerk"
+CLERK_API_TIMEOUT = 5.0
+# Membership changes made outside this service show up within this window
+MEMBERSHIP_CACHE_TTL = 30
+MEMBERSHIP_CACHE_SIZE = 5000
 
 
 class ClerkOrganizationsService:
@@ -32,6 +42,10 @@ class ClerkOrganizationsService:
         self.clerk_secret_key = os.getenv("CLERK_SECRET_KEY")
         self.clerk_base_url = "https://api.clerk.com/v1"
         self.super_admin_org_id = "org_2zWGCeV8c2H56B4ZcK5QmDOv9vL"
+        self.membership_ttl = MEMBERSHIP_CACHE_TTL
+        self._membership_cache: ExpiringLRUCache[List[Dict[str, Any]]] = ExpiringLRUCache(
+            "org_membership", MEMBERSHIP_CACHE_SIZE
+        )
 
         if not self.clerk_secret_key:
             raise ValueError(
@@ -44,35 +58,62 @@ class ClerkOrganizationsService:
             "Content-Type": "application/json"
         }
 
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """Call the Clerk API through the shared pooled client."""
+        return await outbound_http.request(
+            CLERK_PROVIDER,
+            method,
+            f"{self.clerk_base_url}{path}",
+            headers=self._get_headers(),
+            timeout=CLERK_API_TIMEOUT,
+            **kwargs
+        )
+
     async def get_user_organizations(self, user_id: str) -> List[Dict[str, Any]]:
         """
         Get all organizations for a user.
 
+        Memberships are cached for a short TTL; failed lookups are not cached.
+
         Args:
             user_id: Clerk user ID
 
         Returns:
             List of organization memberships
         """
+        cached = self._membership_cache.get(user_id)
+        if cached is not None:
+            # Callers get their own copy so they can't alter the cached entry
+            return copy.deepcopy(cached)
+
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.clerk_base_url}/users/{user_id}/organization_memberships",
-                    headers=self._get_headers()
+            with auth_stage("org_membership"):
+                response = await self._request(
+                    "GET", f"/users/{user_id}/organization_memberships"
                 )
 
-                if response.status_code != 200:
-                    logger.error(
-                        f"Failed to get user organizations: {response.status_code} - {response.text}")
-                    return []
+            if response.status_code != 200:
+                logger.error(
+                    f"Failed to get user organizations: {response.status_code} - {response.text}")
+                return []
 
-                data = response.json()
-                return data.get("data", [])
+            memberships = response.json().get("data", [])
+            self._membership_cache.set(
+                user_id, copy.deepcopy(memberships), time.time() + self.membership_ttl
+            )
+            return memberships
 
         except Exception as e:
             logger.error(f"Error getting user organizations: {str(e)}")
             return []
 
+    def invalidate_user_organizations(self, user_id: Optional[str] = None) -> None:
+        """Drop cached memberships for a user, or for everyone."""
+        if user_id is None:
+            self._membership_cache.clear()
+        else:
+            self._membership_cache.pop(user_id)
+
     async def is_super_admin(self, user_id: str) -> bool:
         """
         Check if a user is a member of the SuperAdmin organization.
@@ -137,19 +178,17 @@ class ClerkOrganizationsService:
         try:
             target_org_id = org_id or self.super_admin_org_id
 
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.clerk_base_url}/organizations/{target_org_id}/memberships",
-                    headers=self._get_headers()
-                )
+            response = await self._request(
+                "GET", f"/organizations/{target_org_id}/memberships"
+            )
 
-                if response.status_code != 200:
-                    logger.error(
-                        f"Failed to get organization members: {response.status_code} - {response.text}")
-                    return []
+            if response.status_code != 200:
+                logger.error(
+                    f"Failed to get organization members: {response.status_code} - {response.text}")
+                return []
 
-                data = response.json()
-                return data.get("data", [])
+            data = response.json()
+            return data.get("data", [])
 
         except Exception as e:
             logger.error(f"Error getting organization members: {str(e)}")
@@ -167,25 +206,24 @@ class ClerkOrganizationsService:
             Invitation details
         """
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.clerk_base_url}/organizations/{self.super_admin_org_id}/invitations",
-                    headers=self._get_headers(),
-                    json={
-                        "email_address": email,
-                        "role": role
-                    }
-                )
+            response = await self._request(
+                "POST",
+                f"/organizations/{self.super_admin_org_id}/invitations",
+                json={
+                    "email_address": email,
+                    "role": role
+                }
+            )
 
-                if response.status_code not in [200, 201]:
-                    logger.error(
-                        f"Failed to invite super admin: {response.status_code} - {response.text}")
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Failed to send invitation: {response.text}"
-                    )
+            if response.status_code not in [200, 201]:
+                logger.error(
+                    f"Failed to invite super admin: {response.status_code} - {response.text}")
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Failed to send invitation: {response.text}"
+                )
 
-                return response.json()
+            return response.json()
 
         except HTTPException:
             raise
@@ -223,18 +261,17 @@ class ClerkOrganizationsService:
                 return False
 
             # Remove the membership
-            async with httpx.AsyncClient() as client:
-                response = await client.delete(
-                    f"{self.clerk_base_url}/organization_memberships/{membership_id}",
-                    headers=self._get_headers()
-                )
+            response = await self._request(
+                "DELETE", f"/organization_memberships/{membership_id}"
+            )
+            self.invalidate_user_organizations(user_id)
 
-                if response.status_code != 200:
-                    logger.error(
-                        f"Failed to remove super admin: {response.status_code} - {response.text}")
-                    return False
+            if response.status_code != 200:
+                logger.error(
+                    f"Failed to remove super admin: {response.status_code} - {response.text}")
+                return False
 
-                return True
+            return True
 
         except Exception as e:
             logger.error(f"Error removing super admin: {str(e)}")
@@ -268,19 +305,19 @@ class ClerkOrganizationsService:
                 return False
 
             # Update the role
-            async with httpx.AsyncClient() as client:
-                response = await client.patch(
-                    f"{self.clerk_base_url}/organization_memberships/{membership_id}",
-                    headers=self._get_headers(),
-                    json={"role": new_role}
-                )
+            response = await self._request(
+                "PATCH",
+                f"/organization_memberships/{membership_id}",
+                json={"role": new_role}
+            )
+            self.invalidate_user_organizations(user_id)
 
-                if response.status_code != 200:
-                    logger.error(
-                        f"Failed to update super admin role: {response.status_code} - {response.text}")
-                    return False
+            if response.status_code != 200:
+                logger.error(
+                    f"Failed to update super admin role: {response.status_code} - {response.text}")
+                return False
 
-                return True
+            return True
 
         except Exception as e:
             logger.error(f"Error updating super admin role: {str(e)}")
@@ -299,18 +336,14 @@ class ClerkOrganizationsService:
         try:
             target_org_id = org_id or self.super_admin_org_id
 
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.clerk_base_url}/organizations/{target_org_id}",
-                    headers=self._get_headers()
-                )
+            response = await self._request("GET", f"/organizations/{target_org_id}")
 
-                if response.status_code != 200:
-                    logger.error(
-                        f"Failed to get organization info: {response.status_code} - {response.text}")
-                    return None
+            if response.status_code != 200:
+                logger.error(
+                    f"Failed to get organization info: {response.status_code} - {response.text}")
+                return None
 
-                return response.json()
+            return response.json()
 
         except Exception as e:
             logger.error(f"Error getting organization info: {str(e)}")
@@ -335,15 +368,11 @@ class ClerkOrganizationsService:
             # For main app domain (enwhe.io), allow regular users
             if domain in ["enwhe.io", "app.enwhe.io"]:
                 # Check if user exists and is active
-                async with httpx.AsyncClient() as client:
-                    response = await client.get(
-                        f"{self.clerk_base_url}/users/{user_id}",
-                        headers=self._get_headers()
-                    )
-
-                    if response.status_code == 200:
-                        user_data = response.json()
-                        return user_data.get("banned") is False
+                response = await self._request("GET", f"/users/{user_id}")
+
+                if response.status_code == 200:
+                    user_data = response.json()
+                    return user_data.get("banned") is False
 
             return False
 
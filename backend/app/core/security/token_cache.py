@@ -0,0 +1,126 @@
+"""
+Caches for the Clerk authentication path.
+
+Provides:
+- A bounded LRU of verified token claims, kept until the token expires
+- A short-TTL LRU used for Clerk organization memberships
+- Per-stage authentication latency metrics
+
+Tokens are keyed by a digest rather than stored verbatim, and only tokens
+that verified successfully are cached, so garbage bearer tokens cannot
+grow or poison the cache.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Generic, Hashable, Optional, Tuple, TypeVar
+
+from prometheus_client import Counter, Histogram
+
+auth_stage_duration = Histogram(
+    "auth_stage_duration_seconds",
+    "Latency of each authentication stage in seconds",
+    ["stage"],
+    buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+auth_cache_lookups = Counter(
+    "auth_cache_lookups_total",
+    "Authentication cache lookups by cache and outcome",
+    ["cache", "outcome"],
+)
+
+DEFAULT_TOKEN_CACHE_SIZE = 10000
+# Never trust a cached verification for longer than this, even if exp is later
+MAX_TOKEN_CACHE_SECONDS = 300
+
+V = TypeVar("V")
+
+
+@contextmanager
+def auth_stage(stage: str):
+    """Time an authentication stage into auth_stage_duration_seconds."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        auth_stage_duration.labels(stage).observe(time.perf_counter() - start)
+
+
+class ExpiringLRUCache(Generic[V]):
+    """Bounded LRU whose entries carry their own absolute expiry time"""
+
+    def __init__(self, name: str, max_size: int):
+        self.name = name
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[V]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                auth_cache_lookups.labels(self.name, "hit").inc()
+                return value
+            del self._entries[key]
+        auth_cache_lookups.labels(self.name, "miss").inc()
+        return None
+
+    def set(self, key: Hashable, value: V, expires_at: float) -> None:
+        if expires_at <= time.time():
+            return
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class VerifiedTokenCache:
+    """LRU of verified token claims keyed by token digest"""
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_TOKEN_CACHE_SIZE,
+        max_age: int = MAX_TOKEN_CACHE_SECONDS,
+    ):
+        self.max_age = max_age
+        self._cache: ExpiringLRUCache[Any] = ExpiringLRUCache("verified_token", max_size)
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+
+    def get(self, token: str) -> Optional[Any]:
+        return self._cache.get(self.key(token))
+
+    def set(self, token: str, claims: Any, exp: Optional[int]) -> None:
+        """
+        Cache verified claims.
+
+        Args:
+            token: Raw bearer token
+            claims: Verified claims object
+            exp: Token expiry as a Unix timestamp; tokens without one are
+                cached for max_age only
+        """
+        expires_at = time.time() + self.max_age
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+        self._cache.set(self.key(token), claims, expires_at)
+
+    def clear(self) -> None:
+        self._cache.clear()
@@ -0,0 +1,282 @@
+"""
+WebSocket hub for tenant and user fan-out.
+
+Publishers hand a message to the hub and return; a dispatcher task encodes
+it once and offers the same text to every matching connection. Each
+connection has a bounded send queue drained by its own writer task, so one
+slow client never holds up a broadcast.
+
+Provides:
+- Any number of sockets per tenant and per user
+- Slow-consumer eviction when a send queue fills or a send times out
+- Cross-worker fan-out over a Redis pub/sub channel
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Set
+
+from fastapi import WebSocket
+from prometheus_client import Counter, Gauge
+
+from app.core.cache.redis_cache import redis_cache
+
+logger = logging.getLogger(__name__)
+
+WEBSOCKET_FANOUT_CHANNEL = "websocket:fanout"
+TENANT_SCOPE = "tenant"
+USER_SCOPE = "user"
+# Messages a connection may have waiting before it is evicted as a slow consumer
+SEND_QUEUE_SIZE = 256
+# Longest a single send may take before the connection is evicted
+SEND_TIMEOUT = 10.0
+# Broadcasts waiting for the dispatcher; beyond this they are dropped
+PENDING_BROADCASTS = 10000
+LISTENER_RETRY_DELAY = 5.0
+# Close code for evicted slow consumers (RFC 6455 "try again later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+websocket_connections = Gauge(
+    "websocket_connections",
+    "Open WebSocket connections on this worker",
+)
+websocket_evictions_total = Counter(
+    "websocket_evictions_total",
+    "WebSocket connections evicted as slow consumers",
+    ["reason"],
+)
+
+
+def encode_message(message: Any) -> str:
+    """Encode a message once for every socket that receives it."""
+    return json.dumps(message, default=str, separators=(",", ":"))
+
+
+class HubConnection:
+    """One accepted socket with its bounded send queue and writer task"""
+
+    def __init__(self, hub: "WebSocketHub", websocket: WebSocket, tenant_id: str, user_id: str):
+        self.hub = hub
+        self.websocket = websocket
+        self.tenant_id = tenant_id
+        self.user_id = user_id
+        self.connected_at = datetime.now(timezone.utc)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=hub.send_queue_size)
+        self.closed = False
+        self._writer: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._writer = asyncio.create_task(self._write())
+
+    def offer(self, text: str) -> bool:
+        """
+        Queue encoded text without waiting.
+
+        Returns:
+            False if the connection was evicted because its queue is full
+        """
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            self.hub.evict(self, "queue_full")
+            return False
+
+    async def _write(self):
+        while True:
+            text = await self.queue.get()
+            try:
+                await asyncio.wait_for(self.websocket.send_text(text), self.hub.send_timeout)
+            except asyncio.TimeoutError:
+                self.hub.evict(self, "send_timeout")
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.info(f"WebSocket send failed for tenant {self.tenant_id}, user {self.user_id}: {str(e)}")
+                self.hub.disconnect(self)
+                return
+
+    async def close(self, code: int):
+        # The writer may be the caller; never cancel the running task
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+
+class WebSocketHub:
+    """Process-wide registry of sockets and the broadcast dispatcher"""
+
+    def __init__(
+        self,
+        cache=redis_cache,
+        send_queue_size: int = SEND_QUEUE_SIZE,
+        send_timeout: float = SEND_TIMEOUT,
+        pending_size: int = PENDING_BROADCASTS,
+    ):
+        self.cache = cache
+        self.send_queue_size = send_queue_size
+        self.send_timeout = send_timeout
+        self.pending_size = pending_size
+        # Identifies this worker's own messages when they come back from Redis
+        self.origin = uuid.uuid4().hex
+        self.tenants: Dict[str, Set[HubConnection]] = {}
+        self.users: Dict[str, Set[HubConnection]] = {}
+        self._pending: Optional[asyncio.Queue] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._listener: Optional[asyncio.Task] = None
+        self._fanout = False
+
+    async def connect(self, websocket: WebSocket, tenant_id: str, user_id: str) -> HubConnection:
+        """Accept a socket and register it under its tenant and user."""
+        await websocket.accept()
+        connection = HubConnection(self, websocket, str(tenant_id), str(user_id))
+        self.tenants.setdefault(connection.tenant_id, set()).add(connection)
+        self.users.setdefault(connection.user_id, set()).add(connection)
+        connection.start()
+        websocket_connections.inc()
+        logger.info(f"New WebSocket connection for tenant {tenant_id}, user {user_id}")
+        return connection
+
+    def disconnect(self, connection: HubConnection):
+        """Unregister a connection and stop its writer; safe to call twice."""
+        if connection.closed:
+            return
+        connection.closed = True
+        for index, key in ((self.tenants, connection.tenant_id), (self.users, connection.user_id)):
+            members = index.get(key)
+            if members is not None:
+                members.discard(connection)
+                if not members:
+                    del index[key]
+        if connection._writer is not None and connection._writer is not asyncio.current_task():
+            connection._writer.cancel()
+        websocket_connections.dec()
+        logger.info(f"WebSocket disconnected for tenant {connection.tenant_id}, user {connection.user_id}")
+
+    def evict(self, connection: HubConnection, reason: str):
+        """Drop a slow consumer and close its socket in the background."""
+        if connection.closed:
+            return
+        logger.warning(
+            f"Evicting slow WebSocket consumer for tenant {connection.tenant_id}, "
+            f"user {connection.user_id}: {reason}"
+        )
+        websocket_evictions_total.labels(reason=reason).inc()
+        self.disconnect(connection)
+        asyncio.create_task(connection.close(SLOW_CONSUMER_CLOSE_CODE))
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._pending = asyncio.Queue(maxsize=self.pending_size)
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    def _submit(self, scope: str, key: str, message: Any):
+        self._ensure_dispatcher()
+        try:
+            self._pending.put_nowait((scope, str(key), message))
+        except asyncio.QueueFull:
+            logger.error(f"WebSocket broadcast queue full, dropping {scope} message for {key}")
+
+    async def broadcast_to_tenant(self, tenant_id: str, message: Any):
+        """Queue a message for every socket of a tenant, on every worker."""
+        self._submit(TENANT_SCOPE, tenant_id, message)
+
+    async def send_to_user(self, user_id: str, message: Any):
+        """Queue a message for every socket of a user, on every worker."""
+        self._submit(USER_SCOPE, user_id, message)
+
+    def deliver(self, scope: str, key: str, text: str) -> int:
+        """
+        Offer encoded text to this worker's matching connections.
+
+        Returns:
+            Number of connections the text was queued for
+        """
+        index = self.tenants if scope == TENANT_SCOPE else self.users
+        delivered = 0
+        # Copy: a full queue evicts and mutates the set mid-iteration
+        for connection in tuple(index.get(key, ())):
+            if connection.offer(text):
+                delivered += 1
+        return delivered
+
+    async def _dispatch(self):
+        while True:
+            scope, key, message = await self._pending.get()
+            try:
+                text = encode_message(message)
+                self.deliver(scope, key, text)
+                if self._fanout:
+                    await self.cache.publish(WEBSOCKET_FANOUT_CHANNEL, f"{self.origin}|{scope}|{key}|{text}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error broadcasting to {scope} {key}: {str(e)}")
+
+    def _on_fanout(self, payload: Any):
+        if isinstance(payload, bytes):
+            payload = payload.decode("utf-8")
+        try:
+            origin, scope, key, text = payload.split("|", 3)
+        except (AttributeError, ValueError):
+            logger.warning("Ignoring malformed WebSocket fan-out message")
+            return
+        if origin != self.origin:
+            self.deliver(scope, key, text)
+
+    async def _listen(self):
+        while True:
+            pubsub = self.cache.pubsub()
+            if pubsub is None:
+                # Redis is down; broadcasts reach this worker's sockets only
+                await asyncio.sleep(LISTENER_RETRY_DELAY)
+                continue
+            try:
+                await pubsub.subscribe(WEBSOCKET_FANOUT_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._on_fanout(message.get("data"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"WebSocket fan-out listener disconnected: {str(e)}")
+            finally:
+                await pubsub.aclose()
+            await asyncio.sleep(LISTENER_RETRY_DELAY)
+
+    def start(self):
+        """Start the dispatcher and cross-worker fan-out."""
+        self._ensure_dispatcher()
+        self._fanout = True
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        """Stop fan-out and the dispatcher, then close every socket."""
+        self._fanout = False
+        for task in (self._listener, self._dispatcher):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._listener = self._dispatcher = None
+
+        connections = [connection for members in self.tenants.values() for connection in members]
+        for connection in connections:
+            self.disconnect(connection)
+        await asyncio.gather(*(connection.close(1001) for connection in connections))
+
+
+# Global WebSocket hub instance
+websocket_hub = WebSocketHub()
@@ -1,6 +1,5 @@
 import logging
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List
 from uuid import UUID
 
 from fastapi import Depends, WebSocket, WebSocketDisconnect
@@ -8,6 +7,7 @@ from fastapi import Depends, WebSocket, WebSocketDisconnect
 from app.core.config.settings import get_settings
 from app.core.security.clerk_multi_org import MultiOrgClerkTokenData as ClerkTokenData
 from app.core.security.auth_deps import require_auth
+from app.core.websocket.hub import WebSocketHub, encode_message, websocket_hub
 from app.db.async_session import get_async_session_local
 from app.models.audit.audit_log import AuditLog
 
@@ -15,84 +15,10 @@ settings = get_settings()
 logger = logging.getLogger(__name__)
 
 
-class ConnectionManager:
-    """Manages WebSocket connections and message broadcasting"""
-
-    def __init__(self):
-        # Store active connections by tenant_id
-        self.active_connections: Dict[str, List[WebSocket]] = {}
-        # Store user-specific connections
-        self.user_connections: Dict[str, WebSocket] = {}
-        # Store connection metadata
-        self.connection_metadata: Dict[str, Dict[str, Any]] = {}
-
-    async def connect(self, websocket: WebSocket, tenant_id: str, user_id: str):
-        """Connect a new WebSocket client"""
-        await websocket.accept()
-
-        # Store connection
-        if tenant_id not in self.active_connections:
-            self.active_connections[tenant_id] = []
-        self.active_connections[tenant_id].append(websocket)
-
-        # Store user connection
-        self.user_connections[user_id] = websocket
-
-        # Store metadata
-        self.connection_metadata[str(websocket)] = {
-            "tenant_id": tenant_id,
-            "user_id": user_id,
-            "connected_at": datetime.now(timezone.utc),
-        }
-
-        logger.info(
-            f"New WebSocket connection for tenant {tenant_id}, user {user_id}")
-
-    def disconnect(self, websocket: WebSocket):
-        """Remove a disconnected WebSocket client"""
-        metadata = self.connection_metadata.get(str(websocket), {})
-        tenant_id = metadata.get("tenant_id")
-        user_id = metadata.get("user_id")
-
-        if tenant_id and tenant_id in self.active_connections:
-            self.active_connections[tenant_id].remove(websocket)
-            if not self.active_connections[tenant_id]:
-                del self.active_connections[tenant_id]
-
-        if user_id in self.user_connections:
-            del self.user_connections[user_id]
-
-        if str(websocket) in self.connection_metadata:
-            del self.connection_metadata[str(websocket)]
-
-        logger.info(
-            f"WebSocket disconnected for tenant {tenant_id}, user {user_id}")
-
-    async def broadcast_to_tenant(self, tenant_id: str, message: dict):
-        """Broadcast a message to all connections in a tenant"""
-        if tenant_id in self.active_connections:
-            for connection in self.active_connections[tenant_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    logger.error(
-                        f"Error broadcasting to tenant {tenant_id}: {str(e)}")
-                    await self.disconnect(connection)
-
-    async def send_to_user(self, user_id: str, message: dict):
-        """Send a message to a specific user"""
-        if user_id in self.user_connections:
-            try:
-                await self.user_connections[user_id].send_json(message)
-            except Exception as e:
-                logger.error(f"Error sending to user {user_id}: {str(e)}")
-                await self.disconnect(self.user_connections[user_id])
-
-
 class ActivityMonitor:
     """Handles real-time activity monitoring and alerting"""
 
-    def __init__(self, connection_manager: ConnectionManager):
+    def __init__(self, connection_manager: WebSocketHub):
         self.connection_manager = connection_manager
         self.alert_thresholds = {
             "high": 5,  # Number of high-severity events before alert
@@ -108,10 +34,16 @@ class ActivityMonitor:
     async def process_activity(self, activity: dict):
         """Process a new activity and determine if alerts are needed"""
         try:
+            # Broadcast to tenant; the hub queues it and returns
+            await self.connection_manager.broadcast_to_tenant(
+                str(activity["tenant_id"]), {
+                    "type": "activity", "data": activity}
+            )
+
             # Store activity in database
-            db = get_async_session_local()
-            try:
-                audit_log = AuditLog(
+            sessionmaker = get_async_session_local()
+            async with sessionmaker() as db:
+                db.add(AuditLog(
                     user_id=activity["user_id"],
                     tenant_id=activity["tenant_id"],
                     action=activity["action"],
@@ -121,17 +53,8 @@ class ActivityMonitor:
                     user_agent=activity.get("user_agent"),
                     details=activity.get("details", {}),
                     timestamp=datetime.now(timezone.utc),
-                )
-                db.add(audit_log)
+                ))
                 await db.commit()
-            finally:
-                await db.close()
-
-            # Broadcast to tenant
-            await self.connection_manager.broadcast_to_tenant(
-                str(activity["tenant_id"]), {
-                    "type": "activity", "data": activity}
-            )
 
             # Check for alerts
             await self._check_alerts(activity)
@@ -275,8 +198,8 @@ class ActivityMonitor:
             logger.error(f"Error storing alert: {str(e)}")
 
 
-# Create global instances
-connection_manager = ConnectionManager()
+# Create global instances; tenant and user broadcasts go through the shared hub
+connection_manager = websocket_hub
 activity_monitor = ActivityMonitor(connection_manager)
 
 
@@ -286,13 +209,14 @@ async def get_websocket_endpoint(
     current_user: ClerkTokenData = Depends(require_auth),
 ):
     """WebSocket endpoint for real-time monitoring"""
+    connection = None
     try:
-        await connection_manager.connect(
+        connection = await connection_manager.connect(
             websocket, tenant_id, str(current_user.user_id)
         )
 
-        # Send initial connection success message
-        await websocket.send_json(
+        # Send initial connection success message ahead of any broadcast
+        connection.offer(encode_message(
             {
                 "type": "connection_status",
                 "status": "connected",
@@ -300,7 +224,7 @@ async def get_websocket_endpoint(
                 "tenant_id": tenant_id,
                 "timestamp": datetime.now(timezone.utc).isoformat(),
             }
-        )
+        ))
 
         # Keep connection alive and handle incoming messages
         while True:
@@ -309,7 +233,6 @@ async def get_websocket_endpoint(
                 # Handle any incoming messages if needed
                 # For now, we're just monitoring outgoing activities
             except WebSocketDisconnect:
-                connection_manager.disconnect(websocket)
                 break
             except Exception as e:
                 logger.error(f"WebSocket error: {str(e)}")
@@ -317,8 +240,9 @@ async def get_websocket_endpoint(
 
     except Exception as e:
         logger.error(f"Error in WebSocket connection: {str(e)}")
-        if websocket in connection_manager.active_connections.get(tenant_id, []):
-            connection_manager.disconnect(websocket)
+    finally:
+        if connection is not None:
+            connection_manager.disconnect(connection)
 
 
 # Example async DB access in websocket monitoring
@@ -0,0 +1,46 @@
+"""Add processing state to webhook events
+
+Webhook events are now claimed before processing and worked off
+asynchronously, so each row tracks its processing status and attempts.
+Existing rows were only written after processing and are marked processed.
+
+Revision ID: 20251018_webhook_processing
+Revises: 20250630_admin_rbac
+Create Date: 2025-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20251018_webhook_processing'
+down_revision = '20250630_admin_rbac'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('webhook_events', sa.Column('status', sa.String(20), nullable=False, server_default='processed'))
+    op.add_column('webhook_events', sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('webhook_events', sa.Column('last_error', sa.Text(), nullable=True))
+    op.add_column('webhook_events', sa.Column('received_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')))
+    op.add_column('webhook_events', sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')))
+    op.alter_column('webhook_events', 'processed_at', nullable=True, server_default=None)
+
+    op.create_index(
+        'ix_webhook_events_status_updated_at',
+        'webhook_events',
+        ['status', 'updated_at']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_webhook_events_status_updated_at', table_name='webhook_events')
+    op.execute("UPDATE webhook_events SET processed_at = updated_at WHERE processed_at IS NULL")
+    op.alter_column('webhook_events', 'processed_at', nullable=False, server_default=sa.text('now()'))
+    op.drop_column('webhook_events', 'updated_at')
+    op.drop_column('webhook_events', 'received_at')
+    op.drop_column('webhook_events', 'last_error')
+    op.drop_column('webhook_events', 'attempts')
+    op.drop_column('webhook_events', 'status')
@@ -0,0 +1,55 @@
+"""Add unique product SKU per tenant
+
+Bulk catalog imports upsert products by SKU with INSERT ... ON CONFLICT,
+which needs a unique index to arbitrate on. SKUs stay optional and soft
+deleted products release theirs. Legacy rows with a NULL is_deleted flag
+are backfilled so they are covered by the index.
+
+Existing duplicate SKUs within a tenant must be resolved before upgrading;
+the migration stops with the number of affected SKUs if any are found.
+
+Revision ID: 20251020_product_tenant_sku
+Revises: 20251018_webhook_processing
+Create Date: 2025-10-20 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20251020_product_tenant_sku'
+down_revision = '20251018_webhook_processing'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("UPDATE products SET is_deleted = false WHERE is_deleted IS NULL")
+    op.alter_column('products', 'is_deleted', server_default=sa.false())
+
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT count(*) FROM ("
+        "  SELECT tenant_id, sku FROM products"
+        "  WHERE sku IS NOT NULL AND is_deleted = false"
+        "  GROUP BY tenant_id, sku HAVING count(*) > 1"
+        ") d"
+    )).scalar()
+    if duplicates:
+        raise RuntimeError(
+            f"{duplicates} product SKUs are duplicated within a tenant; "
+            "rename or soft delete the duplicates before upgrading"
+        )
+
+    op.create_index(
+        'uq_products_tenant_sku',
+        'products',
+        ['tenant_id', 'sku'],
+        unique=True,
+        postgresql_where=sa.text('sku IS NOT NULL AND is_deleted = false')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_products_tenant_sku', table_name='products')
+    op.alter_column('products', 'is_deleted', server_default=None)
@@ -0,0 +1,60 @@
+"""Add cart versioning and unique cart owners
+
+Carts are written by the storefront and by chat flows through one engine
+that checks carts.version before every write. Carts are also upserted by
+their owner (user, phone number or session) per tenant, which needs a
+unique index per owner column. Where a tenant already has several carts
+for the same owner, the most recently updated one keeps the owner and the
+others are detached from it.
+
+Revision ID: 20251021_cart_versioning
+Revises: 20251020_product_tenant_sku
+Create Date: 2025-10-21 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20251021_cart_versioning'
+down_revision = '20251020_product_tenant_sku'
+branch_labels = None
+depends_on = None
+
+OWNER_COLUMNS = ('user_id', 'phone_number', 'session_id')
+
+
+def upgrade() -> None:
+    op.add_column('carts', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+    for column in OWNER_COLUMNS:
+        op.execute(
+            f"""
+            UPDATE carts SET {column} = NULL
+            WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, row_number() OVER (
+                        PARTITION BY tenant_id, {column}
+                        ORDER BY updated_at DESC NULLS LAST, created_at DESC NULLS LAST
+                    ) AS position
+                    FROM carts
+                    WHERE {column} IS NOT NULL
+                ) ranked
+                WHERE position > 1
+            )
+            """
+        )
+        op.create_index(
+            f'uq_carts_tenant_{column}',
+            'carts',
+            ['tenant_id', column],
+            unique=True,
+            postgresql_where=sa.text(f'{column} IS NOT NULL')
+        )
+
+
+def downgrade() -> None:
+    for column in OWNER_COLUMNS:
+        op.drop_index(f'uq_carts_tenant_{column}', table_name='carts')
+    op.drop_column('carts', 'version')
@@ -0,0 +1,67 @@
+"""Store storefront versions as shared chunks and parent deltas
+
+Storefront versions used to keep a full copy of the configuration each.
+New versions are stored as a tree of content-addressed chunks shared between
+versions, plus a delta to the parent version, and only every Nth version
+keeps a full snapshot as a restore checkpoint. Existing versions keep their
+snapshots and therefore all act as checkpoints.
+
+Revision ID: 20251022_storefront_chunks
+Revises: 20251021_cart_versioning
+Create Date: 2025-10-22 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '20251022_storefront_chunks'
+down_revision = '20251021_cart_versioning'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'storefront_version_chunks',
+        sa.Column('storefront_config_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('hash', sa.String(length=64), nullable=False),
+        sa.Column('content', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['storefront_config_id'], ['storefront_configs.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('storefront_config_id', 'hash')
+    )
+
+    op.add_column('storefront_versions', sa.Column('parent_version_id', postgresql.UUID(as_uuid=True), nullable=True))
+    op.add_column('storefront_versions', sa.Column('root_hash', sa.String(length=64), nullable=True))
+    op.add_column('storefront_versions', sa.Column('delta', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    op.create_foreign_key(
+        'fk_storefront_versions_parent',
+        'storefront_versions', 'storefront_versions',
+        ['parent_version_id'], ['id'],
+        ondelete='SET NULL'
+    )
+    op.alter_column('storefront_versions', 'configuration_snapshot', nullable=True)
+
+
+def downgrade() -> None:
+    # Materializing delta-only versions needs the application; refuse to
+    # drop their data silently
+    op.execute(
+        """
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM storefront_versions WHERE configuration_snapshot IS NULL) THEN
+                RAISE EXCEPTION 'storefront_versions has delta-only rows; materialize them before downgrading';
+            END IF;
+        END $$;
+        """
+    )
+    op.alter_column('storefront_versions', 'configuration_snapshot', nullable=False)
+    op.drop_constraint('fk_storefront_versions_parent', 'storefront_versions', type_='foreignkey')
+    op.drop_column('storefront_versions', 'delta')
+    op.drop_column('storefront_versions', 'root_hash')
+    op.drop_column('storefront_versions', 'parent_version_id')
+    op.drop_table('storefront_version_chunks')
@@ -0,0 +1,64 @@
+"""Add the domain event outbox and consumer offsets
+
+Domain events are written to event_outbox in the same transaction as the
+state change and delivered by a relay, instead of being dispatched in
+memory by the publishing request. The relay numbers committed rows with a
+log position; event_consumer_offsets records how far each consumer has
+processed that log.
+
+Revision ID: 20251023_event_outbox
+Revises: 20251022_storefront_chunks
+Create Date: 2025-10-23 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '20251023_event_outbox'
+down_revision = '20251022_storefront_chunks'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'event_outbox',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('event_id', sa.String(length=64), nullable=False),
+        sa.Column('event_type', sa.String(length=100), nullable=False),
+        sa.Column('tenant_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('aggregate_id', sa.String(length=64), nullable=False),
+        sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('clock_timestamp()'), nullable=False),
+        sa.Column('position', sa.BigInteger(), nullable=True),
+        sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('event_id'),
+        sa.UniqueConstraint('position')
+    )
+    op.create_index(
+        'ix_event_outbox_unsequenced',
+        'event_outbox',
+        ['created_at', 'id'],
+        postgresql_where=sa.text('position IS NULL')
+    )
+
+    op.create_table(
+        'event_consumer_offsets',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('consumer', sa.String(length=255), nullable=False),
+        sa.Column('position', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('consumer')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('event_consumer_offsets')
+    op.drop_index('ix_event_outbox_unsequenced', table_name='event_outbox')
+    op.drop_table('event_outbox')
@@ -0,0 +1,146 @@
+"""Partition audit logs by month and add hourly rollups
+
+audit_logs becomes a table range-partitioned by month on timestamp, with
+a BRIN index on timestamp in place of the timestamp btree indexes. The
+existing rows are copied into monthly partitions. Admin statistics read
+audit_log_rollups_hourly, which is backfilled here and then maintained by
+app.services.audit.audit_storage.
+
+Revision ID: 20251024_audit_partitions
+Revises: 20251023_event_outbox
+Create Date: 2025-10-24 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '20251024_audit_partitions'
+down_revision = '20251023_event_outbox'
+branch_labels = None
+depends_on = None
+
+COLUMNS = """
+    id UUID NOT NULL,
+    user_id UUID NOT NULL REFERENCES users(id),
+    ip_address VARCHAR(45),
+    user_agent VARCHAR(255),
+    timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+    action VARCHAR(100) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    resource_type VARCHAR(100) NOT NULL,
+    resource_id VARCHAR(100),
+    tenant_id UUID REFERENCES tenants(id),
+    details JSON,
+    message TEXT
+"""
+COLUMN_NAMES = (
+    "id, user_id, ip_address, user_agent, timestamp, action, status, "
+    "resource_type, resource_id, tenant_id, details, message"
+)
+LEGACY_INDEXES = (
+    "ix_audit_logs_user_id", "ix_audit_logs_timestamp", "ix_audit_logs_action",
+    "ix_audit_logs_resource_type", "ix_audit_logs_resource_id", "ix_audit_logs_tenant_id",
+    "idx_audit_user_action", "idx_audit_tenant_resource", "idx_audit_timestamp_action",
+)
+
+
+def upgrade() -> None:
+    has_table = sa.inspect(op.get_bind()).has_table('audit_logs')
+    if has_table:
+        op.rename_table('audit_logs', 'audit_logs_unpartitioned')
+        # Index and primary key names are schema-wide; free them for the new table
+        op.execute(f"DROP INDEX IF EXISTS {', '.join(LEGACY_INDEXES)}")
+        op.execute("ALTER TABLE audit_logs_unpartitioned RENAME CONSTRAINT audit_logs_pkey TO audit_logs_unpartitioned_pkey")
+
+    op.execute(f"CREATE TABLE audit_logs ({COLUMNS}, PRIMARY KEY (id, timestamp)) PARTITION BY RANGE (timestamp)")
+
+    # One partition per month from the oldest entry through two months ahead
+    first_month = "date_trunc('month', now())"
+    if has_table:
+        first_month = f"LEAST(date_trunc('month', (SELECT MIN(timestamp) FROM audit_logs_unpartitioned)), {first_month})"
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+            month timestamp := COALESCE({first_month}, date_trunc('month', now()));
+        BEGIN
+            WHILE month <= date_trunc('month', now()) + interval '2 months' LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF audit_logs FOR VALUES FROM (%L) TO (%L)',
+                    'audit_logs_' || to_char(month, 'YYYY_MM'), month, month + interval '1 month'
+                );
+                month := month + interval '1 month';
+            END LOOP;
+        END $$;
+        """
+    )
+    op.execute("CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT")
+
+    if has_table:
+        op.execute(
+            f"INSERT INTO audit_logs ({COLUMN_NAMES}) "
+            f"SELECT {COLUMN_NAMES} FROM audit_logs_unpartitioned"
+        )
+        op.drop_table('audit_logs_unpartitioned')
+
+    op.execute("CREATE INDEX brin_audit_logs_timestamp ON audit_logs USING brin (timestamp)")
+    op.create_index('idx_audit_user_action', 'audit_logs', ['user_id', 'action'])
+    op.create_index('idx_audit_tenant_resource', 'audit_logs', ['tenant_id', 'resource_type'])
+    op.create_index('ix_audit_logs_resource_id', 'audit_logs', ['resource_id'])
+
+    op.create_table(
+        'audit_log_rollups_hourly',
+        sa.Column('bucket', sa.DateTime(), nullable=False),
+        sa.Column('action', sa.String(length=100), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('event_count', sa.BigInteger(), nullable=False),
+        sa.Column('server_error_count', sa.BigInteger(), nullable=False),
+        sa.Column('response_time_sum', sa.Float(), nullable=False),
+        sa.Column('response_time_count', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('bucket', 'action', 'status', 'user_id')
+    )
+    op.create_index('idx_audit_rollup_bucket_action', 'audit_log_rollups_hourly', ['bucket', 'action'])
+    op.execute(
+        r"""
+        INSERT INTO audit_log_rollups_hourly (
+            bucket, action, status, user_id,
+            event_count, server_error_count, response_time_sum, response_time_count
+        )
+        SELECT
+            date_trunc('hour', timestamp), action, status, user_id,
+            COUNT(*),
+            COUNT(*) FILTER (WHERE details->>'status_code' LIKE '5%'),
+            COALESCE(SUM(CASE WHEN details->>'response_time' ~ '^[0-9]+(\.[0-9]+)?$'
+                              THEN (details->>'response_time')::float END), 0),
+            COUNT(*) FILTER (WHERE details->>'response_time' ~ '^[0-9]+(\.[0-9]+)?$')
+        FROM audit_logs
+        GROUP BY 1, 2, 3, 4
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_audit_rollup_bucket_action', table_name='audit_log_rollups_hourly')
+    op.drop_table('audit_log_rollups_hourly')
+
+    op.execute(f"CREATE TABLE audit_logs_unpartitioned ({COLUMNS}, PRIMARY KEY (id))")
+    op.execute(
+        f"INSERT INTO audit_logs_unpartitioned ({COLUMN_NAMES}) SELECT {COLUMN_NAMES} FROM audit_logs"
+    )
+    # Dropping the parent drops its partitions and partitioned indexes
+    op.drop_table('audit_logs')
+    op.rename_table('audit_logs_unpartitioned', 'audit_logs')
+    op.execute("ALTER TABLE audit_logs RENAME CONSTRAINT audit_logs_unpartitioned_pkey TO audit_logs_pkey")
+    op.create_index('ix_audit_logs_user_id', 'audit_logs', ['user_id'])
+    op.create_index('ix_audit_logs_timestamp', 'audit_logs', ['timestamp'])
+    op.create_index('ix_audit_logs_action', 'audit_logs', ['action'])
+    op.create_index('ix_audit_logs_resource_type', 'audit_logs', ['resource_type'])
+    op.create_index('ix_audit_logs_resource_id', 'audit_logs', ['resource_id'])
+    op.create_index('ix_audit_logs_tenant_id', 'audit_logs', ['tenant_id'])
+    op.create_index('idx_audit_user_action', 'audit_logs', ['user_id', 'action'])
+    op.create_index('idx_audit_tenant_resource', 'audit_logs', ['tenant_id', 'resource_type'])
+    op.create_index('idx_audit_timestamp_action', 'audit_logs', ['timestamp', 'action'])
@@ -0,0 +1,45 @@
+"""Add the notification retry queue
+
+Notification deliveries that fail on a channel (SMTP, SMS, WhatsApp) are
+stored in notification_retries and retried with backoff by the
+notification dispatcher, instead of being lost with the request that
+raised them.
+
+Revision ID: 20251025_notification_retries
+Revises: 20251024_audit_partitions
+Create Date: 2025-10-25 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '20251025_notification_retries'
+down_revision = '20251024_audit_partitions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'notification_retries',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('notification_id', sa.String(length=64), nullable=False),
+        sa.Column('tenant_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('channel', sa.String(length=20), nullable=False),
+        sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('attempts', sa.Integer(), server_default='1', nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_notification_retries_due', 'notification_retries', ['next_attempt_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notification_retries_due', table_name='notification_retries')
+    op.drop_table('notification_retries')
@@ -0,0 +1,40 @@
+"""Key WhatsApp conversation messages by their message id
+
+A WhatsApp message whose processing fails is retried, and a retry must
+neither store the customer's message again nor resend the replies.
+conversation_history rows of inbound WhatsApp messages now carry the
+WhatsApp message id, unique per tenant, and replied_at records that the
+replies to a message were queued.
+
+Revision ID: 20251026_conversation_msg_ids
+Revises: 20251025_notification_retries
+Create Date: 2025-10-26 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20251026_conversation_msg_ids'
+down_revision = '20251025_notification_retries'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('conversation_history', sa.Column('external_message_id', sa.String(length=128), nullable=True))
+    op.add_column('conversation_history', sa.Column('replied_at', sa.DateTime(), nullable=True))
+    op.create_index(
+        'uq_conversation_history_tenant_external_message',
+        'conversation_history',
+        ['tenant_id', 'external_message_id'],
+        unique=True,
+        postgresql_where=sa.text('external_message_id IS NOT NULL')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_conversation_history_tenant_external_message', table_name='conversation_history')
+    op.drop_column('conversation_history', 'replied_at')
+    op.drop_column('conversation_history', 'external_message_id')
@@ -0,0 +1,47 @@
+import uuid
+from datetime import datetime
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Index, String, Text, func
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+
+from app.db.base_class import Base
+
+
+class OutboxEvent(Base):
+    """
+    Domain event written in the same transaction as the state change it
+    describes; the durable event log behind the EventBus.
+
+    Publishers only insert rows. The outbox relay assigns ``position`` to
+    committed rows in commit order, which makes the table an append-only log
+    that consumers read by offset. Rows are pruned once every consumer has
+    moved past them and the retention period has passed.
+    """
+    __tablename__ = "event_outbox"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    event_id = Column(String(64), nullable=False, unique=True)
+    event_type = Column(String(100), nullable=False)
+    tenant_id = Column(UUID(as_uuid=True), ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False)
+    # Events of one aggregate (an order, by default the tenant) are delivered in order
+    aggregate_id = Column(String(64), nullable=False)
+    payload = Column(JSONB, nullable=False)
+    # Wall-clock insert time, not transaction start, so later writers sort later
+    created_at = Column(DateTime(timezone=True), server_default=func.clock_timestamp(), nullable=False)
+    # Log position; NULL until the relay sequences the committed row
+    position = Column(BigInteger, nullable=True, unique=True)
+
+    __table_args__ = (
+        # The relay sequences unpositioned rows oldest first
+        Index("ix_event_outbox_unsequenced", "created_at", "id", postgresql_where=position.is_(None)),
+    )
+
+
+class EventConsumerOffset(Base):
+    """Log position up to which a consumer has processed the event outbox"""
+    __tablename__ = "event_consumer_offsets"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    consumer = Column(String(255), nullable=False, unique=True)
+    position = Column(BigInteger, nullable=False, default=0, server_default="0")
+    last_error = Column(Text, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -0,0 +1,32 @@
+import uuid
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text, func
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+
+from app.db.base_class import Base
+
+
+class NotificationRetry(Base):
+    """
+    Notification delivery that failed on one channel and is waiting to be
+    retried; the durable retry queue behind the notification dispatcher.
+
+    One row per (notification, channel). Rows are deleted once delivered or
+    once ``attempts`` reaches the dispatcher's limit.
+    """
+    __tablename__ = "notification_retries"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    notification_id = Column(String(64), nullable=False)
+    tenant_id = Column(UUID(as_uuid=True), ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False)
+    channel = Column(String(20), nullable=False)
+    payload = Column(JSONB, nullable=False)
+    attempts = Column(Integer, nullable=False, default=1, server_default="1")
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        # The retry sweep claims due rows oldest first
+        Index("ix_notification_retries_due", "next_attempt_at"),
+    )
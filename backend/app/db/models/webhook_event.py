@@ -1,25 +1,45 @@
 from datetime import datetime
-from sqlalchemy import Column, DateTime, String, Text, Index
+from sqlalchemy import Column, DateTime, Integer, String, Text, Index
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 
 from app.db.base_class import Base
 
 
+class WebhookEventStatus:
+    """Processing states for a claimed webhook event"""
+    PENDING = "pending"  # Claimed and acknowledged, waiting for a worker
+    PROCESSING = "processing"  # Picked up by a worker
+    PROCESSED = "processed"  # Side effects committed
+    FAILED = "failed"  # Gave up after the maximum number of attempts
+
+
 class WebhookEvent(Base):
     """
-    Tracks processed webhook events to ensure idempotency
+    Tracks webhook events to ensure idempotency
+
+    Rows are inserted when an event is first claimed, so the unique
+    (provider, event_id) index is what makes duplicate deliveries no-ops.
+    Pending rows double as the durable work queue for asynchronous processing.
     """
     __tablename__ = "webhook_events"
-    
+
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     provider = Column(String, nullable=False)  # Payment provider name (paystack, mpesa, etc.)
     event_id = Column(String, nullable=False)  # Provider's event ID
     event_type = Column(String, nullable=False)  # Type of event (charge.success, etc.)
     payload = Column(Text, nullable=True)  # JSON payload of the event
-    processed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    
+    status = Column(String(20), nullable=False, default=WebhookEventStatus.PROCESSED,
+                    server_default=WebhookEventStatus.PROCESSED)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    last_error = Column(Text, nullable=True)
+    received_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    processed_at = Column(DateTime, nullable=True)
+
     # Create an index on provider and event_id for fast lookups
     __table_args__ = (
         Index("ix_webhook_events_provider_event_id", "provider", "event_id", unique=True),
+        # Reconciliation sweep scans unfinished events by age
+        Index("ix_webhook_events_status_updated_at", "status", "updated_at"),
     )
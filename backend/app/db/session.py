@@ -6,6 +6,7 @@ Prefer the async_session module for all new application code.
 from contextlib import contextmanager
 from typing import Generator
 
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 from app.db.engines.sync_engine import get_sync_engine, get_sync_session_maker
 
@@ -1,8 +1,16 @@
 import asyncio
 import logging
-from typing import Awaitable, Callable, Dict, List, Optional, TypeVar
+from collections import deque
+from itertools import islice
+from typing import TYPE_CHECKING, Awaitable, Callable, Deque, Dict, FrozenSet, List, Optional, Tuple, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.domain.events.order_events import DomainEvent
+from app.domain.events.outbox import add_to_outbox
+
+if TYPE_CHECKING:
+    from app.domain.events.outbox import EventOutboxRelay
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +23,10 @@ class EventBus:
     """
     Event bus for publishing and subscribing to domain events
     Implements the observer pattern to decouple publishers and subscribers
+
+    Once the outbox relay is started, events are durable: publishing writes
+    them to the event outbox and the relay delivers them to handlers (see
+    app.domain.events.outbox).
     """
 
     _instance = None
@@ -27,26 +39,46 @@ class EventBus:
 
     def _initialize(self):
         self._handlers: Dict[str, List[EventHandler]] = {}
-        self._event_history: List[DomainEvent] = []
         self._max_history_size = 1000  # Limit to prevent memory issues
+        # Ring buffer: appending past the limit drops the oldest event
+        self._event_history: Deque[DomainEvent] = deque(maxlen=self._max_history_size)
+        self._outbox: Optional["EventOutboxRelay"] = None
+
+    def attach_outbox(self, relay: Optional["EventOutboxRelay"]) -> None:
+        """Deliver published events through the outbox relay (None detaches)"""
+        self._outbox = relay
 
-    async def publish(self, event: DomainEvent) -> None:
+    async def publish(self, event: DomainEvent, db: Optional[AsyncSession] = None) -> None:
         """
         Publish an event to all subscribers
-        Executes handlers asynchronously
-        """
-        event_type = event.event_type
 
-        # Store in event history (with size limit)
+        With a session, the event is written to the outbox in that session's
+        transaction and delivered after it commits, so pass the session
+        before committing the state change. Without one, the event is
+        written in its own transaction when the outbox relay runs, or
+        delivered to the handlers directly when it does not (tests, scripts).
+        """
         self._event_history.append(event)
-        if len(self._event_history) > self._max_history_size:
-            self._event_history = self._event_history[-self._max_history_size :]
 
         # Log the event
         logger.info(
-            f"Event published: {event_type} - {event.event_id} - tenant: {event.tenant_id}"
+            f"Event published: {event.event_type} - {event.event_id} - tenant: {event.tenant_id}"
         )
 
+        if db is not None:
+            add_to_outbox(db, event)
+        elif self._outbox is not None:
+            await self._outbox.append(event)
+        else:
+            await self.dispatch(event)
+
+    async def dispatch(self, event: DomainEvent) -> None:
+        """
+        Deliver an event to its handlers in process
+        Executes handlers concurrently
+        """
+        event_type = event.event_type
+
         if event_type not in self._handlers:
             logger.debug(f"No handlers registered for event type: {event_type}")
             return
@@ -87,6 +119,19 @@ class EventBus:
 
         return unsubscribe
 
+    def consumers(self) -> Dict[str, Tuple[EventHandler, FrozenSet[str]]]:
+        """
+        Subscribed handlers as named outbox consumers
+        Returns consumer name -> (handler, event types it is subscribed to)
+        """
+        consumers: Dict[str, Tuple[EventHandler, FrozenSet[str]]] = {}
+        for event_type, handlers in self._handlers.items():
+            for handler in handlers:
+                name = f"{handler.__module__}.{handler.__qualname__}"
+                _, event_types = consumers.get(name, (handler, frozenset()))
+                consumers[name] = (handler, event_types | {event_type})
+        return consumers
+
     def subscribe_to_all(self, handler: EventHandler) -> Callable[[], None]:
         """
         Subscribe to all event types
@@ -111,13 +156,10 @@ class EventBus:
         Get recent events from history, optionally filtered by event type
         Useful for debugging and admin panels
         """
+        events = reversed(self._event_history)
         if event_type:
-            filtered_events = [
-                e for e in self._event_history if e.event_type == event_type
-            ]
-            return filtered_events[-limit:]
-
-        return self._event_history[-limit:]
+            events = (e for e in events if e.event_type == event_type)
+        return list(islice(events, limit))[::-1]
 
     def clear_handlers(self) -> None:
         """Clear all event handlers (mainly for testing)"""
@@ -0,0 +1,364 @@
+"""
+Transactional outbox and relay for domain events.
+
+Workflow for an event:
+1. ``add_to_outbox`` inserts the event into ``event_outbox`` in the
+   publisher's transaction, so the event exists if and only if the state
+   change committed; the publisher returns right after its commit
+2. The commit wakes the in-process relay; relays in other workers poll
+3. One relay at a time (a Postgres advisory lock) gives committed rows a log
+   position in commit order, then reads the log in batches
+4. Each EventBus handler is a consumer with its own offset in
+   ``event_consumer_offsets``. A batch is delivered to every consumer
+   concurrently; within a consumer, events of one aggregate (an order) are
+   delivered in log order and events of different aggregates concurrently
+5. Offsets are saved after delivery, so a crash redelivers the batch:
+   delivery is at-least-once and handlers must tolerate duplicates. A
+   handler that still fails after ``max_attempts`` is logged and skipped so
+   one poison event cannot stall its consumer
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple, Type
+
+from prometheus_client import Counter, Gauge
+from sqlalchemy import event as sa_event
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models.event_outbox import EventConsumerOffset, OutboxEvent
+from app.domain.events.order_events import DomainEvent
+
+logger = logging.getLogger(__name__)
+
+outbox_table = OutboxEvent.__table__
+offsets_table = EventConsumerOffset.__table__
+
+BATCH_SIZE = 200
+POLL_INTERVAL_SECONDS = 1.0
+MAX_ATTEMPTS = 5
+RETRY_DELAY_SECONDS = 0.2
+# Delivered rows are kept this long as an event log before pruning
+RETENTION = timedelta(days=7)
+PRUNE_INTERVAL_SECONDS = 3600
+# pg_try_advisory_xact_lock key; any constant unique to the relay
+RELAY_LOCK_KEY = 0x6F7574626F78
+
+outbox_deliveries = Counter(
+    "event_outbox_deliveries_total",
+    "Outbox events handed to consumers, by outcome",
+    ["consumer", "outcome"],
+)
+outbox_consumer_position = Gauge(
+    "event_outbox_consumer_position",
+    "Log position each consumer has processed up to",
+    ["consumer"],
+)
+
+Consumer = Tuple[Callable[[DomainEvent], Any], FrozenSet[str]]
+
+_event_classes: Dict[str, Type[DomainEvent]] = {}
+
+
+def event_class(event_type: str) -> Type[DomainEvent]:
+    """Event model for an event type, falling back to DomainEvent."""
+    if event_type not in _event_classes:
+        pending = list(DomainEvent.__subclasses__())
+        while pending:
+            cls = pending.pop()
+            pending.extend(cls.__subclasses__())
+            field = cls.model_fields.get("event_type")
+            if field is not None and isinstance(field.default, str):
+                _event_classes.setdefault(field.default, cls)
+    return _event_classes.get(event_type, DomainEvent)
+
+
+def aggregate_id(event: DomainEvent) -> str:
+    """Ordering key of an event: its order, or else its tenant."""
+    return str(getattr(event, "order_id", None) or event.tenant_id)
+
+
+@dataclass
+class OutboxRecord:
+    position: int
+    aggregate_id: str
+    event: DomainEvent
+
+
+def outbox_row(event: DomainEvent) -> OutboxEvent:
+    return OutboxEvent(
+        event_id=event.event_id,
+        event_type=event.event_type,
+        tenant_id=uuid.UUID(str(event.tenant_id)),
+        aggregate_id=aggregate_id(event),
+        payload=event.model_dump(mode="json"),
+    )
+
+
+def add_to_outbox(db: AsyncSession, event: DomainEvent) -> None:
+    """
+    Add an event to the outbox in the session's current transaction.
+
+    The relay is woken when the session commits; a rollback discards the
+    event together with the state change.
+    """
+    db.add(outbox_row(event))
+    if not db.info.get("outbox_listener"):
+        db.info["outbox_listener"] = True
+        sa_event.listen(db.sync_session, "after_commit", lambda session: outbox_relay.notify())
+
+
+class OutboxStore:
+    """SQL side of the relay; every method runs in the caller's transaction."""
+
+    def __init__(self, session_factory: Optional[Callable[[], AsyncSession]] = None):
+        self._session_factory = session_factory
+
+    def session(self) -> AsyncSession:
+        if self._session_factory is None:
+            from app.core.db.session import AsyncSessionLocal
+
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory()
+
+    async def try_lock(self, db: AsyncSession) -> bool:
+        """Become the only relay until the transaction ends."""
+        result = await db.execute(select(func.pg_try_advisory_xact_lock(RELAY_LOCK_KEY)))
+        return bool(result.scalar())
+
+    async def sequence(self, db: AsyncSession, limit: int) -> int:
+        """Give committed, unpositioned rows the next log positions."""
+        result = await db.execute(
+            text(
+                """
+                UPDATE event_outbox SET position = numbered.position
+                FROM (
+                    SELECT id, (SELECT COALESCE(MAX(position), 0) FROM event_outbox)
+                               + row_number() OVER (ORDER BY created_at, id) AS position
+                    FROM event_outbox
+                    WHERE position IS NULL
+                    ORDER BY created_at, id
+                    LIMIT :limit
+                ) AS numbered
+                WHERE event_outbox.id = numbered.id
+                """
+            ),
+            {"limit": limit},
+        )
+        return result.rowcount or 0
+
+    async def offsets(self, db: AsyncSession) -> Dict[str, int]:
+        result = await db.execute(select(offsets_table.c.consumer, offsets_table.c.position))
+        return {consumer: position for consumer, position in result.all()}
+
+    async def read(self, db: AsyncSession, after: int, limit: int) -> List[OutboxRecord]:
+        result = await db.execute(
+            select(outbox_table.c.position, outbox_table.c.aggregate_id,
+                   outbox_table.c.event_type, outbox_table.c.payload)
+            .where(outbox_table.c.position > after)
+            .order_by(outbox_table.c.position)
+            .limit(limit)
+        )
+        return [
+            OutboxRecord(position, aggregate, event_class(event_type).model_validate(payload))
+            for position, aggregate, event_type, payload in result.all()
+        ]
+
+    async def save_offsets(self, db: AsyncSession, offsets: Dict[str, int], errors: Dict[str, str]) -> None:
+        now = datetime.utcnow()
+        for consumer, position in offsets.items():
+            statement = pg_insert(offsets_table).values(
+                consumer=consumer, position=position, last_error=errors.get(consumer), updated_at=now
+            )
+            await db.execute(
+                statement.on_conflict_do_update(
+                    index_elements=["consumer"],
+                    set_={"position": statement.excluded.position,
+                          "last_error": statement.excluded.last_error,
+                          "updated_at": now},
+                )
+            )
+
+    async def prune(self, db: AsyncSession, up_to: int, older_than: datetime) -> int:
+        result = await db.execute(
+            outbox_table.delete()
+            .where(outbox_table.c.position <= up_to)
+            .where(outbox_table.c.created_at < older_than)
+        )
+        return result.rowcount or 0
+
+
+class EventOutboxRelay:
+    """
+    Drains the event outbox to the EventBus handlers.
+
+    ``start()`` should be called on application startup; it also switches
+    the EventBus to durable publishing.
+    """
+
+    def __init__(
+        self,
+        bus=None,
+        store: Optional[OutboxStore] = None,
+        batch_size: int = BATCH_SIZE,
+        poll_interval: float = POLL_INTERVAL_SECONDS,
+        max_attempts: int = MAX_ATTEMPTS,
+        retry_delay: float = RETRY_DELAY_SECONDS,
+    ):
+        self._bus = bus
+        self.store = store or OutboxStore()
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_prune = 0.0
+
+    @property
+    def bus(self):
+        if self._bus is None:
+            from app.domain.events.event_bus import get_event_bus
+
+            self._bus = get_event_bus()
+        return self._bus
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        self.bus.attach_outbox(self)
+        logger.info("Event outbox relay started")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self.bus.attach_outbox(None)
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("Event outbox relay stopped")
+
+    def notify(self) -> None:
+        """Wake the relay; called after a transaction with outbox rows commits."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def append(self, event: DomainEvent) -> None:
+        """Write an event to the outbox in a transaction of its own."""
+        async with self.store.session() as db:
+            db.add(outbox_row(event))
+            await db.commit()
+        self.notify()
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                while await self.drain() >= self.batch_size:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Event outbox relay failed: {e}", exc_info=True)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def drain(self) -> int:
+        """
+        Sequence and deliver one batch.
+
+        Returns:
+            Number of log entries read; 0 if another relay holds the lock
+        """
+        async with self.store.session() as db:
+            if not await self.store.try_lock(db):
+                return 0
+            await self.store.sequence(db, self.batch_size)
+
+            consumers = self.bus.consumers()
+            offsets = await self.store.offsets(db)
+            # New consumers start where the slowest existing consumer is
+            floor = min(offsets.values(), default=0)
+            positions = {name: offsets.get(name, floor) for name in consumers}
+            records = await self.store.read(db, min(positions.values(), default=floor), self.batch_size)
+
+            errors: Dict[str, str] = {}
+            if records:
+                await asyncio.gather(*(
+                    self._deliver_to(name, handler, event_types, records, positions[name], errors)
+                    for name, (handler, event_types) in consumers.items()
+                ))
+                last = records[-1].position
+                positions = {name: max(position, last) for name, position in positions.items()}
+                await self.store.save_offsets(db, positions, errors)
+                for name, position in positions.items():
+                    outbox_consumer_position.labels(name).set(position)
+
+            if positions and time.monotonic() - self._last_prune >= PRUNE_INTERVAL_SECONDS:
+                self._last_prune = time.monotonic()
+                pruned = await self.store.prune(
+                    db, min(positions.values()), datetime.now(timezone.utc) - RETENTION)
+                if pruned:
+                    logger.info(f"Pruned {pruned} delivered outbox events")
+            await db.commit()
+            return len(records)
+
+    async def _deliver_to(
+        self,
+        consumer: str,
+        handler: Callable[[DomainEvent], Any],
+        event_types: FrozenSet[str],
+        records: List[OutboxRecord],
+        after: int,
+        errors: Dict[str, str],
+    ) -> None:
+        by_aggregate: Dict[str, List[OutboxRecord]] = {}
+        for record in records:
+            if record.position > after and record.event.event_type in event_types:
+                by_aggregate.setdefault(record.aggregate_id, []).append(record)
+
+        async def deliver_in_order(pending: List[OutboxRecord]) -> None:
+            for record in pending:
+                error = await self._deliver(consumer, handler, record)
+                if error is not None:
+                    errors[consumer] = f"position {record.position}: {error}"
+
+        await asyncio.gather(*(deliver_in_order(pending) for pending in by_aggregate.values()))
+
+    async def _deliver(
+        self, consumer: str, handler: Callable[[DomainEvent], Any], record: OutboxRecord
+    ) -> Optional[str]:
+        """Run a handler with retries; returns the last error if it gave up."""
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await handler(record.event)
+                outbox_deliveries.labels(consumer, "delivered").inc()
+                return None
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    outbox_deliveries.labels(consumer, "skipped").inc()
+                    logger.error(
+                        f"Consumer {consumer} gave up on {record.event.event_type} "
+                        f"{record.event.event_id} at position {record.position}: {e}",
+                        exc_info=True,
+                    )
+                    return str(e)
+                outbox_deliveries.labels(consumer, "retried").inc()
+                await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+
+
+# Global relay instance
+outbox_relay = EventOutboxRelay()
@@ -2,6 +2,7 @@ import logging
 import os
 import time
 from pathlib import Path
+from typing import Dict, List, Optional
 
 import sentry_sdk
 from sentry_sdk.integrations.asgi import SentryAsgiMiddleware
@@ -32,9 +33,9 @@ from fastapi import Depends, FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
 
-from app.core.monitoring.metrics import MetricsMiddleware, setup_metrics
+from app.core.monitoring.metrics import MetricsStage, setup_metrics
 
 import app.domain.events  # Ensure event handlers are registered
 from app.api.v1.api import api_router
@@ -43,19 +44,37 @@ from app.api.v2.endpoints import orders as v2_orders
 from app.core.cache.redis_cache import redis_cache
 from app.core.config.settings import Settings, get_settings
 from app.core.errors.exception_handlers import register_exception_handlers
-from app.core.middleware.activity_tracker import ActivityTrackerMiddleware
-from app.core.middleware.rate_limit import RateLimitMiddleware
-from app.core.middleware.super_admin_security import SuperAdminSecurityMiddleware
-from app.core.middleware.domain_specific_cors import DomainSpecificCORSMiddleware
+from app.core.http.compression import CompressionStage
+from app.core.http.outbound import outbound_http
+from app.core.notifications.dispatcher import notification_dispatcher
+from app.core.websocket.hub import websocket_hub
+from app.domain.events.outbox import outbox_relay
+from app.services.whatsapp_ingest_service import whatsapp_ingest_queue
+from app.services.whatsapp_outbound_service import whatsapp_sender
+from app.services.payment.webhook_processing_engine import payment_webhook_engine
+from app.services.export import export_jobs
+from app.services.catalog_import import catalog_importer
+from app.services.feature_flags.engine import feature_flag_engine
+from app.services.shipping.seller_quote_engine import seller_quote_engine
+from app.services.audit.audit_storage import audit_storage
+from app.core.middleware.activity_tracker import ActivityTrackerStage
+from app.core.middleware.domain_specific_cors import DomainSpecificCORSStage
+from app.core.middleware.pipeline import MiddlewarePipeline, PipelineStage, RequestContext
+from app.core.middleware.rate_limit import RateLimitStage
+from app.core.middleware.super_admin_security import SuperAdminSecurityStage
 from app.db.async_session import get_async_session_local
 from app.middleware.domain_verification import (
-    DomainVerificationMiddleware,
+    DomainVerificationStage,
     verification_service,
 )
 from app.middleware.storefront_errors import StorefrontError, handle_storefront_error
-from app.middleware.subdomain_middleware import SubdomainMiddleware
+from app.middleware.subdomain_middleware import SubdomainStage
 from app.core.errors import order_failures, payment_failures
-from app.services.security.ip_allowlist_service import IPAllowlistService
+from app.services.security.ip_allowlist_cache import (
+    BypassList,
+    GlobalIPAllowlist,
+    global_ip_allowlist,
+)
 from app.api.admin.endpoints import ip_allowlist as admin_ip_allowlist_router
 from app.api.routers.admin import router as admin_router
 
@@ -77,35 +96,17 @@ else:
 # Prometheus metrics
 webhook_errors = Counter("webhook_errors", "Number of webhook errors")
 
-# Custom security headers middleware implementation
+# Security headers stage: headers are encoded once, not per response
 
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, headers):
-        super().__init__(app)
-        self.headers = headers
+class SecurityHeadersStage(PipelineStage):
+    def __init__(self, headers: Dict[str, str]):
+        self.headers = list(headers.items())
 
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
+    def on_response_start(self, ctx: RequestContext, headers: MutableHeaders) -> None:
         # Add security headers to response
-        for header_name, header_value in self.headers.items():
-            response.headers[header_name] = header_value
-        return response
-
-
-# Custom compression middleware implementation
-
-
-class CompressionMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, **options):
-        super().__init__(app)
-        self.options = options
-
-    async def dispatch(self, request: Request, call_next):
-        # This is a simplified version - in production, you'd want to handle
-        # content compression based on Accept-Encoding headers
-        response = await call_next(request)
-        return response
+        for header_name, header_value in self.headers:
+            headers[header_name] = header_value
 
 
 # Configure logging
@@ -125,48 +126,52 @@ load_dotenv(dotenv_path=env_path, override=True)
 settings = get_settings()
 
 
-# Request timing middleware for performance monitoring
-class RequestTimingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
-        response = await call_next(request)
-        process_time = time.time() - start_time
-
+# Request timing stage for performance monitoring
+class RequestTimingStage(PipelineStage):
+    def on_response_start(self, ctx: RequestContext, headers: MutableHeaders) -> None:
         # Add X-Process-Time header
-        response.headers["X-Process-Time"] = str(process_time)
+        headers["X-Process-Time"] = str(ctx.elapsed)
 
+    async def on_complete(self, ctx: RequestContext) -> None:
+        process_time = ctx.elapsed
         # Log request timing for slower requests (> 1 second)
         if process_time > 1.0:
             logger.warning(
-                f"Slow request: {request.method} {request.url.path} took {process_time:.2f}s"
+                f"Slow request: {ctx.method} {ctx.path} took {process_time:.2f}s"
             )
 
-        return response
-
 
-class TenantMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        # Skip tenant check for public endpoints
-        if self._is_public_path(request.url.path):
-            return await call_next(request)
+class TenantStage(PipelineStage):
+    """
+    Tenant header validation.
+
+    The public path list includes "/", so every path is public and the stage
+    never runs; tenant scoping happens in the get_db dependency instead. The
+    pipeline drops the stage per request without calling it.
+    """
+
+    # Skip tenant check for public endpoints
+    exclude_prefixes = (
+        "/docs",
+        "/redoc",
+        "/openapi.json",
+        "/health",
+        "/",
+        "/test-env",
+        "/test-settings",
+        "/metrics",
+        "/ws/monitoring",
+    )
 
-        tenant_id = request.headers.get("X-Tenant-ID")
+    async def on_request(self, ctx: RequestContext) -> Optional[Response]:
+        tenant_id = ctx.headers.get("X-Tenant-ID")
 
         # For tests, we allow missing X-Tenant-ID header in specific environments
         is_test = os.getenv("TESTING", "").lower() in (
             "true", "1", "t", "yes", "y")
 
-        if not tenant_id:
-            if is_test:
-                # When in test mode, allow the request to proceed
-                # We'll use the TestClient's headers or middleware will handle it
-                pass
-            else:
-                return Response("Missing X-Tenant-ID header", status_code=400)
-
-        # Create a new AsyncSession for the request
-        AsyncSessionLocal = get_async_session_local()
-        db = None
+        if not tenant_id and not is_test:
+            return Response("Missing X-Tenant-ID header", status_code=400)
 
         try:
             # Validate UUID format
@@ -174,61 +179,25 @@ class TenantMiddleware(BaseHTTPMiddleware):
             tenant_uuid = UUID(tenant_id)
 
             # Store tenant_id in request.state for use in dependencies
-            request.state.tenant_id = str(tenant_uuid)
+            ctx.state.tenant_id = str(tenant_uuid)
 
-            # In test mode, skip DB validation in middleware
-            # Detect test environment from settings or request headers
-            from app.core.config.settings import get_settings
-            settings = get_settings()
-
-            test_mode = getattr(settings, "TESTING", False) or request.headers.get(
+            test_mode = getattr(settings, "TESTING", False) or ctx.headers.get(
                 "X-Test") == "true"
 
-            if test_mode or is_test:
-                # For tests, skip DB validation in middleware
-                # This avoids async schema visibility issues while allowing the endpoint
-                # to use its normal get_db dependency which works correctly
-                logger.debug(
-                    "Test environment detected - skipping tenant DB validation")
-                # Skip DB creation in middleware for tests
-                # request.state.db will be set by the endpoint's dependency
-            else:
-                # Production path - create an async database session
-                db = AsyncSessionLocal()
-
-                # Use the session directly in the request state
-                # Do not set tenant context here - will be handled by the get_db dependency
-                # when the endpoint is called
-                request.state.db = db
-
-            # Execute the rest of the request
-            response = await call_next(request)
-            return response
+            if not (test_mode or is_test):
+                # Production path - the session is closed in on_complete
+                ctx.state.db = get_async_session_local()()
+            return None
         except ValueError:
             return Response(f"Invalid tenant ID format: {tenant_id}", status_code=400)
         except Exception as e:
             logger.error(f"Tenant middleware error: {str(e)}")
             return Response("Internal server error in tenant handling", status_code=500)
-        finally:
-            if db:
-                await db.close()
-
-    def _is_public_path(self, path: str) -> bool:
-        """
-        Check if the path is public and doesn't require tenant validation.
-        """
-        public_paths = [
-            "/docs",
-            "/redoc",
-            "/openapi.json",
-            "/health",
-            "/",
-            "/test-env",
-            "/test-settings",
-            "/metrics",
-            "/ws/monitoring",
-        ]
-        return any(path.startswith(public_path) for public_path in public_paths)
+
+    async def on_complete(self, ctx: RequestContext) -> None:
+        db = getattr(ctx.state, "db", None)
+        if db is not None:
+            await db.close()
 
 
 async def initialize_cache():
@@ -269,6 +238,42 @@ async def lifespan(app: FastAPI):
     # Setup metrics
     setup_metrics()
 
+    # Start WhatsApp ingest workers and re-queue messages left pending (skip in test mode)
+    if not TESTING:
+        whatsapp_ingest_queue.start()
+
+    # Start payment webhook workers and reconciliation sweep (skip in test mode)
+    if not TESTING:
+        payment_webhook_engine.start()
+
+    # Listen for feature flag changes pushed by other workers (skip in test mode)
+    if not TESTING:
+        feature_flag_engine.start()
+
+    # Listen for seller shipping provider changes pushed by other workers (skip in test mode)
+    if not TESTING:
+        seller_quote_engine.start()
+
+    # Deliver domain events from the outbox (skip in test mode)
+    if not TESTING:
+        outbox_relay.start()
+
+    # Maintain audit log partitions, archives and rollups (skip in test mode)
+    if not TESTING:
+        audit_storage.start()
+
+    # Listen for global IP allowlist changes pushed by other workers (skip in test mode)
+    if not TESTING:
+        global_ip_allowlist.start()
+
+    # Fan WebSocket broadcasts out across workers (skip in test mode)
+    if not TESTING:
+        websocket_hub.start()
+
+    # Batch notification deliveries and sweep the retry queue (skip in test mode)
+    if not TESTING:
+        notification_dispatcher.start()
+
     logger.info("Startup complete")
 
     yield
@@ -279,42 +284,61 @@ async def lifespan(app: FastAPI):
     # Stop domain verification service (skip in test mode)
     await stop_domain_verification()
 
-    logger.info("Shutdown complete")
+    # Finish queued WhatsApp messages before closing provider connections
+    await whatsapp_ingest_queue.stop()
+    await whatsapp_sender.stop()
+    await payment_webhook_engine.stop()
+    await feature_flag_engine.stop()
+    await seller_quote_engine.stop()
+    await outbox_relay.stop()
+    await audit_storage.stop()
+    await global_ip_allowlist.stop()
 
+    # Deliver queued notifications while the hub and provider pools are still open
+    await notification_dispatcher.stop()
 
-class GlobalIPAllowlistMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, ip_allowlist_service: IPAllowlistService, admin_prefix: str = "/api/admin"):
-        super().__init__(app)
-        self.ip_allowlist_service = ip_allowlist_service
-        self.admin_prefix = admin_prefix
-        # Add test IPs to allowed list for testing
-        self.test_ips = ["127.0.0.1", "::1", "testclient", "testserver"]
+    # Stop WebSocket fan-out and close open sockets
+    await websocket_hub.stop()
 
-    async def dispatch(self, request: Request, call_next):
+    # Cancel background exports and remove their files
+    await export_jobs.stop()
+    await catalog_importer.stop()
+
+    # Close pooled outbound provider connections
+    await outbound_http.aclose()
+
+    logger.info("Shutdown complete")
+
+
+class GlobalIPAllowlistStage(PipelineStage):
+    def __init__(
+        self,
+        allowlist: GlobalIPAllowlist = global_ip_allowlist,
+        admin_prefix: str = "/api/admin",
+        bypass: Optional[List[str]] = None,
+    ):
+        self.allowlist = allowlist
         # Only enforce for admin endpoints
-        if request.url.path.startswith(self.admin_prefix):
-            client_ip = request.client.host
-
-            # Allow test IPs in test mode
-            if client_ip in self.test_ips:
-                return await call_next(request)
-
-            db = None
-            try:
-                # Use a new DB session for the check
-                AsyncSessionLocal = get_async_session_local()
-                db = AsyncSessionLocal()
-                # Check if IP is allowed globally
-                allowed = await self.ip_allowlist_service.is_ip_allowed_global(db, client_ip)
-                if not allowed:
-                    return JSONResponse(status_code=403, content={"detail": "Access denied: IP not allowed."})
-            except Exception as e:
-                logger.error(f"IP allowlist check failed: {e}")
-                return JSONResponse(status_code=500, content={"detail": "Internal server error (IP allowlist)"})
-            finally:
-                if db:
-                    await db.close()
-        return await call_next(request)
+        self.include_prefixes = (admin_prefix,)
+        # Local and test clients skip the allowlist
+        self.bypass = BypassList(bypass if bypass is not None else settings.ADMIN_ALLOWED_IPS)
+
+    async def on_request(self, ctx: RequestContext) -> Optional[Response]:
+        client = ctx.request.client
+        client_ip = client.host if client else ""
+
+        if client_ip in self.bypass:
+            return None
+
+        try:
+            # Decided from the in-process snapshot; the DB is only read on reload
+            allowed = await self.allowlist.is_allowed(client_ip)
+        except Exception as e:
+            logger.error(f"IP allowlist check failed: {e}")
+            return JSONResponse(status_code=500, content={"detail": "Internal server error (IP allowlist)"})
+        if not allowed:
+            return JSONResponse(status_code=403, content={"detail": "Access denied: IP not allowed."})
+        return None
 
 
 def create_app() -> FastAPI:
@@ -332,90 +356,73 @@ def create_app() -> FastAPI:
     # Register storefront error handler
     app.add_exception_handler(StorefrontError, handle_storefront_error)
 
-    # Register security headers middleware with comprehensive admin security headers
-    app.add_middleware(
-        SecurityHeadersMiddleware,
-        headers={
-            # Prevent MIME type sniffing
-            "X-Content-Type-Options": "nosniff",
-            # Prevent clickjacking
-            "X-Frame-Options": "DENY",
-            # Enable XSS protection (legacy, most browsers ignore in modern mode)
-            "X-XSS-Protection": "1; mode=block",
-            # Enforce HTTPS and subdomain security
-            "Strict-Transport-Security": "max-age=31536000; includeSubDomains; preload",
-            # Restrict resource loading and inline scripts/styles
-            "Content-Security-Policy": "default-src 'self'; script-src 'self' 'unsafe-inline' 'unsafe-eval'; style-src 'self' 'unsafe-inline'; img-src 'self' data: https:; font-src 'self' data:; connect-src 'self' https:; frame-ancestors 'none';",
-            # Control referrer information
-            "Referrer-Policy": "strict-origin-when-cross-origin",
-            # Restrict browser features (camera, mic, geolocation, etc.)
-            "Permissions-Policy": "geolocation=(), microphone=(), camera=(), fullscreen=(), payment=()",
-        },
-    )
-
-    # 2. Rate limiting (early to prevent abuse)
-    app.add_middleware(RateLimitMiddleware)
-
-    # 3. Metrics middleware (for system monitoring)
-    app.add_middleware(MetricsMiddleware)
-
-    # 4. Request timing (for performance monitoring)
-    app.add_middleware(RequestTimingMiddleware)
-
-    # 4. Activity tracking (for audit and monitoring)
+    # All request middleware runs as stages of one ASGI pipeline, outermost
+    # first. Stages only see the request and the response start, so bodies
+    # stream through without extra tasks or buffering.
+    storefront_exclude_paths = ["/api/", "/admin/", "/_next/",
+                                "/static/", "/docs/", "/redoc/"]
     app.add_middleware(
-        ActivityTrackerMiddleware,
-        skip_paths={
-            "/docs",
-            "/redoc",
-            "/openapi.json",
-            "/health",
-            "/metrics",
-            "/ws/monitoring",
-        },
+        MiddlewarePipeline,
+        stages=[
+            # Super Admin security
+            SuperAdminSecurityStage(),
+            # Global IP allowlist for admin endpoints
+            GlobalIPAllowlistStage(admin_prefix="/api/admin"),
+            # Compression (br/zstd/gzip; skips small and already-compressed bodies)
+            CompressionStage(),
+            # Domain-specific CORS (replaces generic CORS)
+            DomainSpecificCORSStage(),
+            # Subdomain resolution (for multi-tenant storefronts)
+            SubdomainStage(
+                base_domain=(
+                    settings.BASE_DOMAIN if hasattr(
+                        settings, "BASE_DOMAIN") else "example.com"
+                ),
+                exclude_paths=storefront_exclude_paths,
+            ),
+            # Domain verification (for security)
+            DomainVerificationStage(exclude_paths=storefront_exclude_paths),
+            # Tenant resolution (for multi-tenant support)
+            TenantStage(),
+            # Activity tracking (for audit and monitoring)
+            ActivityTrackerStage(
+                skip_paths={
+                    "/docs",
+                    "/redoc",
+                    "/openapi.json",
+                    "/health",
+                    "/metrics",
+                    "/ws/monitoring",
+                },
+            ),
+            # Request timing (for performance monitoring)
+            RequestTimingStage(),
+            # Metrics (for system monitoring)
+            MetricsStage(),
+            # Rate limiting (early to prevent abuse)
+            RateLimitStage(),
+            # Security headers with comprehensive admin security headers
+            SecurityHeadersStage(
+                headers={
+                    # Prevent MIME type sniffing
+                    "X-Content-Type-Options": "nosniff",
+                    # Prevent clickjacking
+                    "X-Frame-Options": "DENY",
+                    # Enable XSS protection (legacy, most browsers ignore in modern mode)
+                    "X-XSS-Protection": "1; mode=block",
+                    # Enforce HTTPS and subdomain security
+                    "Strict-Transport-Security": "max-age=31536000; includeSubDomains; preload",
+                    # Restrict resource loading and inline scripts/styles
+                    "Content-Security-Policy": "default-src 'self'; script-src 'self' 'unsafe-inline' 'unsafe-eval'; style-src 'self' 'unsafe-inline'; img-src 'self' data: https:; font-src 'self' data:; connect-src 'self' https:; frame-ancestors 'none';",
+                    # Control referrer information
+                    "Referrer-Policy": "strict-origin-when-cross-origin",
+                    # Restrict browser features (camera, mic, geolocation, etc.)
+                    "Permissions-Policy": "geolocation=(), microphone=(), camera=(), fullscreen=(), payment=()",
+                },
+            ),
+        ],
     )
 
-    # 5. Tenant resolution (for multi-tenant support)
-    app.add_middleware(TenantMiddleware)
-
-    # 6. Domain verification (for security)
-    app.add_middleware(
-        DomainVerificationMiddleware,
-        exclude_paths=["/api/", "/admin/", "/_next/",
-                       "/static/", "/docs/", "/redoc/"],
-    )
-
-    # 7. Subdomain resolution (for multi-tenant storefronts)
-    app.add_middleware(
-        SubdomainMiddleware,
-        base_domain=(
-            settings.BASE_DOMAIN if hasattr(
-                settings, "BASE_DOMAIN") else "example.com"
-        ),
-        exclude_paths=["/api/", "/admin/", "/_next/",
-                       "/static/", "/docs/", "/redoc/"],
-    )
-
-    # 8. Domain-specific CORS (replaces generic CORS)
-    app.add_middleware(DomainSpecificCORSMiddleware)
-
-    # 9. Compression (last to compress all responses)
-    app.add_middleware(
-        CompressionMiddleware,
-        minimum_size=1000,  # Only compress responses larger than 1KB
-        compression_level=6,  # Balanced compression level
-    )
-
-    # Add global IP allowlist middleware for admin endpoints
-    app.add_middleware(
-        GlobalIPAllowlistMiddleware,
-        ip_allowlist_service=IPAllowlistService(),
-        admin_prefix="/api/admin"
-    )
-
-    # Add Super Admin security middleware
-    app.add_middleware(SuperAdminSecurityMiddleware)
-
     # Include API router
     app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -13,6 +13,7 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.types import ASGIApp
 
 from app.core.cache.redis_cache import redis_cache
+from app.core.middleware.pipeline import PipelineStage, RequestContext
 from app.db.session import SessionLocal
 from app.db.async_session import get_async_session_local
 from app.models.storefront import StorefrontConfig
@@ -65,13 +66,18 @@ class DomainVerificationMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
         """Process the request and verify domain if needed."""
         # Skip middleware for excluded paths
-        if any(request.url.path.startswith(path) for path in self.exclude_paths):
-            return await call_next(request)
+        if not any(request.url.path.startswith(path) for path in self.exclude_paths):
+            await self.verify_request(request)
 
+        # Continue processing the request
+        return await call_next(request)
+
+    async def verify_request(self, request: Request) -> None:
+        """Schedule verification of the request's custom domain if it is due."""
         # Only process requests with Host header
         host = request.headers.get("host", "")
         if not host or "localhost" in host or "127.0.0.1" in host:
-            return await call_next(request)
+            return
 
         # Clean the host (remove port if present)
         if ":" in host:
@@ -90,9 +96,6 @@ class DomainVerificationMiddleware(BaseHTTPMiddleware):
                 # Perform background verification if needed
                 await self._verify_domain_if_needed(host, tenant_id)
 
-        # Continue processing the request
-        return await call_next(request)
-
     async def _verify_domain_if_needed(self, domain: str, tenant_id: str) -> None:
         """
         Verify domain if it hasn't been verified recently.
@@ -247,6 +250,17 @@ class DomainVerificationMiddleware(BaseHTTPMiddleware):
             return SSL_STATUS_UNKNOWN, f"Unknown error: {str(e)}"
 
 
+class DomainVerificationStage(PipelineStage):
+    """Custom domain verification as a middleware pipeline stage."""
+
+    def __init__(self, exclude_paths: List[str] = None, **options):
+        self.verifier = DomainVerificationMiddleware(None, exclude_paths=exclude_paths, **options)
+        self.exclude_prefixes = tuple(self.verifier.exclude_paths)
+
+    async def on_request(self, ctx: RequestContext) -> None:
+        await self.verifier.verify_request(ctx.request)
+
+
 # Background verification service
 class DomainVerificationService:
     """
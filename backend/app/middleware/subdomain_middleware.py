@@ -10,6 +10,7 @@ from sqlalchemy.orm import Session
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.types import ASGIApp
 
+from app.core.middleware.pipeline import PipelineStage, RequestContext
 from app.db.async_session import get_async_session_local
 from app.middleware.storefront_errors import (
     InactiveTenantError,
@@ -54,6 +55,19 @@ class SubdomainMiddleware(BaseHTTPMiddleware):
         self.cache_timestamp = {}
 
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        error_response = await self.resolve_request(request)
+        if error_response is not None:
+            return error_response
+        return await call_next(request)
+
+    async def resolve_request(self, request: Request) -> Optional[Response]:
+        """
+        Set request.state.tenant_context for the request's host.
+
+        Returns:
+            A storefront error response if the host has no usable tenant,
+            otherwise None
+        """
         # Always allow public endpoints (docs, openapi, favicon, test-env) to pass with default context
         public_paths = ["/docs", "/redoc", "/openapi.json", "/favicon.ico", "/test-env"]
         if any(request.url.path.startswith(path) for path in public_paths):
@@ -65,11 +79,11 @@ class SubdomainMiddleware(BaseHTTPMiddleware):
                 "custom_domain": None,
                 "theme_settings": None,
             }
-            return await call_next(request)
+            return None
 
         # Skip middleware for excluded paths
         if any(request.url.path.startswith(path) for path in self.exclude_paths):
-            return await call_next(request)
+            return None
 
         # Get the host from the request
         host = request.headers.get("host", "")
@@ -144,7 +158,7 @@ class SubdomainMiddleware(BaseHTTPMiddleware):
                 logger.info(
                     f"Resolved tenant: {tenant_context['tenant_name']} for host: {host}"
                 )
-                return await call_next(request)
+                return None
             else:
                 # No tenant found for this domain/subdomain
                 logger.error(
@@ -174,12 +188,12 @@ class SubdomainMiddleware(BaseHTTPMiddleware):
                     "custom_domain": None,
                     "theme_settings": None,
                 }
-                return await call_next(request)
+                return None
             else:
                 logger.error(
                     f"Error in subdomain middleware for Host '{host}': {str(e)}"
                 )
-                return await call_next(request)
+                return None
 
     def _get_from_cache(self, key: str) -> Optional[Dict[str, Any]]:
         """
@@ -259,6 +273,16 @@ class SubdomainMiddleware(BaseHTTPMiddleware):
         return result.scalars().first()
 
 
+class SubdomainStage(PipelineStage):
+    """Storefront tenant resolution as a middleware pipeline stage."""
+
+    def __init__(self, base_domain: str = "example.com", exclude_paths: list = None, **options):
+        self.resolver = SubdomainMiddleware(None, base_domain=base_domain, exclude_paths=exclude_paths, **options)
+
+    async def on_request(self, ctx: RequestContext) -> Optional[Response]:
+        return await self.resolver.resolve_request(ctx.request)
+
+
 # Example async DB access in subdomain middleware
 
 
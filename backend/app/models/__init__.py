@@ -35,7 +35,7 @@ from app.models.storefront_draft import StorefrontDraft
 from app.models.storefront_logo import StorefrontLogo
 from app.models.storefront_page_template import StorefrontPageTemplate
 from app.models.storefront_permission import StorefrontPermission
-from app.models.storefront_version import StorefrontVersion
+from app.models.storefront_version import StorefrontVersion, StorefrontVersionChunk
 from app.models.behavior_analysis import BehaviorPattern, PatternDetection, Evidence
 from app.models.content_filter import ContentFilterRule, ContentAnalysisResult
 from app.models.violation import Violation
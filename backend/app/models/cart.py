@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, Numeric, String
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, Numeric, String, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -17,10 +17,27 @@ class Cart(Base):
     tenant_id = Column(UUID(as_uuid=True), nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Bumped on every write; guards concurrent edits from storefront and chat
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     items = relationship(
         "CartItem", back_populates="cart", cascade="all, delete-orphan"
     )
 
+    __mapper_args__ = {"version_id_col": version}
+
+    __table_args__ = tuple(
+        # One cart per owner per tenant; the cart engine upserts on these
+        Index(
+            f"uq_carts_tenant_{column}",
+            "tenant_id",
+            column,
+            unique=True,
+            postgresql_where=text(f"{column} IS NOT NULL"),
+            sqlite_where=text(f"{column} IS NOT NULL"),
+        )
+        for column in ("user_id", "phone_number", "session_id")
+    )
+
 
 class CartItem(Base):
     __tablename__ = "cart_items"
@@ -2,7 +2,7 @@ import enum
 import uuid
 from datetime import datetime, timezone
 
-from sqlalchemy import Column, DateTime, Enum, ForeignKey, String
+from sqlalchemy import Column, DateTime, Enum, ForeignKey, Index, String, text
 from sqlalchemy.dialects.postgresql import UUID
 
 from app.db.base_class import Base
@@ -31,3 +31,17 @@ class ConversationHistory(Base):
     timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     tenant_id = Column(UUID(as_uuid=True), ForeignKey(
         "tenants.id"), nullable=False)
+    # Provider message id of inbound messages; retried deliveries reuse the row
+    external_message_id = Column(String(128), nullable=True)
+    # Set once the replies to this inbound message have been queued
+    replied_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index(
+            "uq_conversation_history_tenant_external_message",
+            "tenant_id",
+            "external_message_id",
+            unique=True,
+            postgresql_where=text("external_message_id IS NOT NULL"),
+        ),
+    )
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, String, text
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 
@@ -62,3 +62,15 @@ class Product(Base):
         "ProductVariant", back_populates="product", cascade="all, delete-orphan")
     variant_options = relationship(
         "VariantOption", back_populates="product", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Catalog imports upsert on this; soft deleted products free their SKU
+        Index(
+            "uq_products_tenant_sku",
+            "tenant_id",
+            "sku",
+            unique=True,
+            postgresql_where=text("sku IS NOT NULL AND is_deleted = false"),
+            sqlite_where=text("sku IS NOT NULL AND is_deleted = 0"),
+        ),
+    )
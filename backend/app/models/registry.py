@@ -58,12 +58,12 @@ from app.models.storefront_draft import StorefrontDraft
 from app.models.storefront_logo import StorefrontLogo
 from app.models.storefront_page_template import StorefrontPageTemplate
 from app.models.storefront_permission import StorefrontPermission
-from app.models.storefront_version import StorefrontVersion
+from app.models.storefront_version import StorefrontVersion, StorefrontVersionChunk
 
 # 6. Other specialized models
 from app.models.ai_config import AIConfig
 from app.models.alert_config import AlertConfig
-from app.models.audit.audit_log import AuditLog
+from app.models.audit.audit_log import AuditLog, AuditLogHourlyRollup
 from app.models.behavior_analysis import BehaviorPattern, PatternDetection, Evidence
 from app.models.content_filter import ContentFilterRule, ContentAnalysisResult
 from app.models.kyc_document import KYCDocument
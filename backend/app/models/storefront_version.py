@@ -12,6 +12,11 @@ class StorefrontVersion(Base):
     """
     Versioned snapshots of storefront configurations for historical tracking.
     Enables version comparison, restoration, and audit capabilities.
+
+    The configuration of a version is stored as a tree of content-addressed
+    chunks (root_hash) plus a delta to its parent version. Only checkpoint
+    versions keep a full configuration_snapshot; other versions are
+    materialized by replaying deltas from the nearest checkpoint.
     """
 
     __tablename__ = "storefront_versions"
@@ -33,8 +38,17 @@ class StorefrontVersion(Base):
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-    # Complete snapshot of configuration at this version point
-    configuration_snapshot = Column(JSONB, nullable=False)
+    # Complete snapshot of configuration, kept on checkpoint versions only
+    configuration_snapshot = Column(JSONB, nullable=True)
+
+    # Structural storage (see app.services.storefront.version_tree)
+    parent_version_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("storefront_versions.id", ondelete="SET NULL"),
+        nullable=True,
+    )
+    root_hash = Column(String(64), nullable=True)
+    delta = Column(JSONB, nullable=True)
 
     # Relationships
     storefront_config = relationship("StorefrontConfig")
@@ -50,3 +64,22 @@ class StorefrontVersion(Base):
         # Index for efficient version retrieval
         Index("idx_storefront_version_created", "storefront_config_id", "created_at"),
     )
+
+
+class StorefrontVersionChunk(Base):
+    """
+    Content-addressed piece of a storefront configuration, shared by every
+    version of the storefront that contains it.
+    """
+
+    __tablename__ = "storefront_version_chunks"
+
+    storefront_config_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("storefront_configs.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    # SHA-256 of the canonical JSON content
+    hash = Column(String(64), primary_key=True)
+    content = Column(JSONB, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
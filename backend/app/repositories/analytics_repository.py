@@ -1,7 +1,7 @@
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, Iterator, Tuple
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_, desc, asc
+from sqlalchemy import func, and_, or_, desc, asc, distinct, literal_column
 import pandas as pd
 import json
 
@@ -9,6 +9,13 @@ from app.models.analytics import AnalyticsEvent, AnalyticsMetric, AnalyticsRepor
 from app.schemas.analytics import AnalyticsEventCreate, AnalyticsMetricCreate, AnalyticsReportCreate, AnalyticsQuery
 from app.schemas.analytics import AnalyticsMetricUpdate, AnalyticsReportUpdate
 from app.core.security import get_tenant_id_from_context
+from app.services.export import DEFAULT_BATCH_SIZE, stream_query
+
+# Event columns that can be exported as-is or used as grouping dimensions
+STREAMABLE_EVENT_COLUMNS = (
+    "id", "event_type", "event_category", "event_name", "event_value",
+    "created_at", "user_id", "session_id"
+)
 
 
 class AnalyticsRepository:
@@ -221,22 +228,14 @@ class AnalyticsRepository:
         return True
 
     @staticmethod
-    async def aggregate_metrics(
-        db: Session, 
-        query: AnalyticsQuery, 
-        tenant_id: int
-    ) -> pd.DataFrame:
-        """
-        Aggregate metrics based on query parameters
-        Returns a pandas DataFrame with the aggregated data
-        """
-        # Get raw events data
-        raw_query = db.query(AnalyticsEvent).filter(
+    def _apply_event_filters(raw_query, query: AnalyticsQuery, tenant_id: int):
+        """Restrict an events query to the tenant, date range and query filters"""
+        raw_query = raw_query.filter(
             AnalyticsEvent.tenant_id == tenant_id,
             AnalyticsEvent.created_at >= query.date_range.start_date,
             AnalyticsEvent.created_at <= query.date_range.end_date
         )
-        
+
         # Apply filters if specified
         if query.filters:
             for field, value in query.filters.items():
@@ -255,7 +254,109 @@ class AnalyticsRepository:
                         raw_query = raw_query.filter(
                             AnalyticsEvent.event_data[data_key].astext == str(data_value)
                         )
-        
+        return raw_query
+
+    @staticmethod
+    def dimension_column(dimension: str):
+        """Resolve a dimension name to a column, or an event_data key for data_* names"""
+        if dimension in STREAMABLE_EVENT_COLUMNS:
+            return getattr(AnalyticsEvent, dimension)
+        if dimension.startswith('data_'):
+            return AnalyticsEvent.event_data[dimension[len('data_'):]].as_string()
+        raise ValueError(f"Unsupported dimension: {dimension}")
+
+    @staticmethod
+    def _metric_column(metric: str):
+        """Resolve a metric name to an aggregate, or None if it isn't supported"""
+        event_value = func.coalesce(AnalyticsEvent.event_value, 0)
+        if metric == 'count':
+            return func.count(AnalyticsEvent.id)
+        if metric == 'sum_value':
+            return func.sum(event_value)
+        if metric == 'avg_value':
+            return func.avg(event_value)
+        if metric == 'min_value':
+            return func.min(event_value)
+        if metric == 'max_value':
+            return func.max(event_value)
+        if metric.startswith('count_distinct_'):
+            field = metric.replace('count_distinct_', '')
+            try:
+                return func.count(distinct(AnalyticsRepository.dimension_column(field)))
+            except ValueError:
+                return None
+        return None
+
+    @staticmethod
+    def stream_metrics(
+        db: Session,
+        query: AnalyticsQuery,
+        tenant_id: int,
+        batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> Tuple[List[str], Iterator[Dict[str, Any]]]:
+        """
+        Aggregate metrics in the database and stream the result rows.
+
+        Unlike aggregate_metrics, events are never loaded into memory: grouping
+        and aggregation happen in SQL and the result is read through a
+        server-side cursor. Without metrics or dimensions the raw events are
+        streamed, with event_data kept as a single JSON column.
+
+        Returns a tuple of (columns, row iterator)
+        """
+        group_by = query.dimensions or []
+
+        if not group_by and not query.metrics:
+            columns = list(STREAMABLE_EVENT_COLUMNS) + ['event_data']
+            raw_query = AnalyticsRepository._apply_event_filters(
+                db.query(*[getattr(AnalyticsEvent, column) for column in columns]),
+                query, tenant_id
+            ).order_by(AnalyticsEvent.created_at)
+        else:
+            selected = [
+                AnalyticsRepository.dimension_column(dimension).label(dimension)
+                for dimension in group_by
+            ]
+            for metric in query.metrics:
+                aggregate = AnalyticsRepository._metric_column(metric)
+                if aggregate is not None:
+                    selected.append(aggregate.label(metric))
+            columns = [column.name for column in selected]
+            raw_query = AnalyticsRepository._apply_event_filters(
+                db.query(*selected), query, tenant_id
+            )
+            if group_by:
+                raw_query = raw_query.group_by(*selected[:len(group_by)])
+
+        # Apply sorting if specified
+        if query.sort_by in columns:
+            sort_column = literal_column(query.sort_by)
+            raw_query = raw_query.order_by(desc(sort_column) if query.sort_desc else asc(sort_column))
+
+        # Apply limit and offset
+        if query.offset:
+            raw_query = raw_query.offset(query.offset)
+        if query.limit:
+            raw_query = raw_query.limit(query.limit)
+
+        rows = (row._asdict() for row in stream_query(raw_query, batch_size))
+        return columns, rows
+
+    @staticmethod
+    async def aggregate_metrics(
+        db: Session, 
+        query: AnalyticsQuery, 
+        tenant_id: int
+    ) -> pd.DataFrame:
+        """
+        Aggregate metrics based on query parameters
+        Returns a pandas DataFrame with the aggregated data
+        """
+        # Get raw events data
+        raw_query = AnalyticsRepository._apply_event_filters(
+            db.query(AnalyticsEvent), query, tenant_id
+        )
+
         # Execute query and convert to pandas DataFrame for easier manipulation
         results = raw_query.all()
         
@@ -183,3 +183,5 @@ class AnalyticsExportFormat(str, Enum):
 class AnalyticsExportQuery(AnalyticsQuery):
     format: AnalyticsExportFormat = AnalyticsExportFormat.CSV
     include_headers: bool = True
+    compress: bool = False  # Gzip the export on the fly
+    background: bool = False  # Write to disk and return a download token
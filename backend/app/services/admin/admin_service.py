@@ -15,6 +15,7 @@ from app.models.admin.role import Role
 from app.models.admin.permission import Permission
 from app.services.admin.admin_user.service import AdminUserService
 from app.services.admin.role_service import RoleService
+from app.services.admin.role.resolver import rbac_resolver
 from app.services.admin.permission_service import PermissionService
 from app.core.exceptions import ResourceNotFoundError, ValidationError
 
@@ -281,16 +282,17 @@ class AdminService:
         Returns:
             True if user has the permission, False otherwise
         """
-        permissions = await self.get_admin_user_permissions(
-            db, clerk_user_id, tenant_id
-        )
-
-        for permission in permissions:
-            if (permission["resource"] == resource and
-                    permission["action"] == action):
-                return True
+        admin_user = await self.get_admin_user_by_clerk_id(db, clerk_user_id)
+        if not admin_user:
+            return False
 
-        return False
+        return await rbac_resolver.has_permission(
+            db,
+            admin_user_id=admin_user.id,
+            resource=resource,
+            action=action,
+            tenant_id=tenant_id
+        )
 
     # System Management
 
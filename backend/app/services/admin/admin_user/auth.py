@@ -108,40 +108,32 @@ async def get_admin_user_permissions(
     Returns:
         List of permission objects with attributes and conditions
     """
-    from app.services.admin.admin_user.roles import get_admin_user_roles
-    from app.services.admin.role.permissions import get_role_permissions
-    
-    # Get all roles assigned to the admin user
-    assigned_roles = await get_admin_user_roles(
-        db=db,
+    from app.services.admin.role.resolver import rbac_resolver
+
+    # Role graph and permissions come from the compiled snapshot; only the
+    # user's role assignments may need a query on a cold cache
+    snapshot = await rbac_resolver.snapshot(db)
+    assigned_roles = await rbac_resolver.assigned_roles(
+        db,
         admin_user_id=admin_user_id,
         tenant_id=tenant_id
     )
-    
-    # Collect permissions from all roles
+
+    # Collect permissions from all roles, including ancestor roles
     permissions = []
-    for role, role_tenant_id in assigned_roles:
-        # Include permissions from ancestor roles
-        role_permissions = await get_role_permissions(
-            db=db,
-            role_id=role.id,
-            include_ancestors=True
-        )
-        
-        # Add each permission with its details
-        for permission, condition in role_permissions:
-            permission_obj = {
-                'id': str(permission.id),
-                'resource': permission.resource,
-                'action': permission.action,
-                'scope': permission.scope.value,
-                'condition': condition,
+    for role_id, role_tenant_id in assigned_roles:
+        for grant in snapshot.grants_for(role_id):
+            permissions.append({
+                'id': str(grant.permission.id),
+                'resource': grant.permission.resource,
+                'action': grant.permission.action,
+                'scope': grant.permission.scope,
+                'condition': grant.condition,
                 'from_role': {
-                    'id': str(role.id),
-                    'name': role.name,
+                    'id': str(role_id),
+                    'name': snapshot.roles.get(role_id),
                     'tenant_id': str(role_tenant_id) if role_tenant_id else None
                 }
-            }
-            permissions.append(permission_obj)
-            
+            })
+
     return permissions
@@ -21,6 +21,7 @@ from app.models.admin.admin_user import AdminUser, AdminUserRole
 from app.models.admin.role import Role
 from app.models.user import User
 from app.core.exceptions import ResourceNotFoundError, ValidationError
+from app.services.admin.role.resolver import rbac_resolver
 
 
 class AdminUserService:
@@ -316,6 +317,7 @@ class AdminUserService:
             )
             db.add(admin_user_role)
             await db.flush()
+            rbac_resolver.invalidate_on_commit(db)
             return admin_user_role
         except IntegrityError:
             await db.rollback()
@@ -358,6 +360,7 @@ class AdminUserService:
         if admin_user_role:
             await db.delete(admin_user_role)
             await db.flush()
+            rbac_resolver.invalidate_on_commit(db)
 
     async def get_admin_user_roles(
         self,
@@ -444,38 +447,10 @@ class AdminUserService:
         Returns:
             True if the admin user has the role, False otherwise
         """
-        # Get the role by name
-        from app.services.admin.role_service import RoleService
-        role_service = RoleService()
-        role = await role_service.get_role_by_name(db, role_name)
-        if not role:
-            return False
-            
-        # Get all roles assigned to the admin user
-        assigned_roles = await self.get_admin_user_roles(
-            db=db,
+        return await rbac_resolver.has_role(
+            db,
             admin_user_id=admin_user_id,
-            tenant_id=tenant_id
+            role_name=role_name,
+            tenant_id=tenant_id,
+            include_ancestors=include_ancestors
         )
-        
-        # Check if the role is directly assigned
-        for assigned_role, assigned_tenant_id in assigned_roles:
-            if assigned_role.id == role.id:
-                return True
-                
-        # If include_ancestors is True, check if any ancestor of the role is assigned
-        if include_ancestors:
-            # Get all assigned role IDs
-            assigned_role_ids = [r.id for r, _ in assigned_roles]
-            
-            # For each assigned role, check if it's an ancestor of the target role
-            for assigned_role_id in assigned_role_ids:
-                is_ancestor = await role_service.is_role_ancestor(
-                    db=db,
-                    role_id=role.id,
-                    potential_ancestor_id=assigned_role_id
-                )
-                if is_ancestor:
-                    return True
-                    
-        return False
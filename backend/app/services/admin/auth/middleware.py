@@ -15,6 +15,7 @@ from app.models.admin.permission import PermissionScope
 from app.services.admin.admin_user.service import AdminUserService
 from app.db.session import get_db
 from app.services.admin.auth.dependencies import get_current_admin_user
+from app.services.admin.role.resolver import rbac_resolver
 
 
 class AdminPermissionVerifier:
@@ -61,30 +62,15 @@ class AdminPermissionVerifier:
         Returns:
             True if the user has the permission, False otherwise
         """
-        # Get all permissions for the admin user
-        permissions = await self.admin_user_service.get_admin_user_permissions(
-            db=self.db,
+        # Conditions on grants are not evaluated yet; any matching grant allows
+        return await rbac_resolver.has_permission(
+            self.db,
             admin_user_id=admin_user_id,
+            resource=resource,
+            action=action,
+            scope=scope,
             tenant_id=tenant_id
         )
-        
-        # Check if the user has the required permission
-        for permission in permissions:
-            if (
-                permission['resource'] == resource and
-                permission['action'] == action and
-                # Check if permission scope matches or is broader
-                (
-                    permission['scope'] == scope.value or
-                    (permission['scope'] == PermissionScope.GLOBAL.value and
-                     scope != PermissionScope.GLOBAL)
-                )
-            ):
-                # If there's a condition, it would need to be evaluated here
-                # For simplicity, we'll assume the condition is met
-                return True
-                
-        return False
     
     async def verify_role(
         self,
@@ -0,0 +1,180 @@
+"""
+Admin dashboard metrics engine.
+
+The dashboard needs counts from four tables and the audit rollups. Each
+table is read with one fused aggregate (``COUNT(*) FILTER (...)``), and the
+five reads run concurrently, each on its own pooled connection, so a cold
+load costs about one round trip.
+
+Provides:
+- ``snapshot(days)``: the metrics for a window, cached per worker for
+  ``ttl`` seconds
+- Stale-while-revalidate: a snapshot up to ``max_stale`` seconds old is
+  served at once while a background task recomputes it
+- One computation per window at a time; concurrent loads share it
+
+Security and request metrics, including the ``details->>'status_code'``
+error count, come from the hourly audit rollups (``security_summary``).
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.audit.audit_storage import security_summary
+
+logger = logging.getLogger(__name__)
+
+# Snapshots younger than this are served without recomputing
+CACHE_TTL_SECONDS = 30.0
+# Older snapshots up to this age are served while a refresh runs
+MAX_STALE_SECONDS = 300.0
+
+TABLE_QUERIES = {
+    "tenants": """
+        SELECT
+            COUNT(*) AS total_tenants,
+            COUNT(*) FILTER (WHERE is_active = true) AS active_tenants,
+            COUNT(*) FILTER (WHERE is_verified = true) AS verified_tenants,
+            COUNT(*) FILTER (WHERE created_at >= :start_date) AS new_tenants,
+            COUNT(*) FILTER (WHERE created_at >= :previous_start AND created_at < :start_date) AS previous_tenants
+        FROM tenants
+    """,
+    "users": """
+        SELECT
+            COUNT(*) AS total_users,
+            COUNT(*) FILTER (WHERE is_active = true) AS active_users,
+            COUNT(*) FILTER (WHERE created_at >= :start_date) AS new_users,
+            COUNT(*) FILTER (WHERE last_login >= :start_date) AS active_in_period
+        FROM users
+    """,
+    "orders": """
+        SELECT
+            COUNT(*) AS total_orders,
+            COUNT(*) FILTER (WHERE status = 'completed') AS completed_orders,
+            COUNT(*) FILTER (WHERE created_at >= :start_date) AS recent_orders,
+            COALESCE(SUM(total_amount) FILTER (WHERE status = 'completed'), 0) AS total_revenue,
+            COALESCE(AVG(total_amount) FILTER (WHERE status = 'completed'), 0) AS avg_order_value
+        FROM orders
+    """,
+    "products": """
+        SELECT
+            COUNT(*) AS total_products,
+            COUNT(*) FILTER (WHERE is_active = true) AS active_products,
+            COUNT(*) FILTER (WHERE created_at >= :start_date) AS new_products,
+            COALESCE(SUM(inventory_quantity), 0) AS total_inventory
+        FROM products
+    """,
+}
+
+
+class DashboardMetricsEngine:
+    """Computes and caches dashboard metrics per analysis window"""
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+        audit_summary: Callable[[AsyncSession, datetime], Awaitable[Dict[str, Any]]] = security_summary,
+        ttl: float = CACHE_TTL_SECONDS,
+        max_stale: float = MAX_STALE_SECONDS,
+    ):
+        self._session_factory = session_factory
+        self.audit_summary = audit_summary
+        self.ttl = ttl
+        self.max_stale = max_stale
+        # days -> (monotonic time computed, snapshot)
+        self._snapshots: Dict[int, Tuple[float, Dict[str, Any]]] = {}
+        self._refreshing: Dict[int, asyncio.Task] = {}
+
+    def _session(self) -> AsyncSession:
+        if self._session_factory is None:
+            from app.core.db.session import AsyncSessionLocal
+
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory()
+
+    async def _table(self, name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        async with self._session() as db:
+            result = await db.execute(text(TABLE_QUERIES[name]), params)
+            return dict(result.mappings().one())
+
+    async def _audit(self, start_date: datetime) -> Dict[str, Any]:
+        async with self._session() as db:
+            return await self.audit_summary(db, start_date)
+
+    async def compute(self, days: int) -> Dict[str, Any]:
+        """
+        Read every metric for the last ``days`` days, bypassing the cache.
+
+        Returns:
+            One row per table under its name, the audit summary under
+            ``audit`` and the computation time under ``computed_at``
+        """
+        end_date = datetime.utcnow()
+        start_date = end_date - timedelta(days=days)
+        params = {"start_date": start_date, "previous_start": start_date - timedelta(days=days)}
+
+        names = list(TABLE_QUERIES)
+        results = await asyncio.gather(
+            *(self._table(name, params) for name in names),
+            self._audit(start_date),
+        )
+        snapshot: Dict[str, Any] = dict(zip(names, results))
+        snapshot["audit"] = results[-1]
+        snapshot["computed_at"] = end_date
+        return snapshot
+
+    def _refresh(self, days: int) -> asyncio.Task:
+        task = self._refreshing.get(days)
+        if task is None:
+            task = asyncio.create_task(self._recompute(days))
+            task.add_done_callback(self._log_failure)
+            self._refreshing[days] = task
+        return task
+
+    async def _recompute(self, days: int) -> Dict[str, Any]:
+        try:
+            snapshot = await self.compute(days)
+            self._snapshots[days] = (time.monotonic(), snapshot)
+            return snapshot
+        finally:
+            self._refreshing.pop(days, None)
+
+    async def snapshot(self, days: int) -> Dict[str, Any]:
+        """
+        Metrics for the last ``days`` days, from the cache when possible.
+
+        Args:
+            days: Length of the analysis window
+
+        Returns:
+            The same structure as ``compute``
+        """
+        cached = self._snapshots.get(days)
+        if cached is not None:
+            age = time.monotonic() - cached[0]
+            if age < self.ttl:
+                return cached[1]
+            if age < self.max_stale:
+                self._refresh(days)
+                return cached[1]
+        # shield: a cancelled request must not cancel a load other requests share
+        return await asyncio.shield(self._refresh(days))
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Dashboard metrics refresh failed: {str(task.exception())}")
+
+    def invalidate(self) -> None:
+        """Drop every cached snapshot."""
+        self._snapshots.clear()
+
+
+# Global dashboard metrics engine instance
+dashboard_metrics = DashboardMetricsEngine()
@@ -11,6 +11,7 @@ from sqlalchemy.exc import IntegrityError
 
 from app.models.admin.permission import Permission, PermissionScope
 from app.core.exceptions import ResourceNotFoundError, ValidationError
+from app.services.admin.role.resolver import rbac_resolver
 
 
 async def create_permission(
@@ -177,6 +178,7 @@ async def update_permission(
             setattr(permission, key, value)
             
     await db.flush()
+    rbac_resolver.invalidate_on_commit(db)
     return permission
 
 
@@ -202,3 +204,4 @@ async def delete_permission(
         
     await db.delete(permission)
     await db.flush()
+    rbac_resolver.invalidate_on_commit(db)
@@ -16,6 +16,7 @@ from sqlalchemy.exc import IntegrityError
 
 from app.models.admin.permission import Permission, PermissionScope
 from app.core.exceptions import ResourceNotFoundError, ValidationError
+from app.services.admin.role.resolver import rbac_resolver
 
 
 class PermissionService:
@@ -186,6 +187,7 @@ class PermissionService:
                 setattr(permission, key, value)
                 
         await db.flush()
+        rbac_resolver.invalidate_on_commit(db)
         return permission
 
     async def delete_permission(
@@ -211,6 +213,7 @@ class PermissionService:
             
         await db.delete(permission)
         await db.flush()
+        rbac_resolver.invalidate_on_commit(db)
         
     async def create_system_permissions(
         self,
@@ -11,6 +11,7 @@ from sqlalchemy.exc import IntegrityError
 
 from app.models.admin.role import Role
 from app.core.exceptions import ResourceNotFoundError, ValidationError
+from app.services.admin.role.resolver import rbac_resolver
 
 
 async def create_role(
@@ -45,6 +46,7 @@ async def create_role(
         )
         db.add(role)
         await db.flush()
+        rbac_resolver.invalidate_on_commit(db)
         return role
     except IntegrityError:
         await db.rollback()
@@ -157,6 +159,7 @@ async def update_role(
             setattr(role, key, value)
             
     await db.flush()
+    rbac_resolver.invalidate_on_commit(db)
     return role
 
 
@@ -182,3 +185,4 @@ async def delete_role(
         
     await db.delete(role)
     await db.flush()
+    rbac_resolver.invalidate_on_commit(db)
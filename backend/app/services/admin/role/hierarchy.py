@@ -12,6 +12,7 @@ from sqlalchemy.exc import IntegrityError
 from app.models.admin.role import Role, RoleHierarchy
 from app.core.exceptions import ResourceNotFoundError, ValidationError
 from app.services.admin.role.crud import get_role
+from app.services.admin.role.resolver import rbac_resolver
 
 
 async def add_role_parent(
@@ -53,6 +54,7 @@ async def add_role_parent(
         )
         db.add(hierarchy)
         await db.flush()
+        rbac_resolver.invalidate_on_commit(db)
         return hierarchy
     except IntegrityError:
         await db.rollback()
@@ -87,6 +89,7 @@ async def remove_role_parent(
     if hierarchy:
         await db.delete(hierarchy)
         await db.flush()
+        rbac_resolver.invalidate_on_commit(db)
 
 
 async def get_parent_roles(
@@ -139,6 +142,30 @@ async def get_child_roles(
     return list(result.scalars().all())
 
 
+def _role_closure_query(role_id: UUID, ancestors: bool):
+    """
+    Recursive CTE selecting every role reachable from a role.
+
+    Walks child -> parent edges for ancestors and parent -> child edges for
+    descendants. UNION (not UNION ALL) discards revisited roles, so the walk
+    terminates even if the stored hierarchy contains a cycle.
+    """
+    if ancestors:
+        from_column, to_column = RoleHierarchy.child_role_id, RoleHierarchy.parent_role_id
+    else:
+        from_column, to_column = RoleHierarchy.parent_role_id, RoleHierarchy.child_role_id
+
+    closure = (
+        select(to_column.label("role_id"))
+        .where(from_column == role_id)
+        .cte("role_closure", recursive=True)
+    )
+    closure = closure.union(
+        select(to_column).join(closure, from_column == closure.c.role_id)
+    )
+    return select(closure.c.role_id)
+
+
 async def get_all_ancestor_roles(
     db: AsyncSession,
     role_id: UUID,
@@ -146,28 +173,23 @@ async def get_all_ancestor_roles(
 ) -> Set[UUID]:
     """
     Get all ancestor roles (parents, grandparents, etc.) of a role.
-    
+
+    Resolved in a single recursive query so it reflects uncommitted changes
+    in the current transaction; hot-path checks use the cached resolver.
+
     Args:
         db: Database session
         role_id: ID of the role
         include_self: Whether to include the role itself
-        
+
     Returns:
         Set of ancestor role IDs
     """
-    # Use recursive approach to find all ancestors
-    ancestors = set()
+    result = await db.execute(_role_closure_query(role_id, ancestors=True))
+    ancestors = set(result.scalars().all())
+    ancestors.discard(role_id)
     if include_self:
         ancestors.add(role_id)
-        
-    async def collect_ancestors(current_role_id: UUID) -> None:
-        parents = await get_parent_roles(db, current_role_id)
-        for parent in parents:
-            if parent.id not in ancestors:
-                ancestors.add(parent.id)
-                await collect_ancestors(parent.id)
-                
-    await collect_ancestors(role_id)
     return ancestors
 
 
@@ -178,28 +200,20 @@ async def get_all_descendant_roles(
 ) -> Set[UUID]:
     """
     Get all descendant roles (children, grandchildren, etc.) of a role.
-    
+
     Args:
         db: Database session
         role_id: ID of the role
         include_self: Whether to include the role itself
-        
+
     Returns:
         Set of descendant role IDs
     """
-    # Use recursive approach to find all descendants
-    descendants = set()
+    result = await db.execute(_role_closure_query(role_id, ancestors=False))
+    descendants = set(result.scalars().all())
+    descendants.discard(role_id)
     if include_self:
         descendants.add(role_id)
-        
-    async def collect_descendants(current_role_id: UUID) -> None:
-        children = await get_child_roles(db, current_role_id)
-        for child in children:
-            if child.id not in descendants:
-                descendants.add(child.id)
-                await collect_descendants(child.id)
-                
-    await collect_descendants(role_id)
     return descendants
 
 
@@ -210,14 +224,17 @@ async def is_role_ancestor(
 ) -> bool:
     """
     Check if a role is an ancestor of another role.
-    
+
     Args:
         db: Database session
         role_id: ID of the role
         potential_ancestor_id: ID of the potential ancestor role
-        
+
     Returns:
         True if the potential ancestor is an ancestor, False otherwise
     """
-    ancestors = await get_all_ancestor_roles(db, role_id)
-    return potential_ancestor_id in ancestors
+    closure = _role_closure_query(role_id, ancestors=True).subquery()
+    result = await db.execute(
+        select(closure.c.role_id).where(closure.c.role_id == potential_ancestor_id).limit(1)
+    )
+    return result.first() is not None
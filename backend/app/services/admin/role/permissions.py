@@ -16,6 +16,7 @@ from app.core.exceptions import ResourceNotFoundError, ValidationError
 from app.services.admin.role.crud import get_role
 from app.services.admin.role.hierarchy import get_all_ancestor_roles
 from app.services.admin.permission.crud import get_permission
+from app.services.admin.role.resolver import rbac_resolver
 
 
 async def assign_permission_to_role(
@@ -53,6 +54,7 @@ async def assign_permission_to_role(
         )
         db.add(role_permission)
         await db.flush()
+        rbac_resolver.invalidate_on_commit(db)
         return role_permission
     except IntegrityError:
         await db.rollback()
@@ -87,6 +89,7 @@ async def remove_permission_from_role(
     if role_permission:
         await db.delete(role_permission)
         await db.flush()
+        rbac_resolver.invalidate_on_commit(db)
 
 
 async def get_role_permissions(
@@ -0,0 +1,385 @@
+"""
+Compiled RBAC resolver.
+
+The role graph and role permissions are loaded once into an immutable
+snapshot that precomputes, per role, the transitive ancestor/descendant
+closure and an effective-permission bitset (own grants plus everything
+inherited from ancestors). Permission and role checks against a warm
+snapshot are set and bitmask lookups with no database round trip.
+
+Snapshots are tagged with a version stamp. Any write to roles, the role
+hierarchy, role permissions, permissions or admin role assignments bumps
+the stamp, locally right away and in Redis once the transaction commits,
+so every worker drops its snapshot on its next version check.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache.redis_cache import redis_cache
+from app.core.cache.versioned_snapshot import MAX_SNAPSHOT_AGE, VersionedSnapshotCache
+from app.models.admin.admin_user import AdminUserRole
+from app.models.admin.permission import Permission, PermissionScope
+from app.models.admin.role import Role, RoleHierarchy
+from app.models.admin.role_permission import RolePermission
+
+logger = logging.getLogger(__name__)
+
+RBAC_VERSION_KEY = "rbac:version"
+# How often a warm snapshot re-reads the shared version stamp
+VERSION_CHECK_INTERVAL = 5.0
+
+Edge = Tuple[UUID, UUID]
+
+
+@dataclass(frozen=True)
+class PermissionGrant:
+    """A permission as seen by the resolver"""
+    id: UUID
+    resource: str
+    action: str
+    scope: str
+
+
+@dataclass(frozen=True)
+class RoleGrant:
+    """A permission granted to a role, directly or through an ancestor"""
+    permission: PermissionGrant
+    condition: Optional[str]
+    from_role_id: UUID
+
+
+def _closure(graph: Dict[UUID, Set[UUID]], roots: Iterable[UUID]) -> Dict[UUID, FrozenSet[UUID]]:
+    """Transitive closure of every root over an adjacency map, excluding the root."""
+    closure: Dict[UUID, FrozenSet[UUID]] = {}
+    for root in roots:
+        seen: Set[UUID] = set()
+        stack = list(graph.get(root, ()))
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            stack.extend(graph.get(node, ()))
+        seen.discard(root)
+        closure[root] = frozenset(seen)
+    return closure
+
+
+class RBACSnapshot:
+    """Immutable, precomputed view of the role graph and its permissions"""
+
+    def __init__(
+        self,
+        version,
+        roles: Dict[UUID, str],
+        edges: Iterable[Edge],
+        grants: Iterable[Tuple[UUID, PermissionGrant, Optional[str]]],
+    ):
+        """
+        Build a snapshot.
+
+        Args:
+            version: Shared version stamp the snapshot was loaded at
+            roles: Role names by role ID
+            edges: (parent_role_id, child_role_id) pairs
+            grants: (role_id, permission, condition) triples
+        """
+        self.version = version
+        self.roles = dict(roles)
+        self.role_ids_by_name = {name: role_id for role_id, name in self.roles.items()}
+
+        parents: Dict[UUID, Set[UUID]] = {}
+        children: Dict[UUID, Set[UUID]] = {}
+        for parent_id, child_id in edges:
+            parents.setdefault(child_id, set()).add(parent_id)
+            children.setdefault(parent_id, set()).add(child_id)
+        self.ancestors = _closure(parents, self.roles)
+        self.descendants = _closure(children, self.roles)
+
+        # One bit per permission; check masks say which bits satisfy a check
+        self.permissions: List[PermissionGrant] = []
+        bits: Dict[UUID, int] = {}
+        self._direct_grants: Dict[UUID, List[Tuple[int, Optional[str]]]] = {}
+        direct: Dict[UUID, int] = {}
+        for role_id, permission, condition in grants:
+            bit = bits.get(permission.id)
+            if bit is None:
+                bit = bits[permission.id] = len(self.permissions)
+                self.permissions.append(permission)
+            direct[role_id] = direct.get(role_id, 0) | (1 << bit)
+            self._direct_grants.setdefault(role_id, []).append((bit, condition))
+
+        self.effective: Dict[UUID, int] = {}
+        for role_id in self.roles:
+            mask = direct.get(role_id, 0)
+            for ancestor_id in self.ancestors[role_id]:
+                mask |= direct.get(ancestor_id, 0)
+            self.effective[role_id] = mask
+
+        self._scoped_masks: Dict[Tuple[str, str, str], int] = {}
+        self._any_scope_masks: Dict[Tuple[str, str], int] = {}
+        for bit, permission in enumerate(self.permissions):
+            flag = 1 << bit
+            key = (permission.resource, permission.action)
+            self._any_scope_masks[key] = self._any_scope_masks.get(key, 0) | flag
+            scoped_key = key + (permission.scope,)
+            self._scoped_masks[scoped_key] = self._scoped_masks.get(scoped_key, 0) | flag
+
+    def ancestors_of(self, role_id: UUID, include_self: bool = False) -> Set[UUID]:
+        ancestors = set(self.ancestors.get(role_id, ()))
+        if include_self:
+            ancestors.add(role_id)
+        return ancestors
+
+    def descendants_of(self, role_id: UUID, include_self: bool = False) -> Set[UUID]:
+        descendants = set(self.descendants.get(role_id, ()))
+        if include_self:
+            descendants.add(role_id)
+        return descendants
+
+    def is_ancestor(self, role_id: UUID, potential_ancestor_id: UUID) -> bool:
+        return potential_ancestor_id in self.ancestors.get(role_id, ())
+
+    def permission_mask(self, role_ids: Iterable[UUID]) -> int:
+        """Combined effective-permission bitset of a set of roles"""
+        mask = 0
+        for role_id in role_ids:
+            mask |= self.effective.get(role_id, 0)
+        return mask
+
+    def allows(
+        self,
+        mask: int,
+        resource: str,
+        action: str,
+        scope: Optional[PermissionScope] = None,
+    ) -> bool:
+        """
+        Check a permission bitset.
+
+        Args:
+            mask: Effective-permission bitset from permission_mask
+            resource: Resource to access
+            action: Action to perform
+            scope: Required scope; None accepts any scope. A global grant
+                also satisfies a narrower scope.
+
+        Returns:
+            True if any granted permission satisfies the check
+        """
+        if scope is None:
+            return bool(mask & self._any_scope_masks.get((resource, action), 0))
+        scope = PermissionScope(scope)
+        required = self._scoped_masks.get((resource, action, scope.value), 0)
+        if scope != PermissionScope.GLOBAL:
+            required |= self._scoped_masks.get((resource, action, PermissionScope.GLOBAL.value), 0)
+        return bool(mask & required)
+
+    def has_role(
+        self,
+        assigned_role_ids: Iterable[UUID],
+        role_name: str,
+        include_ancestors: bool = True,
+    ) -> bool:
+        """Whether an assigned role is the named role, or one of its ancestors"""
+        role_id = self.role_ids_by_name.get(role_name)
+        if role_id is None:
+            return False
+        assigned = set(assigned_role_ids)
+        if role_id in assigned:
+            return True
+        return include_ancestors and not assigned.isdisjoint(self.ancestors.get(role_id, ()))
+
+    def grants_for(self, role_id: UUID) -> List[RoleGrant]:
+        """Permissions of a role including those inherited from its ancestors"""
+        grants = []
+        for source_id in (role_id, *self.ancestors.get(role_id, ())):
+            for bit, condition in self._direct_grants.get(source_id, ()):
+                grants.append(RoleGrant(self.permissions[bit], condition, source_id))
+        return grants
+
+
+class RBACResolver(VersionedSnapshotCache[RBACSnapshot]):
+    """Process-wide cache of the compiled RBAC snapshot and user role assignments"""
+
+    def __init__(
+        self,
+        cache=redis_cache,
+        version_check_interval: float = VERSION_CHECK_INTERVAL,
+        max_snapshot_age: float = MAX_SNAPSHOT_AGE,
+    ):
+        super().__init__(
+            RBAC_VERSION_KEY,
+            name="RBAC",
+            cache=cache,
+            version_check_interval=version_check_interval,
+            max_snapshot_age=max_snapshot_age,
+        )
+        self._user_roles: Dict[Tuple[UUID, Optional[UUID]], FrozenSet[Tuple[UUID, Optional[UUID]]]] = {}
+
+    async def snapshot(self, db: AsyncSession) -> RBACSnapshot:
+        """
+        Get the current snapshot, loading it if it is cold or stale.
+
+        Args:
+            db: Database session used only when the snapshot has to be loaded
+
+        Returns:
+            The compiled RBAC snapshot
+        """
+        return await self._current(lambda version: self.load(db, version))
+
+    def _store(self, snapshot: RBACSnapshot):
+        super()._store(snapshot)
+        self._user_roles = {}
+
+    async def load(self, db: AsyncSession, version=None) -> RBACSnapshot:
+        """Load the whole role graph and its permissions in three queries."""
+        roles = await db.execute(select(Role.id, Role.name))
+        edges = await db.execute(
+            select(RoleHierarchy.parent_role_id, RoleHierarchy.child_role_id)
+        )
+        grants = await db.execute(
+            select(
+                RolePermission.role_id,
+                RolePermission.condition,
+                Permission.id,
+                Permission.resource,
+                Permission.action,
+                Permission.scope,
+            ).join(Permission, Permission.id == RolePermission.permission_id)
+        )
+
+        snapshot = RBACSnapshot(
+            version=version,
+            roles={role_id: name for role_id, name in roles.all()},
+            edges=[(parent_id, child_id) for parent_id, child_id in edges.all()],
+            grants=[
+                (
+                    role_id,
+                    PermissionGrant(
+                        id=permission_id,
+                        resource=resource,
+                        action=action,
+                        scope=PermissionScope(scope).value,
+                    ),
+                    condition,
+                )
+                for role_id, condition, permission_id, resource, action, scope in grants.all()
+            ],
+        )
+        logger.info(
+            f"Loaded RBAC snapshot: {len(snapshot.roles)} roles, "
+            f"{len(snapshot.permissions)} permissions"
+        )
+        return snapshot
+
+    async def assigned_roles(
+        self,
+        db: AsyncSession,
+        admin_user_id: UUID,
+        tenant_id: Optional[UUID] = None,
+    ) -> FrozenSet[Tuple[UUID, Optional[UUID]]]:
+        """
+        Role assignments of an admin user, cached until the next invalidation.
+
+        Args:
+            db: Database session used on a cache miss
+            admin_user_id: ID of the admin user
+            tenant_id: Optional tenant to restrict assignments to
+
+        Returns:
+            (role_id, assignment tenant_id) pairs
+        """
+        await self.snapshot(db)
+        key = (admin_user_id, tenant_id)
+        cached = self._user_roles.get(key)
+        if cached is not None:
+            return cached
+
+        generation = self._generation
+        query = select(AdminUserRole.role_id, AdminUserRole.tenant_id).where(
+            AdminUserRole.admin_user_id == admin_user_id
+        )
+        if tenant_id is not None:
+            query = query.where(AdminUserRole.tenant_id == tenant_id)
+        result = await db.execute(query)
+        assignments = frozenset((role_id, role_tenant_id) for role_id, role_tenant_id in result.all())
+        if generation == self._generation:
+            self._user_roles[key] = assignments
+        return assignments
+
+    async def assigned_role_ids(
+        self,
+        db: AsyncSession,
+        admin_user_id: UUID,
+        tenant_id: Optional[UUID] = None,
+    ) -> Set[UUID]:
+        """Role IDs assigned to an admin user"""
+        return {role_id for role_id, _ in await self.assigned_roles(db, admin_user_id, tenant_id)}
+
+    async def has_permission(
+        self,
+        db: AsyncSession,
+        admin_user_id: UUID,
+        resource: str,
+        action: str,
+        scope: Optional[PermissionScope] = None,
+        tenant_id: Optional[UUID] = None,
+    ) -> bool:
+        """Check whether an admin user holds a permission through any of their roles."""
+        snapshot = await self.snapshot(db)
+        role_ids = await self.assigned_role_ids(db, admin_user_id, tenant_id)
+        return snapshot.allows(snapshot.permission_mask(role_ids), resource, action, scope)
+
+    async def has_role(
+        self,
+        db: AsyncSession,
+        admin_user_id: UUID,
+        role_name: str,
+        tenant_id: Optional[UUID] = None,
+        include_ancestors: bool = True,
+    ) -> bool:
+        """Check whether an admin user has a role directly or through an ancestor role."""
+        snapshot = await self.snapshot(db)
+        role_ids = await self.assigned_role_ids(db, admin_user_id, tenant_id)
+        return snapshot.has_role(role_ids, role_name, include_ancestors)
+
+    def invalidate_local(self):
+        """Drop this process's snapshot and role assignments."""
+        super().invalidate_local()
+        self._user_roles = {}
+
+    def invalidate_on_commit(self, db: AsyncSession):
+        """
+        Invalidate now and again once the session's transaction commits.
+
+        Invalidating only before commit would let a concurrent reload cache
+        the pre-commit graph under the new stamp; invalidating again after
+        commit guarantees the next load sees the change.
+        """
+        self.invalidate_local()
+
+        sync_session = getattr(db, "sync_session", None)
+        if sync_session is None:
+            return
+
+        def after_commit(session):
+            self.invalidate_local()
+            try:
+                asyncio.get_running_loop().create_task(self.invalidate())
+            except RuntimeError:
+                pass
+
+        event.listen(sync_session, "after_commit", after_commit, once=True)
+
+
+# Global RBAC resolver instance
+rbac_resolver = RBACResolver()
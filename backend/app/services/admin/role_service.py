@@ -19,6 +19,8 @@ from app.models.admin.role import Role, RoleHierarchy
 from app.models.admin.role_permission import RolePermission
 from app.models.admin.permission import Permission
 from app.core.exceptions import ResourceNotFoundError, ValidationError
+from app.services.admin.role import hierarchy as role_hierarchy
+from app.services.admin.role.resolver import rbac_resolver
 
 
 class RoleService:
@@ -57,6 +59,7 @@ class RoleService:
             )
             db.add(role)
             await db.flush()
+            rbac_resolver.invalidate_on_commit(db)
             return role
         except IntegrityError:
             await db.rollback()
@@ -170,6 +173,7 @@ class RoleService:
                 setattr(role, key, value)
 
         await db.flush()
+        rbac_resolver.invalidate_on_commit(db)
         return role
 
     async def delete_role(
@@ -195,6 +199,7 @@ class RoleService:
 
         await db.delete(role)
         await db.flush()
+        rbac_resolver.invalidate_on_commit(db)
 
     # Role Hierarchy Methods
 
@@ -238,6 +243,7 @@ class RoleService:
             )
             db.add(hierarchy)
             await db.flush()
+            rbac_resolver.invalidate_on_commit(db)
             return hierarchy
         except IntegrityError:
             await db.rollback()
@@ -272,6 +278,7 @@ class RoleService:
         if hierarchy:
             await db.delete(hierarchy)
             await db.flush()
+            rbac_resolver.invalidate_on_commit(db)
 
     async def get_parent_roles(
         self,
@@ -340,20 +347,7 @@ class RoleService:
         Returns:
             Set of ancestor role IDs
         """
-        # Use recursive approach to find all ancestors
-        ancestors = set()
-        if include_self:
-            ancestors.add(role_id)
-
-        async def collect_ancestors(current_role_id: UUID) -> None:
-            parents = await self.get_parent_roles(db, current_role_id)
-            for parent in parents:
-                if parent.id not in ancestors:
-                    ancestors.add(parent.id)
-                    await collect_ancestors(parent.id)
-
-        await collect_ancestors(role_id)
-        return ancestors
+        return await role_hierarchy.get_all_ancestor_roles(db, role_id, include_self)
 
     async def get_all_descendant_roles(
         self,
@@ -372,20 +366,7 @@ class RoleService:
         Returns:
             Set of descendant role IDs
         """
-        # Use recursive approach to find all descendants
-        descendants = set()
-        if include_self:
-            descendants.add(role_id)
-
-        async def collect_descendants(current_role_id: UUID) -> None:
-            children = await self.get_child_roles(db, current_role_id)
-            for child in children:
-                if child.id not in descendants:
-                    descendants.add(child.id)
-                    await collect_descendants(child.id)
-
-        await collect_descendants(role_id)
-        return descendants
+        return await role_hierarchy.get_all_descendant_roles(db, role_id, include_self)
 
     async def is_role_ancestor(
         self,
@@ -404,8 +385,7 @@ class RoleService:
         Returns:
             True if the potential ancestor is an ancestor, False otherwise
         """
-        ancestors = await self.get_all_ancestor_roles(db, role_id)
-        return potential_ancestor_id in ancestors
+        return await role_hierarchy.is_role_ancestor(db, role_id, potential_ancestor_id)
 
     # Role Permission Methods
 
@@ -449,6 +429,7 @@ class RoleService:
             )
             db.add(role_permission)
             await db.flush()
+            rbac_resolver.invalidate_on_commit(db)
             return role_permission
         except IntegrityError:
             await db.rollback()
@@ -483,6 +464,7 @@ class RoleService:
         if role_permission:
             await db.delete(role_permission)
             await db.flush()
+            rbac_resolver.invalidate_on_commit(db)
 
     async def get_role_permissions(
         self,
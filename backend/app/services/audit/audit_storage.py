@@ -0,0 +1,384 @@
+"""
+Audit log storage engine.
+
+``audit_logs`` is range-partitioned by month on ``timestamp``. This module
+keeps that layout maintained and serves aggregate reads from rollups:
+
+1. Partitions: the current month and ``months_ahead`` future months always
+   exist; a DEFAULT partition catches out-of-range timestamps
+2. Retention: partitions older than ``retention_months`` are detached, so
+   old data leaves the table without a bulk DELETE
+3. Cold archive: detached partitions are exported to gzip-compressed JSON
+   lines in ``archive_dir`` and then dropped
+4. Rollups: ``audit_log_rollups_hourly`` is refreshed incrementally from a
+   watermark; each refresh recomputes the hours from one hour before the
+   watermark, so rows committed late within that hour are still counted
+5. Reads: ``activity_stats`` and ``security_summary`` answer the admin
+   statistics from the rollups
+
+Maintenance runs in one worker at a time (a Postgres advisory lock).
+"""
+
+import asyncio
+import gzip
+import logging
+import os
+import re
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config.settings import get_settings
+from app.models.audit.audit_log import AuditLogHourlyRollup
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "audit_logs"
+PARTITION_PATTERN = re.compile(r"^audit_logs_(\d{4})_(\d{2})$")
+MONTHS_AHEAD = 2
+ROLLUP_INTERVAL_SECONDS = 60
+MAINTENANCE_INTERVAL_SECONDS = 3600
+# Longest time range one rollup refresh recomputes; backfills take several runs
+MAX_REFRESH_SPAN = timedelta(days=7)
+ARCHIVE_BATCH_SIZE = 5000
+# pg_try_advisory_xact_lock key; any constant unique to this engine
+AUDIT_LOCK_KEY = 0x61756469746C6F67
+
+# Actions counted as sign-ins by the security summary
+LOGIN_ACTIONS = ("login", "authentication")
+
+rollups = AuditLogHourlyRollup.__table__
+
+REFRESH_ROLLUPS_SQL = """
+    INSERT INTO audit_log_rollups_hourly (
+        bucket, action, status, user_id,
+        event_count, server_error_count, response_time_sum, response_time_count
+    )
+    SELECT
+        date_trunc('hour', timestamp) AS bucket, action, status, user_id,
+        COUNT(*),
+        COUNT(*) FILTER (WHERE details->>'status_code' LIKE '5%'),
+        COALESCE(SUM(CASE WHEN details->>'response_time' ~ '^[0-9]+(\\.[0-9]+)?$'
+                          THEN (details->>'response_time')::float END), 0),
+        COUNT(*) FILTER (WHERE details->>'response_time' ~ '^[0-9]+(\\.[0-9]+)?$')
+    FROM audit_logs
+    WHERE timestamp >= :start AND timestamp < :end
+    GROUP BY 1, 2, 3, 4
+"""
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_{month.year:04d}_{month.month:02d}"
+
+
+def partition_month(name: str) -> Optional[date]:
+    """Month of a partition table name, or None for other tables."""
+    match = PARTITION_PATTERN.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+class AuditStorageEngine:
+    """
+    Maintains audit log partitions, archives and rollups.
+
+    ``start()`` should be called on application startup.
+    """
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+        retention_months: Optional[int] = None,
+        archive_dir: Optional[str] = None,
+        months_ahead: int = MONTHS_AHEAD,
+        rollup_interval: float = ROLLUP_INTERVAL_SECONDS,
+        maintenance_interval: float = MAINTENANCE_INTERVAL_SECONDS,
+    ):
+        settings = get_settings()
+        self._session_factory = session_factory
+        self.retention_months = retention_months or settings.AUDIT_LOG_RETENTION_MONTHS
+        self.archive_dir = archive_dir or settings.AUDIT_ARCHIVE_DIR
+        self.months_ahead = months_ahead
+        self.rollup_interval = rollup_interval
+        self.maintenance_interval = maintenance_interval
+        # Rollups are complete up to here; loaded from the rollup table on first use
+        self._watermark: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _session(self) -> AsyncSession:
+        if self._session_factory is None:
+            from app.core.db.session import AsyncSessionLocal
+
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        next_maintenance = 0.0
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                if loop.time() >= next_maintenance:
+                    await self.run_maintenance()
+                    next_maintenance = loop.time() + self.maintenance_interval
+                await self.refresh_rollups()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Audit storage maintenance failed: {e}", exc_info=True)
+            await asyncio.sleep(self.rollup_interval)
+
+    @staticmethod
+    async def _try_lock(db: AsyncSession) -> bool:
+        result = await db.execute(select(func.pg_try_advisory_xact_lock(AUDIT_LOCK_KEY)))
+        return bool(result.scalar())
+
+    async def run_maintenance(self, today: Optional[date] = None) -> Dict[str, List[str]]:
+        """
+        Create upcoming partitions, detach expired ones and archive them.
+
+        Returns:
+            Partition names that were created, detached and archived
+        """
+        today = today or datetime.utcnow().date()
+        done: Dict[str, List[str]] = {"created": [], "detached": [], "archived": []}
+        async with self._session() as db:
+            if not await self._try_lock(db):
+                return done
+            done["created"] = await self.ensure_partitions(db, today)
+            done["detached"] = await self.detach_expired(db, today)
+            await db.commit()
+
+        for name in await self._detached_partitions():
+            await self.archive_partition(name)
+            done["archived"].append(name)
+        return done
+
+    async def ensure_partitions(self, db: AsyncSession, today: date) -> List[str]:
+        created = []
+        attached = await self._attached_partitions(db)
+        first = month_start(today)
+        for offset in range(self.months_ahead + 1):
+            month = add_months(first, offset)
+            name = partition_name(month)
+            if name in attached:
+                continue
+            await db.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT_TABLE} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+            ))
+            created.append(name)
+        if created:
+            logger.info(f"Created audit log partitions: {', '.join(created)}")
+        return created
+
+    async def detach_expired(self, db: AsyncSession, today: date) -> List[str]:
+        cutoff = add_months(month_start(today), -self.retention_months)
+        detached = []
+        for name in sorted(await self._attached_partitions(db)):
+            month = partition_month(name)
+            if month is not None and month < cutoff:
+                await db.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+                detached.append(name)
+        if detached:
+            logger.info(f"Detached expired audit log partitions: {', '.join(detached)}")
+        return detached
+
+    @staticmethod
+    async def _attached_partitions(db: AsyncSession) -> set:
+        result = await db.execute(text(
+            """
+            SELECT child.relname FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = :parent
+            """
+        ), {"parent": PARENT_TABLE})
+        return {row[0] for row in result.all()}
+
+    async def _detached_partitions(self) -> List[str]:
+        """Monthly partition tables that exist but are no longer attached."""
+        async with self._session() as db:
+            attached = await self._attached_partitions(db)
+            result = await db.execute(text(
+                "SELECT tablename FROM pg_tables WHERE schemaname = current_schema() AND tablename LIKE 'audit\\_logs\\_%'"
+            ))
+            return sorted(
+                name for (name,) in result.all()
+                if partition_month(name) is not None and name not in attached
+            )
+
+    async def archive_partition(self, name: str) -> str:
+        """
+        Export a detached partition to ``<archive_dir>/<name>.jsonl.gz`` and drop it.
+
+        The file is written under a temporary name and renamed once complete,
+        so a partition is only dropped after its archive exists in full.
+        """
+        if partition_month(name) is None:
+            raise ValueError(f"Not an audit log partition: {name}")
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = os.path.join(self.archive_dir, f"{name}.jsonl.gz")
+        partial = f"{path}.partial"
+
+        rows = 0
+        archive = await asyncio.to_thread(gzip.open, partial, "wt", encoding="utf-8")
+        try:
+            async with self._session() as db:
+                result = await db.stream(
+                    text(f"SELECT row_to_json(entry)::text FROM {name} AS entry ORDER BY timestamp")
+                )
+                async for batch in result.partitions(ARCHIVE_BATCH_SIZE):
+                    lines = "".join(f"{line}\n" for (line,) in batch)
+                    await asyncio.to_thread(archive.write, lines)
+                    rows += len(batch)
+        finally:
+            await asyncio.to_thread(archive.close)
+        os.replace(partial, path)
+
+        async with self._session() as db:
+            await db.execute(text(f"DROP TABLE {name}"))
+            await db.commit()
+        logger.info(f"Archived {rows} audit log entries from {name} to {path}")
+        return path
+
+    async def refresh_rollups(self, now: Optional[datetime] = None) -> int:
+        """
+        Recompute hourly rollups from the watermark up to the current hour.
+
+        Returns:
+            Number of rollup rows written
+        """
+        now = now or datetime.utcnow()
+        written = 0
+        async with self._session() as db:
+            if not await self._try_lock(db):
+                return 0
+            if self._watermark is None:
+                self._watermark = await self._load_watermark(db)
+            if self._watermark is None:
+                return 0
+
+            end_of_range = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+            start = self._watermark - timedelta(hours=1)
+            end = min(end_of_range, start + MAX_REFRESH_SPAN)
+            await db.execute(
+                rollups.delete().where(rollups.c.bucket >= start).where(rollups.c.bucket < end)
+            )
+            result = await db.execute(text(REFRESH_ROLLUPS_SQL), {"start": start, "end": end})
+            written = result.rowcount or 0
+            await db.commit()
+            # The open hour is recomputed on every run until it closes
+            self._watermark = min(end, now.replace(minute=0, second=0, microsecond=0))
+        return written
+
+    @staticmethod
+    async def _load_watermark(db: AsyncSession) -> Optional[datetime]:
+        latest = (await db.execute(select(func.max(rollups.c.bucket)))).scalar()
+        if latest is not None:
+            return latest
+        # Empty rollups: start from the oldest retained entry
+        oldest = (await db.execute(text("SELECT MIN(timestamp) FROM audit_logs"))).scalar()
+        return oldest.replace(minute=0, second=0, microsecond=0) if oldest else None
+
+
+async def activity_stats(db: AsyncSession, start: datetime) -> Dict[str, Any]:
+    """
+    Activity counts since ``start`` from the hourly rollups.
+
+    Returns:
+        daily_stats (date -> action -> count), event_type_totals,
+        top_actors (ten busiest users) and hourly_distribution (hour of day -> count)
+    """
+    since = start.replace(minute=0, second=0, microsecond=0)
+    daily = await db.execute(
+        select(func.date(rollups.c.bucket).label("day"), rollups.c.action,
+               func.sum(rollups.c.event_count).label("count"))
+        .where(rollups.c.bucket >= since)
+        .group_by("day", rollups.c.action)
+        .order_by(text("day DESC"), text("count DESC"))
+    )
+    daily_stats: Dict[str, Dict[str, int]] = {}
+    event_type_totals: Dict[str, int] = {}
+    for day, action, count in daily.all():
+        daily_stats.setdefault(day.isoformat(), {})[action] = int(count)
+        event_type_totals[action] = event_type_totals.get(action, 0) + int(count)
+
+    actors = await db.execute(
+        select(rollups.c.user_id, func.sum(rollups.c.event_count).label("count"))
+        .where(rollups.c.bucket >= since)
+        .group_by(rollups.c.user_id)
+        .order_by(text("count DESC"))
+        .limit(10)
+    )
+    hourly = await db.execute(
+        select(func.extract("hour", rollups.c.bucket).label("hour"), func.sum(rollups.c.event_count))
+        .where(rollups.c.bucket >= since)
+        .group_by("hour")
+        .order_by("hour")
+    )
+    return {
+        "daily_stats": daily_stats,
+        "event_type_totals": event_type_totals,
+        "top_actors": [{"actor_id": str(user_id), "count": int(count)} for user_id, count in actors.all()],
+        "hourly_distribution": {int(hour): int(count) for hour, count in hourly.all()},
+    }
+
+
+async def security_summary(db: AsyncSession, start: datetime) -> Dict[str, Any]:
+    """Sign-in, security and API request counts since ``start`` from the hourly rollups."""
+    is_login = rollups.c.action.in_(LOGIN_ACTIONS)
+    is_api_request = rollups.c.action == "api_request"
+
+    def total(column, *conditions):
+        return func.coalesce(func.sum(column).filter(*conditions), 0)
+
+    row = (await db.execute(
+        select(
+            total(rollups.c.event_count, is_login, rollups.c.status == "success").label("successful_logins"),
+            total(rollups.c.event_count, is_login, rollups.c.status != "success").label("failed_logins"),
+            total(rollups.c.event_count, rollups.c.action == "security_violation").label("security_violations"),
+            total(rollups.c.event_count, rollups.c.action == "emergency_lockdown").label("emergency_lockdowns"),
+            total(rollups.c.event_count, is_api_request).label("total_requests"),
+            total(rollups.c.server_error_count, is_api_request).label("error_count"),
+            total(rollups.c.response_time_sum, is_api_request).label("response_time_sum"),
+            total(rollups.c.response_time_count, is_api_request).label("response_time_count"),
+        ).where(rollups.c.bucket >= start.replace(minute=0, second=0, microsecond=0))
+    )).one()
+    timed = int(row.response_time_count)
+    return {
+        "successful_logins": int(row.successful_logins),
+        "failed_logins": int(row.failed_logins),
+        "security_violations": int(row.security_violations),
+        "emergency_lockdowns": int(row.emergency_lockdowns),
+        "total_requests": int(row.total_requests),
+        "error_count": int(row.error_count),
+        "avg_response_time": float(row.response_time_sum) / timed if timed else 0.0,
+    }
+
+
+# Global audit storage engine instance
+audit_storage = AuditStorageEngine()
@@ -0,0 +1,245 @@
+"""
+Cart aggregate: the in-memory model the cart engine loads and writes.
+
+Provides:
+- Cart owner identities (user, phone number or session)
+- Cart lines and totals at the price each item was added at
+- In-memory mutations with change tracking for the engine's writes
+- Cacheable and API response representations
+"""
+
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Set
+
+
+@dataclass(frozen=True)
+class CartOwner:
+    """The identity a cart is looked up by"""
+    # Cart column holding the identity: user_id, phone_number or session_id
+    column: str
+    value: str
+
+    COLUMNS = ("user_id", "phone_number", "session_id")
+
+    def __post_init__(self):
+        if self.column not in self.COLUMNS:
+            raise ValueError(f"Unsupported cart owner column: {self.column}")
+
+    @classmethod
+    def from_identity(
+        cls,
+        user_id: Optional[Any] = None,
+        phone_number: Optional[str] = None,
+        session_id: Optional[str] = None,
+    ) -> "CartOwner":
+        """Pick the strongest identity available: user, then phone, then session."""
+        if user_id:
+            return cls("user_id", str(user_id))
+        if phone_number:
+            return cls("phone_number", phone_number)
+        if session_id:
+            return cls("session_id", session_id)
+        raise ValueError("A cart needs a user, phone number or session")
+
+    @property
+    def key(self) -> str:
+        return f"{self.column}:{self.value}"
+
+
+@dataclass
+class CartLine:
+    """One item in a cart"""
+    id: uuid.UUID
+    product_id: uuid.UUID
+    quantity: int
+    price_at_add: Decimal
+    variant_id: Optional[uuid.UUID] = None
+    product_name: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    @property
+    def subtotal(self) -> Decimal:
+        return self.quantity * self.price_at_add
+
+
+def as_uuid(value: Any) -> Optional[uuid.UUID]:
+    if value is None or isinstance(value, uuid.UUID):
+        return value
+    return uuid.UUID(str(value))
+
+
+def as_datetime(value: Any) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+@dataclass
+class CartAggregate:
+    """A cart with its items and customer, as loaded and written by the engine"""
+    tenant_id: uuid.UUID
+    owner: CartOwner
+    id: uuid.UUID = field(default_factory=uuid.uuid4)
+    # 0 until the cart row exists
+    version: int = 0
+    user_id: Optional[uuid.UUID] = None
+    phone_number: Optional[str] = None
+    session_id: Optional[str] = None
+    customer_id: Optional[uuid.UUID] = None
+    customer_name: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    items: List[CartLine] = field(default_factory=list)
+    _changed: Set[uuid.UUID] = field(default_factory=set, repr=False)
+    _removed: Set[uuid.UUID] = field(default_factory=set, repr=False)
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._changed or self._removed)
+
+    @property
+    def total(self) -> Decimal:
+        return sum((line.subtotal for line in self.items), Decimal("0"))
+
+    def line_for(self, product_id: Any, variant_id: Any = None) -> Optional[CartLine]:
+        product_id, variant_id = as_uuid(product_id), as_uuid(variant_id)
+        return next(
+            (line for line in self.items if line.product_id == product_id and line.variant_id == variant_id),
+            None,
+        )
+
+    def add(
+        self,
+        product_id: Any,
+        quantity: int,
+        price: Any,
+        product_name: Optional[str] = None,
+        variant_id: Any = None,
+    ) -> CartLine:
+        """Add quantity of a product, merging with an existing line."""
+        line = self.line_for(product_id, variant_id)
+        now = datetime.utcnow()
+        if line is None:
+            line = CartLine(
+                id=uuid.uuid4(),
+                product_id=as_uuid(product_id),
+                variant_id=as_uuid(variant_id),
+                quantity=quantity,
+                price_at_add=Decimal(str(price)).quantize(Decimal("0.01")),
+                product_name=product_name,
+                created_at=now,
+            )
+            self.items.append(line)
+        else:
+            line.quantity += quantity
+        line.updated_at = now
+        self._changed.add(line.id)
+        return line
+
+    def set_quantity(self, line: CartLine, quantity: int):
+        """Set a line's quantity; zero or less removes it."""
+        if quantity <= 0:
+            self.remove(line)
+            return
+        line.quantity = quantity
+        line.updated_at = datetime.utcnow()
+        self._changed.add(line.id)
+
+    def remove(self, line: CartLine):
+        self.items.remove(line)
+        self._changed.discard(line.id)
+        self._removed.add(line.id)
+
+    def clear(self):
+        for line in list(self.items):
+            self.remove(line)
+
+    def mark_clean(self):
+        self._changed.clear()
+        self._removed.clear()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Cacheable representation; change tracking is not included."""
+        return {
+            "tenant_id": self.tenant_id,
+            "owner": [self.owner.column, self.owner.value],
+            "id": self.id,
+            "version": self.version,
+            "user_id": self.user_id,
+            "phone_number": self.phone_number,
+            "session_id": self.session_id,
+            "customer_id": self.customer_id,
+            "customer_name": self.customer_name,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "items": [
+                {
+                    "id": line.id,
+                    "product_id": line.product_id,
+                    "variant_id": line.variant_id,
+                    "quantity": line.quantity,
+                    "price_at_add": line.price_at_add,
+                    "product_name": line.product_name,
+                    "created_at": line.created_at,
+                    "updated_at": line.updated_at,
+                }
+                for line in self.items
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CartAggregate":
+        return cls(
+            tenant_id=as_uuid(data["tenant_id"]),
+            owner=CartOwner(*data["owner"]),
+            id=as_uuid(data["id"]),
+            version=data["version"],
+            user_id=as_uuid(data.get("user_id")),
+            phone_number=data.get("phone_number"),
+            session_id=data.get("session_id"),
+            customer_id=as_uuid(data.get("customer_id")),
+            customer_name=data.get("customer_name"),
+            created_at=as_datetime(data.get("created_at")),
+            updated_at=as_datetime(data.get("updated_at")),
+            items=[
+                CartLine(
+                    id=as_uuid(item["id"]),
+                    product_id=as_uuid(item["product_id"]),
+                    variant_id=as_uuid(item.get("variant_id")),
+                    quantity=item["quantity"],
+                    price_at_add=Decimal(str(item["price_at_add"])),
+                    product_name=item.get("product_name"),
+                    created_at=as_datetime(item.get("created_at")),
+                    updated_at=as_datetime(item.get("updated_at")),
+                )
+                for item in data.get("items", [])
+            ],
+        )
+
+    def to_response(self) -> Dict[str, Any]:
+        """Shape expected by the CartResponse schema."""
+        return {
+            "id": self.id,
+            "tenant_id": self.tenant_id,
+            "user_id": self.user_id,
+            "phone_number": self.phone_number,
+            "session_id": self.session_id,
+            "created_at": self.created_at or datetime.utcnow(),
+            "updated_at": self.updated_at or datetime.utcnow(),
+            "items": [
+                {
+                    "id": line.id,
+                    "product_id": line.product_id,
+                    "variant_id": line.variant_id,
+                    "quantity": line.quantity,
+                    "price_at_add": float(line.price_at_add),
+                    "created_at": line.created_at,
+                    "updated_at": line.updated_at,
+                }
+                for line in self.items
+            ],
+        }
@@ -0,0 +1,189 @@
+"""
+Cart engine shared by the storefront and conversational cart flows.
+
+A cart is handled as one aggregate (owner, customer, cart row and items)
+that is cached per tenant and owner, mutated in memory and written back
+with a single statement per change.
+
+The aggregate lives in ``cart_aggregate`` and its SQL in
+``cart_persistence``; both are re-exported here.
+
+Provides:
+- Loading of the aggregate in one round trip, or none when cached
+- Writes of a cart's pending changes in a single statement
+- Optimistic concurrency on carts.version, with conflicting changes
+  re-applied to a fresh copy of the cart
+"""
+
+import logging
+import uuid
+from typing import Any, Callable, Optional, Tuple, TypeVar
+
+from prometheus_client import Counter
+
+from app.core.cache.redis_cache import redis_cache
+from app.core.db.session import AsyncSessionLocal
+from app.services.cart_aggregate import CartAggregate, CartLine, CartOwner
+from app.services.cart_persistence import (
+    aggregate_from_rows,
+    build_load_statement,
+    build_write_statement,
+    write_parameters,
+)
+
+logger = logging.getLogger(__name__)
+
+CART_CACHE_PREFIX = "cart"
+CART_CACHE_TTL = 900
+MAX_WRITE_ATTEMPTS = 3
+
+cart_engine_events = Counter(
+    "cart_engine_events_total",
+    "Cart engine cache lookups and write outcomes",
+    ["event"],
+)
+
+T = TypeVar("T")
+
+
+__all__ = [
+    "CartAggregate",
+    "CartConflictError",
+    "CartEngine",
+    "CartLine",
+    "CartOwner",
+    "aggregate_from_rows",
+    "build_load_statement",
+    "build_write_statement",
+    "cart_engine",
+    "write_parameters",
+]
+
+
+class CartConflictError(Exception):
+    """Raised when a cart keeps changing underneath a write"""
+
+
+class CartEngine:
+    """Loads, caches and writes cart aggregates"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Any] = AsyncSessionLocal,
+        cache: Any = redis_cache,
+        cache_ttl: int = CART_CACHE_TTL,
+        max_attempts: int = MAX_WRITE_ATTEMPTS,
+    ):
+        self.session_factory = session_factory
+        self.cache = cache
+        self.cache_ttl = cache_ttl
+        self.max_attempts = max_attempts
+
+    def cache_key(self, tenant_id: Any, owner: CartOwner) -> str:
+        return self.cache.generate_key(str(tenant_id), CART_CACHE_PREFIX, owner.key)
+
+    async def _fetch(self, tenant_id: Any, owner: CartOwner) -> CartAggregate:
+        params = {
+            "tenant_id": str(tenant_id),
+            "owner_value": owner.value,
+            "customer_id": str(uuid.uuid4()),
+            "customer_name": f"Customer {owner.value}",
+        }
+        async with self.session_factory() as session:
+            # A single statement needs no explicit transaction
+            connection = await session.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+            result = await connection.execute(build_load_statement(owner), params)
+            return aggregate_from_rows(tenant_id, owner, result.all())
+
+    async def _write(self, cart: CartAggregate) -> Optional[Any]:
+        async with self.session_factory() as session:
+            connection = await session.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+            result = await connection.execute(build_write_statement(cart), write_parameters(cart))
+            return result.first()
+
+    async def load(self, tenant_id: Any, owner: CartOwner, use_cache: bool = True) -> CartAggregate:
+        """
+        Load the cart for an owner, creating it in memory if it doesn't exist.
+
+        Args:
+            tenant_id: Tenant the cart belongs to
+            owner: Identity the cart is looked up by
+            use_cache: Read through the cache; the database is always read
+                when False
+
+        Returns:
+            The cart aggregate
+        """
+        key = self.cache_key(tenant_id, owner)
+        if use_cache:
+            cached = await self.cache.get(key)
+            if cached:
+                try:
+                    cart = CartAggregate.from_dict(cached)
+                    cart_engine_events.labels(event="cache_hit").inc()
+                    return cart
+                except (KeyError, TypeError, ValueError) as e:
+                    logger.warning(f"Discarding unreadable cached cart {key}: {str(e)}")
+        cart_engine_events.labels(event="cache_miss").inc()
+        cart = await self._fetch(tenant_id, owner)
+        # Empty carts are cached too: every write goes through save()
+        await self.cache.set(key, cart.to_dict(), expire=self.cache_ttl)
+        return cart
+
+    async def save(self, cart: CartAggregate) -> bool:
+        """
+        Write a cart's pending changes in one statement.
+
+        Returns:
+            False if the cart changed since it was loaded; nothing is written
+        """
+        if not cart.dirty:
+            return True
+        row = await self._write(cart)
+        if row is None:
+            cart_engine_events.labels(event="conflict").inc()
+            return False
+        cart.id, cart.version, cart.created_at, cart.updated_at = row
+        cart.mark_clean()
+        cart_engine_events.labels(event="write").inc()
+        await self.cache.set(self.cache_key(cart.tenant_id, cart.owner), cart.to_dict(), expire=self.cache_ttl)
+        return True
+
+    async def mutate(
+        self,
+        tenant_id: Any,
+        owner: CartOwner,
+        mutation: Callable[[CartAggregate], T],
+    ) -> Tuple[CartAggregate, T]:
+        """
+        Apply a change to a cart and persist it.
+
+        The mutation must only change the aggregate in memory; on a version
+        conflict it is applied again to a freshly loaded cart.
+
+        Args:
+            tenant_id: Tenant the cart belongs to
+            owner: Identity the cart is looked up by
+            mutation: Changes the cart and returns a value for the caller
+
+        Returns:
+            The saved cart and the mutation's return value
+
+        Raises:
+            CartConflictError: If every attempt lost a concurrent update
+        """
+        for attempt in range(self.max_attempts):
+            cart = await self.load(tenant_id, owner, use_cache=attempt == 0)
+            outcome = mutation(cart)
+            if await self.save(cart):
+                return cart, outcome
+            logger.info(f"Cart {cart.id} changed concurrently, retrying (attempt {attempt + 1})")
+            await self.invalidate(tenant_id, owner)
+        raise CartConflictError(f"Cart for {owner.key} is being modified concurrently")
+
+    async def invalidate(self, tenant_id: Any, owner: CartOwner):
+        await self.cache.delete(self.cache_key(tenant_id, owner))
+
+
+# Global cart engine instance
+cart_engine = CartEngine()
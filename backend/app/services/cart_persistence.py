@@ -0,0 +1,177 @@
+"""
+SQL for loading and writing cart aggregates.
+
+Provides:
+- One load statement returning the customer, cart row and items, upserting
+  the customer for phone-owned carts
+- One CTE write statement claiming the cart row on its version and applying
+  the changed and removed items only if the claim succeeded
+- Conversion between statement rows/parameters and the aggregate
+"""
+
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from sqlalchemy import text
+
+from app.services.cart_aggregate import CartAggregate, CartLine, CartOwner, as_uuid
+
+
+# Customers are only upserted for phone-owned (conversational) carts
+_CUSTOMER_UPSERT = """
+    INSERT INTO customers (id, phone, name, first_seen, last_activity)
+    VALUES (
+        CAST(:customer_id AS uuid), :owner_value, :customer_name,
+        now() AT TIME ZONE 'utc', now() AT TIME ZONE 'utc'
+    )
+    ON CONFLICT (phone) DO UPDATE SET last_activity = EXCLUDED.last_activity
+    RETURNING id, name
+"""
+_NO_CUSTOMER = "SELECT CAST(NULL AS uuid) AS id, CAST(NULL AS text) AS name"
+
+_LOAD_CART = """
+    WITH customer AS ({customer})
+    SELECT
+        customer.id AS customer_id,
+        customer.name AS customer_name,
+        c.id AS cart_id,
+        c.version,
+        c.user_id,
+        c.phone_number,
+        c.session_id,
+        c.created_at,
+        c.updated_at,
+        i.id AS item_id,
+        i.product_id,
+        i.variant_id,
+        i.quantity,
+        i.price_at_add,
+        i.created_at AS item_created_at,
+        i.updated_at AS item_updated_at,
+        p.name AS product_name
+    FROM customer
+    LEFT JOIN carts c
+        ON c.tenant_id = CAST(:tenant_id AS uuid)
+        AND c.{column} = {owner_value}
+    LEFT JOIN cart_items i ON i.cart_id = c.id
+    LEFT JOIN products p ON p.id = i.product_id
+    ORDER BY i.created_at, i.id
+"""
+
+# The cart row is claimed first; item changes only apply when the claim
+# succeeded, so a stale version leaves the whole cart untouched
+_UPDATE_CART_ROW = """
+    UPDATE carts
+    SET version = version + 1, updated_at = now() AT TIME ZONE 'utc'
+    WHERE id = CAST(:cart_id AS uuid) AND version = :expected_version
+    RETURNING id, version, created_at, updated_at
+"""
+# Conflict target matches the partial unique index on the owner column
+_INSERT_CART_ROW = """
+    INSERT INTO carts (id, tenant_id, user_id, phone_number, session_id, version, created_at, updated_at)
+    VALUES (
+        CAST(:cart_id AS uuid), CAST(:tenant_id AS uuid), CAST(:user_id AS uuid),
+        :phone_number, :session_id, 1,
+        now() AT TIME ZONE 'utc', now() AT TIME ZONE 'utc'
+    )
+    ON CONFLICT (tenant_id, {column}) WHERE {column} IS NOT NULL DO NOTHING
+    RETURNING id, version, created_at, updated_at
+"""
+
+_WRITE_CART = """
+    WITH cart_row AS ({claim}),
+    removed AS (
+        DELETE FROM cart_items
+        WHERE cart_id IN (SELECT id FROM cart_row)
+        AND id = ANY(CAST(:removed_ids AS uuid[]))
+    ),
+    written AS (
+        INSERT INTO cart_items (id, cart_id, product_id, variant_id, quantity, price_at_add, created_at, updated_at)
+        SELECT i.id, cart_row.id, i.product_id, i.variant_id, i.quantity, i.price_at_add,
+            now() AT TIME ZONE 'utc', now() AT TIME ZONE 'utc'
+        FROM cart_row, unnest(
+            CAST(:item_ids AS uuid[]),
+            CAST(:product_ids AS uuid[]),
+            CAST(:variant_ids AS uuid[]),
+            CAST(:quantities AS integer[]),
+            CAST(:prices AS numeric[])
+        ) AS i(id, product_id, variant_id, quantity, price_at_add)
+        ON CONFLICT (id) DO UPDATE SET
+            quantity = EXCLUDED.quantity,
+            price_at_add = EXCLUDED.price_at_add,
+            updated_at = EXCLUDED.updated_at
+    )
+    SELECT id, version, created_at, updated_at FROM cart_row
+"""
+
+
+def _owner_sql(owner: CartOwner) -> str:
+    # user_id is a uuid column; the others are text
+    return "CAST(:owner_value AS uuid)" if owner.column == "user_id" else ":owner_value"
+
+
+def build_load_statement(owner: CartOwner):
+    customer = _CUSTOMER_UPSERT if owner.column == "phone_number" else _NO_CUSTOMER
+    return text(_LOAD_CART.format(customer=customer, column=owner.column, owner_value=_owner_sql(owner)))
+
+
+def build_write_statement(cart: CartAggregate):
+    if cart.version:
+        claim = _UPDATE_CART_ROW
+    else:
+        claim = _INSERT_CART_ROW.format(column=cart.owner.column)
+    return text(_WRITE_CART.format(claim=claim))
+
+
+def write_parameters(cart: CartAggregate) -> Dict[str, Any]:
+    changed = [line for line in cart.items if line.id in cart._changed]
+    return {
+        "cart_id": str(cart.id),
+        "tenant_id": str(cart.tenant_id),
+        "user_id": str(cart.user_id) if cart.user_id else None,
+        "phone_number": cart.phone_number,
+        "session_id": cart.session_id,
+        "expected_version": cart.version,
+        "removed_ids": [str(item_id) for item_id in cart._removed],
+        "item_ids": [str(line.id) for line in changed],
+        "product_ids": [str(line.product_id) for line in changed],
+        "variant_ids": [str(line.variant_id) if line.variant_id else None for line in changed],
+        "quantities": [line.quantity for line in changed],
+        "prices": [line.price_at_add for line in changed],
+    }
+
+
+def aggregate_from_rows(tenant_id: Any, owner: CartOwner, rows: List[Any]) -> CartAggregate:
+    """Build an aggregate from the rows of the load statement."""
+    cart = CartAggregate(tenant_id=as_uuid(tenant_id), owner=owner)
+    setattr(cart, owner.column, as_uuid(owner.value) if owner.column == "user_id" else owner.value)
+    if not rows:
+        return cart
+    first = rows[0]
+    cart.customer_id = first.customer_id
+    cart.customer_name = first.customer_name
+    if cart.user_id is None:
+        cart.user_id = first.customer_id
+    if first.cart_id is None:
+        return cart
+    cart.id = first.cart_id
+    cart.version = first.version
+    cart.user_id = first.user_id
+    cart.phone_number = first.phone_number
+    cart.session_id = first.session_id
+    cart.created_at = first.created_at
+    cart.updated_at = first.updated_at
+    for row in rows:
+        if row.item_id is None:
+            continue
+        cart.items.append(CartLine(
+            id=row.item_id,
+            product_id=row.product_id,
+            variant_id=row.variant_id,
+            quantity=row.quantity,
+            price_at_add=Decimal(str(row.price_at_add)),
+            product_name=row.product_name,
+            created_at=row.item_created_at,
+            updated_at=row.item_updated_at,
+        ))
+    return cart
@@ -1,99 +1,56 @@
-from datetime import datetime
 from typing import Any, Dict, Optional
 
-from sqlalchemy.orm import Session
-from sqlalchemy.sql import select
+from app.services.cart_engine import CartAggregate, CartOwner, cart_engine
 
-from app.api.v1.endpoints.cart import get_or_create_cart
-from app.db.async_session import get_async_session_local
-from app.models.cart import Cart
-
-# Service to get cart by phone number (for conversational flows)
+# Carts are read and written through the cart engine, which caches them per
+# tenant and owner and guards writes with the cart version
 
 
-def get_cart_by_phone(
-    phone_number: str, tenant_id: str, db: Session
-) -> Optional[Dict[str, Any]]:
-    cart = get_or_create_cart(db, tenant_id, None, phone_number, None)
-    if not cart:
-        return None
+def cart_to_dict(cart: CartAggregate) -> Dict[str, Any]:
     # Return a dict representation for compatibility
     return {
         "id": str(cart.id),
         "items": [
             {
                 "product_id": str(item.product_id),
-                "name": (
-                    getattr(item, "product", None).name
-                    if getattr(item, "product", None)
-                    else None
-                ),
+                "name": item.product_name,
                 "quantity": item.quantity,
-                "price": item.price_at_add,
+                "price": float(item.price_at_add),
                 "variant_id": str(item.variant_id) if item.variant_id else None,
-                "variant_name": (
-                    getattr(item, "variant", None).name
-                    if getattr(item, "variant", None)
-                    else None
-                ),
-                "image_url": (
-                    getattr(item, "product", None).image_url
-                    if getattr(item, "product", None)
-                    else None
-                ),
             }
-            for item in getattr(cart, "items", [])
+            for item in cart.items
         ],
     }
 
 
+# Service to get cart by phone number (for conversational flows)
+
+
+async def get_cart_by_phone(
+    phone_number: str, tenant_id: str, db=None
+) -> Optional[Dict[str, Any]]:
+    cart = await cart_engine.load(tenant_id, CartOwner("phone_number", phone_number))
+    return cart_to_dict(cart)
+
+
 # Service to clear cart by phone number and tenant
 
 
-async def clear_cart(phone_number: str, tenant_id: str, db: Session):
-    cart = get_or_create_cart(db, tenant_id, None, phone_number, None)
-    if not cart:
-        return
-    for item in list(cart.items):
-        db.delete(item)
-    cart.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(cart)
+async def clear_cart(phone_number: str, tenant_id: str, db=None):
+    await cart_engine.mutate(
+        tenant_id, CartOwner("phone_number", phone_number), lambda cart: cart.clear()
+    )
 
 
 class CartService:
     @staticmethod
     async def get_cart_by_phone(phone_number: str, tenant_id: str, db=None):
-        db = db or get_async_session_local()()
-        try:
-            # Replace with actual async DB query
-            result = await db.execute(
-                select(Cart).where(
-                    Cart.phone_number == phone_number, Cart.tenant_id == tenant_id
-                )
-            )
-            cart = result.scalar_one_or_none()
-            return cart
-        finally:
-            await db.close()
+        return await get_cart_by_phone(phone_number, tenant_id)
 
     @staticmethod
     async def clear_cart(phone_number: str, tenant_id: str, db=None):
-        db = db or get_async_session_local()()
-        try:
-            # Replace with actual async DB query
-            result = await db.execute(
-                select(Cart).where(
-                    Cart.phone_number == phone_number, Cart.tenant_id == tenant_id
-                )
-            )
-            cart = result.scalar_one_or_none()
-            if cart:
-                await db.delete(cart)
-                await db.commit()
-            return True
-        finally:
-            await db.close()
+        await clear_cart(phone_number, tenant_id)
+        return True
 
 
 def get_cart_service():
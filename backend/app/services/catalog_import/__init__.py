@@ -0,0 +1,40 @@
+"""
+Bulk catalog import subsystem.
+
+Product and variant rows are streamed from CSV or NDJSON files, validated
+in worker processes and upserted set-based through COPY-staged temp tables.
+"""
+
+from app.services.catalog_import.loader import LoadResult, copy_rows, load_batch
+from app.services.catalog_import.parsing import (
+    ImportFormat,
+    ImportRow,
+    detect_format,
+    iter_csv_rows,
+    iter_import_rows,
+    iter_ndjson_rows,
+)
+from app.services.catalog_import.pipeline import (
+    CatalogImporter,
+    ImportReport,
+    catalog_importer,
+)
+from app.services.catalog_import.validation import RowError, ValidatedBatch, validate_rows
+
+__all__ = [
+    "CatalogImporter",
+    "ImportFormat",
+    "ImportReport",
+    "ImportRow",
+    "LoadResult",
+    "RowError",
+    "ValidatedBatch",
+    "catalog_importer",
+    "copy_rows",
+    "detect_format",
+    "iter_csv_rows",
+    "iter_import_rows",
+    "iter_ndjson_rows",
+    "load_batch",
+    "validate_rows",
+]
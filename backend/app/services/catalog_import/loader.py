@@ -0,0 +1,286 @@
+"""
+Set-based loading of validated catalog batches.
+
+Each batch is copied into transaction-scoped temp tables with COPY and
+merged into products and product_variants with one INSERT ... ON CONFLICT
+statement per table, so a batch costs a handful of round trips no matter
+how many rows it holds.
+
+Columns left empty in the import keep their current value on update and
+take the model default on insert: staged rows are joined to the existing
+product or variant and coalesced before the upsert, so EXCLUDED already
+holds the merged row.
+"""
+
+import logging
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, List, Sequence, Tuple
+
+from sqlalchemy import text
+
+from app.services.catalog_import.validation import (
+    PRODUCT_STAGE_COLUMNS,
+    VARIANT_STAGE_COLUMNS,
+    RowError,
+    ValidatedBatch,
+)
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_STAGE_TABLE = "catalog_import_products"
+VARIANT_STAGE_TABLE = "catalog_import_variants"
+
+_CREATE_PRODUCT_STAGE = text(f"""
+    CREATE TEMP TABLE {PRODUCT_STAGE_TABLE} (
+        id uuid,
+        line integer,
+        sku text,
+        name text,
+        description text,
+        price double precision,
+        inventory_quantity integer,
+        image_url text,
+        type text,
+        status text,
+        short_description text,
+        barcode text,
+        weight double precision,
+        weight_unit text,
+        is_featured boolean,
+        show_on_storefront boolean,
+        show_on_whatsapp boolean,
+        track_inventory boolean
+    ) ON COMMIT DROP
+""")
+
+_CREATE_VARIANT_STAGE = text(f"""
+    CREATE TEMP TABLE {VARIANT_STAGE_TABLE} (
+        id uuid,
+        line integer,
+        product_sku text,
+        sku text,
+        name text,
+        price double precision,
+        inventory_quantity integer,
+        image_url text,
+        barcode text,
+        weight double precision,
+        weight_unit text,
+        is_default boolean
+    ) ON COMMIT DROP
+""")
+
+# The conflict target matches the partial unique index uq_products_tenant_sku
+_UPSERT_PRODUCTS = text(f"""
+    INSERT INTO products (
+        id, tenant_id, seller_id, sku, name, description, price,
+        inventory_quantity, image_url, type, status, short_description,
+        barcode, weight, weight_unit, is_featured, show_on_storefront,
+        show_on_whatsapp, track_inventory, is_deleted, created_at, updated_at
+    )
+    SELECT
+        COALESCE(p.id, s.id),
+        CAST(:tenant_id AS uuid),
+        COALESCE(p.seller_id, CAST(:seller_id AS uuid)),
+        s.sku,
+        s.name,
+        s.description,
+        s.price,
+        COALESCE(s.inventory_quantity, p.inventory_quantity, 0),
+        COALESCE(s.image_url, p.image_url),
+        COALESCE(s.type, p.type),
+        COALESCE(s.status, p.status, 'ACTIVE'),
+        COALESCE(s.short_description, p.short_description),
+        COALESCE(s.barcode, p.barcode),
+        COALESCE(s.weight, p.weight),
+        COALESCE(s.weight_unit, p.weight_unit, 'kg'),
+        COALESCE(s.is_featured, p.is_featured, false),
+        COALESCE(s.show_on_storefront, p.show_on_storefront, true),
+        COALESCE(s.show_on_whatsapp, p.show_on_whatsapp, true),
+        COALESCE(s.track_inventory, p.track_inventory, true),
+        false,
+        now() AT TIME ZONE 'utc',
+        now() AT TIME ZONE 'utc'
+    FROM {PRODUCT_STAGE_TABLE} s
+    LEFT JOIN products p
+        ON p.tenant_id = CAST(:tenant_id AS uuid)
+        AND p.sku = s.sku
+        AND p.is_deleted = false
+    ON CONFLICT (tenant_id, sku) WHERE sku IS NOT NULL AND is_deleted = false
+    DO UPDATE SET
+        name = EXCLUDED.name,
+        description = EXCLUDED.description,
+        price = EXCLUDED.price,
+        inventory_quantity = EXCLUDED.inventory_quantity,
+        image_url = EXCLUDED.image_url,
+        type = EXCLUDED.type,
+        status = EXCLUDED.status,
+        short_description = EXCLUDED.short_description,
+        barcode = EXCLUDED.barcode,
+        weight = EXCLUDED.weight,
+        weight_unit = EXCLUDED.weight_unit,
+        is_featured = EXCLUDED.is_featured,
+        show_on_storefront = EXCLUDED.show_on_storefront,
+        show_on_whatsapp = EXCLUDED.show_on_whatsapp,
+        track_inventory = EXCLUDED.track_inventory,
+        updated_at = EXCLUDED.updated_at
+    RETURNING (xmax = 0) AS inserted
+""")
+
+# Variant SKUs are unique across tenants; a SKU owned by another tenant is
+# neither read nor overwritten and is reported back as a row error
+_UPSERT_VARIANTS = text(f"""
+    INSERT INTO product_variants (
+        id, product_id, tenant_id, sku, name, price, inventory_quantity,
+        image_url, barcode, weight, weight_unit, is_default, created_at,
+        updated_at
+    )
+    SELECT
+        COALESCE(v.id, s.id),
+        p.id,
+        CAST(:tenant_id AS uuid),
+        s.sku,
+        COALESCE(s.name, v.name),
+        COALESCE(s.price, v.price),
+        COALESCE(s.inventory_quantity, v.inventory_quantity, 0),
+        COALESCE(s.image_url, v.image_url),
+        COALESCE(s.barcode, v.barcode),
+        COALESCE(s.weight, v.weight),
+        COALESCE(s.weight_unit, v.weight_unit),
+        COALESCE(s.is_default, v.is_default, false),
+        now() AT TIME ZONE 'utc',
+        now() AT TIME ZONE 'utc'
+    FROM {VARIANT_STAGE_TABLE} s
+    JOIN products p
+        ON p.tenant_id = CAST(:tenant_id AS uuid)
+        AND p.sku = s.product_sku
+        AND p.is_deleted = false
+    LEFT JOIN product_variants v ON v.sku = s.sku
+    WHERE v.id IS NULL OR v.tenant_id = CAST(:tenant_id AS uuid)
+    ON CONFLICT (sku) DO UPDATE SET
+        product_id = EXCLUDED.product_id,
+        name = EXCLUDED.name,
+        price = EXCLUDED.price,
+        inventory_quantity = EXCLUDED.inventory_quantity,
+        image_url = EXCLUDED.image_url,
+        barcode = EXCLUDED.barcode,
+        weight = EXCLUDED.weight,
+        weight_unit = EXCLUDED.weight_unit,
+        is_default = EXCLUDED.is_default,
+        updated_at = EXCLUDED.updated_at
+    WHERE product_variants.tenant_id = EXCLUDED.tenant_id
+    RETURNING sku, (xmax = 0) AS inserted
+""")
+
+_REJECTED_VARIANTS = text(f"""
+    SELECT s.line, s.sku, p.id IS NULL AS missing_product
+    FROM {VARIANT_STAGE_TABLE} s
+    LEFT JOIN products p
+        ON p.tenant_id = CAST(:tenant_id AS uuid)
+        AND p.sku = s.product_sku
+        AND p.is_deleted = false
+    WHERE NOT (s.sku = ANY(:loaded))
+""")
+
+
+@dataclass
+class LoadResult:
+    """Counts and row errors from loading one batch"""
+    products_created: int = 0
+    products_updated: int = 0
+    variants_created: int = 0
+    variants_updated: int = 0
+    errors: List[RowError] = field(default_factory=list)
+
+
+async def copy_rows(session: Any, table: str, columns: Sequence[str], records: List[Tuple]) -> None:
+    """
+    Bulk-copy records into a table on the session's connection.
+
+    Uses the COPY protocol when the driver is asyncpg and falls back to an
+    executemany INSERT on other drivers.
+
+    Args:
+        session: Async session with an open transaction
+        table: Target table
+        columns: Column names in record order
+        records: Row tuples
+    """
+    if not records:
+        return
+    connection = await session.connection()
+    raw = await connection.get_raw_connection()
+    driver_connection = getattr(raw, "driver_connection", None)
+    if hasattr(driver_connection, "copy_records_to_table"):
+        await driver_connection.copy_records_to_table(table, records=records, columns=list(columns))
+        return
+    placeholders = ", ".join(f":{column}" for column in columns)
+    await session.execute(
+        text(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"),
+        [dict(zip(columns, record)) for record in records],
+    )
+
+
+async def load_batch(session: Any, batch: ValidatedBatch, tenant_id: Any, seller_id: Any) -> LoadResult:
+    """
+    Stage and upsert one validated batch in a single transaction.
+
+    Args:
+        session: Async session; the batch is committed before returning
+        batch: Output of validate_rows()
+        tenant_id: Tenant that owns the imported products
+        seller_id: Seller recorded on newly created products
+
+    Returns:
+        Created/updated counts and errors for variants that were not loaded
+    """
+    result = LoadResult()
+    params = {"tenant_id": str(tenant_id), "seller_id": str(seller_id)}
+
+    async with session.begin():
+        if batch.products:
+            await session.execute(_CREATE_PRODUCT_STAGE)
+            await copy_rows(
+                session,
+                PRODUCT_STAGE_TABLE,
+                ("id",) + PRODUCT_STAGE_COLUMNS,
+                [(uuid.uuid4(),) + row for row in batch.products],
+            )
+            for (inserted,) in (await session.execute(_UPSERT_PRODUCTS, params)).all():
+                if inserted:
+                    result.products_created += 1
+                else:
+                    result.products_updated += 1
+
+        if batch.variants:
+            await session.execute(_CREATE_VARIANT_STAGE)
+            await copy_rows(
+                session,
+                VARIANT_STAGE_TABLE,
+                ("id",) + VARIANT_STAGE_COLUMNS,
+                [(uuid.uuid4(),) + row for row in batch.variants],
+            )
+            loaded = []
+            for sku, inserted in (await session.execute(_UPSERT_VARIANTS, params)).all():
+                loaded.append(sku)
+                if inserted:
+                    result.variants_created += 1
+                else:
+                    result.variants_updated += 1
+
+            if len(loaded) < len(batch.variants):
+                rejected = await session.execute(_REJECTED_VARIANTS, {**params, "loaded": loaded})
+                for line, sku, missing_product in rejected.all():
+                    message = (
+                        "product SKU not found" if missing_product
+                        else "variant SKU is already used by another store"
+                    )
+                    result.errors.append(RowError(line, sku, "variant.sku", message))
+
+    logger.debug(
+        f"Loaded import batch for tenant {tenant_id}: "
+        f"{result.products_created} products created, {result.products_updated} updated, "
+        f"{result.variants_created} variants created, {result.variants_updated} updated"
+    )
+    return result
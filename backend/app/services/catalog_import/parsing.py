@@ -0,0 +1,133 @@
+"""
+Streaming parsers for catalog import files.
+
+Both formats are read incrementally from a binary file object and yield
+ImportRow records, so a file's size never determines memory use.
+
+CSV files have one row per product or per variant. Product columns are
+named after product fields (``sku``, ``name``, ``price`` ...); variant
+columns carry a ``variant_`` prefix. Rows sharing a product ``sku`` are
+merged by the loader, so a product with three variants may be written as
+three rows repeating the product columns.
+
+NDJSON files have one product object per line, with an optional
+``variants`` list of variant objects.
+"""
+
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from typing import IO, Any, Dict, Iterator, List, Optional
+
+VARIANT_PREFIX = "variant_"
+
+
+class ImportFormat:
+    """Supported catalog import file formats"""
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+    ALL = (CSV, NDJSON)
+
+
+@dataclass
+class ImportRow:
+    """One source record: a product and the variants it declares"""
+    line: int
+    product: Dict[str, Any]
+    variants: List[Dict[str, Any]] = field(default_factory=list)
+    # Set when the record could not be read; it is reported, not loaded
+    error: Optional[str] = None
+
+
+def _blank_to_none(value: Any) -> Any:
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+def iter_csv_rows(stream: IO[bytes], encoding: str = "utf-8-sig") -> Iterator[ImportRow]:
+    """
+    Yield import rows from a CSV file with a header line.
+
+    Args:
+        stream: Binary file object positioned at the start of the file
+        encoding: Text encoding; the default strips a UTF-8 BOM
+
+    Returns:
+        Iterator of rows; empty cells are None
+    """
+    text_stream = io.TextIOWrapper(stream, encoding=encoding, newline="")
+    try:
+        reader = csv.DictReader(text_stream)
+        for record in reader:
+            if None in record:
+                yield ImportRow(line=reader.line_num, product={}, error="row has more cells than the header")
+                continue
+            product: Dict[str, Any] = {}
+            variant: Dict[str, Any] = {}
+            for column, value in record.items():
+                column = column.strip().lower()
+                if column.startswith(VARIANT_PREFIX):
+                    variant[column[len(VARIANT_PREFIX):]] = _blank_to_none(value)
+                else:
+                    product[column] = _blank_to_none(value)
+            variants = [variant] if any(value is not None for value in variant.values()) else []
+            yield ImportRow(line=reader.line_num, product=product, variants=variants)
+    finally:
+        # Leave the caller's stream open
+        text_stream.detach()
+
+
+def iter_ndjson_rows(stream: IO[bytes], encoding: str = "utf-8") -> Iterator[ImportRow]:
+    """
+    Yield import rows from a newline-delimited JSON file.
+
+    Args:
+        stream: Binary file object positioned at the start of the file
+        encoding: Text encoding
+
+    Returns:
+        Iterator of rows; blank lines are skipped and malformed lines are
+        yielded with an error instead of ending the import
+    """
+    for line_number, raw in enumerate(stream, start=1):
+        try:
+            text = raw.decode(encoding).strip()
+            if not text:
+                continue
+            record = json.loads(text)
+        except ValueError as e:
+            yield ImportRow(line=line_number, product={}, error=f"invalid JSON: {e}")
+            continue
+        if not isinstance(record, dict):
+            yield ImportRow(line=line_number, product={}, error="each line must be a JSON object")
+            continue
+        variants = record.pop("variants", None) or []
+        if not isinstance(variants, list) or not all(isinstance(v, dict) for v in variants):
+            yield ImportRow(line=line_number, product={}, error="variants must be a list of objects")
+            continue
+        yield ImportRow(
+            line=line_number,
+            product={key.lower(): _blank_to_none(value) for key, value in record.items()},
+            variants=[{key.lower(): _blank_to_none(value) for key, value in v.items()} for v in variants],
+        )
+
+
+def iter_import_rows(stream: IO[bytes], file_format: str) -> Iterator[ImportRow]:
+    """Dispatch to the parser for file_format."""
+    if file_format == ImportFormat.CSV:
+        return iter_csv_rows(stream)
+    if file_format == ImportFormat.NDJSON:
+        return iter_ndjson_rows(stream)
+    raise ValueError(f"Unsupported import format: {file_format}")
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str] = None) -> str:
+    """Guess the import format from an upload's file name or content type."""
+    name = (filename or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or (content_type or "").endswith("ndjson"):
+        return ImportFormat.NDJSON
+    return ImportFormat.CSV
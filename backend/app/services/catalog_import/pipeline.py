@@ -0,0 +1,288 @@
+"""
+Catalog import pipeline.
+
+Runs an import file through three overlapping stages:
+- parsing on a worker thread, batch_size rows at a time
+- validation in a process pool, so CPU-bound checks don't hold the GIL
+  the event loop needs
+- staging and upserting on a pooled session, one transaction per batch
+
+The next batch is parsed and validated while the current one is loading.
+Progress and the final report are kept on an admin background task
+record, so imports are tracked the same way as other long operations.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Set
+
+from app.core.db.session import AsyncSessionLocal
+from app.core.optimization.background_tasks import (
+    AdminBackgroundTaskManager,
+    AdminTaskRecord,
+    TaskStatus,
+)
+from app.services.catalog_import.loader import LoadResult, load_batch
+from app.services.catalog_import.parsing import ImportRow, iter_import_rows
+from app.services.catalog_import.validation import RowError, ValidatedBatch, validate_rows
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 2000
+DEFAULT_MAX_REPORTED_ERRORS = 1000
+DEFAULT_MAX_CONCURRENT_IMPORTS = 2
+
+
+@dataclass
+class ImportReport:
+    """Outcome of one catalog import"""
+    rows: int = 0
+    products_created: int = 0
+    products_updated: int = 0
+    variants_created: int = 0
+    variants_updated: int = 0
+    error_count: int = 0
+    errors: List[RowError] = field(default_factory=list)
+    unknown_fields: Set[str] = field(default_factory=set)
+    elapsed_seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def add_errors(self, errors: List[RowError], limit: int):
+        self.error_count += len(errors)
+        room = limit - len(self.errors)
+        if room > 0:
+            self.errors.extend(errors[:room])
+
+    def add_load(self, result: LoadResult, limit: int):
+        self.products_created += result.products_created
+        self.products_updated += result.products_updated
+        self.variants_created += result.variants_created
+        self.variants_updated += result.variants_updated
+        self.add_errors(result.errors, limit)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "products_created": self.products_created,
+            "products_updated": self.products_updated,
+            "variants_created": self.variants_created,
+            "variants_updated": self.variants_updated,
+            "error_count": self.error_count,
+            "errors": [error.to_dict() for error in self.errors],
+            "errors_truncated": self.error_count > len(self.errors),
+            "unknown_fields": sorted(self.unknown_fields),
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+
+def _batch_failed(batch: ValidatedBatch, error: Exception) -> List[RowError]:
+    # Every staged row of a batch whose transaction failed is reported
+    message = f"batch was not saved: {type(error).__name__}: {error}"
+    errors = [RowError(row[0], row[1], None, message) for row in batch.products]
+    errors.extend(RowError(row[0], row[2], "variant.sku", message) for row in batch.variants)
+    return errors
+
+
+class CatalogImporter:
+    """Parses, validates and bulk-upserts product catalog files"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Any] = AsyncSessionLocal,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        validation_workers: Optional[int] = None,
+        max_reported_errors: int = DEFAULT_MAX_REPORTED_ERRORS,
+        max_concurrent: int = DEFAULT_MAX_CONCURRENT_IMPORTS,
+    ):
+        """
+        Args:
+            session_factory: Async session factory used for loading
+            batch_size: Rows per parse/validate/load batch
+            validation_workers: Validation processes; 0 validates in-process
+                on a thread, None uses up to 4 processes
+            max_reported_errors: Row errors kept in the report; the total is
+                always counted
+            max_concurrent: Imports allowed to run at once
+        """
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        if validation_workers is None:
+            validation_workers = min(4, os.cpu_count() or 1)
+        self.validation_workers = validation_workers
+        self.max_reported_errors = max_reported_errors
+        self.max_concurrent = max_concurrent
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def pool(self) -> Optional[ProcessPoolExecutor]:
+        if self._pool is None and self.validation_workers > 0:
+            self._pool = ProcessPoolExecutor(max_workers=self.validation_workers)
+        return self._pool
+
+    async def _validate(self, rows: List[ImportRow]) -> ValidatedBatch:
+        if self.pool is None:
+            return await asyncio.to_thread(validate_rows, rows)
+        return await asyncio.get_running_loop().run_in_executor(self.pool, validate_rows, rows)
+
+    async def _load(self, batch: ValidatedBatch, tenant_id: Any, seller_id: Any) -> LoadResult:
+        try:
+            async with self.session_factory() as session:
+                return await load_batch(session, batch, tenant_id, seller_id)
+        except Exception as e:
+            logger.error(f"Catalog import batch failed for tenant {tenant_id}: {str(e)}")
+            return LoadResult(errors=_batch_failed(batch, e))
+
+    async def run(
+        self,
+        stream: IO[bytes],
+        file_format: str,
+        tenant_id: Any,
+        seller_id: Any,
+        task_id: Optional[str] = None,
+        total_bytes: Optional[int] = None,
+    ) -> ImportReport:
+        """
+        Import a catalog file.
+
+        Args:
+            stream: Binary file object with the import
+            file_format: One of ImportFormat.ALL
+            tenant_id: Tenant that owns the imported products
+            seller_id: Seller recorded on newly created products
+            task_id: Admin task record to report progress on
+            total_bytes: File size, used to estimate progress
+
+        Returns:
+            The import report; row errors never abort the import
+        """
+        started = time.perf_counter()
+        report = ImportReport()
+        rows: Iterator[ImportRow] = iter_import_rows(stream, file_format)
+
+        def read_batch() -> List[ImportRow]:
+            return list(islice(rows, self.batch_size))
+
+        async def prepare() -> Optional[ValidatedBatch]:
+            batch_rows = await asyncio.to_thread(read_batch)
+            if not batch_rows:
+                return None
+            return await self._validate(batch_rows)
+
+        next_batch = asyncio.ensure_future(prepare())
+        try:
+            while True:
+                batch = await next_batch
+                if batch is None:
+                    break
+                # Stream position right after parsing approximates progress
+                position = stream.tell() if total_bytes else None
+                next_batch = asyncio.ensure_future(prepare())
+
+                report.rows += batch.rows
+                report.unknown_fields.update(batch.unknown_fields)
+                report.add_errors(batch.errors, self.max_reported_errors)
+                report.add_load(await self._load(batch, tenant_id, seller_id), self.max_reported_errors)
+
+                if task_id and position is not None:
+                    AdminBackgroundTaskManager.update_task_status(
+                        task_id, TaskStatus.RUNNING, progress=int(99 * position / total_bytes)
+                    )
+        finally:
+            if not next_batch.done():
+                next_batch.cancel()
+                await asyncio.gather(next_batch, return_exceptions=True)
+
+        report.elapsed_seconds = time.perf_counter() - started
+        logger.info(
+            f"Catalog import for tenant {tenant_id} processed {report.rows} rows in "
+            f"{report.elapsed_seconds:.1f}s ({report.rows_per_second:.0f} rows/s), "
+            f"{report.error_count} errors"
+        )
+        return report
+
+    def submit(
+        self,
+        path: str,
+        file_format: str,
+        tenant_id: Any,
+        seller_id: Any,
+        created_by: str,
+        filename: Optional[str] = None,
+    ) -> AdminTaskRecord:
+        """
+        Start importing a file from disk in the background.
+
+        The file is deleted once the import finishes.
+
+        Args:
+            path: Import file on local disk
+            file_format: One of ImportFormat.ALL
+            tenant_id: Tenant that owns the imported products
+            seller_id: Seller recorded on newly created products
+            created_by: User the task record belongs to
+            filename: Original file name, for the task description
+
+        Returns:
+            The pending task record; its result holds the import report
+        """
+        task = AdminBackgroundTaskManager.register_admin_task(
+            name="catalog_import",
+            description=f"Import products from {filename or os.path.basename(path)}",
+            created_by=created_by,
+            metadata={"tenant_id": str(tenant_id), "format": file_format},
+            notify_on_completion=True,
+        )
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        runner = asyncio.create_task(
+            self._run_task(task.task_id, path, file_format, tenant_id, seller_id)
+        )
+        self._tasks.add(runner)
+        runner.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _run_task(self, task_id: str, path: str, file_format: str, tenant_id: Any, seller_id: Any):
+        async with self._semaphore:
+            AdminBackgroundTaskManager.update_task_status(task_id, TaskStatus.RUNNING, progress=0)
+            try:
+                with open(path, "rb") as stream:
+                    report = await self.run(
+                        stream, file_format, tenant_id, seller_id,
+                        task_id=task_id, total_bytes=os.path.getsize(path),
+                    )
+                AdminBackgroundTaskManager.update_task_status(
+                    task_id, TaskStatus.COMPLETED, progress=100, result=report.to_dict()
+                )
+            except Exception as e:
+                logger.error(f"Catalog import {task_id} failed: {str(e)}")
+                AdminBackgroundTaskManager.update_task_status(task_id, TaskStatus.FAILED, error=str(e))
+            finally:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    async def stop(self):
+        """Cancel running imports and shut down the validation processes."""
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# Global catalog importer instance
+catalog_importer = CatalogImporter()
@@ -0,0 +1,241 @@
+"""
+Validation of catalog import rows.
+
+validate_rows() is a pure function of picklable inputs so batches can be
+validated in worker processes while the previous batch is being loaded.
+Valid rows come back as tuples in staging-table column order; invalid rows
+come back as RowError reports and are never staged.
+
+Rules mirror the product and variant schemas used by the single-row API.
+"""
+
+import math
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.services.catalog_import.parsing import ImportRow
+
+MAX_SKU_LENGTH = 100
+
+PRODUCT_STAGE_COLUMNS = (
+    "line", "sku", "name", "description", "price", "inventory_quantity",
+    "image_url", "type", "status", "short_description", "barcode", "weight",
+    "weight_unit", "is_featured", "show_on_storefront", "show_on_whatsapp",
+    "track_inventory",
+)
+VARIANT_STAGE_COLUMNS = (
+    "line", "product_sku", "sku", "name", "price", "inventory_quantity",
+    "image_url", "barcode", "weight", "weight_unit", "is_default",
+)
+
+_TRUE = {"true", "1", "yes", "y", "t"}
+_FALSE = {"false", "0", "no", "n", "f"}
+
+
+@dataclass
+class RowError:
+    """Why one source row (or one variant on it) was not imported"""
+    line: int
+    sku: Optional[str]
+    field: Optional[str]
+    message: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"line": self.line, "sku": self.sku, "field": self.field, "message": self.message}
+
+
+@dataclass
+class ValidatedBatch:
+    """Staging tuples and error reports for one batch of rows"""
+    rows: int = 0
+    products: List[Tuple] = field(default_factory=list)
+    variants: List[Tuple] = field(default_factory=list)
+    errors: List[RowError] = field(default_factory=list)
+    unknown_fields: Set[str] = field(default_factory=set)
+
+
+class _Invalid(ValueError):
+    def __init__(self, field_name: str, message: str):
+        super().__init__(message)
+        self.field = field_name
+        self.message = message
+
+
+def _text(record: Dict[str, Any], name: str, required: bool = False, max_length: Optional[int] = None) -> Optional[str]:
+    value = record.get(name)
+    if value is None:
+        if required:
+            raise _Invalid(name, "is required")
+        return None
+    value = str(value).strip()
+    if required and not value:
+        raise _Invalid(name, "is required")
+    if max_length is not None and len(value) > max_length:
+        raise _Invalid(name, f"must be at most {max_length} characters")
+    return value or None
+
+
+def _price(record: Dict[str, Any], name: str, required: bool = False) -> Optional[float]:
+    value = record.get(name)
+    if value is None:
+        if required:
+            raise _Invalid(name, "is required")
+        return None
+    if isinstance(value, bool):
+        raise _Invalid(name, "must be a number")
+    try:
+        amount = Decimal(str(value))
+    except InvalidOperation:
+        raise _Invalid(name, "must be a number")
+    if not amount.is_finite() or amount <= 0:
+        raise _Invalid(name, "must be greater than 0")
+    return float(amount.quantize(Decimal("0.01")))
+
+
+def _non_negative_int(record: Dict[str, Any], name: str) -> Optional[int]:
+    value = record.get(name)
+    if value is None:
+        return None
+    try:
+        number = Decimal(str(value))
+    except InvalidOperation:
+        raise _Invalid(name, "must be a whole number")
+    if isinstance(value, bool) or not number.is_finite() or number != number.to_integral_value():
+        raise _Invalid(name, "must be a whole number")
+    if number < 0:
+        raise _Invalid(name, "cannot be negative")
+    return int(number)
+
+
+def _non_negative_float(record: Dict[str, Any], name: str) -> Optional[float]:
+    value = record.get(name)
+    if value is None:
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise _Invalid(name, "must be a number")
+    if isinstance(value, bool) or not math.isfinite(number) or number < 0:
+        raise _Invalid(name, "must be a non-negative number")
+    return number
+
+
+def _bool(record: Dict[str, Any], name: str) -> Optional[bool]:
+    value = record.get(name)
+    if value is None or isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    raise _Invalid(name, "must be true or false")
+
+
+def _url(record: Dict[str, Any], name: str) -> Optional[str]:
+    value = _text(record, name)
+    if value is not None and not value.startswith(("http://", "https://")):
+        raise _Invalid(name, "must be an http(s) URL")
+    return value
+
+
+def _product_name(record: Dict[str, Any]) -> str:
+    name = _text(record, "name", required=True)
+    if not all(c.isalnum() or c.isspace() or c in "-_" for c in name):
+        raise _Invalid("name", "can only contain letters, numbers, spaces, hyphens, and underscores")
+    return name
+
+
+_PRODUCT_FIELDS = set(PRODUCT_STAGE_COLUMNS) - {"line"}
+_VARIANT_FIELDS = set(VARIANT_STAGE_COLUMNS) - {"line", "product_sku"}
+
+
+def _product_tuple(line: int, sku: str, record: Dict[str, Any]) -> Tuple:
+    status = _text(record, "status")
+    product_type = _text(record, "type")
+    return (
+        line,
+        sku,
+        _product_name(record),
+        _text(record, "description", required=True),
+        _price(record, "price", required=True),
+        _non_negative_int(record, "inventory_quantity"),
+        _url(record, "image_url"),
+        product_type.upper() if product_type else None,
+        status.upper() if status else None,
+        _text(record, "short_description"),
+        _text(record, "barcode"),
+        _non_negative_float(record, "weight"),
+        _text(record, "weight_unit"),
+        _bool(record, "is_featured"),
+        _bool(record, "show_on_storefront"),
+        _bool(record, "show_on_whatsapp"),
+        _bool(record, "track_inventory"),
+    )
+
+
+def _variant_tuple(line: int, product_sku: str, record: Dict[str, Any]) -> Tuple:
+    return (
+        line,
+        product_sku,
+        _text(record, "sku", required=True, max_length=MAX_SKU_LENGTH),
+        _text(record, "name"),
+        _price(record, "price"),
+        _non_negative_int(record, "inventory_quantity"),
+        _url(record, "image_url"),
+        _text(record, "barcode"),
+        _non_negative_float(record, "weight"),
+        _text(record, "weight_unit"),
+        _bool(record, "is_default"),
+    )
+
+
+def validate_rows(rows: List[ImportRow]) -> ValidatedBatch:
+    """
+    Validate a batch of import rows.
+
+    A row whose only product column is ``sku`` declares variants of an
+    existing product and stages no product. Within a batch the last row for
+    a product or variant SKU wins, so each SKU is staged once.
+
+    Args:
+        rows: Parsed rows
+
+    Returns:
+        Staging tuples for valid products and variants plus row errors
+    """
+    batch = ValidatedBatch(rows=len(rows))
+    products: Dict[str, Tuple] = {}
+    variants: Dict[str, Tuple] = {}
+
+    for row in rows:
+        if row.error is not None:
+            batch.errors.append(RowError(row.line, None, None, row.error))
+            continue
+
+        batch.unknown_fields.update(set(row.product) - _PRODUCT_FIELDS)
+        try:
+            sku = _text(row.product, "sku", required=True, max_length=MAX_SKU_LENGTH)
+            declares_product = any(
+                value is not None for key, value in row.product.items()
+                if key != "sku" and key in _PRODUCT_FIELDS
+            )
+            if declares_product:
+                products[sku] = _product_tuple(row.line, sku, row.product)
+        except _Invalid as e:
+            batch.errors.append(RowError(row.line, row.product.get("sku"), e.field, e.message))
+            continue
+
+        for variant in row.variants:
+            batch.unknown_fields.update(f"variant.{key}" for key in set(variant) - _VARIANT_FIELDS)
+            try:
+                staged = _variant_tuple(row.line, sku, variant)
+            except _Invalid as e:
+                batch.errors.append(RowError(row.line, sku, f"variant.{e.field}", e.message))
+                continue
+            variants[staged[2]] = staged
+
+    batch.products = list(products.values())
+    batch.variants = list(variants.values())
+    return batch
@@ -0,0 +1,49 @@
+"""
+Streaming export subsystem.
+
+Rows are read through server-side cursors and encoded incrementally, so an
+export's memory use does not grow with its size.
+"""
+
+from app.services.export.encoders import (
+    DEFAULT_BATCH_SIZE,
+    ExportFormat,
+    gzip_chunks,
+    iter_csv,
+    iter_json_array,
+    iter_ndjson,
+    stream_query,
+    to_export_value,
+)
+from app.services.export.jobs import ExportJob, ExportJobManager, ExportJobStatus, export_jobs
+from app.services.export.response import (
+    encode_rows,
+    export_download,
+    export_job_response,
+    export_response,
+    streaming_export_response,
+    submit_export_job,
+)
+from app.services.export.xlsx import iter_xlsx
+
+__all__ = [
+    "DEFAULT_BATCH_SIZE",
+    "ExportFormat",
+    "ExportJob",
+    "ExportJobManager",
+    "ExportJobStatus",
+    "encode_rows",
+    "export_download",
+    "export_job_response",
+    "export_jobs",
+    "export_response",
+    "gzip_chunks",
+    "iter_csv",
+    "iter_json_array",
+    "iter_ndjson",
+    "iter_xlsx",
+    "stream_query",
+    "streaming_export_response",
+    "submit_export_job",
+    "to_export_value",
+]
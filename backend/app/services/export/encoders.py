@@ -0,0 +1,194 @@
+"""
+Incremental encoders for streaming exports.
+
+Provides:
+- Export formats with their media types and file extensions
+- Row sources that page through the database with server-side cursors
+- CSV, NDJSON and JSON array encoders that yield bytes as rows arrive
+- On-the-fly gzip compression of any chunk stream
+
+Every encoder buffers at most ``chunk_size`` bytes before yielding, so memory
+stays flat regardless of how many rows the export contains.
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+from uuid import UUID
+
+# Target size of each yielded chunk; small enough to keep memory flat and
+# large enough that the ASGI server isn't flushing tiny writes
+DEFAULT_CHUNK_SIZE = 64 * 1024
+DEFAULT_BATCH_SIZE = 1000
+
+
+class ExportFormat(str, Enum):
+    """Supported streaming export formats"""
+    CSV = "csv"
+    NDJSON = "ndjson"
+    JSON = "json"
+    XLSX = "xlsx"
+
+    @property
+    def media_type(self) -> str:
+        return _MEDIA_TYPES[self]
+
+    @property
+    def extension(self) -> str:
+        return self.value
+
+
+_MEDIA_TYPES = {
+    ExportFormat.CSV: "text/csv",
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.JSON: "application/json",
+    ExportFormat.XLSX: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def stream_query(query, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Any]:
+    """
+    Iterate an ORM query through a server-side cursor.
+
+    ``yield_per`` turns on ``stream_results`` so the driver fetches rows in
+    batches instead of materializing the whole result set client-side.
+
+    Args:
+        query: SQLAlchemy ``Query``
+        batch_size: Rows fetched from the cursor per round trip
+
+    Returns:
+        Iterator over the query's rows
+    """
+    return iter(query.yield_per(batch_size))
+
+
+def to_export_value(value: Any) -> Any:
+    """Convert a column value into something every encoder can write."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (UUID, Decimal)):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+def _row_values(row: Any, columns: Sequence[str]) -> List[Any]:
+    if isinstance(row, dict):
+        return [row.get(column) for column in columns]
+    return list(row)
+
+
+def _row_dict(row: Any, columns: Optional[Sequence[str]]) -> Dict[str, Any]:
+    if isinstance(row, dict):
+        return row
+    return dict(zip(columns or [], row))
+
+
+def iter_csv(
+    rows: Iterable[Any],
+    columns: Sequence[str],
+    include_headers: bool = True,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """
+    Encode rows as CSV.
+
+    Args:
+        rows: Dicts keyed by column name, or sequences in column order
+        columns: Column names, also used as the header row
+        include_headers: Whether to write the header row
+        chunk_size: Approximate size of each yielded chunk
+
+    Returns:
+        Iterator over UTF-8 encoded CSV chunks
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if include_headers:
+        writer.writerow(columns)
+
+    for row in rows:
+        writer.writerow(
+            "" if value is None else to_export_value(value)
+            for value in _row_values(row, columns)
+        )
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def iter_ndjson(
+    rows: Iterable[Any],
+    columns: Optional[Sequence[str]] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """Encode rows as newline-delimited JSON, one object per line."""
+    parts: List[bytes] = []
+    size = 0
+    for row in rows:
+        line = json.dumps(_row_dict(row, columns), default=to_export_value).encode("utf-8") + b"\n"
+        parts.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield b"".join(parts)
+            parts, size = [], 0
+
+    if parts:
+        yield b"".join(parts)
+
+
+def iter_json_array(
+    rows: Iterable[Any],
+    columns: Optional[Sequence[str]] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """Encode rows as a single JSON array, written element by element."""
+    parts: List[bytes] = [b"["]
+    size = 1
+    separator = b""
+    for row in rows:
+        item = separator + json.dumps(_row_dict(row, columns), default=to_export_value).encode("utf-8")
+        separator = b","
+        parts.append(item)
+        size += len(item)
+        if size >= chunk_size:
+            yield b"".join(parts)
+            parts, size = [], 0
+
+    parts.append(b"]")
+    yield b"".join(parts)
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """
+    Compress a chunk stream into a gzip stream without buffering it.
+
+    Args:
+        chunks: Uncompressed chunks
+        level: zlib compression level
+
+    Returns:
+        Iterator over gzip-framed chunks; empty compressor outputs are skipped
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
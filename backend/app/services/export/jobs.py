@@ -0,0 +1,271 @@
+"""
+Background export jobs.
+
+Large exports are written to disk by a worker thread instead of being held
+open on a request. The caller gets an unguessable token back immediately and
+downloads the finished file with it; files expire after a TTL.
+
+Job state is kept in Redis and files in ``EXPORT_DIR``, a directory shared
+by every worker, so the download can be served by any worker, not just the
+one that ran the job.
+"""
+
+import asyncio
+import dataclasses
+import logging
+import os
+import secrets
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+from app.core.cache.redis_cache import redis_cache
+from app.core.config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOB_TTL_SECONDS = 3600
+DEFAULT_MAX_CONCURRENT_JOBS = 2
+JOB_KEY_PREFIX = "export_job"
+# How often the shared directory is swept for expired files
+PURGE_INTERVAL_SECONDS = 60.0
+
+
+class ExportJobStatus:
+    """Lifecycle states of an export job"""
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+@dataclass
+class ExportJob:
+    """An export being written to, or ready on, disk"""
+    token: str
+    filename: str
+    media_type: str
+    path: str
+    status: str = ExportJobStatus.PENDING
+    created_at: float = field(default_factory=time.time)
+    completed_at: Optional[float] = None
+    size: int = 0
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "token": self.token,
+            "filename": self.filename,
+            "status": self.status,
+            "size": self.size,
+            "error": self.error,
+        }
+
+    def to_record(self) -> Dict[str, Any]:
+        """Full job state as stored in Redis."""
+        return dataclasses.asdict(self)
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "ExportJob":
+        return cls(**record)
+
+
+class ExportJobManager:
+    """Runs export producers in the background and tracks their output files"""
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        ttl_seconds: int = DEFAULT_JOB_TTL_SECONDS,
+        max_concurrent: int = DEFAULT_MAX_CONCURRENT_JOBS,
+        cache=redis_cache,
+    ):
+        """
+        Args:
+            directory: Where export files are written; must be shared by
+                every worker serving downloads. Defaults to EXPORT_DIR.
+            ttl_seconds: How long a finished export stays downloadable
+            max_concurrent: Jobs this worker runs at once
+            cache: Redis cache holding job state
+        """
+        self._directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_concurrent = max_concurrent
+        self.cache = cache
+        # Jobs started by this worker; the fallback when Redis is unavailable
+        self._jobs: Dict[str, ExportJob] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._purged_at = 0.0
+
+    @property
+    def directory(self) -> str:
+        if self._directory is None:
+            self._directory = get_settings().EXPORT_DIR
+        os.makedirs(self._directory, exist_ok=True)
+        return self._directory
+
+    def _key(self, token: str) -> str:
+        return f"{JOB_KEY_PREFIX}:{token}"
+
+    async def _save(self, job: ExportJob):
+        # Outlives the file by a TTL so late polls see "expired", not a running job
+        await self.cache.set(self._key(job.token), job.to_record(), expire=2 * self.ttl_seconds)
+
+    async def submit(
+        self,
+        producer: Callable[[], Iterable[bytes]],
+        filename: str,
+        media_type: str,
+    ) -> ExportJob:
+        """
+        Start writing an export in the background.
+
+        Args:
+            producer: Called on a worker thread; returns the export's chunks.
+                It must open its own database session.
+            filename: Download file name
+            media_type: Download content type
+
+        Returns:
+            The pending job; its token is the only way to fetch the result
+        """
+        self.purge_expired()
+
+        token = secrets.token_urlsafe(32)
+        job = ExportJob(
+            token=token,
+            filename=filename,
+            media_type=media_type,
+            path=os.path.join(self.directory, token),
+        )
+        self._jobs[token] = job
+        # Stored before the token is handed out, so any worker can answer a poll
+        await self._save(job)
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        task = asyncio.create_task(self._run(job, producer))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def get(self, token: str) -> Optional[ExportJob]:
+        """Look up a job by token; expired jobs are treated as missing."""
+        self.purge_expired()
+        job = self._jobs.get(token)
+        if job is None:
+            record = await self.cache.get(self._key(token))
+            if not record:
+                return None
+            try:
+                job = ExportJob.from_record(record)
+            except TypeError as e:
+                logger.warning(f"Discarding unreadable export job {token}: {str(e)}")
+                return None
+        if self._expired(job, time.time() - self.ttl_seconds):
+            await self._forget(job)
+            return None
+        return job
+
+    @staticmethod
+    def _expired(job: ExportJob, cutoff: float) -> bool:
+        return job.completed_at is not None and job.completed_at < cutoff
+
+    async def _forget(self, job: ExportJob):
+        self._jobs.pop(job.token, None)
+        self._remove_file(job.path)
+        await self.cache.delete(self._key(job.token))
+
+    def purge_expired(self) -> int:
+        """
+        Delete expired export files and return how many were removed.
+
+        Finished jobs of this worker are dropped as they expire; the shared
+        directory is swept at most every PURGE_INTERVAL_SECONDS for files
+        left behind by any worker.
+        """
+        cutoff = time.time() - self.ttl_seconds
+        expired = [job for job in self._jobs.values() if self._expired(job, cutoff)]
+        for job in expired:
+            self._jobs.pop(job.token, None)
+            self._remove_file(job.path)
+        removed = len(expired)
+
+        now = time.monotonic()
+        if self._directory is None or now - self._purged_at < PURGE_INTERVAL_SECONDS:
+            return removed
+        self._purged_at = now
+        try:
+            entries = list(os.scandir(self._directory))
+        except FileNotFoundError:
+            return removed
+        for entry in entries:
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    self._remove_file(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                # Another worker removed it first
+                continue
+        return removed
+
+    async def stop(self):
+        """
+        Cancel this worker's running jobs.
+
+        Finished files stay in the shared directory for other workers to
+        serve until they expire.
+        """
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._jobs.clear()
+
+    async def _run(self, job: ExportJob, producer: Callable[[], Iterable[bytes]]):
+        async with self._semaphore:
+            job.status = ExportJobStatus.RUNNING
+            await self._save(job)
+            try:
+                job.size = await asyncio.to_thread(self._write, job.path, producer)
+                job.status = ExportJobStatus.COMPLETED
+                logger.info(f"Export {job.filename} completed ({job.size} bytes)")
+            except asyncio.CancelledError:
+                job.status = ExportJobStatus.FAILED
+                job.error = "Export was interrupted"
+                raise
+            except Exception as e:
+                job.status = ExportJobStatus.FAILED
+                job.error = str(e)
+                self._remove_file(job.path)
+                logger.error(f"Export {job.filename} failed: {str(e)}")
+            finally:
+                job.completed_at = time.time()
+                await self._save(job)
+
+    @staticmethod
+    def _write(path: str, producer: Callable[[], Iterable[bytes]]) -> int:
+        # Write to a partial file so a download never sees a truncated export
+        partial_path = f"{path}.part"
+        size = 0
+        try:
+            with open(partial_path, "wb") as handle:
+                for chunk in producer():
+                    handle.write(chunk)
+                    size += len(chunk)
+            os.replace(partial_path, path)
+        finally:
+            ExportJobManager._remove_file(partial_path)
+        return size
+
+    @staticmethod
+    def _remove_file(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+# Global export job manager instance
+export_jobs = ExportJobManager()
@@ -0,0 +1,160 @@
+"""
+Response helpers for streaming exports.
+
+Provides:
+- Format dispatch from rows to encoded chunks
+- Streaming download responses with optional gzip
+- Hand-off of large exports to background jobs
+- One response for both: a stream, or 202 with the job's download URL
+"""
+
+from typing import Any, Callable, Iterable, Iterator, Sequence, Union
+
+from fastapi import status
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.core.config.settings import get_settings
+
+from app.services.export.encoders import (
+    ExportFormat,
+    gzip_chunks,
+    iter_csv,
+    iter_json_array,
+    iter_ndjson,
+)
+from app.services.export.jobs import ExportJob, export_jobs
+from app.services.export.xlsx import iter_xlsx
+
+settings = get_settings()
+
+GZIP_MEDIA_TYPE = "application/gzip"
+
+
+def encode_rows(
+    rows: Iterable[Any],
+    export_format: ExportFormat,
+    columns: Sequence[str],
+    include_headers: bool = True,
+    sheet_name: str = "Export",
+) -> Iterator[bytes]:
+    """
+    Encode rows in the requested format.
+
+    Args:
+        rows: Dicts keyed by column name, or sequences in column order
+        export_format: Target format
+        columns: Column names in output order
+        include_headers: Whether tabular formats get a header row
+        sheet_name: Worksheet name for XLSX exports
+
+    Returns:
+        Iterator over encoded chunks
+    """
+    export_format = ExportFormat(export_format)
+    if export_format == ExportFormat.NDJSON:
+        return iter_ndjson(rows, columns)
+    if export_format == ExportFormat.JSON:
+        return iter_json_array(rows, columns)
+    if export_format == ExportFormat.XLSX:
+        return iter_xlsx(rows, columns, include_headers, sheet_name=sheet_name)
+    return iter_csv(rows, columns, include_headers)
+
+
+def export_download(export_format: ExportFormat, basename: str, compress: bool = False):
+    """Return the (filename, media_type) pair for an export download."""
+    export_format = ExportFormat(export_format)
+    filename = f"{basename}.{export_format.extension}"
+    if compress:
+        return f"{filename}.gz", GZIP_MEDIA_TYPE
+    return filename, export_format.media_type
+
+
+def _finalize(chunks: Iterable[bytes], compress: bool) -> Iterator[bytes]:
+    return gzip_chunks(chunks) if compress else iter(chunks)
+
+
+def streaming_export_response(
+    chunks: Iterable[bytes],
+    export_format: ExportFormat,
+    basename: str,
+    compress: bool = False,
+) -> StreamingResponse:
+    """
+    Stream encoded chunks to the client as a file download.
+
+    Args:
+        chunks: Encoded export chunks; a sync iterator runs on the threadpool
+        export_format: Format the chunks are encoded in
+        basename: Download file name without extension
+        compress: Gzip the stream on the fly
+
+    Returns:
+        StreamingResponse with a Content-Disposition attachment header
+    """
+    filename, media_type = export_download(export_format, basename, compress)
+    return StreamingResponse(
+        _finalize(chunks, compress),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+async def submit_export_job(
+    produce_chunks: Callable[[], Iterable[bytes]],
+    export_format: ExportFormat,
+    basename: str,
+    compress: bool = False,
+) -> ExportJob:
+    """
+    Write an export to disk in the background.
+
+    Args:
+        produce_chunks: Called on a worker thread to produce encoded chunks;
+            it must open its own database session
+        export_format: Format the chunks are encoded in
+        basename: Download file name without extension
+        compress: Gzip the file as it is written
+
+    Returns:
+        The pending export job
+    """
+    filename, media_type = export_download(export_format, basename, compress)
+    return await export_jobs.submit(
+        lambda: _finalize(produce_chunks(), compress),
+        filename=filename,
+        media_type=media_type,
+    )
+
+
+def export_job_response(job: ExportJob) -> JSONResponse:
+    """202 Accepted for a queued export job, with where to download it."""
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={**job.to_dict(), "download_url": f"{settings.API_V1_STR}/exports/{job.token}"},
+    )
+
+
+async def export_response(
+    produce_chunks: Callable[[], Iterable[bytes]],
+    export_format: ExportFormat,
+    basename: str,
+    compress: bool = False,
+    background: bool = False,
+) -> Union[StreamingResponse, JSONResponse]:
+    """
+    Stream an export, or queue it as a background job.
+
+    Args:
+        produce_chunks: Produces encoded chunks; in the background it runs
+            on a worker thread and must open its own database session
+        export_format: Format the chunks are encoded in
+        basename: Download file name without extension
+        compress: Gzip the export
+        background: Write the export to disk and return a download token
+
+    Returns:
+        The streaming download, or a 202 response describing the job
+    """
+    if background:
+        return export_job_response(await submit_export_job(produce_chunks, export_format, basename, compress))
+    return streaming_export_response(produce_chunks(), export_format, basename, compress)
@@ -0,0 +1,167 @@
+"""
+Constant-memory XLSX writer.
+
+Writes a single-sheet workbook straight into a zip stream using inline
+strings, so no shared-string table or worksheet has to be held in memory.
+The zip container is written with data descriptors, which lets it go to a
+non-seekable sink and be yielded chunk by chunk while rows are still coming in.
+"""
+
+import io
+import zipfile
+from typing import Any, Iterable, Iterator, List, Sequence
+from xml.sax.saxutils import escape
+
+from app.services.export.encoders import DEFAULT_CHUNK_SIZE, _row_values, to_export_value
+
+# Excel limits sheet names to 31 characters and rejects these characters
+_SHEET_NAME_MAX_LENGTH = 31
+_SHEET_NAME_INVALID = set('[]:*?/\\')
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+_SHEET_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+
+_SHEET_FOOTER = '</sheetData></worksheet>'
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, non-seekable sink that hands written bytes back to the generator."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self.size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        self.size = 0
+        return data
+
+
+def _column_letter(index: int) -> str:
+    """Convert a zero-based column index into a spreadsheet column name."""
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _sheet_name(name: str) -> str:
+    cleaned = "".join("_" if char in _SHEET_NAME_INVALID else char for char in name).strip()
+    return (cleaned or "Sheet1")[:_SHEET_NAME_MAX_LENGTH]
+
+
+def _cell(reference: str, value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return f'<c r="{reference}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{reference}"><v>{value}</v></c>'
+    text = escape(str(to_export_value(value)))
+    return f'<c r="{reference}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _row_xml(row_number: int, values: Sequence[Any], letters: List[str]) -> str:
+    cells = "".join(
+        _cell(f"{letters[index]}{row_number}", value)
+        for index, value in enumerate(values)
+    )
+    return f'<row r="{row_number}">{cells}</row>'
+
+
+def iter_xlsx(
+    rows: Iterable[Any],
+    columns: Sequence[str],
+    include_headers: bool = True,
+    sheet_name: str = "Export",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """
+    Encode rows as a single-sheet XLSX workbook.
+
+    Args:
+        rows: Dicts keyed by column name, or sequences in column order
+        columns: Column names, also used as the header row
+        include_headers: Whether to write the header row
+        sheet_name: Worksheet name
+        chunk_size: Approximate size of each yielded chunk
+
+    Returns:
+        Iterator over chunks of the zipped workbook
+    """
+    sink = _ChunkSink()
+    letters = [_column_letter(index) for index in range(len(columns))]
+
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        archive.writestr("_rels/.rels", _ROOT_RELS)
+        archive.writestr("xl/workbook.xml", _WORKBOOK.format(name=escape(_sheet_name(sheet_name), {'"': "&quot;"})))
+        archive.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+
+        with archive.open("xl/worksheets/sheet1.xml", mode="w", force_zip64=True) as sheet:
+            sheet.write(_SHEET_HEADER.encode("utf-8"))
+            row_number = 0
+            if include_headers:
+                row_number += 1
+                sheet.write(_row_xml(row_number, list(columns), letters).encode("utf-8"))
+
+            for row in rows:
+                row_number += 1
+                sheet.write(_row_xml(row_number, _row_values(row, columns), letters).encode("utf-8"))
+                if sink.size >= chunk_size:
+                    yield sink.drain()
+
+            sheet.write(_SHEET_FOOTER.encode("utf-8"))
+
+    yield sink.drain()
@@ -0,0 +1,229 @@
+"""
+Feature flag evaluation engine.
+
+All flags and tenant overrides are loaded into an immutable, versioned
+snapshot held by every worker, so flag checks are dictionary lookups with
+no database round trip.
+
+Provides:
+- Single-flag and bulk (evaluate_all) evaluation for a tenant
+- Percentage rollouts bucketed by a deterministic hash of flag and tenant
+- Push invalidation over a Redis channel when flags change
+- A polling fallback on a shared version stamp for missed notifications
+"""
+
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache.redis_cache import redis_cache
+from app.core.cache.versioned_snapshot import MAX_SNAPSHOT_AGE, VERSION_CHECK_INTERVAL, VersionedSnapshotCache
+from app.models.feature_flags.feature_flag import FeatureFlag, TenantFeatureFlagOverride
+
+logger = logging.getLogger(__name__)
+
+FEATURE_FLAGS_VERSION_KEY = "feature_flags:version"
+FEATURE_FLAGS_CHANNEL = "feature_flags:changes"
+# Flag config key holding the share of tenants (0-100) a flag is rolled out to
+ROLLOUT_CONFIG_KEY = "rollout_percentage"
+ROLLOUT_BUCKETS = 10000
+
+
+def rollout_bucket(key: str, subject: Any) -> int:
+    """Stable bucket in [0, ROLLOUT_BUCKETS) for a flag and rollout subject."""
+    digest = hashlib.blake2b(f"{key}:{subject}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % ROLLOUT_BUCKETS
+
+
+@dataclass(frozen=True)
+class FlagDefinition:
+    """A feature flag as seen by the engine"""
+    id: UUID
+    key: str
+    is_enabled: bool
+    config: Dict[str, Any]
+    # Bucket threshold for percentage rollouts, None when fully on or off
+    rollout_threshold: Optional[int] = None
+
+
+def _rollout_threshold(config: Dict[str, Any]) -> Optional[int]:
+    percentage = config.get(ROLLOUT_CONFIG_KEY)
+    if percentage is None:
+        return None
+    try:
+        percentage = min(max(float(percentage), 0.0), 100.0)
+    except (TypeError, ValueError):
+        logger.warning(f"Ignoring invalid {ROLLOUT_CONFIG_KEY}: {percentage!r}")
+        return None
+    return int(percentage * ROLLOUT_BUCKETS / 100)
+
+
+class FlagSnapshot:
+    """Immutable view of every flag and tenant override"""
+
+    def __init__(
+        self,
+        version: Optional[int],
+        flags: Iterable[Tuple[UUID, str, bool, Optional[Dict[str, Any]]]],
+        overrides: Iterable[Tuple[UUID, UUID, bool, Optional[Dict[str, Any]]]],
+    ):
+        self.version = version
+        self.flags: Dict[str, FlagDefinition] = {}
+        for flag_id, key, is_enabled, config in flags:
+            config = dict(config or {})
+            self.flags[key] = FlagDefinition(
+                flag_id, key, bool(is_enabled), config, _rollout_threshold(config)
+            )
+
+        # tenant_id -> flag_id -> (is_enabled, config_override)
+        self.overrides: Dict[UUID, Dict[UUID, Tuple[bool, Dict[str, Any]]]] = {}
+        for flag_id, tenant_id, is_enabled, config_override in overrides:
+            self.overrides.setdefault(tenant_id, {})[flag_id] = (
+                bool(is_enabled), dict(config_override or {})
+            )
+
+    def _evaluate(
+        self,
+        flag: FlagDefinition,
+        tenant_overrides: Dict[UUID, Tuple[bool, Dict[str, Any]]],
+        subject: Any,
+    ) -> bool:
+        override = tenant_overrides.get(flag.id)
+        if override is not None:
+            return override[0]
+        if not flag.is_enabled:
+            return False
+        if flag.rollout_threshold is None or subject is None:
+            return True
+        return rollout_bucket(flag.key, subject) < flag.rollout_threshold
+
+    def is_enabled(self, key: str, tenant_id: Optional[UUID] = None, subject: Any = None) -> bool:
+        """
+        Evaluate one flag.
+
+        A tenant override always wins. Otherwise a globally enabled flag with a
+        rollout percentage is on only for subjects hashing below the threshold.
+
+        Args:
+            key: Flag key
+            tenant_id: Tenant whose overrides apply
+            subject: Rollout subject, defaults to the tenant
+
+        Returns:
+            Whether the flag is on; unknown flags are off
+        """
+        flag = self.flags.get(key)
+        if flag is None:
+            return False
+        if subject is None:
+            subject = tenant_id
+        return self._evaluate(flag, self.overrides.get(tenant_id, {}), subject)
+
+    def config(self, key: str, tenant_id: Optional[UUID] = None) -> Dict[str, Any]:
+        """Flag config with the tenant's override keys merged on top."""
+        flag = self.flags.get(key)
+        if flag is None:
+            return {}
+        config = dict(flag.config)
+        override = self.overrides.get(tenant_id, {}).get(flag.id)
+        if override is not None:
+            config.update(override[1])
+        return config
+
+    def evaluate_all(self, tenant_id: Optional[UUID] = None, subject: Any = None) -> Dict[str, bool]:
+        """Evaluate every flag for a tenant."""
+        tenant_overrides = self.overrides.get(tenant_id, {})
+        if subject is None:
+            subject = tenant_id
+        return {
+            key: self._evaluate(flag, tenant_overrides, subject)
+            for key, flag in self.flags.items()
+        }
+
+
+class FeatureFlagEngine(VersionedSnapshotCache[FlagSnapshot]):
+    """Process-wide holder of the flag snapshot and its change listener"""
+
+    def __init__(
+        self,
+        cache=redis_cache,
+        version_check_interval: float = VERSION_CHECK_INTERVAL,
+        max_snapshot_age: float = MAX_SNAPSHOT_AGE,
+    ):
+        super().__init__(
+            FEATURE_FLAGS_VERSION_KEY,
+            channel=FEATURE_FLAGS_CHANNEL,
+            name="Feature flag",
+            cache=cache,
+            version_check_interval=version_check_interval,
+            max_snapshot_age=max_snapshot_age,
+        )
+
+    async def snapshot(self, db: AsyncSession) -> FlagSnapshot:
+        """
+        Get the current snapshot, loading it if it is cold or stale.
+
+        Args:
+            db: Database session used only when the snapshot has to be loaded
+
+        Returns:
+            The flag snapshot
+        """
+        return await self._current(lambda version: self.load(db, version))
+
+    async def load(self, db: AsyncSession, version: Optional[int] = None) -> FlagSnapshot:
+        """Load every flag and tenant override in two queries."""
+        flags = await db.execute(
+            select(FeatureFlag.id, FeatureFlag.key, FeatureFlag.is_enabled, FeatureFlag.config)
+        )
+        overrides = await db.execute(
+            select(
+                TenantFeatureFlagOverride.feature_flag_id,
+                TenantFeatureFlagOverride.tenant_id,
+                TenantFeatureFlagOverride.is_enabled,
+                TenantFeatureFlagOverride.config_override,
+            )
+        )
+        snapshot = FlagSnapshot(version, flags.all(), overrides.all())
+        logger.info(
+            f"Loaded feature flag snapshot: {len(snapshot.flags)} flags, "
+            f"{len(snapshot.overrides)} tenants with overrides"
+        )
+        return snapshot
+
+    async def is_enabled(
+        self,
+        db: AsyncSession,
+        key: str,
+        tenant_id: Optional[UUID] = None,
+        subject: Any = None,
+    ) -> bool:
+        """Evaluate one flag for a tenant."""
+        return (await self.snapshot(db)).is_enabled(key, tenant_id, subject)
+
+    async def get_config(
+        self,
+        db: AsyncSession,
+        key: str,
+        tenant_id: Optional[UUID] = None,
+    ) -> Dict[str, Any]:
+        """Flag config with tenant overrides applied."""
+        return (await self.snapshot(db)).config(key, tenant_id)
+
+    async def evaluate_all(
+        self,
+        db: AsyncSession,
+        tenant_id: Optional[UUID] = None,
+        subject: Any = None,
+    ) -> Dict[str, bool]:
+        """Evaluate every flag for a tenant in one pass."""
+        return (await self.snapshot(db)).evaluate_all(tenant_id, subject)
+
+
+# Global feature flag engine instance
+feature_flag_engine = FeatureFlagEngine()
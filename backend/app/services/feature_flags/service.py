@@ -5,6 +5,9 @@ This module provides functionality for managing feature flags, including:
 - Creating and updating global feature flags
 - Managing tenant-specific overrides
 - Checking feature flag status for a specific tenant
+
+Flag checks are served from the in-memory snapshot in engine.py; every write
+here invalidates it across workers.
 """
 
 import uuid
@@ -15,6 +18,7 @@ from sqlalchemy import select, update, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.feature_flags.feature_flag import FeatureFlag, TenantFeatureFlagOverride
+from app.services.feature_flags.engine import feature_flag_engine
 from app.models.tenant import Tenant
 
 
@@ -61,6 +65,7 @@ class FeatureFlagService:
 
         db.add(feature_flag)
         await db.commit()
+        await feature_flag_engine.invalidate()
         await db.refresh(feature_flag)
 
         return feature_flag
@@ -175,6 +180,7 @@ class FeatureFlagService:
         feature_flag.updated_at = datetime.utcnow()
 
         await db.commit()
+        await feature_flag_engine.invalidate()
         await db.refresh(feature_flag)
 
         return feature_flag
@@ -204,6 +210,7 @@ class FeatureFlagService:
         # Then delete the feature flag
         await db.delete(feature_flag)
         await db.commit()
+        await feature_flag_engine.invalidate()
 
         return True
 
@@ -261,6 +268,7 @@ class FeatureFlagService:
             db.add(override)
 
         await db.commit()
+        await feature_flag_engine.invalidate()
         await db.refresh(override)
 
         return override
@@ -290,6 +298,7 @@ class FeatureFlagService:
         )
 
         await db.commit()
+        await feature_flag_engine.invalidate()
 
         return result.rowcount > 0
 
@@ -326,38 +335,35 @@ class FeatureFlagService:
         """
         Check if a feature flag is enabled for a specific tenant or globally.
 
+        Evaluated against the in-memory flag snapshot, so warm checks don't
+        touch the database.
+
         Args:
-            db: Database session
+            db: Database session, used only to load a cold snapshot
             key: The unique key of the feature flag
             tenant_id: Optional tenant ID to check for overrides
 
         Returns:
             True if the feature is enabled, False otherwise
         """
-        # Get the feature flag
-        feature_flag = await self.get_feature_flag_by_key(db, key)
-        if not feature_flag:
-            # Feature flag doesn't exist, default to disabled
-            return False
+        return await feature_flag_engine.is_enabled(db, key, tenant_id)
 
-        # If no tenant specified, return global setting
-        if tenant_id is None:
-            return feature_flag.is_enabled
-
-        # Check for tenant override
-        result = await db.execute(
-            select(TenantFeatureFlagOverride).where(
-                TenantFeatureFlagOverride.feature_flag_id == feature_flag.id,
-                TenantFeatureFlagOverride.tenant_id == tenant_id
-            )
-        )
-        override = result.scalars().first()
+    async def evaluate_all(
+        self,
+        db: AsyncSession,
+        tenant_id: Optional[uuid.UUID] = None
+    ) -> Dict[str, bool]:
+        """
+        Evaluate every feature flag for a tenant in one pass.
 
-        # If override exists, use its setting, otherwise use global setting
-        if override:
-            return override.is_enabled
+        Args:
+            db: Database session, used only to load a cold snapshot
+            tenant_id: Optional tenant ID to check for overrides
 
-        return feature_flag.is_enabled
+        Returns:
+            Mapping of flag key to enabled state
+        """
+        return await feature_flag_engine.evaluate_all(db, tenant_id)
 
     async def get_feature_config(
         self,
@@ -369,39 +375,11 @@ class FeatureFlagService:
         Get the configuration for a feature flag, with tenant overrides if applicable.
 
         Args:
-            db: Database session
+            db: Database session, used only to load a cold snapshot
             key: The unique key of the feature flag
             tenant_id: Optional tenant ID to check for overrides
 
         Returns:
             Configuration dictionary, empty if feature flag doesn't exist
         """
-        # Get the feature flag
-        feature_flag = await self.get_feature_flag_by_key(db, key)
-        if not feature_flag:
-            # Feature flag doesn't exist, return empty config
-            return {}
-
-        # Start with the global config
-        config = dict(feature_flag.config or {})
-
-        # If no tenant specified, return global config
-        if tenant_id is None:
-            return config
-
-        # Check for tenant override
-        result = await db.execute(
-            select(TenantFeatureFlagOverride).where(
-                TenantFeatureFlagOverride.feature_flag_id == feature_flag.id,
-                TenantFeatureFlagOverride.tenant_id == tenant_id
-            )
-        )
-        override = result.scalars().first()
-
-        # If override exists, merge its config with global config
-        if override and override.config_override:
-            # Override keys from tenant config
-            for key, value in override.config_override.items():
-                config[key] = value
-
-        return config
+        return await feature_flag_engine.get_config(db, key, tenant_id)
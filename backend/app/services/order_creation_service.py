@@ -9,12 +9,17 @@ from app.models.order_channel_meta import OrderChannelMeta
 from app.models.order_item import OrderItem
 from app.schemas.order import OrderCreate, ModernOrderCreate
 from app.services.audit_service import AuditActionType, create_audit_log
+from app.domain.events.event_bus import get_event_bus
+from app.domain.events.order_events import OrderEventFactory
 import logging
 
+logger = logging.getLogger(__name__)
+
 
 class OrderCreationService:
     def __init__(self, db: AsyncSession):
         self.db = db
+        self.event_bus = get_event_bus()
 
     async def create_order(self, order_in: OrderCreate, seller_id: UUID) -> Order:
         items = [
@@ -160,6 +165,12 @@ class OrderCreationService:
             resource_id=str(order.id),
             details=f"Created order for product {product_id}",
         )
+        # Emit domain event in the same transaction as the order
+        try:
+            event = OrderEventFactory.create_order_created_event(order)
+            await self.event_bus.publish(event, db=self.db)
+        except Exception as e:
+            logger.warning(f"Failed to emit order created event: {str(e)}")
         await self.db.commit()
         await self.db.refresh(order)
         return order
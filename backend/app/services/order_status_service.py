@@ -113,6 +113,17 @@ class OrderStatusService:
                 else:
                     order.notes += f"\nCarrier: {status_update['shipping_carrier']}"
 
+            # Emit domain event in the same transaction as the status change
+            try:
+                event = OrderEventFactory.create_status_changed_event(
+                    order,
+                    previous_status,
+                    new_status
+                )
+                await self.event_bus.publish(event, db=self.db)
+            except Exception as e:
+                logger.warning(f"Failed to emit status change event: {str(e)}")
+
             # Commit the transaction
             await self.db.commit()
 
@@ -133,17 +144,6 @@ class OrderStatusService:
                 }
             )
 
-            # Emit domain event
-            try:
-                event = OrderEventFactory.create_status_changed_event(
-                    order,
-                    previous_status,
-                    new_status
-                )
-                await self.event_bus.publish(event)
-            except Exception as e:
-                logger.warning(f"Failed to emit status change event: {str(e)}")
-
             logger.info(
                 f"Updated order {order_id} status from {previous_status} to {new_status}")
             return order
@@ -173,6 +173,18 @@ class OrderTransactionService:
             if payment.status == 'success':
                 await self._update_order_payment_status(order, payment)
 
+            # Emit domain event in the same transaction as the payment
+            try:
+                event = OrderEventFactory.create_payment_processed_event(
+                    order,
+                    payment,
+                    transaction_result
+                )
+                await self.event_bus.publish(event, db=self.db)
+            except Exception as e:
+                logger.warning(
+                    f"Failed to emit payment processed event: {str(e)}")
+
             await self.db.commit()
 
             # Create audit log
@@ -194,18 +206,6 @@ class OrderTransactionService:
                 }
             )
 
-            # Emit domain event
-            try:
-                event = OrderEventFactory.create_payment_processed_event(
-                    order,
-                    payment,
-                    transaction_result
-                )
-                await self.event_bus.publish(event)
-            except Exception as e:
-                logger.warning(
-                    f"Failed to emit payment processed event: {str(e)}")
-
             logger.info(
                 f"Payment processed for order {order.id}: {payment.status}")
 
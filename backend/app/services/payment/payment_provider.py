@@ -4,9 +4,11 @@ import json
 from abc import ABC, abstractmethod
 from typing import Dict, Optional
 
-import requests
+import httpx
 
+from app.core.http.outbound import outbound_http
 from app.core.logging import logger
+from app.core.resilience.retry_manager import CircuitOpenError
 from app.schemas.payment.payment import (
     Money,
     PaymentInitializeRequest,
@@ -22,14 +24,14 @@ class PaymentProviderInterface(ABC):
     """Abstract base class for payment providers"""
 
     @abstractmethod
-    def initialize_payment(
+    async def initialize_payment(
         self, request: PaymentInitializeRequest
     ) -> PaymentInitializeResponse:
         """Initialize a payment transaction"""
         pass
 
     @abstractmethod
-    def verify_payment(self, reference: str) -> PaymentVerificationResponse:
+    async def verify_payment(self, reference: str) -> PaymentVerificationResponse:
         """Verify a payment transaction"""
         pass
 
@@ -47,7 +49,7 @@ class PaystackProvider(PaymentProviderInterface):
         self.public_key = public_key
         self.base_url = "https://api.paystack.co"
 
-    def initialize_payment(
+    async def initialize_payment(
         self, request: PaymentInitializeRequest
     ) -> PaymentInitializeResponse:
         """Initialize a payment with Paystack"""
@@ -73,8 +75,11 @@ class PaystackProvider(PaymentProviderInterface):
                 },
             }
 
-            response = requests.post(
-                f"{self.base_url}/transaction/initialize", headers=headers, json=payload
+            response = await outbound_http.post(
+                "paystack",
+                f"{self.base_url}/transaction/initialize",
+                headers=headers,
+                json=payload,
             )
 
             response.raise_for_status()
@@ -91,11 +96,11 @@ class PaystackProvider(PaymentProviderInterface):
                 logger.error(f"Paystack initialization failed: {data}")
                 raise Exception(data["message"])
 
-        except requests.RequestException as e:
+        except (httpx.HTTPError, CircuitOpenError) as e:
             logger.error(f"Error initializing Paystack payment: {str(e)}")
             raise Exception(f"Payment initialization failed: {str(e)}")
 
-    def verify_payment(self, reference: str) -> PaymentVerificationResponse:
+    async def verify_payment(self, reference: str) -> PaymentVerificationResponse:
         """Verify payment with Paystack"""
         try:
             headers = {
@@ -103,8 +108,8 @@ class PaystackProvider(PaymentProviderInterface):
                 "Content-Type": "application/json",
             }
 
-            response = requests.get(
-                f"{self.base_url}/transaction/verify/{reference}", headers=headers
+            response = await outbound_http.get(
+                "paystack", f"{self.base_url}/transaction/verify/{reference}", headers=headers
             )
 
             response.raise_for_status()
@@ -151,7 +156,7 @@ class PaystackProvider(PaymentProviderInterface):
                     transaction_date=data["data"].get("paid_at", ""),
                 )
 
-        except requests.RequestException as e:
+        except (httpx.HTTPError, CircuitOpenError) as e:
             logger.error(f"Error verifying Paystack payment: {str(e)}")
             raise Exception(f"Payment verification failed: {str(e)}")
 
@@ -189,7 +194,7 @@ class FlutterwaveProvider(PaymentProviderInterface):
         self.encryption_key = encryption_key
         self.base_url = "https://api.flutterwave.com/v3"
 
-    def initialize_payment(
+    async def initialize_payment(
         self, request: PaymentInitializeRequest
     ) -> PaymentInitializeResponse:
         """Initialize a payment with Flutterwave"""
@@ -214,8 +219,8 @@ class FlutterwaveProvider(PaymentProviderInterface):
                 "meta": {"order_id": request.order_id, **request.metadata},
             }
 
-            response = requests.post(
-                f"{self.base_url}/payments", headers=headers, json=payload
+            response = await outbound_http.post(
+                "flutterwave", f"{self.base_url}/payments", headers=headers, json=payload
             )
 
             response.raise_for_status()
@@ -231,11 +236,11 @@ class FlutterwaveProvider(PaymentProviderInterface):
                 logger.error(f"Flutterwave initialization failed: {data}")
                 raise Exception(data["message"])
 
-        except requests.RequestException as e:
+        except (httpx.HTTPError, CircuitOpenError) as e:
             logger.error(f"Error initializing Flutterwave payment: {str(e)}")
             raise Exception(f"Payment initialization failed: {str(e)}")
 
-    def verify_payment(self, reference: str) -> PaymentVerificationResponse:
+    async def verify_payment(self, reference: str) -> PaymentVerificationResponse:
         """Verify payment with Flutterwave"""
         try:
             headers = {
@@ -244,8 +249,11 @@ class FlutterwaveProvider(PaymentProviderInterface):
             }
 
             # First try to find by tx_ref
-            response = requests.get(
-                f"{self.base_url}/transactions?tx_ref={reference}", headers=headers
+            response = await outbound_http.get(
+                "flutterwave",
+                f"{self.base_url}/transactions",
+                params={"tx_ref": reference},
+                headers=headers,
             )
 
             response.raise_for_status()
@@ -309,7 +317,7 @@ class FlutterwaveProvider(PaymentProviderInterface):
                     transaction_date="",
                 )
 
-        except requests.RequestException as e:
+        except (httpx.HTTPError, CircuitOpenError) as e:
             logger.error(f"Error verifying Flutterwave payment: {str(e)}")
             raise Exception(f"Payment verification failed: {str(e)}")
 
@@ -365,21 +373,23 @@ class MpesaProvider(PaymentProviderInterface):
         self.base_url = "https://sandbox.safaricom.co.ke"
         self.token = None
 
-    def _get_access_token(self):
+    async def _get_access_token(self):
         if self.token:
             return self.token
         url = f"{self.base_url}/oauth/v1/generate?grant_type=client_credentials"
-        response = requests.get(url, auth=(self.consumer_key, self.consumer_secret))
+        response = await outbound_http.get(
+            "mpesa", url, auth=(self.consumer_key, self.consumer_secret)
+        )
         response.raise_for_status()
         self.token = response.json()["access_token"]
         return self.token
 
-    def initialize_payment(
+    async def initialize_payment(
         self, request: PaymentInitializeRequest
     ) -> PaymentInitializeResponse:
         """Initiate M-Pesa STK Push or USSD fallback"""
         try:
-            access_token = self._get_access_token()
+            access_token = await self._get_access_token()
             headers = {
                 "Authorization": f"Bearer {access_token}",
                 "Content-Type": "application/json",
@@ -399,7 +409,7 @@ class MpesaProvider(PaymentProviderInterface):
                 "TransactionDesc": request.metadata.get("desc", "Order Payment"),
             }
             url = f"{self.base_url}/mpesa/stkpush/v1/processrequest"
-            response = requests.post(url, headers=headers, json=payload)
+            response = await outbound_http.post("mpesa", url, headers=headers, json=payload)
             response.raise_for_status()
             data = response.json()
             # USSD fallback (simulate, real USSD would be handled by frontend or SMS)
@@ -414,7 +424,7 @@ class MpesaProvider(PaymentProviderInterface):
             logger.error(f"Error initializing M-Pesa payment: {str(e)}")
             raise Exception(f"M-Pesa payment initialization failed: {str(e)}")
 
-    def verify_payment(self, reference: str) -> PaymentVerificationResponse:
+    async def verify_payment(self, reference: str) -> PaymentVerificationResponse:
         """Verify M-Pesa payment status (simulate for now)"""
         # In production, use Daraja API to query status
         # Here, simulate as always successful
@@ -455,11 +465,9 @@ class StripeProvider(PaymentProviderInterface):
         self.secret_key = secret_key
         self.base_url = "https://api.stripe.com/v1"
 
-    def initialize_payment(
+    async def initialize_payment(
         self, request: PaymentInitializeRequest
     ) -> PaymentInitializeResponse:
-        import requests
-
         try:
             headers = {
                 "Authorization": f"Bearer {self.secret_key}",
@@ -472,8 +480,8 @@ class StripeProvider(PaymentProviderInterface):
                 "metadata[order_id]": request.order_id,
                 "receipt_email": request.customer_email,
             }
-            response = requests.post(
-                f"{self.base_url}/payment_intents", headers=headers, data=data
+            response = await outbound_http.post(
+                "stripe", f"{self.base_url}/payment_intents", headers=headers, data=data
             )
             response.raise_for_status()
             resp_data = response.json()
@@ -487,16 +495,14 @@ class StripeProvider(PaymentProviderInterface):
             logger.error(f"Error initializing Stripe payment: {str(e)}")
             raise Exception(f"Stripe payment initialization failed: {str(e)}")
 
-    def verify_payment(self, reference: str) -> PaymentVerificationResponse:
-        import requests
-
+    async def verify_payment(self, reference: str) -> PaymentVerificationResponse:
         try:
             headers = {
                 "Authorization": f"Bearer {self.secret_key}",
                 "Content-Type": "application/x-www-form-urlencoded",
             }
-            response = requests.get(
-                f"{self.base_url}/payment_intents/{reference}", headers=headers
+            response = await outbound_http.get(
+                "stripe", f"{self.base_url}/payment_intents/{reference}", headers=headers
             )
             response.raise_for_status()
             data = response.json()
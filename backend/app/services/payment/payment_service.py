@@ -1,7 +1,9 @@
+import asyncio
 from datetime import datetime, timedelta
 
 import sentry_sdk
 from fastapi import HTTPException
+from sqlalchemy import or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.logging import logger
@@ -11,8 +13,8 @@ from app.core.security.payment_security import (
     get_tls12_session,
     verify_payment_reference,
 )
-from app.models.order import Order
-from app.models.payment import ManualPaymentProof, Payment, PaymentSettings
+from app.models.order import Order, OrderStatus
+from app.models.payment import ManualPaymentProof, Payment, PaymentAuditLog, PaymentSettings
 # Import Tenant instead of Store which does not exist
 from app.models.tenant import Tenant
 from app.core.errors import payment_failures
@@ -35,6 +37,13 @@ from app.schemas.payment.payment import (
 from app.services.order_service import OrderService
 from app.services.payment.payment_provider import get_payment_provider
 
+# Payments in these states are never moved by a webhook
+SETTLED_PAYMENT_STATUSES = (
+    PaymentStatus.COMPLETED.value,
+    PaymentStatus.REFUNDED.value,
+    PaymentStatus.PARTIALLY_REFUNDED.value,
+)
+
 
 class PaymentService:
     """Service for handling payment operations"""
@@ -285,16 +294,14 @@ class PaymentService:
                         self.db, order, "PROCESSING"
                     )
 
-                    # Emit PaymentProcessedEvent
-                    import asyncio
-
+                    # Emit PaymentProcessedEvent; the outbox row commits with the payment
                     from app.domain.events.event_bus import get_event_bus
                     from app.domain.events.order_events import OrderEventFactory
 
                     event = OrderEventFactory.create_payment_processed_event(
                         order, payment
                     )
-                    asyncio.create_task(get_event_bus().publish(event))
+                    await get_event_bus().publish(event, db=self.db)
 
                 # Risk scoring (update if new info is available)
                 if payment:
@@ -629,6 +636,101 @@ class PaymentService:
                     detail=f"Failed to update payment settings: {str(e)}",
                 )
 
+    @staticmethod
+    def _webhook_payment_reference(payment_data: dict) -> str:
+        """Extract our payment reference from a provider webhook payload."""
+        return (
+            payment_data.get("reference")
+            or payment_data.get("tx_ref")
+            or payment_data.get("CheckoutRequestID")
+            or ""
+        )
+
+    async def _lock_webhook_payment(self, payment_data: dict):
+        """Load and row-lock the payment a webhook refers to, or None if unknown."""
+        reference = self._webhook_payment_reference(payment_data)
+        if not reference:
+            return None
+        result = await self.db.execute(
+            select(Payment)
+            .where(or_(Payment.reference == reference, Payment.provider_reference == reference))
+            .with_for_update()
+        )
+        return result.scalars().first()
+
+    def _audit_transition(self, payment: Payment, previous_status: str, event_id: str, provider: str) -> None:
+        self.db.add(
+            PaymentAuditLog(
+                payment_id=payment.id,
+                action="WEBHOOK",
+                previous_status=previous_status,
+                new_status=payment.status,
+                changes={"provider": provider, "event_id": event_id},
+            )
+        )
+
+    async def process_successful_payment(
+        self, payment_data: dict, provider: str, event_id: str
+    ) -> bool:
+        """
+        Mark a payment completed from a provider webhook.
+
+        Changes are flushed but not committed, so the caller can commit them
+        together with the webhook event's state.
+
+        Returns:
+            True if the payment changed state, False if it was unknown or
+            already settled
+        """
+        payment = await self._lock_webhook_payment(payment_data)
+        if not payment:
+            logger.warning(f"{provider} webhook {event_id} does not match a known payment")
+            return False
+        if payment.status in SETTLED_PAYMENT_STATUSES:
+            return False
+
+        previous_status = payment.status
+        payment.status = PaymentStatus.COMPLETED.value
+        payment.verified_at = datetime.now()
+        provider_reference = payment_data.get("id") or payment_data.get("MpesaReceiptNumber")
+        if provider_reference and not payment.provider_reference:
+            payment.provider_reference = str(provider_reference)
+        self._audit_transition(payment, previous_status, event_id, provider)
+
+        order = await self.db.get(Order, payment.order_id)
+        if order and order.status == OrderStatus.pending:
+            order.status = OrderStatus.processing
+
+        await self.db.flush()
+        return True
+
+    async def process_failed_payment(
+        self, payment_data: dict, provider: str, event_id: str, failure_reason: str
+    ) -> bool:
+        """
+        Mark a payment failed from a provider webhook.
+
+        A failure arriving after the payment completed (for example an
+        out-of-order retry of an earlier attempt) is ignored.
+
+        Returns:
+            True if the payment changed state
+        """
+        payment = await self._lock_webhook_payment(payment_data)
+        if not payment:
+            logger.warning(f"{provider} webhook {event_id} does not match a known payment")
+            return False
+        if payment.status in SETTLED_PAYMENT_STATUSES or payment.status == PaymentStatus.FAILED.value:
+            return False
+
+        previous_status = payment.status
+        payment.status = PaymentStatus.FAILED.value
+        payment.payment_metadata = {**(payment.payment_metadata or {}), "failure_reason": failure_reason}
+        self._audit_transition(payment, previous_status, event_id, provider)
+
+        await self.db.flush()
+        return True
+
     def map_provider_status_to_internal(
         self, provider: str, external_status: str
     ) -> str:
@@ -667,7 +769,7 @@ class PaymentService:
             return []
         return [p.provider for p in settings.providers if p.enabled]
 
-    def generate_payment_link(self, order, payment_method: str) -> str:
+    async def generate_payment_link(self, order, payment_method: str) -> str:
         """
         Generate a payment link for the given order and payment method using the provider SDK/API.
         """
@@ -680,9 +782,10 @@ class PaymentService:
         )
         from app.services.payment.payment_provider import get_payment_provider
 
-        # Get provider credentials/settings for the tenant/store
-        settings = (
-            self.db.query(PaymentSettings).filter_by(
+        # Get provider credentials/settings for the tenant/store; the chat
+        # flow's sync session blocks, so query it off the event loop
+        settings = await asyncio.to_thread(
+            lambda: self.db.query(PaymentSettings).filter_by(
                 tenant_id=order.seller_id).first()
         )
         provider_config = next(
@@ -721,7 +824,7 @@ class PaymentService:
             request.provider, provider_config.credentials
         )
         try:
-            response = provider_instance.initialize_payment(request)
+            response = await provider_instance.initialize_payment(request)
             return response.checkout_url or response.payment_link
         except Exception as e:
             logging.error(f"Error generating payment link: {str(e)}")
@@ -1,4 +1,5 @@
 import json
+from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
@@ -63,7 +64,8 @@ class WebhookEventService:
                 provider=provider,
                 event_id=event_id,
                 event_type=event_type,
-                payload=json.dumps(payload) if payload else None
+                payload=json.dumps(payload) if payload else None,
+                processed_at=datetime.utcnow()
             )
             
             db.add(webhook_event)
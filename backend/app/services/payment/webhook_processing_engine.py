@@ -0,0 +1,401 @@
+"""
+Payment webhook processing engine.
+
+Workflow for a provider callback:
+1. Fast path: ``SET NX`` on a Redis key for (provider, event_id) rejects most
+   redeliveries without touching the database
+2. Atomic claim: ``INSERT ... ON CONFLICT DO NOTHING`` on ``webhook_events``;
+   only the request that inserts the row goes on, so concurrent duplicates
+   cannot both process the charge
+3. The provider is acknowledged as soon as the claim commits
+4. Workers move the event pending -> processing -> processed, applying the
+   payment state transition and the processed marker in one transaction
+5. A reconciliation sweep re-queues events left pending or stuck in
+   processing (for example after a restart) and publishes queue depth and
+   oldest-event age through ``WebhookMetrics.update_queue_metrics``
+
+The Redis key is first written with a short TTL and only extended once the
+database claim has committed, so a crash between the two never blocks a
+provider's retry for longer than ``CLAIM_TTL_SECONDS``.
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache.redis_cache import redis_cache
+from app.core.monitoring.webhook_metrics import WebhookMetrics
+from app.db.models.webhook_event import WebhookEvent, WebhookEventStatus
+from app.services.payment.payment_service import PaymentService
+
+logger = logging.getLogger(__name__)
+
+# State transitions run as Core statements on the table
+webhook_events = WebhookEvent.__table__
+
+CLAIM_TTL_SECONDS = 30
+DEDUP_TTL_SECONDS = 24 * 3600
+DEFAULT_WORKERS = 8
+MAX_ATTEMPTS = 5
+# Pending events older than this were never picked up by an in-process worker
+PENDING_GRACE_SECONDS = 15
+# Events processing for longer than this are assumed to belong to a dead worker
+PROCESSING_TIMEOUT_SECONDS = 120
+SWEEP_INTERVAL_SECONDS = 30
+SWEEP_BATCH_SIZE = 500
+
+EventHandler = Callable[[PaymentService, str, str, Dict[str, Any]], Awaitable[str]]
+
+
+async def handle_paystack_event(service: PaymentService, event_id: str, event_type: str, payload: Dict[str, Any]) -> str:
+    """Apply a Paystack charge event; returns the metrics outcome."""
+    data = payload.get("data", {})
+    if event_type == "charge.success":
+        await service.process_successful_payment(
+            payment_data=data, provider="paystack", event_id=event_id
+        )
+        return "success"
+    if event_type == "charge.failed":
+        await service.process_failed_payment(
+            payment_data=data,
+            provider="paystack",
+            event_id=event_id,
+            failure_reason=data.get("gateway_response", "Payment failed"),
+        )
+        return "failure"
+    return "unhandled_event"
+
+
+async def handle_mpesa_event(service: PaymentService, event_id: str, event_type: str, payload: Dict[str, Any]) -> str:
+    """Apply an M-Pesa STK callback; returns the metrics outcome."""
+    stk_callback = payload.get("Body", {}).get("stkCallback", {})
+    if stk_callback.get("ResultCode") == 0:
+        await service.process_successful_payment(
+            payment_data=stk_callback, provider="mpesa", event_id=event_id
+        )
+        return "success"
+    await service.process_failed_payment(
+        payment_data=stk_callback,
+        provider="mpesa",
+        event_id=event_id,
+        failure_reason=stk_callback.get("ResultDesc", "Payment failed"),
+    )
+    return "failure"
+
+
+DEFAULT_HANDLERS: Dict[str, EventHandler] = {
+    "paystack": handle_paystack_event,
+    "mpesa": handle_mpesa_event,
+}
+
+
+class PaymentWebhookEngine:
+    """
+    Claims, queues and processes payment webhook events.
+
+    Workers start lazily on the first ``submit``; ``start()`` also runs the
+    reconciliation sweep and should be called on application startup.
+    """
+
+    def __init__(
+        self,
+        handlers: Optional[Dict[str, EventHandler]] = None,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+        cache=redis_cache,
+        workers: int = DEFAULT_WORKERS,
+        max_attempts: int = MAX_ATTEMPTS,
+        sweep_interval: float = SWEEP_INTERVAL_SECONDS,
+    ):
+        self.handlers = handlers or dict(DEFAULT_HANDLERS)
+        self._session_factory = session_factory
+        self.cache = cache
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.sweep_interval = sweep_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._queued: Set[uuid.UUID] = set()
+        self._tasks: list = []
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def _session(self) -> AsyncSession:
+        if self._session_factory is None:
+            from app.core.db.session import AsyncSessionLocal
+
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory()
+
+    @staticmethod
+    def _dedup_key(provider: str, event_id: str) -> str:
+        return f"webhook:{provider}:{event_id}"
+
+    async def claim(
+        self, db: AsyncSession, provider: str, event_id: str, event_type: str, payload: Dict[str, Any]
+    ) -> Optional[uuid.UUID]:
+        """
+        Atomically claim an event for processing.
+
+        Returns:
+            The new ``webhook_events`` row id, or None if the event was
+            already claimed by an earlier delivery
+        """
+        key = self._dedup_key(provider, event_id)
+        fast_path = await self.cache.set_if_absent(key, "claiming", expire=CLAIM_TTL_SECONDS)
+        if fast_path is False:
+            return None
+
+        now = datetime.utcnow()
+        try:
+            result = await db.execute(
+                pg_insert(webhook_events)
+                .values(
+                    id=uuid.uuid4(),
+                    provider=provider,
+                    event_id=event_id,
+                    event_type=event_type,
+                    payload=json.dumps(payload),
+                    status=WebhookEventStatus.PENDING,
+                    attempts=0,
+                    received_at=now,
+                    updated_at=now,
+                )
+                .on_conflict_do_nothing(index_elements=["provider", "event_id"])
+                .returning(webhook_events.c.id)
+            )
+            event_pk = result.scalar_one_or_none()
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            if fast_path:
+                await self.cache.delete(key)
+            raise
+
+        # Claimed now or earlier: either way later deliveries can stop at Redis
+        await self.cache.set(key, "claimed", expire=DEDUP_TTL_SECONDS)
+        return event_pk
+
+    async def submit(
+        self, db: AsyncSession, provider: str, event_id: str, event_type: str, payload: Dict[str, Any]
+    ) -> bool:
+        """
+        Claim an event and queue it for processing.
+
+        Returns:
+            True if the event was accepted, False if it is a duplicate
+        """
+        event_pk = await self.claim(db, provider, event_id, event_type, payload)
+        if event_pk is None:
+            WebhookMetrics.record_processed(provider, "duplicate")
+            return False
+        self.enqueue(event_pk)
+        return True
+
+    def enqueue(self, event_pk: uuid.UUID) -> None:
+        """Queue a claimed event for a worker unless it is already queued."""
+        self._ensure_workers()
+        if event_pk in self._queued:
+            return
+        self._queued.add(event_pk)
+        self._queue.put_nowait(event_pk)
+
+    def _ensure_workers(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"payment-webhook-{index}")
+            for index in range(self.workers)
+        ]
+
+    async def _worker(self) -> None:
+        while True:
+            event_pk = await self._queue.get()
+            try:
+                await self.process_event(event_pk)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Unexpected error processing webhook event {event_pk}: {str(e)}")
+            finally:
+                self._queued.discard(event_pk)
+                self._queue.task_done()
+
+    async def process_event(self, event_pk: uuid.UUID) -> Optional[str]:
+        """
+        Process one claimed event.
+
+        Returns:
+            The metrics outcome, or None if another worker owns the event or it
+            is already finished
+        """
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=PROCESSING_TIMEOUT_SECONDS)
+
+        async with self._session() as db:
+            result = await db.execute(
+                update(webhook_events)
+                .where(
+                    webhook_events.c.id == event_pk,
+                    or_(
+                        webhook_events.c.status == WebhookEventStatus.PENDING,
+                        and_(
+                            webhook_events.c.status == WebhookEventStatus.PROCESSING,
+                            webhook_events.c.updated_at < stale_before,
+                        ),
+                    ),
+                )
+                .values(
+                    status=WebhookEventStatus.PROCESSING,
+                    attempts=webhook_events.c.attempts + 1,
+                    updated_at=now,
+                )
+                .returning(
+                    webhook_events.c.provider,
+                    webhook_events.c.event_id,
+                    webhook_events.c.event_type,
+                    webhook_events.c.payload,
+                    webhook_events.c.attempts,
+                )
+            )
+            event = result.first()
+            await db.commit()
+            if event is None:
+                return None
+
+            provider = event.provider
+            handler = self.handlers.get(provider)
+            try:
+                if handler is None:
+                    raise ValueError(f"No webhook handler registered for provider {provider}")
+                with WebhookMetrics.track_processing_time(provider):
+                    outcome = await handler(
+                        PaymentService(db), event.event_id, event.event_type, json.loads(event.payload or "{}")
+                    )
+                    await db.execute(
+                        update(webhook_events)
+                        .where(webhook_events.c.id == event_pk)
+                        .values(
+                            status=WebhookEventStatus.PROCESSED,
+                            processed_at=datetime.utcnow(),
+                            updated_at=datetime.utcnow(),
+                            last_error=None,
+                        )
+                    )
+                    # Payment transition and processed marker commit together
+                    await db.commit()
+            except Exception as e:
+                await db.rollback()
+                gave_up = event.attempts >= self.max_attempts
+                await db.execute(
+                    update(webhook_events)
+                    .where(webhook_events.c.id == event_pk)
+                    .values(
+                        status=WebhookEventStatus.FAILED if gave_up else WebhookEventStatus.PENDING,
+                        last_error=str(e)[:2000],
+                        updated_at=datetime.utcnow(),
+                    )
+                )
+                await db.commit()
+                logger.error(
+                    f"Error processing {provider} webhook {event.event_id} "
+                    f"(attempt {event.attempts}/{self.max_attempts}): {str(e)}"
+                )
+                outcome = "failed" if gave_up else "error"
+
+        WebhookMetrics.record_processed(provider, outcome)
+        return outcome
+
+    async def sweep(self) -> int:
+        """
+        Re-queue stuck events and refresh queue metrics.
+
+        Returns:
+            Number of events re-queued
+        """
+        now = datetime.utcnow()
+        providers = list(self.handlers)
+        unfinished = (WebhookEventStatus.PENDING, WebhookEventStatus.PROCESSING)
+
+        async with self._session() as db:
+            stuck = await db.execute(
+                select(webhook_events.c.id)
+                .where(
+                    webhook_events.c.provider.in_(providers),
+                    or_(
+                        and_(
+                            webhook_events.c.status == WebhookEventStatus.PENDING,
+                            webhook_events.c.updated_at < now - timedelta(seconds=PENDING_GRACE_SECONDS),
+                        ),
+                        and_(
+                            webhook_events.c.status == WebhookEventStatus.PROCESSING,
+                            webhook_events.c.updated_at < now - timedelta(seconds=PROCESSING_TIMEOUT_SECONDS),
+                        ),
+                    ),
+                )
+                .order_by(webhook_events.c.updated_at)
+                .limit(SWEEP_BATCH_SIZE)
+            )
+            stuck_ids = list(stuck.scalars().all())
+
+            backlog = await db.execute(
+                select(webhook_events.c.provider, func.count(), func.min(webhook_events.c.received_at))
+                .where(webhook_events.c.provider.in_(providers), webhook_events.c.status.in_(unfinished))
+                .group_by(webhook_events.c.provider)
+            )
+            depth = {provider: (count, oldest) for provider, count, oldest in backlog.all()}
+
+        for provider in providers:
+            count, oldest = depth.get(provider, (0, None))
+            age = (now - oldest).total_seconds() if oldest else 0.0
+            WebhookMetrics.update_queue_metrics(provider, count, age)
+
+        for event_pk in stuck_ids:
+            self.enqueue(event_pk)
+        if stuck_ids:
+            logger.info(f"Reconciliation sweep re-queued {len(stuck_ids)} webhook events")
+        return len(stuck_ids)
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Webhook reconciliation sweep failed: {str(e)}")
+            await asyncio.sleep(self.sweep_interval)
+
+    def start(self) -> None:
+        """Start workers and the reconciliation sweep (idempotent)."""
+        self._ensure_workers()
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_loop(), name="payment-webhook-sweep")
+
+    async def stop(self, drain_timeout: float = 10.0) -> None:
+        """Let queued events finish for up to ``drain_timeout`` seconds, then stop."""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            # Left pending in the database; the next sweep picks them up
+            logger.warning(f"Stopping webhook engine with {self._queue.qsize()} events queued")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queued.clear()
+
+
+# Global engine instance
+payment_webhook_engine = PaymentWebhookEngine()
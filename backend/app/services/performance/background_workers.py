@@ -15,48 +15,22 @@ import asyncio
 import uuid
 import logging
 from typing import Dict, Any, List, Optional, Callable
-from datetime import datetime, timedelta
-from dataclasses import dataclass
-from enum import Enum
-import json
+from datetime import datetime, timedelta, timezone
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-logger = logging.getLogger(__name__)
+from app.services.performance.task_scheduler import (
+    BackgroundTask,
+    RedisTaskStore,
+    TaskPriority,
+    TaskScheduler,
+    TaskStatus,
+)
 
+logger = logging.getLogger(__name__)
 
-class TaskStatus(str, Enum):
-    """Background task execution status."""
-    PENDING = "pending"
-    RUNNING = "running"
-    COMPLETED = "completed"
-    FAILED = "failed"
-    CANCELLED = "cancelled"
-
-
-class TaskPriority(str, Enum):
-    """Background task priority levels."""
-    LOW = "low"
-    NORMAL = "normal"
-    HIGH = "high"
-    URGENT = "urgent"
-
-
-@dataclass
-class BackgroundTask:
-    """Background optimization task definition."""
-    task_id: str
-    tenant_id: str
-    task_type: str
-    priority: TaskPriority
-    scheduled_time: datetime
-    status: TaskStatus
-    parameters: Dict[str, Any]
-    created_at: datetime
-    started_at: Optional[datetime] = None
-    completed_at: Optional[datetime] = None
-    result: Optional[Dict[str, Any]] = None
-    error_message: Optional[str] = None
+# Redis hash holding queued optimization tasks across restarts
+TASK_STORE_KEY = "performance:optimization_tasks"
 
 
 class OptimizationWorkers:
@@ -71,19 +45,36 @@ class OptimizationWorkers:
     - Cleanup and maintenance operations
     """
 
-    def __init__(self, db: AsyncSession):
+    def __init__(
+        self,
+        db: Optional[AsyncSession] = None,
+        cache_manager=None,
+        query_optimizer=None,
+        metrics_collector=None,
+        persist_tasks: bool = True,
+    ):
         self.db = db
-
-        # Task management
-        self.task_queue: List[BackgroundTask] = []
-        self.running_tasks: Dict[str, BackgroundTask] = {}
-        self.task_history: Dict[str, List[BackgroundTask]] = {}
+        self.cache_manager = cache_manager
+        self.query_optimizer = query_optimizer
+        self.metrics_collector = metrics_collector
 
         # Worker configuration
         self.max_concurrent_tasks = 5
+        self.max_tasks_per_tenant = 2
         self.task_timeout_seconds = 3600  # 1 hour
         self.cleanup_interval_hours = 24
 
+        # Task management
+        self.scheduler = TaskScheduler(
+            self._execute_task,
+            max_concurrent=self.max_concurrent_tasks,
+            max_per_tenant=self.max_tasks_per_tenant,
+            store=RedisTaskStore(TASK_STORE_KEY) if persist_tasks else None,
+        )
+        self.running_tasks: Dict[str, BackgroundTask] = {}
+        self.task_history: Dict[str, List[BackgroundTask]] = {}
+        self._cleanup_task: Optional[asyncio.Task] = None
+
         # Performance optimization schedules
         self.optimization_schedules = {
             "cache_warming": {"interval_hours": 6, "priority": TaskPriority.NORMAL},
@@ -122,11 +113,11 @@ class OptimizationWorkers:
         self.is_running = True
         logger.info("Starting background optimization workers")
 
-        # Start the main worker loop
-        asyncio.create_task(self._worker_loop())
+        # Start dispatching, including tasks queued before a restart
+        await self.scheduler.start()
 
         # Start the cleanup worker
-        asyncio.create_task(self._cleanup_worker())
+        self._cleanup_task = asyncio.create_task(self._cleanup_worker())
 
         logger.info("Background optimization workers started successfully")
 
@@ -138,13 +129,21 @@ class OptimizationWorkers:
         self.is_running = False
         logger.info("Stopping background optimization workers")
 
-        # Cancel running tasks
+        # Cancel running tasks; persisted ones run again after a restart
         for task in self.running_tasks.values():
             task.status = TaskStatus.CANCELLED
+        await self.scheduler.stop()
+        if self._cleanup_task:
+            self._cleanup_task.cancel()
+            self._cleanup_task = None
 
         self.running_tasks.clear()
         logger.info("Background optimization workers stopped")
 
+    # Lifecycle names used by PerformanceOrchestrator
+    start = start_workers
+    stop = stop_workers
+
     async def schedule_optimization(
         self,
         tenant_id: uuid.UUID,
@@ -168,6 +167,9 @@ class OptimizationWorkers:
 
         if scheduled_time is None:
             scheduled_time = datetime.utcnow()
+        elif scheduled_time.tzinfo is not None:
+            # The scheduler works in naive UTC like the rest of this module
+            scheduled_time = scheduled_time.astimezone(timezone.utc).replace(tzinfo=None)
 
         # Determine priority based on optimization level
         priority_map = {
@@ -192,76 +194,19 @@ class OptimizationWorkers:
             created_at=datetime.utcnow()
         )
 
-        # Add to task queue in priority order
-        self._insert_task_by_priority(task)
+        # O(log n); wakes the dispatcher if the task is due earlier than anything queued
+        await self.scheduler.submit(task)
 
         logger.info(
             f"Scheduled {task_type} optimization for tenant {tenant_id} at {scheduled_time}")
         return task_id
 
-    def _insert_task_by_priority(self, task: BackgroundTask) -> None:
-        """Insert task into queue based on priority and scheduled time."""
-        priority_order = [TaskPriority.URGENT, TaskPriority.HIGH,
-                          TaskPriority.NORMAL, TaskPriority.LOW]
-
-        # Find insertion point
-        insert_index = len(self.task_queue)
-        for i, queued_task in enumerate(self.task_queue):
-            task_priority_index = priority_order.index(task.priority)
-            queued_priority_index = priority_order.index(queued_task.priority)
-
-            if (task_priority_index < queued_priority_index or
-                    (task_priority_index == queued_priority_index and task.scheduled_time < queued_task.scheduled_time)):
-                insert_index = i
-                break
-
-        self.task_queue.insert(insert_index, task)
-
-    async def _worker_loop(self) -> None:
-        """Main worker loop that processes optimization tasks."""
-        while self.is_running:
-            try:
-                # Check for tasks ready to execute
-                await self._process_ready_tasks()
-
-                # Clean up completed tasks
-                await self._cleanup_completed_tasks()
-
-                # Update worker stats
-                self.worker_stats["last_activity"] = datetime.utcnow()
-
-                # Sleep before next iteration
-                await asyncio.sleep(30)  # Check every 30 seconds
-
-            except Exception as e:
-                logger.error(f"Error in worker loop: {e}")
-                await asyncio.sleep(60)  # Longer sleep on error
-
-    async def _process_ready_tasks(self) -> None:
-        """Process tasks that are ready to execute."""
-        if len(self.running_tasks) >= self.max_concurrent_tasks:
-            return
-
-        current_time = datetime.utcnow()
-
-        # Find tasks ready to execute
-        ready_tasks = []
-        for task in self.task_queue[:]:
-            if (task.scheduled_time <= current_time and
-                task.status == TaskStatus.PENDING and
-                    len(ready_tasks) + len(self.running_tasks) < self.max_concurrent_tasks):
-                ready_tasks.append(task)
-                self.task_queue.remove(task)
-
-        # Execute ready tasks
-        for task in ready_tasks:
-            asyncio.create_task(self._execute_task(task))
-
     async def _execute_task(self, task: BackgroundTask) -> None:
         """Execute a single optimization task."""
         task.status = TaskStatus.RUNNING
         task.started_at = datetime.utcnow()
         self.running_tasks[task.task_id] = task
+        self.worker_stats["last_activity"] = task.started_at
 
         try:
             logger.info(
@@ -473,9 +418,9 @@ class OptimizationWorkers:
             return self._task_to_dict(task)
 
         # Check task queue
-        for task in self.task_queue:
-            if task.task_id == task_id:
-                return self._task_to_dict(task)
+        task = self.scheduler.get(task_id)
+        if task:
+            return self._task_to_dict(task)
 
         # Check task history
         for tenant_tasks in self.task_history.values():
@@ -496,7 +441,7 @@ class OptimizationWorkers:
                 tasks.append(self._task_to_dict(task))
 
         # Queued tasks
-        for task in self.task_queue:
+        for task in self.scheduler.queued_tasks():
             if task.tenant_id == tenant_key:
                 tasks.append(self._task_to_dict(task))
 
@@ -509,22 +454,18 @@ class OptimizationWorkers:
 
     async def get_worker_stats(self) -> Dict[str, Any]:
         """Get background worker statistics."""
+        scheduler_stats = self.scheduler.stats()
         return {
             "is_running": self.is_running,
-            "tasks_in_queue": len(self.task_queue),
+            "tasks_in_queue": scheduler_stats["queued"],
             "running_tasks": len(self.running_tasks),
             "max_concurrent_tasks": self.max_concurrent_tasks,
+            "max_tasks_per_tenant": self.max_tasks_per_tenant,
             "stats": self.worker_stats.copy(),
-            "queue_by_priority": self._get_queue_stats_by_priority()
+            "queue_by_priority": scheduler_stats["queue_by_priority"],
+            "tenants_at_capacity": scheduler_stats["tenants_at_cap"],
         }
 
-    def _get_queue_stats_by_priority(self) -> Dict[str, int]:
-        """Get task queue statistics by priority."""
-        stats = {priority.value: 0 for priority in TaskPriority}
-        for task in self.task_queue:
-            stats[task.priority.value] += 1
-        return stats
-
     def _task_to_dict(self, task: BackgroundTask) -> Dict[str, Any]:
         """Convert BackgroundTask to dictionary representation."""
         return {
@@ -12,7 +12,6 @@ Business Context:
 """
 
 import asyncio
-import json
 import time
 import uuid
 import logging
@@ -26,6 +25,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_
 from sqlalchemy.orm import selectinload, joinedload
 
+from app.core.cache.codec import CacheCodec, cache_codec
 from app.core.config.settings import get_settings
 from app.models.tenant import Tenant
 from app.models.product import Product
@@ -34,6 +34,9 @@ from app.models.order import Order
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Cache types configured without compression still use the binary codec
+_uncompressed_codec = CacheCodec(serializer=cache_codec.serializer, compress_threshold=None)
+
 
 class CacheStrategy(str, Enum):
     """Cache strategies for different data types."""
@@ -74,10 +77,9 @@ class MerchantCacheManager:
         """Initialize Redis connection and cache configurations."""
         try:
             # Initialize Redis connection
+            # Values are binary codec payloads, so responses stay as bytes
             self.redis_client = redis.Redis.from_url(
                 settings.REDIS_URL,
-                encoding="utf-8",
-                decode_responses=True,
                 max_connections=20
             )
             await self.redis_client.ping()
@@ -297,7 +299,7 @@ class MerchantCacheManager:
             if self.redis_client:
                 data = await self.redis_client.get(key)
                 if data:
-                    return json.loads(data)
+                    return cache_codec.decode(data)
             return None
         except Exception as e:
             logger.error(f"Error getting from cache: {e}")
@@ -307,12 +309,8 @@ class MerchantCacheManager:
         """Set data in Redis cache with configuration."""
         try:
             if self.redis_client:
-                serialized_data = json.dumps(data, default=str)
-
-                if config.compression:
-                    import gzip
-                    serialized_data = gzip.compress(serialized_data.encode())
-
+                codec = cache_codec if config.compression else _uncompressed_codec
+                serialized_data = codec.encode(data)
                 await self.redis_client.setex(key, config.ttl, serialized_data)
         except Exception as e:
             logger.error(f"Error setting cache: {e}")
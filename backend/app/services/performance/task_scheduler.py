@@ -0,0 +1,360 @@
+"""
+Bounded async task scheduler for background optimization work.
+
+Tasks wait in a delay heap keyed by scheduled time until they are due, then
+move to a ready heap keyed by (priority, fair share tag, scheduled time).
+The dispatcher sleeps until the next task is due or new work arrives; it
+never polls. Every queue operation is O(log n).
+
+Fairness: each tenant's ready tasks get increasing share tags, so at equal
+priority tenants are served round-robin instead of first-come-first-served,
+and no tenant can run more than max_per_tenant tasks at once. A tenant's
+tasks that are ready while it is at its cap wait in a per-tenant heap and
+go back to the ready heap as its running tasks finish.
+
+Provides:
+- TaskStatus, TaskPriority, BackgroundTask: task definitions
+- TaskScheduler: the scheduler
+- RedisTaskStore: optional persistence so queued tasks survive restarts
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.core.cache.redis_cache import redis_cache
+
+logger = logging.getLogger(__name__)
+
+background_task_queue_latency = Histogram(
+    "background_task_queue_latency_seconds",
+    "Time a background task waited between becoming due and starting",
+    ["priority"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, 120.0, 600.0),
+)
+background_task_queue_depth = Gauge(
+    "background_task_queue_depth",
+    "Background tasks waiting in the scheduler",
+    ["scheduler"],
+)
+background_tasks = Counter(
+    "background_tasks_total",
+    "Background tasks handled by the scheduler",
+    ["scheduler", "event"],  # event: scheduled, restored, started, finished, cancelled
+)
+
+
+class TaskStatus(str, Enum):
+    """Background task execution status."""
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class TaskPriority(str, Enum):
+    """Background task priority levels."""
+    LOW = "low"
+    NORMAL = "normal"
+    HIGH = "high"
+    URGENT = "urgent"
+
+
+# Lower rank runs first
+PRIORITY_RANK = {
+    TaskPriority.URGENT: 0,
+    TaskPriority.HIGH: 1,
+    TaskPriority.NORMAL: 2,
+    TaskPriority.LOW: 3,
+}
+
+
+@dataclass
+class BackgroundTask:
+    """Background optimization task definition."""
+    task_id: str
+    tenant_id: str
+    task_type: str
+    priority: TaskPriority
+    scheduled_time: datetime
+    status: TaskStatus
+    parameters: Dict[str, Any]
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    result: Optional[Dict[str, Any]] = None
+    error_message: Optional[str] = None
+
+    def to_record(self) -> Dict[str, Any]:
+        """Serializable form of a queued task."""
+        return {
+            "task_id": self.task_id,
+            "tenant_id": self.tenant_id,
+            "task_type": self.task_type,
+            "priority": self.priority.value,
+            "scheduled_time": self.scheduled_time.isoformat(),
+            "parameters": self.parameters,
+            "created_at": self.created_at.isoformat(),
+        }
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "BackgroundTask":
+        return cls(
+            task_id=record["task_id"],
+            tenant_id=record["tenant_id"],
+            task_type=record["task_type"],
+            priority=TaskPriority(record["priority"]),
+            scheduled_time=datetime.fromisoformat(record["scheduled_time"]),
+            status=TaskStatus.PENDING,
+            parameters=record.get("parameters") or {},
+            created_at=datetime.fromisoformat(record["created_at"]),
+        )
+
+
+class RedisTaskStore:
+    """
+    Keeps queued and running tasks in a Redis hash until they finish.
+
+    Tasks that were queued or running when the process stopped are restored
+    by the next TaskScheduler.start(), so delivery is at-least-once.
+    """
+
+    def __init__(self, key: str, cache=redis_cache):
+        self.key = key
+        self.cache = cache
+
+    async def save(self, task: BackgroundTask) -> None:
+        await self.cache.hset(self.key, task.task_id, task.to_record())
+
+    async def delete(self, task_id: str) -> None:
+        await self.cache.hdel(self.key, task_id)
+
+    async def load(self) -> List[BackgroundTask]:
+        tasks = []
+        for task_id, record in (await self.cache.hgetall(self.key)).items():
+            try:
+                tasks.append(BackgroundTask.from_record(record))
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning(f"Dropping unreadable stored task {task_id}: {e}")
+                await self.delete(task_id)
+        return tasks
+
+
+# Ready heap entry: (priority rank, share tag, scheduled time, sequence, task id)
+ReadyEntry = Tuple[int, int, datetime, int, str]
+
+
+class TaskScheduler:
+    """
+    Priority scheduler with delayed tasks, per-tenant caps and fair sharing.
+
+    The runner coroutine is called once per task; the scheduler only tracks
+    queueing, not results.
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[BackgroundTask], Awaitable[Any]],
+        max_concurrent: int = 5,
+        max_per_tenant: int = 2,
+        store: Optional[RedisTaskStore] = None,
+        name: str = "optimization",
+    ):
+        self.runner = runner
+        self.max_concurrent = max_concurrent
+        self.max_per_tenant = max_per_tenant
+        self.store = store
+        self.name = name
+
+        # Queued tasks by id; heap entries whose id is gone were cancelled
+        self._queued: Dict[str, BackgroundTask] = {}
+        self._delayed: List[Tuple[datetime, int, str]] = []
+        self._ready: List[ReadyEntry] = []
+        self._parked: Dict[str, List[ReadyEntry]] = defaultdict(list)
+        self._sequence = itertools.count()
+
+        # Start-time fair queuing: a tenant's next tag continues from its
+        # last one, or from the tag being served if it has been idle
+        self._share_tags: Dict[str, int] = {}
+        self._virtual_tag = 0
+
+        self._running: Dict[str, asyncio.Task] = {}
+        self._running_per_tenant: Dict[str, int] = defaultdict(int)
+        self._wakeup = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._queued)
+
+    @property
+    def running_count(self) -> int:
+        return len(self._running)
+
+    def get(self, task_id: str) -> Optional[BackgroundTask]:
+        return self._queued.get(task_id)
+
+    def queued_tasks(self) -> Iterator[BackgroundTask]:
+        return iter(list(self._queued.values()))
+
+    async def start(self) -> None:
+        """Restore persisted tasks and start dispatching."""
+        if self._dispatcher is not None:
+            return
+        if self.store is not None:
+            restored = await self.store.load()
+            for task in restored:
+                self._enqueue(task)
+            if restored:
+                background_tasks.labels(self.name, "restored").inc(len(restored))
+                logger.info(f"Restored {len(restored)} queued {self.name} tasks")
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    async def stop(self) -> None:
+        """
+        Stop dispatching and cancel running tasks.
+
+        Queued and interrupted tasks stay in the store and run after the next
+        start().
+        """
+        if self._dispatcher is None:
+            return
+        self._dispatcher.cancel()
+        running = list(self._running.values())
+        for task in running:
+            task.cancel()
+        await asyncio.gather(self._dispatcher, *running, return_exceptions=True)
+        self._dispatcher = None
+
+    async def submit(self, task: BackgroundTask) -> None:
+        """Queue a task to run at its scheduled time."""
+        if self.store is not None:
+            await self.store.save(task)
+        self._enqueue(task)
+        background_tasks.labels(self.name, "scheduled").inc()
+
+    async def cancel(self, task_id: str) -> bool:
+        """Remove a queued task. Running tasks are not interrupted."""
+        task = self._queued.pop(task_id, None)
+        if task is None:
+            return False
+        task.status = TaskStatus.CANCELLED
+        if self.store is not None:
+            await self.store.delete(task_id)
+        background_tasks.labels(self.name, "cancelled").inc()
+        background_task_queue_depth.labels(self.name).set(len(self._queued))
+        return True
+
+    def _enqueue(self, task: BackgroundTask) -> None:
+        self._queued[task.task_id] = task
+        heapq.heappush(self._delayed, (task.scheduled_time, next(self._sequence), task.task_id))
+        background_task_queue_depth.labels(self.name).set(len(self._queued))
+        self._wakeup.set()
+
+    def _promote_due(self, now: datetime) -> None:
+        while self._delayed and self._delayed[0][0] <= now:
+            scheduled_time, sequence, task_id = heapq.heappop(self._delayed)
+            task = self._queued.get(task_id)
+            if task is None:
+                continue
+            tag = max(self._virtual_tag, self._share_tags.get(task.tenant_id, 0)) + 1
+            self._share_tags[task.tenant_id] = tag
+            heapq.heappush(
+                self._ready, (PRIORITY_RANK[task.priority], tag, scheduled_time, sequence, task_id)
+            )
+
+    def _dispatch_ready(self, now: datetime) -> None:
+        while self._ready and len(self._running) < self.max_concurrent:
+            entry = heapq.heappop(self._ready)
+            task = self._queued.get(entry[-1])
+            if task is None:
+                continue
+            if self._running_per_tenant[task.tenant_id] >= self.max_per_tenant:
+                heapq.heappush(self._parked[task.tenant_id], entry)
+                continue
+            self._virtual_tag = max(self._virtual_tag, entry[1])
+            self._start(task, now)
+
+    def _start(self, task: BackgroundTask, now: datetime) -> None:
+        del self._queued[task.task_id]
+        self._running_per_tenant[task.tenant_id] += 1
+        background_task_queue_latency.labels(task.priority.value).observe(
+            max(0.0, (now - task.scheduled_time).total_seconds())
+        )
+        background_tasks.labels(self.name, "started").inc()
+        background_task_queue_depth.labels(self.name).set(len(self._queued))
+        self._running[task.task_id] = asyncio.create_task(self._run(task))
+
+    async def _run(self, task: BackgroundTask) -> None:
+        interrupted = False
+        try:
+            await self.runner(task)
+        except asyncio.CancelledError:
+            interrupted = True
+            raise
+        except Exception as e:
+            logger.error(f"{self.name} task {task.task_id} raised: {e}")
+        finally:
+            self._finish(task)
+            if self.store is not None and not interrupted:
+                await self.store.delete(task.task_id)
+
+    def _finish(self, task: BackgroundTask) -> None:
+        self._running.pop(task.task_id, None)
+        tenant_id = task.tenant_id
+        self._running_per_tenant[tenant_id] -= 1
+        if self._running_per_tenant[tenant_id] <= 0:
+            del self._running_per_tenant[tenant_id]
+        parked = self._parked.get(tenant_id)
+        if parked is not None:
+            # Skip entries of tasks cancelled while parked; they would never start
+            while parked:
+                entry = heapq.heappop(parked)
+                if entry[-1] in self._queued:
+                    heapq.heappush(self._ready, entry)
+                    break
+            if not parked:
+                del self._parked[tenant_id]
+        if tenant_id not in self._running_per_tenant and tenant_id not in self._parked:
+            # Idle tenants restart from the current virtual tag anyway
+            if self._share_tags.get(tenant_id, 0) <= self._virtual_tag:
+                self._share_tags.pop(tenant_id, None)
+        background_tasks.labels(self.name, "finished").inc()
+        self._wakeup.set()
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            self._wakeup.clear()
+            now = datetime.utcnow()
+            self._promote_due(now)
+            self._dispatch_ready(now)
+
+            timeout = None
+            if self._delayed:
+                timeout = max(0.0, (self._delayed[0][0] - datetime.utcnow()).total_seconds())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        by_priority = {priority.value: 0 for priority in TaskPriority}
+        for task in self._queued.values():
+            by_priority[task.priority.value] += 1
+        return {
+            "queued": len(self._queued),
+            "ready": len(self._ready) + sum(len(parked) for parked in self._parked.values()),
+            "running": len(self._running),
+            "tenants_at_cap": sum(
+                1 for count in self._running_per_tenant.values() if count >= self.max_per_tenant
+            ),
+            "queue_by_priority": by_priority,
+        }
@@ -3,10 +3,11 @@ from typing import Any, Dict, List, Optional, Tuple
 from uuid import UUID
 
 from fastapi import Request
-from sqlalchemy import and_, desc, or_, update
+from sqlalchemy import and_, desc, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.core.cache.redis_cache import invalidate_product_cache
 from app.core.exceptions import (
     DatabaseError,
     ProductNotFoundError,
@@ -25,6 +26,20 @@ class ConcurrentModificationError(AppError):
     # Extend with context attributes as needed
 
 
+async def invalidate_storefront_cache(*tenant_ids: Any) -> None:
+    """
+    Drop cached storefront product and collection responses.
+
+    Collections are derived from products, so every product write clears
+    both prefixes for the tenants it touched.
+
+    Args:
+        tenant_ids: Tenants whose cached catalog is stale
+    """
+    for tenant_id in {str(tenant_id) for tenant_id in tenant_ids if tenant_id}:
+        await invalidate_product_cache(tenant_id)
+
+
 async def create_product(
     db: AsyncSession, product_in: ProductCreate, request: Request = None
 ) -> ProductModel:
@@ -96,7 +111,8 @@ async def create_product(
             await db.flush()
             await db.refresh(product)
             logger.debug(f"Product created successfully: {product.id}")
-            return product
+        await invalidate_storefront_cache(product.tenant_id)
+        return product
     except Exception as e:
         await db.rollback()
         logger.error(f"Error in create_product: {type(e).__name__}: {e}")
@@ -326,6 +342,7 @@ async def update_product(
                 f"Product with ID {product_id} was modified concurrently"
             )
         await db.refresh(product)
+        await invalidate_storefront_cache(product.tenant_id)
         return product
     except (
         ProductNotFoundError,
@@ -365,14 +382,15 @@ async def batch_update_products(
     try:
         # First, verify the seller has permission to update all products
         authorized_products = await db.execute(
-            select(ProductModel.id).filter(
+            select(ProductModel.id, ProductModel.tenant_id).filter(
                 ProductModel.id.in_(product_ids),
                 ProductModel.seller_id == seller_id,
                 not ProductModel.is_deleted,
             )
         )
 
-        authorized_ids = [str(p.id) for p in authorized_products.scalars()]
+        authorized = authorized_products.all()
+        authorized_ids = [str(p.id) for p in authorized]
         unauthorized_ids = [
             str(pid) for pid in product_ids if str(pid) not in authorized_ids
         ]
@@ -400,6 +418,7 @@ async def batch_update_products(
         )
 
         await db.commit()
+        await invalidate_storefront_cache(*(p.tenant_id for p in authorized))
         return result.rowcount
 
     except ProductPermissionError:
@@ -442,6 +461,7 @@ async def delete_product(db: AsyncSession, product_id: UUID, seller_id: UUID) ->
         product.is_deleted = True
         product.updated_at = datetime.now(timezone.utc)
         await db.commit()
+        await invalidate_storefront_cache(product.tenant_id)
     except (ProductNotFoundError, ProductPermissionError):
         await db.rollback()
         raise
@@ -490,6 +510,7 @@ async def restore_product(
         product.updated_at = datetime.now(timezone.utc)
         await db.commit()
         await db.refresh(product)
+        await invalidate_storefront_cache(product.tenant_id)
         return product
     except (ProductNotFoundError, ProductPermissionError):
         await db.rollback()
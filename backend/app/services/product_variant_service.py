@@ -6,6 +6,7 @@ from sqlalchemy.future import select
 from sqlalchemy import func
 
 from app.models.product import Product
+from app.services.product_service import invalidate_storefront_cache
 from app.models.product_variant import ProductVariant, VariantOption, VariantOptionValue
 from app.schemas.product_variant import (
     ProductVariantCreate,
@@ -416,6 +417,7 @@ class ProductVariantService:
         
         await db.commit()
         await db.refresh(variant)
+        await invalidate_storefront_cache(variant.tenant_id)
         
         return variant
     
@@ -525,6 +527,7 @@ class ProductVariantService:
         
         await db.commit()
         await db.refresh(variant)
+        await invalidate_storefront_cache(variant.tenant_id)
         
         return variant
     
@@ -551,5 +554,6 @@ class ProductVariantService:
         # Delete the variant
         await db.delete(variant)
         await db.commit()
+        await invalidate_storefront_cache(variant.tenant_id)
         
         return True
@@ -0,0 +1,219 @@
+"""
+Cached global IP allowlist decisions.
+
+Active global allowlist entries are compiled into an immutable, versioned
+set of address ranges held by every worker, so the admin IP gate decides
+without opening a database session.
+
+Provides:
+- Range lookup by bisection over collapsed IPv4/IPv6 networks
+- A per-client-IP decision LRU that lives and dies with its snapshot
+- Reloads when the earliest entry expires, on a change notification over
+  Redis, or when the shared version stamp moves
+- Explicit bypass hosts and networks that never reach the allowlist
+"""
+
+import bisect
+import ipaddress
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache.redis_cache import redis_cache
+from app.core.cache.versioned_snapshot import MAX_SNAPSHOT_AGE, VERSION_CHECK_INTERVAL, VersionedSnapshotCache
+from app.models.security.ip_allowlist import IPAllowlistEntry
+
+logger = logging.getLogger(__name__)
+
+IP_ALLOWLIST_VERSION_KEY = "ip_allowlist:version"
+IP_ALLOWLIST_CHANNEL = "ip_allowlist:changes"
+# Client IPs whose decision is remembered per snapshot
+DECISION_CACHE_SIZE = 4096
+
+
+def _compile(networks: Iterable[ipaddress._BaseNetwork]) -> Dict[int, Tuple[List[int], List[int]]]:
+    """Collapse networks into sorted, disjoint (first, last) ranges per IP version."""
+    by_version: Dict[int, list] = {4: [], 6: []}
+    for network in networks:
+        by_version[network.version].append(network)
+
+    ranges = {}
+    for version, members in by_version.items():
+        collapsed = sorted(ipaddress.collapse_addresses(members))
+        ranges[version] = (
+            [int(network.network_address) for network in collapsed],
+            [int(network.broadcast_address) for network in collapsed],
+        )
+    return ranges
+
+
+class AllowlistSnapshot:
+    """Immutable compiled view of the active global allowlist entries"""
+
+    def __init__(
+        self,
+        version: Optional[int],
+        ip_ranges: Iterable[str],
+        expires_at: Optional[datetime] = None,
+        cache_size: int = DECISION_CACHE_SIZE,
+    ):
+        self.version = version
+        # Earliest expiry among the loaded entries; the snapshot is stale after it
+        self.expires_at = expires_at
+        self.cache_size = cache_size
+        networks = []
+        for ip_range in ip_ranges:
+            try:
+                networks.append(ipaddress.ip_network(str(ip_range), strict=False))
+            except ValueError:
+                logger.warning(f"Skipping invalid global allowlist range: {ip_range!r}")
+        self.size = len(networks)
+        self._ranges = _compile(networks)
+        self._decisions: "OrderedDict[str, bool]" = OrderedDict()
+
+    def expired(self, now: Optional[datetime] = None) -> bool:
+        if self.expires_at is None:
+            return False
+        return (now or datetime.now(timezone.utc)) >= self.expires_at
+
+    def _contains(self, client_ip: str) -> bool:
+        try:
+            address = ipaddress.ip_address(client_ip)
+        except ValueError:
+            return False
+        if address.version == 6 and address.ipv4_mapped is not None:
+            address = address.ipv4_mapped
+        firsts, lasts = self._ranges[address.version]
+        value = int(address)
+        index = bisect.bisect_right(firsts, value) - 1
+        return index >= 0 and value <= lasts[index]
+
+    def is_allowed(self, client_ip: str) -> bool:
+        """
+        Decide whether a client IP falls inside any global entry.
+
+        Args:
+            client_ip: Client address as reported by the server
+
+        Returns:
+            True if allowed; unparseable addresses are denied
+        """
+        decision = self._decisions.get(client_ip)
+        if decision is not None:
+            self._decisions.move_to_end(client_ip)
+            return decision
+
+        decision = self._contains(client_ip)
+        self._decisions[client_ip] = decision
+        if len(self._decisions) > self.cache_size:
+            self._decisions.popitem(last=False)
+        return decision
+
+
+class GlobalIPAllowlist(VersionedSnapshotCache[AllowlistSnapshot]):
+    """Process-wide holder of the allowlist snapshot and its change listener"""
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+        cache=redis_cache,
+        version_check_interval: float = VERSION_CHECK_INTERVAL,
+        max_snapshot_age: float = MAX_SNAPSHOT_AGE,
+        cache_size: int = DECISION_CACHE_SIZE,
+    ):
+        super().__init__(
+            IP_ALLOWLIST_VERSION_KEY,
+            channel=IP_ALLOWLIST_CHANNEL,
+            name="IP allowlist",
+            cache=cache,
+            version_check_interval=version_check_interval,
+            max_snapshot_age=max_snapshot_age,
+        )
+        self._session_factory = session_factory
+        self.cache_size = cache_size
+
+    def _session(self) -> AsyncSession:
+        if self._session_factory is None:
+            from app.db.async_session import get_async_session_local
+            self._session_factory = get_async_session_local()
+        return self._session_factory()
+
+    def _usable(self, snapshot: AllowlistSnapshot) -> bool:
+        return not snapshot.expired()
+
+    async def _reload(self, version: Optional[int]) -> AllowlistSnapshot:
+        try:
+            async with self._session() as db:
+                return await self.load(db, version)
+        except Exception as e:
+            if self._snapshot is None or self._snapshot.expired():
+                raise
+            logger.error(f"Global IP allowlist reload failed, keeping the previous snapshot: {str(e)}")
+            self._checked_at = time.monotonic()
+            return self._snapshot
+
+    async def snapshot(self) -> AllowlistSnapshot:
+        """
+        Get the current snapshot, loading it if it is cold, stale or expired.
+
+        A failed reload keeps serving the previous snapshot unless it is cold
+        or one of its entries has expired, in which case the error surfaces.
+
+        Returns:
+            The allowlist snapshot
+        """
+        return await self._current(self._reload)
+
+    async def load(self, db: AsyncSession, version: Optional[int] = None) -> AllowlistSnapshot:
+        """Load the active, unexpired global entries in one query."""
+        result = await db.execute(
+            select(IPAllowlistEntry.ip_range, IPAllowlistEntry.expires_at).where(
+                IPAllowlistEntry.is_global == True,
+                IPAllowlistEntry.is_active == True,
+                or_(
+                    IPAllowlistEntry.expires_at.is_(None),
+                    IPAllowlistEntry.expires_at > datetime.now(timezone.utc)
+                )
+            )
+        )
+        rows = result.all()
+        expiries = [expires_at for _, expires_at in rows if expires_at is not None]
+        snapshot = AllowlistSnapshot(
+            version,
+            [ip_range for ip_range, _ in rows],
+            expires_at=min(expiries) if expiries else None,
+            cache_size=self.cache_size,
+        )
+        logger.info(f"Loaded global IP allowlist snapshot: {snapshot.size} entries")
+        return snapshot
+
+    async def is_allowed(self, client_ip: str) -> bool:
+        """Check a client IP against the global allowlist."""
+        return (await self.snapshot()).is_allowed(client_ip)
+
+
+class BypassList:
+    """Hosts and networks that skip the global allowlist entirely"""
+
+    def __init__(self, entries: Iterable[str]):
+        self.hosts = set()
+        networks = []
+        for entry in entries:
+            try:
+                networks.append(ipaddress.ip_network(entry, strict=False))
+            except ValueError:
+                # Non-address client names such as the test client's "testclient"
+                self.hosts.add(entry)
+        self.networks = AllowlistSnapshot(None, [str(network) for network in networks])
+
+    def __contains__(self, client_ip: str) -> bool:
+        return client_ip in self.hosts or self.networks.is_allowed(client_ip)
+
+
+# Global IP allowlist instance
+global_ip_allowlist = GlobalIPAllowlist()
@@ -18,6 +18,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.security.ip_allowlist import IPAllowlistEntry, IPAllowlistSetting, IPTemporaryBypass
 from app.models.admin.admin_user import AdminUser
 from app.services.audit.audit_service import AuditService
+from app.services.security.ip_allowlist_cache import global_ip_allowlist
 
 
 class IPAllowlistService:
@@ -100,6 +101,8 @@ class IPAllowlistService:
 
         await db.commit()
         await db.refresh(entry)
+        if is_global:
+            await global_ip_allowlist.invalidate()
 
         # Determine the scope for audit logging
         scope = "global" if is_global else ""
@@ -165,6 +168,8 @@ class IPAllowlistService:
         # Delete the entry
         await db.delete(entry)
         await db.commit()
+        if entry_info["is_global"]:
+            await global_ip_allowlist.invalidate()
 
         # Log this action in the audit log
         await self.audit_service.log_event(
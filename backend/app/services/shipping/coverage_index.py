@@ -0,0 +1,220 @@
+"""
+Precomputed coverage index for seller-defined shipping providers.
+
+Each provider's ``coverage_area`` is compiled once into a shape that can be
+tested without re-parsing JSON:
+
+- circles keep their centre and radius and are tested for all providers of a
+  tenant in one vectorized Haversine pass
+- polygons keep a bounding box plus a latitude-slab edge index, so a
+  point-in-polygon test only visits the edges that cross the query latitude
+"""
+
+import math
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.services.shipping.geo import LatLng, haversine_km, haversine_many_km
+
+# Polygons with fewer edges than this are tested directly; the slab index
+# only pays off once there are enough edges to skip.
+SLAB_INDEX_MIN_EDGES = 16
+SLAB_EDGES_PER_BUCKET = 4
+
+Edge = Tuple[float, float, float, float]
+
+
+@dataclass
+class PolygonShape:
+    """A polygon ring with a bounding box and a latitude-slab edge index."""
+
+    vertices: Tuple[LatLng, ...]
+    min_lat: float
+    max_lat: float
+    min_lng: float
+    max_lng: float
+    slabs: List[List[Edge]] = field(default_factory=list)
+    slab_height: float = 0.0
+
+    @classmethod
+    def from_vertices(cls, vertices: Sequence[LatLng]) -> "PolygonShape":
+        ring = tuple((float(lat), float(lng)) for lat, lng in vertices)
+        if len(ring) > 1 and ring[0] == ring[-1]:
+            ring = ring[:-1]
+
+        lats = [point[0] for point in ring]
+        lngs = [point[1] for point in ring]
+        shape = cls(
+            vertices=ring,
+            min_lat=min(lats),
+            max_lat=max(lats),
+            min_lng=min(lngs),
+            max_lng=max(lngs),
+        )
+        shape._build_slabs()
+        return shape
+
+    def _edges(self) -> List[Edge]:
+        ring = self.vertices
+        return [
+            (ring[i - 1][0], ring[i - 1][1], ring[i][0], ring[i][1])
+            for i in range(len(ring))
+        ]
+
+    def _build_slabs(self) -> None:
+        edges = self._edges()
+        span = self.max_lat - self.min_lat
+        if len(edges) < SLAB_INDEX_MIN_EDGES or span <= 0:
+            self.slabs = [edges]
+            self.slab_height = 0.0
+            return
+
+        bucket_count = max(1, len(edges) // SLAB_EDGES_PER_BUCKET)
+        self.slab_height = span / bucket_count
+        self.slabs = [[] for _ in range(bucket_count)]
+        for edge in edges:
+            low = min(edge[0], edge[2])
+            high = max(edge[0], edge[2])
+            for bucket in range(self._slab_for(low), self._slab_for(high) + 1):
+                self.slabs[bucket].append(edge)
+
+    def _slab_for(self, lat: float) -> int:
+        if not self.slab_height:
+            return 0
+        bucket = int((lat - self.min_lat) / self.slab_height)
+        return min(max(bucket, 0), len(self.slabs) - 1)
+
+    def contains(self, lat: float, lng: float) -> bool:
+        """Ray-casting test restricted to the edges in the query's slab."""
+        if not (self.min_lat <= lat <= self.max_lat and self.min_lng <= lng <= self.max_lng):
+            return False
+
+        inside = False
+        for lat_a, lng_a, lat_b, lng_b in self.slabs[self._slab_for(lat)]:
+            if (lat_a > lat) != (lat_b > lat):
+                crossing_lng = lng_a + (lat - lat_a) * (lng_b - lng_a) / (lat_b - lat_a)
+                if lng == crossing_lng:
+                    return True
+                if lng < crossing_lng:
+                    inside = not inside
+            elif lat_a == lat == lat_b and min(lng_a, lng_b) <= lng <= max(lng_a, lng_b):
+                return True
+        return inside
+
+
+@dataclass
+class CompiledCoverage:
+    """Coverage area compiled from a provider's ``coverage_area`` JSON."""
+
+    kind: str  # "any", "circle" or "polygon"
+    center: Optional[LatLng] = None
+    radius_km: float = 0.0
+    polygon: Optional[PolygonShape] = None
+
+    def contains(self, lat: float, lng: float) -> bool:
+        if self.kind == "circle":
+            return haversine_km(self.center[0], self.center[1], lat, lng) <= self.radius_km
+        if self.kind == "polygon":
+            return self.polygon.contains(lat, lng)
+        return True
+
+
+UNRESTRICTED = CompiledCoverage(kind="any")
+
+
+def compile_coverage(coverage: Optional[Dict[str, Any]]) -> CompiledCoverage:
+    """
+    Compile a ``coverage_area`` JSON document.
+
+    Polygon coordinates are ``[lat, lng]`` pairs, matching what sellers
+    store today. Missing or malformed areas impose no restriction, which is
+    the behaviour providers had before the index existed.
+    """
+    if not coverage:
+        return UNRESTRICTED
+
+    kind = coverage.get("type")
+    if kind == "circle":
+        center_lat = coverage.get("center_lat")
+        center_lng = coverage.get("center_lng")
+        radius_km = coverage.get("radius_km")
+        if not all([center_lat, center_lng, radius_km]):
+            return UNRESTRICTED
+        return CompiledCoverage(
+            kind="circle",
+            center=(float(center_lat), float(center_lng)),
+            radius_km=float(radius_km),
+        )
+
+    if kind == "polygon":
+        coords = coverage.get("coordinates") or []
+        try:
+            points = [(float(point[0]), float(point[1])) for point in coords]
+        except (TypeError, ValueError, IndexError):
+            return UNRESTRICTED
+        if len(points) < 3:
+            return UNRESTRICTED
+        return CompiledCoverage(kind="polygon", polygon=PolygonShape.from_vertices(points))
+
+    return UNRESTRICTED
+
+
+@dataclass
+class ProviderProfile:
+    """Detached snapshot of the provider fields needed to price a quote."""
+
+    id: uuid.UUID
+    name: str
+    provider_type: str
+    base_fee: int
+    per_km_fee: int
+    min_distance: float
+    max_distance: float
+    coverage: CompiledCoverage
+    estimated_delivery_time: Optional[str] = None
+
+    @classmethod
+    def from_model(cls, provider: Any) -> "ProviderProfile":
+        return cls(
+            id=provider.id,
+            name=provider.name,
+            provider_type=provider.provider_type,
+            base_fee=provider.base_fee or 0,
+            per_km_fee=provider.per_km_fee or 0,
+            min_distance=provider.min_distance if provider.min_distance is not None else 0.0,
+            max_distance=provider.max_distance if provider.max_distance is not None else math.inf,
+            coverage=compile_coverage(provider.coverage_area),
+            estimated_delivery_time=provider.estimated_delivery_time,
+        )
+
+
+class TenantCoverageIndex:
+    """All active providers of one tenant, indexed for destination lookups."""
+
+    def __init__(self, profiles: Sequence[ProviderProfile]):
+        self.profiles = list(profiles)
+        self._circle_positions = [
+            i for i, profile in enumerate(self.profiles) if profile.coverage.kind == "circle"
+        ]
+        self._circle_lats = [self.profiles[i].coverage.center[0] for i in self._circle_positions]
+        self._circle_lngs = [self.profiles[i].coverage.center[1] for i in self._circle_positions]
+        self._circle_radii = [self.profiles[i].coverage.radius_km for i in self._circle_positions]
+
+    def __len__(self) -> int:
+        return len(self.profiles)
+
+    def covering(self, lat: float, lng: float) -> List[ProviderProfile]:
+        """Return the providers whose coverage area contains the point."""
+        covered = [True] * len(self.profiles)
+
+        if self._circle_positions:
+            distances = haversine_many_km(lat, lng, self._circle_lats, self._circle_lngs)
+            for position, distance, radius in zip(self._circle_positions, distances, self._circle_radii):
+                covered[position] = distance <= radius
+
+        for i, profile in enumerate(self.profiles):
+            if profile.coverage.kind == "polygon":
+                covered[i] = profile.coverage.contains(lat, lng)
+
+        return [profile for profile, ok in zip(self.profiles, covered) if ok]
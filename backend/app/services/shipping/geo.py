@@ -0,0 +1,124 @@
+"""
+Geometry helpers for shipping quotes.
+
+Provides:
+- Scalar and vectorized Haversine distances
+- Geohash cell encoding used to bucket quote cache keys
+"""
+
+import math
+from typing import List, Sequence, Tuple
+
+try:
+    import numpy as np
+    has_numpy = True
+except ImportError:
+    np = None
+    has_numpy = False
+
+EARTH_RADIUS_KM = 6371.0
+
+_GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+_GEOHASH_INDEX = {char: index for index, char in enumerate(_GEOHASH_ALPHABET)}
+
+LatLng = Tuple[float, float]
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two points in kilometres."""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def haversine_many_km(lat: float, lng: float, lats: Sequence[float], lngs: Sequence[float]) -> List[float]:
+    """
+    Distances from one point to many points in a single pass.
+
+    Uses numpy when it is installed; otherwise falls back to a tight Python
+    loop that hoists the per-call trigonometry out of the iteration.
+    """
+    if not lats:
+        return []
+
+    if has_numpy:
+        phi = math.radians(lat)
+        phis = np.radians(np.asarray(lats, dtype=np.float64))
+        dlmb = np.radians(np.asarray(lngs, dtype=np.float64) - lng)
+        a = np.sin((phis - phi) / 2) ** 2 + math.cos(phi) * np.cos(phis) * np.sin(dlmb / 2) ** 2
+        return (2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))).tolist()
+
+    phi = math.radians(lat)
+    cos_phi = math.cos(phi)
+    distances = []
+    for other_lat, other_lng in zip(lats, lngs):
+        other_phi = math.radians(other_lat)
+        a = (
+            math.sin((other_phi - phi) / 2) ** 2
+            + cos_phi * math.cos(other_phi) * math.sin(math.radians(other_lng - lng) / 2) ** 2
+        )
+        distances.append(2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a))))
+    return distances
+
+
+def geohash_encode(lat: float, lng: float, precision: int = 7) -> str:
+    """Encode a coordinate as a geohash cell id (precision 7 is roughly 150m)."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(chars) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if lng >= mid:
+                bits = (bits << 1) | 1
+                lng_range[0] = mid
+            else:
+                bits <<= 1
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if lat >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+
+        if bit_count == 5:
+            chars.append(_GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+
+def geohash_center(cell: str) -> LatLng:
+    """Return the centre coordinate of a geohash cell."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+
+    for char in cell:
+        value = _GEOHASH_INDEX[char]
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            target = lng_range if even else lat_range
+            mid = (target[0] + target[1]) / 2
+            if bit:
+                target[0] = mid
+            else:
+                target[1] = mid
+            even = not even
+
+    return (lat_range[0] + lat_range[1]) / 2, (lng_range[0] + lng_range[1]) / 2
+
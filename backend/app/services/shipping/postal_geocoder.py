@@ -0,0 +1,108 @@
+"""
+Postal code geocoder backed by a local centroid dataset.
+
+The dataset is a CSV with ``country,postal_code,latitude,longitude`` columns
+(extra columns are ignored). A small seed file ships with the service; set
+``POSTAL_CENTROIDS_PATH`` to point at a full national dataset in production.
+"""
+
+import csv
+import logging
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from app.core.config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATASET_PATH = Path(__file__).parent / "data" / "postal_centroids.csv"
+
+
+def normalize_postal_code(postal_code: str) -> str:
+    """Normalize a postal code for lookup ("ga 100" -> "GA100")."""
+    return "".join(postal_code.split()).replace("-", "").upper()
+
+
+class PostalCodeGeocoder:
+    """
+    In-memory postal code to centroid lookup.
+
+    The table is loaded lazily on first use and kept for the life of the
+    process; lookups are plain dictionary reads.
+    """
+
+    def __init__(self, dataset_path: Optional[str] = None):
+        self.dataset_path = dataset_path
+        self._by_country: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        self._by_code: Dict[str, Tuple[float, float]] = {}
+        self._loaded = False
+
+    def _resolve_path(self) -> Path:
+        if self.dataset_path:
+            return Path(self.dataset_path)
+        configured = getattr(get_settings(), "POSTAL_CENTROIDS_PATH", "")
+        return Path(configured) if configured else DEFAULT_DATASET_PATH
+
+    def load(self) -> None:
+        """Load (or reload) the centroid table from disk."""
+        path = self._resolve_path()
+        by_country: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        by_code: Dict[str, Tuple[float, float]] = {}
+        ambiguous = set()
+
+        try:
+            with open(path, newline="", encoding="utf-8") as handle:
+                for row in csv.DictReader(handle):
+                    try:
+                        point = (float(row["latitude"]), float(row["longitude"]))
+                    except (KeyError, TypeError, ValueError):
+                        continue
+                    code = normalize_postal_code(row.get("postal_code") or "")
+                    if not code:
+                        continue
+                    country = (row.get("country") or "").strip().upper()
+                    by_country[(country, code)] = point
+                    if code in by_code and by_code[code] != point:
+                        ambiguous.add(code)
+                    by_code[code] = point
+        except OSError as e:
+            logger.error(f"Could not load postal centroid dataset {path}: {e}")
+
+        # A bare postal code shared by several countries cannot be resolved
+        # without the country, so only keep unambiguous bare-code entries.
+        for code in ambiguous:
+            by_code.pop(code, None)
+
+        self._by_country = by_country
+        self._by_code = by_code
+        self._loaded = True
+        logger.info(f"Loaded {len(by_country)} postal centroids from {path}")
+
+    def lookup(self, postal_code: Optional[str], country: Optional[str] = None) -> Optional[Tuple[float, float]]:
+        """
+        Return the (lat, lng) centroid for a postal code, or None if unknown.
+
+        Args:
+            postal_code: Postal code as entered by the customer
+            country: Optional ISO country code to disambiguate the lookup
+        """
+        if not postal_code:
+            return None
+        if not self._loaded:
+            self.load()
+
+        code = normalize_postal_code(postal_code)
+        if country:
+            point = self._by_country.get((country.strip().upper(), code))
+            if point is not None:
+                return point
+        return self._by_code.get(code)
+
+    def __len__(self) -> int:
+        if not self._loaded:
+            self.load()
+        return len(self._by_country)
+
+
+# Global singleton instance
+postal_code_geocoder = PostalCodeGeocoder()
@@ -1,10 +1,11 @@
 import xml.etree.ElementTree as ET
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
-import aiohttp
 import logging
 from urllib.parse import quote
 
+from app.core.http.outbound import outbound_http
+
 from .base_provider import (
     BaseShippingProvider,
     ShippingProviderConfig,
@@ -93,16 +94,17 @@ class USPSProvider(BaseShippingProvider):
             # Make the API call
             api_url = f"{self.api_base_url}?API=RateV4&XML={quote(xml_request)}"
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(api_url, timeout=self.config.timeout_seconds) as response:
-                    if response.status != 200:
-                        return ShippingRateResponse(
-                            rates=[],
-                            carrier="USPS",
-                            errors=[f"USPS API error: HTTP {response.status}"]
-                        )
-                    
-                    response_text = await response.text()
+            response = await outbound_http.get(
+                "usps", api_url, timeout=self.config.timeout_seconds, idempotent=True
+            )
+            if response.status_code != 200:
+                return ShippingRateResponse(
+                    rates=[],
+                    carrier="USPS",
+                    errors=[f"USPS API error: HTTP {response.status_code}"]
+                )
+
+            response_text = response.text
                     
             # Parse the XML response
             rates, errors = self._parse_rate_response_xml(response_text, request)
@@ -137,18 +139,19 @@ class USPSProvider(BaseShippingProvider):
             # Make the API call
             api_url = f"{self.api_base_url}?API=eVS&XML={quote(xml_request)}"
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(api_url, timeout=self.config.timeout_seconds) as response:
-                    if response.status != 200:
-                        return LabelResponse(
-                            labels=[],
-                            carrier="USPS",
-                            total_cost=0.0,
-                            shipment_id="",
-                            errors=[f"USPS API error: HTTP {response.status}"]
-                        )
-                    
-                    response_text = await response.text()
+            response = await outbound_http.get(
+                "usps", api_url, timeout=self.config.timeout_seconds, idempotent=False
+            )
+            if response.status_code != 200:
+                return LabelResponse(
+                    labels=[],
+                    carrier="USPS",
+                    total_cost=0.0,
+                    shipment_id="",
+                    errors=[f"USPS API error: HTTP {response.status_code}"]
+                )
+
+            response_text = response.text
                     
             # Parse the XML response
             labels, shipment_id, total_cost, errors = self._parse_label_response_xml(response_text, request)
@@ -202,18 +205,19 @@ class USPSProvider(BaseShippingProvider):
             # Make the API call
             api_url = f"{self.api_base_url}?API=TrackV2&XML={quote(xml_request)}"
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(api_url, timeout=self.config.timeout_seconds) as response:
-                    if response.status != 200:
-                        return TrackingResponse(
-                            tracking_number=tracking_number,
-                            carrier="USPS",
-                            status=TrackingStatus.UNKNOWN,
-                            events=[],
-                            errors=[f"USPS API error: HTTP {response.status}"]
-                        )
-                    
-                    response_text = await response.text()
+            response = await outbound_http.get(
+                "usps", api_url, timeout=self.config.timeout_seconds, idempotent=True
+            )
+            if response.status_code != 200:
+                return TrackingResponse(
+                    tracking_number=tracking_number,
+                    carrier="USPS",
+                    status=TrackingStatus.UNKNOWN,
+                    events=[],
+                    errors=[f"USPS API error: HTTP {response.status_code}"]
+                )
+
+            response_text = response.text
                     
             # Parse the XML response
             status, events, delivered_at, estimated_delivery, errors = self._parse_tracking_response_xml(response_text)
@@ -270,15 +274,16 @@ class USPSProvider(BaseShippingProvider):
             # Make the API call
             api_url = f"{self.api_base_url}?API=Verify&XML={quote(xml_request)}"
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(api_url, timeout=self.config.timeout_seconds) as response:
-                    if response.status != 200:
-                        return ValidationResponse(
-                            is_valid=False,
-                            errors=[f"USPS API error: HTTP {response.status}"]
-                        )
-                    
-                    response_text = await response.text()
+            response = await outbound_http.get(
+                "usps", api_url, timeout=self.config.timeout_seconds, idempotent=True
+            )
+            if response.status_code != 200:
+                return ValidationResponse(
+                    is_valid=False,
+                    errors=[f"USPS API error: HTTP {response.status_code}"]
+                )
+
+            response_text = response.text
                     
             # Parse the XML response
             is_valid, normalized_address, errors = self._parse_address_validation_response(response_text, request.address)
@@ -0,0 +1,87 @@
+"""
+Bounded TTL cache for shipping quotes.
+
+Quotes are keyed by (tenant, tenant generation, origin cell, destination
+cell, weight band). Bumping a tenant's generation invalidates all of its
+quotes in O(1); stale entries are then evicted by LRU pressure or expiry.
+"""
+
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+@dataclass
+class QuoteCacheStats:
+    """Counters for cache effectiveness."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class ShippingQuoteCache:
+    """In-process LRU cache with per-entry expiry."""
+
+    def __init__(self, ttl_seconds: float = 300, max_entries: int = 50_000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._generations: Dict[uuid.UUID, int] = {}
+        self.stats = QuoteCacheStats()
+
+    def make_key(
+        self,
+        tenant_id: uuid.UUID,
+        origin_cell: str,
+        destination_cell: str,
+        weight_band: int,
+    ) -> Tuple[uuid.UUID, int, str, str, int]:
+        """Build a cache key bound to the tenant's current generation."""
+        return (
+            tenant_id,
+            self._generations.get(tenant_id, 0),
+            origin_cell,
+            destination_cell,
+            weight_band,
+        )
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.stats.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def invalidate_tenant(self, tenant_id: uuid.UUID) -> None:
+        """Make every cached quote for the tenant unreachable."""
+        self._generations[tenant_id] = self._generations.get(tenant_id, 0) + 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
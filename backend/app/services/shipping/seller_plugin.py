@@ -7,6 +7,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.shipping import SellerShippingProvider, ShippingCourier
 from app.schemas.shipping import ShippingDetails
+from app.services.shipping.coverage_index import compile_coverage
+from app.services.shipping.geo import haversine_km
 from app.services.shipping_service import ShippingProviderPlugin
 
 logger = logging.getLogger(__name__)
@@ -82,58 +84,12 @@ def estimate_delivery_time(provider_type: str, distance_km: float) -> str:
 
 def calculate_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
     """Calculate distance between two points using Haversine formula"""
-    from math import radians, sin, cos, sqrt, atan2
-
-    # Radius of the Earth in km
-    R = 6371.0
-
-    lat1, lng1, lat2, lng2 = map(radians, [lat1, lng1, lat2, lng2])
-
-    dlng = lng2 - lng1
-    dlat = lat2 - lat1
-
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlng/2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1-a))
-
-    distance = R * c
-    return distance
+    return haversine_km(lat1, lng1, lat2, lng2)
 
 
 def is_within_coverage_area(provider: SellerShippingProvider, lat: float, lng: float) -> bool:
     """Check if a location is within the provider's coverage area"""
-    if not provider.coverage_area:
-        return True  # No coverage area set means no restrictions
-
-    coverage = provider.coverage_area
-
-    # Handle circular coverage area
-    if coverage.get('type') == 'circle':
-        center_lat = coverage.get('center_lat')
-        center_lng = coverage.get('center_lng')
-        radius_km = coverage.get('radius_km')
-
-        if not all([center_lat, center_lng, radius_km]):
-            return True  # Malformed coverage area
-
-        distance = calculate_distance(center_lat, center_lng, lat, lng)
-        return distance <= radius_km
-
-    # Handle polygon coverage area (simplified check for now)
-    elif coverage.get('type') == 'polygon':
-        # For now, just a simple bounding box check
-        coords = coverage.get('coordinates', [])
-        if not coords:
-            return True
-
-        lats = [point[0] for point in coords]
-        lngs = [point[1] for point in coords]
-
-        min_lat, max_lat = min(lats), max(lats)
-        min_lng, max_lng = min(lngs), max(lngs)
-
-        return min_lat <= lat <= max_lat and min_lng <= lng <= max_lng
-
-    return True  # Unknown coverage area type
+    return compile_coverage(provider.coverage_area).contains(lat, lng)
 
 
 class SellerDefinedShippingPlugin(ShippingProviderPlugin):
@@ -0,0 +1,309 @@
+"""
+Quote engine for seller-defined shipping providers.
+
+Workflow for a checkout quote:
+1. Geocode origin and destination postal codes from the local centroid table
+2. Snap both points to geohash cells and the weight to a billing band
+3. Look up the providers that qualify for (tenant, cells, band), cached
+4. Otherwise load the tenant's coverage index (cached per tenant), filter the
+   providers covering the destination and in range, and cache them
+5. Price the qualifying providers with the parcel's actual weight
+
+The cache holds only what its key determines (the qualifying providers and
+the distance between the cell centres), so hits are always correct and a
+parcel is never billed for its band's upper weight. Postal codes missing
+from the centroid table are quoted at a nominal distance with the same
+filters: coverage is checked against the destination when it is known, and
+only providers with unrestricted coverage qualify when it is not.
+
+Provider changes are announced with ``invalidate_tenant`` once committed: it
+bumps the tenant's shared version stamp in Redis and notifies other workers
+over a channel, and each worker re-reads the stamp periodically in case a
+notification was missed.
+"""
+
+import asyncio
+import logging
+import math
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, select
+
+from app.core.cache.redis_cache import redis_cache
+from app.models.shipping import SellerShippingProvider
+from app.services.shipping.coverage_index import ProviderProfile, TenantCoverageIndex
+from app.services.shipping.geo import geohash_center, geohash_encode, haversine_km
+from app.services.shipping.postal_geocoder import PostalCodeGeocoder, postal_code_geocoder
+from app.services.shipping.providers.base_provider import ShippingRate, ShippingService
+from app.services.shipping.quote_cache import ShippingQuoteCache
+
+logger = logging.getLogger(__name__)
+
+# Geohash precision 7 cells are roughly 150m x 150m
+CELL_PRECISION = 7
+# Cached quotes are partitioned by half-kilogram weight band
+WEIGHT_BAND_KG = 0.5
+# Weight included in the base fee; heavier parcels pay a surcharge per kg
+FREE_WEIGHT_KG = 5
+WEIGHT_SURCHARGE_PER_KG = 100  # cents
+
+QUOTE_TTL_SECONDS = 300
+INDEX_TTL_SECONDS = 600
+# Distance used to price quotes whose postal codes can't be geocoded
+FALLBACK_DISTANCE_KM = 10
+
+SELLER_QUOTES_VERSION_KEY = "shipping:seller_quotes:version:{tenant_id}"
+SELLER_QUOTES_CHANNEL = "shipping:seller_quotes:changes"
+# How often a tenant's cached state re-reads its shared version stamp
+VERSION_CHECK_INTERVAL = 10.0
+LISTENER_RETRY_DELAY = 5.0
+
+
+def weight_band(weight_kg: float) -> int:
+    """Return the billing band index for a weight (band n covers up to n * 0.5kg)."""
+    return max(1, math.ceil(max(weight_kg, 0.0) / WEIGHT_BAND_KG - 1e-9))
+
+
+def price_quote(profile: ProviderProfile, distance_km: float, weight_kg: float) -> ShippingRate:
+    """Price a seller provider quote; fees are stored in cents."""
+    distance_fee = profile.per_km_fee * distance_km
+    total = profile.base_fee + distance_fee
+    if weight_kg > FREE_WEIGHT_KG:
+        total += (weight_kg - FREE_WEIGHT_KG) * WEIGHT_SURCHARGE_PER_KG
+
+    return ShippingRate(
+        service=ShippingService(
+            code=f"LOCAL_{profile.provider_type}",
+            name=profile.name,
+            carrier="LOCAL",
+        ),
+        base_rate=profile.base_fee / 100,
+        fees={"distance": distance_fee / 100},
+        total_rate=total / 100,
+        currency="USD",
+        transit_days=1,
+    )
+
+
+def in_range(profiles: List[ProviderProfile], distance_km: float) -> Tuple[ProviderProfile, ...]:
+    """Providers whose min/max distance allows a delivery of this length."""
+    return tuple(
+        profile for profile in profiles
+        if profile.min_distance <= distance_km <= profile.max_distance
+    )
+
+
+class SellerQuoteEngine:
+    """
+    Cached quote engine for seller-defined providers.
+
+    Coverage indexes are held per tenant for ``index_ttl_seconds`` and are
+    dropped together with the tenant's quotes by ``invalidate_local``.
+    """
+
+    def __init__(
+        self,
+        geocoder: PostalCodeGeocoder = postal_code_geocoder,
+        quote_cache: Optional[ShippingQuoteCache] = None,
+        index_ttl_seconds: float = INDEX_TTL_SECONDS,
+        provider_loader: Optional[Callable] = None,
+        cache=redis_cache,
+        version_check_interval: float = VERSION_CHECK_INTERVAL,
+    ):
+        self.geocoder = geocoder
+        self.quote_cache = quote_cache or ShippingQuoteCache(ttl_seconds=QUOTE_TTL_SECONDS)
+        self.index_ttl_seconds = index_ttl_seconds
+        self._provider_loader = provider_loader or self._load_providers
+        self.cache = cache
+        self.version_check_interval = version_check_interval
+        self._indexes: Dict[uuid.UUID, Tuple[float, TenantCoverageIndex]] = {}
+        self._index_locks: Dict[uuid.UUID, asyncio.Lock] = {}
+        self._generations: Dict[uuid.UUID, int] = {}
+        # tenant -> (shared version seen, monotonic time it was read)
+        self._versions: Dict[uuid.UUID, Tuple[Optional[int], float]] = {}
+        self._listener: Optional[asyncio.Task] = None
+
+    async def _load_providers(self, tenant_id: uuid.UUID) -> List[SellerShippingProvider]:
+        from app.core.db.session import AsyncSessionLocal
+
+        async with AsyncSessionLocal() as session:
+            stmt = select(SellerShippingProvider).where(
+                and_(
+                    SellerShippingProvider.tenant_id == tenant_id,
+                    SellerShippingProvider.is_active == True
+                )
+            )
+            result = await session.execute(stmt)
+            return list(result.scalars().all())
+
+    async def _check_version(self, tenant_id: uuid.UUID) -> None:
+        """Drop the tenant's cached state if its shared version stamp moved."""
+        seen = self._versions.get(tenant_id)
+        now = time.monotonic()
+        if seen is not None and now - seen[1] < self.version_check_interval:
+            return
+
+        shared = await self.cache.get(SELLER_QUOTES_VERSION_KEY.format(tenant_id=tenant_id))
+        if seen is not None and shared != seen[0]:
+            self.invalidate_local(tenant_id)
+        self._versions[tenant_id] = (shared, now)
+
+    async def get_tenant_index(self, tenant_id: uuid.UUID) -> TenantCoverageIndex:
+        """Return the tenant's coverage index, loading it on first use or expiry."""
+        cached = self._indexes.get(tenant_id)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
+        lock = self._index_locks.setdefault(tenant_id, asyncio.Lock())
+        async with lock:
+            cached = self._indexes.get(tenant_id)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+
+            generation = self._generations.get(tenant_id, 0)
+            providers = await self._provider_loader(tenant_id)
+            index = TenantCoverageIndex([ProviderProfile.from_model(p) for p in providers])
+            # Only keep the index if the tenant wasn't invalidated during the load
+            if generation == self._generations.get(tenant_id, 0):
+                self._indexes[tenant_id] = (time.monotonic() + self.index_ttl_seconds, index)
+            return index
+
+    def invalidate_local(self, tenant_id: uuid.UUID) -> None:
+        """Drop this process's coverage index and cached quotes for the tenant."""
+        self._generations[tenant_id] = self._generations.get(tenant_id, 0) + 1
+        self._indexes.pop(tenant_id, None)
+        self.quote_cache.invalidate_tenant(tenant_id)
+
+    async def invalidate_tenant(self, tenant_id: uuid.UUID) -> None:
+        """
+        Announce committed provider changes for a tenant.
+
+        Call after the transaction commits: a quote computed concurrently
+        with an uncommitted change would otherwise re-cache the old rows.
+        """
+        self.invalidate_local(tenant_id)
+        version = await self.cache.incr(SELLER_QUOTES_VERSION_KEY.format(tenant_id=tenant_id))
+        if version is not None:
+            self._versions[tenant_id] = (version, time.monotonic())
+            await self.cache.publish(SELLER_QUOTES_CHANNEL, str(tenant_id))
+
+    async def quote(
+        self,
+        tenant_id: uuid.UUID,
+        origin_postal_code: str,
+        destination_postal_code: str,
+        package_weight: float,
+        origin_country: Optional[str] = None,
+        destination_country: Optional[str] = None,
+    ) -> List[ShippingRate]:
+        """
+        Quote all of a tenant's providers that cover the destination.
+
+        When either postal code cannot be geocoded, the providers are quoted
+        at ``FALLBACK_DISTANCE_KM``, still filtered by coverage and distance.
+        """
+        await self._check_version(tenant_id)
+        weight = max(package_weight, 0.0)
+
+        origin = self.geocoder.lookup(origin_postal_code, origin_country)
+        destination = self.geocoder.lookup(destination_postal_code, destination_country)
+        if origin is None or destination is None:
+            logger.info(
+                f"Cannot geocode shipping quote {origin_postal_code} -> "
+                f"{destination_postal_code} for tenant {tenant_id}, using nominal distance"
+            )
+            index = await self.get_tenant_index(tenant_id)
+            if destination is None:
+                # Coverage can't be checked without a destination
+                covering = [profile for profile in index.profiles if profile.coverage.kind == "any"]
+            else:
+                covering = index.covering(*destination)
+            distance_km, profiles = FALLBACK_DISTANCE_KM, in_range(covering, FALLBACK_DISTANCE_KM)
+        else:
+            distance_km, profiles = await self._qualifying(tenant_id, origin, destination, weight)
+
+        return [price_quote(profile, distance_km, weight) for profile in profiles]
+
+    async def _qualifying(
+        self,
+        tenant_id: uuid.UUID,
+        origin: Tuple[float, float],
+        destination: Tuple[float, float],
+        weight_kg: float,
+    ) -> Tuple[float, Tuple[ProviderProfile, ...]]:
+        """The cell-centre distance and the providers that qualify for it, cached."""
+        origin_cell = geohash_encode(origin[0], origin[1], CELL_PRECISION)
+        destination_cell = geohash_encode(destination[0], destination[1], CELL_PRECISION)
+
+        key = self.quote_cache.make_key(tenant_id, origin_cell, destination_cell, weight_band(weight_kg))
+        cached = self.quote_cache.get(key)
+        if cached is not None:
+            return cached
+
+        index = await self.get_tenant_index(tenant_id)
+        origin_lat, origin_lng = geohash_center(origin_cell)
+        dest_lat, dest_lng = geohash_center(destination_cell)
+        distance_km = haversine_km(origin_lat, origin_lng, dest_lat, dest_lng)
+
+        qualifying = (distance_km, in_range(index.covering(dest_lat, dest_lng), distance_km))
+        self.quote_cache.set(key, qualifying)
+        return qualifying
+
+    def _invalidate_all_local(self) -> None:
+        for tenant_id in set(self._generations) | set(self._indexes):
+            self._generations[tenant_id] = self._generations.get(tenant_id, 0) + 1
+        self._indexes.clear()
+        self._versions.clear()
+        self.quote_cache.clear()
+
+    def _on_change(self, payload) -> None:
+        try:
+            tenant_id = uuid.UUID(str(payload))
+        except ValueError:
+            return
+        self.invalidate_local(tenant_id)
+        # Re-read the stamp on the next quote rather than trusting the old one
+        self._versions.pop(tenant_id, None)
+
+    async def _listen(self):
+        while True:
+            pubsub = self.cache.pubsub()
+            if pubsub is None:
+                # Redis is down; version polling covers us until it's back
+                await asyncio.sleep(LISTENER_RETRY_DELAY)
+                continue
+            try:
+                await pubsub.subscribe(SELLER_QUOTES_CHANNEL)
+                # Anything published before the subscription is in place was missed
+                self._invalidate_all_local()
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._on_change(message.get("data"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Seller quote listener disconnected: {str(e)}")
+            finally:
+                await pubsub.aclose()
+            await asyncio.sleep(LISTENER_RETRY_DELAY)
+
+    def start(self):
+        """Start listening for provider change notifications."""
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        """Stop the change listener."""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+
+# Global singleton instance
+seller_quote_engine = SellerQuoteEngine()
@@ -1,8 +1,11 @@
 import logging
-import requests
 from typing import Any, Dict, Optional
 
+import httpx
+
 from app.core.config.settings import get_settings
+from app.core.http.outbound import outbound_http
+from app.core.resilience.retry_manager import CircuitOpenError
 from app.schemas.shipping import ShippingDetails
 from app.services.shipping_service import ShippingProviderPlugin
 
@@ -24,8 +27,15 @@ class SendyShippingPlugin(ShippingProviderPlugin):
         self.vendor_type = settings.SENDY_VENDOR_TYPE
         self.logger = logging.getLogger(__name__)
 
-    def _make_request(self, endpoint: str, payload: Dict[str, Any]) -> Dict[str, Any]:
-        """Make authenticated request to Sendy API."""
+    async def _make_request(
+        self, endpoint: str, payload: Dict[str, Any], idempotent: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Make authenticated request to Sendy API.
+
+        Quote and tracking commands are safe to repeat, so callers mark them
+        idempotent and the outbound layer may hedge them.
+        """
         url = f"{self.base_url}/{endpoint}"
         headers = {
             "Content-Type": "application/json",
@@ -34,10 +44,12 @@ class SendyShippingPlugin(ShippingProviderPlugin):
         }
 
         try:
-            response = requests.post(url, json=payload, headers=headers)
+            response = await outbound_http.post(
+                "sendy", url, json=payload, headers=headers, idempotent=idempotent
+            )
             response.raise_for_status()
             return response.json()
-        except requests.exceptions.RequestException as e:
+        except (httpx.HTTPError, CircuitOpenError) as e:
             self.logger.error(f"Sendy API error: {str(e)}")
             # Return error response that follows our expected format
             return {
@@ -46,7 +58,7 @@ class SendyShippingPlugin(ShippingProviderPlugin):
                 "status": "failed",
             }
 
-    def get_quote(self, address: dict, method: str, **kwargs) -> Dict[str, Any]:
+    async def get_quote(self, address: dict, method: str, **kwargs) -> Dict[str, Any]:
         """
         Return a shipping quote from Sendy for the given address and method.
 
@@ -72,7 +84,7 @@ class SendyShippingPlugin(ShippingProviderPlugin):
             }
         }
 
-        response = self._make_request("request", payload)
+        response = await self._make_request("request", payload, idempotent=True)
 
         # Transform response to our standard format
         if response.get("error", True):
@@ -93,7 +105,7 @@ class SendyShippingPlugin(ShippingProviderPlugin):
             "distance": response.get("data", {}).get("distance", 0)
         }
 
-    def create_shipment(self, order_id: str, shipping_details: ShippingDetails, **kwargs) -> Dict[str, Any]:
+    async def create_shipment(self, order_id: str, shipping_details: ShippingDetails, **kwargs) -> Dict[str, Any]:
         """
         Create a shipment with Sendy and return tracking info.
 
@@ -136,7 +148,7 @@ class SendyShippingPlugin(ShippingProviderPlugin):
             }
         }
 
-        response = self._make_request("request", payload)
+        response = await self._make_request("request", payload)
 
         # Transform response to our standard format
         if response.get("error", True):
@@ -155,7 +167,7 @@ class SendyShippingPlugin(ShippingProviderPlugin):
             "tracking_url": response.get("data", {}).get("tracking_link", "")
         }
 
-    def track_shipment(self, tracking_number: str, **kwargs) -> Dict[str, Any]:
+    async def track_shipment(self, tracking_number: str, **kwargs) -> Dict[str, Any]:
         """
         Track a shipment by tracking number.
 
@@ -171,7 +183,7 @@ class SendyShippingPlugin(ShippingProviderPlugin):
             }
         }
 
-        response = self._make_request("track", payload)
+        response = await self._make_request("track", payload, idempotent=True)
 
         # Transform response to our standard format
         if response.get("error", True):
@@ -4,6 +4,7 @@ import uuid
 import asyncio
 from datetime import datetime
 
+from app.core.http.outbound import outbound_http
 from app.services.shipping.providers.base_provider import (
     ShippingRateRequest,
     ShippingRateResponse,
@@ -12,8 +13,12 @@ from app.services.shipping.providers.base_provider import (
     PackageDimensions
 )
 from app.services.shipping.shipping_provider_registry import shipping_provider_registry
-from app.models.shipping import SellerShippingProvider
-from app.db.session import get_db
+from app.services.shipping.seller_quote_engine import seller_quote_engine
+
+# Overall budget for a multi-carrier fan-out and the extra time slower
+# carriers get once one carrier has answered with rates
+MULTI_PROVIDER_DEADLINE = 8.0
+STRAGGLER_GRACE = 0.3
 
 
 class ShippingRateService:
@@ -55,45 +60,83 @@ class ShippingRateService:
     async def get_rates_from_multiple_providers(
         self,
         provider_ids: List[str],
-        request: ShippingRateRequest
+        request: ShippingRateRequest,
+        deadline: float = MULTI_PROVIDER_DEADLINE,
+        straggler_grace: float = STRAGGLER_GRACE
     ) -> Dict[str, ShippingRateResponse]:
         """
         Get shipping rates from multiple providers in parallel
         
+        Providers whose circuit breaker is open are skipped immediately. Once
+        the first provider answers with rates, the others get ``straggler_grace``
+        seconds to finish before they are cancelled, so checkout waits for the
+        fastest healthy carrier rather than the slowest one.
+        
         Args:
             provider_ids: List of shipping provider IDs
             request: Shipping rate request
+            deadline: Upper bound in seconds for the whole fan-out
+            straggler_grace: Extra time given to other providers after the first success
             
         Returns:
             Dictionary mapping provider IDs to their rate responses
         """
-        tasks = []
+        responses: Dict[str, ShippingRateResponse] = {}
+        tasks: Dict[asyncio.Future, str] = {}
         for provider_id in provider_ids:
-            task = self.get_rates_from_provider(provider_id, request)
-            tasks.append(task)
-            
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        responses = {}
-        for i, provider_id in enumerate(provider_ids):
-            result = results[i]
-            if isinstance(result, Exception):
+            if not outbound_http.is_available(provider_id):
                 responses[provider_id] = ShippingRateResponse(
                     rates=[],
                     carrier=provider_id,
-                    errors=[f"Failed to get rates: {str(result)}"]
+                    errors=["Provider temporarily unavailable"]
                 )
-            else:
-                responses[provider_id] = result
-                
-        return responses
+                continue
+            task = asyncio.ensure_future(self.get_rates_from_provider(provider_id, request))
+            tasks[task] = provider_id
+
+        loop = asyncio.get_running_loop()
+        cutoff = loop.time() + deadline
+        pending = set(tasks)
+        while pending:
+            remaining = cutoff - loop.time()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(
+                pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                provider_id = tasks[task]
+                error = task.exception()
+                if error is not None:
+                    responses[provider_id] = ShippingRateResponse(
+                        rates=[],
+                        carrier=provider_id,
+                        errors=[f"Failed to get rates: {str(error)}"]
+                    )
+                    continue
+                responses[provider_id] = task.result()
+                if task.result().rates:
+                    cutoff = min(cutoff, loop.time() + straggler_grace)
+
+        for task in pending:
+            task.cancel()
+            provider_id = tasks[task]
+            responses[provider_id] = ShippingRateResponse(
+                rates=[],
+                carrier=provider_id,
+                errors=["Timed out waiting for rates"]
+            )
+
+        return {provider_id: responses[provider_id] for provider_id in provider_ids}
     
     async def get_seller_shipping_rates(
         self,
         tenant_id: uuid.UUID,
         origin_postal_code: str,
         destination_postal_code: str,
-        package_weight: float
+        package_weight: float,
+        origin_country: Optional[str] = None,
+        destination_country: Optional[str] = None
     ) -> List[ShippingRate]:
         """
         Get rates from seller-defined shipping providers
@@ -103,56 +146,21 @@ class ShippingRateService:
             origin_postal_code: Origin postal code
             destination_postal_code: Destination postal code
             package_weight: Package weight in kg
+            origin_country: Optional origin country code for geocoding
+            destination_country: Optional destination country code for geocoding
             
         Returns:
             List of shipping rates from seller-defined providers
         """
         try:
-            # Get seller shipping providers from the database
-            async with get_db() as db:
-                query = (
-                    "SELECT * FROM seller_shipping_providers "
-                    "WHERE tenant_id = :tenant_id AND is_active = TRUE"
-                )
-                result = await db.execute(query, {"tenant_id": tenant_id})
-                providers = [dict(row) for row in result.mappings()]
-                
-            if not providers:
-                return []
-                
-            rates = []
-            for provider in providers:
-                # Calculate rate based on provider's pricing structure
-                base_fee = provider.get("base_fee", 0)
-                per_km_fee = provider.get("per_km_fee", 0)
-                
-                # Simple distance calculation based on postal codes
-                # In a real implementation, we would use a geocoding service
-                distance_km = 10  # Placeholder
-                
-                # Calculate total rate
-                total_rate = base_fee + (per_km_fee * distance_km)
-                
-                # Add weight surcharge if applicable
-                if package_weight > 5:
-                    weight_surcharge = (package_weight - 5) * 100  # $1 per kg over 5kg
-                    total_rate += weight_surcharge
-                
-                # Create a shipping rate object
-                rate = ShippingRate(
-                    service={"code": f"LOCAL_{provider['provider_type']}", 
-                             "name": provider["name"],
-                             "carrier": "LOCAL"},
-                    base_rate=base_fee / 100,  # Convert cents to dollars
-                    fees={"distance": (per_km_fee * distance_km) / 100},
-                    total_rate=total_rate / 100,  # Convert cents to dollars
-                    currency="USD",
-                    transit_days=1
-                )
-                
-                rates.append(rate)
-                
-            return rates
+            return await seller_quote_engine.quote(
+                tenant_id,
+                origin_postal_code,
+                destination_postal_code,
+                package_weight,
+                origin_country=origin_country,
+                destination_country=destination_country
+            )
         except Exception as e:
             self.logger.error(f"Error calculating seller shipping rates: {str(e)}")
             return []
@@ -194,7 +202,9 @@ class ShippingRateService:
                 tenant_id,
                 origin_postal,
                 dest_postal,
-                package_weight
+                package_weight,
+                origin_country=request.origin.country,
+                destination_country=request.destination.country
             )
             
             all_rates.extend(seller_rates)
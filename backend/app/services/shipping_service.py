@@ -1,3 +1,4 @@
+import inspect
 import logging
 from typing import Any, Dict, Optional
 
@@ -25,6 +26,13 @@ class ShippingProviderPlugin:
         raise NotImplementedError
 
 
+async def _resolve(result: Any) -> Any:
+    """Await plugin results from async plugins; pass sync results through."""
+    if inspect.isawaitable(result):
+        return await result
+    return result
+
+
 class ShippingService:
     def __init__(self):
         self.plugins = {}
@@ -35,32 +43,32 @@ class ShippingService:
     def get_plugin(self, name: str) -> Optional[ShippingProviderPlugin]:
         return self.plugins.get(name)
 
-    def get_quote(
+    async def get_quote(
         self, provider: str, address: dict, method: str, **kwargs
     ) -> Dict[str, Any]:
         plugin = self.get_plugin(provider)
         if not plugin:
             raise ValueError(
                 f"Shipping provider plugin '{provider}' not found")
-        return plugin.get_quote(address, method, **kwargs)
+        return await _resolve(plugin.get_quote(address, method, **kwargs))
 
-    def create_shipment(
+    async def create_shipment(
         self, provider: str, order_id: str, shipping_details: ShippingDetails, **kwargs
     ) -> Dict[str, Any]:
         plugin = self.get_plugin(provider)
         if not plugin:
             raise ValueError(
                 f"Shipping provider plugin '{provider}' not found")
-        return plugin.create_shipment(order_id, shipping_details, **kwargs)
+        return await _resolve(plugin.create_shipment(order_id, shipping_details, **kwargs))
 
-    def track_shipment(
+    async def track_shipment(
         self, provider: str, tracking_number: str, **kwargs
     ) -> Dict[str, Any]:
         plugin = self.get_plugin(provider)
         if not plugin:
             raise ValueError(
                 f"Shipping provider plugin '{provider}' not found")
-        return plugin.track_shipment(tracking_number, **kwargs)
+        return await _resolve(plugin.track_shipment(tracking_number, **kwargs))
 
 
 class MockShippingPlugin(ShippingProviderPlugin):
@@ -0,0 +1,379 @@
+"""
+Content-addressed trees for storefront configuration versions.
+
+A configuration is stored as chunks: every dict or list whose canonical JSON
+is at least MIN_CHUNK_BYTES long becomes its own chunk, keyed by the SHA-256
+of its content, and is replaced in its parent by a {"$ref": <hash>} marker.
+Smaller values stay inline in their parent, unless the parent would exceed
+MAX_CHUNK_BYTES. A sub-tree that did not change
+between two versions has the same hash in both, so it is stored once and is
+skipped entirely when the versions are compared.
+
+Deltas are lists of operations on paths (lists of dict keys and list
+indexes), ordered so that replaying them in sequence is always valid:
+
+    {"op": "add", "path": [...], "value": ...}
+    {"op": "remove", "path": [...], "old": ...}
+    {"op": "replace", "path": [...], "old": ..., "value": ...}
+
+Provides:
+- chunk_tree: split a configuration into chunks
+- diff_trees: changed paths between two chunked configurations
+- diff_values: changed paths between two in-memory values
+- unshared_chunks: chunks of a new tree that are not stored yet
+- apply_delta / invert_delta: replay a delta forwards or backwards
+- summarize_delta: operation counts for display
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# Containers smaller than this are kept inline in their parent chunk
+MIN_CHUNK_BYTES = 256
+# Chunks larger than this store every nested container as its own chunk
+MAX_CHUNK_BYTES = 2048
+
+REF_KEY = "$ref"
+
+ChunkLoader = Callable[[Set[str]], Awaitable[Dict[str, Any]]]
+
+
+def canonical_json(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def is_ref(value: Any) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and REF_KEY in value
+
+
+def chunk_tree(
+    value: Any,
+    min_chunk_bytes: int = MIN_CHUNK_BYTES,
+    max_chunk_bytes: int = MAX_CHUNK_BYTES,
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Split a JSON value into content-addressed chunks.
+
+    Args:
+        value: JSON-compatible configuration
+        min_chunk_bytes: Size from which a nested container gets its own chunk
+        max_chunk_bytes: Size above which all nested containers get their own chunk
+
+    Returns:
+        Tuple of (root hash, {hash: chunk content}). The root is always a chunk.
+    """
+    chunks: Dict[str, Any] = {}
+
+    def store(content: Any, encoded: str) -> Dict[str, str]:
+        digest = hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+        chunks[digest] = content
+        return {REF_KEY: digest}
+
+    def visit(node: Any, is_root: bool = False) -> Any:
+        if isinstance(node, dict):
+            content: Any = {key: visit(child) for key, child in node.items()}
+            children = content.items()
+        elif isinstance(node, list):
+            content = [visit(child) for child in node]
+            children = enumerate(content)
+        else:
+            return node
+
+        encoded = canonical_json(content)
+        if not is_root and len(encoded) < min_chunk_bytes:
+            return content
+        if len(encoded) >= max_chunk_bytes:
+            # Many small containers (e.g. a long list of sections) would make
+            # one large chunk; give each of them its own chunk instead
+            inline = [
+                (key, child) for key, child in children
+                if isinstance(child, (dict, list)) and not is_ref(child)
+            ]
+            for key, child in inline:
+                content[key] = store(child, canonical_json(child))
+            if inline:
+                encoded = canonical_json(content)
+        return store(content, encoded)
+
+    root = visit(value, is_root=True)
+    return root[REF_KEY], chunks
+
+
+@dataclass
+class TreeDiff:
+    """Result of comparing two chunked trees"""
+
+    ops: List[Dict[str, Any]] = field(default_factory=list)
+    # Chunks found unchanged in both trees; they and everything below them
+    # are already stored with the old tree
+    shared_hashes: Set[str] = field(default_factory=set)
+
+
+class _Resolver:
+    """Caches chunks and fetches missing ones in one batch per call"""
+
+    def __init__(self, load_chunks: ChunkLoader):
+        self.load_chunks = load_chunks
+        self.chunks: Dict[str, Any] = {}
+
+    async def fetch(self, hashes: Iterable[str]) -> None:
+        missing = {digest for digest in hashes if digest not in self.chunks}
+        if missing:
+            loaded = await self.load_chunks(missing)
+            absent = missing - loaded.keys()
+            if absent:
+                raise KeyError(f"Missing configuration chunks: {sorted(absent)[:3]}")
+            self.chunks.update(loaded)
+
+    def shallow(self, value: Any) -> Any:
+        return self.chunks[value[REF_KEY]] if is_ref(value) else value
+
+    async def materialize(self, values: List[Any]) -> List[Any]:
+        """Replace every ref in values, fetching one tree level per round trip."""
+        frontier = list(values)
+        while True:
+            refs = set()
+            for value in frontier:
+                refs.update(_collect_refs(value))
+            if not refs:
+                break
+            await self.fetch(refs)
+            frontier = [self.chunks[digest] for digest in refs]
+        return [self._expand(value) for value in values]
+
+    def _expand(self, value: Any) -> Any:
+        value = self.shallow(value)
+        if isinstance(value, dict):
+            return {key: self._expand(child) for key, child in value.items()}
+        if isinstance(value, list):
+            return [self._expand(child) for child in value]
+        return value
+
+
+def _collect_refs(value: Any) -> Iterable[str]:
+    if is_ref(value):
+        yield value[REF_KEY]
+    elif isinstance(value, dict):
+        for child in value.values():
+            yield from _collect_refs(child)
+    elif isinstance(value, list):
+        for child in value:
+            yield from _collect_refs(child)
+
+
+def _kind(value: Any) -> Optional[str]:
+    """Container kind of a value; refs always point to a dict or list chunk"""
+    if is_ref(value):
+        return "ref"
+    if isinstance(value, dict):
+        return "dict"
+    if isinstance(value, list):
+        return "list"
+    return None
+
+
+async def diff_trees(old_root: str, new_root: str, load_chunks: ChunkLoader) -> TreeDiff:
+    """
+    Compare two chunked trees, visiting only sub-trees whose hashes differ.
+
+    Chunks are fetched breadth-first, one call to load_chunks per tree level.
+
+    Args:
+        old_root: Root hash of the old tree
+        new_root: Root hash of the new tree
+        load_chunks: Async callable returning {hash: content} for a set of hashes
+
+    Returns:
+        TreeDiff with the delta from old to new
+
+    Raises:
+        KeyError: If a referenced chunk cannot be loaded
+    """
+    resolver = _Resolver(load_chunks)
+    result = TreeDiff()
+    if old_root == new_root:
+        return result
+
+    ops: List[Tuple[Tuple, Dict[str, Any]]] = []
+    pending: List[Tuple[List[Any], Any, Any]] = [([], {REF_KEY: old_root}, {REF_KEY: new_root})]
+
+    while pending:
+        await resolver.fetch(
+            value[REF_KEY] for _, old, new in pending for value in (old, new) if is_ref(value)
+        )
+        next_pending: List = []
+        for path, old, new in pending:
+            _diff_containers(
+                path, resolver.shallow(old), resolver.shallow(new), ops, next_pending,
+                result.shared_hashes,
+            )
+        pending = next_pending
+
+    # Replaced and added values may still contain refs; expand them level by level
+    values = []
+    for _, op in ops:
+        values.extend(op.get(key) for key in ("old", "value") if key in op)
+    expanded = iter(await resolver.materialize(values))
+    for _, op in ops:
+        for key in ("old", "value"):
+            if key in op:
+                op[key] = next(expanded)
+
+    result.ops = [op for _, op in sorted(ops, key=lambda item: item[0])]
+    return result
+
+
+def _diff_containers(path, old, new, ops, pending, shared=None) -> None:
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old.keys() - new.keys():
+            _emit(ops, {"op": "remove", "path": path + [key], "old": old[key]})
+        for key, value in new.items():
+            if key not in old:
+                _emit(ops, {"op": "add", "path": path + [key], "value": value})
+            else:
+                _diff_child(path + [key], old[key], value, ops, pending, shared)
+        return
+
+    if isinstance(old, list) and isinstance(new, list):
+        for index in range(min(len(old), len(new))):
+            _diff_child(path + [index], old[index], new[index], ops, pending, shared)
+        for index in range(len(old) - 1, len(new) - 1, -1):
+            _emit(ops, {"op": "remove", "path": path + [index], "old": old[index]})
+        for index in range(len(old), len(new)):
+            _emit(ops, {"op": "add", "path": path + [index], "value": new[index]})
+        return
+
+    _emit(ops, {"op": "replace", "path": path, "old": old, "value": new})
+
+
+def _diff_child(path, old, new, ops, pending, shared) -> None:
+    if old == new:
+        if shared is not None:
+            shared.update(_collect_refs(old))
+        return
+    old_kind, new_kind = _kind(old), _kind(new)
+    if old_kind is not None and new_kind is not None and (
+        old_kind == new_kind or "ref" in (old_kind, new_kind)
+    ):
+        # Both containers: descend once the refs are resolved. A ref paired
+        # with a different container type becomes a replace after resolving
+        pending.append((path, old, new))
+        return
+    _emit(ops, {"op": "replace", "path": path, "old": old, "value": new})
+
+
+def _emit(ops, op) -> None:
+    # Removals of list items run last and from the highest index down, so
+    # replaying the ops in order never shifts a pending index
+    path = op["path"]
+    if op["op"] == "remove" and path and isinstance(path[-1], int):
+        order = (1, tuple(map(_path_key, path[:-1])), -path[-1])
+    else:
+        order = (0, tuple(map(_path_key, path)), 0)
+    ops.append((order, op))
+
+
+def _path_key(part) -> Tuple[int, Any]:
+    return (0, part) if isinstance(part, int) else (1, str(part))
+
+
+def diff_values(old: Any, new: Any) -> List[Dict[str, Any]]:
+    """
+    Compare two in-memory values.
+
+    Args:
+        old: Old JSON value
+        new: New JSON value
+
+    Returns:
+        Delta from old to new
+    """
+    ops: List[Tuple[Tuple, Dict[str, Any]]] = []
+    pending = [([], old, new)] if old != new else []
+    while pending:
+        next_pending: List = []
+        for path, old_value, new_value in pending:
+            _diff_containers(path, old_value, new_value, ops, next_pending)
+        pending = next_pending
+    return [op for _, op in sorted(ops, key=lambda item: item[0])]
+
+
+def unshared_chunks(root: str, chunks: Dict[str, Any], shared: Set[str]) -> Dict[str, Any]:
+    """
+    Chunks of an in-memory tree that are not reachable through a shared chunk.
+
+    Args:
+        root: Root hash of the tree
+        chunks: All chunks of the tree, as returned by chunk_tree
+        shared: Hashes known to be stored already (with their descendants)
+
+    Returns:
+        {hash: content} of the chunks that still need storing
+    """
+    found: Dict[str, Any] = {}
+    frontier = [root]
+    while frontier:
+        digest = frontier.pop()
+        if digest in shared or digest in found:
+            continue
+        found[digest] = chunks[digest]
+        frontier.extend(_collect_refs(found[digest]))
+    return found
+
+
+def apply_delta(document: Any, delta: Optional[List[Dict[str, Any]]]) -> Any:
+    """
+    Replay a delta on a document, modifying it in place.
+
+    Args:
+        document: JSON value to update
+        delta: Operations as produced by diff_trees or diff_values
+
+    Returns:
+        The updated document (a new object when the root itself is replaced)
+    """
+    for op in delta or []:
+        path = op["path"]
+        if not path:
+            document = op.get("value")
+            continue
+        parent = document
+        for part in path[:-1]:
+            parent = parent[part]
+        key = path[-1]
+        if op["op"] == "remove":
+            del parent[key]
+        elif op["op"] == "add" and isinstance(parent, list):
+            parent.insert(key, op["value"])
+        else:
+            parent[key] = op["value"]
+    return document
+
+
+def invert_delta(delta: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Return the delta that undoes the given one."""
+    inverted = []
+    for op in reversed(delta or []):
+        if op["op"] == "add":
+            inverted.append({"op": "remove", "path": op["path"], "old": op["value"]})
+        elif op["op"] == "remove":
+            inverted.append({"op": "add", "path": op["path"], "value": op["old"]})
+        else:
+            inverted.append({"op": "replace", "path": op["path"], "old": op["value"], "value": op["old"]})
+    return inverted
+
+
+def summarize_delta(delta: List[Dict[str, Any]]) -> Dict[str, int]:
+    summary = {"added": 0, "removed": 0, "changed": 0, "type_changes": 0}
+    for op in delta:
+        if op["op"] == "add":
+            summary["added"] += 1
+        elif op["op"] == "remove":
+            summary["removed"] += 1
+        elif type(op["old"]) is not type(op["value"]):
+            summary["type_changes"] += 1
+        else:
+            summary["changed"] += 1
+    return summary
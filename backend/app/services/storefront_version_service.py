@@ -1,20 +1,166 @@
+import copy
 import uuid
-from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional, Tuple
 
-from deepdiff import DeepDiff
 from fastapi import HTTPException, status
-from sqlalchemy import desc
-from sqlalchemy.orm import Session
+from sqlalchemy import desc, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.storefront import StorefrontConfig
-from app.models.storefront_version import StorefrontVersion
-from app.models.tenant import Tenant
+from app.models.storefront_version import StorefrontVersion, StorefrontVersionChunk
 from app.models.user import User
+from app.services.storefront.version_tree import (
+    apply_delta,
+    chunk_tree,
+    diff_trees,
+    diff_values,
+    invert_delta,
+    summarize_delta,
+    unshared_chunks,
+)
+
+# Every CHECKPOINT_INTERVAL-th version keeps a full snapshot; restoring any
+# other version replays at most CHECKPOINT_INTERVAL - 1 deltas
+CHECKPOINT_INTERVAL = 20
+
+
+def is_checkpoint(version_number: int) -> bool:
+    return (version_number - 1) % CHECKPOINT_INTERVAL == 0
+
+
+def configuration_snapshot(config: StorefrontConfig) -> Dict[str, Any]:
+    """Versioned fields of a storefront configuration as JSON."""
+    return {
+        "id": str(config.id),
+        "tenant_id": str(config.tenant_id),
+        "subdomain_name": config.subdomain_name,
+        "custom_domain": config.custom_domain,
+        "domain_verified": config.domain_verified,
+        "status": config.status.value if config.status else None,
+        "meta_title": config.meta_title,
+        "meta_description": config.meta_description,
+        "theme_settings": config.theme_settings,
+        "layout_config": config.layout_config,
+        "social_links": config.social_links,
+        "published_at": (
+            config.published_at.isoformat() if config.published_at else None
+        ),
+        "scheduled_publish_at": (
+            config.scheduled_publish_at.isoformat()
+            if config.scheduled_publish_at
+            else None
+        ),
+        "published_by": str(config.published_by) if config.published_by else None,
+    }
+
+
+async def _get_config(db: AsyncSession, tenant_id: uuid.UUID) -> StorefrontConfig:
+    result = await db.execute(
+        select(StorefrontConfig).where(StorefrontConfig.tenant_id == tenant_id)
+    )
+    config = result.scalars().first()
+    if not config:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Storefront configuration not found",
+        )
+    return config
+
+
+async def _get_versions(
+    db: AsyncSession, tenant_id: uuid.UUID, version_ids: List[uuid.UUID]
+) -> Dict[uuid.UUID, StorefrontVersion]:
+    """Load versions of the tenant's storefront in one query, 404 on any missing."""
+    result = await db.execute(
+        select(StorefrontVersion)
+        .join(StorefrontConfig, StorefrontConfig.id == StorefrontVersion.storefront_config_id)
+        .where(
+            StorefrontConfig.tenant_id == tenant_id,
+            StorefrontVersion.id.in_(version_ids),
+        )
+    )
+    versions = {version.id: version for version in result.scalars()}
+    for version_id in version_ids:
+        if version_id not in versions:
+            detail = (
+                f"Version {version_id} not found" if len(version_ids) > 1 else "Version not found"
+            )
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+    return versions
+
+
+def _chunk_loader(db: AsyncSession, storefront_config_id: uuid.UUID, local: Optional[Dict[str, Any]] = None):
+    """Chunk loader for diff_trees: in-memory chunks first, then one query per call."""
+
+    async def load(hashes):
+        found = {digest: local[digest] for digest in hashes if local and digest in local}
+        missing = [digest for digest in hashes if digest not in found]
+        if missing:
+            result = await db.execute(
+                select(StorefrontVersionChunk.hash, StorefrontVersionChunk.content).where(
+                    StorefrontVersionChunk.storefront_config_id == storefront_config_id,
+                    StorefrontVersionChunk.hash.in_(missing),
+                )
+            )
+            found.update(result.tuples().all())
+        return found
+
+    return load
+
+
+async def materialize_configuration(
+    db: AsyncSession, version: StorefrontVersion
+) -> Dict[str, Any]:
+    """
+    Rebuild the configuration stored by a version.
+
+    Checkpoint versions return their snapshot; other versions load the nearest
+    earlier checkpoint and the deltas after it in one query and replay them.
+
+    Args:
+        db: Database session
+        version: Version to materialize
+
+    Returns:
+        Configuration snapshot of the version
+    """
+    if version.configuration_snapshot is not None:
+        return version.configuration_snapshot
+
+    checkpoint = (
+        select(func.max(StorefrontVersion.version_number))
+        .where(
+            StorefrontVersion.storefront_config_id == version.storefront_config_id,
+            StorefrontVersion.version_number <= version.version_number,
+            StorefrontVersion.configuration_snapshot.is_not(None),
+        )
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        select(StorefrontVersion.configuration_snapshot, StorefrontVersion.delta)
+        .where(
+            StorefrontVersion.storefront_config_id == version.storefront_config_id,
+            StorefrontVersion.version_number >= checkpoint,
+            StorefrontVersion.version_number <= version.version_number,
+        )
+        .order_by(StorefrontVersion.version_number)
+    )
+    rows = result.all()
+    if not rows or rows[0].configuration_snapshot is None:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"No checkpoint found for version {version.version_number}",
+        )
+
+    snapshot = copy.deepcopy(rows[0].configuration_snapshot)
+    for row in rows[1:]:
+        snapshot = apply_delta(snapshot, row.delta)
+    return snapshot
 
 
 async def create_version(
-    db: Session,
+    db: AsyncSession,
     tenant_id: uuid.UUID,
     user_id: uuid.UUID,
     change_summary: Optional[str] = None,
@@ -25,7 +171,10 @@ async def create_version(
     Create a snapshot of the current storefront configuration as a new version.
 
     This function creates a point-in-time snapshot of the storefront configuration
-    that can be used for versioning, rollback, and audit purposes.
+    that can be used for versioning, rollback, and audit purposes. Only chunks
+    that are not already stored for the storefront are written, together with
+    the delta to the previous version; checkpoint versions also keep the full
+    snapshot.
 
     Args:
         db: Database session
@@ -39,70 +188,53 @@ async def create_version(
         Newly created StorefrontVersion
 
     Raises:
-        HTTPException: 404 if tenant, user, or storefront config not found
+        HTTPException: 404 if user or storefront config not found
     """
-    # Check if tenant exists
-    tenant = db.query(Tenant).filter(Tenant.id == tenant_id).first()
-    if not tenant:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Tenant not found"
-        )
-
-    # Check if user exists
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+    if await db.get(User, user_id) is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
 
-    # Get the storefront config
-    config = (
-        db.query(StorefrontConfig)
-        .filter(StorefrontConfig.tenant_id == tenant_id)
-        .first()
-    )
-    if not config:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Storefront configuration not found",
-        )
+    config = await _get_config(db, tenant_id)
 
-    # Get the latest version number
-    latest_version = (
-        db.query(StorefrontVersion)
-        .filter(StorefrontVersion.storefront_config_id == config.id)
+    # Get the latest version
+    result = await db.execute(
+        select(StorefrontVersion)
+        .where(StorefrontVersion.storefront_config_id == config.id)
         .order_by(desc(StorefrontVersion.version_number))
-        .first()
+        .limit(1)
     )
-
-    new_version_number = 1
-    if latest_version:
-        new_version_number = latest_version.version_number + 1
-
-    # Create a snapshot of the configuration
-    config_dict = {
-        "id": str(config.id),
-        "tenant_id": str(config.tenant_id),
-        "subdomain_name": config.subdomain_name,
-        "custom_domain": config.custom_domain,
-        "domain_verified": config.domain_verified,
-        "status": config.status.value if config.status else None,
-        "meta_title": config.meta_title,
-        "meta_description": config.meta_description,
-        "theme_settings": config.theme_settings,
-        "layout_config": config.layout_config,
-        "social_links": config.social_links,
-        "published_at": (
-            config.published_at.isoformat() if config.published_at else None
-        ),
-        "scheduled_publish_at": (
-            config.scheduled_publish_at.isoformat()
-            if config.scheduled_publish_at
-            else None
-        ),
-        "published_by": str(config.published_by) if config.published_by else None,
-        "version_created_at": datetime.now(timezone.utc).isoformat(),
-    }
+    parent = result.scalars().first()
+    new_version_number = parent.version_number + 1 if parent else 1
+
+    config_dict = configuration_snapshot(config)
+    root_hash, chunks = chunk_tree(config_dict)
+
+    delta = None
+    new_chunks = chunks
+    if parent is not None:
+        if parent.root_hash is not None:
+            # Only sub-trees whose hashes differ are read back from the database
+            tree_diff = await diff_trees(
+                parent.root_hash, root_hash, _chunk_loader(db, config.id, local=chunks)
+            )
+            delta = tree_diff.ops
+            new_chunks = unshared_chunks(root_hash, chunks, tree_diff.shared_hashes)
+        else:
+            # Versions created before chunking have a full snapshot
+            delta = diff_values(parent.configuration_snapshot, config_dict)
+
+    if new_chunks:
+        await db.execute(
+            insert(StorefrontVersionChunk)
+            .values(
+                [
+                    {"storefront_config_id": config.id, "hash": digest, "content": content}
+                    for digest, content in new_chunks.items()
+                ]
+            )
+            .on_conflict_do_nothing(index_elements=["storefront_config_id", "hash"])
+        )
 
     # Create the version record
     version = StorefrontVersion(
@@ -112,18 +244,23 @@ async def create_version(
         change_summary=change_summary,
         change_description=change_description,
         tags=tags or [],
-        configuration_snapshot=config_dict,
+        parent_version_id=parent.id if parent else None,
+        root_hash=root_hash,
+        delta=delta,
+        configuration_snapshot=(
+            config_dict if parent is None or is_checkpoint(new_version_number) else None
+        ),
     )
 
     db.add(version)
-    db.commit()
-    db.refresh(version)
+    await db.commit()
+    await db.refresh(version)
 
     return version
 
 
 async def list_versions(
-    db: Session,
+    db: AsyncSession,
     tenant_id: uuid.UUID,
     limit: int = 10,
     offset: int = 0,
@@ -143,29 +280,12 @@ async def list_versions(
         Tuple of (list of versions, total count)
 
     Raises:
-        HTTPException: 404 if tenant or storefront config not found
+        HTTPException: 404 if storefront config not found
     """
-    # Check if tenant exists
-    tenant = db.query(Tenant).filter(Tenant.id == tenant_id).first()
-    if not tenant:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Tenant not found"
-        )
-
-    # Get the storefront config
-    config = (
-        db.query(StorefrontConfig)
-        .filter(StorefrontConfig.tenant_id == tenant_id)
-        .first()
-    )
-    if not config:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Storefront configuration not found",
-        )
+    config = await _get_config(db, tenant_id)
 
     # Base query
-    query = db.query(StorefrontVersion).filter(
+    query = select(StorefrontVersion).where(
         StorefrontVersion.storefront_config_id == config.id
     )
 
@@ -173,29 +293,31 @@ async def list_versions(
     if tags and len(tags) > 0:
         # This is a simplification - actual JSON array containment would depend on your database
         # For PostgreSQL you might use the @> operator
-        # query = query.filter(StorefrontVersion.tags.contains(tags))
+        # query = query.where(StorefrontVersion.tags.contains(tags))
         pass
 
     # Get total count
-    total_count = query.count()
+    total_count = (
+        await db.execute(select(func.count()).select_from(query.subquery()))
+    ).scalar_one()
 
     # Get versions with pagination
-    versions = (
-        query.order_by(desc(StorefrontVersion.created_at))
-        .offset(offset)
-        .limit(limit)
-        .all()
+    result = await db.execute(
+        query.order_by(desc(StorefrontVersion.created_at)).offset(offset).limit(limit)
     )
 
-    return versions, total_count
+    return list(result.scalars()), total_count
 
 
 async def get_version(
-    db: Session, tenant_id: uuid.UUID, version_id: uuid.UUID
+    db: AsyncSession, tenant_id: uuid.UUID, version_id: uuid.UUID
 ) -> Optional[StorefrontVersion]:
     """
     Get a specific version by ID.
 
+    The configuration_snapshot of delta-only versions is filled in from the
+    nearest checkpoint, so callers always see the full configuration.
+
     Args:
         db: Database session
         tenant_id: UUID of the tenant
@@ -205,47 +327,19 @@ async def get_version(
         StorefrontVersion or None if not found
 
     Raises:
-        HTTPException: 404 if tenant or storefront config not found
+        HTTPException: 404 if the version is not found
     """
-    # Check if tenant exists
-    tenant = db.query(Tenant).filter(Tenant.id == tenant_id).first()
-    if not tenant:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Tenant not found"
-        )
-
-    # Get the storefront config
-    config = (
-        db.query(StorefrontConfig)
-        .filter(StorefrontConfig.tenant_id == tenant_id)
-        .first()
-    )
-    if not config:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Storefront configuration not found",
-        )
-
-    # Get the version
-    version = (
-        db.query(StorefrontVersion)
-        .filter(
-            StorefrontVersion.id == version_id,
-            StorefrontVersion.storefront_config_id == config.id,
-        )
-        .first()
-    )
-
-    if not version:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Version not found"
-        )
-
+    version = (await _get_versions(db, tenant_id, [version_id]))[version_id]
+    if version.configuration_snapshot is None:
+        snapshot = await materialize_configuration(db, version)
+        # Detach the materialized copy so it is never flushed back
+        db.expunge(version)
+        version.configuration_snapshot = snapshot
     return version
 
 
 async def restore_version(
-    db: Session, tenant_id: uuid.UUID, user_id: uuid.UUID, version_id: uuid.UUID
+    db: AsyncSession, tenant_id: uuid.UUID, user_id: uuid.UUID, version_id: uuid.UUID
 ) -> StorefrontConfig:
     """
     Restore a storefront configuration to a previous version.
@@ -260,48 +354,10 @@ async def restore_version(
         Updated StorefrontConfig
 
     Raises:
-        HTTPException: 404 if tenant, user, storefront config, or version not found
+        HTTPException: 404 if user, storefront config, or version not found
     """
-    # Check if tenant exists
-    tenant = db.query(Tenant).filter(Tenant.id == tenant_id).first()
-    if not tenant:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Tenant not found"
-        )
-
-    # Check if user exists
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
-        )
-
-    # Get the storefront config
-    config = (
-        db.query(StorefrontConfig)
-        .filter(StorefrontConfig.tenant_id == tenant_id)
-        .first()
-    )
-    if not config:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Storefront configuration not found",
-        )
-
-    # Get the version
-    version = (
-        db.query(StorefrontVersion)
-        .filter(
-            StorefrontVersion.id == version_id,
-            StorefrontVersion.storefront_config_id == config.id,
-        )
-        .first()
-    )
-
-    if not version:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Version not found"
-        )
+    version = (await _get_versions(db, tenant_id, [version_id]))[version_id]
+    snapshot = await materialize_configuration(db, version)
 
     # Create a new version of the current config before restoring
     await create_version(
@@ -312,8 +368,7 @@ async def restore_version(
         change_description=f"Automatic snapshot created before restoring to version {version.version_number}",
     )
 
-    # Restore the configuration data from the snapshot
-    snapshot = version.configuration_snapshot
+    config = await _get_config(db, tenant_id)
 
     # Update configuration properties from the snapshot
     config.subdomain_name = snapshot.get("subdomain_name", config.subdomain_name)
@@ -324,8 +379,8 @@ async def restore_version(
     config.layout_config = snapshot.get("layout_config", config.layout_config)
     config.social_links = snapshot.get("social_links", config.social_links)
 
-    db.commit()
-    db.refresh(config)
+    await db.commit()
+    await db.refresh(config)
 
     # Create a new version to record the restore action
     await create_version(
@@ -340,12 +395,55 @@ async def restore_version(
     return config
 
 
+async def version_delta(
+    db: AsyncSession, version1: StorefrontVersion, version2: StorefrontVersion
+) -> List[Dict[str, Any]]:
+    """
+    Delta that turns the configuration of version1 into that of version2.
+
+    Adjacent versions reuse the stored delta; chunked versions are compared by
+    walking only the sub-trees whose hashes differ. Versions created before
+    chunking are materialized and compared in memory.
+    """
+    if version1.id == version2.id:
+        return []
+    if version2.parent_version_id == version1.id and version2.delta is not None:
+        return version2.delta
+    if version1.parent_version_id == version2.id and version1.delta is not None:
+        return invert_delta(version1.delta)
+    if version1.root_hash and version2.root_hash:
+        tree_diff = await diff_trees(
+            version1.root_hash,
+            version2.root_hash,
+            _chunk_loader(db, version1.storefront_config_id),
+        )
+        return tree_diff.ops
+    return diff_values(
+        await materialize_configuration(db, version1),
+        await materialize_configuration(db, version2),
+    )
+
+
+def _version_metadata(version: StorefrontVersion) -> Dict[str, Any]:
+    return {
+        "id": str(version.id),
+        "number": version.version_number,
+        "created_at": version.created_at.isoformat() if version.created_at else None,
+        "created_by": str(version.created_by),
+        "summary": version.change_summary,
+    }
+
+
 async def compare_versions(
-    db: Session, tenant_id: uuid.UUID, version_id1: uuid.UUID, version_id2: uuid.UUID
+    db: AsyncSession, tenant_id: uuid.UUID, version_id1: uuid.UUID, version_id2: uuid.UUID
 ) -> Dict[str, Any]:
     """
     Compare two versions and generate a diff of the changes.
 
+    Both versions are loaded in one query scoped to the tenant's storefront.
+    The cost of the comparison grows with the size of the change, not with the
+    size of the configuration.
+
     Args:
         db: Database session
         tenant_id: UUID of the tenant
@@ -353,95 +451,22 @@ async def compare_versions(
         version_id2: UUID of the second version
 
     Returns:
-        Dictionary containing the differences between versions
+        Dictionary containing the differences between versions. Each difference
+        is an add, remove or replace operation on a path of keys and indexes.
 
     Raises:
-        HTTPException: 404 if tenant, storefront config, or versions not found
+        HTTPException: 404 if either version is not found
     """
-    # Check if tenant exists
-    tenant = db.query(Tenant).filter(Tenant.id == tenant_id).first()
-    if not tenant:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Tenant not found"
-        )
-
-    # Get the storefront config
-    config = (
-        db.query(StorefrontConfig)
-        .filter(StorefrontConfig.tenant_id == tenant_id)
-        .first()
-    )
-    if not config:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Storefront configuration not found",
-        )
+    versions = await _get_versions(db, tenant_id, [version_id1, version_id2])
+    version1, version2 = versions[version_id1], versions[version_id2]
 
-    # Get the first version
-    version1 = (
-        db.query(StorefrontVersion)
-        .filter(
-            StorefrontVersion.id == version_id1,
-            StorefrontVersion.storefront_config_id == config.id,
-        )
-        .first()
-    )
+    diff = await version_delta(db, version1, version2)
 
-    if not version1:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Version {version_id1} not found",
-        )
-
-    # Get the second version
-    version2 = (
-        db.query(StorefrontVersion)
-        .filter(
-            StorefrontVersion.id == version_id2,
-            StorefrontVersion.storefront_config_id == config.id,
-        )
-        .first()
-    )
-
-    if not version2:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Version {version_id2} not found",
-        )
-
-    # Compare the two snapshots
-    diff = DeepDiff(
-        version1.configuration_snapshot,
-        version2.configuration_snapshot,
-        ignore_order=True,
-        verbose_level=2,
-    )
-
-    # Prepare a more readable diff result
-    result = {
+    return {
         "metadata": {
-            "version1": {
-                "id": str(version1.id),
-                "number": version1.version_number,
-                "created_at": version1.created_at.isoformat(),
-                "created_by": str(version1.created_by),
-                "summary": version1.change_summary,
-            },
-            "version2": {
-                "id": str(version2.id),
-                "number": version2.version_number,
-                "created_at": version2.created_at.isoformat(),
-                "created_by": str(version2.created_by),
-                "summary": version2.change_summary,
-            },
+            "version1": _version_metadata(version1),
+            "version2": _version_metadata(version2),
         },
         "differences": diff,
-        "summary": {
-            "added": len(diff.get("dictionary_item_added", [])),
-            "removed": len(diff.get("dictionary_item_removed", [])),
-            "changed": len(diff.get("values_changed", [])),
-            "type_changes": len(diff.get("type_changes", [])),
-        },
+        "summary": summarize_delta(diff),
     }
-
-    return result
@@ -14,6 +14,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.tenant import Tenant
 from app.core.errors.exceptions import EntityNotFoundException, DuplicateEntityException
+from app.services.whatsapp_outbound_service import whatsapp_sender
 
 
 class TenantService:
@@ -262,6 +263,7 @@ class TenantService:
         # Commit changes
         await db.commit()
         await db.refresh(tenant)
+        whatsapp_sender.invalidate_credentials(tenant_id)
 
         return tenant
 
@@ -287,3 +289,4 @@ class TenantService:
         # Delete tenant
         await db.delete(tenant)
         await db.commit()
+        whatsapp_sender.invalidate_credentials(tenant_id)
@@ -0,0 +1,471 @@
+"""
+WhatsApp webhook ingest queue.
+
+The webhook endpoint verifies the signature, records every incoming message
+in ``webhook_events`` and acknowledges Meta straight away. Processing happens
+afterwards in a pool of partition workers.
+
+Provides:
+- Dedup by WhatsApp message id, using the unique (provider, event_id) index
+  on ``webhook_events`` so retried deliveries are dropped in one round trip
+- Durability: rows are recorded as pending and only marked processed once
+  the handler succeeds; a sweep re-queues pending rows left behind by a
+  crash or restart
+- Retries in place: a failed message is retried with backoff up to
+  ``max_attempts`` before its partition moves on, so later messages of the
+  conversation never overtake it
+- Per-conversation ordering: a (business number, customer number) pair always
+  maps to the same partition, and each partition has a single consumer
+- Concurrency across conversations: partitions are drained in parallel
+- Queue depth, oldest-item age and ingest-to-processing lag metrics
+
+A business number belongs to exactly one tenant, so partitioning by the
+business number gives per-tenant ordering without a tenant lookup on the
+request path.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.monitoring.webhook_metrics import WebhookMetrics
+from app.db.models.webhook_event import WebhookEvent, WebhookEventStatus
+
+logger = logging.getLogger(__name__)
+
+# State transitions run as Core statements on the table
+webhook_events = WebhookEvent.__table__
+
+PROVIDER = "whatsapp"
+DEFAULT_PARTITIONS = 8
+DEFAULT_MAX_PENDING_PER_PARTITION = 1000
+MAX_ATTEMPTS = 5
+# Delay before the first in-place retry of a failed message; doubles per attempt
+RETRY_BACKOFF_SECONDS = 1.0
+# Pending rows older than this are not in any live worker's queue
+PENDING_GRACE_SECONDS = 60
+# Messages processing for longer than this are assumed to belong to a dead worker
+PROCESSING_TIMEOUT_SECONDS = 300
+SWEEP_INTERVAL_SECONDS = 30
+SWEEP_BATCH_SIZE = 500
+
+
+@dataclass
+class IngestedMessage:
+    """A text message accepted from the WhatsApp webhook, waiting to be processed."""
+
+    message_id: str
+    business_number: str
+    customer_number: str
+    body: str
+    timestamp: datetime
+    payload: Dict[str, Any]
+    received_at: float = field(default_factory=time.monotonic)
+    # Backed by a webhook_events row whose status the worker maintains
+    recorded: bool = False
+
+    @property
+    def conversation_key(self) -> str:
+        return f"{self.business_number}:{self.customer_number}"
+
+
+MessageHandler = Callable[[IngestedMessage], Awaitable[None]]
+
+
+def extract_messages(data: Dict[str, Any]) -> List[IngestedMessage]:
+    """
+    Pull the text messages out of a WhatsApp Business webhook payload.
+
+    Args:
+        data: Parsed webhook body
+
+    Returns:
+        Messages in payload order; non-text messages and messages without an
+        id are skipped
+    """
+    if data.get("object") != "whatsapp_business_account":
+        return []
+
+    messages = []
+    for entry in data.get("entry", []):
+        for change in entry.get("changes", []):
+            value = change.get("value", {})
+            metadata = value.get("metadata", {})
+            for message in value.get("messages", []):
+                if message.get("type") != "text" or not message.get("id"):
+                    continue
+                business_number = message.get("to") or metadata.get("display_phone_number") or ""
+                messages.append(_message_from_payload(message, business_number))
+    return messages
+
+
+def _message_from_payload(message: Dict[str, Any], business_number: str) -> IngestedMessage:
+    return IngestedMessage(
+        message_id=message["id"],
+        business_number=business_number,
+        customer_number=message.get("from", ""),
+        body=message.get("text", {}).get("body", ""),
+        timestamp=datetime.fromtimestamp(int(message.get("timestamp", 0))),
+        payload=message,
+    )
+
+
+def message_from_record(payload: str) -> IngestedMessage:
+    """Rebuild a message from the payload ``record`` stored in ``webhook_events``."""
+    message = json.loads(payload)
+    ingested = _message_from_payload(message, message.get("to", ""))
+    ingested.recorded = True
+    return ingested
+
+
+class WhatsAppIngestQueue:
+    """
+    Partitioned in-process work queue for WhatsApp messages.
+
+    Workers start lazily on the first enqueue and run until ``stop()``;
+    ``start()`` also runs the pending-message sweep and should be called on
+    application startup.
+    """
+
+    def __init__(
+        self,
+        handler: Optional[MessageHandler] = None,
+        partitions: int = DEFAULT_PARTITIONS,
+        max_pending_per_partition: int = DEFAULT_MAX_PENDING_PER_PARTITION,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+        max_attempts: int = MAX_ATTEMPTS,
+        sweep_interval: float = SWEEP_INTERVAL_SECONDS,
+        retry_backoff: float = RETRY_BACKOFF_SECONDS,
+    ):
+        self.handler = handler
+        self.partitions = partitions
+        self.max_pending_per_partition = max_pending_per_partition
+        self._session_factory = session_factory
+        self.max_attempts = max_attempts
+        self.sweep_interval = sweep_interval
+        self.retry_backoff = retry_backoff
+        self._queues: List[asyncio.Queue] = []
+        self._workers: List[asyncio.Task] = []
+        # Recorded message ids waiting in this worker's partitions
+        self._queued: Set[str] = set()
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def _session(self) -> AsyncSession:
+        if self._session_factory is None:
+            from app.core.db.session import AsyncSessionLocal
+
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory()
+
+    def set_handler(self, handler: MessageHandler) -> None:
+        """Set the coroutine that processes one message."""
+        self.handler = handler
+
+    def partition_for(self, message: IngestedMessage) -> int:
+        """Return the partition for a message; stable for a given conversation."""
+        return zlib.crc32(message.conversation_key.encode("utf-8")) % self.partitions
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    def pending(self) -> int:
+        """Number of messages waiting in all partitions."""
+        return sum(queue.qsize() for queue in self._queues)
+
+    def start(self) -> None:
+        """Start the partition workers and the pending-message sweep (idempotent)."""
+        self._ensure_workers()
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_loop(), name="whatsapp-ingest-sweep")
+
+    def _ensure_workers(self) -> None:
+        if self.running:
+            return
+        self._queues = [asyncio.Queue(maxsize=self.max_pending_per_partition) for _ in range(self.partitions)]
+        self._workers = [
+            asyncio.create_task(self._worker(index), name=f"whatsapp-ingest-{index}")
+            for index in range(self.partitions)
+        ]
+        logger.info(f"Started WhatsApp ingest queue with {self.partitions} partitions")
+
+    async def stop(self, drain_timeout: float = 10.0) -> None:
+        """Wait up to ``drain_timeout`` seconds for queued messages, then stop workers."""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in self._queues)),
+                timeout=drain_timeout,
+            )
+        except asyncio.TimeoutError:
+            # Left pending in the database; the next sweep picks them up
+            logger.warning(f"Stopping WhatsApp ingest queue with {self.pending()} messages unprocessed")
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queues = []
+        self._queued.clear()
+
+    async def record(self, db: AsyncSession, messages: List[IngestedMessage]) -> List[IngestedMessage]:
+        """
+        Persist raw messages to ``webhook_events`` as pending and return the ones not seen before.
+
+        Args:
+            db: Async database session
+            messages: Messages extracted from one webhook delivery
+
+        Returns:
+            The subset of ``messages`` that were newly inserted
+        """
+        if not messages:
+            return []
+
+        WebhookMetrics.record_received(PROVIDER)
+        now = datetime.utcnow()
+        stmt = (
+            pg_insert(WebhookEvent)
+            .values(
+                [
+                    {
+                        "id": uuid.uuid4(),
+                        "provider": PROVIDER,
+                        "event_id": message.message_id,
+                        "event_type": "message",
+                        # "to" lets the sweep rebuild the message without the envelope
+                        "payload": json.dumps(dict(message.payload, to=message.business_number)),
+                        "status": WebhookEventStatus.PENDING,
+                        "attempts": 0,
+                        "received_at": now,
+                        "updated_at": now,
+                    }
+                    for message in messages
+                ]
+            )
+            .on_conflict_do_nothing(index_elements=["provider", "event_id"])
+            .returning(WebhookEvent.event_id)
+        )
+        result = await db.execute(stmt)
+        inserted = set(result.scalars().all())
+        await db.commit()
+
+        fresh = []
+        for message in messages:
+            if message.message_id in inserted:
+                inserted.discard(message.message_id)
+                message.recorded = True
+                fresh.append(message)
+            else:
+                WebhookMetrics.record_processed(PROVIDER, "duplicate")
+        return fresh
+
+    async def enqueue(self, message: IngestedMessage) -> None:
+        """Queue a message on its conversation's partition, waiting if the partition is full."""
+        self._ensure_workers()
+        if message.recorded:
+            if message.message_id in self._queued:
+                return
+            self._queued.add(message.message_id)
+        await self._queues[self.partition_for(message)].put(message)
+
+    async def _claim(self, message_id: str) -> Optional[int]:
+        """
+        Move a recorded message to processing.
+
+        Returns:
+            The attempt number, or None if another worker owns the message or
+            it is already finished
+        """
+        now = datetime.utcnow()
+        async with self._session() as db:
+            result = await db.execute(
+                update(webhook_events)
+                .where(
+                    webhook_events.c.provider == PROVIDER,
+                    webhook_events.c.event_id == message_id,
+                    or_(
+                        webhook_events.c.status == WebhookEventStatus.PENDING,
+                        and_(
+                            webhook_events.c.status == WebhookEventStatus.PROCESSING,
+                            webhook_events.c.updated_at < now - timedelta(seconds=PROCESSING_TIMEOUT_SECONDS),
+                        ),
+                    ),
+                )
+                .values(status=WebhookEventStatus.PROCESSING, attempts=webhook_events.c.attempts + 1, updated_at=now)
+                .returning(webhook_events.c.attempts)
+            )
+            attempts = result.scalar_one_or_none()
+            await db.commit()
+            return attempts
+
+    async def _retry(self, message_id: str, error: Exception) -> int:
+        """
+        Record a failed attempt of a message that is retried in place.
+
+        The row stays processing, owned by this worker, with a fresh
+        ``updated_at`` so the sweep does not take it over.
+
+        Returns:
+            The next attempt number
+        """
+        async with self._session() as db:
+            result = await db.execute(
+                update(webhook_events)
+                .where(webhook_events.c.provider == PROVIDER, webhook_events.c.event_id == message_id)
+                .values(
+                    attempts=webhook_events.c.attempts + 1,
+                    last_error=str(error)[:2000],
+                    updated_at=datetime.utcnow(),
+                )
+                .returning(webhook_events.c.attempts)
+            )
+            attempts = result.scalar_one()
+            await db.commit()
+            return attempts
+
+    async def _finish(self, message_id: str, attempts: int, error: Optional[Exception]) -> str:
+        """Record the final outcome of a recorded message; returns the metrics outcome."""
+        if error is None:
+            values = {"status": WebhookEventStatus.PROCESSED, "processed_at": datetime.utcnow(), "last_error": None}
+            outcome = "success"
+        else:
+            values = {"status": WebhookEventStatus.FAILED, "last_error": str(error)[:2000]}
+            outcome = "failed"
+        async with self._session() as db:
+            await db.execute(
+                update(webhook_events)
+                .where(webhook_events.c.provider == PROVIDER, webhook_events.c.event_id == message_id)
+                .values(updated_at=datetime.utcnow(), **values)
+            )
+            await db.commit()
+        return outcome
+
+    async def sweep(self) -> int:
+        """
+        Re-queue recorded messages no live worker is processing.
+
+        Returns:
+            Number of messages re-queued
+        """
+        now = datetime.utcnow()
+        async with self._session() as db:
+            result = await db.execute(
+                select(webhook_events.c.payload)
+                .where(
+                    webhook_events.c.provider == PROVIDER,
+                    or_(
+                        and_(
+                            webhook_events.c.status == WebhookEventStatus.PENDING,
+                            webhook_events.c.updated_at < now - timedelta(seconds=PENDING_GRACE_SECONDS),
+                        ),
+                        and_(
+                            webhook_events.c.status == WebhookEventStatus.PROCESSING,
+                            webhook_events.c.updated_at < now - timedelta(seconds=PROCESSING_TIMEOUT_SECONDS),
+                        ),
+                    ),
+                )
+                # Oldest first keeps each conversation in order
+                .order_by(webhook_events.c.received_at)
+                .limit(SWEEP_BATCH_SIZE)
+            )
+            payloads = list(result.scalars().all())
+
+        requeued = 0
+        for payload in payloads:
+            try:
+                message = message_from_record(payload)
+            except (ValueError, KeyError, TypeError) as e:
+                logger.error(f"Skipping unreadable WhatsApp webhook record: {str(e)}")
+                continue
+            if message.message_id not in self._queued:
+                await self.enqueue(message)
+                requeued += 1
+        if requeued:
+            logger.info(f"Re-queued {requeued} pending WhatsApp messages")
+        return requeued
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"WhatsApp ingest sweep failed: {str(e)}")
+            await asyncio.sleep(self.sweep_interval)
+
+    async def _handle(self, message: IngestedMessage) -> Optional[Exception]:
+        """Run the handler once; returns its error, if any."""
+        try:
+            with WebhookMetrics.track_processing_time(PROVIDER):
+                await self.handler(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error processing WhatsApp message {message.message_id}: {str(e)}")
+            return e
+        return None
+
+    async def _worker(self, index: int) -> None:
+        queue = self._queues[index]
+        while True:
+            message = await queue.get()
+            try:
+                lag = time.monotonic() - message.received_at
+                WebhookMetrics.record_queue_lag(PROVIDER, lag)
+                WebhookMetrics.update_queue_metrics(PROVIDER, self.pending(), lag)
+
+                if self.handler is None:
+                    # Recorded messages stay pending for a worker that has one
+                    logger.error("WhatsApp ingest queue has no handler; dropping message")
+                    WebhookMetrics.record_processed(PROVIDER, "failed")
+                    continue
+
+                attempts = None
+                if message.recorded:
+                    attempts = await self._claim(message.message_id)
+                    if attempts is None:
+                        continue
+
+                error = await self._handle(message)
+                # Retry in place; moving on would let later messages of the conversation overtake it
+                while error is not None and attempts is not None and attempts < self.max_attempts:
+                    WebhookMetrics.record_processed(PROVIDER, "error")
+                    await asyncio.sleep(self.retry_backoff * (2 ** (attempts - 1)))
+                    attempts = await self._retry(message.message_id, error)
+                    error = await self._handle(message)
+
+                if attempts is not None:
+                    outcome = await self._finish(message.message_id, attempts, error)
+                else:
+                    outcome = "success" if error is None else "failed"
+                WebhookMetrics.record_processed(PROVIDER, outcome)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Bookkeeping failed; the row stays unfinished and the sweep retries it
+                WebhookMetrics.record_processed(PROVIDER, "failed")
+                logger.error(f"Error recording WhatsApp message {message.message_id}: {str(e)}")
+            finally:
+                self._queued.discard(message.message_id)
+                queue.task_done()
+
+
+# Global ingest queue; the webhook endpoint registers the message handler
+whatsapp_ingest_queue = WhatsAppIngestQueue()
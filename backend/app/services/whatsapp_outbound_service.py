@@ -0,0 +1,468 @@
+"""
+Outbound WhatsApp messaging service.
+
+Replies are queued and delivered by background workers so conversation
+processing never waits on Twilio or the Graph API.
+
+Provides:
+- Per-tenant credential cache with a TTL (no DB query per message)
+- Delivery over the shared pooled ``outbound_http`` client, so Twilio and
+  Graph API connections are kept alive instead of rebuilt per send
+- Per-conversation ordering: replies to one customer from one tenant share a
+  single-consumer partition, so multi-message replies arrive in order
+- Rate shaping with a token bucket per sending number, sized to the
+  provider's per-number throughput limit
+- Retries with exponential backoff and jitter for 429, 5xx and connection
+  failures; a send that may have reached the provider (e.g. a read timeout)
+  is never retried, so customers don't get duplicate replies
+- Delivery receipt tracking, fed from the WhatsApp webhook ``statuses`` and
+  from Twilio status callbacks (``TWILIO_STATUS_CALLBACK_URL``)
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from prometheus_client import Counter, Histogram
+from sqlalchemy import select
+
+from app.core.config.settings import get_settings
+from app.core.http.outbound import outbound_http, request_not_sent
+from app.core.resilience.retry_manager import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+whatsapp_outbound_messages = Counter(
+    "whatsapp_outbound_messages_total",
+    "Outbound WhatsApp messages by provider and outcome",
+    ["provider", "outcome"],  # outcome: sent, failed, retried, dropped, unknown
+)
+whatsapp_outbound_queue_lag = Histogram(
+    "whatsapp_outbound_queue_lag_seconds",
+    "Time an outbound WhatsApp message waited before its first send attempt",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+whatsapp_delivery_status = Counter(
+    "whatsapp_delivery_status_total",
+    "Delivery receipts received for outbound WhatsApp messages",
+    ["status"],  # sent, delivered, read, failed
+)
+
+WHATSAPP_API_VERSION = os.getenv("WHATSAPP_API_VERSION", "v16.0")
+TWILIO_API_BASE = "https://api.twilio.com/2010-04-01"
+
+# Default per-number throughput for both Twilio and the Cloud API
+DEFAULT_MESSAGES_PER_SECOND = 80.0
+DEFAULT_PARTITIONS = 8
+DEFAULT_MAX_ATTEMPTS = 4
+DEFAULT_BASE_BACKOFF = 0.5
+MAX_BACKOFF = 10.0
+CREDENTIAL_TTL_SECONDS = 300
+MAX_TRACKED_RECEIPTS = 10000
+
+
+class WhatsAppCredential:
+    """Represents credentials for a tenant's WhatsApp integration"""
+
+    def __init__(
+        self,
+        tenant_id: str,
+        whatsapp_number: str,
+        access_token: str = None,
+        phone_number_id: str = None,
+    ):
+        self.tenant_id = tenant_id
+        self.whatsapp_number = whatsapp_number
+        # If tenant doesn't have their own credentials, use Twilio integration
+        self.access_token = access_token
+        self.phone_number_id = phone_number_id
+        self.use_twilio = (access_token is None) or (phone_number_id is None)
+
+
+class RetryableSendError(Exception):
+    """Raised when a send failed in a way that is worth retrying."""
+
+
+class UnknownOutcomeError(Exception):
+    """Raised when a send failed after the request may have reached the provider."""
+
+
+def _send_failed(error: Exception) -> Exception:
+    """Classify a transport failure of a (non-idempotent) send."""
+    if request_not_sent(error):
+        return RetryableSendError(str(error))
+    return UnknownOutcomeError(str(error))
+
+
+@dataclass
+class OutboundWhatsAppMessage:
+    """A reply waiting to be delivered."""
+
+    tenant_id: Any
+    to_number: str
+    body: str
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def conversation_key(self) -> str:
+        return f"{self.tenant_id}:{self.to_number}"
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` tokens per second, up to ``burst`` banked."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class DeliveryReceiptTracker:
+    """
+    Bounded record of recently sent messages and their latest delivery status.
+
+    Statuses only move forward (sent -> delivered -> read); a late "sent"
+    receipt never overwrites "read". "failed" always wins.
+    """
+
+    STATUS_ORDER = {"queued": 0, "sent": 1, "delivered": 2, "read": 3}
+    # Provider statuses that mean the same as one of ours
+    STATUS_ALIASES = {"undelivered": "failed"}
+
+    def __init__(self, max_entries: int = MAX_TRACKED_RECEIPTS):
+        self.max_entries = max_entries
+        self._receipts: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def record_sent(self, provider_message_id: str, tenant_id: Any, to_number: str, provider: str) -> None:
+        self._receipts[provider_message_id] = {
+            "tenant_id": tenant_id,
+            "to_number": to_number,
+            "provider": provider,
+            "status": "sent",
+            "updated_at": time.time(),
+        }
+        self._receipts.move_to_end(provider_message_id)
+        while len(self._receipts) > self.max_entries:
+            self._receipts.popitem(last=False)
+
+    def update(self, provider_message_id: str, status: str, timestamp: Optional[float] = None) -> bool:
+        """Apply a delivery receipt; returns False for messages not tracked here."""
+        status = self.STATUS_ALIASES.get(status, status)
+        whatsapp_delivery_status.labels(status=status).inc()
+        receipt = self._receipts.get(provider_message_id)
+        if receipt is None:
+            return False
+
+        current = receipt["status"]
+        if status == "failed" or current == "failed":
+            receipt["status"] = "failed"
+        elif self.STATUS_ORDER.get(status, 0) > self.STATUS_ORDER.get(current, 0):
+            receipt["status"] = status
+        receipt["updated_at"] = timestamp or time.time()
+        return True
+
+    def get(self, provider_message_id: str) -> Optional[Dict[str, Any]]:
+        return self._receipts.get(provider_message_id)
+
+
+def extract_statuses(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Pull delivery status updates out of a WhatsApp Business webhook payload."""
+    if data.get("object") != "whatsapp_business_account":
+        return []
+    return [
+        status
+        for entry in data.get("entry", [])
+        for change in entry.get("changes", [])
+        for status in change.get("value", {}).get("statuses", [])
+        if status.get("id") and status.get("status")
+    ]
+
+
+CredentialLoader = Callable[[Any], Awaitable[Optional[WhatsAppCredential]]]
+
+
+class WhatsAppOutboundService:
+    """
+    Queued, rate-shaped WhatsApp sender shared by all tenants.
+
+    Workers start lazily on the first ``send_reply`` and run until ``stop()``.
+    """
+
+    def __init__(
+        self,
+        credential_loader: Optional[CredentialLoader] = None,
+        messages_per_second: float = DEFAULT_MESSAGES_PER_SECOND,
+        partitions: int = DEFAULT_PARTITIONS,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        base_backoff: float = DEFAULT_BASE_BACKOFF,
+        credential_ttl: float = CREDENTIAL_TTL_SECONDS,
+    ):
+        settings = get_settings()
+        self.twilio_account_sid = getattr(settings, "TWILIO_ACCOUNT_SID", None)
+        self.twilio_auth_token = getattr(settings, "TWILIO_AUTH_TOKEN", None)
+        self.twilio_whatsapp_number = getattr(settings, "TWILIO_WHATSAPP_FROM", None)
+        self.twilio_status_callback = getattr(settings, "TWILIO_STATUS_CALLBACK_URL", "")
+
+        self.messages_per_second = messages_per_second
+        self.partitions = partitions
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.credential_ttl = credential_ttl
+        self.receipts = DeliveryReceiptTracker()
+
+        self._credential_loader = credential_loader or self._load_credentials
+        self._credentials: Dict[str, Tuple[float, Optional[WhatsAppCredential]]] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._queues: List[asyncio.Queue] = []
+        self._workers: List[asyncio.Task] = []
+
+    async def _load_credentials(self, tenant_id: Any) -> Optional[WhatsAppCredential]:
+        from app.core.db.session import AsyncSessionLocal
+        from app.models.tenant import Tenant
+
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(select(Tenant).where(Tenant.id == tenant_id))
+            tenant = result.scalars().first()
+
+        if not tenant or not tenant.whatsapp_number:
+            return None
+
+        # Tenant-owned Cloud API credentials are not stored yet, so every
+        # tenant sends through the platform Twilio account for now
+        return WhatsAppCredential(
+            tenant_id=tenant.id,
+            whatsapp_number=tenant.whatsapp_number,
+            access_token=None,
+            phone_number_id=None,
+        )
+
+    async def get_credentials(self, tenant_id: Any) -> Optional[WhatsAppCredential]:
+        """Return the tenant's credentials from cache, loading them at most once per TTL."""
+        # Callers pass UUIDs or strings; key by the string form
+        key = str(tenant_id)
+        cached = self._credentials.get(key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        credentials = await self._credential_loader(tenant_id)
+        self._credentials[key] = (time.monotonic() + self.credential_ttl, credentials)
+        return credentials
+
+    def invalidate_credentials(self, tenant_id: Any) -> None:
+        """
+        Drop cached credentials after a tenant changes its WhatsApp settings.
+
+        Only this worker's cache is dropped; other workers pick the change
+        up within ``credential_ttl``.
+        """
+        self._credentials.pop(str(tenant_id), None)
+
+    def _bucket_for(self, sender: str) -> TokenBucket:
+        bucket = self._buckets.get(sender)
+        if bucket is None:
+            bucket = self._buckets[sender] = TokenBucket(self.messages_per_second)
+        return bucket
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    def pending(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+
+    def start(self) -> None:
+        """Start the delivery workers (idempotent)."""
+        if self.running:
+            return
+        self._queues = [asyncio.Queue() for _ in range(self.partitions)]
+        self._workers = [
+            asyncio.create_task(self._worker(index), name=f"whatsapp-outbound-{index}")
+            for index in range(self.partitions)
+        ]
+
+    async def stop(self, drain_timeout: float = 10.0) -> None:
+        """Wait up to ``drain_timeout`` seconds for queued replies, then stop workers."""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in self._queues)),
+                timeout=drain_timeout,
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Stopping WhatsApp sender with {self.pending()} replies undelivered")
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queues = []
+
+    async def send_reply(self, tenant_id: Any, to_number: str, body: str) -> None:
+        """
+        Queue a reply for delivery and return immediately.
+
+        Replies to the same customer from the same tenant are delivered in the
+        order they were queued.
+        """
+        if not body:
+            return
+        if not self.running:
+            self.start()
+        message = OutboundWhatsAppMessage(tenant_id=tenant_id, to_number=to_number, body=body)
+        partition = zlib.crc32(message.conversation_key.encode("utf-8")) % self.partitions
+        self._queues[partition].put_nowait(message)
+
+    async def _worker(self, index: int) -> None:
+        queue = self._queues[index]
+        while True:
+            message = await queue.get()
+            try:
+                whatsapp_outbound_queue_lag.observe(time.monotonic() - message.enqueued_at)
+                await self.deliver(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error delivering WhatsApp reply to {message.to_number}: {str(e)}")
+            finally:
+                queue.task_done()
+
+    async def deliver(self, message: OutboundWhatsAppMessage) -> Optional[str]:
+        """
+        Send one message with rate shaping and retries.
+
+        Returns:
+            The provider message id, or None if the message could not be sent
+        """
+        credentials = await self.get_credentials(message.tenant_id)
+        if not credentials:
+            logger.error(f"No WhatsApp credentials found for tenant {message.tenant_id}")
+            whatsapp_outbound_messages.labels("none", "dropped").inc()
+            return None
+
+        provider = "twilio" if credentials.use_twilio else "whatsapp_graph"
+        sender = credentials.whatsapp_number if credentials.use_twilio else credentials.phone_number_id
+        bucket = self._bucket_for(f"{provider}:{sender}")
+
+        for attempt in range(1, self.max_attempts + 1):
+            await bucket.acquire()
+            try:
+                if credentials.use_twilio:
+                    message_id = await self._send_via_twilio(credentials, message.to_number, message.body)
+                else:
+                    message_id = await self._send_via_graph_api(credentials, message.to_number, message.body)
+            except RetryableSendError as e:
+                if attempt == self.max_attempts:
+                    logger.error(f"Giving up on WhatsApp reply to {message.to_number} after {attempt} attempts: {e}")
+                    break
+                whatsapp_outbound_messages.labels(provider, "retried").inc()
+                delay = min(self.base_backoff * (2 ** (attempt - 1)), MAX_BACKOFF)
+                await asyncio.sleep(delay * (0.5 + random.random() / 2))
+                continue
+            except UnknownOutcomeError as e:
+                # The provider may have accepted it; resending risks a duplicate reply
+                logger.error(f"WhatsApp reply to {message.to_number} may not have been sent: {e}")
+                whatsapp_outbound_messages.labels(provider, "unknown").inc()
+                return None
+
+            if message_id is None:
+                break
+            whatsapp_outbound_messages.labels(provider, "sent").inc()
+            self.receipts.record_sent(message_id, message.tenant_id, message.to_number, provider)
+            return message_id
+
+        whatsapp_outbound_messages.labels(provider, "failed").inc()
+        return None
+
+    @staticmethod
+    def _check_response(provider: str, response: httpx.Response) -> bool:
+        """Raise for retryable statuses; return False for permanent failures."""
+        if response.status_code == 429 or response.status_code >= 500:
+            raise RetryableSendError(f"{provider} returned HTTP {response.status_code}")
+        if response.status_code >= 400:
+            logger.error(f"Failed to send WhatsApp via {provider}: {response.text}")
+            return False
+        return True
+
+    async def _send_via_twilio(self, credentials: WhatsAppCredential, to_number: str, body: str) -> Optional[str]:
+        """Send message using the Twilio REST API; returns the message SID"""
+        if not (self.twilio_account_sid and self.twilio_auth_token):
+            logger.error("Twilio credentials not configured")
+            return None
+
+        # If tenant has their own WhatsApp number, use it
+        # Otherwise fall back to platform WhatsApp number
+        from_whatsapp = credentials.whatsapp_number or self.twilio_whatsapp_number
+        if not from_whatsapp:
+            logger.error("No WhatsApp number available for sending")
+            return None
+
+        url = f"{TWILIO_API_BASE}/Accounts/{self.twilio_account_sid}/Messages.json"
+        data = {
+            "Body": body,
+            "From": f"whatsapp:{from_whatsapp}",
+            "To": f"whatsapp:{to_number}",
+        }
+        if self.twilio_status_callback:
+            data["StatusCallback"] = self.twilio_status_callback
+        try:
+            response = await outbound_http.post(
+                "twilio",
+                url,
+                auth=(self.twilio_account_sid, self.twilio_auth_token),
+                data=data,
+            )
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            raise _send_failed(e) from e
+
+        if not self._check_response("twilio", response):
+            return None
+        return response.json().get("sid")
+
+    async def _send_via_graph_api(self, credentials: WhatsAppCredential, to_number: str, body: str) -> Optional[str]:
+        """Send message using the Meta Graph API; returns the WhatsApp message id"""
+        url = f"https://graph.facebook.com/{WHATSAPP_API_VERSION}/{credentials.phone_number_id}/messages"
+        try:
+            response = await outbound_http.post(
+                "whatsapp_graph",
+                url,
+                headers={"Authorization": f"Bearer {credentials.access_token}"},
+                json={
+                    "messaging_product": "whatsapp",
+                    "recipient_type": "individual",
+                    "to": to_number,
+                    "type": "text",
+                    "text": {"body": body},
+                },
+            )
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            raise _send_failed(e) from e
+
+        if not self._check_response("whatsapp_graph", response):
+            return None
+        messages = response.json().get("messages") or [{}]
+        return messages[0].get("id") or str(uuid.uuid4())
+
+
+# Global sender instance
+whatsapp_sender = WhatsAppOutboundService()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Cache codec benchmark.
+
+Compares the legacy ``json.dumps(default=str)`` cache encoding with every
+installed serializer/compressor combination of the cache codec, on payloads
+shaped like a cached storefront catalog and an analytics dashboard.
+
+Usage:
+    python scripts/benchmark_cache_codec.py [--products 500] [--days 90] [--rounds 50]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.cache.codec import COMPRESSORS, SERIALIZERS, CacheCodec  # noqa: E402
+
+
+def storefront_catalog(products: int) -> dict:
+    """Product listing as cached for a storefront page."""
+    rng = random.Random(7)
+    created = datetime(2025, 1, 1)
+    return {
+        "tenant_id": str(uuid.UUID(int=1)),
+        "page": 1,
+        "total": products,
+        "items": [
+            {
+                "id": str(uuid.UUID(int=index + 100)),
+                "name": f"Handwoven basket {index}",
+                "description": "Sustainably sourced, handmade by local artisans. " * 3,
+                "price": round(rng.uniform(5, 500), 2),
+                "currency": "KES",
+                "stock_quantity": rng.randint(0, 200),
+                "is_featured": index % 10 == 0,
+                "images": [
+                    f"https://res.cloudinary.com/demo/image/upload/v1/products/{index}_{n}.jpg"
+                    for n in range(3)
+                ],
+                "tags": ["home", "handmade", "basket"][: 1 + index % 3],
+                "variants": [
+                    {"sku": f"SKU-{index}-{size}", "size": size, "price_delta": delta}
+                    for size, delta in (("S", 0), ("M", 5), ("L", 10))
+                ],
+                "created_at": (created + timedelta(hours=index)).isoformat(),
+            }
+            for index in range(products)
+        ],
+    }
+
+
+def analytics_dashboard(days: int) -> dict:
+    """Daily metric series plus breakdowns as cached for an analytics view."""
+    rng = random.Random(11)
+    start = datetime(2025, 1, 1)
+    return {
+        "tenant_id": str(uuid.UUID(int=1)),
+        "period": {"start": start.isoformat(), "end": (start + timedelta(days=days)).isoformat()},
+        "series": [
+            {
+                "date": (start + timedelta(days=day)).date().isoformat(),
+                "orders": rng.randint(0, 400),
+                "revenue": round(rng.uniform(0, 50000), 2),
+                "visitors": rng.randint(100, 10000),
+                "conversion_rate": round(rng.random() / 10, 4),
+                "by_channel": {channel: rng.randint(0, 200) for channel in ("whatsapp", "web", "instagram")},
+            }
+            for day in range(days)
+        ],
+        "top_products": [
+            {"product_id": str(uuid.UUID(int=n)), "name": f"Product {n}", "units": rng.randint(1, 900)}
+            for n in range(50)
+        ],
+    }
+
+
+def legacy_codec():
+    return (
+        lambda value: json.dumps(value, default=str).encode("utf-8"),
+        json.loads,
+    )
+
+
+def bench(name, payload, encode, decode, rounds):
+    encoded = encode(payload)
+    assert decode(encoded) == json.loads(json.dumps(payload, default=str))
+    encode_us = min(timeit.repeat(lambda: encode(payload), number=rounds, repeat=3)) / rounds * 1e6
+    decode_us = min(timeit.repeat(lambda: decode(encoded), number=rounds, repeat=3)) / rounds * 1e6
+    print(f"  {name:<22} {len(encoded):>10,} B {encode_us:>11,.0f} us {decode_us:>11,.0f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    payloads = {
+        f"storefront catalog ({args.products} products)": storefront_catalog(args.products),
+        f"analytics dashboard ({args.days} days)": analytics_dashboard(args.days),
+    }
+    for title, payload in payloads.items():
+        print(title)
+        print(f"  {'codec':<22} {'size':>12} {'encode':>14} {'decode':>14}")
+        bench("legacy json", payload, *legacy_codec(), rounds=args.rounds)
+        for serializer in SERIALIZERS:
+            for compression in COMPRESSORS:
+                threshold = None if compression == "none" else 0
+                codec = CacheCodec(serializer, compression if threshold is not None else None, threshold)
+                bench(f"{serializer}+{compression}", payload, codec.encode, codec.decode, args.rounds)
+        print()
+
+
+if __name__ == "__main__":
+    main()
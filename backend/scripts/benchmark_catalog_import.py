@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Catalog import throughput benchmark.
+
+Generates a synthetic catalog (products with variants) as CSV or NDJSON and
+reports rows/sec through the import pipeline at several batch sizes and
+validation worker counts.
+
+Without --database-url the load stage is skipped, measuring parsing and
+validation only. With it, batches are COPY-staged and upserted into a real
+PostgreSQL database; the tenant and seller must already exist, and the
+imported products are left in place (re-running measures the update path).
+
+Usage:
+    python scripts/benchmark_catalog_import.py [--products 10000] [--variants 3] [--format csv]
+    python scripts/benchmark_catalog_import.py --database-url postgresql+asyncpg://... \\
+        --tenant-id <uuid> --seller-id <uuid>
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.catalog_import import CatalogImporter, ImportFormat, LoadResult  # noqa: E402
+from app.services.catalog_import import pipeline as pipeline_module  # noqa: E402
+
+CSV_COLUMNS = [
+    "sku", "name", "description", "price", "inventory_quantity", "weight",
+    "is_featured", "variant_sku", "variant_name", "variant_price",
+    "variant_inventory_quantity",
+]
+
+
+def catalog_rows(products: int, variants: int):
+    rng = random.Random(5)
+    for index in range(products):
+        base = {
+            "sku": f"BENCH-{index:07d}",
+            "name": f"Handwoven basket {index}",
+            "description": "Sustainably sourced, handmade by local artisans.",
+            "price": round(rng.uniform(5, 500), 2),
+            "inventory_quantity": rng.randint(0, 200),
+            "weight": round(rng.uniform(0.1, 5), 2),
+            "is_featured": index % 10 == 0,
+        }
+        yield base, [
+            {
+                "sku": f"BENCH-{index:07d}-{size}",
+                "name": size,
+                "price": round(base["price"] + n * 5, 2),
+                "inventory_quantity": rng.randint(0, 50),
+            }
+            for n, size in enumerate(("S", "M", "L", "XL", "XXL")[:variants])
+        ]
+
+
+def build_file(file_format: str, products: int, variants: int) -> bytes:
+    buffer = io.StringIO()
+    if file_format == ImportFormat.NDJSON:
+        for base, product_variants in catalog_rows(products, variants):
+            buffer.write(json.dumps({**base, "variants": product_variants}) + "\n")
+        return buffer.getvalue().encode()
+
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS)
+    writer.writeheader()
+    for base, product_variants in catalog_rows(products, variants):
+        for variant in product_variants or [{}]:
+            row = dict(base)
+            row.update({f"variant_{key}": value for key, value in variant.items()})
+            writer.writerow(row)
+    return buffer.getvalue().encode()
+
+
+class NoDatabase:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+async def skip_load(session, batch, tenant_id, seller_id):
+    return LoadResult(products_created=len(batch.products), variants_created=len(batch.variants))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--variants", type=int, default=3)
+    parser.add_argument("--format", choices=ImportFormat.ALL, default=ImportFormat.CSV)
+    parser.add_argument("--database-url")
+    parser.add_argument("--tenant-id")
+    parser.add_argument("--seller-id")
+    args = parser.parse_args()
+
+    if args.database_url:
+        if not (args.tenant_id and args.seller_id):
+            parser.error("--tenant-id and --seller-id are required with --database-url")
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        engine = create_async_engine(args.database_url, pool_size=4)
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    else:
+        engine = None
+        session_factory = NoDatabase
+        pipeline_module.load_batch = skip_load
+
+    data = build_file(args.format, args.products, args.variants)
+    print(
+        f"{args.products} products x {args.variants} variants as {args.format} "
+        f"({len(data) / 1e6:.1f} MB), {'with' if engine else 'without'} database load"
+    )
+    print(f"  {'batch size':>10} {'workers':>8} {'rows':>9} {'seconds':>9} {'rows/sec':>10}")
+
+    for batch_size, workers in [(500, 0), (2000, 0), (2000, 2), (2000, 4), (5000, 4)]:
+        importer = CatalogImporter(session_factory, batch_size=batch_size, validation_workers=workers)
+        try:
+            report = await importer.run(
+                io.BytesIO(data), args.format, args.tenant_id or "tenant", args.seller_id or "seller"
+            )
+        finally:
+            await importer.stop()
+        assert report.error_count == 0, report.to_dict()["errors"][:3]
+        print(
+            f"  {batch_size:>10} {workers:>8} {report.rows:>9} "
+            f"{report.elapsed_seconds:>9.2f} {report.rows_per_second:>10,.0f}"
+        )
+
+    if engine is not None:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
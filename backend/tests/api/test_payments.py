@@ -1,7 +1,7 @@
 import pytest
 from fastapi.testclient import TestClient
 from backend.app.main import app
-from unittest.mock import patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 client = TestClient(app)
 
@@ -11,12 +11,16 @@ client = TestClient(app)
 def test_mpesa_initialize_payment():
     with patch(
         "app.services.payment.payment_provider.MpesaProvider._get_access_token",
+        new_callable=AsyncMock,
         return_value="mock_token",
-    ), patch("requests.post") as mock_post:
+    ), patch(
+        "app.services.payment.payment_provider.outbound_http.post",
+        new_callable=AsyncMock,
+    ) as mock_post:
+        mock_post.return_value = MagicMock(status_code=200)
         mock_post.return_value.json.return_value = {
             "CheckoutRequestID": "mock_checkout_id"
         }
-        mock_post.return_value.raise_for_status = lambda: None
         payload = {
             "order_id": "order123",
             "provider": "MPESA",
@@ -65,12 +69,16 @@ def test_payment_status_mapping():
 def test_mpesa_ussd_fallback():
     with patch(
         "app.services.payment.payment_provider.MpesaProvider._get_access_token",
+        new_callable=AsyncMock,
         return_value="mock_token",
-    ), patch("requests.post") as mock_post:
+    ), patch(
+        "app.services.payment.payment_provider.outbound_http.post",
+        new_callable=AsyncMock,
+    ) as mock_post:
+        mock_post.return_value = MagicMock(status_code=200)
         mock_post.return_value.json.return_value = {
             "CheckoutRequestID": "mock_checkout_id"
         }
-        mock_post.return_value.raise_for_status = lambda: None
         payload = {
             "order_id": "order123",
             "provider": "MPESA",
@@ -107,12 +115,15 @@ def test_flutterwave_webhook():
 
 
 def test_stripe_initialize_payment():
-    with patch("app.services.payment.payment_provider.requests.post") as mock_post:
+    with patch(
+        "app.services.payment.payment_provider.outbound_http.post",
+        new_callable=AsyncMock,
+    ) as mock_post:
+        mock_post.return_value = MagicMock(status_code=200)
         mock_post.return_value.json.return_value = {
             "id": "pi_123",
             "client_secret": "secret_abc",
         }
-        mock_post.return_value.raise_for_status = lambda: None
         payload = {
             "order_id": "order123",
             "provider": "stripe",
@@ -13,7 +13,6 @@ from backend.app.api.v1.endpoints.webhooks import router as webhook_router
 from backend.app.core.config.settings import get_settings
 from backend.app.services.payment.webhook_event_service import WebhookEventService
 from backend.app.services.payment.payment_service import PaymentService
-from backend.app.db.models.webhook_event import WebhookEvent
 
 
 @pytest.fixture
@@ -94,13 +93,9 @@ def generate_paystack_signature(payload, secret="test_secret"):
 @pytest.mark.asyncio
 @patch("app.api.v1.endpoints.webhooks.get_db")
 @patch("app.api.v1.endpoints.webhooks.verify_paystack_signature")
-@patch("app.services.payment.webhook_event_service.WebhookEventService.is_webhook_processed")
-@patch("app.services.payment.webhook_event_service.WebhookEventService.record_webhook_event")
-@patch("app.api.v1.endpoints.webhooks.PaymentService")
+@patch("app.api.v1.endpoints.webhooks.payment_webhook_engine.submit", new_callable=AsyncMock)
 async def test_paystack_webhook_success(
-    mock_payment_service_cls,
-    mock_record_webhook_event,
-    mock_is_webhook_processed,
+    mock_submit,
     mock_verify_signature,
     mock_get_db,
     client,
@@ -110,10 +105,7 @@ async def test_paystack_webhook_success(
     # Setup mocks
     mock_get_db.return_value = mock_db
     mock_verify_signature.return_value = True
-    mock_is_webhook_processed.return_value = False
-    mock_record_webhook_event.return_value = True
-    mock_payment_service = mock_payment_service_cls.return_value
-    mock_payment_service.process_successful_payment = AsyncMock()
+    mock_submit.return_value = True
     
     # Create signature
     signature = generate_paystack_signature(valid_paystack_payload)
@@ -125,21 +117,18 @@ async def test_paystack_webhook_success(
         headers={"X-Paystack-Signature": signature}
     )
     
-    # Assert response
+    # Assert response: acknowledged, processed asynchronously
     assert response.status_code == 200
-    assert response.json() == {"status": "success", "message": "Webhook processed"}
+    assert response.json() == {"status": "accepted", "message": "Webhook queued for processing"}
     
     # Assert mocks called correctly
     mock_verify_signature.assert_called_once()
-    mock_is_webhook_processed.assert_called_once_with(
-        mock_db, valid_paystack_payload["id"], "paystack"
-    )
-    mock_payment_service.process_successful_payment.assert_called_once_with(
-        mock_db,
-        payment_data=valid_paystack_payload["data"],
-        provider="paystack",
-        event_id=valid_paystack_payload["id"]
-    )
+    mock_submit.assert_awaited_once()
+    kwargs = mock_submit.call_args.kwargs
+    assert kwargs["provider"] == "paystack"
+    assert kwargs["event_id"] == valid_paystack_payload["id"]
+    assert kwargs["event_type"] == "charge.success"
+    assert kwargs["payload"] == valid_paystack_payload
 
 
 @pytest.mark.asyncio
@@ -170,9 +159,9 @@ async def test_paystack_webhook_invalid_signature(
 
 @pytest.mark.asyncio
 @patch("app.api.v1.endpoints.webhooks.get_db")
-@patch("app.services.payment.webhook_event_service.WebhookEventService.is_webhook_processed")
+@patch("app.api.v1.endpoints.webhooks.payment_webhook_engine.submit", new_callable=AsyncMock)
 async def test_paystack_webhook_idempotency(
-    mock_is_webhook_processed,
+    mock_submit,
     mock_get_db,
     client,
     mock_db,
@@ -181,8 +170,8 @@ async def test_paystack_webhook_idempotency(
     # Setup mocks
     mock_get_db.return_value = mock_db
     
-    # Mock that event was already processed
-    mock_is_webhook_processed.return_value = True
+    # Mock that event was already claimed
+    mock_submit.return_value = False
     
     # Override verify_paystack_signature for testing
     with patch("app.api.v1.endpoints.webhooks.verify_paystack_signature", return_value=True):
@@ -199,13 +188,9 @@ async def test_paystack_webhook_idempotency(
 
 @pytest.mark.asyncio
 @patch("app.api.v1.endpoints.webhooks.get_db")
-@patch("app.services.payment.webhook_event_service.WebhookEventService.is_webhook_processed")
-@patch("app.services.payment.webhook_event_service.WebhookEventService.record_webhook_event")
-@patch("app.api.v1.endpoints.webhooks.PaymentService")
+@patch("app.api.v1.endpoints.webhooks.payment_webhook_engine.submit", new_callable=AsyncMock)
 async def test_mpesa_webhook_success(
-    mock_payment_service_cls,
-    mock_record_webhook_event,
-    mock_is_webhook_processed,
+    mock_submit,
     mock_get_db,
     client,
     mock_db,
@@ -213,10 +198,7 @@ async def test_mpesa_webhook_success(
 ):
     # Setup mocks
     mock_get_db.return_value = mock_db
-    mock_is_webhook_processed.return_value = False
-    mock_record_webhook_event.return_value = True
-    mock_payment_service = mock_payment_service_cls.return_value
-    mock_payment_service.process_successful_payment = AsyncMock()
+    mock_submit.return_value = True
     
     # Disable IP validation for testing
     with patch("app.api.v1.endpoints.webhooks.settings") as mock_settings:
@@ -229,14 +211,11 @@ async def test_mpesa_webhook_success(
     
     # Assert response
     assert response.status_code == 200
-    assert response.json() == {"status": "success", "message": "Webhook processed"}
+    assert response.json() == {"status": "accepted", "message": "Webhook queued for processing"}
     
     # Assert mocks called correctly
     event_id = valid_mpesa_payload["Body"]["stkCallback"]["CheckoutRequestID"]
-    mock_is_webhook_processed.assert_called_once_with(mock_db, event_id, "mpesa")
-    mock_payment_service.process_successful_payment.assert_called_once_with(
-        mock_db,
-        payment_data=valid_mpesa_payload["Body"]["stkCallback"],
-        provider="mpesa",
-        event_id=event_id
-    )
+    kwargs = mock_submit.call_args.kwargs
+    assert kwargs["provider"] == "mpesa"
+    assert kwargs["event_id"] == event_id
+    assert kwargs["event_type"] == "mpesa_result_0"
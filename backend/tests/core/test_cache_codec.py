@@ -0,0 +1,143 @@
+import enum
+import json
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from pydantic import BaseModel
+from sqlalchemy import Column, DateTime, Enum, Integer, Numeric, String
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import declarative_base
+
+from app.core.cache.codec import (
+    HEADER_SIZE,
+    MAGIC,
+    SERIALIZERS,
+    CacheCodec,
+    CacheCodecError,
+    orm_row_from_cache,
+)
+
+Base = declarative_base()
+
+
+class Status(str, enum.Enum):
+    ACTIVE = "active"
+    ARCHIVED = "archived"
+
+
+class CachedProduct(Base):
+    __tablename__ = "cached_products"
+
+    id = Column(UUID(as_uuid=True), primary_key=True)
+    name = Column(String)
+    price = Column(Numeric(10, 2))
+    stock = Column(Integer)
+    status = Column(Enum(Status))
+    created_at = Column(DateTime)
+
+
+class ProductOut(BaseModel):
+    id: uuid.UUID
+    name: str
+    created_at: datetime
+
+
+@dataclass
+class Point:
+    x: int
+    y: int
+
+
+PRODUCT_ID = uuid.UUID(int=42)
+CREATED = datetime(2025, 3, 1, 9, 30)
+
+
+@pytest.mark.parametrize("serializer", sorted(SERIALIZERS))
+@pytest.mark.parametrize("threshold", [None, 0])
+def test_round_trip_with_every_installed_serializer(serializer, threshold):
+    codec = CacheCodec(serializer=serializer, compress_threshold=threshold)
+    value = {"items": [{"id": str(PRODUCT_ID), "price": 9.5, "tags": ["a", "b"]}] * 50, "total": 50}
+
+    encoded = codec.encode(value)
+
+    assert encoded[0] == MAGIC
+    assert codec.decode(encoded) == value
+
+
+def test_schema_aware_values_are_encoded():
+    codec = CacheCodec(compress_threshold=None)
+    value = {
+        "model": ProductOut(id=PRODUCT_ID, name="Mug", created_at=CREATED),
+        "id": PRODUCT_ID,
+        "when": CREATED,
+        "amount": Decimal("12.50"),
+        "status": Status.ACTIVE,
+        "tags": {"x"},
+        "point": Point(1, 2),
+    }
+
+    assert codec.decode(codec.encode(value)) == {
+        "model": {"id": str(PRODUCT_ID), "name": "Mug", "created_at": "2025-03-01T09:30:00"},
+        "id": str(PRODUCT_ID),
+        "when": "2025-03-01T09:30:00",
+        "amount": "12.50",
+        "status": "active",
+        "tags": ["x"],
+        "point": {"x": 1, "y": 2},
+    }
+
+
+def test_unserializable_values_raise_codec_error():
+    with pytest.raises(CacheCodecError):
+        CacheCodec().encode({"handle": object()})
+
+
+def test_only_large_compressible_payloads_are_compressed():
+    codec = CacheCodec(compression="zlib", compress_threshold=256)
+
+    small = codec.encode({"a": 1})
+    large = codec.encode(["repeated value"] * 500)
+
+    assert small[3] == 0
+    assert large[3] != 0
+    assert len(large) < len(json.dumps(["repeated value"] * 500))
+    assert codec.decode(large) == ["repeated value"] * 500
+
+
+def test_legacy_json_and_counter_values_still_decode():
+    codec = CacheCodec()
+
+    assert codec.decode(json.dumps({"legacy": True}).encode()) == {"legacy": True}
+    assert codec.decode(b"7") == 7
+    assert codec.decode('"text"') == "text"
+
+
+def test_payloads_from_unknown_codecs_are_rejected():
+    codec = CacheCodec()
+    encoded = codec.encode({"a": 1})
+
+    with pytest.raises(CacheCodecError):
+        codec.decode(bytes((MAGIC, 1, 99, 0)) + encoded[HEADER_SIZE:])
+    with pytest.raises(CacheCodecError):
+        codec.decode(bytes((MAGIC, 2)) + encoded[2:])
+    with pytest.raises(CacheCodecError):
+        codec.decode(b"\xc1\x01")
+
+
+def test_orm_rows_round_trip_with_their_column_types():
+    codec = CacheCodec()
+    product = CachedProduct(
+        id=PRODUCT_ID, name="Mug", price=Decimal("12.50"), stock=3,
+        status=Status.ARCHIVED, created_at=CREATED,
+    )
+
+    restored = [orm_row_from_cache(CachedProduct, row) for row in codec.decode(codec.encode([product]))]
+
+    assert restored[0].id == PRODUCT_ID
+    assert restored[0].price == Decimal("12.50")
+    assert restored[0].status is Status.ARCHIVED
+    assert restored[0].created_at == CREATED
+    assert restored[0].stock == 3
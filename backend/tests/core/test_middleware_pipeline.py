@@ -0,0 +1,194 @@
+import json
+
+import pytest
+from starlette.responses import PlainTextResponse, Response
+
+from app.core.middleware.pipeline import MiddlewarePipeline, PipelineStage
+
+
+class Recording(PipelineStage):
+    def __init__(self, name, log, answer=None, include=(), exclude=()):
+        self.name = name
+        self.log = log
+        self.answer = answer
+        self.include_prefixes = include
+        self.exclude_prefixes = exclude
+
+    async def on_request(self, ctx):
+        self.log.append(("request", self.name))
+        ctx.state.seen = getattr(ctx.state, "seen", ()) + (self.name,)
+        return self.answer
+
+    def on_response_start(self, ctx, headers):
+        self.log.append(("start", self.name))
+        headers.append("x-stages", self.name)
+
+    async def on_complete(self, ctx):
+        self.log.append(("complete", self.name, ctx.status_code))
+
+
+class BodyReader(PipelineStage):
+    needs_body = True
+
+    def __init__(self):
+        self.seen = None
+
+    async def on_complete(self, ctx):
+        self.seen = ctx.json()
+
+
+async def call(app, path="/items", method="GET", body_chunks=(b"",)):
+    sent = []
+    chunks = list(body_chunks)
+
+    async def receive():
+        chunk = chunks.pop(0)
+        return {"type": "http.request", "body": chunk, "more_body": bool(chunks)}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "method": method, "path": path, "headers": [(b"host", b"shop.test")],
+        "query_string": b"", "client": ("10.0.0.1", 1234),
+    }
+    await app(scope, receive, send)
+    return sent
+
+
+def stage_headers(sent):
+    return [value.decode() for name, value in sent[0]["headers"] if name == b"x-stages"]
+
+
+@pytest.mark.asyncio
+async def test_stages_run_like_a_middleware_stack():
+    log = []
+
+    async def endpoint(scope, receive, send):
+        log.append(("endpoint", scope["state"]["seen"]))
+        await PlainTextResponse("ok")(scope, receive, send)
+
+    app = MiddlewarePipeline(endpoint, [Recording("outer", log), Recording("inner", log)])
+    sent = await call(app)
+
+    assert log == [
+        ("request", "outer"), ("request", "inner"), ("endpoint", ("outer", "inner")),
+        ("start", "inner"), ("start", "outer"),
+        ("complete", "inner", 200), ("complete", "outer", 200),
+    ]
+    assert stage_headers(sent) == ["inner", "outer"]
+
+
+@pytest.mark.asyncio
+async def test_short_circuit_skips_inner_stages_and_endpoint():
+    log = []
+
+    async def endpoint(scope, receive, send):
+        raise AssertionError("endpoint must not run")
+
+    blocked = Response("denied", status_code=403)
+    app = MiddlewarePipeline(endpoint, [
+        Recording("outer", log), Recording("guard", log, answer=blocked), Recording("inner", log),
+    ])
+    sent = await call(app)
+
+    assert sent[0]["status"] == 403
+    assert stage_headers(sent) == ["outer"]
+    assert log == [("request", "outer"), ("request", "guard"), ("start", "outer"), ("complete", "outer", 403)]
+
+
+@pytest.mark.asyncio
+async def test_stages_are_selected_by_path_prefix():
+    log = []
+
+    async def endpoint(scope, receive, send):
+        await PlainTextResponse("ok")(scope, receive, send)
+
+    app = MiddlewarePipeline(endpoint, [
+        Recording("admin", log, include=("/api/admin",)),
+        Recording("storefront", log, exclude=("/api/",)),
+    ])
+
+    await call(app, path="/api/admin/tenants")
+    await call(app, path="/api/v1/products")
+    await call(app, path="/")
+
+    requested = [entry[1] for entry in log if entry[0] == "request"]
+    assert requested == ["admin", "storefront"]
+
+
+@pytest.mark.asyncio
+async def test_streaming_bodies_pass_through_unbuffered():
+    forwarded = []
+
+    async def endpoint(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        for part in (b"a", b"b", b"c"):
+            await send({"type": "http.response.body", "body": part, "more_body": True})
+            # Each chunk reaches the client before the next one is produced
+            forwarded.append(len(sent))
+        await send({"type": "http.response.body", "body": b""})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    app = MiddlewarePipeline(endpoint, [Recording("only", [])])
+    scope = {"type": "http", "method": "GET", "path": "/stream", "headers": [], "query_string": b""}
+    await app(scope, receive, send)
+
+    assert forwarded == [2, 3, 4]
+    assert dict(sent[0]["headers"])[b"x-stages"] == b"only"
+
+
+@pytest.mark.asyncio
+async def test_body_is_captured_while_the_endpoint_reads_it():
+    reader = BodyReader()
+
+    async def endpoint(scope, receive, send):
+        body = b""
+        while True:
+            message = await receive()
+            body += message["body"]
+            if not message["more_body"]:
+                break
+        await PlainTextResponse(body.decode())(scope, receive, send)
+
+    app = MiddlewarePipeline(endpoint, [reader])
+    payload = json.dumps({"sku": "TSHIRT-RED", "quantity": 2}).encode()
+    sent = await call(app, method="POST", body_chunks=(payload[:10], payload[10:]))
+
+    assert sent[1]["body"] == payload
+    assert reader.seen == {"sku": "TSHIRT-RED", "quantity": 2}
+
+
+@pytest.mark.asyncio
+async def test_completion_hooks_see_failures():
+    log = []
+
+    async def endpoint(scope, receive, send):
+        raise RuntimeError("boom")
+
+    app = MiddlewarePipeline(endpoint, [Recording("outer", log)])
+
+    with pytest.raises(RuntimeError):
+        await call(app)
+    assert log[-1] == ("complete", "outer", None)
+
+
+@pytest.mark.asyncio
+async def test_non_http_scopes_bypass_stages():
+    log = []
+    reached = []
+
+    async def endpoint(scope, receive, send):
+        reached.append(scope["type"])
+
+    app = MiddlewarePipeline(endpoint, [Recording("outer", log)])
+    await app({"type": "lifespan"}, None, None)
+
+    assert reached == ["lifespan"] and log == []
@@ -0,0 +1,188 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from app.core.notifications.dispatcher import NotificationDispatcher, TenantContact, TenantContactCache
+from app.core.notifications.retry_store import NotificationRetryStore
+from app.core.notifications.notification_service import Notification, NotificationChannel
+
+
+def make_notification(n, tenant_id="t1", title="Order shipped", channels=(NotificationChannel.EMAIL,)):
+    return Notification(
+        id=f"n{n}", tenant_id=tenant_id, user_id="u1", title=title, message=f"Order {title}",
+        priority="high", channels=list(channels),
+    )
+
+
+class FakeSender:
+    def __init__(self, fail_for=()):
+        self.batches = []
+        self.fail_for = set(fail_for)
+
+    async def __call__(self, items):
+        self.batches.append([(notification.id, address) for notification, address in items])
+        return ["mailbox full" if address in self.fail_for else None for _, address in items]
+
+
+class FakeRetryStore:
+    def __init__(self, rows=()):
+        self.added = []
+        self.rows = list(rows)
+        self.resolved = None
+
+    async def add(self, failures, delay):
+        self.added.extend((notification.id, channel, error) for notification, channel, error in failures)
+
+    async def claim_due(self, limit):
+        return self.rows[:limit]
+
+    async def resolve(self, done, failed):
+        self.resolved = (done, failed)
+
+
+def make_dispatcher(loads, senders, retry_store=None):
+    async def loader(tenant_ids):
+        loads.append(sorted(tenant_ids))
+        return {
+            tenant_id: TenantContact(email=f"{tenant_id}@example.com", phone=f"+2547{tenant_id}")
+            for tenant_id in tenant_ids
+        }
+
+    return NotificationDispatcher(
+        contacts=TenantContactCache(loader), retry_store=retry_store or FakeRetryStore(),
+        senders=senders, flush_interval=3600, max_attempts=3,
+    )
+
+
+@pytest.mark.asyncio
+async def test_duplicates_are_coalesced_within_the_window():
+    loads, email = [], FakeSender()
+    dispatcher = make_dispatcher(loads, {"email": email})
+
+    assert dispatcher.submit(make_notification(1))
+    assert dispatcher.submit(make_notification(2))
+    assert dispatcher.submit(make_notification(3, title="Order delivered"))
+    assert await dispatcher.flush() == 2
+
+    assert email.batches == [[("n1", "t1@example.com"), ("n3", "t1@example.com")]]
+    # A duplicate of one just sent is dropped rather than queued
+    assert not dispatcher.submit(make_notification(4))
+    assert await dispatcher.flush() == 0
+    await dispatcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_batch_loads_contacts_once_and_groups_by_channel():
+    loads, email, sms = [], FakeSender(), FakeSender()
+    dispatcher = make_dispatcher(loads, {"email": email, "sms": sms})
+
+    for n, tenant_id in enumerate(["t1", "t2", "t3"]):
+        dispatcher.submit(make_notification(
+            n, tenant_id=tenant_id, channels=(NotificationChannel.EMAIL, NotificationChannel.SMS),
+        ))
+    await dispatcher.flush()
+
+    assert loads == [["t1", "t2", "t3"]]
+    assert len(email.batches) == len(sms.batches) == 1
+    assert [address for _, address in sms.batches[0]] == ["+2547t1", "+2547t2", "+2547t3"]
+
+    # Cached contacts are not reloaded for the next batch
+    dispatcher.submit(make_notification(9, tenant_id="t2", title="Refund issued"))
+    await dispatcher.flush()
+    assert loads == [["t1", "t2", "t3"]]
+    await dispatcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_failed_deliveries_go_to_the_retry_queue():
+    loads, store = [], FakeRetryStore()
+    email = FakeSender(fail_for={"t2@example.com"})
+    dispatcher = make_dispatcher(loads, {"email": email}, retry_store=store)
+
+    first, second = make_notification(1), make_notification(2, tenant_id="t2")
+    dispatcher.submit(first)
+    dispatcher.submit(second)
+    await dispatcher.flush()
+
+    assert store.added == [("n2", "email", "mailbox full")]
+    assert (first.status, second.status) == ("sent", "retrying")
+    await dispatcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_retry_sweep_backs_off_and_gives_up_after_max_attempts():
+    def row(row_id, tenant_id, attempts):
+        notification = make_notification(row_id, tenant_id=tenant_id)
+        return SimpleNamespace(
+            id=row_id, notification_id=notification.id, tenant_id=tenant_id, channel="email",
+            payload=notification.model_dump(mode="json"), attempts=attempts,
+        )
+
+    store = FakeRetryStore(rows=[row(1, "t1", 1), row(2, "t2", 1), row(3, "t2", 2)])
+    email = FakeSender(fail_for={"t2@example.com"})
+    dispatcher = make_dispatcher([], {"email": email}, retry_store=store)
+
+    assert await dispatcher.retry_due() == 3
+    done, failed = store.resolved
+    # Row 1 went out, row 3 reached max_attempts; row 2 is rescheduled with doubled delay
+    assert sorted(done) == [1, 3]
+    assert failed == [(2, 2, "mailbox full", dispatcher.retry_base_delay * 2)]
+    await dispatcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_twilio_sends_are_retried_only_when_nothing_was_sent():
+    store = FakeRetryStore()
+    dispatcher = make_dispatcher([], {}, retry_store=store)
+    notifications = [
+        make_notification(n, tenant_id=f"t{n}", channels=(NotificationChannel.SMS,)) for n in range(4)
+    ]
+    outcomes = {
+        "+2547t0": httpx.ConnectError("refused"),
+        "+2547t1": httpx.ReadTimeout("slow"),
+        "+2547t2": httpx.Response(503),
+        "+2547t3": httpx.Response(400, text="invalid number"),
+    }
+
+    async def post(provider, url, **kwargs):
+        outcome = outcomes[kwargs["data"]["To"]]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    for notification in notifications:
+        dispatcher.submit(notification)
+    with patch("app.core.notifications.dispatcher.outbound_http.post", new=AsyncMock(side_effect=post)):
+        await dispatcher.flush()
+
+    # A read timeout may have been delivered and a 400 will never succeed
+    assert [notification_id for notification_id, _, _ in store.added] == ["n0", "n2"]
+    assert [notification.status for notification in notifications] == ["retrying", "failed", "retrying", "failed"]
+    await dispatcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_retry_claims_are_committed_before_anything_is_sent():
+    calls = []
+
+    class Session:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            calls.append("closed")
+
+        async def execute(self, statement):
+            calls.append(type(statement).__name__)
+            return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: [SimpleNamespace(id=1)]))
+
+        async def commit(self):
+            calls.append("commit")
+
+    rows = await NotificationRetryStore(session_factory=Session).claim_due(10)
+
+    # The lock is released, and the rows leased, before the caller sends
+    assert [row.id for row in rows] == [1]
+    assert calls == ["Select", "Update", "commit", "closed"]
@@ -0,0 +1,106 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.http.outbound import OutboundHTTPClient
+from app.core.resilience.retry_manager import (
+    CircuitBreakerConfig,
+    CircuitOpenError,
+    MerchantRetryManager,
+)
+
+
+def make_client(handler, **kwargs):
+    return OutboundHTTPClient(
+        transport=httpx.MockTransport(handler),
+        breakers=MerchantRetryManager(),
+        circuit_config=CircuitBreakerConfig(failure_threshold=2, success_threshold=1, timeout=60.0),
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_reuses_one_pooled_client_per_origin():
+    client = make_client(lambda request: httpx.Response(200, json={"ok": True}))
+
+    await client.get("sendy", "https://api.sendyit.com/v1/track")
+    await client.post("sendy", "https://api.sendyit.com/v1/request", json={})
+    await client.get("usps", "https://secure.shippingapis.com/ShippingAPI.dll")
+
+    assert len(client._clients) == 2
+    await client.aclose()
+    assert client._clients == {}
+
+
+@pytest.mark.asyncio
+async def test_slow_idempotent_call_is_hedged():
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.path)
+        if len(calls) == 1:
+            await asyncio.sleep(1.0)
+        return httpx.Response(200, json={"attempt": len(calls)})
+
+    client = make_client(handler)
+    client.hedge_delay = lambda provider: 0.05
+
+    response = await client.get("sendy", "https://api.sendyit.com/v1/track")
+
+    assert response.json() == {"attempt": 2}
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_non_idempotent_call_is_never_hedged():
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.path)
+        await asyncio.sleep(0.1)
+        return httpx.Response(201)
+
+    client = make_client(handler)
+    client.hedge_delay = lambda provider: 0.01
+
+    response = await client.post("paystack", "https://api.paystack.co/transaction/initialize", json={})
+
+    assert response.status_code == 201
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_server_errors_open_the_circuit():
+    client = make_client(lambda request: httpx.Response(503))
+
+    for _ in range(2):
+        response = await client.post("sendy", "https://api.sendyit.com/v1/request")
+        assert response.status_code == 503
+
+    assert not client.is_available("sendy")
+    with pytest.raises(CircuitOpenError):
+        await client.post("sendy", "https://api.sendyit.com/v1/request")
+
+
+@pytest.mark.asyncio
+async def test_client_errors_do_not_trip_the_circuit():
+    client = make_client(lambda request: httpx.Response(400))
+
+    for _ in range(3):
+        response = await client.get("usps", "https://secure.shippingapis.com/ShippingAPI.dll")
+        assert response.status_code == 400
+
+    assert client.is_available("usps")
+
+
+@pytest.mark.asyncio
+async def test_deadline_raises_timeout():
+    async def handler(request):
+        await asyncio.sleep(1.0)
+        return httpx.Response(200)
+
+    client = make_client(handler)
+
+    with pytest.raises(httpx.TimeoutException):
+        await client.post("mpesa", "https://sandbox.safaricom.co.ke/oauth", timeout=0.05)
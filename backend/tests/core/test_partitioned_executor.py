@@ -0,0 +1,189 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import Column, DateTime, Integer, String, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import declarative_base
+
+from app.core.optimization import cross_tenant_queries
+from app.core.optimization.partitioned_executor import (
+    PARTIAL_AGGREGATES,
+    PartitionedQueryExecutor,
+    order_by_sort_key,
+)
+
+Base = declarative_base()
+
+
+class AdminOrder(Base):
+    __tablename__ = "admin_orders"
+
+    id = Column(UUID(as_uuid=True), primary_key=True)
+    tenant_id = Column(String, nullable=False)
+    status = Column(String)
+    total = Column(Integer)
+    shipped_at = Column(DateTime)
+
+
+TENANTS = [f"tenant-{n}" for n in range(10)]
+START = datetime(2025, 1, 1)
+ORDERS = [
+    AdminOrder(
+        id=uuid.UUID(int=n),
+        tenant_id=TENANTS[n % len(TENANTS)],
+        status=("paid", "pending", "refunded")[n % 3],
+        total=(n * 37) % 101,
+        shipped_at=None if n % 7 == 0 else START + timedelta(minutes=(n * 13) % 97),
+    )
+    for n in range(200)
+]
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    """Evaluates (tenants, limit, rows) statements built by the tests."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement):
+        self.stats["active"] += 1
+        self.stats["peak"] = max(self.stats["peak"], self.stats["active"])
+        try:
+            await asyncio.sleep(statement.get("delay", 0.001))
+            self.stats["completed"] += 1
+            return FakeResult(statement["rows"])
+        finally:
+            self.stats["active"] -= 1
+
+
+def make_executor(shard_size=3, max_concurrency=2):
+    stats = {"active": 0, "peak": 0, "completed": 0}
+    executor = PartitionedQueryExecutor(lambda: FakeSession(stats), shard_size, max_concurrency)
+    return executor, stats
+
+
+def orders_for(shard, sort_key=None, limit=None):
+    rows = [order for order in ORDERS if order.tenant_id in shard]
+    if sort_key is not None:
+        rows.sort(key=sort_key)
+    return rows[:limit] if limit is not None else rows
+
+
+@pytest.mark.parametrize("order_by", [
+    [AdminOrder.shipped_at.desc(), AdminOrder.id],
+    [AdminOrder.shipped_at, AdminOrder.id.desc()],
+    [AdminOrder.shipped_at.desc().nulls_last(), AdminOrder.total, AdminOrder.id],
+])
+@pytest.mark.asyncio
+async def test_ordered_merge_matches_a_single_sorted_query(order_by):
+    executor, stats = make_executor()
+    sort_key = order_by_sort_key(AdminOrder, order_by)
+
+    page = await executor.fetch(
+        lambda shard, limit: {"rows": orders_for(shard, sort_key, limit)},
+        TENANTS, sort_key=sort_key, limit=15, offset=20,
+    )
+
+    assert page == orders_for(TENANTS, sort_key)[20:35]
+    assert stats["completed"] == 4
+    assert stats["peak"] <= 2
+
+
+def test_sort_key_follows_postgres_null_ordering():
+    ascending = sorted(ORDERS, key=order_by_sort_key(AdminOrder, [AdminOrder.shipped_at, AdminOrder.id]))
+    descending = sorted(ORDERS, key=order_by_sort_key(AdminOrder, [AdminOrder.shipped_at.desc(), AdminOrder.id]))
+
+    assert ascending[-1].shipped_at is None and ascending[0].shipped_at is not None
+    assert descending[0].shipped_at is None and descending[-1].shipped_at is not None
+    assert order_by_sort_key(AdminOrder, [func.lower(AdminOrder.status)]) is None
+
+
+@pytest.mark.asyncio
+async def test_unordered_limit_cancels_outstanding_shards():
+    executor, stats = make_executor(shard_size=2, max_concurrency=5)
+
+    def build(shard, limit):
+        return {"rows": orders_for(shard, limit=limit), "delay": 0.001 if shard[0] == TENANTS[0] else 1}
+
+    rows = await asyncio.wait_for(executor.fetch(build, TENANTS, limit=5), timeout=0.5)
+
+    assert len(rows) == 5
+    assert stats["completed"] == 1
+    assert stats["active"] == 0
+
+
+@pytest.mark.parametrize("name", ["count", "sum", "min", "max", "avg"])
+@pytest.mark.asyncio
+async def test_partial_aggregates_combine_to_the_global_result(name):
+    executor, _ = make_executor(shard_size=4)
+
+    def build(shard):
+        groups = {}
+        for order in orders_for(shard):
+            groups.setdefault(order.status, []).append(order.total)
+        if name == "avg":
+            return {"rows": [(status, sum(v), len(v)) for status, v in groups.items()]}
+        reduce = {"count": len, "sum": sum, "min": min, "max": max}[name]
+        return {"rows": [(status, reduce(v)) for status, v in groups.items()]}
+
+    result = await executor.aggregate(build, TENANTS, PARTIAL_AGGREGATES[name])
+
+    totals = {}
+    for order in ORDERS:
+        totals.setdefault(order.status, []).append(order.total)
+    expected = {
+        "count": len, "sum": sum, "min": min, "max": max,
+        "avg": lambda values: sum(values) / len(values),
+    }[name]
+    assert result == {status: expected(values) for status, values in totals.items()}
+
+
+def test_shards_deduplicate_tenants():
+    executor, _ = make_executor(shard_size=2)
+
+    assert executor.shards(["a", "b", "a", "c"]) == [["a", "b"], ["c"]]
+
+
+class CompilingSession(FakeSession):
+    """Runs real select() statements against ORDERS by reading their bound parameters."""
+
+    async def execute(self, statement):
+        params = statement.compile().params
+        shard = next(value for key, value in params.items() if key.startswith("tenant_id"))
+        limit = next((value for key, value in params.items() if key.startswith("param")), None)
+        sort_key = order_by_sort_key(AdminOrder, list(statement._order_by_clauses))
+        return await super().execute({"rows": orders_for(shard, sort_key, limit)})
+
+
+@pytest.mark.asyncio
+async def test_optimizer_fans_out_large_tenant_sets(monkeypatch):
+    stats = {"active": 0, "peak": 0, "completed": 0}
+    executor = PartitionedQueryExecutor(lambda: CompilingSession(stats), shard_size=3, max_concurrency=2)
+    monkeypatch.setattr(cross_tenant_queries, "partitioned_executor", executor)
+    order_by = [AdminOrder.shipped_at.desc(), AdminOrder.id]
+
+    rows = await cross_tenant_queries.CrossTenantQueryOptimizer.execute_optimized_query(
+        AdminOrder, tenant_ids=TENANTS, order_by=order_by, limit=10, offset=5,
+    )
+
+    assert rows == orders_for(TENANTS, order_by_sort_key(AdminOrder, order_by))[5:15]
+    assert stats["completed"] == 4
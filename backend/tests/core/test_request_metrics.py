@@ -0,0 +1,95 @@
+import pytest
+from fastapi import FastAPI
+from prometheus_client import REGISTRY
+
+from app.core.middleware.pipeline import MiddlewarePipeline
+from app.core.monitoring.metrics import MetricsStage, metrics_collector
+from app.core.monitoring.request_metrics import (
+    CardinalityGuard,
+    TenantLatencySketch,
+    parse_buckets,
+    tenant_labels,
+)
+
+
+def request_count(**labels):
+    return REGISTRY.get_sample_value("http_request_total", labels) or 0
+
+
+async def call(app, path, state=None):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"spec_version": "2.4"}, "method": "GET", "path": path,
+        "raw_path": path.encode(), "root_path": "", "query_string": b"", "headers": [],
+        "state": dict(state or {}),
+    }
+    await app(scope, receive, send)
+    return sent[0]["status"]
+
+
+@pytest.mark.asyncio
+async def test_requests_are_labelled_by_route_template_and_tier():
+    api = FastAPI()
+
+    @api.get("/api/v1/metrics-test/orders/{order_id}")
+    async def get_order(order_id: str):
+        return {"id": order_id}
+
+    app = MiddlewarePipeline(api, [MetricsStage()])
+    template = {"method": "GET", "endpoint": "/api/v1/metrics-test/orders/{order_id}", "status_code": "200"}
+    before = request_count(**template, tenant_tier="premium")
+    unmatched_before = request_count(method="GET", endpoint="unmatched", status_code="404", tenant_tier="unknown")
+
+    for order_id in ("a1", "b2", "c3"):
+        state = {"tenant_context": {"tenant_id": "tenant-1", "tier": "Premium"}}
+        assert await call(app, f"/api/v1/metrics-test/orders/{order_id}", state) == 200
+    assert await call(app, "/wp-admin/setup.php") == 404
+
+    assert request_count(**template, tenant_tier="premium") == before + 3
+    assert request_count(method="GET", endpoint="unmatched", status_code="404", tenant_tier="unknown") \
+        == unmatched_before + 1
+    assert any(entry["tenant_id"] == "tenant-1" for entry in metrics_collector.top_tenants())
+
+
+def test_cardinality_guard_records_new_label_sets_as_overflow(monkeypatch):
+    monkeypatch.setattr(metrics_collector, "_request_series", CardinalityGuard("http_request_total_test", 2))
+    overflow_before = request_count(method="POST", endpoint="overflow", status_code="201", tenant_tier="unknown")
+
+    for index in range(5):
+        metrics_collector.record_request("POST", f"/guard-test/{index}", 201, 0.01)
+
+    assert len(metrics_collector._request_series) == 2
+    assert request_count(method="POST", endpoint="/guard-test/3", status_code="201", tenant_tier="unknown") == 0
+    assert request_count(method="POST", endpoint="overflow", status_code="201", tenant_tier="unknown") \
+        == overflow_before + 3
+    assert REGISTRY.get_sample_value(
+        "metrics_series_overflow_total", {"metric": "http_request_total_test"}) == 3
+
+
+def test_tenant_sketch_keeps_heavy_tenants_within_capacity():
+    sketch = TenantLatencySketch(capacity=3)
+    for index in range(200):
+        sketch.observe("big", 0.2)
+        sketch.observe(f"long-tail-{index}", 0.01)
+        if index % 2 == 0:
+            sketch.observe("medium", 0.05)
+
+    top = sketch.top()
+    assert len(sketch) == 3
+    assert [entry["tenant_id"] for entry in top[:2]] == ["big", "medium"]
+    assert top[0]["requests"] == 200 and top[0]["avg_latency_seconds"] == pytest.approx(0.2)
+
+
+def test_labels_and_buckets_are_normalized():
+    assert tenant_labels({"tenant_id": "t1", "tenant_tier": "gold"}) == ("t1", "unknown")
+    assert tenant_labels({}) == (None, "unknown")
+    assert parse_buckets("0.5, 0.1,1", (1.0,)) == (0.1, 0.5, 1.0)
+    assert parse_buckets("fast", (1.0,)) == (1.0,)
+    assert parse_buckets("", (1.0,)) == (1.0,)
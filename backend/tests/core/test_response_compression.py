@@ -0,0 +1,218 @@
+import gzip
+import importlib
+import json
+import re
+import zlib
+from typing import List
+
+import pytest
+from fastapi import Request
+from pydantic import BaseModel
+from starlette.responses import JSONResponse, Response, StreamingResponse
+
+from app.core.cache.redis_cache import cached_response
+from app.core.http.compression import CompressionStage, negotiate_encoding
+from app.core.middleware.pipeline import MiddlewarePipeline, PipelineStage
+
+# app.core.cache re-exports the redis_cache instance under the module's name
+redis_cache_module = importlib.import_module("app.core.cache.redis_cache")
+
+CATALOG = {"items": [{"sku": f"BASKET-{index}", "name": "Handwoven basket", "price": 1200} for index in range(80)]}
+
+
+async def call(app, headers=(), method="GET"):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"spec_version": "2.4"}, "method": method, "path": "/api/v1/products",
+        "query_string": b"",
+        "headers": [(name.encode(), value.encode()) for name, value in headers],
+    }
+    await app(scope, receive, send)
+    return sent
+
+
+def compressing(endpoint, encodings=("br", "zstd", "gzip"), **options):
+    return MiddlewarePipeline(endpoint, [CompressionStage(encodings=encodings, **options)])
+
+
+def response_headers(sent):
+    return {name.decode(): value.decode() for name, value in sent[0]["headers"]}
+
+
+def test_negotiation_follows_client_weights_then_server_preference():
+    offered = ("br", "zstd", "gzip")
+    assert negotiate_encoding("gzip, deflate, br", offered) == "br"
+    assert negotiate_encoding("br;q=0.5, gzip", offered) == "gzip"
+    assert negotiate_encoding("*", ("gzip",)) == "gzip"
+    assert negotiate_encoding("gzip;q=0, identity", offered) is None
+    assert negotiate_encoding("deflate", offered) is None
+    assert negotiate_encoding(None, offered) is None
+
+
+@pytest.mark.asyncio
+async def test_large_json_is_gzipped_and_small_bodies_pass_through():
+    body = {"value": CATALOG}
+
+    async def endpoint(scope, receive, send):
+        await JSONResponse(body["value"], headers={"ETag": '"v1"'})(scope, receive, send)
+
+    app = compressing(endpoint, encodings=["gzip"])
+    sent = await call(app, headers=[("accept-encoding", "gzip")])
+    headers = response_headers(sent)
+
+    assert headers["content-encoding"] == "gzip" and headers["vary"] == "Accept-Encoding"
+    assert headers["etag"] == 'W/"v1"'
+    assert int(headers["content-length"]) == len(sent[1]["body"])
+    assert json.loads(gzip.decompress(sent[1]["body"])) == CATALOG
+
+    body["value"] = {"ok": True}
+    sent = await call(app, headers=[("accept-encoding", "gzip")])
+    assert "content-encoding" not in response_headers(sent)
+    assert json.loads(sent[1]["body"]) == {"ok": True}
+
+
+@pytest.mark.asyncio
+async def test_streamed_chunks_are_decodable_as_they_arrive():
+    rows = [json.dumps(item).encode() + b"\n" for item in CATALOG["items"][:5]]
+
+    async def endpoint(scope, receive, send):
+        async def chunks():
+            for row in rows:
+                yield row
+        await StreamingResponse(chunks(), media_type="application/x-ndjson")(scope, receive, send)
+
+    sent = await call(compressing(endpoint, encodings=["gzip"]), headers=[("accept-encoding", "gzip")])
+
+    assert response_headers(sent)["content-encoding"] == "gzip"
+    decoder = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    for message, row in zip(sent[1:], rows):
+        # Each flushed chunk decodes to the row it carried
+        assert decoder.decompress(message["body"]) == row
+    assert sent[-1]["more_body"] is False
+
+
+@pytest.mark.asyncio
+async def test_compressed_and_precompressed_content_is_left_alone():
+    payload = b"x" * 5000
+
+    def endpoint_for(response):
+        async def endpoint(scope, receive, send):
+            await response(scope, receive, send)
+        return endpoint
+
+    for response in (
+        Response(payload, media_type="image/png"),
+        Response(payload, media_type="application/gzip"),
+        Response(payload, media_type="application/json", headers={"Content-Encoding": "br"}),
+        Response(b"", status_code=304),
+    ):
+        sent = await call(compressing(endpoint_for(response)), headers=[("accept-encoding", "gzip")])
+        assert sent[1]["body"] == response.body
+
+    sent = await call(compressing(endpoint_for(Response(payload, media_type="text/plain"))),
+                      headers=[("accept-encoding", "gzip")], method="HEAD")
+    assert "content-encoding" not in response_headers(sent)
+
+
+class FakeResponseCache:
+    is_available = True
+
+    def __init__(self):
+        self.hashes = {}
+
+    async def hset_bytes(self, key, mapping, expire=None):
+        self.hashes[key] = dict(mapping)
+        return True
+
+    async def hmget_bytes(self, key, *fields):
+        stored = self.hashes.get(key, {})
+        return [stored.get(field) for field in fields]
+
+    def generate_key(self, tenant_id, prefix, identifier=None):
+        return f"tenant:{tenant_id}:{prefix}:{identifier}"
+
+
+def make_request(accept_encoding=None, if_none_match=None):
+    headers = []
+    if accept_encoding:
+        headers.append((b"accept-encoding", accept_encoding.encode()))
+    if if_none_match:
+        headers.append((b"if-none-match", if_none_match.encode()))
+    return Request({
+        "type": "http", "method": "GET", "path": "/api/v1/catalog", "query_string": b"page=1",
+        "headers": headers, "state": {"tenant_context": {"tenant_id": "t1"}},
+    })
+
+
+@pytest.mark.asyncio
+async def test_cached_response_serves_precompressed_variants(monkeypatch):
+    cache = FakeResponseCache()
+    monkeypatch.setattr(redis_cache_module, "redis_cache", cache)
+    calls = []
+
+    @cached_response("catalog")
+    async def list_catalog(request: Request):
+        calls.append(request)
+        return CATALOG
+
+    miss = await list_catalog(make_request("gzip"))
+    hit = await list_catalog(make_request("gzip"))
+    plain = await list_catalog(make_request())
+
+    assert len(calls) == 1
+    (stored,) = cache.hashes.values()
+    assert set(stored) == {"meta", "identity", "gzip"}
+    assert hit.body == miss.body == stored["gzip"]
+    assert hit.headers["content-encoding"] == "gzip"
+    assert json.loads(gzip.decompress(hit.body)) == CATALOG
+    assert "content-encoding" not in plain.headers and json.loads(plain.body) == CATALOG
+    # Entity tags are quoted; compressed variants carry the weak form
+    assert re.fullmatch(r'"[0-9a-f]{32}"', plain.headers["etag"])
+    assert hit.headers["etag"] == f'W/{plain.headers["etag"]}'
+
+    not_modified = await list_catalog(make_request("gzip", if_none_match=hit.headers["etag"]))
+    assert not_modified.status_code == 304 and len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_cached_response_filters_through_the_response_model(monkeypatch):
+    class Item(BaseModel):
+        sku: str
+
+    monkeypatch.setattr(redis_cache_module, "redis_cache", FakeResponseCache())
+
+    @cached_response("catalog", response_model=List[Item], headers={"Cache-Control": "public, max-age=60"})
+    async def list_catalog(request: Request):
+        return [{"sku": "BASKET-1", "cost_price": 700}]
+
+    miss = await list_catalog(make_request())
+    hit = await list_catalog(make_request())
+
+    assert json.loads(miss.body) == json.loads(hit.body) == [{"sku": "BASKET-1"}]
+    assert hit.headers["cache-control"] == "public, max-age=60"
+
+
+@pytest.mark.asyncio
+async def test_header_stages_on_both_sides_of_compression_apply():
+    class Tag(PipelineStage):
+        def __init__(self, name):
+            self.name = name
+
+        def on_response_start(self, ctx, headers):
+            headers.append("x-seen-encoding", f"{self.name}:{headers.get('content-encoding', 'none')}")
+
+    async def endpoint(scope, receive, send):
+        await JSONResponse(CATALOG)(scope, receive, send)
+
+    app = MiddlewarePipeline(endpoint, [Tag("outer"), CompressionStage(encodings=["gzip"]), Tag("inner")])
+    sent = await call(app, headers=[("accept-encoding", "gzip")])
+
+    seen = [value.decode() for name, value in sent[0]["headers"] if name == b"x-seen-encoding"]
+    assert seen == ["inner:none", "outer:gzip"]
@@ -0,0 +1,124 @@
+import random
+
+from app.core.monitoring.rule_index import OPERATORS, SlidingCounter
+from app.core.monitoring.rules_engine import Rule, RuleCondition, RulesEngine
+
+ACTIONS = ["GET", "POST", "PUT", "DELETE"]
+RESOURCES = ["orders", "products", "users", "payments", "seller_profiles"]
+
+
+def make_rule(rule_id, *conditions, tenant_id="t1", enabled=True):
+    return Rule(
+        id=rule_id, name=rule_id, description="", tenant_id=tenant_id, severity="high",
+        conditions=[RuleCondition(**condition) for condition in conditions], enabled=enabled,
+    )
+
+
+def naive_match(rules, activity):
+    """The previous engine: every condition of every enabled rule."""
+    def holds(condition):
+        value = activity.get(condition.field)
+        if value is None:
+            return False
+        try:
+            return OPERATORS[condition.operator](value, condition.value)
+        except Exception:
+            return False
+    return [rule for rule in rules if rule.enabled and all(holds(c) for c in rule.conditions)]
+
+
+def random_rules(rng, count):
+    rules = []
+    for n in range(count):
+        conditions = []
+        if rng.random() < 0.8:
+            conditions.append({"field": "resource_type", "operator": "equals", "value": rng.choice(RESOURCES)})
+        if rng.random() < 0.5:
+            conditions.append({"field": "action", "operator": "in", "value": rng.sample(ACTIONS, 2)})
+        if rng.random() < 0.5:
+            conditions.append({"field": "status_code", "operator": "greater_than", "value": rng.choice([399, 499])})
+        if rng.random() < 0.2:
+            conditions.append({"field": "path", "operator": "contains", "value": "admin"})
+        rules.append(make_rule(f"r{n}", *conditions, enabled=rng.random() < 0.9))
+    return rules
+
+
+def random_activity(rng):
+    activity = {
+        "tenant_id": "t1",
+        "action": rng.choice(ACTIONS),
+        "resource_type": rng.choice(RESOURCES),
+        "status_code": rng.choice([200, 201, 404, 500]),
+        "path": rng.choice(["/api/admin/users", "/api/v1/orders"]),
+    }
+    if rng.random() < 0.1:
+        del activity["resource_type"]
+    return activity
+
+
+def test_indexed_matching_agrees_with_evaluating_every_rule():
+    rng = random.Random(3)
+    rules = random_rules(rng, 300)
+    engine = RulesEngine()
+    for rule in rules:
+        engine.add_rule(rule)
+
+    for _ in range(500):
+        activity = random_activity(rng)
+        assert engine.match_activity(activity) == naive_match(rules, activity)
+
+    # Removing and updating keep the index consistent
+    for rule in rules[::3]:
+        engine.remove_rule(rule.id, "t1")
+    rules = [rule for index, rule in enumerate(rules) if index % 3]
+    rules[0] = make_rule(rules[0].id, {"field": "action", "operator": "equals", "value": "GET"})
+    engine.update_rule(rules[0])
+    assert engine.get_rules("t1") == rules
+    for _ in range(200):
+        activity = random_activity(rng)
+        assert engine.match_activity(activity) == naive_match(rules, activity)
+
+
+def test_rules_only_see_their_own_tenant_and_shared_conditions_are_compiled_once():
+    engine = RulesEngine()
+    shared = {"field": "resource_type", "operator": "equals", "value": "orders"}
+    engine.add_rule(make_rule("a", shared, {"field": "action", "operator": "equals", "value": "DELETE"}))
+    engine.add_rule(make_rule("b", shared))
+    engine.add_rule(make_rule("c", shared, tenant_id="t2"))
+
+    index = engine.indexes["t1"]
+    assert len(index.conditions) == 2 and not index.scan
+    triggered = engine.match_activity({"tenant_id": "t1", "resource_type": "orders", "action": "DELETE"})
+    assert [rule.id for rule in triggered] == ["a", "b"]
+
+    engine.remove_rule("a", "t1")
+    engine.remove_rule("b", "t1")
+    assert "t1" not in engine.indexes and engine.rules == {"t2": engine.get_rules("t2")}
+
+
+def test_time_window_condition_counts_matches_across_activities():
+    engine = RulesEngine()
+    engine.add_rule(make_rule(
+        "burst",
+        {"field": "status_code", "operator": "greater_than", "value": 499,
+         "duration_seconds": 60, "min_count": 3},
+    ))
+    failure = {"tenant_id": "t1", "status_code": 500}
+
+    assert engine.match_activity(failure, now=0) == []
+    assert engine.match_activity(failure, now=10) == []
+    assert [rule.id for rule in engine.match_activity(failure, now=20)] == ["burst"]
+    # Still within the window even though this activity succeeded
+    assert [rule.id for rule in engine.match_activity({"tenant_id": "t1", "status_code": 200}, now=30)] == ["burst"]
+    # The first two failures have aged out
+    assert engine.match_activity(failure, now=75) == []
+
+
+def test_sliding_counter_expires_whole_buckets():
+    counter = SlidingCounter(window=10, buckets=10)
+    for now in (0.1, 0.5, 3.2, 9.9):
+        counter.hit(now)
+
+    assert counter.count(9.9) == 4
+    assert counter.count(10.5) == 2
+    assert counter.count(20) == 0
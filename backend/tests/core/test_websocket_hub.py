@@ -0,0 +1,113 @@
+import asyncio
+import json
+
+import pytest
+
+from app.core.websocket.hub import WEBSOCKET_FANOUT_CHANNEL, WebSocketHub
+
+
+class FakeSocket:
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.sent = []
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        if self.fail:
+            raise RuntimeError("connection reset")
+        await asyncio.sleep(self.delay)
+        self.sent.append(json.loads(text))
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+class FakeCache:
+    def __init__(self):
+        self.published = []
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+        return 1
+
+
+async def settle():
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_reaches_every_socket_of_a_tenant_and_user():
+    hub = WebSocketHub(cache=FakeCache())
+    first, second, other = FakeSocket(), FakeSocket(), FakeSocket()
+    await hub.connect(first, "t1", "u1")
+    await hub.connect(second, "t1", "u1")
+    await hub.connect(other, "t2", "u2")
+
+    await hub.broadcast_to_tenant("t1", {"type": "activity", "n": 1})
+    await hub.send_to_user("u1", {"type": "notification"})
+    await settle()
+
+    assert first.sent == second.sent == [{"type": "activity", "n": 1}, {"type": "notification"}]
+    assert other.sent == []
+    await hub.stop()
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_is_evicted_without_delaying_the_rest():
+    hub = WebSocketHub(cache=FakeCache(), send_queue_size=2)
+    slow, fast = FakeSocket(delay=60), FakeSocket()
+    slow_connection = await hub.connect(slow, "t1", "slow")
+    await hub.connect(fast, "t1", "fast")
+
+    # The slow socket's writer holds one message, its queue two more
+    for n in range(5):
+        await hub.broadcast_to_tenant("t1", {"n": n})
+        await settle()
+
+    assert [message["n"] for message in fast.sent] == [0, 1, 2, 3, 4]
+    assert slow_connection.closed and slow.closed_with == 1013
+    assert hub.users.keys() == {"fast"}
+    await hub.stop()
+
+
+@pytest.mark.asyncio
+async def test_failed_send_disconnects_only_that_socket():
+    hub = WebSocketHub(cache=FakeCache())
+    broken, healthy = FakeSocket(fail=True), FakeSocket()
+    await hub.connect(broken, "t1", "u1")
+    await hub.connect(healthy, "t1", "u1")
+
+    await hub.broadcast_to_tenant("t1", {"n": 1})
+    await settle()
+
+    assert healthy.sent == [{"n": 1}]
+    assert len(hub.users["u1"]) == 1
+    await hub.stop()
+
+
+@pytest.mark.asyncio
+async def test_fanout_publishes_once_and_ignores_its_own_messages():
+    cache = FakeCache()
+    hub, peer = WebSocketHub(cache=cache), WebSocketHub(cache=FakeCache())
+    hub._fanout = True
+    local, remote = FakeSocket(), FakeSocket()
+    await hub.connect(local, "t1", "u1")
+    await peer.connect(remote, "t1", "u2")
+
+    await hub.broadcast_to_tenant("t1", {"n": 1})
+    await settle()
+    [(channel, payload)] = cache.published
+    assert channel == WEBSOCKET_FANOUT_CHANNEL
+
+    # Delivered to the peer worker's sockets, not redelivered on the origin
+    peer._on_fanout(payload.encode())
+    hub._on_fanout(payload)
+    await settle()
+    assert local.sent == remote.sent == [{"n": 1}]
+    await hub.stop()
+    await peer.stop()
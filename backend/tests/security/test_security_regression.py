@@ -300,13 +300,16 @@ class TestSecurityConfigurationValidation:
         """Test that security middleware is properly registered."""
         from backend.app.main import app
 
-        # Check that security middleware classes are in the middleware stack
+        # Check that security stages are in the middleware pipeline
         middleware_classes = [
             middleware.cls.__name__ for middleware in app.user_middleware]
+        for middleware in app.user_middleware:
+            middleware_classes.extend(
+                type(stage).__name__ for stage in middleware.kwargs.get("stages", ()))
 
         expected_middleware = [
-            "SuperAdminSecurityMiddleware",
-            "DomainSpecificCORSMiddleware"
+            "SuperAdminSecurity",
+            "DomainSpecificCORS"
         ]
 
         for middleware_name in expected_middleware:
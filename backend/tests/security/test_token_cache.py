@@ -0,0 +1,174 @@
+import os
+import time
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import jwt
+import pytest
+from fastapi import HTTPException
+
+os.environ.setdefault("CLERK_SECRET_KEY", "sk_test_organizations")
+
+from app.core.security import clerk_multi_org  # noqa: E402
+from app.core.security.clerk_multi_org import (  # noqa: E402
+    ADMIN_AUDIENCE,
+    SELLER_AUDIENCE,
+    MultiOrgClerkService,
+)
+from app.core.security.clerk_organizations import ClerkOrganizationsService  # noqa: E402
+from app.core.security.token_cache import ExpiringLRUCache, VerifiedTokenCache  # noqa: E402
+
+ADMIN_KEY = "admin-secret"
+SELLER_KEY = "seller-secret"
+
+
+def make_service():
+    service = MultiOrgClerkService()
+    service.admin_secret_key = ADMIN_KEY
+    service.seller_secret_key = SELLER_KEY
+    return service
+
+
+def make_token(key, audience, expires_in=3600, **claims):
+    now = int(time.time())
+    payload = {"sub": "user_1", "email": "user@example.com", "iat": now,
+               "exp": now + expires_in, "aud": audience, **claims}
+    return jwt.encode(payload, key, algorithm="HS256")
+
+
+def test_expiring_lru_evicts_oldest_and_expired_entries():
+    cache = ExpiringLRUCache("test", max_size=2)
+    later = time.time() + 60
+    cache.set("a", 1, later)
+    cache.set("b", 2, later)
+    assert cache.get("a") == 1
+    cache.set("c", 3, later)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    cache.set("stale", 4, time.time() - 1)
+    assert cache.get("stale") is None
+    assert len(cache) == 2
+
+
+def test_verified_token_cache_never_outlives_token_or_max_age():
+    cache = VerifiedTokenCache(max_size=10, max_age=300)
+    cache.set("expired", {"sub": "x"}, int(time.time()) - 1)
+    cache.set("fresh", {"sub": "y"}, int(time.time()) + 3600)
+
+    assert cache.get("expired") is None
+    assert cache.get("fresh") == {"sub": "y"}
+    assert cache.get("unseen") is None
+
+
+def test_repeat_tokens_skip_signature_verification():
+    service = make_service()
+    token = make_token(ADMIN_KEY, ADMIN_AUDIENCE, roles=["admin"])
+
+    first = service._verify_production_token(token)
+    with patch.object(clerk_multi_org.jwt, "decode", side_effect=AssertionError("decoded")):
+        second = service._verify_production_token(token)
+
+    assert second == first
+    assert second is not first
+    assert second.organization_source == "admin"
+
+    # Mutating one caller's claims must not leak into the cached copy
+    second.roles.append("super_admin")
+    second.metadata["impersonating"] = True
+    third = service._verify_production_token(token)
+    assert third.roles == ["admin"]
+    assert "impersonating" not in third.metadata
+
+
+def test_seller_tokens_are_routed_to_the_seller_key():
+    service = make_service()
+    token = make_token(SELLER_KEY, SELLER_AUDIENCE)
+    real_decode = jwt.decode
+    keys = []
+
+    def recording_decode(token, key=None, **kwargs):
+        keys.append(key)
+        return real_decode(token, key, **kwargs)
+
+    with patch.object(clerk_multi_org.jwt, "decode", side_effect=recording_decode):
+        assert service._verify_production_token(token).organization_source == "seller"
+
+    assert keys == [None, SELLER_KEY]
+
+
+@pytest.mark.parametrize("token", [
+    make_token(SELLER_KEY, ADMIN_AUDIENCE),
+    make_token(ADMIN_KEY, "someone-else"),
+    make_token(ADMIN_KEY, ADMIN_AUDIENCE, expires_in=-10),
+    "not-a-jwt",
+])
+def test_invalid_tokens_are_rejected_and_not_cached(token):
+    service = make_service()
+
+    for _ in range(2):
+        with pytest.raises(HTTPException) as exc_info:
+            service._verify_production_token(token)
+        assert exc_info.value.status_code == 401
+    assert len(service.token_cache) == 0
+
+
+def test_unconfigured_organization_is_rejected():
+    service = make_service()
+    service.seller_secret_key = None
+
+    with pytest.raises(HTTPException):
+        service._verify_production_token(make_token(SELLER_KEY, SELLER_AUDIENCE))
+
+
+def membership_response(status_code=200):
+    request = httpx.Request("GET", "https://api.clerk.com/v1/users/user_1/organization_memberships")
+    body = {"data": [{"id": "mem_1", "role": "org:admin", "status": "active",
+                      "organization": {"id": "org_2zWGCeV8c2H56B4ZcK5QmDOv9vL"}}]}
+    return httpx.Response(status_code, json=body, request=request)
+
+
+@pytest.mark.asyncio
+async def test_membership_lookups_are_cached_briefly():
+    service = ClerkOrganizationsService()
+    fetch = AsyncMock(return_value=membership_response())
+
+    with patch("app.core.security.clerk_organizations.outbound_http.request", fetch):
+        assert await service.is_super_admin("user_1")
+        assert await service.get_super_admin_role("user_1") == "org:admin"
+        assert fetch.await_count == 1
+
+        service.invalidate_user_organizations("user_1")
+        assert await service.is_super_admin("user_1")
+        assert fetch.await_count == 2
+
+    assert fetch.await_args.args[0] == "clerk"
+
+
+@pytest.mark.asyncio
+async def test_cached_memberships_are_not_shared_with_callers():
+    service = ClerkOrganizationsService()
+    fetch = AsyncMock(return_value=membership_response())
+
+    with patch("app.core.security.clerk_organizations.outbound_http.request", fetch):
+        first = await service.get_user_organizations("user_1")
+        first[0]["role"] = "org:member"
+        first.clear()
+
+        cached = await service.get_user_organizations("user_1")
+        assert cached[0]["role"] == "org:admin"
+        cached.append({"id": "mem_2"})
+        assert len(await service.get_user_organizations("user_1")) == 1
+        assert fetch.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_membership_lookups_are_not_cached():
+    service = ClerkOrganizationsService()
+    fetch = AsyncMock(side_effect=[membership_response(500), membership_response()])
+
+    with patch("app.core.security.clerk_organizations.outbound_http.request", fetch):
+        assert not await service.is_super_admin("user_1")
+        assert await service.is_super_admin("user_1")
+
+    assert fetch.await_count == 2
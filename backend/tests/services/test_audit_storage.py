@@ -0,0 +1,118 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.services.audit.audit_storage import (
+    AuditStorageEngine,
+    add_months,
+    partition_month,
+    partition_name,
+)
+
+
+class FakeResult:
+    def __init__(self, value=None, rowcount=0):
+        self.value = value
+        self.rowcount = rowcount
+
+    def scalar(self):
+        return self.value
+
+
+class FakeSession:
+    """Records statements; answers the lock, watermark and insert queries."""
+
+    def __init__(self, latest_bucket=None, oldest_entry=None):
+        self.latest_bucket = latest_bucket
+        self.oldest_entry = oldest_entry
+        self.statements = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement, params=None):
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        self.statements.append((sql, params))
+        if "pg_try_advisory_xact_lock" in sql:
+            return FakeResult(True)
+        if "max(audit_log_rollups_hourly.bucket)" in sql:
+            return FakeResult(self.latest_bucket)
+        if "MIN(timestamp)" in sql:
+            return FakeResult(self.oldest_entry)
+        return FakeResult(rowcount=3)
+
+    async def commit(self):
+        pass
+
+
+def engine_with(session, **options):
+    return AuditStorageEngine(session_factory=lambda: session, retention_months=12,
+                              archive_dir="/tmp/audit-test", **options)
+
+
+def test_partition_names_and_month_arithmetic():
+    assert partition_name(date(2025, 3, 1)) == "audit_logs_2025_03"
+    assert partition_month("audit_logs_2025_03") == date(2025, 3, 1)
+    assert partition_month("audit_logs_default") is None
+    assert add_months(date(2025, 11, 1), 3) == date(2026, 2, 1)
+    assert add_months(date(2025, 1, 1), -12) == date(2024, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_maintenance_creates_upcoming_and_detaches_expired_partitions(monkeypatch):
+    session = FakeSession()
+    engine = engine_with(session)
+
+    async def attached(db):
+        return {"audit_logs_2024_09", "audit_logs_2024_10", "audit_logs_2025_10", "audit_logs_default"}
+
+    monkeypatch.setattr(engine, "_attached_partitions", attached)
+    created = await engine.ensure_partitions(session, date(2025, 10, 18))
+    detached = await engine.detach_expired(session, date(2025, 10, 18))
+
+    assert created == ["audit_logs_2025_11", "audit_logs_2025_12"]
+    assert any("FOR VALUES FROM ('2025-12-01') TO ('2026-01-01')" in sql for sql, _ in session.statements)
+    # Twelve months of retention keep October 2024 onwards
+    assert detached == ["audit_logs_2024_09"]
+    assert session.statements[-1][0] == "ALTER TABLE audit_logs DETACH PARTITION audit_logs_2024_09"
+
+
+@pytest.mark.asyncio
+async def test_rollup_refresh_recomputes_from_an_hour_before_the_watermark():
+    session = FakeSession(latest_bucket=datetime(2025, 10, 18, 9))
+    engine = engine_with(session)
+
+    assert await engine.refresh_rollups(now=datetime(2025, 10, 18, 10, 25)) == 3
+    deleted = [params for sql, params in session.statements if sql.startswith("DELETE")]
+    inserted = [params for sql, params in session.statements if sql.lstrip().startswith("INSERT")]
+    assert inserted == [{"start": datetime(2025, 10, 18, 8), "end": datetime(2025, 10, 18, 11)}]
+    assert len(deleted) == 1
+
+    # The open hour stays inside the next window
+    session.statements.clear()
+    await engine.refresh_rollups(now=datetime(2025, 10, 18, 10, 26))
+    inserted = [params for sql, params in session.statements if sql.lstrip().startswith("INSERT")]
+    assert inserted == [{"start": datetime(2025, 10, 18, 9), "end": datetime(2025, 10, 18, 11)}]
+
+
+@pytest.mark.asyncio
+async def test_rollup_backfill_advances_in_bounded_spans():
+    session = FakeSession(oldest_entry=datetime(2025, 9, 1, 6, 30))
+    engine = engine_with(session)
+
+    await engine.refresh_rollups(now=datetime(2025, 10, 18, 10))
+    await engine.refresh_rollups(now=datetime(2025, 10, 18, 10))
+    windows = [params for sql, params in session.statements if sql.lstrip().startswith("INSERT")]
+
+    assert windows[0] == {"start": datetime(2025, 9, 1, 5), "end": datetime(2025, 9, 8, 5)}
+    assert windows[1] == {"start": datetime(2025, 9, 8, 4), "end": datetime(2025, 9, 15, 4)}
+
+
+@pytest.mark.asyncio
+async def test_rollup_refresh_waits_for_the_first_entry():
+    session = FakeSession()
+    assert await engine_with(session).refresh_rollups(now=datetime(2025, 10, 18, 10)) == 0
@@ -0,0 +1,229 @@
+import copy
+import uuid
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from app.conversation.nlp import cart_intent_processor
+from app.core.cache.codec import CacheCodec
+from app.services.cart_engine import (
+    CartAggregate,
+    CartConflictError,
+    CartEngine,
+    CartOwner,
+    aggregate_from_rows,
+    build_load_statement,
+    build_write_statement,
+    write_parameters,
+)
+
+TENANT = uuid.UUID(int=1)
+PHONE = CartOwner("phone_number", "+254700000001")
+MUG = uuid.UUID(int=10)
+BOWL = uuid.UUID(int=11)
+
+
+class FakeCache:
+    """Stores values through the real codec, like RedisCache"""
+
+    def __init__(self):
+        self.codec = CacheCodec()
+        self.values = {}
+
+    def generate_key(self, tenant_id, prefix, identifier=None):
+        return f"tenant:{tenant_id}:{prefix}:{identifier}"
+
+    async def get(self, key):
+        raw = self.values.get(key)
+        return None if raw is None else self.codec.decode(raw)
+
+    async def set(self, key, value, expire=None):
+        self.values[key] = self.codec.encode(value)
+        return True
+
+    async def delete(self, key):
+        return self.values.pop(key, None) is not None
+
+
+class InMemoryCartEngine(CartEngine):
+    """Applies writes to a dict with the same version rules as the SQL"""
+
+    def __init__(self, cache):
+        super().__init__(session_factory=None, cache=cache)
+        self.rows = {}
+        self.fetches = 0
+        self.writes = 0
+
+    async def _fetch(self, tenant_id, owner):
+        self.fetches += 1
+        stored = self.rows.get(owner)
+        if stored is None:
+            cart = CartAggregate(tenant_id=tenant_id, owner=owner)
+            setattr(cart, owner.column, owner.value)
+            return cart
+        return copy.deepcopy(stored)
+
+    async def _write(self, cart):
+        self.writes += 1
+        stored = self.rows.get(cart.owner)
+        if cart.version == 0 and stored is not None:
+            return None
+        if cart.version and (stored is None or stored.version != cart.version):
+            return None
+        saved = copy.deepcopy(cart)
+        saved.version = cart.version + 1
+        saved.created_at = saved.created_at or datetime(2025, 1, 1)
+        saved.updated_at = datetime(2025, 1, 2)
+        saved.mark_clean()
+        self.rows[cart.owner] = saved
+        return (saved.id, saved.version, saved.created_at, saved.updated_at)
+
+    def concurrent_edit(self, owner, change):
+        """Simulate a write by another process, bypassing this engine's cache."""
+        stored = self.rows[owner]
+        change(stored)
+        stored.version += 1
+        stored.mark_clean()
+
+
+@pytest.fixture
+def engine():
+    return InMemoryCartEngine(FakeCache())
+
+
+@pytest.mark.asyncio
+async def test_mutations_are_written_once_and_served_from_cache(engine):
+    cart, line = await engine.mutate(TENANT, PHONE, lambda cart: cart.add(MUG, 2, 12.5, "Mug"))
+
+    assert (engine.fetches, engine.writes) == (1, 1)
+    assert cart.version == 1 and not cart.dirty
+    assert line.price_at_add == Decimal("12.50")
+
+    cart, _ = await engine.mutate(TENANT, PHONE, lambda cart: cart.add(MUG, 1, 12.5, "Mug"))
+    loaded = await engine.load(TENANT, PHONE)
+
+    assert (engine.fetches, engine.writes) == (1, 2)
+    assert [(item.product_id, item.quantity, item.product_name) for item in loaded.items] == [(MUG, 3, "Mug")]
+    assert loaded.version == 2
+    assert loaded.total == Decimal("37.50")
+
+
+@pytest.mark.asyncio
+async def test_unchanged_carts_are_not_written(engine):
+    await engine.mutate(TENANT, PHONE, lambda cart: cart.line_for(MUG))
+
+    assert engine.writes == 0
+
+
+@pytest.mark.asyncio
+async def test_version_conflict_reapplies_the_change_to_the_current_cart(engine):
+    await engine.mutate(TENANT, PHONE, lambda cart: cart.add(MUG, 1, 10))
+    engine.concurrent_edit(PHONE, lambda cart: cart.add(BOWL, 4, 7))
+
+    cart, _ = await engine.mutate(TENANT, PHONE, lambda cart: cart.add(MUG, 1, 10))
+
+    assert engine.writes == 3
+    assert {item.product_id: item.quantity for item in cart.items} == {MUG: 2, BOWL: 4}
+    assert (await engine.load(TENANT, PHONE)).version == cart.version == 3
+
+
+@pytest.mark.asyncio
+async def test_persistent_conflicts_raise(engine):
+    await engine.mutate(TENANT, PHONE, lambda cart: cart.add(MUG, 1, 10))
+
+    def always_conflicts(cart):
+        engine.concurrent_edit(PHONE, lambda stored: None)
+        cart.add(BOWL, 1, 5)
+
+    with pytest.raises(CartConflictError):
+        await engine.mutate(TENANT, PHONE, always_conflicts)
+    assert engine.writes == 1 + engine.max_attempts
+
+
+def test_aggregate_round_trips_through_the_cache_codec():
+    cart = CartAggregate(tenant_id=TENANT, owner=PHONE, version=4, phone_number=PHONE.value)
+    cart.add(MUG, 2, "9.99", "Mug", variant_id=uuid.UUID(int=99))
+    cart.mark_clean()
+    codec = CacheCodec()
+
+    restored = CartAggregate.from_dict(codec.decode(codec.encode(cart.to_dict())))
+
+    assert restored == cart
+
+
+def test_removed_and_changed_lines_become_write_parameters():
+    cart = CartAggregate(tenant_id=TENANT, owner=PHONE, version=2)
+    kept = cart.add(MUG, 1, 10)
+    dropped = cart.add(BOWL, 1, 5)
+    cart.mark_clean()
+
+    cart.set_quantity(kept, 3)
+    cart.set_quantity(dropped, 0)
+    params = write_parameters(cart)
+
+    assert params["expected_version"] == 2
+    assert params["item_ids"] == [str(kept.id)]
+    assert params["quantities"] == [3]
+    assert params["removed_ids"] == [str(dropped.id)]
+
+
+def test_statements_claim_new_and_existing_carts_differently():
+    new_cart = CartAggregate(tenant_id=TENANT, owner=CartOwner("session_id", "s-1"))
+    existing = CartAggregate(tenant_id=TENANT, owner=PHONE, version=5)
+
+    insert_sql = str(build_write_statement(new_cart))
+    update_sql = str(build_write_statement(existing))
+
+    assert "ON CONFLICT (tenant_id, session_id) WHERE session_id IS NOT NULL DO NOTHING" in insert_sql
+    assert "version = :expected_version" in update_sql
+    assert "INSERT INTO customers" in str(build_load_statement(PHONE))
+    assert "INSERT INTO customers" not in str(build_load_statement(CartOwner("user_id", str(MUG))))
+
+
+Row = namedtuple("Row", [
+    "customer_id", "customer_name", "cart_id", "version", "user_id", "phone_number",
+    "session_id", "created_at", "updated_at", "item_id", "product_id", "variant_id",
+    "quantity", "price_at_add", "item_created_at", "item_updated_at", "product_name",
+])
+
+
+def test_aggregate_from_load_rows():
+    customer, cart_id = uuid.UUID(int=5), uuid.UUID(int=6)
+    base = dict(customer_id=customer, customer_name="Amina", cart_id=cart_id, version=3, user_id=customer,
+                phone_number=PHONE.value, session_id=None, created_at=None, updated_at=None,
+                variant_id=None, item_created_at=None, item_updated_at=None)
+    rows = [
+        Row(item_id=uuid.UUID(int=7), product_id=MUG, quantity=2, price_at_add=Decimal("4.00"), product_name="Mug", **base),
+        Row(item_id=uuid.UUID(int=8), product_id=BOWL, quantity=1, price_at_add=Decimal("6.50"), product_name="Bowl", **base),
+    ]
+
+    cart = aggregate_from_rows(TENANT, PHONE, rows)
+    empty = aggregate_from_rows(TENANT, PHONE, [Row(**{**base, "cart_id": None, "version": None}, item_id=None,
+                                                    product_id=None, quantity=None, price_at_add=None, product_name=None)])
+
+    assert (cart.id, cart.version, cart.customer_name) == (cart_id, 3, "Amina")
+    assert cart.total == Decimal("14.50")
+    assert empty.version == 0 and empty.items == [] and empty.user_id == customer
+
+
+@pytest.mark.asyncio
+async def test_warm_chat_turns_cost_one_write_and_no_reads(engine, monkeypatch):
+    cache = engine.cache
+    monkeypatch.setattr(cart_intent_processor, "cart_engine", engine)
+    monkeypatch.setattr(cart_intent_processor, "redis_cache", cache)
+    await cache.set(
+        cache.generate_key(str(TENANT), cart_intent_processor.PRODUCT_MATCH_CACHE_PREFIX, "mug"),
+        {"id": str(MUG), "name": "Mug", "price": 12.5},
+    )
+    processor = cart_intent_processor.CartIntentProcessor(db=None)
+
+    first = await processor.process_cart_intent("add 2 mug to cart", str(TENANT), PHONE.value, {})
+    second = await processor.process_cart_intent("add mug to cart", str(TENANT), PHONE.value, {})
+    view = await processor.process_cart_intent("view cart", str(TENANT), PHONE.value, {})
+
+    assert "Cart total: KES 25.00" in first["messages"][0]["text"]
+    assert "Cart total: KES 37.50" in second["messages"][0]["text"]
+    assert "3x Mug" in view["messages"][0]["text"]
+    assert (engine.fetches, engine.writes) == (1, 2)
@@ -0,0 +1,239 @@
+import io
+import json
+
+import pytest
+
+from app.services.catalog_import import pipeline as pipeline_module
+from app.services.catalog_import import (
+    CatalogImporter,
+    ImportFormat,
+    LoadResult,
+    RowError,
+    copy_rows,
+    iter_csv_rows,
+    iter_ndjson_rows,
+    validate_rows,
+)
+from app.services.catalog_import.validation import PRODUCT_STAGE_COLUMNS, VARIANT_STAGE_COLUMNS
+
+CSV_IMPORT = (
+    "﻿sku,name,description,price,inventory_quantity,is_featured,variant_sku,variant_price\n"
+    "MUG-1,Ceramic Mug,Hand thrown,12.5,10,yes,MUG-1-S,11\n"
+    "MUG-1,Ceramic Mug,Hand thrown,12.5,10,yes,MUG-1-L,14\n"
+    "MUG-1,,,,,,MUG-1-XL,16\n"
+    "BOWL-1,Bowl!,Wide,-3,x,maybe,,\n"
+    "CUP-1,Cup,Small,4,1,no,CUP-1-S,abc\n"
+    "TOO,many,cells,1,1,no,,,extra\n"
+)
+
+
+def product(row):
+    return dict(zip(PRODUCT_STAGE_COLUMNS, row))
+
+
+def variant(row):
+    return dict(zip(VARIANT_STAGE_COLUMNS, row))
+
+
+def test_csv_rows_split_product_and_variant_columns():
+    stream = io.BytesIO(CSV_IMPORT.encode("utf-8"))
+
+    rows = list(iter_csv_rows(stream))
+
+    assert [row.line for row in rows] == [2, 3, 4, 5, 6, 7]
+    assert rows[0].product["sku"] == "MUG-1"
+    assert rows[0].variants == [{"sku": "MUG-1-S", "price": "11"}]
+    assert rows[2].product["name"] is None
+    assert rows[3].variants == []
+    assert rows[5].error is not None
+    assert not stream.closed
+
+
+def test_ndjson_rows_report_malformed_lines_and_continue():
+    lines = [
+        json.dumps({"sku": "TEE-1", "name": "Tee", "description": "Cotton", "price": 20,
+                    "variants": [{"sku": "TEE-1-M", "inventory_quantity": 3}]}),
+        "",
+        "{not json",
+        json.dumps(["array"]),
+        json.dumps({"sku": "TEE-2", "variants": "TEE-2-M"}),
+        json.dumps({"SKU": "TEE-3", "Name": " Tee ", "Description": "x", "Price": "1"}),
+    ]
+    rows = list(iter_ndjson_rows(io.BytesIO("\n".join(lines).encode())))
+
+    assert [row.line for row in rows] == [1, 3, 4, 5, 6]
+    assert rows[0].variants == [{"sku": "TEE-1-M", "inventory_quantity": 3}]
+    assert [row.error is not None for row in rows] == [False, True, True, True, False]
+    assert rows[4].product == {"sku": "TEE-3", "name": "Tee", "description": "x", "price": "1"}
+
+
+def test_validation_stages_each_sku_once_and_reports_row_errors():
+    batch = validate_rows(list(iter_csv_rows(io.BytesIO(CSV_IMPORT.encode()))))
+
+    assert batch.rows == 6
+    assert [product(row)["sku"] for row in batch.products] == ["MUG-1", "CUP-1"]
+    mug = product(batch.products[0])
+    assert (mug["line"], mug["price"], mug["inventory_quantity"], mug["is_featured"]) == (3, 12.5, 10, True)
+    assert [variant(row)["sku"] for row in batch.variants] == ["MUG-1-S", "MUG-1-L", "MUG-1-XL"]
+    assert {variant(row)["product_sku"] for row in batch.variants} == {"MUG-1"}
+
+    errors = {(error.line, error.field) for error in batch.errors}
+    assert (5, "name") in errors
+    assert (6, "variant.price") in errors
+    assert (7, None) in errors
+    assert len(batch.errors) == 3
+
+
+@pytest.mark.parametrize("field,value,message", [
+    ("price", "-1", "must be greater than 0"),
+    ("price", "NaN", "must be greater than 0"),
+    ("inventory_quantity", "1.5", "must be a whole number"),
+    ("inventory_quantity", "-2", "cannot be negative"),
+    ("image_url", "ftp://x", "must be an http(s) URL"),
+    ("show_on_whatsapp", "sometimes", "must be true or false"),
+    ("weight", "inf", "must be a non-negative number"),
+    ("description", None, "is required"),
+    ("sku", "S" * 101, "must be at most 100 characters"),
+])
+def test_invalid_product_values_are_reported(field, value, message):
+    record = {"sku": "A-1", "name": "Lamp", "description": "Brass", "price": "10", field: value}
+    rows = list(iter_ndjson_rows(io.BytesIO(json.dumps(record).encode())))
+
+    batch = validate_rows(rows)
+
+    assert batch.products == []
+    assert [(e.field, e.message) for e in batch.errors] == [(field, message)]
+
+
+def test_unknown_columns_are_collected():
+    record = {"sku": "A-1", "name": "Lamp", "description": "Brass", "price": 10, "colour": "red",
+              "variants": [{"sku": "A-1-R", "size": "L"}]}
+
+    batch = validate_rows(list(iter_ndjson_rows(io.BytesIO(json.dumps(record).encode()))))
+
+    assert batch.unknown_fields == {"colour", "variant.size"}
+    assert len(batch.products) == 1 and len(batch.variants) == 1
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def import_file(count, bad_every=0):
+    lines = []
+    for n in range(count):
+        price = -1 if bad_every and n % bad_every == 0 else n + 1
+        lines.append(json.dumps({
+            "sku": f"SKU-{n}", "name": f"Item {n}", "description": "d", "price": price,
+            "variants": [{"sku": f"SKU-{n}-A"}],
+        }))
+    return io.BytesIO("\n".join(lines).encode())
+
+
+@pytest.mark.parametrize("workers", [0, 1])
+@pytest.mark.asyncio
+async def test_pipeline_loads_batches_and_aggregates_the_report(monkeypatch, workers):
+    loaded = []
+
+    async def fake_load_batch(session, batch, tenant_id, seller_id):
+        loaded.append(batch)
+        return LoadResult(
+            products_created=len(batch.products),
+            variants_created=len(batch.variants) - 1,
+            errors=[RowError(batch.variants[0][0], batch.variants[0][2], "variant.sku", "taken")],
+        )
+
+    monkeypatch.setattr(pipeline_module, "load_batch", fake_load_batch)
+    importer = CatalogImporter(FakeSession, batch_size=40, validation_workers=workers, max_reported_errors=5)
+    try:
+        report = await importer.run(import_file(100, bad_every=10), ImportFormat.NDJSON, "tenant", "seller")
+    finally:
+        await importer.stop()
+
+    assert [batch.rows for batch in loaded] == [40, 40, 20]
+    assert report.rows == 100
+    assert report.products_created == 90
+    assert report.variants_created == 87
+    assert report.error_count == 13
+    summary = report.to_dict()
+    assert len(summary["errors"]) == 5 and summary["errors_truncated"]
+    assert summary["rows_per_second"] > 0
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_reports_its_rows_and_the_import_continues(monkeypatch):
+    calls = []
+
+    async def flaky_load_batch(session, batch, tenant_id, seller_id):
+        calls.append(batch)
+        if len(calls) == 1:
+            raise RuntimeError("deadlock detected")
+        return LoadResult(products_created=len(batch.products))
+
+    monkeypatch.setattr(pipeline_module, "load_batch", flaky_load_batch)
+    importer = CatalogImporter(FakeSession, batch_size=3, validation_workers=0)
+
+    report = await importer.run(import_file(5), ImportFormat.NDJSON, "tenant", "seller")
+
+    assert report.products_created == 2
+    assert report.error_count == 6
+    assert all("deadlock detected" in error.message for error in report.errors)
+
+
+class FakeDriverConnection:
+    def __init__(self):
+        self.copied = []
+
+    async def copy_records_to_table(self, table, records, columns):
+        self.copied.append((table, columns, records))
+
+
+class FakeRawConnection:
+    def __init__(self, driver_connection):
+        self.driver_connection = driver_connection
+
+
+class FakeConnection:
+    def __init__(self, raw):
+        self.raw = raw
+
+    async def get_raw_connection(self):
+        return self.raw
+
+
+class CopySession:
+    def __init__(self, driver_connection):
+        self.connection_ = FakeConnection(FakeRawConnection(driver_connection))
+        self.executed = []
+
+    async def connection(self):
+        return self.connection_
+
+    async def execute(self, statement, params=None):
+        self.executed.append((str(statement), params))
+
+
+@pytest.mark.asyncio
+async def test_copy_rows_uses_copy_protocol_when_available():
+    driver = FakeDriverConnection()
+    session = CopySession(driver)
+
+    await copy_rows(session, "stage", ("a", "b"), [(1, 2)])
+
+    assert driver.copied == [("stage", ["a", "b"], [(1, 2)])]
+    assert session.executed == []
+
+
+@pytest.mark.asyncio
+async def test_copy_rows_falls_back_to_executemany():
+    session = CopySession(object())
+
+    await copy_rows(session, "stage", ("a", "b"), [(1, 2), (3, 4)])
+
+    assert session.executed == [
+        ("INSERT INTO stage (a, b) VALUES (:a, :b)", [{"a": 1, "b": 2}, {"a": 3, "b": 4}])
+    ]
@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from app.services.admin.dashboard_metrics import TABLE_QUERIES, DashboardMetricsEngine
+
+
+class FakeResult:
+    def __init__(self, row):
+        self.row = row
+
+    def mappings(self):
+        return self
+
+    def one(self):
+        return self.row
+
+
+class FakeDatabase:
+    """Every session shares a gate, so the test can hold all queries in flight at once."""
+
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.sessions = 0
+        self.in_flight = 0
+        self.peak = 0
+        self.statements = []
+        self.total_tenants = 10
+
+    def session(self):
+        database = self
+
+        class Session:
+            async def __aenter__(self):
+                database.sessions += 1
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            async def execute(self, statement, params=None):
+                database.statements.append(str(statement))
+                database.in_flight += 1
+                database.peak = max(database.peak, database.in_flight)
+                await database.gate.wait()
+                database.in_flight -= 1
+                return FakeResult({"total_tenants": database.total_tenants, "previous_tenants": 4})
+
+        return Session()
+
+    async def audit_summary(self, db, start_date):
+        await db.execute("audit rollups")
+        return {"error_count": 2}
+
+
+async def settle():
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+def make_engine(database, **kwargs):
+    return DashboardMetricsEngine(session_factory=database.session, audit_summary=database.audit_summary, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_one_query_per_table_all_in_flight_together():
+    database = FakeDatabase()
+    engine = make_engine(database)
+
+    load = asyncio.create_task(engine.snapshot(30))
+    await settle()
+    # Every table and the audit rollups are queried concurrently on separate sessions
+    assert database.peak == database.sessions == len(TABLE_QUERIES) + 1
+    database.gate.set()
+    metrics = await load
+
+    assert metrics["tenants"]["previous_tenants"] == 4
+    assert metrics["audit"] == {"error_count": 2}
+    assert all("FILTER" in statement for statement in database.statements[:len(TABLE_QUERIES)])
+
+
+@pytest.mark.asyncio
+async def test_concurrent_loads_share_one_computation_and_are_cached():
+    database = FakeDatabase()
+    engine = make_engine(database)
+
+    loads = [asyncio.create_task(engine.snapshot(30)) for _ in range(5)]
+    await settle()
+    database.gate.set()
+    results = await asyncio.gather(*loads)
+
+    assert all(result is results[0] for result in results)
+    assert database.sessions == len(TABLE_QUERIES) + 1
+    assert await engine.snapshot(30) is results[0]
+    assert database.sessions == len(TABLE_QUERIES) + 1
+    # Another window is computed separately
+    await engine.snapshot(7)
+    assert database.sessions == 2 * (len(TABLE_QUERIES) + 1)
+
+
+@pytest.mark.asyncio
+async def test_stale_snapshot_is_served_while_refreshing_in_the_background():
+    database = FakeDatabase()
+    database.gate.set()
+    engine = make_engine(database, ttl=0, max_stale=60)
+
+    first = await engine.snapshot(30)
+    database.total_tenants = 11
+    # Stale but within max_stale: returned at once, refresh scheduled
+    assert await engine.snapshot(30) is first
+    await settle()
+    assert (await engine.snapshot(30))["tenants"]["total_tenants"] == 11
+
+    # Past max_stale the caller waits for fresh numbers
+    engine.max_stale = 0
+    database.total_tenants = 12
+    assert (await engine.snapshot(30))["tenants"]["total_tenants"] == 12
@@ -0,0 +1,171 @@
+import asyncio
+
+import pytest
+
+import app.domain.events.event_bus as event_bus_module
+from app.domain.events.event_bus import EventBus
+from app.domain.events.order_events import DomainEvent, OrderCancelledEvent
+from app.domain.events.outbox import EventOutboxRelay, OutboxRecord, aggregate_id, event_class
+
+
+def cancelled(order_id, reason):
+    return OrderCancelledEvent(tenant_id="t1", order_id=order_id, order_number=order_id,
+                               cancellation_reason=reason)
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def commit(self):
+        pass
+
+
+class FakeStore:
+    def __init__(self, events=()):
+        self.records = []
+        self.offsets_saved = {}
+        self.errors = {}
+        for event in events:
+            self.append(event)
+
+    def append(self, event):
+        position = len(self.records) + 1
+        self.records.append(OutboxRecord(position, str(event.order_id), event))
+
+    def session(self):
+        return FakeSession()
+
+    async def try_lock(self, db):
+        return True
+
+    async def sequence(self, db, limit):
+        return 0
+
+    async def offsets(self, db):
+        return dict(self.offsets_saved)
+
+    async def read(self, db, after, limit):
+        return [record for record in self.records if record.position > after][:limit]
+
+    async def save_offsets(self, db, offsets, errors):
+        self.offsets_saved.update(offsets)
+        self.errors.update(errors)
+
+    async def prune(self, db, up_to, older_than):
+        return 0
+
+
+class FakeBus:
+    def __init__(self, **consumers):
+        self._consumers = {name: (handler, frozenset({"ORDER_CANCELLED"})) for name, handler in consumers.items()}
+
+    def consumers(self):
+        return self._consumers
+
+
+@pytest.mark.asyncio
+async def test_relay_delivers_each_aggregate_in_order_and_records_offsets():
+    delivered = []
+
+    async def handler(event):
+        # The first event of order A is the slowest; A2 must still wait for it
+        if event.cancellation_reason == "A1":
+            await asyncio.sleep(0.01)
+        delivered.append(event.cancellation_reason)
+
+    store = FakeStore([cancelled("A", "A1"), cancelled("B", "B1"), cancelled("A", "A2")])
+    relay = EventOutboxRelay(bus=FakeBus(notify=handler), store=store, retry_delay=0)
+
+    assert await relay.drain() == 3
+    assert delivered.index("A1") < delivered.index("A2") and sorted(delivered) == ["A1", "A2", "B1"]
+    assert store.offsets_saved == {"notify": 3}
+
+    # Nothing is redelivered; a later event is delivered on the next drain
+    store.append(cancelled("B", "B2"))
+    await relay.drain()
+    assert delivered[3:] == ["B2"] and store.offsets_saved == {"notify": 4}
+
+
+@pytest.mark.asyncio
+async def test_failing_handler_is_retried_then_skipped_without_blocking_others():
+    attempts = {"flaky": 0, "broken": 0}
+    received = []
+
+    async def flaky(event):
+        attempts["flaky"] += 1
+        if attempts["flaky"] < 3:
+            raise RuntimeError("inventory service unavailable")
+        received.append(event.event_id)
+
+    async def broken(event):
+        attempts["broken"] += 1
+        raise ValueError("bad payload")
+
+    store = FakeStore([cancelled("A", "A1")])
+    relay = EventOutboxRelay(bus=FakeBus(flaky=flaky, broken=broken), store=store,
+                             max_attempts=4, retry_delay=0)
+    await relay.drain()
+
+    assert received == [store.records[0].event.event_id]
+    assert attempts == {"flaky": 3, "broken": 4}
+    assert store.offsets_saved == {"flaky": 1, "broken": 1}
+    assert "bad payload" in store.errors["broken"]
+
+
+@pytest.mark.asyncio
+async def test_new_consumer_starts_at_the_slowest_existing_offset():
+    seen = []
+
+    async def audit(event):
+        seen.append(event.cancellation_reason)
+
+    store = FakeStore([cancelled("A", f"A{index}") for index in range(1, 5)])
+    store.offsets_saved = {"old": 2, "older": 1}
+    relay = EventOutboxRelay(bus=FakeBus(audit=audit), store=store, retry_delay=0)
+    await relay.drain()
+
+    assert seen == ["A2", "A3", "A4"]
+
+
+@pytest.mark.asyncio
+async def test_publish_with_a_session_writes_the_outbox_instead_of_dispatching(monkeypatch):
+    bus = EventBus()
+    staged, dispatched = [], []
+    monkeypatch.setattr(event_bus_module, "add_to_outbox", lambda db, event: staged.append((db, event)))
+
+    async def handler(event):
+        dispatched.append(event)
+
+    unsubscribe = bus.subscribe("ORDER_CANCELLED", handler)
+    try:
+        session = object()
+        event = cancelled("A", "A1")
+        await bus.publish(event, db=session)
+        assert staged == [(session, event)] and dispatched == []
+
+        # Without a session or a running relay, handlers run in process
+        await bus.publish(event)
+        assert dispatched == [event]
+    finally:
+        unsubscribe()
+
+    # Stored payloads load back as the original event type
+    payload = event.model_dump(mode="json")
+    assert event_class(payload["event_type"]).model_validate(payload) == event
+    assert aggregate_id(event) == "A"
+
+
+def test_event_history_is_a_bounded_ring_buffer():
+    bus = EventBus()
+    history = bus._event_history
+    assert history.maxlen == 1000
+    for index in range(1004):
+        history.append(DomainEvent(event_type="PING" if index % 2 else "PONG", tenant_id="t1"))
+
+    assert len(history) == 1000
+    recent = bus.get_recent_events(limit=3, event_type="PING")
+    assert [event.event_type for event in recent] == ["PING"] * 3 and recent[-1] is history[-1]
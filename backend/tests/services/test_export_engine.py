@@ -0,0 +1,216 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+import uuid
+import zipfile
+from datetime import datetime
+from xml.etree import ElementTree
+
+import pytest
+
+from app.services.export import (
+    ExportFormat,
+    ExportJobManager,
+    ExportJobStatus,
+    encode_rows,
+    export_job_response,
+    gzip_chunks,
+    iter_csv,
+    iter_xlsx,
+    stream_query,
+)
+
+COLUMNS = ["id", "name", "amount", "created_at"]
+SHEET_NS = {"s": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+
+def make_rows(count):
+    for index in range(count):
+        yield {
+            "id": uuid.UUID(int=index),
+            "name": f"row <{index}> & \"quoted\"",
+            "amount": index * 1.5,
+            "created_at": datetime(2025, 1, 1, 12, 0, index % 60),
+        }
+
+
+class CountingRows:
+    """Row source that records how far the encoder has pulled."""
+
+    def __init__(self, count):
+        self.count = count
+        self.pulled = 0
+
+    def __iter__(self):
+        for row in make_rows(self.count):
+            self.pulled += 1
+            yield row
+
+
+def test_csv_yields_chunks_while_rows_are_still_arriving():
+    rows = CountingRows(5000)
+    chunks = iter_csv(rows, COLUMNS, chunk_size=1024)
+
+    first = next(chunks)
+    assert rows.pulled < rows.count
+    body = first + b"".join(chunks)
+
+    parsed = list(csv.reader(io.StringIO(body.decode("utf-8"))))
+    assert parsed[0] == COLUMNS
+    assert len(parsed) == 5001
+    assert parsed[1] == [str(uuid.UUID(int=0)), 'row <0> & "quoted"', "0.0", "2025-01-01T12:00:00"]
+
+
+@pytest.mark.parametrize("export_format", [ExportFormat.NDJSON, ExportFormat.JSON])
+def test_json_formats_round_trip(export_format):
+    body = b"".join(encode_rows(make_rows(3), export_format, COLUMNS))
+
+    if export_format == ExportFormat.NDJSON:
+        records = [json.loads(line) for line in body.splitlines()]
+    else:
+        records = json.loads(body)
+    assert [record["id"] for record in records] == [str(uuid.UUID(int=i)) for i in range(3)]
+    assert records[2]["amount"] == 3.0
+
+
+def test_empty_json_export_is_an_empty_array():
+    assert b"".join(encode_rows([], ExportFormat.JSON, COLUMNS)) == b"[]"
+
+
+def test_gzip_stream_decompresses_to_original():
+    chunks = list(iter_csv(make_rows(2000), COLUMNS, chunk_size=512))
+
+    assert gzip.decompress(b"".join(gzip_chunks(chunks))) == b"".join(chunks)
+
+
+def test_xlsx_is_a_readable_workbook_streamed_in_chunks():
+    rows = CountingRows(3000)
+    chunks = iter_xlsx(rows, COLUMNS, sheet_name="Orders: 2025", chunk_size=4096)
+
+    first = next(chunks)
+    assert rows.pulled < rows.count
+    body = first + b"".join(chunks)
+
+    with zipfile.ZipFile(io.BytesIO(body)) as archive:
+        assert archive.testzip() is None
+        workbook = archive.read("xl/workbook.xml").decode("utf-8")
+        sheet = ElementTree.fromstring(archive.read("xl/worksheets/sheet1.xml"))
+
+    assert 'name="Orders_ 2025"' in workbook
+    sheet_rows = sheet.findall("s:sheetData/s:row", SHEET_NS)
+    assert len(sheet_rows) == 3001
+    header = [cell.findtext("s:is/s:t", namespaces=SHEET_NS) for cell in sheet_rows[0]]
+    assert header == COLUMNS
+    cells = list(sheet_rows[2])
+    assert cells[0].get("r") == "A3"
+    assert cells[1].findtext("s:is/s:t", namespaces=SHEET_NS) == 'row <1> & "quoted"'
+    assert cells[2].findtext("s:v", namespaces=SHEET_NS) == "1.5"
+
+
+def test_stream_query_uses_server_side_batches():
+    class FakeQuery:
+        def yield_per(self, count):
+            self.batch_size = count
+            return iter([1, 2, 3])
+
+    query = FakeQuery()
+
+    assert list(stream_query(query, batch_size=250)) == [1, 2, 3]
+    assert query.batch_size == 250
+
+
+class FakeJobCache:
+    """Shared job store standing in for Redis"""
+
+    def __init__(self):
+        self.values = {}
+
+    async def get(self, key):
+        return json.loads(self.values[key]) if key in self.values else None
+
+    async def set(self, key, value, expire=None):
+        self.values[key] = json.dumps(value)
+        return True
+
+    async def delete(self, key):
+        return self.values.pop(key, None) is not None
+
+
+@pytest.mark.asyncio
+async def test_background_job_writes_file_and_serves_it_by_token(tmp_path):
+    manager = ExportJobManager(directory=str(tmp_path), cache=FakeJobCache())
+
+    job = await manager.submit(
+        lambda: iter_csv(make_rows(10), COLUMNS), filename="export.csv", media_type="text/csv"
+    )
+    assert job.status in (ExportJobStatus.PENDING, ExportJobStatus.RUNNING)
+
+    while (await manager.get(job.token)).status not in (ExportJobStatus.COMPLETED, ExportJobStatus.FAILED):
+        await asyncio.sleep(0.01)
+
+    assert job.status == ExportJobStatus.COMPLETED
+    with open(job.path, "rb") as handle:
+        assert len(handle.read().splitlines()) == 11
+    assert not any(name.endswith(".part") for name in (p.name for p in tmp_path.iterdir()))
+    assert await manager.get("unknown-token") is None
+
+    manager.ttl_seconds = -1
+    assert await manager.get(job.token) is None
+    assert not tmp_path.joinpath(job.token).exists()
+
+
+@pytest.mark.asyncio
+async def test_failed_background_job_leaves_no_file(tmp_path):
+    manager = ExportJobManager(directory=str(tmp_path), cache=FakeJobCache())
+
+    def produce():
+        yield b"partial"
+        raise RuntimeError("cursor closed")
+
+    job = await manager.submit(produce, filename="export.csv", media_type="text/csv")
+    while job.status not in (ExportJobStatus.COMPLETED, ExportJobStatus.FAILED):
+        await asyncio.sleep(0.01)
+
+    assert job.status == ExportJobStatus.FAILED
+    assert "cursor closed" in job.error
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_queued_export_response_points_at_the_download(tmp_path):
+    manager = ExportJobManager(directory=str(tmp_path), cache=FakeJobCache())
+    job = await manager.submit(
+        lambda: iter_csv(make_rows(1), COLUMNS), filename="export.csv", media_type="text/csv"
+    )
+
+    response = export_job_response(job)
+
+    assert response.status_code == 202
+    assert json.loads(response.body)["download_url"].endswith(f"/exports/{job.token}")
+    while job.status not in (ExportJobStatus.COMPLETED, ExportJobStatus.FAILED):
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_any_worker_can_serve_a_background_export(tmp_path):
+    cache = FakeJobCache()
+    running = ExportJobManager(directory=str(tmp_path), cache=cache)
+    other = ExportJobManager(directory=str(tmp_path), cache=cache)
+
+    job = await running.submit(
+        lambda: iter_csv(make_rows(3), COLUMNS), filename="export.csv", media_type="text/csv"
+    )
+    assert (await other.get(job.token)).status in (ExportJobStatus.PENDING, ExportJobStatus.RUNNING)
+    while job.status not in (ExportJobStatus.COMPLETED, ExportJobStatus.FAILED):
+        await asyncio.sleep(0.01)
+
+    served = await other.get(job.token)
+    assert served.status == ExportJobStatus.COMPLETED
+    with open(served.path, "rb") as handle:
+        assert len(handle.read().splitlines()) == 4
+
+    # Stopping the worker that ran the job leaves the file downloadable elsewhere
+    await running.stop()
+    assert (await other.get(job.token)).size == job.size
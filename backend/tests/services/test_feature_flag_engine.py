@@ -0,0 +1,176 @@
+import asyncio
+import uuid
+
+import pytest
+
+from app.services.feature_flags.engine import (
+    FEATURE_FLAGS_CHANNEL,
+    FeatureFlagEngine,
+    FlagSnapshot,
+    rollout_bucket,
+)
+
+TENANT = uuid.uuid4()
+OTHER_TENANT = uuid.uuid4()
+CHECKOUT, BETA, DARK, ROLLOUT = (uuid.uuid4() for _ in range(4))
+
+
+def make_snapshot(version=None, rollout=50):
+    return FlagSnapshot(
+        version,
+        flags=[
+            (CHECKOUT, "new_checkout", True, {"theme": "light", "limit": 5}),
+            (BETA, "beta_reports", False, None),
+            (DARK, "dark_mode", True, None),
+            (ROLLOUT, "fast_search", True, {"rollout_percentage": rollout}),
+        ],
+        overrides=[
+            (CHECKOUT, TENANT, False, {"theme": "dark"}),
+            (BETA, TENANT, True, None),
+        ],
+    )
+
+
+def test_tenant_overrides_win_over_global_state():
+    snapshot = make_snapshot()
+
+    assert snapshot.is_enabled("new_checkout")
+    assert not snapshot.is_enabled("new_checkout", TENANT)
+    assert snapshot.is_enabled("beta_reports", TENANT)
+    assert not snapshot.is_enabled("beta_reports", OTHER_TENANT)
+    assert not snapshot.is_enabled("missing", TENANT)
+
+
+def test_config_merges_tenant_override_keys():
+    snapshot = make_snapshot()
+
+    assert snapshot.config("new_checkout", TENANT) == {"theme": "dark", "limit": 5}
+    assert snapshot.config("new_checkout") == {"theme": "light", "limit": 5}
+    assert snapshot.config("missing", TENANT) == {}
+
+
+def test_evaluate_all_matches_single_flag_checks():
+    snapshot = make_snapshot()
+
+    for tenant_id in (TENANT, OTHER_TENANT, None):
+        expected = {key: snapshot.is_enabled(key, tenant_id) for key in snapshot.flags}
+        assert snapshot.evaluate_all(tenant_id) == expected
+
+
+def test_percentage_rollout_is_deterministic_and_proportional():
+    tenants = [uuid.UUID(int=i) for i in range(4000)]
+    half = make_snapshot(rollout=50)
+
+    enabled = [t for t in tenants if half.is_enabled("fast_search", t)]
+    assert 0.45 < len(enabled) / len(tenants) < 0.55
+    assert enabled == [t for t in tenants if make_snapshot(rollout=50).is_enabled("fast_search", t)]
+
+    # Widening a rollout only ever adds tenants
+    wider = make_snapshot(rollout=80)
+    assert all(wider.is_enabled("fast_search", t) for t in enabled)
+    assert not any(make_snapshot(rollout=0).is_enabled("fast_search", t) for t in tenants[:100])
+    assert all(make_snapshot(rollout=100).is_enabled("fast_search", t) for t in tenants[:100])
+    assert rollout_bucket("fast_search", TENANT) == rollout_bucket("fast_search", TENANT)
+
+
+class FakeCache:
+    def __init__(self):
+        self.store = {}
+        self.published = []
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def incr(self, key):
+        self.store[key] = self.store.get(key, 0) + 1
+        return self.store[key]
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+        return 1
+
+
+class CountingEngine(FeatureFlagEngine):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.loads = 0
+
+    async def load(self, db, version=None):
+        self.loads += 1
+        return make_snapshot(version)
+
+
+@pytest.mark.asyncio
+async def test_warm_checks_do_not_reload():
+    engine = CountingEngine(cache=FakeCache(), version_check_interval=60)
+
+    for _ in range(10):
+        assert await engine.is_enabled(None, "beta_reports", TENANT)
+        assert (await engine.evaluate_all(None, OTHER_TENANT))["dark_mode"]
+
+    assert engine.loads == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidate_bumps_version_and_notifies_other_workers():
+    cache = FakeCache()
+    writer = CountingEngine(cache=cache, version_check_interval=60)
+    reader = CountingEngine(cache=cache, version_check_interval=60)
+    await reader.snapshot(None)
+
+    await writer.invalidate()
+    assert cache.published == [(FEATURE_FLAGS_CHANNEL, "1")]
+
+    reader._on_change(b"1")
+    assert (await reader.snapshot(None)).version == 1
+    assert reader.loads == 2
+
+    # Our own notification echoed back is a no-op
+    reader._on_change(b"1")
+    await reader.snapshot(None)
+    assert reader.loads == 2
+
+
+@pytest.mark.asyncio
+async def test_polling_catches_missed_notifications():
+    cache = FakeCache()
+    engine = CountingEngine(cache=cache, version_check_interval=0)
+    await engine.snapshot(None)
+
+    await cache.incr("feature_flags:version")
+    assert (await engine.snapshot(None)).version == 1
+    assert engine.loads == 2
+
+
+class FakePubSub:
+    def __init__(self, messages):
+        self.messages = messages
+        self.closed = False
+
+    async def subscribe(self, channel):
+        self.channel = channel
+
+    async def listen(self):
+        for message in self.messages:
+            yield message
+        await asyncio.Event().wait()
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_listener_applies_pushed_changes():
+    cache = FakeCache()
+    pubsub = FakePubSub([{"type": "message", "data": b"7"}])
+    cache.pubsub = lambda: pubsub
+    engine = CountingEngine(cache=cache, version_check_interval=60)
+    await engine.snapshot(None)
+
+    engine.start()
+    await asyncio.sleep(0.01)
+    assert pubsub.channel == FEATURE_FLAGS_CHANNEL
+    assert engine._snapshot is None
+
+    await engine.stop()
+    assert pubsub.closed
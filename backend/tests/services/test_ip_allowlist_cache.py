@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.services.security.ip_allowlist_cache import (
+    IP_ALLOWLIST_CHANNEL,
+    AllowlistSnapshot,
+    BypassList,
+    GlobalIPAllowlist,
+)
+
+
+class FakeCache:
+    def __init__(self):
+        self.store = {}
+        self.published = []
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def incr(self, key):
+        self.store[key] = self.store.get(key, 0) + 1
+        return self.store[key]
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+        return 1
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def allowlist_with(loads, **options):
+    """Allowlist whose loads pop prepared snapshots, or raise when given an exception."""
+    cache = FakeCache()
+    allowlist = GlobalIPAllowlist(session_factory=FakeSession, cache=cache, **options)
+
+    async def load(db, version=None):
+        item = loads.pop(0)
+        if isinstance(item, Exception):
+            raise item
+        return AllowlistSnapshot(version, *item)
+
+    allowlist.load = load
+    return allowlist, cache
+
+
+def test_snapshot_matches_collapsed_ranges_for_both_families():
+    snapshot = AllowlistSnapshot(1, ["10.0.0.0/24", "10.0.1.0/24", "203.0.113.7", "2001:db8::/32", "bogus"])
+
+    assert snapshot.size == 4
+    assert snapshot.is_allowed("10.0.1.200")
+    assert snapshot.is_allowed("203.0.113.7")
+    assert not snapshot.is_allowed("203.0.113.8")
+    assert not snapshot.is_allowed("10.0.2.0")
+    assert snapshot.is_allowed("2001:db8:1::5")
+    assert snapshot.is_allowed("::ffff:10.0.0.9")
+    assert not snapshot.is_allowed("testclient")
+
+
+def test_decision_lru_is_bounded():
+    snapshot = AllowlistSnapshot(1, ["10.0.0.0/8"], cache_size=2)
+    for client_ip in ("10.0.0.1", "10.0.0.2", "10.0.0.1", "192.0.2.1"):
+        snapshot.is_allowed(client_ip)
+
+    assert list(snapshot._decisions.items()) == [("10.0.0.1", True), ("192.0.2.1", False)]
+
+
+@pytest.mark.asyncio
+async def test_warm_snapshot_answers_without_loading_until_invalidated():
+    allowlist, cache = allowlist_with([(["10.0.0.0/8"],), (["192.0.2.0/24"],)])
+
+    assert await allowlist.is_allowed("10.1.2.3")
+    assert await allowlist.is_allowed("10.1.2.3")
+    assert not await allowlist.is_allowed("192.0.2.1")
+
+    await allowlist.invalidate()
+    assert cache.published == [(IP_ALLOWLIST_CHANNEL, "1")]
+    assert await allowlist.is_allowed("192.0.2.1")
+    assert not await allowlist.is_allowed("10.1.2.3")
+
+
+@pytest.mark.asyncio
+async def test_expiring_entry_forces_a_reload():
+    past = datetime.now(timezone.utc) - timedelta(seconds=1)
+    allowlist, _ = allowlist_with([(["10.0.0.0/8"], past), (["192.0.2.0/24"],)])
+
+    assert await allowlist.is_allowed("10.1.2.3")
+    assert not await allowlist.is_allowed("10.1.2.3")
+
+
+@pytest.mark.asyncio
+async def test_failed_reload_keeps_the_previous_snapshot_only_while_unexpired():
+    allowlist, cache = allowlist_with([(["10.0.0.0/8"],), RuntimeError("db down")], version_check_interval=0)
+    assert await allowlist.is_allowed("10.1.2.3")
+
+    cache.store["ip_allowlist:version"] = 7
+    assert await allowlist.is_allowed("10.1.2.3")
+
+    past = datetime.now(timezone.utc) - timedelta(seconds=1)
+    allowlist, _ = allowlist_with([(["10.0.0.0/8"], past), RuntimeError("db down")])
+    await allowlist.is_allowed("10.1.2.3")
+    with pytest.raises(RuntimeError):
+        await allowlist.is_allowed("10.1.2.3")
+
+
+def test_bypass_list_accepts_hosts_and_networks():
+    bypass = BypassList(["127.0.0.1", "::1", "testclient", "172.16.0.0/12"])
+
+    assert "testclient" in bypass
+    assert "127.0.0.1" in bypass
+    assert "172.20.1.1" in bypass
+    assert "8.8.8.8" not in bypass
@@ -0,0 +1,178 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.db.models.webhook_event import WebhookEventStatus
+from app.services.payment.webhook_processing_engine import PaymentWebhookEngine
+
+
+class FakeCache:
+    def __init__(self, available=True):
+        self.available = available
+        self.store = {}
+
+    async def set_if_absent(self, key, value=1, expire=None):
+        if not self.available:
+            return None
+        if key in self.store:
+            return False
+        self.store[key] = value
+        return True
+
+    async def set(self, key, value, expire=None):
+        if self.available:
+            self.store[key] = value
+        return self.available
+
+    async def delete(self, key):
+        return self.store.pop(key, None) is not None
+
+
+class ClaimSession:
+    """Emulates INSERT ... ON CONFLICT DO NOTHING on (provider, event_id)."""
+
+    def __init__(self, fail=False):
+        self.rows = {}
+        self.fail = fail
+        self.executed = 0
+
+    async def execute(self, stmt):
+        self.executed += 1
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        params = stmt.compile(dialect=postgresql.dialect()).params
+        key = (params["provider"], params["event_id"])
+        inserted = None if key in self.rows else params["id"]
+        self.rows.setdefault(key, params["id"])
+        return SimpleNamespace(scalar_one_or_none=lambda: inserted)
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+
+class ProcessSession:
+    """Returns a claimed event row for the first UPDATE and records the rest."""
+
+    def __init__(self, event):
+        self.event = event
+        self.statements = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt):
+        self.statements.append(stmt.compile(dialect=postgresql.dialect()).params)
+        if len(self.statements) == 1:
+            return SimpleNamespace(first=lambda: self.event)
+        return SimpleNamespace()
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+def make_event(attempts=1):
+    return SimpleNamespace(
+        provider="paystack",
+        event_id="evt_1",
+        event_type="charge.success",
+        payload='{"data": {"reference": "REF1"}}',
+        attempts=attempts,
+    )
+
+
+@pytest.mark.asyncio
+async def test_duplicate_delivery_is_rejected_by_redis_without_db():
+    engine = PaymentWebhookEngine(cache=FakeCache())
+    db = ClaimSession()
+
+    first = await engine.claim(db, "paystack", "evt_1", "charge.success", {})
+    second = await engine.claim(db, "paystack", "evt_1", "charge.success", {})
+
+    assert first is not None
+    assert second is None
+    assert db.executed == 1
+
+
+@pytest.mark.asyncio
+async def test_database_claim_is_authoritative_without_redis():
+    engine = PaymentWebhookEngine(cache=FakeCache(available=False))
+    db = ClaimSession()
+
+    assert await engine.claim(db, "mpesa", "ws_CO_1", "mpesa_result_0", {}) is not None
+    assert await engine.claim(db, "mpesa", "ws_CO_1", "mpesa_result_0", {}) is None
+    assert await engine.claim(db, "mpesa", "ws_CO_2", "mpesa_result_0", {}) is not None
+
+
+@pytest.mark.asyncio
+async def test_failed_claim_releases_redis_key():
+    cache = FakeCache()
+    engine = PaymentWebhookEngine(cache=cache)
+
+    with pytest.raises(RuntimeError):
+        await engine.claim(ClaimSession(fail=True), "paystack", "evt_1", "charge.success", {})
+
+    assert cache.store == {}
+    assert await engine.claim(ClaimSession(), "paystack", "evt_1", "charge.success", {}) is not None
+
+
+@pytest.mark.asyncio
+async def test_successful_processing_marks_event_processed():
+    session = ProcessSession(make_event())
+    seen = []
+
+    async def handler(service, event_id, event_type, payload):
+        seen.append((event_id, event_type, payload))
+        return "success"
+
+    engine = PaymentWebhookEngine(handlers={"paystack": handler}, session_factory=lambda: session, cache=FakeCache())
+    outcome = await engine.process_event(uuid.uuid4())
+
+    assert outcome == "success"
+    assert seen == [("evt_1", "charge.success", {"data": {"reference": "REF1"}})]
+    assert session.statements[0]["status"] == WebhookEventStatus.PROCESSING
+    assert session.statements[-1]["status"] == WebhookEventStatus.PROCESSED
+    assert session.rollbacks == 0
+
+
+@pytest.mark.parametrize(
+    "attempts, expected_status, expected_outcome",
+    [(1, WebhookEventStatus.PENDING, "error"), (5, WebhookEventStatus.FAILED, "failed")],
+)
+@pytest.mark.asyncio
+async def test_handler_errors_retry_until_max_attempts(attempts, expected_status, expected_outcome):
+    session = ProcessSession(make_event(attempts=attempts))
+
+    async def handler(service, event_id, event_type, payload):
+        raise RuntimeError("payment row locked")
+
+    engine = PaymentWebhookEngine(
+        handlers={"paystack": handler}, session_factory=lambda: session, cache=FakeCache(), max_attempts=5
+    )
+    outcome = await engine.process_event(uuid.uuid4())
+
+    assert outcome == expected_outcome
+    assert session.rollbacks == 1
+    assert session.statements[-1]["status"] == expected_status
+    assert "payment row locked" in session.statements[-1]["last_error"]
+
+
+@pytest.mark.asyncio
+async def test_event_owned_elsewhere_is_skipped():
+    session = ProcessSession(None)
+    engine = PaymentWebhookEngine(session_factory=lambda: session, cache=FakeCache())
+
+    assert await engine.process_event(uuid.uuid4()) is None
+    assert len(session.statements) == 1
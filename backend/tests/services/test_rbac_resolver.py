@@ -0,0 +1,159 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models.admin.permission import PermissionScope
+from app.services.admin.role.resolver import (
+    PermissionGrant,
+    RBACResolver,
+    RBACSnapshot,
+)
+
+SUPER, DOMAIN, SUPPORT, READ_ONLY, ORPHAN = (uuid.uuid4() for _ in range(5))
+ROLES = {
+    SUPER: "Super Admin",
+    DOMAIN: "Domain Admin",
+    SUPPORT: "Support Admin",
+    READ_ONLY: "Read Only Admin",
+    ORPHAN: "Orphan",
+}
+# Super Admin > Domain Admin > Support Admin > Read Only Admin
+EDGES = [(SUPER, DOMAIN), (DOMAIN, SUPPORT), (SUPPORT, READ_ONLY)]
+
+TENANTS_MANAGE = PermissionGrant(uuid.uuid4(), "tenants", "manage", "global")
+ORDERS_READ = PermissionGrant(uuid.uuid4(), "orders", "read", "tenant")
+USERS_READ = PermissionGrant(uuid.uuid4(), "users", "read", "self")
+
+
+def make_snapshot(version=None):
+    return RBACSnapshot(
+        version=version,
+        roles=ROLES,
+        edges=EDGES,
+        grants=[
+            (SUPER, TENANTS_MANAGE, None),
+            (SUPPORT, ORDERS_READ, "tenant_id == user.tenant_id"),
+            (ORPHAN, USERS_READ, None),
+        ],
+    )
+
+
+def test_closure_is_precomputed_in_both_directions():
+    snapshot = make_snapshot()
+
+    assert snapshot.ancestors_of(READ_ONLY) == {SUPPORT, DOMAIN, SUPER}
+    assert snapshot.descendants_of(SUPER, include_self=True) == {SUPER, DOMAIN, SUPPORT, READ_ONLY}
+    assert snapshot.is_ancestor(SUPPORT, SUPER)
+    assert not snapshot.is_ancestor(SUPER, SUPPORT)
+    assert snapshot.ancestors_of(ORPHAN) == set()
+
+
+def test_effective_permissions_inherit_from_ancestors():
+    snapshot = make_snapshot()
+    read_only = snapshot.permission_mask([READ_ONLY])
+
+    assert snapshot.allows(read_only, "tenants", "manage")
+    assert snapshot.allows(read_only, "orders", "read")
+    assert not snapshot.allows(read_only, "users", "read")
+    assert not snapshot.allows(snapshot.permission_mask([SUPER]), "orders", "read")
+
+    sources = {(grant.permission.resource, grant.from_role_id) for grant in snapshot.grants_for(READ_ONLY)}
+    assert sources == {("tenants", SUPER), ("orders", SUPPORT)}
+
+
+def test_scoped_checks_accept_broader_global_grants():
+    snapshot = make_snapshot()
+    mask = snapshot.permission_mask([SUPPORT])
+
+    assert snapshot.allows(mask, "tenants", "manage", PermissionScope.TENANT)
+    assert snapshot.allows(mask, "orders", "read", PermissionScope.TENANT)
+    assert not snapshot.allows(mask, "orders", "read", PermissionScope.GLOBAL)
+
+
+def test_has_role_matches_assigned_ancestors():
+    snapshot = make_snapshot()
+
+    assert snapshot.has_role({SUPER}, "Read Only Admin")
+    assert not snapshot.has_role({SUPER}, "Read Only Admin", include_ancestors=False)
+    assert not snapshot.has_role({READ_ONLY}, "Super Admin")
+    assert not snapshot.has_role({SUPER}, "Missing Role")
+
+
+def test_cycles_in_stored_hierarchy_terminate():
+    a, b = uuid.uuid4(), uuid.uuid4()
+    snapshot = RBACSnapshot(None, {a: "A", b: "B"}, [(a, b), (b, a)], [])
+
+    assert snapshot.ancestors_of(a) == {b}
+
+
+class FakeCache:
+    def __init__(self):
+        self.store = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def incr(self, key):
+        self.store[key] = self.store.get(key, 0) + 1
+        return self.store[key]
+
+
+class CountingResolver(RBACResolver):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.loads = 0
+        self.assignments = {}
+
+    async def load(self, db, version=None):
+        self.loads += 1
+        return make_snapshot(version)
+
+    async def assigned_roles(self, db, admin_user_id, tenant_id=None):
+        await self.snapshot(db)
+        return frozenset((role_id, tenant_id) for role_id in self.assignments.get(admin_user_id, ()))
+
+
+@pytest.mark.asyncio
+async def test_warm_checks_do_not_reload():
+    resolver = CountingResolver(cache=FakeCache(), version_check_interval=60)
+    user = uuid.uuid4()
+    resolver.assignments[user] = {READ_ONLY}
+
+    for _ in range(5):
+        assert await resolver.has_permission(None, user, "tenants", "manage")
+        assert await resolver.has_role(None, user, "Support Admin") is False
+
+    assert resolver.loads == 1
+
+
+@pytest.mark.asyncio
+async def test_shared_version_bump_reloads_other_workers():
+    cache = FakeCache()
+    worker = CountingResolver(cache=cache, version_check_interval=0)
+    other = CountingResolver(cache=cache, version_check_interval=0)
+
+    await worker.snapshot(None)
+    await other.invalidate()
+    await worker.snapshot(None)
+
+    assert worker.loads == 2
+    assert (await worker.snapshot(None)).version == 1
+    assert worker.loads == 2
+
+
+@pytest.mark.asyncio
+async def test_commit_invalidates_after_transaction():
+    cache = FakeCache()
+    resolver = CountingResolver(cache=cache, version_check_interval=60)
+    session = Session()
+    await resolver.snapshot(None)
+
+    resolver.invalidate_on_commit(SimpleNamespace(sync_session=session))
+    await resolver.snapshot(None)
+    assert resolver.loads == 2
+
+    session.commit()
+    await resolver.snapshot(None)
+    assert resolver.loads == 3
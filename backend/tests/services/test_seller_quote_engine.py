@@ -0,0 +1,249 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.shipping.coverage_index import (
+    PolygonShape,
+    TenantCoverageIndex,
+    ProviderProfile,
+    compile_coverage,
+)
+from app.services.shipping.geo import geohash_center, geohash_encode, haversine_km, haversine_many_km
+from app.services.shipping.postal_geocoder import PostalCodeGeocoder
+from app.services.shipping.quote_cache import ShippingQuoteCache
+from app.services.shipping.seller_quote_engine import (
+    FALLBACK_DISTANCE_KM,
+    SELLER_QUOTES_CHANNEL,
+    SellerQuoteEngine,
+    weight_band,
+)
+
+
+def make_provider(**overrides):
+    values = {
+        "id": uuid.uuid4(),
+        "name": "Boda Express",
+        "provider_type": "motorcycle",
+        "base_fee": 20000,
+        "per_km_fee": 5000,
+        "min_distance": 0,
+        "max_distance": 50,
+        "coverage_area": None,
+        "estimated_delivery_time": None,
+    }
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+class FakeCache:
+    def __init__(self):
+        self.store = {}
+        self.published = []
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def incr(self, key):
+        self.store[key] = self.store.get(key, 0) + 1
+        return self.store[key]
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+        return 1
+
+
+# Nairobi CBD / Westlands / Karen
+NAIROBI_POLYGON = [[-1.20, 36.70], [-1.20, 36.95], [-1.40, 36.95], [-1.40, 36.70]]
+
+
+class TestGeo:
+    def test_vectorized_haversine_matches_scalar(self):
+        lats = [-1.2841, -4.0435, 0.5143]
+        lngs = [36.8155, 39.6682, 35.2698]
+        expected = [haversine_km(-1.2921, 36.8219, lat, lng) for lat, lng in zip(lats, lngs)]
+        assert haversine_many_km(-1.2921, 36.8219, lats, lngs) == pytest.approx(expected)
+
+    def test_geohash_center_round_trip(self):
+        cell = geohash_encode(-1.2841, 36.8155, 7)
+        lat, lng = geohash_center(cell)
+        assert haversine_km(lat, lng, -1.2841, 36.8155) < 0.2
+        assert geohash_encode(lat, lng, 7) == cell
+
+
+class TestCoverage:
+    def test_polygon_is_not_a_bounding_box(self):
+        # Triangle whose bounding box contains the test point but the shape does not
+        coverage = compile_coverage({"type": "polygon", "coordinates": [[0, 0], [0, 10], [10, 0]]})
+        assert coverage.contains(1, 1)
+        assert not coverage.contains(9, 9)
+
+    def test_slab_index_agrees_with_plain_ray_casting(self):
+        import math
+
+        ring = [
+            (math.sin(2 * math.pi * i / 64) * (1 + 0.3 * (i % 2)), math.cos(2 * math.pi * i / 64))
+            for i in range(64)
+        ]
+        indexed = PolygonShape.from_vertices(ring)
+        plain = PolygonShape.from_vertices(ring)
+        plain.slabs = [plain._edges()]
+        plain.slab_height = 0.0
+        assert len(indexed.slabs) > 1
+
+        for lat in [x / 10 for x in range(-14, 15)]:
+            for lng in [y / 10 for y in range(-12, 13)]:
+                assert indexed.contains(lat, lng) == plain.contains(lat, lng)
+
+    def test_tenant_index_filters_circles_and_polygons(self):
+        circle = make_provider(
+            name="CBD Riders",
+            coverage_area={"type": "circle", "center_lat": -1.2841, "center_lng": 36.8155, "radius_km": 5},
+        )
+        polygon = make_provider(name="Nairobi Metro", coverage_area={"type": "polygon", "coordinates": NAIROBI_POLYGON})
+        anywhere = make_provider(name="Countrywide")
+        index = TenantCoverageIndex([ProviderProfile.from_model(p) for p in (circle, polygon, anywhere)])
+
+        assert [p.name for p in index.covering(-1.2921, 36.8219)] == ["CBD Riders", "Nairobi Metro", "Countrywide"]
+        assert [p.name for p in index.covering(-1.3622, 36.7360)] == ["Nairobi Metro", "Countrywide"]
+        assert [p.name for p in index.covering(-4.0435, 39.6682)] == ["Countrywide"]
+
+
+class TestQuoteCache:
+    def test_invalidate_tenant_hides_existing_entries(self):
+        cache = ShippingQuoteCache(ttl_seconds=60)
+        tenant_id = uuid.uuid4()
+        key = cache.make_key(tenant_id, "kzf0", "kzf1", 2)
+        cache.set(key, ("rate",))
+        assert cache.get(key) == ("rate",)
+
+        cache.invalidate_tenant(tenant_id)
+        assert cache.get(cache.make_key(tenant_id, "kzf0", "kzf1", 2)) is None
+
+    def test_lru_bound(self):
+        cache = ShippingQuoteCache(ttl_seconds=60, max_entries=2)
+        for i in range(3):
+            cache.set(i, i)
+        assert len(cache) == 2
+        assert cache.get(0) is None
+        assert cache.stats.evictions == 1
+
+
+class TestSellerQuoteEngine:
+    @pytest.fixture
+    def geocoder(self):
+        geocoder = PostalCodeGeocoder()
+        geocoder.load()
+        return geocoder
+
+    def test_weight_band(self):
+        assert weight_band(0) == 1
+        assert weight_band(0.5) == 1
+        assert weight_band(0.51) == 2
+        assert weight_band(6.2) == 13
+
+    @pytest.mark.asyncio
+    async def test_quote_uses_real_distance_and_caches(self, geocoder):
+        tenant_id = uuid.uuid4()
+        calls = []
+
+        async def loader(requested_tenant):
+            calls.append(requested_tenant)
+            return [
+                make_provider(),
+                make_provider(name="Short hop", max_distance=2),
+            ]
+
+        cache = FakeCache()
+        engine = SellerQuoteEngine(geocoder=geocoder, provider_loader=loader, cache=cache)
+        rates = await engine.quote(tenant_id, "00100", "00502", 1.0, "KE", "KE")
+
+        assert [rate.service.name for rate in rates] == ["Boda Express"]
+        distance = rates[0].fees["distance"] / 50
+        assert 11 < distance < 14
+
+        again = await engine.quote(tenant_id, "00100", "00502", 0.8, "KE", "KE")
+        assert again == rates
+        assert calls == [tenant_id]
+        assert engine.quote_cache.stats.hits == 1
+
+        await engine.invalidate_tenant(tenant_id)
+        await engine.quote(tenant_id, "00100", "00502", 1.0, "KE", "KE")
+        assert calls == [tenant_id, tenant_id]
+        assert cache.published == [(SELLER_QUOTES_CHANNEL, str(tenant_id))]
+
+    @pytest.mark.asyncio
+    async def test_other_workers_drop_quotes_when_the_version_moves(self, geocoder):
+        tenant_id = uuid.uuid4()
+        calls = []
+
+        async def loader(requested_tenant):
+            calls.append(requested_tenant)
+            return [make_provider()]
+
+        cache = FakeCache()
+        writer = SellerQuoteEngine(geocoder=geocoder, provider_loader=loader, cache=cache)
+        reader = SellerQuoteEngine(
+            geocoder=geocoder, provider_loader=loader, cache=cache, version_check_interval=0,
+        )
+        await reader.quote(tenant_id, "00100", "00502", 1.0, "KE", "KE")
+        await reader.quote(tenant_id, "00100", "00502", 1.0, "KE", "KE")
+        assert len(calls) == 1
+
+        # A missed notification is caught by the version check
+        await writer.invalidate_tenant(tenant_id)
+        await reader.quote(tenant_id, "00100", "00502", 1.0, "KE", "KE")
+        assert len(calls) == 2
+
+        # A notification drops the tenant's state right away
+        reader._on_change(str(tenant_id))
+        assert tenant_id not in reader._indexes
+
+    @pytest.mark.asyncio
+    async def test_index_loaded_during_invalidation_is_not_kept(self, geocoder):
+        tenant_id = uuid.uuid4()
+        engine = SellerQuoteEngine(geocoder=geocoder, cache=FakeCache())
+
+        async def loader(_):
+            # The provider change commits while the old rows are being read
+            await engine.invalidate_tenant(tenant_id)
+            return [make_provider()]
+
+        engine._provider_loader = loader
+        await engine.get_tenant_index(tenant_id)
+        assert tenant_id not in engine._indexes
+
+    @pytest.mark.asyncio
+    async def test_unknown_postal_code_falls_back_to_nominal_distance(self, geocoder):
+        async def loader(_):
+            return [
+                make_provider(),
+                make_provider(name="Westlands only", coverage_area={"type": "polygon", "coordinates": NAIROBI_POLYGON}),
+                make_provider(name="Short hop", max_distance=FALLBACK_DISTANCE_KM - 1),
+            ]
+
+        engine = SellerQuoteEngine(geocoder=geocoder, provider_loader=loader, cache=FakeCache())
+        rates = await engine.quote(uuid.uuid4(), "00100", "99999", 1.0)
+
+        # Without a destination only unrestricted providers in range qualify
+        assert [rate.service.name for rate in rates] == ["Boda Express"]
+        assert rates[0].fees["distance"] == 5000 * FALLBACK_DISTANCE_KM / 100
+
+        # A known destination is still checked against coverage
+        rates = await engine.quote(uuid.uuid4(), "99999", "00100", 1.0)
+        assert [rate.service.name for rate in rates] == ["Boda Express", "Westlands only"]
+
+    @pytest.mark.asyncio
+    async def test_cached_quotes_are_priced_with_the_actual_weight(self, geocoder):
+        async def loader(_):
+            return [make_provider()]
+
+        tenant_id = uuid.uuid4()
+        engine = SellerQuoteEngine(geocoder=geocoder, provider_loader=loader, cache=FakeCache())
+        lighter = await engine.quote(tenant_id, "00100", "00502", 6.1, "KE", "KE")
+        heavier = await engine.quote(tenant_id, "00100", "00502", 6.4, "KE", "KE")
+
+        # Same band and a cache hit, but each parcel pays the surcharge for its own weight
+        assert weight_band(6.1) == weight_band(6.4)
+        assert engine.quote_cache.stats.hits == 1
+        assert heavier[0].total_rate - lighter[0].total_rate == pytest.approx(0.3)
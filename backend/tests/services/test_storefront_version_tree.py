@@ -0,0 +1,165 @@
+import copy
+import random
+
+import pytest
+
+from app.services.storefront.version_tree import (
+    apply_delta,
+    chunk_tree,
+    diff_trees,
+    diff_values,
+    invert_delta,
+    summarize_delta,
+    unshared_chunks,
+)
+
+
+def storefront(sections=40):
+    return {
+        "subdomain_name": "amina-crafts",
+        "meta_title": "Amina Crafts",
+        "theme_settings": {
+            "colors": {"primary": "#4f46e5", "secondary": "#f59e0b", "background": "#ffffff"},
+            "typography": {"heading": "Poppins", "body": "Inter", "scale": [12, 14, 16, 20, 24, 32]},
+        },
+        "layout_config": {
+            "sections": [
+                {
+                    "id": f"section-{index}",
+                    "type": "product_grid" if index % 2 else "banner",
+                    "settings": {"columns": 4, "title": f"Collection {index}", "show_prices": True},
+                }
+                for index in range(sections)
+            ]
+        },
+        "social_links": {"instagram": "https://instagram.com/amina", "whatsapp": "+254700000001"},
+    }
+
+
+class ChunkStore:
+    def __init__(self):
+        self.chunks = {}
+        self.requests = []
+
+    def add(self, chunks):
+        self.chunks.update(chunks)
+
+    async def load(self, hashes):
+        self.requests.append(set(hashes))
+        return {digest: self.chunks[digest] for digest in hashes if digest in self.chunks}
+
+
+def edit(config, change):
+    updated = copy.deepcopy(config)
+    change(updated)
+    return updated
+
+
+@pytest.mark.asyncio
+async def test_small_change_shares_chunks_and_reads_only_changed_subtrees():
+    store = ChunkStore()
+    old = storefront()
+    old_root, old_chunks = chunk_tree(old)
+    store.add(old_chunks)
+
+    new = edit(old, lambda c: c["layout_config"]["sections"][7]["settings"].update(columns=3))
+    new_root, new_chunks = chunk_tree(new)
+    store.add(new_chunks)
+    result = await diff_trees(old_root, new_root, store.load)
+
+    assert result.ops == [{
+        "op": "replace", "path": ["layout_config", "sections", 7, "settings", "columns"], "old": 4, "value": 3,
+    }]
+    stored = unshared_chunks(new_root, new_chunks, result.shared_hashes)
+    assert len(stored) <= 3 < len(new_chunks)
+    # One request per tree level, each only for the hashes on the changed path
+    assert all(len(request) <= 2 for request in store.requests)
+    assert len(store.requests) <= 4
+
+
+@pytest.mark.asyncio
+async def test_tree_diff_matches_in_memory_diff_and_replays():
+    store = ChunkStore()
+    old = storefront()
+    new = edit(old, lambda c: (
+        c["theme_settings"]["colors"].pop("secondary"),
+        c["theme_settings"].update(radius=8),
+        c["layout_config"]["sections"].pop(),
+        c["layout_config"]["sections"].pop(),
+        c["social_links"].update(instagram=None),
+    ))
+    old_root, old_chunks = chunk_tree(old)
+    new_root, new_chunks = chunk_tree(new)
+    store.add(old_chunks)
+    store.add(new_chunks)
+
+    result = await diff_trees(old_root, new_root, store.load)
+
+    assert result.ops == diff_values(old, new)
+    assert apply_delta(copy.deepcopy(old), result.ops) == new
+    assert apply_delta(copy.deepcopy(new), invert_delta(result.ops)) == old
+    assert summarize_delta(result.ops) == {"added": 1, "removed": 3, "changed": 0, "type_changes": 1}
+
+
+@pytest.mark.asyncio
+async def test_containers_crossing_the_chunk_threshold():
+    store = ChunkStore()
+    old = {"small": {"a": 1}, "big": {"values": list(range(200))}, "kind": [1, 2]}
+    new = {"small": {"a": 1, "values": list(range(200))}, "big": {"a": 1}, "kind": {"x": 1}}
+    old_root, old_chunks = chunk_tree(old)
+    new_root, new_chunks = chunk_tree(new)
+    store.add(old_chunks)
+    store.add(new_chunks)
+
+    result = await diff_trees(old_root, new_root, store.load)
+
+    assert apply_delta(copy.deepcopy(old), result.ops) == new
+    assert {"op": "replace", "path": ["kind"], "old": [1, 2], "value": {"x": 1}} in result.ops
+
+
+@pytest.mark.asyncio
+async def test_identical_trees_need_no_reads():
+    store = ChunkStore()
+    root, _ = chunk_tree(storefront())
+
+    result = await diff_trees(root, chunk_tree(storefront())[0], store.load)
+
+    assert result.ops == [] and store.requests == []
+
+
+@pytest.mark.asyncio
+async def test_missing_chunks_raise():
+    old_root, _ = chunk_tree(storefront())
+    new_root, _ = chunk_tree(storefront(sections=3))
+
+    with pytest.raises(KeyError):
+        await diff_trees(old_root, new_root, ChunkStore().load)
+
+
+def random_value(rng, depth=0):
+    roll = rng.random()
+    if depth < 3 and roll < 0.3:
+        return {f"k{rng.randint(0, 6)}": random_value(rng, depth + 1) for _ in range(rng.randint(0, 6))}
+    if depth < 3 and roll < 0.5:
+        return [random_value(rng, depth + 1) for _ in range(rng.randint(0, 8))]
+    return rng.choice([None, True, rng.randint(0, 5), "x" * rng.randint(0, 90)])
+
+
+@pytest.mark.asyncio
+async def test_random_edits_replay_exactly():
+    rng = random.Random(39)
+    for _ in range(200):
+        old = {"root": random_value(rng), "other": random_value(rng)}
+        new = {"root": random_value(rng) if rng.random() < 0.5 else copy.deepcopy(old["root"]),
+               "other": random_value(rng)}
+        store = ChunkStore()
+        old_root, old_chunks = chunk_tree(old, min_chunk_bytes=64, max_chunk_bytes=160)
+        new_root, new_chunks = chunk_tree(new, min_chunk_bytes=64, max_chunk_bytes=160)
+        store.add(old_chunks)
+        store.add(new_chunks)
+
+        ops = (await diff_trees(old_root, new_root, store.load)).ops
+
+        assert apply_delta(copy.deepcopy(old), ops) == new
+        assert apply_delta(copy.deepcopy(old), diff_values(old, new)) == new
+        assert apply_delta(copy.deepcopy(new), invert_delta(ops)) == old
@@ -0,0 +1,184 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.performance.background_workers import OptimizationWorkers
+from app.services.performance.task_scheduler import (
+    BackgroundTask,
+    RedisTaskStore,
+    TaskPriority,
+    TaskScheduler,
+    TaskStatus,
+)
+
+
+def make_task(tenant="t1", priority=TaskPriority.NORMAL, delay=0.0, name=None):
+    now = datetime.utcnow()
+    return BackgroundTask(
+        task_id=name or str(uuid.uuid4()),
+        tenant_id=tenant,
+        task_type="cache_warming",
+        priority=priority,
+        scheduled_time=now + timedelta(seconds=delay),
+        status=TaskStatus.PENDING,
+        parameters={},
+        created_at=now,
+    )
+
+
+class Recorder:
+    def __init__(self, hold=False):
+        self.started = []
+        self.release = asyncio.Event()
+        if not hold:
+            self.release.set()
+
+    async def __call__(self, task):
+        self.started.append(task.task_id)
+        await self.release.wait()
+
+
+class FakeHashCache:
+    def __init__(self):
+        self.hashes = {}
+
+    async def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = value
+        return True
+
+    async def hdel(self, key, *fields):
+        return sum(self.hashes.get(key, {}).pop(field, None) is not None for field in fields)
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+
+async def settle(condition, timeout=1.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "condition not reached"
+        await asyncio.sleep(0.005)
+
+
+@pytest.mark.asyncio
+async def test_runs_by_priority_then_scheduled_time():
+    runner = Recorder()
+    scheduler = TaskScheduler(runner, max_concurrent=1, max_per_tenant=10, store=None)
+    await scheduler.submit(make_task(tenant="a", name="low", priority=TaskPriority.LOW))
+    await scheduler.submit(make_task(tenant="b", name="normal"))
+    await scheduler.submit(make_task(tenant="c", name="urgent", priority=TaskPriority.URGENT))
+
+    await scheduler.start()
+    await settle(lambda: len(runner.started) == 3)
+    await scheduler.stop()
+
+    assert runner.started == ["urgent", "normal", "low"]
+
+
+@pytest.mark.asyncio
+async def test_delayed_task_wakes_dispatcher_without_polling():
+    runner = Recorder()
+    scheduler = TaskScheduler(runner, store=None)
+    await scheduler.start()
+
+    await scheduler.submit(make_task(name="later", delay=0.05))
+    await asyncio.sleep(0.01)
+    assert runner.started == []
+    await scheduler.submit(make_task(name="now"))
+    await settle(lambda: runner.started == ["now"])
+    await settle(lambda: runner.started == ["now", "later"])
+    await scheduler.stop()
+
+
+@pytest.mark.asyncio
+async def test_tenants_share_slots_fairly_and_respect_caps():
+    runner = Recorder(hold=True)
+    scheduler = TaskScheduler(runner, max_concurrent=3, max_per_tenant=2, store=None)
+    for index in range(6):
+        await scheduler.submit(make_task(tenant="busy", name=f"busy-{index}"))
+    await scheduler.submit(make_task(tenant="quiet", name="quiet-0"))
+
+    await scheduler.start()
+    await settle(lambda: len(runner.started) == 3)
+
+    assert sorted(runner.started) == ["busy-0", "busy-1", "quiet-0"]
+    assert scheduler.stats()["tenants_at_cap"] == 1
+
+    runner.release.set()
+    await settle(lambda: len(runner.started) == 7)
+    await scheduler.stop()
+    assert len(scheduler) == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_tasks_never_run():
+    runner = Recorder()
+    scheduler = TaskScheduler(runner, store=None)
+    await scheduler.submit(make_task(name="keep", delay=0.02))
+    await scheduler.submit(make_task(name="drop", delay=0.01))
+
+    assert await scheduler.cancel("drop")
+    assert not await scheduler.cancel("drop")
+    await scheduler.start()
+    await settle(lambda: runner.started == ["keep"])
+    await scheduler.stop()
+
+
+@pytest.mark.asyncio
+async def test_cancelling_a_parked_task_does_not_strand_its_tenant():
+    runner = Recorder(hold=True)
+    scheduler = TaskScheduler(runner, max_concurrent=5, max_per_tenant=1, store=None)
+    await scheduler.start()
+    await scheduler.submit(make_task(name="running"))
+    await settle(lambda: runner.started == ["running"])
+
+    # Both wait behind the tenant cap; cancelling A leaves a stale parked entry
+    await scheduler.submit(make_task(name="a"))
+    await scheduler.submit(make_task(name="b"))
+    await asyncio.sleep(0.01)
+    assert await scheduler.cancel("a")
+
+    runner.release.set()
+    await settle(lambda: runner.started == ["running", "b"])
+    await scheduler.stop()
+    assert len(scheduler) == 0
+
+
+@pytest.mark.asyncio
+async def test_queued_and_interrupted_tasks_survive_restart():
+    cache = FakeHashCache()
+    runner = Recorder(hold=True)
+    first = TaskScheduler(runner, max_concurrent=1, store=RedisTaskStore("tasks", cache=cache))
+    await first.submit(make_task(name="interrupted", priority=TaskPriority.HIGH))
+    await first.submit(make_task(name="queued", delay=3600))
+    await first.start()
+    await settle(lambda: runner.started == ["interrupted"])
+    await first.stop()
+
+    restored_runner = Recorder()
+    second = TaskScheduler(restored_runner, store=RedisTaskStore("tasks", cache=cache))
+    await second.start()
+    await settle(lambda: restored_runner.started == ["interrupted"])
+    await settle(lambda: "interrupted" not in cache.hashes["tasks"])
+
+    assert second.get("queued").scheduled_time > datetime.utcnow()
+    assert set(cache.hashes["tasks"]) == {"queued"}
+    await second.stop()
+
+
+@pytest.mark.asyncio
+async def test_optimization_workers_schedule_through_the_scheduler():
+    workers = OptimizationWorkers(persist_tasks=False)
+    tenant = uuid.uuid4()
+
+    task_id = await workers.schedule_optimization(
+        tenant, "premium", scheduled_time=datetime.utcnow() + timedelta(hours=1), task_type="cache_warming"
+    )
+    status = await workers.get_task_status(task_id)
+    stats = await workers.get_worker_stats()
+
+    assert status["priority"] == TaskPriority.HIGH.value and status["status"] == "pending"
+    assert stats["tasks_in_queue"] == 1 and stats["queue_by_priority"]["high"] == 1
+    assert [task["task_id"] for task in await workers.get_tenant_tasks(tenant)] == [task_id]
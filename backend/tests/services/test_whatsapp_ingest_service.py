@@ -0,0 +1,276 @@
+import asyncio
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.services.whatsapp_ingest_service import (
+    IngestedMessage,
+    WhatsAppIngestQueue,
+    extract_messages,
+    message_from_record,
+)
+
+
+def make_message(message_id, customer="254700000001", business="254711000000"):
+    return IngestedMessage(
+        message_id=message_id,
+        business_number=business,
+        customer_number=customer,
+        body=f"message {message_id}",
+        timestamp=datetime.utcnow(),
+        payload={"id": message_id},
+    )
+
+
+def test_extract_messages_keeps_text_messages_only():
+    payload = {
+        "object": "whatsapp_business_account",
+        "entry": [
+            {
+                "changes": [
+                    {
+                        "value": {
+                            "metadata": {"display_phone_number": "254711000000"},
+                            "messages": [
+                                {"id": "wamid.1", "from": "254700000001", "timestamp": "1700000000",
+                                 "type": "text", "text": {"body": "hi"}},
+                                {"id": "wamid.2", "from": "254700000001", "timestamp": "1700000001",
+                                 "type": "image"},
+                            ],
+                        }
+                    }
+                ]
+            }
+        ],
+    }
+
+    messages = extract_messages(payload)
+
+    assert [m.message_id for m in messages] == ["wamid.1"]
+    assert messages[0].business_number == "254711000000"
+    assert messages[0].body == "hi"
+    assert extract_messages({"object": "page"}) == []
+
+
+@pytest.mark.asyncio
+async def test_messages_in_a_conversation_are_processed_in_order():
+    processed = []
+
+    async def handler(message):
+        # Later messages finish faster; ordering must still hold
+        await asyncio.sleep(0.01 * (5 - int(message.message_id)))
+        processed.append(message.message_id)
+
+    queue = WhatsAppIngestQueue(handler=handler, partitions=4)
+    for i in range(5):
+        await queue.enqueue(make_message(str(i)))
+    await queue.stop()
+
+    assert processed == ["0", "1", "2", "3", "4"]
+
+
+@pytest.mark.asyncio
+async def test_conversations_run_concurrently():
+    queue = WhatsAppIngestQueue(partitions=8)
+    first = make_message("a", customer="254700000001")
+    second = next(
+        make_message("b", customer=f"2547000000{i:02d}")
+        for i in range(2, 100)
+        if queue.partition_for(make_message("b", customer=f"2547000000{i:02d}")) != queue.partition_for(first)
+    )
+    started = asyncio.Event()
+    finished = []
+
+    async def handler(message):
+        if message.message_id == "a":
+            started.set()
+            await asyncio.sleep(0.2)
+        else:
+            await started.wait()
+        finished.append(message.message_id)
+
+    queue.set_handler(handler)
+    await queue.enqueue(first)
+    await queue.enqueue(second)
+    await queue.stop()
+
+    assert finished == ["b", "a"]
+
+
+@pytest.mark.asyncio
+async def test_handler_errors_do_not_stop_the_partition():
+    processed = []
+
+    async def handler(message):
+        if message.message_id == "1":
+            raise RuntimeError("boom")
+        processed.append(message.message_id)
+
+    queue = WhatsAppIngestQueue(handler=handler, partitions=1)
+    for i in range(3):
+        await queue.enqueue(make_message(str(i)))
+    await queue.stop()
+
+    assert processed == ["0", "2"]
+
+
+@pytest.mark.asyncio
+async def test_record_drops_redelivered_message_ids():
+    class FakeSession:
+        def __init__(self):
+            self.seen = set()
+
+        async def execute(self, stmt):
+            params = stmt.compile(dialect=postgresql.dialect()).params
+            ids = [value for key, value in params.items() if key.startswith("event_id")]
+            new = [i for i in ids if i not in self.seen]
+            self.seen.update(new)
+            return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: new))
+
+        async def commit(self):
+            pass
+
+    db = FakeSession()
+    queue = WhatsAppIngestQueue()
+
+    first = await queue.record(db, [make_message("wamid.1"), make_message("wamid.2")])
+    second = await queue.record(db, [make_message("wamid.2"), make_message("wamid.3")])
+
+    assert [m.message_id for m in first] == ["wamid.1", "wamid.2"]
+    assert [m.message_id for m in second] == ["wamid.3"]
+
+
+def test_record_inserts_pending_rows_without_processed_at():
+    statements = []
+
+    class FakeSession:
+        async def execute(self, stmt):
+            statements.append(stmt.compile(dialect=postgresql.dialect()).params)
+            return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: ["wamid.1"]))
+
+        async def commit(self):
+            pass
+
+    [message] = asyncio.run(WhatsAppIngestQueue().record(FakeSession(), [make_message("wamid.1")]))
+
+    params = statements[0]
+    assert params["status_m0"] == "pending"
+    assert not any(key.startswith("processed_at") for key in params)
+    assert message.recorded
+    # The stored payload rebuilds the same message for the sweep
+    rebuilt = message_from_record(params["payload_m0"])
+    assert (rebuilt.message_id, rebuilt.business_number, rebuilt.recorded) == ("wamid.1", "254711000000", True)
+
+
+@pytest.mark.asyncio
+async def test_recorded_messages_are_marked_processed_only_after_the_handler_succeeds():
+    events = []
+
+    async def handler(message):
+        events.append(("handled", message.message_id))
+        if message.message_id == "2":
+            raise RuntimeError("boom")
+
+    queue = WhatsAppIngestQueue(handler=handler, partitions=1, max_attempts=2, retry_backoff=0)
+
+    async def claim(message_id):
+        events.append(("claimed", message_id))
+        return None if message_id == "3" else 1
+
+    async def retry(message_id, error):
+        events.append(("retrying", message_id, str(error)))
+        return 2
+
+    async def finish(message_id, attempts, error):
+        events.append(("finished", message_id, None if error is None else str(error)))
+        return "success" if error is None else "failed"
+
+    queue._claim, queue._retry, queue._finish = claim, retry, finish
+    for i in ("1", "2", "3"):
+        message = make_message(i)
+        message.recorded = True
+        await queue.enqueue(message)
+    # Already queued here; a sweep must not queue it twice
+    duplicate = make_message("1")
+    duplicate.recorded = True
+    await queue.enqueue(duplicate)
+    await queue.stop()
+
+    assert events == [
+        ("claimed", "1"), ("handled", "1"), ("finished", "1", None),
+        ("claimed", "2"), ("handled", "2"), ("retrying", "2", "boom"), ("handled", "2"),
+        ("finished", "2", "boom"),
+        # Owned by another worker or already finished
+        ("claimed", "3"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_failed_message_is_retried_before_later_messages_of_its_conversation():
+    processed = []
+    failures = {"1": 1}
+
+    async def handler(message):
+        if failures.get(message.message_id):
+            failures[message.message_id] -= 1
+            raise RuntimeError("database unavailable")
+        processed.append(message.message_id)
+
+    queue = WhatsAppIngestQueue(handler=handler, partitions=1, retry_backoff=0)
+
+    async def claim(message_id):
+        return 1
+
+    async def retry(message_id, error):
+        return 2
+
+    async def finish(message_id, attempts, error):
+        return "success" if error is None else "failed"
+
+    queue._claim, queue._retry, queue._finish = claim, retry, finish
+    for i in ("1", "2"):
+        message = make_message(i)
+        message.recorded = True
+        await queue.enqueue(message)
+    await queue.stop()
+
+    assert processed == ["1", "2"]
+
+
+@pytest.mark.asyncio
+async def test_sweep_requeues_stale_pending_messages():
+    payloads = [json.dumps({"id": f"wamid.{i}", "from": "254700000001", "to": "254711000000",
+                            "timestamp": "1700000000", "type": "text", "text": {"body": "hi"}})
+                for i in range(2)]
+
+    class FakeSession:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def execute(self, stmt):
+            return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: payloads))
+
+    handled = []
+
+    async def handler(message):
+        handled.append(message.message_id)
+
+    queue = WhatsAppIngestQueue(handler=handler, partitions=1, session_factory=FakeSession)
+
+    async def claim(message_id):
+        return 1
+
+    async def finish(message_id, attempts, error):
+        return "success"
+
+    queue._claim, queue._finish = claim, finish
+    assert await queue.sweep() == 2
+    await queue.stop()
+
+    assert handled == ["wamid.0", "wamid.1"]
@@ -0,0 +1,165 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from app.services.whatsapp_outbound_service import (
+    DeliveryReceiptTracker,
+    OutboundWhatsAppMessage,
+    TokenBucket,
+    WhatsAppCredential,
+    WhatsAppOutboundService,
+    extract_statuses,
+)
+
+SEND_PATH = "app.services.whatsapp_outbound_service.outbound_http.post"
+
+
+def twilio_credentials(tenant_id="tenant-1"):
+    return WhatsAppCredential(tenant_id=tenant_id, whatsapp_number="+254711000000")
+
+
+def make_service(loader=None, **kwargs):
+    async def default_loader(tenant_id):
+        return twilio_credentials(tenant_id)
+
+    service = WhatsAppOutboundService(credential_loader=loader or default_loader, base_backoff=0.001, **kwargs)
+    service.twilio_account_sid = "AC123"
+    service.twilio_auth_token = "token"
+    return service
+
+
+def twilio_response(status_code=201, sid="SM1"):
+    return httpx.Response(status_code, json={"sid": sid})
+
+
+@pytest.mark.asyncio
+async def test_credentials_are_loaded_once_per_ttl():
+    calls = []
+
+    async def loader(tenant_id):
+        calls.append(tenant_id)
+        return twilio_credentials(tenant_id)
+
+    service = make_service(loader)
+    for _ in range(3):
+        await service.get_credentials("tenant-1")
+    assert calls == ["tenant-1"]
+
+    service.invalidate_credentials("tenant-1")
+    await service.get_credentials("tenant-1")
+    assert calls == ["tenant-1", "tenant-1"]
+
+
+@pytest.mark.asyncio
+async def test_retries_transient_failures_then_records_receipt():
+    service = make_service()
+    responses = [twilio_response(503), twilio_response(429), twilio_response(201, sid="SM42")]
+
+    with patch(SEND_PATH, new_callable=AsyncMock, side_effect=responses) as send:
+        message_id = await service.deliver(OutboundWhatsAppMessage("tenant-1", "+254700000001", "hello"))
+
+    assert message_id == "SM42"
+    assert send.await_count == 3
+    assert service.receipts.get("SM42")["status"] == "sent"
+
+
+@pytest.mark.asyncio
+async def test_connection_failures_are_retried():
+    service = make_service()
+    responses = [httpx.ConnectError("refused"), twilio_response(201, sid="SM7")]
+
+    with patch(SEND_PATH, new_callable=AsyncMock, side_effect=responses) as send:
+        message_id = await service.deliver(OutboundWhatsAppMessage("tenant-1", "+254700000001", "hello"))
+
+    assert message_id == "SM7"
+    assert send.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_timeouts_after_sending_are_not_retried():
+    service = make_service()
+
+    with patch(SEND_PATH, new_callable=AsyncMock, side_effect=httpx.ReadTimeout("slow")) as send:
+        message_id = await service.deliver(OutboundWhatsAppMessage("tenant-1", "+254700000001", "hello"))
+
+    # Twilio may have accepted the message; a resend could duplicate it
+    assert message_id is None
+    assert send.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_twilio_sends_request_status_callbacks():
+    service = make_service()
+    service.twilio_status_callback = "https://api.enwhe.io/api/v1/whatsapp/twilio/status"
+
+    with patch(SEND_PATH, new_callable=AsyncMock, return_value=twilio_response(201, sid="SM9")) as send:
+        await service.deliver(OutboundWhatsAppMessage("tenant-1", "+254700000001", "hello"))
+
+    assert send.await_args.kwargs["data"]["StatusCallback"] == service.twilio_status_callback
+    service.receipts.update("SM9", "delivered")
+    assert service.receipts.get("SM9")["status"] == "delivered"
+    service.receipts.update("SM9", "undelivered")
+    assert service.receipts.get("SM9")["status"] == "failed"
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried():
+    service = make_service()
+
+    with patch(SEND_PATH, new_callable=AsyncMock, return_value=twilio_response(400)) as send:
+        message_id = await service.deliver(OutboundWhatsAppMessage("tenant-1", "+254700000001", "hello"))
+
+    assert message_id is None
+    assert send.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_replies_to_one_customer_are_sent_in_order():
+    service = make_service()
+    bodies = []
+
+    async def send(provider, url, **kwargs):
+        bodies.append(kwargs["data"]["Body"])
+        await asyncio.sleep(0.01)
+        return twilio_response(201, sid=f"SM{len(bodies)}")
+
+    with patch(SEND_PATH, new=send):
+        for i in range(5):
+            await service.send_reply("tenant-1", "+254700000001", f"part {i}")
+        await service.stop()
+
+    assert bodies == [f"part {i}" for i in range(5)]
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_shapes_bursts():
+    bucket = TokenBucket(rate=100, burst=2)
+    started = time.monotonic()
+    for _ in range(6):
+        await bucket.acquire()
+    # Two tokens are banked; the remaining four need ~40ms at 100/s
+    assert time.monotonic() - started >= 0.035
+
+
+def test_receipts_only_move_forward():
+    tracker = DeliveryReceiptTracker()
+    tracker.record_sent("wamid.1", "tenant-1", "+254700000001", "whatsapp_graph")
+
+    tracker.update("wamid.1", "read")
+    tracker.update("wamid.1", "delivered")
+    assert tracker.get("wamid.1")["status"] == "read"
+
+    tracker.update("wamid.1", "failed")
+    assert tracker.get("wamid.1")["status"] == "failed"
+    assert tracker.update("wamid.unknown", "delivered") is False
+
+
+def test_extract_statuses():
+    payload = {
+        "object": "whatsapp_business_account",
+        "entry": [{"changes": [{"value": {"statuses": [{"id": "wamid.1", "status": "delivered"}]}}]}],
+    }
+    assert extract_statuses(payload) == [{"id": "wamid.1", "status": "delivered"}]